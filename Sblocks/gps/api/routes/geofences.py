@@ -10,6 +10,7 @@ from api.dependencies import get_current_user, require_permission, get_request_i
 from schemas.responses import ResponseBuilder
 from schemas.requests import GeofenceCreateRequest, GeofenceUpdateRequest
 from api.exception_handlers import BusinessLogicError
+from utils.pagination import InvalidCursorError
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -87,6 +88,7 @@ async def get_geofences(
     created_by: Optional[str] = Query(None, description="Filter by creator"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of records"),
     offset: int = Query(0, ge=0, description="Number of records to skip"),
+    cursor: Optional[str] = Query(None, description="Continuation token for keyset pagination (empty for the first page)"),
     current_user = Depends(require_permission("gps:read"))
 ):
     """Get list of geofences with filters"""
@@ -98,6 +100,21 @@ async def get_geofences(
             if not created_by and not current_user.get('is_admin', False):
                 created_by = current_user.get('user_id')
             
+            if cursor is not None:
+                page = await geofence_service.get_geofences_page(
+                    is_active=is_active,
+                    created_by=created_by,
+                    limit=limit,
+                    cursor=cursor or None
+                )
+                return ResponseBuilder.success(
+                    data=[geofence.model_dump() for geofence in page.items],
+                    message=f"Retrieved {len(page.items)} geofences",
+                    request_id=request_id,
+                    execution_time_ms=timer.execution_time_ms,
+                    links={"next_cursor": page.next_cursor} if page.next_cursor else None
+                ).model_dump()
+
             geofences = await geofence_service.get_geofences(
                 is_active=is_active,
                 created_by=created_by,
@@ -112,6 +129,8 @@ async def get_geofences(
                 execution_time_ms=timer.execution_time_ms
             ).model_dump()
             
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             logger.error(f"Error getting geofences: {e}")
             raise BusinessLogicError("Failed to retrieve geofences")
@@ -8,9 +8,13 @@ from datetime import datetime
 
 from services.location_service import location_service
 from services.geofence_service import geofence_service
+from services.analytics_rollup_service import analytics_rollup_service
 from api.dependencies import get_current_user, require_permission, get_request_id, RequestTimer
 from schemas.responses import ResponseBuilder
-from schemas.requests import LocationUpdateRequest, LocationHistoryRequest, TrackingSessionRequest, VehicleSearchRequest
+from schemas.requests import (
+    LocationUpdateRequest, LocationHistoryRequest, TrackingSessionRequest, VehicleSearchRequest,
+    VehicleBoundingBoxRequest, NearestVehiclesRequest
+)
 from api.exception_handlers import BusinessLogicError
 
 logger = logging.getLogger(__name__)
@@ -158,6 +162,35 @@ async def get_location_history(
             raise BusinessLogicError("Failed to retrieve location history")
 
 
+@router.get("/locations/{vehicle_id}/analytics/daily")
+async def get_vehicle_daily_analytics(
+    request: Request,
+    vehicle_id: str,
+    start_date: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$", description="First day (YYYY-MM-DD)"),
+    end_date: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$", description="Last day (YYYY-MM-DD)"),
+    current_user = Depends(require_permission("gps:read"))
+):
+    """Get precomputed daily distance, time and speed summaries for a vehicle"""
+    request_id = await get_request_id(request)
+    
+    with RequestTimer() as timer:
+        try:
+            days = await analytics_rollup_service.get_vehicle_daily_analytics(
+                vehicle_id, start_date, end_date
+            )
+            
+            return ResponseBuilder.success(
+                data=days,
+                message=f"Retrieved {len(days)} daily analytics records",
+                request_id=request_id,
+                execution_time_ms=timer.execution_time_ms
+            ).model_dump()
+            
+        except Exception as e:
+            logger.error(f"Error getting vehicle daily analytics: {e}")
+            raise BusinessLogicError("Failed to retrieve vehicle daily analytics")
+
+
 @router.post("/locations/search/area")
 async def search_vehicles_in_area(
     request: Request,
@@ -187,6 +220,74 @@ async def search_vehicles_in_area(
             raise BusinessLogicError("Failed to search vehicles in area")
 
 
+@router.post("/locations/search/bbox")
+async def search_vehicles_in_bbox(
+    request: Request,
+    search_data: VehicleBoundingBoxRequest,
+    current_user = Depends(require_permission("gps:read"))
+):
+    """Search for vehicles inside a bounding box"""
+    request_id = await get_request_id(request)
+    
+    with RequestTimer() as timer:
+        try:
+            if search_data.min_latitude > search_data.max_latitude or search_data.min_longitude > search_data.max_longitude:
+                raise HTTPException(status_code=400, detail="Bounding box minimums must not exceed maximums")
+            
+            vehicles = await location_service.get_vehicles_in_bbox(
+                min_lat=search_data.min_latitude,
+                min_lng=search_data.min_longitude,
+                max_lat=search_data.max_latitude,
+                max_lng=search_data.max_longitude
+            )
+            
+            return ResponseBuilder.success(
+                data=[vehicle.model_dump() for vehicle in vehicles],
+                message=f"Found {len(vehicles)} vehicles in bounding box",
+                request_id=request_id,
+                execution_time_ms=timer.execution_time_ms
+            ).model_dump()
+            
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error searching vehicles in bounding box: {e}")
+            raise BusinessLogicError("Failed to search vehicles in bounding box")
+
+
+@router.post("/locations/search/nearest")
+async def search_nearest_vehicles(
+    request: Request,
+    search_data: NearestVehiclesRequest,
+    current_user = Depends(require_permission("gps:read"))
+):
+    """Find the vehicles closest to a point"""
+    request_id = await get_request_id(request)
+    
+    with RequestTimer() as timer:
+        try:
+            matches = await location_service.get_nearest_vehicles(
+                latitude=search_data.latitude,
+                longitude=search_data.longitude,
+                limit=search_data.limit,
+                max_distance_meters=search_data.max_distance_meters
+            )
+            
+            return ResponseBuilder.success(
+                data=[
+                    {"vehicle": match["vehicle"].model_dump(), "distance_meters": match["distance_meters"]}
+                    for match in matches
+                ],
+                message=f"Found {len(matches)} nearest vehicles",
+                request_id=request_id,
+                execution_time_ms=timer.execution_time_ms
+            ).model_dump()
+            
+        except Exception as e:
+            logger.error(f"Error searching nearest vehicles: {e}")
+            raise BusinessLogicError("Failed to search nearest vehicles")
+
+
 # Background task function
 async def check_geofences_for_location(vehicle_id: str, latitude: float, longitude: float):
     """Background task to check geofence events"""
@@ -10,6 +10,7 @@ from api.dependencies import get_current_user, require_permission, get_request_i
 from schemas.responses import ResponseBuilder
 from schemas.requests import PlaceCreateRequest, PlaceUpdateRequest, PlaceSearchRequest, NearbyPlacesRequest
 from api.exception_handlers import BusinessLogicError
+from utils.pagination import InvalidCursorError
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -52,6 +53,36 @@ async def create_place(
             raise BusinessLogicError("Failed to create place")
 
 
+@router.get("/places/autocomplete")
+async def autocomplete_places(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=100, description="Partial place name or address"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of suggestions"),
+    current_user = Depends(require_permission("gps:read"))
+):
+    """Type-ahead suggestions for the current user's places"""
+    request_id = await get_request_id(request)
+    
+    with RequestTimer() as timer:
+        try:
+            places = await places_service.autocomplete_places(
+                user_id=current_user.get('user_id'),
+                prefix=q,
+                limit=limit
+            )
+            
+            return ResponseBuilder.success(
+                data=[place.model_dump() for place in places],
+                message=f"Found {len(places)} suggestions",
+                request_id=request_id,
+                execution_time_ms=timer.execution_time_ms
+            ).model_dump()
+            
+        except Exception as e:
+            logger.error(f"Error autocompleting places: {e}")
+            raise BusinessLogicError("Failed to autocomplete places")
+
+
 @router.get("/places/{place_id}")
 async def get_place(
     request: Request,
@@ -93,6 +124,7 @@ async def get_user_places(
     place_type: Optional[str] = Query(None, description="Filter by place type"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of records"),
     offset: int = Query(0, ge=0, description="Number of records to skip"),
+    cursor: Optional[str] = Query(None, description="Continuation token for keyset pagination (empty for the first page)"),
     current_user = Depends(require_permission("gps:read"))
 ):
     """Get places for the current user"""
@@ -102,6 +134,21 @@ async def get_user_places(
         try:
             user_id = current_user.get('user_id')
             
+            if cursor is not None:
+                page = await places_service.get_places_page(
+                    user_id=user_id,
+                    place_type=place_type,
+                    limit=limit,
+                    cursor=cursor or None
+                )
+                return ResponseBuilder.success(
+                    data=[place.model_dump() for place in page.items],
+                    message=f"Retrieved {len(page.items)} places",
+                    request_id=request_id,
+                    execution_time_ms=timer.execution_time_ms,
+                    links={"next_cursor": page.next_cursor} if page.next_cursor else None
+                ).model_dump()
+
             places = await places_service.get_user_places(
                 user_id=user_id,
                 place_type=place_type,
@@ -116,6 +163,8 @@ async def get_user_places(
                 execution_time_ms=timer.execution_time_ms
             ).model_dump()
             
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             logger.error(f"Error getting user places: {e}")
             raise BusinessLogicError("Failed to retrieve places")
@@ -134,6 +183,22 @@ async def search_places(
         try:
             user_id = current_user.get('user_id')
             
+            if search_data.latitude is not None and search_data.longitude is not None:
+                results = await places_service.search_places_near(
+                    user_id=user_id,
+                    search_term=search_data.search_term,
+                    latitude=search_data.latitude,
+                    longitude=search_data.longitude,
+                    radius_meters=search_data.radius_meters,
+                    limit=search_data.limit
+                )
+                return ResponseBuilder.success(
+                    data=[{**r, "place": r["place"].model_dump()} for r in results],
+                    message=f"Found {len(results)} places matching search nearby",
+                    request_id=request_id,
+                    execution_time_ms=timer.execution_time_ms
+                ).model_dump()
+            
             places = await places_service.search_places(
                 user_id=user_id,
                 search_term=search_data.search_term,
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark deep-page latency for offset (skip/limit) vs keyset pagination
+
+Seeds a scratch collection in MONGODB_URL and times fetching page N both ways.
+
+    python -m benchmarks.bench_pagination --docs 50000 --page 500 --page-size 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from utils.pagination import paginate
+
+MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+DATABASE_NAME = os.getenv("BENCH_DATABASE_NAME", "samfms_bench")
+
+
+async def seed(collection, docs: int):
+    await collection.drop()
+    base = datetime.utcnow()
+    batch = []
+    for i in range(docs):
+        batch.append({
+            "user_id": "bench-user",
+            "name": f"Place {i:06d}",
+            "created_at": base - timedelta(seconds=i),
+        })
+        if len(batch) == 5000:
+            await collection.insert_many(batch)
+            batch = []
+    if batch:
+        await collection.insert_many(batch)
+    await collection.create_index([("user_id", 1), ("created_at", -1), ("_id", -1)])
+
+
+async def offset_page(collection, page: int, page_size: int):
+    cursor = collection.find({"user_id": "bench-user"}).sort(
+        [("created_at", -1), ("_id", -1)]
+    ).skip(page * page_size).limit(page_size)
+    return await cursor.to_list(length=page_size)
+
+
+async def keyset_cursor_for(collection, page: int, page_size: int):
+    """Walk to the cursor that starts ``page`` (not timed)"""
+    cursor = None
+    for _ in range(page):
+        result = await paginate(
+            collection, {"user_id": "bench-user"}, [("created_at", -1)], page_size, cursor
+        )
+        cursor = result.next_cursor
+    return cursor
+
+
+async def timed(fn, repeats: int):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": round(statistics.median(samples), 3),
+        "min_ms": round(min(samples), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Offset vs keyset pagination benchmark")
+    parser.add_argument("--docs", type=int, default=50000)
+    parser.add_argument("--page", type=int, default=500)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--skip-seed", action="store_true")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(MONGODB_URL)
+    collection = client[DATABASE_NAME]["bench_places"]
+    if not args.skip_seed:
+        await seed(collection, args.docs)
+
+    start_cursor = await keyset_cursor_for(collection, args.page, args.page_size)
+
+    offset_stats = await timed(lambda: offset_page(collection, args.page, args.page_size), args.repeats)
+    keyset_stats = await timed(
+        lambda: paginate(
+            collection, {"user_id": "bench-user"}, [("created_at", -1)], args.page_size, start_cursor
+        ),
+        args.repeats
+    )
+
+    print(json.dumps({
+        "docs": args.docs,
+        "page": args.page,
+        "page_size": args.page_size,
+        "offset": offset_stats,
+        "keyset": keyset_stats,
+    }, indent=2))
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark vehicles-in-area queries on the in-memory grid against a linear scan
+
+Runs offline: seeds a synthetic fleet around Pretoria, then drives radius,
+bounding-box and k-nearest queries at a target rate (default 1k/s) while
+applying position updates, and prints per-query latency percentiles as JSON.
+
+    python -m benchmarks.bench_spatial_index --vehicles 10000 --qps 1000 --seconds 5
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from services.vehicle_spatial_index import VehicleSpatialIndex, _haversine_meters
+
+CENTER = (-25.7463, 28.1881)
+
+
+def make_fleet(vehicles: int, rng: random.Random):
+    return [
+        {
+            "vehicle_id": f"veh-{i:05d}",
+            "latitude": CENTER[0] + rng.gauss(0, 0.25),
+            "longitude": CENTER[1] + rng.gauss(0, 0.25),
+        }
+        for i in range(vehicles)
+    ]
+
+
+def linear_radius(fleet, lat, lon, radius):
+    return [d for d in fleet if _haversine_meters(lat, lon, d["latitude"], d["longitude"]) <= radius]
+
+
+def percentiles(samples_ms):
+    ordered = sorted(samples_ms)
+
+    def pick(p):
+        return round(ordered[min(len(ordered) - 1, int(p / 100.0 * len(ordered)))], 4)
+
+    return {
+        "count": len(ordered),
+        "p50_ms": pick(50),
+        "p95_ms": pick(95),
+        "p99_ms": pick(99),
+        "mean_ms": round(statistics.fmean(ordered), 4),
+    }
+
+
+def random_query(rng: random.Random):
+    return CENTER[0] + rng.uniform(-0.4, 0.4), CENTER[1] + rng.uniform(-0.4, 0.4)
+
+
+async def drive(index, fleet, qps: int, seconds: float, updates_per_query: int, rng: random.Random):
+    """Issue queries on a fixed schedule, mixing in position updates"""
+    latencies = {"radius": [], "bbox": [], "nearest": []}
+    interval = 1.0 / qps
+    start = time.perf_counter()
+    deadline = start + seconds
+    next_at = start
+    issued = 0
+
+    while next_at < deadline:
+        now = time.perf_counter()
+        if now < next_at:
+            await asyncio.sleep(next_at - now)
+
+        for _ in range(updates_per_query):
+            doc = fleet[rng.randrange(len(fleet))]
+            doc["latitude"] += rng.uniform(-0.0005, 0.0005)
+            doc["longitude"] += rng.uniform(-0.0005, 0.0005)
+            index.upsert_doc(doc)
+
+        lat, lon = random_query(rng)
+        kind = ("radius", "bbox", "nearest")[issued % 3]
+        t0 = time.perf_counter()
+        if kind == "radius":
+            index.within_radius(lat, lon, 2000)
+        elif kind == "bbox":
+            index.within_bbox(lat - 0.02, lon - 0.03, lat + 0.02, lon + 0.03)
+        else:
+            index.nearest(lat, lon, k=10)
+        latencies[kind].append((time.perf_counter() - t0) * 1000)
+
+        issued += 1
+        next_at += interval
+
+    elapsed = time.perf_counter() - start
+    return latencies, issued / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vehicles", type=int, default=10000)
+    parser.add_argument("--qps", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--updates-per-query", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    fleet = make_fleet(args.vehicles, rng)
+
+    index = VehicleSpatialIndex()
+    t0 = time.perf_counter()
+    index.load(fleet)
+    load_ms = (time.perf_counter() - t0) * 1000
+
+    linear = []
+    for _ in range(200):
+        lat, lon = random_query(rng)
+        t0 = time.perf_counter()
+        linear_radius(fleet, lat, lon, 2000)
+        linear.append((time.perf_counter() - t0) * 1000)
+
+    latencies, achieved_qps = asyncio.run(
+        drive(index, fleet, args.qps, args.seconds, args.updates_per_query, rng)
+    )
+
+    print(json.dumps({
+        "vehicles": args.vehicles,
+        "target_qps": args.qps,
+        "achieved_qps": round(achieved_qps, 1),
+        "load_ms": round(load_ms, 2),
+        "linear_scan_radius": percentiles(linear),
+        "grid": {kind: percentiles(samples) for kind, samples in latencies.items()},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,8 @@ class EventType(str, Enum):
     SERVICE_STARTED = "service_started"
     LOCATION_UPDATED = "location_updated"
     GEOFENCE_CREATED = "geofence_created"
+    GEOFENCE_UPDATED = "geofence_updated"
+    GEOFENCE_DELETED = "geofence_deleted"
     GEOFENCE_EVENT = "geofence_event"
     PLACE_CREATED = "place_created"
     TRACKING_SESSION_STARTED = "tracking_session_started"
@@ -46,6 +48,18 @@ class GeofenceCreatedEvent(BaseEvent):
     created_by: Optional[str] = Field(None, description="User who created the geofence")
 
 
+class GeofenceUpdatedEvent(BaseEvent):
+    """Geofence updated event"""
+    event_type: EventType = Field(default=EventType.GEOFENCE_UPDATED, description="Event type")
+    geofence_id: str = Field(..., description="Geofence identifier")
+
+
+class GeofenceDeletedEvent(BaseEvent):
+    """Geofence deleted event"""
+    event_type: EventType = Field(default=EventType.GEOFENCE_DELETED, description="Event type")
+    geofence_id: str = Field(..., description="Geofence identifier")
+
+
 class GeofenceEvent(BaseEvent):
     """Geofence event (enter/exit/dwell)"""
     event_type: EventType = Field(default=EventType.GEOFENCE_EVENT, description="Event type")
@@ -10,7 +10,7 @@ import os
 from datetime import datetime
 
 from .events import (
-    BaseEvent, EventType, LocationUpdatedEvent, GeofenceCreatedEvent, 
+    BaseEvent, EventType, LocationUpdatedEvent, GeofenceCreatedEvent, GeofenceUpdatedEvent, GeofenceDeletedEvent, 
     GeofenceEvent, PlaceCreatedEvent, ServiceStartedEvent
 )
 
@@ -161,6 +161,16 @@ class EventPublisher:
         )
         return await self.publish_event(event, "gps.geofence.created")
     
+    async def publish_geofence_updated(self, geofence_id: str) -> bool:
+        """Publish geofence updated event"""
+        event = GeofenceUpdatedEvent(geofence_id=geofence_id)
+        return await self.publish_event(event, "gps.geofence.updated")
+    
+    async def publish_geofence_deleted(self, geofence_id: str) -> bool:
+        """Publish geofence deleted event"""
+        event = GeofenceDeletedEvent(geofence_id=geofence_id)
+        return await self.publish_event(event, "gps.geofence.deleted")
+    
     async def publish_geofence_event(
         self, 
         vehicle_id: str, 
@@ -20,6 +20,8 @@ from events.consumer import event_consumer, setup_event_handlers
 from services.location_service import location_service
 from services.geofence_service import geofence_service
 from services.places_service import places_service
+from services.analytics_rollup_service import analytics_rollup_service
+from services.vehicle_spatial_index import vehicle_spatial_index
 from services.request_consumer import service_request_consumer
 from api.routes.locations import router as locations_router
 from api.routes.geofences import router as geofences_router
@@ -194,6 +196,15 @@ async def lifespan(app: FastAPI):
             await enhanced_background_tasks()
         
         asyncio.create_task(start_background_tasks())
+        asyncio.create_task(analytics_rollup_task())
+        
+        # Keep the in-memory vehicle grid in step with vehicle_locations
+        app.state.spatial_index_task = asyncio.create_task(
+            vehicle_spatial_index.run_sync_loop(
+                lambda: db_manager.db.vehicle_locations,
+                db_manager.is_connected
+            )
+        )
         
         # Store start time for uptime calculation
         app.state.start_time = datetime.now(timezone.utc)
@@ -227,6 +238,10 @@ async def lifespan(app: FastAPI):
             await event_publisher.disconnect()
             logger.info("Event publisher disconnected")
 
+            spatial_index_task = getattr(app.state, "spatial_index_task", None)
+            if spatial_index_task:
+                spatial_index_task.cancel()
+
             await service_request_consumer.stop_consuming()
             await service_request_consumer.disconnect()
             logger.info("Service request consumer stopped")
@@ -263,6 +278,18 @@ async def enhanced_background_tasks():
             logger.error(f"Background task error: {e}")
             await asyncio.sleep(300)  # Wait 5 minutes before retry
 
+async def analytics_rollup_task():
+    """Periodically roll new location history into daily vehicle analytics"""
+    interval = int(os.getenv("ANALYTICS_ROLLUP_INTERVAL_SECONDS", "300"))
+    await asyncio.sleep(10)
+    while True:
+        try:
+            if db_manager.is_connected():
+                await analytics_rollup_service.run_once()
+        except Exception as e:
+            logger.error(f"Analytics rollup task error: {e}")
+        await asyncio.sleep(interval)
+
 # Create FastAPI app
 app = FastAPI(
     title="GPS Service",
@@ -97,6 +97,9 @@ class DatabaseManager:
             await locations_collection.create_index([
                 ("timestamp", -1)
             ])
+            await locations_collection.create_index([
+                ("updated_at", 1)  # Spatial index delta sync
+            ])
             await locations_collection.create_index([
                 ("vehicle_id", 1),
                 ("created_at", -1)
@@ -124,6 +127,9 @@ class DatabaseManager:
             await history_collection.create_index([
                 ("timestamp", 1)  # For TTL and cleanup
             ])
+            await history_collection.create_index([
+                ("created_at", 1)  # Analytics rollup watermark scans
+            ])
             # New indexes for analytics
             await history_collection.create_index([
                 ("vehicle_id", 1),
@@ -149,6 +155,15 @@ class DatabaseManager:
             await geofences_collection.create_index([
                 ("is_active", 1)
             ])
+            await geofences_collection.create_index([
+                ("name", 1),
+                ("_id", 1)  # Keyset pagination sort key
+            ])
+            await geofences_collection.create_index([
+                ("created_by", 1),
+                ("name", 1),
+                ("_id", 1)  # Keyset pages of one user's geofences
+            ])
             
             # Geofence events collection indexes
             geofence_events_collection = self._db.geofence_events
@@ -177,6 +192,21 @@ class DatabaseManager:
             await places_collection.create_index([
                 ("created_by", 1)
             ])
+            await places_collection.create_index(
+                [("name", "text"), ("address", "text"), ("description", "text")],
+                weights={"name": 10, "address": 5, "description": 2},
+                name="places_text_search"
+            )
+            # Keyset pagination sort keys (newest first)
+            await places_collection.create_index([
+                ("created_at", -1),
+                ("_id", -1)
+            ])
+            await places_collection.create_index([
+                ("user_id", 1),
+                ("created_at", -1),
+                ("_id", -1)
+            ])
             
             # Tracking sessions collection indexes (enhanced for analytics)
             tracking_sessions_collection = self._db.tracking_sessions
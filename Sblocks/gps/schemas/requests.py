@@ -80,10 +80,29 @@ class VehicleSearchRequest(BaseModel):
     radius_meters: float = Field(..., gt=0, le=100000, description="Search radius in meters")
 
 
+class VehicleBoundingBoxRequest(BaseModel):
+    """Request to list vehicles inside a map viewport"""
+    min_latitude: float = Field(..., ge=-90, le=90, description="Southern edge")
+    min_longitude: float = Field(..., ge=-180, le=180, description="Western edge")
+    max_latitude: float = Field(..., ge=-90, le=90, description="Northern edge")
+    max_longitude: float = Field(..., ge=-180, le=180, description="Eastern edge")
+
+
+class NearestVehiclesRequest(BaseModel):
+    """Request to find the vehicles closest to a point"""
+    latitude: float = Field(..., ge=-90, le=90, description="Latitude of the point")
+    longitude: float = Field(..., ge=-180, le=180, description="Longitude of the point")
+    limit: int = Field(default=5, ge=1, le=100, description="Number of vehicles to return")
+    max_distance_meters: Optional[float] = Field(None, gt=0, le=500000, description="Ignore vehicles further than this")
+
+
 class PlaceSearchRequest(BaseModel):
     """Request to search places"""
     search_term: str = Field(..., min_length=1, max_length=100, description="Search term")
     limit: int = Field(default=50, ge=1, le=100, description="Maximum number of results")
+    latitude: Optional[float] = Field(None, ge=-90, le=90, description="Rank results by distance from this latitude")
+    longitude: Optional[float] = Field(None, ge=-180, le=180, description="Rank results by distance from this longitude")
+    radius_meters: float = Field(default=5000, gt=0, le=50000, description="Search radius in meters when a location is given")
 
 
 class NearbyPlacesRequest(BaseModel):
@@ -0,0 +1,257 @@
+"""
+Incremental daily vehicle analytics rollup built from location history
+"""
+import logging
+import math
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from repositories.database import db_manager
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_STATE_ID = "vehicle_daily_analytics"
+MOVING_SPEED_KMH = 5.0
+MAX_SEGMENT_GAP_SECONDS = 600
+# History written in the last few seconds may still be arriving out of order
+WATERMARK_LAG_SECONDS = 5
+DATE_FORMAT = "%Y-%m-%d"
+
+
+def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = math.radians(lat2 - lat1)
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(min(1.0, a)))
+
+
+def day_bounds(date: str) -> Tuple[datetime, datetime]:
+    """UTC start (inclusive) and end (exclusive) of a ``YYYY-MM-DD`` day"""
+    start = datetime.strptime(date, DATE_FORMAT)
+    return start, start + timedelta(days=1)
+
+
+def summarize_day(
+    vehicle_id: str,
+    date: str,
+    points: Iterable[Dict[str, Any]],
+    anchor: Optional[Dict[str, Any]] = None,
+    geofence_counts: Optional[Dict[str, int]] = None
+) -> Dict[str, Any]:
+    """Fold one vehicle's time-ordered points for ``date`` into a daily summary
+
+    ``anchor`` is the last point before the day so the segment crossing
+    midnight is attributed to the day it ends in. Gaps longer than
+    ``MAX_SEGMENT_GAP_SECONDS`` count towards distance but not time.
+    """
+    distance_km = 0.0
+    moving_seconds = 0.0
+    idle_seconds = 0.0
+    max_speed = 0.0
+    speed_sum = 0.0
+    speed_samples = 0
+    point_count = 0
+    first_ts = None
+    last_ts = None
+
+    prev = anchor
+    for point in points:
+        point_count += 1
+        ts = point["timestamp"]
+        if first_ts is None:
+            first_ts = ts
+        last_ts = ts
+
+        speed = point.get("speed")
+        if speed is not None:
+            max_speed = max(max_speed, float(speed))
+            speed_sum += float(speed)
+            speed_samples += 1
+
+        if prev is not None:
+            distance_km += _haversine_km(
+                prev["latitude"], prev["longitude"], point["latitude"], point["longitude"]
+            )
+            gap = (ts - prev["timestamp"]).total_seconds()
+            if 0 < gap <= MAX_SEGMENT_GAP_SECONDS:
+                # Classify the segment by the speed reported at its start
+                prev_speed = prev.get("speed") or 0.0
+                if prev_speed >= MOVING_SPEED_KMH:
+                    moving_seconds += gap
+                else:
+                    idle_seconds += gap
+        prev = point
+
+    geofence_counts = geofence_counts or {}
+    return {
+        "vehicle_id": vehicle_id,
+        "date": date,
+        "distance_km": round(distance_km, 3),
+        "moving_time_seconds": int(moving_seconds),
+        "idle_time_seconds": int(idle_seconds),
+        "max_speed": round(max_speed, 2),
+        "avg_speed": round(speed_sum / speed_samples, 2) if speed_samples else 0.0,
+        "speed_samples": speed_samples,
+        "point_count": point_count,
+        "first_timestamp": first_ts,
+        "last_timestamp": last_ts,
+        "geofence_entries": geofence_counts.get("enter", 0),
+        "geofence_exits": geofence_counts.get("exit", 0),
+        "geofence_events": sum(geofence_counts.values()),
+        "updated_at": datetime.utcnow()
+    }
+
+
+class AnalyticsRollupService:
+    """Maintains ``vehicle_analytics`` from history appended since a watermark
+
+    Each run finds the (vehicle, day) pairs touched by history or geofence
+    events written after the stored watermark and recomputes those days in
+    full, so re-running (or running after a crash before the watermark moved)
+    replaces the same documents with the same values.
+    """
+
+    def __init__(self):
+        self.db = db_manager
+
+    async def _get_watermark(self) -> datetime:
+        state = await self.db.db.analytics_rollup_state.find_one({"_id": ROLLUP_STATE_ID})
+        if state and state.get("watermark"):
+            return state["watermark"]
+        return datetime(1970, 1, 1)
+
+    async def _set_watermark(self, watermark: datetime):
+        await self.db.db.analytics_rollup_state.update_one(
+            {"_id": ROLLUP_STATE_ID},
+            {"$set": {"watermark": watermark, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+    async def _dirty_days(self, collection, time_field: str, since: datetime, until: datetime) -> Set[Tuple[str, str]]:
+        pipeline = [
+            {"$match": {time_field: {"$gt": since, "$lte": until}}},
+            {"$group": {"_id": {
+                "vehicle_id": "$vehicle_id",
+                "date": {"$dateToString": {"format": DATE_FORMAT, "date": "$timestamp"}}
+            }}}
+        ]
+        dirty = set()
+        async for row in collection.aggregate(pipeline):
+            key = row["_id"]
+            if key.get("vehicle_id") and key.get("date"):
+                dirty.add((key["vehicle_id"], key["date"]))
+        return dirty
+
+    async def _geofence_counts(self, vehicle_id: str, start: datetime, end: datetime) -> Dict[str, int]:
+        pipeline = [
+            {"$match": {"vehicle_id": vehicle_id, "timestamp": {"$gte": start, "$lt": end}}},
+            {"$group": {"_id": "$event_type", "count": {"$sum": 1}}}
+        ]
+        counts = {}
+        async for row in self.db.db.geofence_events.aggregate(pipeline):
+            counts[row["_id"]] = row["count"]
+        return counts
+
+    async def recompute_day(self, vehicle_id: str, date: str) -> Dict[str, Any]:
+        """Recompute and store the summary for one vehicle and day"""
+        start, end = day_bounds(date)
+        projection = {"latitude": 1, "longitude": 1, "speed": 1, "timestamp": 1, "_id": 0}
+        history = self.db.db.location_history
+
+        anchor = await history.find_one(
+            {"vehicle_id": vehicle_id, "timestamp": {"$lt": start}},
+            projection,
+            sort=[("timestamp", -1)]
+        )
+        if anchor is not None and (start - anchor["timestamp"]).total_seconds() > MAX_SEGMENT_GAP_SECONDS:
+            anchor = None
+
+        cursor = history.find(
+            {"vehicle_id": vehicle_id, "timestamp": {"$gte": start, "$lt": end}},
+            projection
+        ).sort("timestamp", 1)
+        points = await cursor.to_list(length=None)
+
+        geofence_counts = await self._geofence_counts(vehicle_id, start, end)
+        summary = summarize_day(vehicle_id, date, points, anchor, geofence_counts)
+        await self.db.store_daily_analytics(summary)
+        return summary
+
+    async def run_once(self, now: Optional[datetime] = None) -> int:
+        """Roll up everything written since the watermark; returns days recomputed"""
+        try:
+            now = now or datetime.utcnow()
+            since = await self._get_watermark()
+            until = now - timedelta(seconds=WATERMARK_LAG_SECONDS)
+            if until <= since:
+                return 0
+
+            dirty = await self._dirty_days(self.db.db.location_history, "created_at", since, until)
+            dirty |= await self._dirty_days(self.db.db.geofence_events, "timestamp", since, until)
+
+            # A day's first segment depends on the previous day's last point,
+            # so history landing late in a day also dirties the following day
+            # when that one already has a summary.
+            for vehicle_id, date in list(dirty):
+                next_date = (day_bounds(date)[1]).strftime(DATE_FORMAT)
+                if (vehicle_id, next_date) in dirty:
+                    continue
+                existing = await self.db.db.vehicle_analytics.find_one(
+                    {"vehicle_id": vehicle_id, "date": next_date}, {"_id": 1}
+                )
+                if existing is not None:
+                    dirty.add((vehicle_id, next_date))
+
+            for vehicle_id, date in sorted(dirty):
+                await self.recompute_day(vehicle_id, date)
+
+            await self._set_watermark(until)
+            if dirty:
+                logger.info(f"Rolled up daily analytics for {len(dirty)} vehicle-days")
+            return len(dirty)
+
+        except Exception as e:
+            logger.error(f"Error rolling up daily analytics: {e}")
+            raise
+
+    async def rebuild(self, vehicle_id: str, start_date: str, end_date: str) -> int:
+        """Recompute every day in ``[start_date, end_date]`` for one vehicle"""
+        start, _ = day_bounds(start_date)
+        end, _ = day_bounds(end_date)
+        days = 0
+        current = start
+        while current <= end:
+            await self.recompute_day(vehicle_id, current.strftime(DATE_FORMAT))
+            current += timedelta(days=1)
+            days += 1
+        return days
+
+    async def get_vehicle_daily_analytics(
+        self,
+        vehicle_id: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Read precomputed daily summaries for a vehicle, oldest first"""
+        try:
+            query: Dict[str, Any] = {"vehicle_id": vehicle_id}
+            date_range = {}
+            if start_date:
+                date_range["$gte"] = start_date
+            if end_date:
+                date_range["$lte"] = end_date
+            if date_range:
+                query["date"] = date_range
+
+            cursor = self.db.db.vehicle_analytics.find(query, {"_id": 0}).sort("date", 1)
+            return await cursor.to_list(length=None)
+
+        except Exception as e:
+            logger.error(f"Error fetching daily analytics for {vehicle_id}: {e}")
+            raise
+
+
+# Global analytics rollup service instance
+analytics_rollup_service = AnalyticsRollupService()
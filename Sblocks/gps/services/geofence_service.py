@@ -6,6 +6,7 @@ from bson import ObjectId
 from repositories.database import db_manager
 from schemas.entities import Geofence, GeofenceGeometry, GeofenceCenter, GeofenceType, GeofenceStatus, GeofenceCategory
 from events.publisher import event_publisher
+from utils.pagination import KeysetPage, paginate
 
 logger = logging.getLogger(__name__)
 
@@ -160,6 +161,7 @@ class GeofenceService:
         self,
         is_active: Optional[bool] = None,
         geofence_type: Optional[str] = None,
+        created_by: Optional[str] = None,
         limit: int = 50,
         offset: int = 0
     ) -> List[Geofence]:
@@ -170,6 +172,8 @@ class GeofenceService:
                 query["is_active"] = is_active
             if geofence_type:
                 query["type"] = geofence_type
+            if created_by:
+                query["created_by"] = created_by
 
             cursor = self.db.db.geofences.find(query).skip(offset).limit(limit)
             geofences = []
@@ -187,6 +191,44 @@ class GeofenceService:
             logger.error(f"Error getting geofences: {e}")
             return []
 
+    async def get_geofences_page(
+        self,
+        is_active: Optional[bool] = None,
+        geofence_type: Optional[str] = None,
+        created_by: Optional[str] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> KeysetPage:
+        """Get geofences ordered by name using keyset pagination
+
+        Pass the previous page's ``next_cursor`` to continue; deep pages cost the
+        same as the first because nothing before the cursor is skipped.
+        """
+        query = {}
+        if is_active is not None:
+            query["is_active"] = is_active
+        if geofence_type:
+            query["type"] = geofence_type
+        if created_by:
+            query["created_by"] = created_by
+
+        page = await paginate(
+            self.db.db.geofences,
+            query=query,
+            sort=[("name", 1)],
+            limit=limit,
+            cursor=cursor
+        )
+
+        geofences = []
+        for doc in page.items:
+            doc["id"] = str(doc.pop("_id"))
+            if "geometry" not in doc or not isinstance(doc["geometry"], dict):
+                doc["geometry"] = {"type": "Polygon", "coordinates": []}
+            geofences.append(Geofence(**doc))
+        page.items = geofences
+        return page
+
 
     
     async def update_geofence(
@@ -267,6 +309,12 @@ class GeofenceService:
             )
 
             if result.modified_count > 0:
+                # Let services holding geofences in memory reload them
+                try:
+                    await event_publisher.publish_geofence_updated(geofence_id=geofence_id)
+                except Exception as e:
+                    logger.warning(f"Failed to publish geofence updated event: {e}")
+
                 # Retrieve the updated document with proper transformations
                 return await self.get_geofence_by_id(geofence_id)
 
@@ -285,7 +333,13 @@ class GeofenceService:
             
             result = await self.db.db.geofences.delete_one({"_id": query_id})
             
-            return result.deleted_count > 0
+            if result.deleted_count > 0:
+                try:
+                    await event_publisher.publish_geofence_deleted(geofence_id=geofence_id)
+                except Exception as e:
+                    logger.warning(f"Failed to publish geofence deleted event: {e}")
+                return True
+            return False
             
         except Exception as e:
             logger.error(f"Error deleting geofence {geofence_id}: {e}")
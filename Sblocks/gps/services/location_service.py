@@ -9,6 +9,8 @@ from bson import ObjectId
 from repositories.database import db_manager, db_manager_management
 from schemas.entities import VehicleLocation, LocationHistory, TrackingSession
 from events.publisher import event_publisher
+from utils.geo import haversine_km, segment_lengths_km
+from services.vehicle_spatial_index import vehicle_spatial_index
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +46,7 @@ class LocationService:
         """Delete a vehicle's current location by vehicle_id."""
         try:
             result = await self.db.db.vehicle_locations.delete_one({"vehicle_id": vehicle_id})
+            vehicle_spatial_index.remove(vehicle_id)
             if result.deleted_count > 0:
                 logger.info(f"Deleted location for vehicle {vehicle_id}")
                 return True
@@ -84,6 +87,7 @@ class LocationService:
 
             result = await self.db.db.vehicle_locations.insert_one(location_data)
             location_data["_id"] = str(result.inserted_id)
+            vehicle_spatial_index.upsert_doc(location_data)
 
             history_data = location_data.copy()
             history_data["created_at"] = datetime.utcnow()
@@ -160,6 +164,7 @@ class LocationService:
                 {"$set": location_data},
                 upsert=True
             )
+            vehicle_spatial_index.upsert_doc(location_data)
             
             # Add to location history
             history_data = location_data.copy()
@@ -254,6 +259,12 @@ class LocationService:
             logger.error(f"Error getting location history: {e}")
             raise
     
+    def _to_vehicle_location(self, doc: Dict[str, Any]) -> VehicleLocation:
+        doc = dict(doc)
+        if "_id" in doc:
+            doc["_id"] = str(doc["_id"])
+        return VehicleLocation(**doc)
+
     async def get_vehicles_in_area(
         self, 
         center_lat: float, 
@@ -262,6 +273,13 @@ class LocationService:
     ) -> List[VehicleLocation]:
         """Get all vehicles within a circular area"""
         try:
+            if vehicle_spatial_index.is_ready:
+                return [
+                    self._to_vehicle_location(doc)
+                    for doc, _ in vehicle_spatial_index.within_radius(center_lat, center_lng, radius_meters)
+                ]
+            
+            # Cold start: the spatial index has not loaded yet
             query = {
                 "location": {
                     "$geoWithin": {
@@ -285,6 +303,65 @@ class LocationService:
         except Exception as e:
             logger.error(f"Error getting vehicles in area: {e}")
             raise
+
+    async def get_vehicles_in_bbox(
+        self,
+        min_lat: float,
+        min_lng: float,
+        max_lat: float,
+        max_lng: float
+    ) -> List[VehicleLocation]:
+        """Get all vehicles inside a bounding box (e.g. the visible map)"""
+        try:
+            if vehicle_spatial_index.is_ready:
+                docs = vehicle_spatial_index.within_bbox(min_lat, min_lng, max_lat, max_lng)
+            else:
+                query = {
+                    "location": {
+                        "$geoWithin": {"$box": [[min_lng, min_lat], [max_lng, max_lat]]}
+                    }
+                }
+                docs = await self.db.db.vehicle_locations.find(query).to_list(length=None)
+            
+            return [self._to_vehicle_location(doc) for doc in docs]
+            
+        except Exception as e:
+            logger.error(f"Error getting vehicles in bounding box: {e}")
+            raise
+
+    async def get_nearest_vehicles(
+        self,
+        latitude: float,
+        longitude: float,
+        limit: int = 5,
+        max_distance_meters: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """Get the closest vehicles to a point, nearest first"""
+        try:
+            if vehicle_spatial_index.is_ready:
+                matches = vehicle_spatial_index.nearest(latitude, longitude, limit, max_distance_meters)
+            else:
+                near: Dict[str, Any] = {
+                    "$geometry": {"type": "Point", "coordinates": [longitude, latitude]}
+                }
+                if max_distance_meters is not None:
+                    near["$maxDistance"] = max_distance_meters
+                docs = await self.db.db.vehicle_locations.find(
+                    {"location": {"$nearSphere": near}}
+                ).limit(limit).to_list(length=limit)
+                matches = [
+                    (doc, haversine_km(latitude, longitude, doc["latitude"], doc["longitude"]) * 1000)
+                    for doc in docs
+                ]
+            
+            return [
+                {"vehicle": self._to_vehicle_location(doc), "distance_meters": round(distance, 1)}
+                for doc, distance in matches
+            ]
+            
+        except Exception as e:
+            logger.error(f"Error getting nearest vehicles: {e}")
+            raise
     
     async def start_tracking_session(self, vehicle_id: str, user_id: str) -> TrackingSession:
         """Start a new tracking session for a vehicle"""
@@ -437,26 +514,19 @@ class LocationService:
             
             # Calculate route information
             route_points = []
-            total_distance = 0
-            
-            for i, location in enumerate(locations):
-                point = {
+            for location in locations:
+                route_points.append({
                     "latitude": location["latitude"],
                     "longitude": location["longitude"],
                     "timestamp": location["timestamp"].isoformat(),
                     "speed": location.get("speed"),
                     "heading": location.get("heading")
-                }
-                route_points.append(point)
-                
-                # Calculate distance between consecutive points
-                if i > 0:
-                    prev_loc = locations[i-1]
-                    distance = self._calculate_distance(
-                        prev_loc["latitude"], prev_loc["longitude"],
-                        location["latitude"], location["longitude"]
-                    )
-                    total_distance += distance
+                })
+            
+            # Sum distances between consecutive points in one vectorised pass
+            total_distance = float(segment_lengths_km(
+                [[loc["latitude"], loc["longitude"]] for loc in locations]
+            ).sum())
             
             return {
                 "vehicle_id": vehicle_id,
@@ -551,21 +621,7 @@ class LocationService:
 
     def _calculate_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         """Calculate distance between two coordinates using Haversine formula (returns km)"""
-        import math
-        
-        R = 6371  # Earth's radius in kilometers
-        
-        lat1_rad = math.radians(lat1)
-        lat2_rad = math.radians(lat2)
-        delta_lat = math.radians(lat2 - lat1)
-        delta_lon = math.radians(lon2 - lon1)
-        
-        a = (math.sin(delta_lat/2) * math.sin(delta_lat/2) + 
-             math.cos(lat1_rad) * math.cos(lat2_rad) * 
-             math.sin(delta_lon/2) * math.sin(delta_lon/2))
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-        
-        return R * c
+        return haversine_km(lat1, lon1, lat2, lon2)
 
 
 # Global location service instance
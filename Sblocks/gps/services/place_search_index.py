@@ -0,0 +1,250 @@
+"""
+In-memory per-user search index for places (type-ahead and text + distance ranking)
+"""
+import bisect
+import logging
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Keep in step with the weights of the Mongo text index on places
+FIELD_WEIGHTS = {
+    "name": 10.0,
+    "address": 5.0,
+    "description": 2.0,
+}
+
+PREFIX_MATCH_FACTOR = 0.75
+FUZZY_MATCH_FACTOR = 0.5
+MIN_TRIGRAM_SIMILARITY = 0.4
+USER_INDEX_TTL_SECONDS = 300
+MAX_INDEXED_USERS = 500
+
+_TOKEN_RE = re.compile(r"[0-9a-z]+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase alphanumeric tokens of ``text``"""
+    if not text:
+        return []
+    return _TOKEN_RE.findall(text.lower())
+
+
+def trigrams(token: str) -> Set[str]:
+    """Character trigrams of a token padded with word boundaries"""
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def haversine_meters(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in meters"""
+    r = 6371000.0
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = math.radians(lat2 - lat1)
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * r * math.asin(math.sqrt(a))
+
+
+class _UserIndex:
+    """Token, prefix and trigram postings for one user's places"""
+
+    def __init__(self):
+        self.places: Dict[str, Dict[str, Any]] = {}
+        self.place_tokens: Dict[str, Dict[str, float]] = {}
+        self.postings: Dict[str, Dict[str, float]] = {}
+        self.sorted_tokens: List[str] = []
+        self.trigram_postings: Dict[str, Set[str]] = {}
+        self.loaded_at = time.monotonic()
+
+    def add(self, place_id: str, doc: Dict[str, Any]):
+        self.remove(place_id)
+
+        weights: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(doc.get(field)):
+                weights[token] = max(weights.get(token, 0.0), weight)
+
+        self.places[place_id] = doc
+        self.place_tokens[place_id] = weights
+        for token, weight in weights.items():
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = self.postings[token] = {}
+                bisect.insort(self.sorted_tokens, token)
+                for gram in trigrams(token):
+                    self.trigram_postings.setdefault(gram, set()).add(token)
+            posting[place_id] = weight
+
+    def remove(self, place_id: str):
+        weights = self.place_tokens.pop(place_id, None)
+        self.places.pop(place_id, None)
+        if not weights:
+            return
+        for token in weights:
+            posting = self.postings.get(token)
+            if posting is None:
+                continue
+            posting.pop(place_id, None)
+            if not posting:
+                del self.postings[token]
+                i = bisect.bisect_left(self.sorted_tokens, token)
+                if i < len(self.sorted_tokens) and self.sorted_tokens[i] == token:
+                    del self.sorted_tokens[i]
+                for gram in trigrams(token):
+                    grams = self.trigram_postings.get(gram)
+                    if grams is not None:
+                        grams.discard(token)
+                        if not grams:
+                            del self.trigram_postings[gram]
+
+    def _prefix_tokens(self, prefix: str) -> List[str]:
+        start = bisect.bisect_left(self.sorted_tokens, prefix)
+        end = bisect.bisect_left(self.sorted_tokens, prefix + "\uffff")
+        return self.sorted_tokens[start:end]
+
+    def _fuzzy_tokens(self, token: str) -> List[Tuple[str, float]]:
+        grams = trigrams(token)
+        overlap: Dict[str, int] = {}
+        for gram in grams:
+            for candidate in self.trigram_postings.get(gram, ()):
+                overlap[candidate] = overlap.get(candidate, 0) + 1
+        matches = []
+        for candidate, shared in overlap.items():
+            similarity = shared / float(len(grams) + len(trigrams(candidate)) - shared)
+            if similarity >= MIN_TRIGRAM_SIMILARITY:
+                matches.append((candidate, similarity))
+        return matches
+
+    def score(self, query: str) -> Dict[str, float]:
+        """Score places against ``query``; the last token is treated as a prefix"""
+        scores: Dict[str, float] = {}
+        query_tokens = tokenize(query)
+        for position, token in enumerate(query_tokens):
+            is_last = position == len(query_tokens) - 1
+            token_scores: Dict[str, float] = {}
+
+            exact = self.postings.get(token, {})
+            for place_id, weight in exact.items():
+                token_scores[place_id] = weight
+
+            for candidate in self._prefix_tokens(token) if is_last else ():
+                if candidate == token:
+                    continue
+                for place_id, weight in self.postings[candidate].items():
+                    token_scores[place_id] = max(token_scores.get(place_id, 0.0), weight * PREFIX_MATCH_FACTOR)
+
+            if not token_scores and len(token) >= 3:
+                for candidate, similarity in self._fuzzy_tokens(token):
+                    for place_id, weight in self.postings[candidate].items():
+                        fuzzy = weight * similarity * FUZZY_MATCH_FACTOR
+                        token_scores[place_id] = max(token_scores.get(place_id, 0.0), fuzzy)
+
+            for place_id, value in token_scores.items():
+                scores[place_id] = scores.get(place_id, 0.0) + value
+        return scores
+
+
+class PlaceSearchIndex:
+    """Per-user prefix/trigram index kept in step with place writes
+
+    A user's places are loaded from Mongo on first use and reloaded after
+    ``ttl_seconds`` so writes made by other GPS instances are picked up.
+    Expired entries are dropped on load and at most ``max_users`` indexes are
+    kept, least recently used first out.
+    """
+
+    def __init__(self, ttl_seconds: int = USER_INDEX_TTL_SECONDS, max_users: int = MAX_INDEXED_USERS):
+        self.ttl_seconds = ttl_seconds
+        self.max_users = max_users
+        self._users: "OrderedDict[str, _UserIndex]" = OrderedDict()
+
+    def is_loaded(self, user_id: str) -> bool:
+        index = self._users.get(user_id)
+        return index is not None and time.monotonic() - index.loaded_at < self.ttl_seconds
+
+    async def ensure_user(self, user_id: str, loader: Callable[[str], Awaitable[List[Dict[str, Any]]]]):
+        """Load ``user_id``'s places with ``loader`` unless a fresh index exists"""
+        if self.is_loaded(user_id):
+            return
+        index = _UserIndex()
+        for doc in await loader(user_id):
+            index.add(str(doc["_id"]), doc)
+        self._users[user_id] = index
+        self._users.move_to_end(user_id)
+        self._evict()
+        logger.debug(f"Loaded place search index for user {user_id}: {len(index.places)} places")
+
+    def _evict(self):
+        """Drop expired indexes, then the least recently used beyond ``max_users``"""
+        now = time.monotonic()
+        for user_id in [u for u, index in self._users.items() if now - index.loaded_at >= self.ttl_seconds]:
+            del self._users[user_id]
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def upsert(self, doc: Dict[str, Any]):
+        """Apply a created/updated place; ignored until the user's index is loaded"""
+        index = self._users.get(doc.get("user_id"))
+        if index is not None:
+            index.add(str(doc["_id"]), doc)
+
+    def remove(self, user_id: str, place_id: str):
+        index = self._users.get(user_id)
+        if index is not None:
+            index.remove(place_id)
+
+    def invalidate(self, user_id: Optional[str] = None):
+        if user_id is None:
+            self._users.clear()
+        else:
+            self._users.pop(user_id, None)
+
+    def search(
+        self,
+        user_id: str,
+        query: str,
+        limit: int = 10,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        radius_meters: Optional[float] = None
+    ) -> List[Tuple[Dict[str, Any], float, Optional[float]]]:
+        """Rank a user's places by text relevance, optionally blended with distance
+
+        Returns ``(doc, score, distance_meters)`` tuples, best first. With a
+        location, places beyond ``radius_meters`` are dropped and the text score
+        decays with distance so nearby matches outrank distant ones.
+        """
+        index = self._users.get(user_id)
+        if index is None:
+            return []
+        self._users.move_to_end(user_id)
+
+        scores = index.score(query)
+        results = []
+        for place_id, text_score in scores.items():
+            doc = index.places[place_id]
+            distance = None
+            score = text_score
+            if latitude is not None and longitude is not None:
+                distance = haversine_meters(latitude, longitude, doc["latitude"], doc["longitude"])
+                if radius_meters is not None and distance > radius_meters:
+                    continue
+                scale = radius_meters or 1000.0
+                score = text_score / (1.0 + distance / scale)
+            results.append((doc, score, distance))
+
+        results.sort(key=lambda r: (-r[1], r[2] if r[2] is not None else 0.0, r[0].get("name") or ""))
+        return results[:limit]
+
+
+# Global place search index instance
+place_search_index = PlaceSearchIndex()
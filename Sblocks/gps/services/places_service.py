@@ -9,6 +9,8 @@ from bson import ObjectId
 from repositories.database import db_manager
 from schemas.entities import Place
 from events.publisher import event_publisher
+from utils.pagination import KeysetPage, paginate
+from services.place_search_index import place_search_index
 
 logger = logging.getLogger(__name__)
 
@@ -53,6 +55,7 @@ class PlacesService:
             
             result = await self.db.db.places.insert_one(place_data)
             place_data["_id"] = str(result.inserted_id)
+            place_search_index.upsert(place_data)
             
             # Publish place created event
             try:
@@ -160,6 +163,40 @@ class PlacesService:
         except Exception as e:
             logger.error(f"Error getting user places: {e}")
             raise
+
+    async def get_places_page(
+        self,
+        user_id: Optional[str] = None,
+        place_type: Optional[str] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> KeysetPage:
+        """Get places newest first using keyset pagination"""
+        try:
+            query = {}
+            if user_id:
+                query["user_id"] = user_id
+            if place_type:
+                query["place_type"] = place_type
+
+            page = await paginate(
+                self.db.db.places,
+                query=query,
+                sort=[("created_at", -1)],
+                limit=limit,
+                cursor=cursor
+            )
+
+            places = []
+            for doc in page.items:
+                doc["_id"] = str(doc["_id"])
+                places.append(Place(**doc))
+            page.items = places
+            return page
+
+        except Exception as e:
+            logger.error(f"Error getting places page: {e}")
+            raise
     
     async def search_places(
         self,
@@ -167,23 +204,22 @@ class PlacesService:
         search_term: str,
         limit: int = 50
     ) -> List[Place]:
-        """Search places by name or description"""
+        """Search places by name, description or address using the text index"""
         try:
             query = {
                 "user_id": user_id,
-                "$or": [
-                    {"name": {"$regex": search_term, "$options": "i"}},
-                    {"description": {"$regex": search_term, "$options": "i"}},
-                    {"address": {"$regex": search_term, "$options": "i"}}
-                ]
+                "$text": {"$search": search_term}
             }
             
-            cursor = self.db.db.places.find(query).sort(
-                "name", 1
+            cursor = self.db.db.places.find(
+                query, {"score": {"$meta": "textScore"}}
+            ).sort(
+                "score", {"$meta": "textScore"}
             ).limit(limit)
             
             places = []
             async for doc in cursor:
+                doc.pop("score", None)
                 doc["_id"] = str(doc["_id"])
                 places.append(Place(**doc))
             
@@ -193,6 +229,67 @@ class PlacesService:
             logger.error(f"Error searching places: {e}")
             raise
     
+    async def autocomplete_places(
+        self,
+        user_id: str,
+        prefix: str,
+        limit: int = 10
+    ) -> List[Place]:
+        """Type-ahead suggestions from the in-memory prefix/trigram index"""
+        try:
+            await place_search_index.ensure_user(user_id, self._load_user_place_docs)
+            results = place_search_index.search(user_id, prefix, limit=limit)
+            return [Place(**doc) for doc, _, _ in results]
+            
+        except Exception as e:
+            logger.error(f"Error autocompleting places: {e}")
+            raise
+    
+    async def search_places_near(
+        self,
+        user_id: str,
+        search_term: str,
+        latitude: float,
+        longitude: float,
+        radius_meters: float = 5000,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """Search places by text within a radius, ranked by text score and distance
+
+        Answers queries like "fuel near me" in one call; each result carries the
+        place, its combined score and the distance in meters.
+        """
+        try:
+            await place_search_index.ensure_user(user_id, self._load_user_place_docs)
+            results = place_search_index.search(
+                user_id,
+                search_term,
+                limit=limit,
+                latitude=latitude,
+                longitude=longitude,
+                radius_meters=radius_meters
+            )
+            return [
+                {
+                    "place": Place(**doc),
+                    "score": round(score, 4),
+                    "distance_meters": round(distance, 1)
+                }
+                for doc, score, distance in results
+            ]
+            
+        except Exception as e:
+            logger.error(f"Error searching places near location: {e}")
+            raise
+    
+    async def _load_user_place_docs(self, user_id: str) -> List[Dict[str, Any]]:
+        """Load a user's places for the in-memory search index"""
+        docs = []
+        async for doc in self.db.db.places.find({"user_id": user_id}):
+            doc["_id"] = str(doc["_id"])
+            docs.append(doc)
+        return docs
+    
     async def get_places_near_location(
         self,
         user_id: str,
@@ -270,6 +367,8 @@ class PlacesService:
             )
             
             if result.modified_count > 0:
+                # Rebuilt from Mongo on the next search
+                place_search_index.invalidate(user_id)
                 return await self.get_place(place_id)
             return None
             
@@ -286,6 +385,7 @@ class PlacesService:
             
             success = result.deleted_count > 0
             if success:
+                place_search_index.remove(user_id, place_id)
                 logger.info(f"Deleted place {place_id} for user {user_id}")
             return success
             
@@ -405,6 +405,35 @@ class ServiceRequestConsumer:
                 if not data:
                     raise ValueError("Request data is required for POST operation")
                 
+                if "search" in endpoint:
+                    # locations/search/{area,bbox,nearest} answered from the spatial index
+                    if "bbox" in endpoint:
+                        vehicles = await location_service.get_vehicles_in_bbox(
+                            float(data["min_latitude"]), float(data["min_longitude"]),
+                            float(data["max_latitude"]), float(data["max_longitude"])
+                        )
+                        result_data = [v.model_dump() for v in vehicles]
+                    elif "nearest" in endpoint:
+                        matches = await location_service.get_nearest_vehicles(
+                            float(data["latitude"]), float(data["longitude"]),
+                            int(data.get("limit", 5)), data.get("max_distance_meters")
+                        )
+                        result_data = [
+                            {"vehicle": m["vehicle"].model_dump(), "distance_meters": m["distance_meters"]}
+                            for m in matches
+                        ]
+                    else:
+                        vehicles = await location_service.get_vehicles_in_area(
+                            float(data["center_latitude"]), float(data["center_longitude"]),
+                            float(data["radius_meters"])
+                        )
+                        result_data = [v.model_dump() for v in vehicles]
+                    
+                    return ResponseBuilder.success(
+                        data=result_data,
+                        message=f"Found {len(result_data)} vehicles"
+                    ).model_dump()
+                
                 vehicle_id = data.get("vehicle_id")
                 latitude = data.get("latitude")
                 longitude = data.get("longitude")
@@ -512,6 +541,20 @@ class ServiceRequestConsumer:
                     pagination = data.get("pagination", {"skip": 0, "limit": 50})
                     
                     is_active = active_only if active_only else None
+                    if "cursor" in pagination:
+                        # Keyset pagination (opt-in via a "cursor" key, null for the first page)
+                        page = await geofence_service.get_geofences_page(
+                            is_active=is_active,
+                            geofence_type=geofence_type,
+                            limit=pagination.get("limit", 50),
+                            cursor=pagination.get("cursor")
+                        )
+                        return ResponseBuilder.success(
+                            data=[gf.model_dump() for gf in page.items],
+                            message="Geofences retrieved successfully",
+                            links={"next_cursor": page.next_cursor} if page.next_cursor else None
+                        ).model_dump()
+
                     geofences = await geofence_service.get_geofences(
                         is_active=is_active,
                         geofence_type=geofence_type,
@@ -633,7 +676,18 @@ class ServiceRequestConsumer:
             # Handle HTTP methods and route to appropriate logic
             if method == "GET":
                 # Parse endpoint for specific place operations
-                if "search" in endpoint:
+                if "autocomplete" in endpoint:
+                    user_id = user_context.get("user_id", "system")
+                    places = await places_service.autocomplete_places(
+                        user_id=user_id,
+                        prefix=data.get("query", ""),
+                        limit=data.get("limit", 10)
+                    )
+                    return ResponseBuilder.success(
+                        data=[place.model_dump() for place in places],
+                        message="Place suggestions retrieved successfully"
+                    ).model_dump()
+                elif "search" in endpoint:
                     # places/search with query
                     query = data.get("query", "")
                     place_type = data.get("type")
@@ -641,7 +695,22 @@ class ServiceRequestConsumer:
                     longitude = data.get("longitude")
                     radius = data.get("radius", 1000)  # Default 1km
                     
-                    if latitude and longitude:
+                    if query and latitude and longitude:
+                        # Text + distance ranking in one pass, e.g. "fuel near me"
+                        user_id = user_context.get("user_id", "system")
+                        results = await places_service.search_places_near(
+                            user_id=user_id,
+                            search_term=query,
+                            latitude=latitude,
+                            longitude=longitude,
+                            radius_meters=radius,
+                            limit=data.get("limit", 50)
+                        )
+                        return ResponseBuilder.success(
+                            data=[{**r, "place": r["place"].model_dump()} for r in results],
+                            message="Places search completed successfully"
+                        ).model_dump()
+                    elif latitude and longitude:
                         # Search near location
                         places = await places_service.get_places_near_location(
                             latitude=latitude,
@@ -684,6 +753,18 @@ class ServiceRequestConsumer:
                     place_type = data.get("type")
                     pagination = data.get("pagination", {"skip": 0, "limit": 50})
                     
+                    if "cursor" in pagination:
+                        page = await places_service.get_places_page(
+                            place_type=place_type,
+                            limit=pagination.get("limit", 50),
+                            cursor=pagination.get("cursor")
+                        )
+                        return ResponseBuilder.success(
+                            data=[place.model_dump() for place in page.items],
+                            message="Places retrieved successfully",
+                            links={"next_cursor": page.next_cursor} if page.next_cursor else None
+                        ).model_dump()
+
                     places = await places_service.get_places(
                         place_type=place_type,
                         skip=pagination["skip"],
@@ -805,6 +886,22 @@ class ServiceRequestConsumer:
                         message="Live tracking data retrieved successfully"
                     ).model_dump()
                     
+                elif "analytics" in endpoint:
+                    # tracking/analytics for precomputed daily summaries
+                    from services.analytics_rollup_service import analytics_rollup_service
+                    vehicle_id = data.get("vehicle_id")
+                    if not vehicle_id:
+                        raise ValueError("Vehicle ID is required for vehicle analytics")
+                    
+                    days = await analytics_rollup_service.get_vehicle_daily_analytics(
+                        vehicle_id, data.get("start_date"), data.get("end_date")
+                    )
+                    
+                    return ResponseBuilder.success(
+                        data=days,
+                        message="Vehicle daily analytics retrieved successfully"
+                    ).model_dump()
+                    
                 elif "route" in endpoint:
                     # tracking/route for route tracking
                     vehicle_id = data.get("vehicle_id")
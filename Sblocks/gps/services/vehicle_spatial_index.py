@@ -0,0 +1,271 @@
+"""
+In-memory uniform grid of the latest vehicle positions for area and nearest-vehicle queries
+"""
+import asyncio
+import logging
+import math
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_METERS = 6371000.0
+METERS_PER_DEGREE_LAT = 111320.0
+DEFAULT_CELL_SIZE_DEGREES = 0.01  # ~1.1 km north-south
+DELTA_SYNC_INTERVAL_SECONDS = 2.0
+FULL_RELOAD_INTERVAL_SECONDS = 60.0
+
+# (lat, lon, doc) for one vehicle
+Entry = Tuple[float, float, Dict[str, Any]]
+
+
+def _haversine_meters(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(math.sqrt(min(1.0, a)))
+
+
+class VehicleSpatialIndex:
+    """Uniform lat/lon grid keyed by cell, holding each vehicle's latest position
+
+    GPS writes update the grid directly. Positions written to Mongo by other
+    services (e.g. the trip simulator) are picked up by ``sync`` through an
+    ``updated_at`` watermark, with a periodic full reload to drop deleted
+    vehicles. Writes that land while a reload query is running are replayed
+    over its result unless the reloaded document is newer. Until the first
+    load finishes ``is_ready`` is False and callers should fall back to Mongo.
+    """
+
+    def __init__(self, cell_size_degrees: float = DEFAULT_CELL_SIZE_DEGREES):
+        self.cell_size = cell_size_degrees
+        self._cells: Dict[Tuple[int, int], Set[str]] = {}
+        self._entries: Dict[str, Entry] = {}
+        self._cell_of: Dict[str, Tuple[int, int]] = {}
+        self._watermark: Optional[datetime] = None
+        self._loaded_at: Optional[float] = None
+        self._sync_lock = asyncio.Lock()
+        # Writes seen during a full reload; None marks a removal
+        self._pending: Optional[Dict[str, Optional[Entry]]] = None
+
+    # ---- maintenance ----
+
+    @property
+    def is_ready(self) -> bool:
+        return self._loaded_at is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.cell_size)), int(math.floor(lon / self.cell_size))
+
+    def upsert(self, vehicle_id: str, latitude: float, longitude: float, doc: Optional[Dict[str, Any]] = None):
+        """Record the latest position of a vehicle"""
+        lat, lon = float(latitude), float(longitude)
+        doc = doc if doc is not None else {"vehicle_id": vehicle_id}
+        if self._pending is not None:
+            self._pending[vehicle_id] = (lat, lon, doc)
+        cell = self._cell(lat, lon)
+        previous = self._cell_of.get(vehicle_id)
+        if previous != cell:
+            if previous is not None:
+                self._discard_from_cell(previous, vehicle_id)
+            self._cells.setdefault(cell, set()).add(vehicle_id)
+            self._cell_of[vehicle_id] = cell
+        self._entries[vehicle_id] = (lat, lon, doc)
+
+        updated_at = doc.get("updated_at")
+        if isinstance(updated_at, datetime) and (self._watermark is None or updated_at > self._watermark):
+            self._watermark = updated_at
+
+    def upsert_doc(self, doc: Dict[str, Any]):
+        """Record a ``vehicle_locations`` document"""
+        vehicle_id = doc.get("vehicle_id")
+        lat, lon = doc.get("latitude"), doc.get("longitude")
+        if vehicle_id is None or lat is None or lon is None:
+            return
+        self.upsert(str(vehicle_id), lat, lon, doc)
+
+    def remove(self, vehicle_id: str):
+        if self._pending is not None:
+            self._pending[vehicle_id] = None
+        cell = self._cell_of.pop(vehicle_id, None)
+        self._entries.pop(vehicle_id, None)
+        if cell is not None:
+            self._discard_from_cell(cell, vehicle_id)
+
+    def _discard_from_cell(self, cell: Tuple[int, int], vehicle_id: str):
+        members = self._cells.get(cell)
+        if members is not None:
+            members.discard(vehicle_id)
+            if not members:
+                del self._cells[cell]
+
+    def clear(self):
+        self._cells.clear()
+        self._entries.clear()
+        self._cell_of.clear()
+        self._watermark = None
+        self._loaded_at = None
+
+    def load(self, docs: Iterable[Dict[str, Any]]):
+        """Replace the index contents with ``docs``"""
+        self.clear()
+        for doc in docs:
+            self.upsert_doc(doc)
+        self._loaded_at = time.monotonic()
+
+    def _replay(self, pending: Dict[str, Optional[Entry]]):
+        """Reapply writes made during a reload unless the reloaded document is newer"""
+        for vehicle_id, entry in pending.items():
+            if entry is None:
+                self.remove(vehicle_id)
+                continue
+            lat, lon, doc = entry
+            current = self._entries.get(vehicle_id)
+            loaded_at = current[2].get("updated_at") if current else None
+            written_at = doc.get("updated_at")
+            if isinstance(loaded_at, datetime) and isinstance(written_at, datetime) and loaded_at > written_at:
+                continue
+            self.upsert(vehicle_id, lat, lon, doc)
+
+    async def sync(self, collection, full_reload_interval: float = FULL_RELOAD_INTERVAL_SECONDS) -> int:
+        """Pull positions changed since the watermark; returns documents applied"""
+        async with self._sync_lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at >= full_reload_interval:
+                self._pending = {}
+                try:
+                    docs = await collection.find({}).to_list(length=None)
+                finally:
+                    pending, self._pending = self._pending, None
+                self.load(docs)
+                self._replay(pending)
+                logger.debug(f"Vehicle spatial index reloaded with {len(self)} vehicles")
+                return len(docs)
+
+            query = {"updated_at": {"$gt": self._watermark}} if self._watermark else {}
+            applied = 0
+            async for doc in collection.find(query):
+                self.upsert_doc(doc)
+                applied += 1
+            return applied
+
+    async def run_sync_loop(
+        self,
+        collection_getter: Callable[[], Any],
+        is_connected: Callable[[], bool],
+        interval: float = DELTA_SYNC_INTERVAL_SECONDS
+    ):
+        """Keep the index in step with Mongo until cancelled"""
+        while True:
+            try:
+                if is_connected():
+                    await self.sync(collection_getter())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Vehicle spatial index sync failed: {e}")
+            await asyncio.sleep(interval)
+
+    # ---- queries ----
+
+    def _cells_in_box(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> Iterable[Tuple[int, int]]:
+        lo_i, lo_j = self._cell(max(-90.0, min_lat), max(-180.0, min_lon))
+        hi_i, hi_j = self._cell(min(90.0, max_lat), min(180.0, max_lon))
+        # Walk whichever is smaller: the cell range or the occupied cells
+        if (hi_i - lo_i + 1) * (hi_j - lo_j + 1) > len(self._cells):
+            return [c for c in self._cells if lo_i <= c[0] <= hi_i and lo_j <= c[1] <= hi_j]
+        return [(i, j) for i in range(lo_i, hi_i + 1) for j in range(lo_j, hi_j + 1)]
+
+    def _candidates(self, cells: Iterable[Tuple[int, int]]) -> Iterable[str]:
+        for cell in cells:
+            members = self._cells.get(cell)
+            if members:
+                yield from members
+
+    def within_radius(self, latitude: float, longitude: float, radius_meters: float) -> List[Tuple[Dict[str, Any], float]]:
+        """Vehicles within ``radius_meters`` as ``(doc, distance_meters)``, nearest first"""
+        d_lat = radius_meters / METERS_PER_DEGREE_LAT
+        cos_lat = max(math.cos(math.radians(min(90.0, abs(latitude) + d_lat))), 1e-6)
+        d_lon = min(180.0, d_lat / cos_lat)
+        cells = self._cells_in_box(latitude - d_lat, longitude - d_lon, latitude + d_lat, longitude + d_lon)
+
+        results = []
+        for vehicle_id in self._candidates(cells):
+            lat, lon, doc = self._entries[vehicle_id]
+            distance = _haversine_meters(latitude, longitude, lat, lon)
+            if distance <= radius_meters:
+                results.append((doc, distance))
+        results.sort(key=lambda r: r[1])
+        return results
+
+    def within_bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[Dict[str, Any]]:
+        """Vehicles inside a latitude/longitude box"""
+        results = []
+        for vehicle_id in self._candidates(self._cells_in_box(min_lat, min_lon, max_lat, max_lon)):
+            lat, lon, doc = self._entries[vehicle_id]
+            if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon:
+                results.append(doc)
+        return results
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int = 5,
+        max_radius_meters: Optional[float] = None
+    ) -> List[Tuple[Dict[str, Any], float]]:
+        """The ``k`` closest vehicles as ``(doc, distance_meters)``, nearest first
+
+        Searches rings of cells outward from the query cell and stops once the
+        k-th best distance is closer than anything an unvisited ring could hold.
+        """
+        if k <= 0 or not self._entries:
+            return []
+
+        ci, cj = self._cell(latitude, longitude)
+        max_ring = int(180.0 / self.cell_size) + 1
+
+        best: List[Tuple[float, str]] = []
+        ring = 0
+        while ring <= max_ring:
+            if ring == 0:
+                ring_cells = [(ci, cj)]
+            else:
+                ring_cells = [(ci + di, cj + dj)
+                              for di in range(-ring, ring + 1)
+                              for dj in (-ring, ring)]
+                ring_cells += [(ci + di, cj + dj)
+                               for di in (-ring, ring)
+                               for dj in range(-ring + 1, ring)]
+
+            for vehicle_id in self._candidates(ring_cells):
+                lat, lon, _ = self._entries[vehicle_id]
+                best.append((_haversine_meters(latitude, longitude, lat, lon), vehicle_id))
+
+            # Anything in ring r+1 or beyond is at least r cell steps away; a
+            # longitude step is narrowest at the ring's poleward edge
+            far_lat = min(90.0, abs(latitude) + (ring + 1) * self.cell_size)
+            reach = ring * self.cell_size * METERS_PER_DEGREE_LAT * math.cos(math.radians(far_lat))
+            if max_radius_meters is not None and reach > max_radius_meters:
+                break
+            if len(best) >= k:
+                best.sort()
+                if best[k - 1][0] <= reach:
+                    break
+            if len(best) == len(self._entries):
+                break
+            ring += 1
+
+        best.sort()
+        if max_radius_meters is not None:
+            best = [b for b in best if b[0] <= max_radius_meters]
+        return [(self._entries[vehicle_id][2], distance) for distance, vehicle_id in best[:k]]
+
+
+# Global vehicle spatial index instance
+vehicle_spatial_index = VehicleSpatialIndex()
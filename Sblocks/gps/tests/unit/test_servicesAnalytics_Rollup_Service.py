@@ -0,0 +1,213 @@
+import os
+import sys
+import types
+import importlib.util
+import pytest
+from datetime import datetime, timedelta
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+MODULE_PATH = os.path.abspath(os.path.join(HERE, "..", "..", "services", "analytics_rollup_service.py"))
+
+
+def _matches(doc, query):
+    for key, cond in query.items():
+        value = doc.get(key)
+        if isinstance(cond, dict):
+            for op, target in cond.items():
+                if op == "$gt" and not value > target:
+                    return False
+                if op == "$gte" and not value >= target:
+                    return False
+                if op == "$lt" and not value < target:
+                    return False
+                if op == "$lte" and not value <= target:
+                    return False
+        elif value != cond:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    def sort(self, key, direction=1):
+        self._docs = sorted(self._docs, key=lambda d: d[key], reverse=direction == -1)
+        return self
+
+    async def to_list(self, length=None):
+        return list(self._docs)
+
+    def __aiter__(self):
+        async def gen():
+            for d in self._docs:
+                yield d
+        return gen()
+
+
+class FakeCollection:
+    def __init__(self, docs=None):
+        self.docs = list(docs or [])
+        self.find_calls = 0
+
+    def find(self, query, projection=None):
+        self.find_calls += 1
+        return FakeCursor([dict(d) for d in self.docs if _matches(d, query)])
+
+    async def find_one(self, query, projection=None, sort=None):
+        docs = [d for d in self.docs if _matches(d, query)]
+        if sort:
+            key, direction = sort[0]
+            docs.sort(key=lambda d: d[key], reverse=direction == -1)
+        return dict(docs[0]) if docs else None
+
+    async def update_one(self, flt, update, upsert=False):
+        for d in self.docs:
+            if _matches(d, flt):
+                d.update(update["$set"])
+                return
+        self.docs.append({**flt, **update["$set"]})
+
+    def aggregate(self, pipeline):
+        match = pipeline[0]["$match"]
+        group = pipeline[1]["$group"]["_id"]
+        rows = [d for d in self.docs if _matches(d, match)]
+        if isinstance(group, dict):
+            keys = {(d["vehicle_id"], d["timestamp"].strftime("%Y-%m-%d")) for d in rows}
+            out = [{"_id": {"vehicle_id": v, "date": day}} for v, day in keys]
+        else:
+            counts = {}
+            for d in rows:
+                counts[d["event_type"]] = counts.get(d["event_type"], 0) + 1
+            out = [{"_id": k, "count": v} for k, v in counts.items()]
+        return FakeCursor(out)
+
+
+class FakeDB:
+    def __init__(self):
+        self.location_history = FakeCollection()
+        self.geofence_events = FakeCollection()
+        self.vehicle_analytics = FakeCollection()
+        self.analytics_rollup_state = FakeCollection()
+
+
+class FakeDBManager:
+    def __init__(self):
+        self.db = FakeDB()
+        self.stored = []
+
+    async def store_daily_analytics(self, data):
+        self.stored.append(data)
+        coll = self.db.vehicle_analytics
+        coll.docs = [d for d in coll.docs if not (d["vehicle_id"] == data["vehicle_id"] and d["date"] == data["date"])]
+        coll.docs.append(dict(data))
+
+
+def load_module():
+    repo_pkg = types.ModuleType("repositories")
+    repo_db = types.ModuleType("repositories.database")
+    repo_db.db_manager = FakeDBManager()
+    sys.modules["repositories"] = repo_pkg
+    sys.modules["repositories.database"] = repo_db
+    spec = importlib.util.spec_from_file_location("gps_analytics_rollup_service", MODULE_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+rollup = load_module()
+
+
+def point(ts, lat, lon, speed, vehicle="v1", created_at=None):
+    return {
+        "vehicle_id": vehicle, "latitude": lat, "longitude": lon, "speed": speed,
+        "timestamp": ts, "created_at": created_at or ts,
+    }
+
+
+@pytest.fixture
+def service():
+    svc = rollup.AnalyticsRollupService()
+    svc.db = FakeDBManager()
+    return svc
+
+
+#------------summarize_day folds distance, time and speed--------
+def test_summarize_day_totals():
+    t0 = datetime(2025, 3, 1, 8, 0)
+    points = [
+        point(t0, -25.7500, 28.1900, 40),
+        point(t0 + timedelta(seconds=60), -25.7590, 28.1900, 0),
+        point(t0 + timedelta(seconds=180), -25.7590, 28.1900, 0),
+        point(t0 + timedelta(hours=2), -25.7590, 28.1900, 30),
+    ]
+    summary = rollup.summarize_day("v1", "2025-03-01", points, geofence_counts={"enter": 2, "exit": 1})
+    assert summary["distance_km"] == pytest.approx(1.0, abs=0.01)
+    assert summary["moving_time_seconds"] == 60
+    assert summary["idle_time_seconds"] == 120  # the two-hour gap is not counted
+    assert summary["max_speed"] == 40
+    assert summary["avg_speed"] == pytest.approx(17.5)
+    assert summary["point_count"] == 4
+    assert (summary["geofence_entries"], summary["geofence_exits"], summary["geofence_events"]) == (2, 1, 3)
+
+
+#------------run_once rolls up new history and is idempotent--------
+@pytest.mark.asyncio
+async def test_run_once_rolls_up_and_rerun_is_stable(service):
+    t0 = datetime(2025, 3, 1, 10, 0)
+    service.db.db.location_history.docs = [
+        point(t0, -25.75, 28.19, 20),
+        point(t0 + timedelta(seconds=30), -25.751, 28.19, 20),
+        point(t0, -26.0, 28.0, 0, vehicle="v2"),
+    ]
+    service.db.db.geofence_events.docs = [
+        {"vehicle_id": "v1", "event_type": "enter", "timestamp": t0 + timedelta(seconds=10)},
+    ]
+    now = t0 + timedelta(minutes=5)
+    assert await service.run_once(now=now) == 2
+
+    first = await service.get_vehicle_daily_analytics("v1")
+    assert len(first) == 1
+    assert first[0]["geofence_entries"] == 1
+    assert first[0]["moving_time_seconds"] == 30
+
+    # Nothing new since the watermark
+    assert await service.run_once(now=now + timedelta(minutes=5)) == 0
+
+    # Rebuilding yields the same figures
+    await service.rebuild("v1", "2025-03-01", "2025-03-01")
+    again = await service.get_vehicle_daily_analytics("v1")
+    assert again[0]["distance_km"] == first[0]["distance_km"]
+    assert len(service.db.db.vehicle_analytics.docs) == 2
+
+
+#------------late history only recomputes affected days--------
+@pytest.mark.asyncio
+async def test_run_once_only_recomputes_dirty_days(service):
+    day1 = datetime(2025, 3, 1, 23, 59)
+    service.db.db.location_history.docs = [point(day1, -25.75, 28.19, 30)]
+    await service.run_once(now=day1 + timedelta(minutes=1))
+
+    day2 = datetime(2025, 3, 2, 0, 1)
+    service.db.db.location_history.docs.append(point(day2, -25.76, 28.19, 30))
+    await service.run_once(now=day2 + timedelta(minutes=1))
+    assert [s["date"] for s in service.db.stored] == ["2025-03-01", "2025-03-02"]
+
+    # The crossing-midnight segment is attributed to the day it ends in
+    days = {d["date"]: d for d in await service.get_vehicle_daily_analytics("v1")}
+    assert days["2025-03-01"]["distance_km"] == 0
+    assert days["2025-03-02"]["distance_km"] == pytest.approx(1.11, abs=0.01)
+    assert days["2025-03-02"]["moving_time_seconds"] == 120
+
+
+#------------reads filter by date range--------
+@pytest.mark.asyncio
+async def test_get_daily_analytics_filters_range(service):
+    service.db.db.vehicle_analytics.docs = [
+        {"vehicle_id": "v1", "date": "2025-03-01", "distance_km": 10.0},
+        {"vehicle_id": "v1", "date": "2025-03-02", "distance_km": 5.5},
+        {"vehicle_id": "v1", "date": "2025-03-05", "distance_km": 7.0},
+        {"vehicle_id": "v2", "date": "2025-03-02", "distance_km": 99.0},
+    ]
+    days = await service.get_vehicle_daily_analytics("v1", "2025-03-01", "2025-03-02")
+    assert [d["date"] for d in days] == ["2025-03-01", "2025-03-02"]
@@ -200,6 +200,12 @@ def make_fake_events_module(raise_on_publish=False, calls_sink=None):
             if raise_on_publish:
                 raise RuntimeError("publish failed")
             self.calls.append({"geofence_id": geofence_id, "name": name})
+
+        async def publish_geofence_updated(self, geofence_id: str):
+            self.calls.append({"geofence_id": geofence_id, "event": "updated"})
+
+        async def publish_geofence_deleted(self, geofence_id: str):
+            self.calls.append({"geofence_id": geofence_id, "event": "deleted"})
     _publisher = _EventPublisher()
     pub.event_publisher = _publisher
     async def publish_geofence_created(geofence_id: str, name: str):
@@ -505,6 +511,18 @@ async def test_get_geofences_applies_filters_and_normalizes():
         assert g1["coordinates"][0][0] == (10.0, 1.0)
 
 
+@pytest.mark.asyncio
+async def test_get_geofences_filters_by_owner():
+    with SysModulesSandbox() as dbm:
+        dbm.db.geofences.set_find_docs([])
+        svc_mod = import_service_module()
+        svc = svc_mod.GeofenceService()
+
+        await svc.get_geofences(created_by="u1", limit=10)
+
+        assert dbm.db.geofences.last_find_query == {"created_by": "u1"}
+
+
 @pytest.mark.asyncio
 async def test_get_geofences_db_error_returns_empty_list():
     with SysModulesSandbox() as dbm:
@@ -650,4 +668,25 @@ async def test_delete_geofence_exception_returns_false():
         svc_mod = import_service_module()
         svc = svc_mod.GeofenceService()
         ok = await svc.delete_geofence("x" * 24)
-        assert ok is False
\ No newline at end of file
+        assert ok is False
+
+@pytest.mark.asyncio
+async def test_update_and_delete_publish_change_events_only_when_something_changed():
+    calls = []
+    with SysModulesSandbox(publisher_calls=calls) as dbm:
+        dbm.db.geofences.set_find_one_doc(
+            {"_id": "ret", "name": "N", "description": "D", "type": "depot", "status": "active", "geometry": {}}
+        )
+        svc_mod = import_service_module()
+        svc = svc_mod.GeofenceService()
+
+        dbm.db.geofences.set_update_result(modified_count=0)
+        await svc.update_geofence("1" * 24, name="Same")
+        dbm.db.geofences.set_update_result(modified_count=1)
+        await svc.update_geofence("1" * 24, name="New")
+        dbm.db.geofences.set_delete_result(0)
+        await svc.delete_geofence("2" * 24)
+        dbm.db.geofences.set_delete_result(1)
+        await svc.delete_geofence("3" * 24)
+
+    assert calls == [{"geofence_id": "1" * 24, "event": "updated"}, {"geofence_id": "3" * 24, "event": "deleted"}]
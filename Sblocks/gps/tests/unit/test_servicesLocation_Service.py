@@ -6,6 +6,9 @@ from pathlib import Path
 import pytest
 from datetime import datetime, timedelta
 
+# C extensions cannot be re-imported after SysModulesSandbox restores sys.modules
+import numpy  # noqa: F401
+
 SERVICE_IMPORT_CANDIDATES = [
     "gps.services.location_service",
     "trip_planning.services.location_service",
@@ -738,16 +741,11 @@ async def test_get_vehicle_route_with_points_and_distance_rounding(monkeypatch):
 
         sb.db_manager.db.location_history.find = find
 
-        async def fake_distance(*a, **k): pass
-        def _fake_calc(lat1, lon1, lat2, lon2):
-            if lat1 == 0.0 and lon1 == 0.0 and lat2 == 0.0 and lon2 == 1.0: return 100.004
-            return 50.004
-        svc._calculate_distance = _fake_calc
-
         start = datetime(2025,1,1); end = datetime(2025,1,2)
         res = await svc.get_vehicle_route("vehR", start_time=start, end_time=end)
         assert res["total_points"] == 3
-        assert res["distance_km"] == 150.01
+        # Two one-degree legs on the equator/meridian, rounded to 2 dp
+        assert res["distance_km"] == 222.39
         assert res["route"][0]["timestamp"].endswith("00:00:00")
 
 @pytest.mark.asyncio
@@ -0,0 +1,141 @@
+import os
+import importlib.util
+import pytest
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+MODULE_PATH = os.path.abspath(os.path.join(HERE, "..", "..", "services", "place_search_index.py"))
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location("gps_place_search_index", MODULE_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+psi = load_module()
+
+
+def place(pid, name, lat=-25.75, lon=28.19, user="u1", description=None, address=None):
+    return {
+        "_id": pid, "user_id": user, "name": name, "description": description,
+        "address": address, "latitude": lat, "longitude": lon,
+    }
+
+
+PLACES = [
+    place("p1", "Shell Fuel Hatfield", -25.748, 28.238, address="Burnett Street"),
+    place("p2", "Engen Fuel Centurion", -25.860, 28.189),
+    place("p3", "Depot North", -25.700, 28.200, description="Fuel bay at the back"),
+    place("p4", "Fullerton Offices", -25.749, 28.240),
+    place("p5", "Warehouse", -25.749, 28.239, user="u2"),
+]
+
+
+async def loader(user_id):
+    return [dict(p) for p in PLACES if p["user_id"] == user_id]
+
+
+@pytest.fixture
+def index():
+    return psi.PlaceSearchIndex()
+
+
+#------------tokenize and trigrams--------
+def test_tokenize_and_trigrams():
+    assert psi.tokenize("Shell-Fuel, Hatfield 24") == ["shell", "fuel", "hatfield", "24"]
+    assert psi.tokenize(None) == []
+    assert "fue" in psi.trigrams("fuel")
+
+
+#------------prefix search respects field weights and users--------
+@pytest.mark.asyncio
+async def test_prefix_search_ranks_name_above_description(index):
+    await index.ensure_user("u1", loader)
+    results = index.search("u1", "fu", limit=10)
+    ids = [doc["_id"] for doc, _, _ in results]
+    assert set(ids) == {"p1", "p2", "p3", "p4"}
+    assert ids[-1] == "p3"  # description-only match has the lowest weight
+    assert index.search("u2", "fu") == []
+
+
+#------------multi-token query sums per-token scores--------
+@pytest.mark.asyncio
+async def test_multi_token_query_prefers_full_match(index):
+    await index.ensure_user("u1", loader)
+    results = index.search("u1", "fuel hat")
+    assert results[0][0]["_id"] == "p1"
+
+
+#------------typo tolerance via trigrams--------
+@pytest.mark.asyncio
+async def test_fuzzy_match_on_typo(index):
+    await index.ensure_user("u1", loader)
+    ids = [doc["_id"] for doc, _, _ in index.search("u1", "centurian")]
+    assert ids == ["p2"]
+
+
+#------------distance blending and radius filter--------
+@pytest.mark.asyncio
+async def test_search_near_blends_distance_and_filters_radius(index):
+    await index.ensure_user("u1", loader)
+    results = index.search("u1", "fuel", latitude=-25.859, longitude=28.190, radius_meters=5000)
+    assert [doc["_id"] for doc, _, _ in results] == ["p2"]
+    assert results[0][2] < 200
+
+    wide = index.search("u1", "fuel", latitude=-25.859, longitude=28.190, radius_meters=50000)
+    assert wide[0][0]["_id"] == "p2"
+    assert {doc["_id"] for doc, _, _ in wide} == {"p1", "p2", "p3"}
+
+
+#------------upsert and remove keep postings consistent--------
+@pytest.mark.asyncio
+async def test_upsert_and_remove(index):
+    await index.ensure_user("u1", loader)
+    index.upsert(place("p9", "Sasol Fuel Menlyn"))
+    assert "p9" in [d["_id"] for d, _, _ in index.search("u1", "menl")]
+
+    index.upsert(place("p9", "Sasol Garage Menlyn"))
+    assert "p9" not in [d["_id"] for d, _, _ in index.search("u1", "fuel")]
+
+    index.remove("u1", "p9")
+    assert index.search("u1", "sasol") == []
+    assert "sasol" not in index._users["u1"].postings
+    assert "sasol" not in index._users["u1"].sorted_tokens
+
+
+#------------upsert before load is ignored and invalidate forces reload--------
+@pytest.mark.asyncio
+async def test_lazy_load_and_invalidate(index):
+    calls = []
+
+    async def counting_loader(user_id):
+        calls.append(user_id)
+        return await loader(user_id)
+
+    index.upsert(place("p7", "Ignored"))
+    assert not index.is_loaded("u1")
+    await index.ensure_user("u1", counting_loader)
+    await index.ensure_user("u1", counting_loader)
+    assert calls == ["u1"]
+    assert index.search("u1", "ignored") == []
+
+    index.invalidate("u1")
+    await index.ensure_user("u1", counting_loader)
+    assert calls == ["u1", "u1"]
+
+
+#------------least recently used and expired user indexes are evicted--------
+@pytest.mark.asyncio
+async def test_user_indexes_are_evicted():
+    index = psi.PlaceSearchIndex(max_users=2)
+    await index.ensure_user("u1", loader)
+    await index.ensure_user("u2", loader)
+    index.search("u1", "shell")
+    await index.ensure_user("u3", loader)
+    assert len(index) == 2
+    assert index.is_loaded("u1") and index.is_loaded("u3") and not index.is_loaded("u2")
+
+    index._users["u1"].loaded_at -= index.ttl_seconds
+    await index.ensure_user("u2", loader)
+    assert set(index._users) == {"u2", "u3"}
@@ -95,10 +95,11 @@ class FakePlacesCollection:
     async def insert_one(self, doc):
         self.last_insert_doc = doc
         return self.insert_result
-    def find(self, query):
+    def find(self, query, projection=None):
         if self.find_raises:
             raise RuntimeError("find error")
         self.last_find_query = query
+        self.last_find_projection = projection
         return FakeCursor(self.find_docs)
     async def find_one(self, flt):
         if self.find_one_raises:
@@ -382,17 +383,15 @@ async def test_search_places_query_shape_and_result():
         res = await svc.search_places("u1","Park",limit=10)
         q = sb.db_manager.db.places.last_find_query
         assert q["user_id"] == "u1"
-        ors = q["$or"]
-        assert ors[0]["name"]["$regex"] == "Park" and ors[0]["name"]["$options"] == "i"
-        assert ors[1]["description"]["$regex"] == "Park" and ors[1]["description"]["$options"] == "i"
-        assert ors[2]["address"]["$regex"] == "Park" and ors[2]["address"]["$options"] == "i"
+        assert q["$text"] == {"$search": "Park"}
+        assert sb.db_manager.db.places.last_find_projection == {"score": {"$meta": "textScore"}}
         assert [r._id for r in res] == ["S"]
 
 #------------search_places db error--------
 @pytest.mark.asyncio
 async def test_search_places_db_error():
     class Boom(FakePlacesCollection):
-        def find(self, q):
+        def find(self, q, projection=None):
             raise RuntimeError("boom")
     with SysModulesSandbox() as sb:
         sb.db_manager.db.places = Boom()
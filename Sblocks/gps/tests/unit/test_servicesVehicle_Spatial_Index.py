@@ -0,0 +1,167 @@
+import os
+import random
+import importlib.util
+import pytest
+from datetime import datetime, timedelta
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+MODULE_PATH = os.path.abspath(os.path.join(HERE, "..", "..", "services", "vehicle_spatial_index.py"))
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location("gps_vehicle_spatial_index", MODULE_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+vsi = load_module()
+
+
+def make_fleet(n=500, seed=3):
+    rng = random.Random(seed)
+    base = datetime(2025, 1, 1)
+    return [
+        {
+            "vehicle_id": f"v{i}",
+            "latitude": -25.75 + rng.uniform(-0.3, 0.3),
+            "longitude": 28.19 + rng.uniform(-0.3, 0.3),
+            "updated_at": base + timedelta(seconds=i),
+        }
+        for i in range(n)
+    ]
+
+
+def brute_force(fleet, lat, lon):
+    return sorted(
+        ((vsi._haversine_meters(lat, lon, d["latitude"], d["longitude"]), d["vehicle_id"]) for d in fleet)
+    )
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    async def to_list(self, length=None):
+        return list(self._docs)
+
+    def __aiter__(self):
+        async def gen():
+            for d in self._docs:
+                yield d
+        return gen()
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+
+    def find(self, query):
+        self.queries.append(query)
+        if "updated_at" in query:
+            since = query["updated_at"]["$gt"]
+            return FakeCursor([d for d in self.docs if d["updated_at"] > since])
+        return FakeCursor(self.docs)
+
+
+@pytest.fixture
+def fleet():
+    return make_fleet()
+
+
+@pytest.fixture
+def index(fleet):
+    idx = vsi.VehicleSpatialIndex()
+    idx.load(fleet)
+    return idx
+
+
+#------------radius query matches a linear scan--------
+def test_within_radius_matches_brute_force(index, fleet):
+    for lat, lon, radius in [(-25.75, 28.19, 5000), (-25.5, 28.4, 12000), (-26.2, 27.9, 800)]:
+        got = [doc["vehicle_id"] for doc, _ in index.within_radius(lat, lon, radius)]
+        expected = [vid for d, vid in brute_force(fleet, lat, lon) if d <= radius]
+        assert got == expected
+
+
+#------------bounding box query--------
+def test_within_bbox(index, fleet):
+    got = {d["vehicle_id"] for d in index.within_bbox(-25.8, 28.1, -25.7, 28.3)}
+    expected = {d["vehicle_id"] for d in fleet if -25.8 <= d["latitude"] <= -25.7 and 28.1 <= d["longitude"] <= 28.3}
+    assert got == expected and got
+
+
+#------------k nearest matches a linear scan, including sparse areas--------
+def test_nearest_matches_brute_force(index, fleet):
+    for lat, lon in [(-25.75, 28.19), (-25.2, 28.9), (-30.0, 25.0)]:
+        got = [doc["vehicle_id"] for doc, _ in index.nearest(lat, lon, k=7)]
+        assert got == [vid for _, vid in brute_force(fleet, lat, lon)[:7]]
+
+    limited = index.nearest(-25.75, 28.19, k=50, max_radius_meters=2000)
+    assert all(distance <= 2000 for _, distance in limited)
+    assert len(limited) == len([1 for d, _ in brute_force(fleet, -25.75, 28.19) if d <= 2000])
+
+
+#------------moving and removing vehicles keeps cells consistent--------
+def test_upsert_moves_and_remove():
+    idx = vsi.VehicleSpatialIndex()
+    idx.load([])
+    idx.upsert("a", -25.75, 28.19)
+    idx.upsert("a", -33.92, 18.42)
+    assert idx.within_radius(-25.75, 28.19, 1000) == []
+    assert [d["vehicle_id"] for d, _ in idx.within_radius(-33.92, 18.42, 1000)] == ["a"]
+    idx.remove("a")
+    assert len(idx) == 0 and idx._cells == {}
+
+
+#------------sync loads once then applies deltas since the watermark--------
+@pytest.mark.asyncio
+async def test_sync_full_then_delta(fleet):
+    idx = vsi.VehicleSpatialIndex()
+    assert not idx.is_ready
+    coll = FakeCollection(list(fleet))
+    assert await idx.sync(coll) == len(fleet)
+    assert idx.is_ready and coll.queries[-1] == {}
+
+    moved = dict(fleet[0], latitude=-33.92, longitude=18.42, updated_at=datetime(2025, 2, 1))
+    coll.docs.append(moved)
+    assert await idx.sync(coll) == 1
+    assert [d["vehicle_id"] for d, _ in idx.within_radius(-33.92, 18.42, 500)] == ["v0"]
+
+    # A stale index is reloaded in full so deleted vehicles disappear
+    coll.docs = coll.docs[1:10]
+    await idx.sync(coll, full_reload_interval=0)
+    assert len(idx) == 9
+
+
+#------------writes that land during a full reload are not lost--------
+@pytest.mark.asyncio
+async def test_full_reload_keeps_writes_made_while_loading():
+    idx = vsi.VehicleSpatialIndex()
+    base = datetime(2025, 1, 1)
+    snapshot = [
+        {"vehicle_id": "a", "latitude": -25.75, "longitude": 28.19, "updated_at": base},
+        {"vehicle_id": "b", "latitude": -25.75, "longitude": 28.19, "updated_at": base + timedelta(minutes=5)},
+        {"vehicle_id": "c", "latitude": -25.75, "longitude": 28.19, "updated_at": base},
+    ]
+
+    class SlowCursor(FakeCursor):
+        async def to_list(self, length=None):
+            # Writes arriving while the reload query is in flight
+            idx.upsert_doc({"vehicle_id": "a", "latitude": -33.92, "longitude": 18.42,
+                            "updated_at": base + timedelta(minutes=1)})
+            idx.upsert_doc({"vehicle_id": "b", "latitude": -33.92, "longitude": 18.42,
+                            "updated_at": base + timedelta(minutes=1)})
+            idx.remove("c")
+            return list(self._docs)
+
+    class SlowCollection(FakeCollection):
+        def find(self, query):
+            return SlowCursor(self.docs)
+
+    await idx.sync(SlowCollection(snapshot))
+    positions = {vid: entry[:2] for vid, entry in idx._entries.items()}
+    # "a" keeps the fresher write, "b" keeps the newer reloaded row, "c" stays removed
+    assert positions == {"a": (-33.92, 18.42), "b": (-25.75, 28.19)}
+    assert idx._pending is None
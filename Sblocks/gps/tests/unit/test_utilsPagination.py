@@ -0,0 +1,226 @@
+import os
+import sys
+import importlib.util
+import pytest
+from datetime import datetime, timedelta
+from functools import cmp_to_key
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+MODULE_PATH = os.path.abspath(os.path.join(HERE, "..", "..", "utils", "pagination.py"))
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location("gps_utils_pagination", MODULE_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+pagination = load_module()
+
+
+def _order(value):
+    """Enough of BSON ordering for these tests: null and missing before everything else"""
+    return (0, 0) if value is None else (1, value)
+
+
+def _matches(doc, query):
+    for key, cond in query.items():
+        if key == "$and":
+            if not all(_matches(doc, q) for q in cond):
+                return False
+        elif key == "$or":
+            if not any(_matches(doc, q) for q in cond):
+                return False
+        elif isinstance(cond, dict):
+            value = doc.get(key)
+            for op, target in cond.items():
+                if op == "$ne" and value == target:
+                    return False
+                # Range operators never match across null
+                if op in ("$gt", "$lt") and (value is None or target is None):
+                    return False
+                if op == "$gt" and not value > target:
+                    return False
+                if op == "$lt" and not value < target:
+                    return False
+        elif doc.get(key) != cond:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self._docs = docs
+        self.sort_spec = None
+        self.limit_n = None
+
+    def sort(self, spec):
+        self.sort_spec = spec
+
+        def cmp(a, b):
+            for key, direction in spec:
+                x, y = _order(a.get(key)), _order(b.get(key))
+                if x != y:
+                    return (-1 if x < y else 1) * direction
+            return 0
+
+        self._docs = sorted(self._docs, key=cmp_to_key(cmp))
+        return self
+
+    def limit(self, n):
+        self.limit_n = n
+        self._docs = self._docs[:n]
+        return self
+
+    def __aiter__(self):
+        async def gen():
+            for d in self._docs:
+                yield dict(d)
+        return gen()
+
+
+class FakeCollection:
+    name = "places"
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+        self.count_calls = 0
+        self.estimated_calls = 0
+
+    def find(self, query):
+        self.queries.append(query)
+        return FakeCursor([d for d in self.docs if _matches(d, query)])
+
+    async def count_documents(self, query):
+        self.count_calls += 1
+        return len([d for d in self.docs if _matches(d, query)])
+
+    async def estimated_document_count(self):
+        self.estimated_calls += 1
+        return len(self.docs)
+
+
+def make_docs(n=25):
+    base = datetime(2025, 1, 1)
+    docs = []
+    for i in range(n):
+        # Pairs share a timestamp so the _id tie-breaker matters
+        docs.append({"_id": i, "user_id": "u1" if i % 3 else "u2", "created_at": base + timedelta(minutes=i // 2)})
+    return docs
+
+
+@pytest.fixture(autouse=True)
+def fresh_count_cache():
+    pagination.count_cache.invalidate()
+    yield
+
+
+#------------normalize_sort appends _id tie-breaker--------
+def test_normalize_sort_appends_id():
+    assert pagination.normalize_sort([("created_at", -1)]) == [("created_at", -1), ("_id", -1)]
+    assert pagination.normalize_sort(None) == [("_id", 1)]
+    assert pagination.normalize_sort([("name", 1), ("_id", -1)]) == [("name", 1), ("_id", -1)]
+
+
+#------------cursor round trip keeps datetimes--------
+def test_cursor_round_trip():
+    sort = [("created_at", -1), ("_id", -1)]
+    ts = datetime(2025, 5, 1, 12, 30)
+    token = pagination.encode_cursor({"created_at": ts, "_id": 7}, sort)
+    assert isinstance(token, str) and "=" not in token
+    assert pagination.decode_cursor(token, sort) == [ts, 7]
+
+
+#------------cursor rejects garbage and mismatched sort--------
+def test_cursor_rejects_invalid_tokens():
+    sort = [("created_at", -1), ("_id", -1)]
+    token = pagination.encode_cursor({"created_at": datetime(2025, 1, 1), "_id": 1}, sort)
+    with pytest.raises(pagination.InvalidCursorError):
+        pagination.decode_cursor("not-a-cursor", sort)
+    with pytest.raises(pagination.InvalidCursorError):
+        pagination.decode_cursor(token, [("name", 1), ("_id", 1)])
+    assert issubclass(pagination.InvalidCursorError, ValueError)
+
+
+#------------keyset filter shape--------
+def test_build_keyset_filter_compound():
+    flt = pagination.build_keyset_filter([("a", 1), ("b", -1)], ["x", 5])
+    assert flt == {"$or": [{"a": {"$gt": "x"}}, {"a": "x", "$or": [{"b": {"$lt": 5}}, {"b": None}]}]}
+    assert pagination.build_keyset_filter([("_id", 1)], [3]) == {"_id": {"$gt": 3}}
+
+
+#------------walking all pages matches a full sort--------
+@pytest.mark.asyncio
+async def test_paginate_walks_every_document_once():
+    docs = make_docs(25)
+    coll = FakeCollection(docs)
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        page = await pagination.paginate(coll, {}, [("created_at", -1)], limit=4, cursor=cursor)
+        seen.extend(d["_id"] for d in page.items)
+        pages += 1
+        if not page.has_more:
+            assert page.next_cursor is None
+            break
+        cursor = page.next_cursor
+    expected = [d["_id"] for d in sorted(docs, key=lambda d: (d["created_at"], d["_id"]), reverse=True)]
+    assert seen == expected
+    assert pages == 7
+
+
+#------------rows with null or missing sort keys keep their place in both directions--------
+@pytest.mark.asyncio
+@pytest.mark.parametrize("direction", [1, -1])
+async def test_paginate_keeps_null_sort_keys(direction):
+    docs = make_docs(12)
+    for doc in docs[::3]:
+        doc["created_at"] = None
+    for doc in docs[1::4]:
+        del doc["created_at"]
+    coll = FakeCollection(docs)
+    seen, cursor = [], None
+    while True:
+        page = await pagination.paginate(coll, {}, [("created_at", direction)], limit=2, cursor=cursor)
+        seen.extend(d["_id"] for d in page.items)
+        if not page.has_more:
+            break
+        cursor = page.next_cursor
+    expected = [d["_id"] for d in sorted(docs, key=lambda d: (_order(d.get("created_at")), d["_id"]),
+                                         reverse=direction == -1)]
+    assert seen == expected
+
+
+#------------base query is combined with keyset predicate--------
+@pytest.mark.asyncio
+async def test_paginate_combines_base_query():
+    coll = FakeCollection(make_docs(30))
+    first = await pagination.paginate(coll, {"user_id": "u1"}, [("created_at", 1)], limit=5)
+    second = await pagination.paginate(coll, {"user_id": "u1"}, [("created_at", 1)], limit=5, cursor=first.next_cursor)
+    assert "$and" in coll.queries[-1]
+    assert all(d["user_id"] == "u1" for d in first.items + second.items)
+    assert not set(d["_id"] for d in first.items) & set(d["_id"] for d in second.items)
+
+
+#------------estimated totals use metadata count and cache filtered counts--------
+@pytest.mark.asyncio
+async def test_paginate_estimated_totals():
+    coll = FakeCollection(make_docs(10))
+    page = await pagination.paginate(coll, {}, [("created_at", 1)], limit=3, include_total=True)
+    assert page.total == 10
+    assert coll.estimated_calls == 1 and coll.count_calls == 0
+
+    for _ in range(3):
+        page = await pagination.paginate(coll, {"user_id": "u2"}, [("created_at", 1)], limit=3, include_total=True)
+    assert page.total == 4
+    assert coll.count_calls == 1
+
+
+#------------to_dict uses custom items key--------
+def test_keyset_page_to_dict():
+    page = pagination.KeysetPage(items=[1, 2], next_cursor="abc", has_more=True, total=9)
+    assert page.to_dict("drivers") == {"drivers": [1, 2], "next_cursor": "abc", "has_more": True, "total": 9}
+    assert "total" not in pagination.KeysetPage(items=[]).to_dict()
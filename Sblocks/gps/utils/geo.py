@@ -0,0 +1,162 @@
+"""
+Vectorised geodesic helpers (haversine, path length, polyline and polygon queries)
+
+Coordinates are ``[lat, lon]`` pairs in degrees unless noted otherwise;
+polygon rings use GeoJSON ``[lon, lat]`` order. Distances are kilometres.
+"""
+from typing import Any, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+ArrayLike = Union[float, Sequence[float], np.ndarray]
+
+
+def as_latlon_array(coords: Any) -> np.ndarray:
+    """Return ``coords`` as an ``(n, 2)`` float array of ``[lat, lon]`` rows"""
+    arr = np.asarray(coords, dtype=float)
+    if arr.size == 0:
+        return np.empty((0, 2), dtype=float)
+    if arr.ndim != 2 or arr.shape[1] < 2:
+        raise ValueError(f"Expected a sequence of [lat, lon] pairs, got shape {arr.shape}")
+    return arr[:, :2]
+
+
+def haversine_km(lat1: ArrayLike, lon1: ArrayLike, lat2: ArrayLike, lon2: ArrayLike) -> Union[float, np.ndarray]:
+    """Great-circle distance; arguments broadcast like NumPy arrays"""
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = np.radians(np.subtract(lon2, lon1))
+    a = np.sin(d_phi / 2.0) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(d_lambda / 2.0) ** 2
+    result = 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    return float(result) if np.ndim(result) == 0 else result
+
+
+def bearing_deg(lat1: ArrayLike, lon1: ArrayLike, lat2: ArrayLike, lon2: ArrayLike) -> Union[float, np.ndarray]:
+    """Initial bearing from point 1 to point 2 in degrees clockwise from north"""
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    d_lambda = np.radians(np.subtract(lon2, lon1))
+    x = np.sin(d_lambda) * np.cos(phi2)
+    y = np.cos(phi1) * np.sin(phi2) - np.sin(phi1) * np.cos(phi2) * np.cos(d_lambda)
+    result = (np.degrees(np.arctan2(x, y)) + 360.0) % 360.0
+    return float(result) if np.ndim(result) == 0 else result
+
+
+def distances_to_point_km(coords: Any, lat: float, lon: float) -> np.ndarray:
+    """Distance from every coordinate to a single point"""
+    arr = as_latlon_array(coords)
+    return np.asarray(haversine_km(arr[:, 0], arr[:, 1], lat, lon), dtype=float).reshape(-1)
+
+
+def segment_lengths_km(coords: Any) -> np.ndarray:
+    """Lengths of the ``n - 1`` consecutive segments of a path"""
+    arr = as_latlon_array(coords)
+    if len(arr) < 2:
+        return np.zeros(0, dtype=float)
+    return np.asarray(haversine_km(arr[:-1, 0], arr[:-1, 1], arr[1:, 0], arr[1:, 1]), dtype=float).reshape(-1)
+
+
+def cumulative_distance_km(coords: Any) -> np.ndarray:
+    """Distance from the first vertex to each vertex (length ``n``, starts at 0)"""
+    arr = as_latlon_array(coords)
+    if len(arr) == 0:
+        return np.zeros(0, dtype=float)
+    return np.concatenate(([0.0], np.cumsum(segment_lengths_km(arr))))
+
+
+def path_length_km(coords: Any) -> float:
+    """Total length of a path"""
+    return float(segment_lengths_km(coords).sum())
+
+
+def nearest_vertex_index(coords: Any, lat: float, lon: float) -> Optional[int]:
+    """Index of the path vertex closest to a point, or ``None`` for an empty path"""
+    arr = as_latlon_array(coords)
+    if len(arr) == 0:
+        return None
+    return int(np.argmin(distances_to_point_km(arr, lat, lon)))
+
+
+def closest_point_on_polyline(coords: Any, lat: float, lon: float) -> Optional[Tuple[int, float, float, float]]:
+    """Project a point onto the nearest segment of a polyline
+
+    Returns ``(segment_index, fraction, distance_km, along_km)`` where the
+    projection lies ``fraction`` of the way along segment ``segment_index``,
+    ``distance_km`` is the offset from the line and ``along_km`` is the path
+    distance from the first vertex. Segments are projected on a local
+    equirectangular plane, which is accurate at road-segment scale.
+    """
+    arr = as_latlon_array(coords)
+    if len(arr) == 0:
+        return None
+    if len(arr) == 1:
+        return 0, 0.0, float(haversine_km(arr[0, 0], arr[0, 1], lat, lon)), 0.0
+
+    kx = np.cos(np.radians(lat))
+    xs = (arr[:, 1] - lon) * kx
+    ys = arr[:, 0] - lat
+    ax, ay = xs[:-1], ys[:-1]
+    dx, dy = xs[1:] - ax, ys[1:] - ay
+    seg_len_sq = dx * dx + dy * dy
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = np.where(seg_len_sq > 0, -(ax * dx + ay * dy) / seg_len_sq, 0.0)
+    t = np.clip(t, 0.0, 1.0)
+    px = ax + t * dx
+    py = ay + t * dy
+    best = int(np.argmin(px * px + py * py))
+
+    fraction = float(t[best])
+    proj_lat = arr[best, 0] + fraction * (arr[best + 1, 0] - arr[best, 0])
+    proj_lon = arr[best, 1] + fraction * (arr[best + 1, 1] - arr[best, 1])
+    cumulative = cumulative_distance_km(arr)
+    along = cumulative[best] + fraction * (cumulative[best + 1] - cumulative[best])
+    return best, fraction, float(haversine_km(lat, lon, proj_lat, proj_lon)), float(along)
+
+
+def interpolate_along(coords: Any, distances_km: ArrayLike, cumulative: Optional[np.ndarray] = None) -> np.ndarray:
+    """Positions at the given path distances (clamped to the path ends)"""
+    arr = as_latlon_array(coords)
+    if cumulative is None:
+        cumulative = cumulative_distance_km(arr)
+    targets = np.atleast_1d(np.asarray(distances_km, dtype=float))
+    if len(arr) == 0:
+        return np.empty((0, 2), dtype=float)
+    if len(arr) == 1 or cumulative[-1] == 0:
+        return np.repeat(arr[:1], len(targets), axis=0)
+    lats = np.interp(targets, cumulative, arr[:, 0])
+    lons = np.interp(targets, cumulative, arr[:, 1])
+    return np.column_stack((lats, lons))
+
+
+def resample_polyline(coords: Any, count: int) -> np.ndarray:
+    """``count`` points spaced evenly by distance along a path, ends included"""
+    arr = as_latlon_array(coords)
+    if len(arr) == 0 or count <= 0:
+        return np.empty((0, 2), dtype=float)
+    cumulative = cumulative_distance_km(arr)
+    return interpolate_along(arr, np.linspace(0.0, cumulative[-1], count), cumulative)
+
+
+def points_in_polygon(lats: ArrayLike, lons: ArrayLike, ring: Any) -> np.ndarray:
+    """Even-odd ray casting for many points against one ``[lon, lat]`` ring"""
+    poly = np.asarray(ring, dtype=float)
+    y = np.atleast_1d(np.asarray(lats, dtype=float))[:, None]
+    x = np.atleast_1d(np.asarray(lons, dtype=float))[:, None]
+    if poly.ndim != 2 or len(poly) < 3:
+        return np.zeros(y.shape[0], dtype=bool)
+
+    x1, y1 = poly[:, 0], poly[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    straddles = (y1 > y) != (y2 > y)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    crossings = straddles & (x < x_cross)
+    return (np.count_nonzero(crossings, axis=1) % 2) == 1
+
+
+def point_in_polygon(lat: float, lon: float, ring: Any) -> bool:
+    """Whether a single point lies inside a ``[lon, lat]`` ring"""
+    return bool(points_in_polygon(lat, lon, ring)[0])
@@ -9,6 +9,7 @@ from bson import ObjectId
 from pymongo.errors import DuplicateKeyError
 
 from .database import db_manager
+from utils.pagination import KeysetPage, paginate
 
 logger = logging.getLogger(__name__)
 
@@ -166,6 +167,30 @@ class BaseRepository:
             logger.error(f"Error finding documents in {self.collection_name}: {e}")
             raise
             
+    async def find_page(self,
+                        query: Dict[str, Any] = None,
+                        limit: int = 100,
+                        sort: List[tuple] = None,
+                        cursor: Optional[str] = None,
+                        include_total: bool = False) -> KeysetPage:
+        """Find documents with keyset pagination, continuing after ``cursor``"""
+        try:
+            collection = await self.get_collection()
+            page = await paginate(
+                collection,
+                query=self._prepare_query(query),
+                sort=sort,
+                limit=limit,
+                cursor=cursor,
+                include_total=include_total
+            )
+            page.items = [self._process_result(doc) for doc in page.items]
+            return page
+            
+        except Exception as e:
+            logger.error(f"Error finding document page in {self.collection_name}: {e}")
+            raise
+            
     async def count(self, query: Dict[str, Any] = None) -> int:
         """Count documents matching query"""
         try:
@@ -125,6 +125,9 @@ class DatabaseManager:
             await maintenance_collection.create_index("status")
             await maintenance_collection.create_index("maintenance_type")
             await maintenance_collection.create_index([("vehicle_id", 1), ("scheduled_date", 1)])
+            # Keyset pagination sort keys for record listings
+            await maintenance_collection.create_index([("scheduled_date", -1), ("_id", -1)])
+            await maintenance_collection.create_index([("vehicle_id", 1), ("scheduled_date", -1), ("_id", -1)])
             
             # Maintenance schedules indexes
             schedules_collection = await self.get_collection("maintenance_schedules")
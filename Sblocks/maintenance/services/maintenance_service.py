@@ -10,6 +10,7 @@ from datetime import datetime, timedelta
 from schemas.entities import MaintenanceRecord, MaintenanceStatus, MaintenancePriority
 from repositories import MaintenanceRecordsRepository
 from utils.vehicle_validator import vehicle_validator
+from utils.pagination import KeysetPage
 
 logger = logging.getLogger(__name__)
 
@@ -222,30 +223,7 @@ class MaintenanceRecordsService:
                                        sort_order: str = "desc") -> List[Dict[str, Any]]:
         """Search maintenance records with complex filters"""
         try:
-            # Build MongoDB query from search parameters
-            db_query = {}
-            
-            if "vehicle_id" in query:
-                db_query["vehicle_id"] = query["vehicle_id"]
-            if "status" in query:
-                db_query["status"] = query["status"]
-            if "maintenance_type" in query:
-                db_query["maintenance_type"] = query["maintenance_type"]
-            if "priority" in query:
-                db_query["priority"] = query["priority"]
-            if "vendor_id" in query:
-                db_query["vendor_id"] = query["vendor_id"]
-            if "technician_id" in query:
-                db_query["assigned_technician"] = query["technician_id"]
-                
-            # Date range filters
-            if "scheduled_from" in query or "scheduled_to" in query:
-                date_filter = {}
-                if "scheduled_from" in query:
-                    date_filter["$gte"] = datetime.fromisoformat(query["scheduled_from"].replace("Z", "+00:00"))
-                if "scheduled_to" in query:
-                    date_filter["$lte"] = datetime.fromisoformat(query["scheduled_to"].replace("Z", "+00:00"))
-                db_query["scheduled_date"] = date_filter
+            db_query = self._build_search_query(query)
                 
             # Sorting
             sort_direction = 1 if sort_order == "asc" else -1
@@ -256,6 +234,56 @@ class MaintenanceRecordsService:
         except Exception as e:
             logger.error(f"Error searching maintenance records: {e}")
             raise
+
+    async def search_maintenance_records_page(self,
+                                            query: Dict[str, Any],
+                                            limit: int = 100,
+                                            cursor: Optional[str] = None,
+                                            sort_by: str = "scheduled_date",
+                                            sort_order: str = "desc") -> KeysetPage:
+        """Search maintenance records with keyset pagination"""
+        try:
+            db_query = self._build_search_query(query)
+            sort_direction = 1 if sort_order == "asc" else -1
+            return await self.repository.find_page(
+                db_query,
+                limit=limit,
+                sort=[(sort_by, sort_direction)],
+                cursor=cursor,
+                include_total=True
+            )
+            
+        except Exception as e:
+            logger.error(f"Error searching maintenance records page: {e}")
+            raise
+            
+    def _build_search_query(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        """Build MongoDB query from search parameters"""
+        db_query = {}
+        
+        if "vehicle_id" in query:
+            db_query["vehicle_id"] = query["vehicle_id"]
+        if "status" in query:
+            db_query["status"] = query["status"]
+        if "maintenance_type" in query:
+            db_query["maintenance_type"] = query["maintenance_type"]
+        if "priority" in query:
+            db_query["priority"] = query["priority"]
+        if "vendor_id" in query:
+            db_query["vendor_id"] = query["vendor_id"]
+        if "technician_id" in query:
+            db_query["assigned_technician"] = query["technician_id"]
+            
+        # Date range filters
+        if "scheduled_from" in query or "scheduled_to" in query:
+            date_filter = {}
+            if "scheduled_from" in query:
+                date_filter["$gte"] = datetime.fromisoformat(query["scheduled_from"].replace("Z", "+00:00"))
+            if "scheduled_to" in query:
+                date_filter["$lte"] = datetime.fromisoformat(query["scheduled_to"].replace("Z", "+00:00"))
+            db_query["scheduled_date"] = date_filter
+            
+        return db_query
     
     async def _auto_set_priority(self, data: Dict[str, Any]) -> None:
         """Automatically set priority based on maintenance type and conditions"""
@@ -355,6 +355,29 @@ class ServiceRequestConsumer:
                         skip = 0
                         limit = 100
                     
+                    if "cursor" in data:
+                        # Keyset pagination: continue after the cursor instead of skipping
+                        page = await maintenance_records_service.search_maintenance_records_page(
+                            query=data,
+                            limit=limit,
+                            cursor=data.get("cursor"),
+                            sort_by=data.get("sort_by", "scheduled_date"),
+                            sort_order=data.get("sort_order", "desc")
+                        )
+                        return ResponseBuilder.success(
+                            data={
+                                "maintenance_records": page.items,
+                                "total": page.total,
+                                "pagination": {
+                                    "limit": limit,
+                                    "next_cursor": page.next_cursor,
+                                    "has_more": page.has_more
+                                },
+                                "filters": data
+                            },
+                            message="Maintenance records retrieved successfully"
+                        ).model_dump()
+                    
                     records = await maintenance_records_service.search_maintenance_records(
                         query=data,
                         skip=skip,
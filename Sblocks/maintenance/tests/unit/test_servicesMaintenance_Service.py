@@ -155,6 +155,13 @@ class FakeRepo:
         self.last_find_args = {"query": dict(query or {}), "skip": skip, "limit": limit, "sort": list(sort or [])}
         return list(self.find_return)
 
+    async def find_page(self, query=None, limit=100, sort=None, cursor=None, include_total=False):
+        self.last_page_args = {"query": dict(query or {}), "limit": limit, "sort": list(sort or []),
+                               "cursor": cursor, "include_total": include_total}
+        if cursor == "bad":
+            raise ValueError("Invalid pagination cursor")
+        return {"items": list(self.find_return), "next_cursor": None}
+
 
 def make_service(repo=None, vehicle_ok=True):
     svc = MaintenanceRecordsService()
@@ -525,6 +532,28 @@ async def test_search_full_query_and_asc_sort_and_date_range():
     assert isinstance(dq["scheduled_date"]["$gte"], datetime)
     assert isinstance(dq["scheduled_date"]["$lte"], datetime)
 
+@pytest.mark.asyncio
+async def test_search_page_passes_cursor_filters_and_sort():
+    repo = FakeRepo()
+    repo.find_return = [{"id": "r1"}]
+    svc = make_service(repo)
+    page = await svc.search_maintenance_records_page({"vehicle_id": "V1", "technician_id": "t1"},
+                                                     limit=5, cursor="abc", sort_by="priority", sort_order="asc")
+    assert page["items"] == [{"id": "r1"}]
+    args = repo.last_page_args
+    assert args["query"] == {"vehicle_id": "V1", "assigned_technician": "t1"}
+    assert args["limit"] == 5 and args["cursor"] == "abc" and args["include_total"] is True
+    assert args["sort"] == [("priority", 1)]
+
+@pytest.mark.asyncio
+async def test_search_page_default_sort_and_bad_cursor_raises():
+    repo = FakeRepo()
+    svc = make_service(repo)
+    await svc.search_maintenance_records_page({})
+    assert repo.last_page_args["sort"] == [("scheduled_date", -1)] and repo.last_page_args["cursor"] is None
+    with pytest.raises(ValueError):
+        await svc.search_maintenance_records_page({}, cursor="bad")
+
 @pytest.mark.asyncio
 async def test_search_invalid_date_raises():
     repo = FakeRepo()
@@ -3,5 +3,6 @@ Utilities package for maintenance service
 """
 
 from .vehicle_validator import vehicle_validator
+from .pagination import KeysetPage, InvalidCursorError, paginate
 
-__all__ = ["vehicle_validator"]
+__all__ = ["vehicle_validator", "KeysetPage", "InvalidCursorError", "paginate"]
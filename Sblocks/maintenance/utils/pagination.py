@@ -0,0 +1,230 @@
+"""
+Keyset (cursor) pagination helpers for MongoDB list queries
+
+The GPS, management and maintenance blocks are built as separate images,
+so each ships its own copy of this module. Keep the copies identical.
+"""
+import base64
+import json
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from bson import ObjectId
+
+logger = logging.getLogger(__name__)
+
+SortSpec = List[Tuple[str, int]]
+
+DEFAULT_COUNT_CACHE_TTL_SECONDS = 30
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a continuation token cannot be decoded or does not match the query"""
+
+
+@dataclass
+class KeysetPage:
+    """One page of a keyset-paginated query"""
+    items: List[Any]
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+    total: Optional[int] = None
+
+    def to_dict(self, items_key: str = "items") -> Dict[str, Any]:
+        data = {
+            items_key: self.items,
+            "next_cursor": self.next_cursor,
+            "has_more": self.has_more,
+        }
+        if self.total is not None:
+            data["total"] = self.total
+        return data
+
+
+def normalize_sort(sort: Optional[Sequence[Tuple[str, int]]]) -> SortSpec:
+    """Return a sort spec that always ends with ``_id`` so the ordering is total"""
+    spec = [(key, 1 if direction >= 0 else -1) for key, direction in (sort or [])]
+    if not any(key == "_id" for key, _ in spec):
+        spec.append(("_id", spec[0][1] if spec else 1))
+    return spec
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return {"$oid": str(value)}
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "$oid" in value:
+            return ObjectId(value["$oid"])
+        if "$date" in value:
+            return datetime.fromisoformat(value["$date"])
+    return value
+
+
+def _get_path(doc: Dict[str, Any], path: str) -> Any:
+    current: Any = doc
+    for part in path.split("."):
+        if not isinstance(current, dict):
+            return None
+        current = current.get(part)
+    return current
+
+
+def encode_cursor(doc: Dict[str, Any], sort: SortSpec) -> str:
+    """Build an opaque continuation token from the sort-key values of ``doc``"""
+    payload = {
+        "k": [key for key, _ in sort],
+        "v": [_encode_value(_get_path(doc, key)) for key, _ in sort],
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, sort: SortSpec) -> List[Any]:
+    """Decode a continuation token into sort-key values, validating it against ``sort``"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        keys = payload["k"]
+        values = payload["v"]
+    except Exception as e:
+        raise InvalidCursorError(f"Malformed pagination cursor: {e}")
+
+    if keys != [key for key, _ in sort] or len(values) != len(sort):
+        raise InvalidCursorError("Pagination cursor does not match the requested sort order")
+
+    try:
+        return [_decode_value(value) for value in values]
+    except Exception as e:
+        raise InvalidCursorError(f"Malformed pagination cursor value: {e}")
+
+
+def _after(key: str, direction: int, value: Any) -> Optional[Dict[str, Any]]:
+    """Predicate for values of ``key`` that sort strictly after ``value``
+
+    MongoDB sorts null and missing values before every other value, so
+    ascending they are only ever before the cursor and descending they are
+    only ever after it. ``None`` means nothing sorts after ``value``.
+    """
+    if value is None:
+        return {key: {"$ne": None}} if direction == 1 else None
+    if direction == 1:
+        return {key: {"$gt": value}}
+    return {"$or": [{key: {"$lt": value}}, {key: None}]}
+
+
+def build_keyset_filter(sort: SortSpec, values: List[Any]) -> Dict[str, Any]:
+    """Build the "strictly after" predicate for a compound sort key
+
+    For sort ``[(a, 1), (b, -1)]`` and values ``(x, y)`` this yields
+    ``{"$or": [{a: {"$gt": x}}, {a: x, "$or": [{b: {"$lt": y}}, {b: null}]}]}``.
+    Rows whose sort keys are null or missing are kept in their place.
+    """
+    branches = []
+    for i, (key, direction) in enumerate(sort):
+        after = _after(key, direction, values[i])
+        if after is None:
+            continue
+        branch = {prev_key: values[j] for j, (prev_key, _) in enumerate(sort[:i])}
+        branch.update(after)
+        branches.append(branch)
+    return branches[0] if len(branches) == 1 else {"$or": branches}
+
+
+def apply_cursor(query: Dict[str, Any], sort: SortSpec, cursor: Optional[str]) -> Dict[str, Any]:
+    """Combine a base query with the keyset predicate for ``cursor``"""
+    if not cursor:
+        return query
+    keyset = build_keyset_filter(sort, decode_cursor(cursor, sort))
+    if not query:
+        return keyset
+    return {"$and": [query, keyset]}
+
+
+class CountCache:
+    """Short-lived cache of collection totals so deep pages skip repeated counts"""
+
+    def __init__(self, ttl_seconds: int = DEFAULT_COUNT_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[str, Tuple[float, int]] = {}
+
+    def _key(self, collection_name: str, query: Dict[str, Any]) -> str:
+        return f"{collection_name}:{json.dumps(query, sort_keys=True, default=str)}"
+
+    async def count(self, collection, query: Dict[str, Any]) -> int:
+        """Return an estimated total for ``query``
+
+        Unfiltered collections use ``estimated_document_count`` (metadata only);
+        filtered totals are counted once and reused for ``ttl_seconds``.
+        """
+        key = self._key(getattr(collection, "name", "collection"), query)
+        now = time.monotonic()
+        cached = self._entries.get(key)
+        if cached and now - cached[0] < self.ttl_seconds:
+            return cached[1]
+
+        if not query:
+            total = await collection.estimated_document_count()
+        else:
+            total = await collection.count_documents(query)
+
+        self._entries[key] = (now, total)
+        return total
+
+    def invalidate(self, collection_name: Optional[str] = None):
+        if collection_name is None:
+            self._entries.clear()
+            return
+        prefix = f"{collection_name}:"
+        for key in [k for k in self._entries if k.startswith(prefix)]:
+            del self._entries[key]
+
+
+count_cache = CountCache()
+
+
+async def paginate(
+    collection,
+    query: Optional[Dict[str, Any]] = None,
+    sort: Optional[Sequence[Tuple[str, int]]] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    include_total: bool = False
+) -> KeysetPage:
+    """Fetch one page of ``collection`` ordered by ``sort`` starting after ``cursor``
+
+    Fetches ``limit + 1`` documents to detect whether another page exists, so no
+    documents before the cursor are scanned or skipped. The sort keys should be
+    backed by a compound index ending in ``_id``.
+    """
+    query = query or {}
+    spec = normalize_sort(sort)
+    limit = max(1, int(limit))
+
+    find_query = apply_cursor(query, spec, cursor)
+    cursor_obj = collection.find(find_query).sort(spec).limit(limit + 1)
+
+    docs = []
+    async for doc in cursor_obj:
+        docs.append(doc)
+
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    next_cursor = encode_cursor(docs[-1], spec) if has_more and docs else None
+
+    total = None
+    if include_total:
+        try:
+            total = await count_cache.count(collection, query)
+        except Exception as e:
+            logger.warning(f"Failed to estimate total for paginated query: {e}")
+
+    return KeysetPage(items=docs, next_cursor=next_cursor, has_more=has_more, total=total)
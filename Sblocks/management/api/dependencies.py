@@ -186,9 +186,14 @@ async def get_pagination_params(
     skip: int = 0, 
     limit: int = 100,
     page: Optional[int] = None,
-    page_size: Optional[int] = None
-) -> Dict[str, int]:
-    """Get pagination parameters with validation"""
+    page_size: Optional[int] = None,
+    cursor: Optional[str] = None
+) -> Dict[str, Any]:
+    """Get pagination parameters with validation
+
+    Passing ``cursor`` (empty for the first page) switches list endpoints to
+    keyset pagination; the response then carries a ``next_cursor``.
+    """
     # Support both skip/limit and page/page_size patterns
     if page is not None and page_size is not None:
         if page < 1:
@@ -208,12 +213,15 @@ async def get_pagination_params(
         page = (skip // limit) + 1
         page_size = limit
     
-    return {
+    params = {
         "skip": skip,
         "limit": limit,
         "page": page,
         "page_size": page_size
     }
+    if cursor is not None:
+        params["cursor"] = cursor or None
+    return params
 
 
 def validate_object_id(obj_id: str, field_name: str = "ID") -> str:
@@ -5,7 +5,7 @@ from fastapi import APIRouter, Depends, Query
 from typing import Optional
 import logging
 
-from services.driver_service import driver_service
+from services.driver_service import driver_service, DRIVER_PAGE_SORT
 from schemas.requests import DriverCreateRequest, DriverUpdateRequest
 from schemas.responses import ResponseBuilder
 from api.dependencies import (
@@ -40,11 +40,24 @@ async def get_drivers(
             if status:
                 filter_query["status"] = status
             
+            if "cursor" in pagination:
+                page = await driver_repo.find_page(
+                    filter_query=filter_query,
+                    limit=pagination["limit"],
+                    sort=DRIVER_PAGE_SORT,
+                    cursor=pagination["cursor"],
+                    include_total=True
+                )
+                return ResponseBuilder.success(
+                    data=page.to_dict("drivers"),
+                    message="Drivers retrieved successfully"
+                ).model_dump()
+            
             drivers = await driver_repo.find(
                 filter_query=filter_query,
                 skip=pagination["skip"],
                 limit=pagination["limit"],
-                sort=[("last_name", 1), ("first_name", 1)]
+                sort=DRIVER_PAGE_SORT
             )
         
         return ResponseBuilder.success(
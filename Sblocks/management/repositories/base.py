@@ -8,6 +8,7 @@ from datetime import datetime
 import logging
 
 from .database import db_manager
+from utils.pagination import KeysetPage, paginate
 
 logger = logging.getLogger(__name__)
 
@@ -128,6 +129,36 @@ class BaseRepository(ABC, Generic[T]):
             logger.error(f"Failed to find entities in {self.collection_name}: {e}")
             raise
     
+    async def find_page(
+        self,
+        filter_query: Dict[str, Any] = None,
+        limit: int = 100,
+        sort: List[tuple] = None,
+        cursor: Optional[str] = None,
+        include_total: bool = False
+    ) -> KeysetPage:
+        """Find entities with keyset pagination
+
+        ``cursor`` is the ``next_cursor`` of the previous page. Totals, when
+        requested, are estimated and cached briefly instead of counted per page.
+        """
+        try:
+            page = await paginate(
+                self.collection,
+                query=filter_query or {},
+                sort=sort,
+                limit=limit,
+                cursor=cursor,
+                include_total=include_total
+            )
+            for entity in page.items:
+                entity["_id"] = str(entity["_id"])
+            return page
+            
+        except Exception as e:
+            logger.error(f"Failed to find entity page in {self.collection_name}: {e}")
+            raise
+    
     async def count(self, filter_query: Dict[str, Any] = None) -> int:
         """Count entities matching filter"""
         try:
@@ -150,6 +150,12 @@ class DatabaseManager:
             await create_index_safe(db.drivers, "status")
             await create_index_safe(db.drivers, "department")
             await create_index_safe(db.drivers, "current_vehicle_id", sparse=True)
+            await create_index_safe(db.drivers, [("status", 1), ("last_name", 1), ("first_name", 1), ("_id", 1)])
+            await create_index_safe(db.drivers, [("last_name", 1), ("first_name", 1), ("_id", 1)])
+            
+            # Vehicles keyset pagination indexes
+            await create_index_safe(db.vehicles, [("registration_number", 1), ("_id", 1)])
+            await create_index_safe(db.vehicles, [("status", 1), ("registration_number", 1), ("_id", 1)])
             
             # Analytics snapshots indexes
             await create_index_safe(db.analytics_snapshots, "metric_type")
@@ -13,6 +13,10 @@ from schemas.requests import DriverCreateRequest, DriverUpdateRequest
 
 logger = logging.getLogger(__name__)
 
+# Sort used for every driver list page; the route and the service share it so
+# a cursor issued by one resumes on the other
+DRIVER_PAGE_SORT = [("last_name", 1), ("first_name", 1)]
+
 
 class DriverService:
     """Service for driver management business logic"""
@@ -74,6 +78,23 @@ class DriverService:
             # Ensure pagination params are integers
             skip = int(str(filters.get("skip", 0)).strip())
             limit = int(str(filters.get("limit", 100)).strip())
+
+            if "cursor" in filters:
+                # Keyset pagination: continue after the cursor instead of skipping
+                page = await self.driver_repo.find_page(
+                    filter_query=query,
+                    limit=limit if limit > 0 else 100,
+                    sort=DRIVER_PAGE_SORT,
+                    cursor=filters.get("cursor"),
+                    include_total=True
+                )
+                return {
+                    "drivers": page.items,
+                    "total": page.total,
+                    "limit": limit,
+                    "next_cursor": page.next_cursor,
+                    "has_more": page.has_more,
+                }
             logger.info(f"Skip parameter for drivers: {skip}")
             logger.info(f"Limit parameter for drivers: {limit}")
 
@@ -81,7 +102,8 @@ class DriverService:
             all_drivers = await self.driver_repo.find(
                 filter_query=query,
                 skip=skip,
-                limit=limit if limit > 0 else None
+                limit=limit if limit > 0 else None,
+                sort=DRIVER_PAGE_SORT
             )
 
             # Total count without pagination
@@ -435,6 +457,8 @@ class DriverService:
                         filters["skip"] = pagination["skip"]
                     if "limit" in pagination:
                         filters["limit"] = pagination["limit"]
+                    if "cursor" in pagination:
+                        filters["cursor"] = pagination["cursor"]
                     
                     logger.info(f"Filters: {filters}")
 
@@ -41,6 +41,9 @@ class VehicleService:
             if not pagination:
                 pagination = {"skip": 0, "limit": 50}
             
+            if "cursor" in pagination:
+                return await self._get_vehicles_page(filter_query, pagination)
+            
             # Get vehicles
             vehicles = await self.vehicle_repo.find(
                 filter_query=filter_query,
@@ -76,6 +79,32 @@ class VehicleService:
             raise
 
 
+    async def _get_vehicles_page(self, filter_query: Dict[str, Any], pagination: Dict[str, Any]) -> Dict[str, Any]:
+        """Get vehicles with keyset pagination, continuing after ``pagination["cursor"]``"""
+        limit = pagination.get("limit", 50)
+        page = await self.vehicle_repo.find_page(
+            filter_query=filter_query,
+            limit=limit,
+            sort=[("registration_number", 1)],
+            cursor=pagination.get("cursor"),
+            include_total=True
+        )
+        
+        for vehicle in page.items:
+            for key, value in vehicle.items():
+                if isinstance(value, datetime):
+                    vehicle[key] = value.isoformat()
+        
+        return {
+            "vehicles": page.items,
+            "pagination": {
+                "total": page.total,
+                "page_size": limit,
+                "next_cursor": page.next_cursor,
+                "has_more": page.has_more
+            }
+        }
+
     async def get_num_vehicles(self, 
         department: Optional[str] = None,
         status: Optional[str] = None, 
@@ -0,0 +1,145 @@
+import sys, os, types, importlib.util, pytest
+from datetime import datetime, timedelta
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+ROOT = os.path.abspath(os.path.join(HERE, "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# Other tests stub the "repositories" package, so load base.py under its own name
+PKG = "mgmt_repositories_under_test"
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    def sort(self, spec):
+        for key, direction in reversed(spec):
+            self._docs = sorted(self._docs, key=lambda d: d[key], reverse=direction == -1)
+        return self
+
+    def limit(self, n):
+        self._docs = self._docs[:n]
+        return self
+
+    def __aiter__(self):
+        async def gen():
+            for d in self._docs:
+                yield dict(d)
+        return gen()
+
+
+def _matches(doc, query):
+    for key, cond in query.items():
+        if key == "$and":
+            if not all(_matches(doc, q) for q in cond):
+                return False
+        elif key == "$or":
+            if not any(_matches(doc, q) for q in cond):
+                return False
+        elif isinstance(cond, dict):
+            value = doc.get(key)
+            for op, target in cond.items():
+                if op == "$ne" and value == target:
+                    return False
+                if op == "$gt" and not (value is not None and value > target):
+                    return False
+                if op == "$lt" and not (value is not None and value < target):
+                    return False
+        elif doc.get(key) != cond:
+            return False
+    return True
+
+
+class FakeCollection:
+    name = "drivers"
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+
+    def find(self, query):
+        self.queries.append(query)
+        return FakeCursor([d for d in self.docs if _matches(d, query)])
+
+    async def estimated_document_count(self):
+        return len(self.docs)
+
+    async def count_documents(self, query):
+        return len([d for d in self.docs if _matches(d, query)])
+
+
+class FakeDbManager:
+    def __init__(self):
+        self.db = {}
+
+
+def _load_base():
+    pkg = types.ModuleType(PKG)
+    pkg.__path__ = []
+    sys.modules[PKG] = pkg
+    dbm = types.ModuleType(PKG + ".database")
+    dbm.db_manager = FakeDbManager()
+    sys.modules[PKG + ".database"] = dbm
+    spec = importlib.util.spec_from_file_location(PKG + ".base", os.path.join(ROOT, "repositories", "base.py"))
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[PKG + ".base"] = mod
+    spec.loader.exec_module(mod)
+    return mod, dbm.db_manager
+
+
+base_mod, db_manager = _load_base()
+
+
+class DriverRepo(base_mod.BaseRepository):
+    def __init__(self):
+        super().__init__("drivers")
+
+
+def make_docs():
+    base = datetime(2025, 1, 1)
+    return [
+        {"_id": i, "last_name": f"L{i // 2}", "status": "active" if i % 2 else "inactive",
+         "created_at": base + timedelta(minutes=i)}
+        for i in range(9)
+    ]
+
+
+#------------find_page walks every matching entity once and stringifies ids--------
+@pytest.mark.asyncio
+async def test_find_page_walks_all_pages():
+    coll = FakeCollection(make_docs())
+    db_manager.db = {"drivers": coll}
+    repo = DriverRepo()
+    seen, cursor = [], None
+    while True:
+        page = await repo.find_page({}, limit=2, sort=[("last_name", 1)], cursor=cursor, include_total=True)
+        assert page.total == 9
+        seen.extend(d["_id"] for d in page.items)
+        if not page.has_more:
+            break
+        cursor = page.next_cursor
+    assert seen == [str(i) for i in range(9)]
+
+
+#------------find_page keeps the caller's filter on later pages--------
+@pytest.mark.asyncio
+async def test_find_page_applies_filter():
+    coll = FakeCollection(make_docs())
+    db_manager.db = {"drivers": coll}
+    repo = DriverRepo()
+    first = await repo.find_page({"status": "active"}, limit=3, sort=[("last_name", 1)])
+    second = await repo.find_page({"status": "active"}, limit=3, sort=[("last_name", 1)], cursor=first.next_cursor)
+    assert [d["_id"] for d in first.items + second.items] == ["1", "3", "5", "7"]
+    assert second.has_more is False
+    assert coll.queries[1]["$and"][0] == {"status": "active"}
+
+
+#------------find_page surfaces bad cursors as InvalidCursorError--------
+@pytest.mark.asyncio
+async def test_find_page_rejects_bad_cursor():
+    db_manager.db = {"drivers": FakeCollection(make_docs())}
+    from utils.pagination import InvalidCursorError
+    with pytest.raises(InvalidCursorError):
+        await DriverRepo().find_page({}, limit=2, sort=[("last_name", 1)], cursor="garbage")
@@ -114,9 +114,14 @@ class _DriverRepoStub:
         self.data_by_id.pop(did, None)
         self.deleted.append(did)
         return True
-    async def find(self, filter_query=None, skip=0, limit=None):
+    async def find(self, filter_query=None, skip=0, limit=None, sort=None):
         self.find_args.append((filter_query, skip, limit))
+        self.find_sort = sort
         return list(self.data_by_id.values())
+    async def find_page(self, filter_query=None, limit=100, sort=None, cursor=None, include_total=False):
+        self.page_args = (filter_query, limit, sort, cursor, include_total)
+        items = list(self.data_by_id.values())[:limit]
+        return types.SimpleNamespace(items=items, total=len(self.data_by_id), next_cursor="next", has_more=True)
     async def count(self, query=None):
         self.count_args.append(query)
         return len(self.data_by_id)
@@ -201,6 +206,17 @@ async def test_get_all_drivers_limit_zero_and_invalid_status_ignored():
     q, s, l = svc.driver_repo.find_args[-1]
     assert q == {} and l is None
 
+@pytest.mark.asyncio
+async def test_get_all_drivers_cursor_uses_shared_page_sort():
+    svc = make_service()
+    for i in range(3):
+        await svc.driver_repo.create({"employee_id": f"E{i}", "status":"active"})
+    out = await svc.get_all_drivers({"status_filter":"active","cursor":"abc","limit":"2"})
+    assert out["next_cursor"] == "next" and out["has_more"] is True and len(out["drivers"]) == 2
+    assert svc.driver_repo.page_args == ({"status":"active"}, 2, ds_mod.DRIVER_PAGE_SORT, "abc", True)
+    await svc.get_all_drivers({})
+    assert svc.driver_repo.find_sort == ds_mod.DRIVER_PAGE_SORT
+
 @pytest.mark.asyncio
 async def test_get_all_drivers_bad_skip_raises():
     svc = make_service()
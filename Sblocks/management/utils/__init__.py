@@ -0,0 +1,7 @@
+"""
+Utilities package for management service
+"""
+
+from .pagination import KeysetPage, InvalidCursorError, paginate
+
+__all__ = ["KeysetPage", "InvalidCursorError", "paginate"]
@@ -10,6 +10,8 @@ from bson import ObjectId
 from schemas.requests import AnalyticsRequest
 from schemas.responses import ResponseBuilder, StandardResponse, ResponseStatus
 from services.analytics_service import analytics_service
+from services.driver_behavior_service import driver_behavior_service
+from services.trip_rollup_service import trip_rollup_service
 from api.dependencies import get_current_user_legacy as get_current_user
 
 from repositories.database import db_manager
@@ -117,6 +119,29 @@ async def get_route_efficiency_analytics(
         raise HTTPException(status_code=500, detail="Failed to get route efficiency analytics")
 
 
+@router.post("/rollups/rebuild", response_model=Dict[str, Any])
+async def rebuild_trip_rollups(
+    since: Optional[datetime] = Query(None, description="Rebuild from the month of this date; all history if omitted"),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Recount the daily and monthly trip rollups from trip history
+    This is useful for backfilling or fixing inconsistencies
+    """
+    try:
+        logger.info(f"[AnalyticsAPI] Rebuilding trip rollups since {since or 'the beginning'}")
+        results = await trip_rollup_service.rebuild(since)
+        
+        return ResponseBuilder.success(
+            data=results,
+            message="Trip rollups rebuilt successfully"
+        )
+    
+    except Exception as e:
+        logger.error(f"[AnalyticsAPI] Failed to rebuild trip rollups: {e}")
+        raise HTTPException(status_code=500, detail="Failed to rebuild trip rollups")
+
+
 @router.get("/dashboard", response_model=Dict[str, Any])
 async def get_dashboard_analytics(
     period: str = Query("month", regex="^(day|week|month|quarter|year)$"),
@@ -273,151 +298,20 @@ async def get_violation_trends(
 ) -> StandardResponse:
     """
     Get violation trends over time by type (speeding, braking, acceleration, phone usage)
-    with daily aggregation. Extra logging added to diagnose event-loop mismatches.
+    with daily aggregation.
     """
-    import asyncio
-    import traceback
-
-    def loop_id():
-        try:
-            return id(asyncio.get_running_loop())
-        except RuntimeError:
-            return None
-
-    def coll_info(coll):
-        try:
-            client = coll.database.client
-            addr = getattr(client, "address", None)
-            return f"db={coll.database.name} coll={coll.name} addr={addr} coll_id={id(coll)}"
-        except Exception as e:
-            return f"<coll_info_error {e!r}>"
-
-    logger.info("[AnalyticsAPI] get_violation_trends start period=%s driver_id=%s loop=%s",
-                period, driver_id, loop_id())
+    logger.info(f"[AnalyticsAPI] Getting violation trends for period {period} driver_id={driver_id}")
 
     try:
-        days = {"7d": 7, "30d": 30, "90d": 90}.get(period, 7)
-        now = datetime.utcnow()
-        start_date = now - timedelta(days=days)
-
-        collection_aliases = {
-            "speeding": ["speed_violations", "speeding_violations"],
-            "braking": ["excessive_braking_violations", "harsh_braking_violations"],
-            "acceleration": ["excessive_acceleration_violations", "rapid_acceleration_violations"],
-            "phone_usage": ["phone_usage_violations", "driver_ping_violations"],
-        }
-
-        date_fields = ["created_at", "time", "timestamp"]
-
-        trends_data: Dict[str, list] = {}
-        total_violations = 0
-
-        for label, aliases in collection_aliases.items():
-            collection = None
-            chosen = None
-            for name in aliases:
-                try:
-                    collection = getattr(db_manager, name)
-                    chosen = name
-                    break
-                except AttributeError:
-                    continue
-
-            if collection is None:
-                logger.warning("[AnalyticsAPI] Collection not found for %s; tried %s", label, aliases)
-                trends_data[label] = []
-                continue
-
-            logger.info("[AnalyticsAPI] %s: using %s | %s | loop=%s",
-                        label, chosen, coll_info(collection), loop_id())
-
-            base_and = [{"$or": [{f: {"$gte": start_date}} for f in date_fields]}]
-            if driver_id:
-                base_and.append({"driver_id": driver_id})
-            base_match = {"$and": base_and}
-
-            pipeline = [
-                {"$match": base_match},
-                {"$addFields": {
-                    "violation_date_raw": {
-                        "$ifNull": [
-                            "$created_at",
-                            {"$ifNull": ["$time", "$timestamp"]}
-                        ]
-                    }
-                }},
-                {"$addFields": {
-                    "violation_date": {
-                        "$convert": {
-                            "input": "$violation_date_raw",
-                            "to": "date",
-                            "onError": None,
-                            "onNull": None
-                        }
-                    }
-                }},
-                {"$match": {"violation_date": {"$ne": None, "$gte": start_date}}},
-                {"$group": {
-                    "_id": {
-                        "y": {"$year": "$violation_date"},
-                        "m": {"$month": "$violation_date"},
-                        "d": {"$dayOfMonth": "$violation_date"},
-                    },
-                    "count": {"$sum": 1}
-                }},
-                {"$sort": {"_id.y": 1, "_id.m": 1, "_id.d": 1}}
-            ]
-
-            logger.debug("[AnalyticsAPI] %s pipeline: %s", label, pipeline)
-
-            daily_counts: Dict[str, int] = {}
-            try:
-                cursor = collection.aggregate(pipeline)
-                docs = await cursor.to_list(length=None)
-                for doc in docs:
-                    y, m, d = doc["_id"]["y"], doc["_id"]["m"], doc["_id"]["d"]
-                    key = f"{y}-{m:02d}-{d:02d}"
-                    daily_counts[key] = int(doc.get("count", 0))
-                logger.info("[AnalyticsAPI] %s aggregated %d days (sum=%d) | loop=%s",
-                            label, len(daily_counts), sum(daily_counts.values()), loop_id())
-                total_violations += sum(daily_counts.values())
-            except Exception as e:
-                logger.error("[AnalyticsAPI] %s aggregation failed on %s | loop=%s | err=%s\n%s",
-                             label, coll_info(collection), loop_id(), repr(e), traceback.format_exc())
-                daily_counts = {}
-
-            series = []
-            cur = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
-            end = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            while cur <= end:
-                key = cur.strftime("%Y-%m-%d")
-                series.append({"date": key, "count": daily_counts.get(key, 0)})
-                cur += timedelta(days=1)
-
-            trends_data[label] = series
-
-        summary = {
-            "total_violations": total_violations,
-            "period_days": days,
-            "start_date": start_date.isoformat(),
-            "end_date": now.isoformat(),
-            "driver_filter": driver_id
-        }
-
-        logger.info("[AnalyticsAPI] get_violation_trends OK total=%d loop=%s", total_violations, loop_id())
-        return StandardResponse(
-            status=ResponseStatus.SUCCESS,
-            message="Violation trends retrieved successfully",
-            data={"trends": trends_data, "summary": summary},
-        )
+        report = await driver_behavior_service.get_report("violation-trends", period, driver_id)
+        logger.info(f"[AnalyticsAPI] Violation trends calculated: {report['data']['summary']['total_violations']} violations")
+        return StandardResponse(status=ResponseStatus.SUCCESS, message=report["message"], data=report["data"])
 
     except Exception as e:
-        logger.error("[AnalyticsAPI] get_violation_trends failed loop=%s err=%r", loop_id(), e, exc_info=True)
+        logger.error(f"[AnalyticsAPI] Failed to get violation trends: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to retrieve violation trends: {str(e)}")
 
 
-
-
 @router.get("/driver-behavior/risk-distribution", response_model=StandardResponse)
 async def get_risk_distribution(
   #  current_user: str = Depends(get_current_user)
@@ -431,119 +325,8 @@ async def get_risk_distribution(
     logger.info("[AnalyticsAPI] Getting driver risk distribution")
     
     try:
-        # Get all drivers from driver_history collection
-        try:
-            cursor = db_manager.driver_history.find({})
-            drivers = await cursor.to_list(length=None)
-        except Exception as e:
-            logger.warning(f"Error querying driver_history: {e}")
-            drivers = []
-        
-        if not drivers:
-            # Return empty distribution if no driver data
-            return StandardResponse(
-                status=ResponseStatus.SUCCESS,
-                message="No driver data available",
-                data={
-                    "distribution": {"low_risk": 0, "medium_risk": 0, "high_risk": 0},
-                    "safety_score_ranges": {
-                        "90-100": 0, "80-89": 0, "70-79": 0, "60-69": 0, "below_60": 0
-                    },
-                    "performance_metrics": {
-                        "avg_safety_score": 0, "violation_rate": 0, "improvement_trend": "neutral"
-                    },
-                    "top_performers": [],
-                    "worst_performers": []
-                }
-            )
-        
-        # Analyze risk distribution
-        risk_distribution = {"low_risk": 0, "medium_risk": 0, "high_risk": 0}
-        safety_score_ranges = {"90-100": 0, "80-89": 0, "70-79": 0, "60-69": 0, "below_60": 0}
-        safety_scores = []
-        
-        for driver in drivers:
-            safety_score = driver.get("safety_score", driver.get("driver_safety_score", 0))
-            safety_scores.append(safety_score)
-            
-            # Classify risk level based on safety score and violation count
-            violation_count = driver.get("total_violations", 0)
-            
-            if safety_score >= 80 and violation_count <= 5:
-                risk_distribution["low_risk"] += 1
-            elif safety_score >= 60 and violation_count <= 15:
-                risk_distribution["medium_risk"] += 1
-            else:
-                risk_distribution["high_risk"] += 1
-            
-            # Categorize safety score
-            if safety_score >= 90:
-                safety_score_ranges["90-100"] += 1
-            elif safety_score >= 80:
-                safety_score_ranges["80-89"] += 1
-            elif safety_score >= 70:
-                safety_score_ranges["70-79"] += 1
-            elif safety_score >= 60:
-                safety_score_ranges["60-69"] += 1
-            else:
-                safety_score_ranges["below_60"] += 1
-        
-        # Calculate performance metrics
-        avg_safety_score = round(sum(safety_scores) / len(safety_scores), 2) if safety_scores else 0
-        total_violations = sum(driver.get("total_violations", 0) for driver in drivers)
-        total_trips = sum(driver.get("total_trips", 1) for driver in drivers)
-        violation_rate = round(total_violations / total_trips, 3) if total_trips > 0 else 0
-        
-        # Determine improvement trend (simplified logic)
-        recent_violations = sum(driver.get("recent_violations", 0) for driver in drivers)
-        historical_violations = sum(driver.get("historical_violations", recent_violations) for driver in drivers)
-        
-        if recent_violations < historical_violations * 0.8:
-            improvement_trend = "positive"
-        elif recent_violations > historical_violations * 1.2:
-            improvement_trend = "negative"
-        else:
-            improvement_trend = "neutral"
-        
-        performance_metrics = {
-            "avg_safety_score": avg_safety_score,
-            "violation_rate": violation_rate,
-            "improvement_trend": improvement_trend
-        }
-        
-        # Get top and worst performers
-        sorted_drivers = sorted(drivers, key=lambda x: x.get("safety_score", x.get("driver_safety_score", 0)), reverse=True)
-        top_performers = [
-            {
-                "driver_id": driver.get("driver_id", "Unknown"),
-                "name": driver.get("name", driver.get("driver_name", "Unknown Driver")),
-                "safety_score": driver.get("safety_score", driver.get("driver_safety_score", 0))
-            }
-            for driver in sorted_drivers[:5]
-        ]
-        
-        worst_performers = [
-            {
-                "driver_id": driver.get("driver_id", "Unknown"),
-                "name": driver.get("name", driver.get("driver_name", "Unknown Driver")),
-                "safety_score": driver.get("safety_score", driver.get("driver_safety_score", 0))
-            }
-            for driver in sorted_drivers[-5:]
-        ]
-        
-        logger.info(f"[AnalyticsAPI] Risk distribution calculated for {len(drivers)} drivers")
-        
-        return StandardResponse(
-            status=ResponseStatus.SUCCESS,
-            message="Driver risk distribution retrieved successfully",
-            data={
-                "distribution": risk_distribution,
-                "safety_score_ranges": safety_score_ranges,
-                "performance_metrics": performance_metrics,
-                "top_performers": top_performers,
-                "worst_performers": worst_performers
-            }
-        )
+        report = await driver_behavior_service.get_report("risk-distribution")
+        return StandardResponse(status=ResponseStatus.SUCCESS, message=report["message"], data=report["data"])
         
     except Exception as e:
         logger.error(f"[AnalyticsAPI] Failed to get risk distribution: {e}")
@@ -567,134 +350,8 @@ async def get_performance_metrics(
     logger.info(f"[AnalyticsAPI] Getting performance metrics for period {period}")
     
     try:
-        # Parse period parameter
-        days = {"7d": 7, "30d": 30, "90d": 90}.get(period, 30)
-        start_date = datetime.utcnow() - timedelta(days=days)
-        
-        # Get violation counts by type
-        violation_counts = {}
-        violation_types = {
-            "speed_violations": "speeding",
-            "excessive_braking_violations": "braking",
-            "excessive_acceleration_violations": "acceleration",
-            "phone_usage_violations": "phone_usage"
-        }
-        
-        total_violations = 0
-        for collection_name, violation_type in violation_types.items():
-            try:
-                collection = getattr(db_manager, collection_name)
-                # Handle both created_at and time fields
-                count = await collection.count_documents({
-                    "$or": [
-                        {"created_at": {"$gte": start_date}},
-                        {"time": {"$gte": start_date}}
-                    ]
-                })
-                violation_counts[violation_type] = count
-                total_violations += count
-            except Exception as e:
-                logger.warning(f"Error counting {collection_name}: {e}")
-                violation_counts[violation_type] = 0
-        
-        # Get driver statistics
-        try:
-            cursor = db_manager.driver_history.find({})
-            drivers = await cursor.to_list(length=None)
-        except Exception as e:
-            logger.warning(f"Error querying driver_history: {e}")
-            drivers = []
-        
-        # Calculate safety metrics
-        if drivers:
-            safety_scores = [d.get("safety_score", d.get("driver_safety_score", 0)) for d in drivers]
-            avg_safety_score = round(sum(safety_scores) / len(safety_scores), 2)
-            
-            # Calculate trends (simplified - compare with previous period)
-            prev_start_date = start_date - timedelta(days=days)
-            prev_total_violations = 0
-            
-            for collection_name in violation_types.keys():
-                try:
-                    collection = getattr(db_manager, collection_name)
-                    prev_count = await collection.count_documents({
-                        "created_at": {"$gte": prev_start_date, "$lt": start_date}
-                    })
-                    prev_total_violations += prev_count
-                except Exception as e:
-                    logger.warning(f"Error counting previous {collection_name}: {e}")
-            
-            # Calculate improvement percentage
-            if prev_total_violations > 0:
-                period_change = round(((prev_total_violations - total_violations) / prev_total_violations) * 100, 2)
-            else:
-                period_change = 0
-            
-            # Mock other trend calculations (would need historical data)
-            violation_rate_change = period_change * 0.6  # Approximate correlation
-            avg_safety_score_change = 2.1 if period_change > 0 else -1.5
-        else:
-            avg_safety_score = 0
-            period_change = 0
-            violation_rate_change = 0
-            avg_safety_score_change = 0
-        
-        # Calculate key performance indicators
-        violations_per_driver = round(total_violations / len(drivers), 2) if drivers else 0
-        violations_per_day = round(total_violations / days, 2)
-        
-        # Count critical violations (simplified criteria)
-        critical_violations = 0
-        for collection_name in violation_types.keys():
-            try:
-                collection = getattr(db_manager, collection_name)
-                # Count violations that might be considered critical based on common fields
-                critical_count = await collection.count_documents({
-                    "created_at": {"$gte": start_date},
-                    "$or": [
-                        {"severity": {"$gt": 0.8}},
-                        {"speed": {"$gt": 120}},
-                        {"duration_seconds": {"$gt": 300}}
-                    ]
-                })
-                critical_violations += critical_count
-            except Exception as e:
-                logger.warning(f"Error counting critical violations in {collection_name}: {e}")
-        
-        # Driver improvement and completion metrics
-        improving_drivers = len([d for d in drivers if d.get("trend", "neutral") == "improving"])
-        driver_improvement_rate = round(improving_drivers / len(drivers), 2) if drivers else 0
-        
-        total_trips = sum(d.get("total_trips", 0) for d in drivers)
-        completed_trips = sum(d.get("completed_trips", 0) for d in drivers)
-        avg_completion_rate = round(completed_trips / total_trips, 2) if total_trips > 0 else 0
-        
-        metrics = {
-            "violation_counts": violation_counts,
-            "total_violations": total_violations,
-            "active_drivers": len(drivers),
-            "safety_trends": {
-                "period_change": period_change,
-                "violation_rate_change": violation_rate_change,
-                "avg_safety_score_change": avg_safety_score_change
-            },
-            "key_metrics": {
-                "violations_per_driver": violations_per_driver,
-                "violations_per_day": violations_per_day,
-                "critical_violations": critical_violations,
-                "avg_safety_score": avg_safety_score,
-                "driver_improvement_rate": driver_improvement_rate,
-                "avg_driver_completion_rate": avg_completion_rate
-            }
-        }
-        
-        logger.info(f"[AnalyticsAPI] Performance metrics calculated: {total_violations} violations, {len(drivers)} drivers")
-        
-        return StandardResponse(
-            status=ResponseStatus.SUCCESS,
-            message="Performance metrics retrieved successfully",
-            data=metrics
-        )
+        report = await driver_behavior_service.get_report("performance-metrics", period)
+        return StandardResponse(status=ResponseStatus.SUCCESS, message=report["message"], data=report["data"])
         
     except Exception as e:
         logger.error(f"[AnalyticsAPI] Failed to get performance metrics: {e}")
@@ -718,189 +375,8 @@ async def get_violation_comparison(
     logger.info(f"[AnalyticsAPI] Getting violation comparison for period {period}")
     
     try:
-        # Parse period parameter
-        days = {"7d": 7, "30d": 30, "90d": 90}.get(period, 30)
-        start_date = datetime.utcnow() - timedelta(days=days)
-        
-        comparison_data = {}
-        total_violations = 0
-        
-        # Process speeding violations
-        try:
-            cursor = db_manager.speed_violations.find({
-                "$or": [
-                    {"created_at": {"$gte": start_date}},
-                    {"time": {"$gte": start_date}}
-                ]
-            })
-            speed_violations = await cursor.to_list(length=None)
-            
-            if speed_violations:
-                severities = [doc.get("speed", 0) - doc.get("speed_limit", 0) for doc in speed_violations]
-                severities = [s for s in severities if s > 0]  # Only positive values
-                
-                comparison_data["speeding"] = {
-                    "count": len(speed_violations),
-                    "avg_severity": round(sum(severities) / len(severities), 2) if severities else 0,
-                    "max_severity": max(severities) if severities else 0,
-                    "severity_ranges": {
-                        "minor": len([s for s in severities if 0 < s <= 10]),
-                        "moderate": len([s for s in severities if 10 < s <= 20]),
-                        "severe": len([s for s in severities if s > 20])
-                    }
-                }
-            else:
-                comparison_data["speeding"] = {
-                    "count": 0, "avg_severity": 0, "max_severity": 0,
-                    "severity_ranges": {"minor": 0, "moderate": 0, "severe": 0}
-                }
-            total_violations += comparison_data["speeding"]["count"]
-        except Exception as e:
-            logger.warning(f"Error processing speed violations: {e}")
-            comparison_data["speeding"] = {
-                "count": 0, "avg_severity": 0, "max_severity": 0,
-                "severity_ranges": {"minor": 0, "moderate": 0, "severe": 0}
-            }
-        
-        # Process braking violations
-        try:
-            cursor = db_manager.excessive_braking_violations.find({
-                "$or": [
-                    {"created_at": {"$gte": start_date}},
-                    {"time": {"$gte": start_date}}
-                ]
-            })
-            braking_violations = await cursor.to_list(length=None)
-            
-            if braking_violations:
-                severities = [doc.get("deceleration", 0) - doc.get("threshold", 0) for doc in braking_violations]
-                severities = [s for s in severities if s > 0]
-                
-                comparison_data["braking"] = {
-                    "count": len(braking_violations),
-                    "avg_severity": round(sum(severities) / len(severities), 2) if severities else 0,
-                    "max_severity": round(max(severities), 2) if severities else 0,
-                    "severity_ranges": {
-                        "minor": len([s for s in severities if 0 < s <= 2]),
-                        "moderate": len([s for s in severities if 2 < s <= 4]),
-                        "severe": len([s for s in severities if s > 4])
-                    }
-                }
-            else:
-                comparison_data["braking"] = {
-                    "count": 0, "avg_severity": 0, "max_severity": 0,
-                    "severity_ranges": {"minor": 0, "moderate": 0, "severe": 0}
-                }
-            total_violations += comparison_data["braking"]["count"]
-        except Exception as e:
-            logger.warning(f"Error processing braking violations: {e}")
-            comparison_data["braking"] = {
-                "count": 0, "avg_severity": 0, "max_severity": 0,
-                "severity_ranges": {"minor": 0, "moderate": 0, "severe": 0}
-            }
-        
-        # Process acceleration violations
-        try:
-            cursor = db_manager.excessive_acceleration_violations.find({
-                "$or": [
-                    {"created_at": {"$gte": start_date}},
-                    {"time": {"$gte": start_date}}
-                ]
-            })
-            acceleration_violations = await cursor.to_list(length=None)
-            
-            if acceleration_violations:
-                severities = [doc.get("acceleration", 0) - doc.get("threshold", 0) for doc in acceleration_violations]
-                severities = [s for s in severities if s > 0]
-                
-                comparison_data["acceleration"] = {
-                    "count": len(acceleration_violations),
-                    "avg_severity": round(sum(severities) / len(severities), 2) if severities else 0,
-                    "max_severity": round(max(severities), 2) if severities else 0,
-                    "severity_ranges": {
-                        "minor": len([s for s in severities if 0 < s <= 1.5]),
-                        "moderate": len([s for s in severities if 1.5 < s <= 3]),
-                        "severe": len([s for s in severities if s > 3])
-                    }
-                }
-            else:
-                comparison_data["acceleration"] = {
-                    "count": 0, "avg_severity": 0, "max_severity": 0,
-                    "severity_ranges": {"minor": 0, "moderate": 0, "severe": 0}
-                }
-            total_violations += comparison_data["acceleration"]["count"]
-        except Exception as e:
-            logger.warning(f"Error processing acceleration violations: {e}")
-            comparison_data["acceleration"] = {
-                "count": 0, "avg_severity": 0, "max_severity": 0,
-                "severity_ranges": {"minor": 0, "moderate": 0, "severe": 0}
-            }
-        
-        # Process phone usage violations
-        try:
-            cursor = db_manager.phone_usage_violations.find({
-                "$or": [
-                    {"created_at": {"$gte": start_date}},
-                    {"time": {"$gte": start_date}}
-                ]
-            })
-            phone_violations = await cursor.to_list(length=None)
-            
-            if phone_violations:
-                severities = [doc.get("duration_seconds", 0) for doc in phone_violations]
-                severities = [s for s in severities if s > 0]
-                
-                comparison_data["phone_usage"] = {
-                    "count": len(phone_violations),
-                    "avg_severity": round(sum(severities) / len(severities), 2) if severities else 0,
-                    "max_severity": max(severities) if severities else 0,
-                    "severity_ranges": {
-                        "minor": len([s for s in severities if 0 < s <= 30]),
-                        "moderate": len([s for s in severities if 30 < s <= 120]),
-                        "severe": len([s for s in severities if s > 120])
-                    }
-                }
-            else:
-                comparison_data["phone_usage"] = {
-                    "count": 0, "avg_severity": 0, "max_severity": 0,
-                    "severity_ranges": {"minor": 0, "moderate": 0, "severe": 0}
-                }
-            total_violations += comparison_data["phone_usage"]["count"]
-        except Exception as e:
-            logger.warning(f"Error processing phone usage violations: {e}")
-            comparison_data["phone_usage"] = {
-                "count": 0, "avg_severity": 0, "max_severity": 0,
-                "severity_ranges": {"minor": 0, "moderate": 0, "severe": 0}
-            }
-        
-        # Calculate percentages
-        for violation_type, data in comparison_data.items():
-            if total_violations > 0:
-                data["percentage"] = round((data["count"] / total_violations) * 100, 2)
-            else:
-                data["percentage"] = 0
-        
-        # Find most common violation type
-        most_common = max(comparison_data.items(), key=lambda x: x[1]["count"]) if total_violations > 0 else ("none", {"count": 0})
-        
-        summary = {
-            "total_violations": total_violations,
-            "most_common_type": most_common[0],
-            "most_common_count": most_common[1]["count"],
-            "period_days": days,
-            "violations_per_day": round(total_violations / days, 2) if days > 0 else 0
-        }
-        
-        logger.info(f"[AnalyticsAPI] Violation comparison calculated: {total_violations} total violations")
-        
-        return StandardResponse(
-            status=ResponseStatus.SUCCESS,
-            message="Violation comparison retrieved successfully",
-            data={
-                "comparison": comparison_data,
-                "summary": summary
-            }
-        )
+        report = await driver_behavior_service.get_report("violation-comparison", period)
+        return StandardResponse(status=ResponseStatus.SUCCESS, message=report["message"], data=report["data"])
         
     except Exception as e:
         logger.error(f"[AnalyticsAPI] Failed to get violation comparison: {e}")
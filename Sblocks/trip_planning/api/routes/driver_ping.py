@@ -9,8 +9,8 @@ from datetime import datetime
 from services.driver_ping_service import driver_ping_service
 from services.trip_service import trip_service
 from api.dependencies import get_current_user, require_permission, get_request_id, RequestTimer
-from schemas.requests import DriverPingRequest
-from schemas.responses import DriverPingResponse, StandardResponse, ResponseStatus
+from schemas.requests import DriverPingRequest, DriverPingBatchRequest
+from schemas.responses import DriverPingResponse, DriverPingBatchResponse, StandardResponse, ResponseStatus
 from schemas.entities import TripStatus
 
 logger = logging.getLogger(__name__)
@@ -35,8 +35,8 @@ async def receive_driver_ping(
     logger.info(f"[DriverPingAPI] Processing ping for trip {ping_data.trip_id}")
     
     try:
-        # Validate trip exists and is active
-        trip = await trip_service.get_trip_by_id(ping_data.trip_id)
+        # Validate trip exists and is active (status and driver are cached between pings)
+        trip = await driver_ping_service.get_trip(ping_data.trip_id)
         if not trip:
             raise HTTPException(
                 status_code=404,
@@ -44,12 +44,12 @@ async def receive_driver_ping(
             )
         
         # Check if trip is in a state where pings should be monitored
-        if trip.status not in [TripStatus.IN_PROGRESS]:
+        if trip.get("status") not in [TripStatus.IN_PROGRESS]:
             return StandardResponse(
                 status=ResponseStatus.WARNING,
                 data=DriverPingResponse(
                     status="trip_not_active",
-                    message=f"Trip is not in progress (status: {trip.status}). Ping ignored.",
+                    message=f"Trip is not in progress (status: {trip.get('status')}). Ping ignored.",
                     ping_received_at=ping_data.timestamp,
                     next_ping_expected_at=ping_data.timestamp,
                     session_active=False,
@@ -59,8 +59,8 @@ async def receive_driver_ping(
             )
         
         # Validate driver assignment matches current user (optional security check)
-        if trip.driver_assignment and trip.driver_assignment != current_user.get("user_id"):
-            logger.warning(f"[DriverPingAPI] Driver mismatch: trip assigned to {trip.driver_assignment}, ping from {current_user.get('user_id')}")
+        if trip.get("driver_assignment") and trip["driver_assignment"] != current_user.get("user_id"):
+            logger.warning(f"[DriverPingAPI] Driver mismatch: trip assigned to {trip['driver_assignment']}, ping from {current_user.get('user_id')}")
         
         # Process the ping
         result = await driver_ping_service.process_ping(
@@ -104,6 +104,49 @@ async def receive_driver_ping(
         )
 
 
+@router.post("/driver/ping/batch", response_model=StandardResponse)
+async def receive_driver_ping_batch(
+    request: Request,
+    batch: DriverPingBatchRequest,
+    current_user = Depends(require_permission("trips:ping"))
+):
+    """
+    Receive several driver phone pings in one request
+    
+    Pings are processed in order, each as if sent to /driver/ping, and one
+    result is returned per ping. A phone that buffered pings while offline,
+    or a gateway relaying pings for many trips, can send them together.
+    """
+    request_id = get_request_id(request)
+    timer = RequestTimer()
+    
+    logger.info(f"[DriverPingAPI] Processing batch of {len(batch.pings)} pings")
+    
+    try:
+        results = await driver_ping_service.process_pings([
+            (ping.trip_id, ping.location, ping.timestamp) for ping in batch.pings
+        ])
+        statuses = [result["status"] for result in results]
+        
+        return StandardResponse(
+            status=ResponseStatus.SUCCESS if "error" not in statuses else ResponseStatus.WARNING,
+            data=DriverPingBatchResponse(
+                accepted=statuses.count("success"),
+                inactive=statuses.count("inactive"),
+                failed=statuses.count("error"),
+                results=results
+            ),
+            message=f"Processed {len(results)} pings"
+        )
+        
+    except Exception as e:
+        logger.error(f"[DriverPingAPI] Failed to process ping batch: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to process driver ping batch: {str(e)}"
+        )
+
+
 @router.get("/driver/ping/violations/{trip_id}", response_model=StandardResponse)
 async def get_trip_violations(
     request: Request,
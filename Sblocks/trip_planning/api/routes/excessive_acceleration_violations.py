@@ -8,6 +8,7 @@ from bson import ObjectId
 
 from fastapi import APIRouter, HTTPException, status
 from repositories.database import db_manager
+from services.driver_history_service import driver_history_service
 from schemas.entities import ExcessiveAccelerationViolation
 from schemas.requests import CreateExcessiveAccelerationViolationRequest
 from schemas.responses import StandardResponse
@@ -64,6 +65,7 @@ async def create_excessive_acceleration_violation(
         # Insert into database
         result = await db_manager.excessive_acceleration_violations.insert_one(violation_data)
         violation_data["_id"] = str(result.inserted_id)
+        await driver_history_service.record_violation(violation_data["driver_id"], "acceleration")
         
         # Create response object
         violation = ExcessiveAccelerationViolation(**violation_data)
@@ -8,6 +8,7 @@ from bson import ObjectId
 
 from fastapi import APIRouter, HTTPException, status
 from repositories.database import db_manager
+from services.driver_history_service import driver_history_service
 from schemas.entities import ExcessiveBrakingViolation
 from schemas.requests import CreateExcessiveBrakingViolationRequest
 from schemas.responses import StandardResponse
@@ -64,6 +65,7 @@ async def create_excessive_braking_violation(
         # Insert into database
         result = await db_manager.excessive_braking_violations.insert_one(violation_data)
         violation_data["_id"] = str(result.inserted_id)
+        await driver_history_service.record_violation(violation_data["driver_id"], "braking")
         
         # Create response object
         violation = ExcessiveBrakingViolation(**violation_data)
@@ -8,6 +8,7 @@ from bson import ObjectId
 
 from fastapi import APIRouter, HTTPException, status
 from repositories.database import db_manager
+from services.driver_history_service import driver_history_service
 from schemas.entities import SpeedViolation
 from schemas.requests import CreateSpeedViolationRequest
 from schemas.responses import StandardResponse
@@ -64,6 +65,7 @@ async def create_speed_violation(
         # Insert into database
         result = await db_manager.speed_violations.insert_one(violation_data)
         violation_data["_id"] = str(result.inserted_id)
+        await driver_history_service.record_violation(violation_data["driver_id"], "speeding")
         
         # Create response object
         violation = SpeedViolation(**violation_data)
@@ -0,0 +1,61 @@
+"""
+API routes for batch telematics violation ingest
+"""
+import logging
+
+from fastapi import APIRouter, HTTPException, status
+
+from services.violation_ingest_service import violation_ingest_service
+from schemas.requests import ViolationBatchRequest
+from schemas.responses import StandardResponse, ResponseStatus, ViolationBatchResponse
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/violations",
+    tags=["Violations"]
+)
+
+
+@router.post("/batch", response_model=StandardResponse)
+async def ingest_violation_batch(
+    batch: ViolationBatchRequest
+) -> StandardResponse:
+    """
+    Record speeding, braking and acceleration violations in one request
+
+    Each event names its ``type`` and carries the fields of that type's
+    create endpoint. Invalid events are rejected one by one without failing
+    the rest, and events already recorded for the same driver, trip and
+    time are counted as duplicates. With ``wait`` false the events are
+    queued and written on the next flush.
+    """
+    logger.info(f"[ViolationAPI] Ingesting batch of {len(batch.violations)} violations")
+
+    try:
+        if batch.wait:
+            result = await violation_ingest_service.ingest(batch.violations)
+        else:
+            result = await violation_ingest_service.submit(batch.violations)
+
+        if result.get("buffer_full"):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Violation ingest buffer is full, retry later"
+            )
+
+        response = ViolationBatchResponse(**result)
+        return StandardResponse(
+            status=ResponseStatus.SUCCESS if not (response.rejected or response.failed) else ResponseStatus.WARNING,
+            data=response,
+            message=f"Processed {response.received} violations"
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"[ViolationAPI] Failed to ingest violation batch: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to ingest violation batch"
+        )
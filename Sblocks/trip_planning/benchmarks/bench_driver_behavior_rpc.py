@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Benchmark answering driver behaviour analytics requests from RabbitMQ
+
+Serves the real FastAPI app with uvicorn on a local port (startup events
+off, so no database or broker is needed) and answers the violation
+queries from canned results, each delayed by ``--db-latency-ms``. Then
+sends ``--requests`` requests for the four driver behaviour reports,
+``--concurrency`` at a time, three ways:
+
+- http_loopback: the previous consumer handler, a new ``httpx.AsyncClient``
+  and a GET against the service's own API for every request
+- in_process: ``ServiceRequestConsumer._handle_driver_behavior_analytics_requests``
+  calling ``DriverBehaviorService`` with reports expiring at once; concurrent
+  requests for the same report still share one build
+- in_process_cached: the same with the default report cache
+
+The rate limiter is taken off the app so the loopback can be timed; how
+many of its requests the limiter would have refused is reported as well.
+Prints latency percentiles and throughput per way as JSON.
+
+    python -m benchmarks.bench_driver_behavior_rpc --requests 2000 --concurrency 20
+"""
+import argparse
+import asyncio
+import json
+import logging
+import socket
+import statistics
+import time
+from datetime import timedelta
+
+import httpx
+import uvicorn
+
+from main import app
+from middleware import RateLimitMiddleware
+from services.driver_behavior_service import DRIVER_BEHAVIOR_CACHE_TTL_SECONDS, driver_behavior_service
+from services.request_consumer import ServiceRequestConsumer
+
+REPORTS = ["violation-trends", "risk-distribution", "performance-metrics", "violation-comparison"]
+LABELS = ["speeding", "braking", "acceleration", "phone_usage"]
+
+
+class CannedViolations:
+    """``ViolationAnalyticsService`` answers of a realistic size after one round trip each"""
+
+    def __init__(self, latency_s: float, drivers: int = 500):
+        self.latency_s = latency_s
+        self.drivers = drivers
+
+    async def _round_trip(self):
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+
+    async def get_daily_violation_counts(self, start_date, driver_id=None):
+        await self._round_trip()
+        days = [(start_date + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(91)]
+        return {label: {day: (i * 7 + len(label)) % 40 for i, day in enumerate(days)} for label in LABELS}
+
+    async def get_driver_statistics(self):
+        await self._round_trip()
+        performer = lambda i: {"driver_id": f"{i:024x}", "driver_name": f"Driver {i}", "safety_score": 90 - i,
+                               "total_violations": i, "total_trips": 120}
+        return {
+            "drivers": self.drivers, "total_trips_or_one": 60000, "total_trips": 60000, "completed_trips": 55000,
+            "total_violations": 9000, "recent_violations": 400, "historical_violations": 600,
+            "avg_safety_score": 74.2, "improving_drivers": 120,
+            "risk_distribution": {"low_risk": 200, "medium_risk": 200, "high_risk": 100},
+            "safety_score_ranges": {"90-100": 50, "80-89": 150, "70-79": 150, "60-69": 100, "below_60": 50},
+            "top_performers": [performer(i) for i in range(5)],
+            "worst_performers": [performer(i) for i in range(100, 105)],
+        }
+
+    async def get_period_violation_counts(self, start_date, prev_start_date):
+        await self._round_trip()
+        return {label: {"current": 300 + i, "previous": 350 + i, "critical": 20 + i} for i, label in enumerate(LABELS)}
+
+    async def get_violation_comparison(self, start_date):
+        await self._round_trip()
+        return {label: {"count": 300 + i, "avg_severity": 12.5, "max_severity": 48.0,
+                        "severity_ranges": {"minor": 100, "moderate": 100, "severe": 100 + i}}
+                for i, label in enumerate(LABELS)}
+
+
+async def legacy_handler(base_url: str, user_context: dict) -> dict:
+    """The removed consumer handler: a new client and a GET on our own API for every request"""
+    endpoint = user_context["endpoint"]
+    analytics_endpoint = '/'.join(endpoint.split('/')[1:])
+    period = user_context["data"].get("period")
+    full_endpoint = f"/driver-behavior/{analytics_endpoint}" + (f"?period={period}" if period else "")
+    async with httpx.AsyncClient(base_url=base_url, timeout=20.0) as client:
+        response = await client.get(full_endpoint, headers={})
+    if response.status_code != 200:
+        raise RuntimeError(f"HTTP {response.status_code}: {response.text}")
+    return response.json()
+
+
+async def measure(handle, args):
+    """Per-request latency and overall throughput for ``args.requests`` requests"""
+    contexts = [{"endpoint": f"driver-behavior/{REPORTS[i % len(REPORTS)]}", "data": {"period": "30d"}}
+                for i in range(args.requests)]
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(user_context):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await handle(user_context)
+                if response.get("status") != "success":
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(user_context) for user_context in contexts))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1], 2),
+        "requests_per_s": round(args.requests / elapsed, 1),
+        "errors": errors,
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run(args):
+    rate_limit = next(m for m in app.user_middleware if m.cls is RateLimitMiddleware)
+    app.user_middleware = [m for m in app.user_middleware if m is not rate_limit]
+    app.middleware_stack = None
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, lifespan="off", log_level="error",
+                                           access_log=False))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    driver_behavior_service.violations = CannedViolations(args.db_latency_ms / 1000.0)
+    consumer = ServiceRequestConsumer()
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        results = {}
+        driver_behavior_service.ttl_s = 0
+        results["http_loopback"] = await measure(lambda uc: legacy_handler(base_url, uc), args)
+        results["in_process"] = await measure(
+            lambda uc: consumer._handle_driver_behavior_analytics_requests("GET", uc), args)
+        driver_behavior_service.ttl_s = DRIVER_BEHAVIOR_CACHE_TTL_SECONDS
+        results["in_process_cached"] = await measure(
+            lambda uc: consumer._handle_driver_behavior_analytics_requests("GET", uc), args)
+    finally:
+        server.should_exit = True
+        await serving
+
+    limit = rate_limit.kwargs.get("requests_per_minute", 60)
+    loopback_minutes = args.requests / results["http_loopback"]["requests_per_s"] / 60
+    return {
+        "requests": args.requests, "concurrency": args.concurrency, "db_latency_ms": args.db_latency_ms,
+        **results,
+        "loopback_refused_by_rate_limit": max(0, args.requests - int(limit * max(1.0, loopback_minutes))),
+        "p50_speedup": round(results["http_loopback"]["p50_ms"] / max(0.01, results["in_process"]["p50_ms"]), 1),
+        "throughput_speedup": round(
+            results["in_process"]["requests_per_s"] / max(0.1, results["http_loopback"]["requests_per_s"]), 1),
+        "metrics": driver_behavior_service.get_metrics(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--db-latency-ms", type=float, default=2.0)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    print(json.dumps(asyncio.run(run(args)), indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
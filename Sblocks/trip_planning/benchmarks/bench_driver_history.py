@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Benchmark keeping driver histories current for a large fleet
+
+Sets up ``--drivers`` drivers with finished trips and violations in
+in-memory stand-ins for the trip history, violation, driver and driver
+history collections. Counts are pre-indexed by driver so the stand-ins
+cost little CPU next to the code under test, and every database call is
+delayed by ``--db-latency-ms``. Then compares one minute of upkeep:
+
+- the previous way: every driver recalculated one after another, with
+  three trip counts, four violation counts, a name lookup and a replace
+  each, once a minute
+- incremental: ``--trips-per-minute`` finished trips and
+  ``--violations-per-minute`` violations applied as deltas, plus the
+  batched reconciliation once every ``--reconcile-minutes``, counted pro
+  rata
+
+Prints database operations and CPU seconds per minute as JSON.
+
+    python -m benchmarks.bench_driver_history --drivers 5000 --db-latency-ms 0.5
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import Counter
+
+from bson import ObjectId
+
+from schemas.entities import DriverHistory
+from services.driver_history_service import DriverHistoryService, VIOLATION_COUNTERS
+
+logger = logging.getLogger(__name__)
+
+
+class FakeCursor:
+    def __init__(self, docs, latency_s=0.0):
+        self.docs = iter(docs)
+        self.latency_s = latency_s
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.latency_s:
+            latency, self.latency_s = self.latency_s, 0.0  # One round trip per batch
+            await asyncio.sleep(latency)
+        try:
+            return next(self.docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    """Just enough of a Motor collection, counting every call and adding a round-trip delay"""
+
+    def __init__(self, name, ops, latency_s):
+        self.name = name
+        self.ops = ops
+        self.latency_s = latency_s
+        self.by_driver = {}  # driver -> Counter of statuses, or driver -> document
+
+    async def _round_trip(self, op):
+        self.ops[f"{self.name}.{op}"] += 1
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+
+    @staticmethod
+    def _drivers(query):
+        if "$or" in query:
+            query = query["$or"][0]
+        value = next(v for k, v in query.items() if k in ("driver_id", "driver_assignment", "employee_id"))
+        return value["$in"] if isinstance(value, dict) else [value]
+
+    # -------------------- Trip history and violations --------------------
+    async def count_documents(self, query):
+        await self._round_trip("count_documents")
+        (driver,) = self._drivers(query)
+        statuses = self.by_driver.get(driver, Counter())
+        return statuses[query["status"]] if "status" in query else sum(statuses.values())
+
+    async def distinct(self, key, query=None):
+        await self._round_trip("distinct")
+        return list(self.by_driver) if key == "driver_assignment" else []
+
+    def aggregate(self, pipeline):
+        self.ops[f"{self.name}.aggregate"] += 1
+        by_status = isinstance(pipeline[1]["$group"]["_id"], dict)
+        groups = []
+        for driver in self._drivers(pipeline[0]["$match"]):
+            statuses = self.by_driver.get(driver)
+            if not statuses:
+                continue
+            if by_status:
+                groups += [{"_id": {"driver": driver, "status": s}, "count": n} for s, n in statuses.items()]
+            else:
+                groups.append({"_id": driver, "count": sum(statuses.values())})
+        return FakeCursor(groups, self.latency_s)
+
+    # -------------------- Drivers and driver history --------------------
+    async def find_one(self, query, projection=None):
+        await self._round_trip("find_one")
+        (driver,) = self._drivers(query)
+        doc = self.by_driver.get(driver)
+        return dict(doc) if doc else None
+
+    def find(self, query, projection=None):
+        self.ops[f"{self.name}.find"] += 1
+        drivers = self._drivers(query) if query else list(self.by_driver)
+        return FakeCursor([dict(self.by_driver[d]) for d in drivers if d in self.by_driver], self.latency_s)
+
+    def _update(self, query, update, upsert):
+        doc = self.by_driver.get(query["driver_id"])
+        if doc is None:
+            if not upsert:
+                return None
+            doc = self.by_driver[query["driver_id"]] = {"_id": ObjectId(), **query, **update.get("$setOnInsert", {})}
+        elif any(doc.get(k) != v for k, v in query.items()):
+            return None
+        doc.update(update.get("$set", {}))
+        for key, step in update.get("$inc", {}).items():
+            doc[key] = doc.get(key, 0) + step
+        return doc
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        await self._round_trip("find_one_and_update")
+        return dict(self._update(query, update, upsert))
+
+    async def update_one(self, query, update, upsert=False):
+        await self._round_trip("update_one")
+        self._update(query, update, upsert)
+
+    async def replace_one(self, query, doc, upsert=False):
+        await self._round_trip("replace_one")
+        self.by_driver[query["driver_id"]] = dict(doc)
+
+    async def bulk_write(self, operations, ordered=True):
+        await self._round_trip("bulk_write")
+        for operation in operations:
+            self._update(operation._filter, operation._doc, operation._upsert)
+
+
+class FakeDatabase:
+    """A fleet of drivers, each with trip history and a spread of violations"""
+
+    def __init__(self, drivers: int, latency_s: float, rng: random.Random):
+        self.ops = Counter()
+        for name in ("trips", "trip_history", "drivers", "driver_history",
+                     *(collection for collection, _ in VIOLATION_COUNTERS.values())):
+            setattr(self, name, FakeCollection(name, self.ops, latency_s))
+        self.driver_ids = [f"EMP{i:05d}" for i in range(drivers)]
+        for driver_id in self.driver_ids:
+            self.drivers.by_driver[driver_id] = {"employee_id": driver_id, "first_name": "Driver", "last_name": driver_id}
+            self.trip_history.by_driver[driver_id] = Counter(
+                completed=rng.randint(5, 200), cancelled=rng.randint(0, 10), missed=rng.randint(0, 5))
+            for collection, _ in VIOLATION_COUNTERS.values():
+                getattr(self, collection).by_driver[driver_id] = Counter(recorded=rng.randint(0, 40))
+
+
+async def legacy_recalculate(service: DriverHistoryService, db: FakeDatabase, driver_id: str):
+    """The removed per-driver recalculation: nine round trips for each driver"""
+    driver_info = await service._get_driver_info(driver_id)
+    driver_query = {"$or": [{"driver_assignment": driver_id}, {"driver_id": driver_id}]}
+    total_assigned = await db.trip_history.count_documents(driver_query)
+    completed = await db.trip_history.count_documents({**driver_query, "status": "completed"})
+    cancelled = await db.trip_history.count_documents({**driver_query, "status": "cancelled"})
+    history = DriverHistory(
+        driver_id=driver_id,
+        driver_name=driver_info.get("full_name", "Unknown Driver"),
+        employee_id=driver_info.get("employee_id"),
+        total_assigned_trips=total_assigned,
+        completed_trips=completed,
+        cancelled_trips=cancelled
+    )
+    for collection, field in VIOLATION_COUNTERS.values():
+        setattr(history, field, await getattr(db, collection).count_documents({"driver_id": driver_id}))
+    await service._rescore(history)
+    history_dict = history.model_dump(by_alias=True, exclude_none=True)
+    logger.info(f"Saving driver history for driver_id: {driver_id}. Data: {history_dict}")
+    await db.driver_history.replace_one({"driver_id": driver_id}, history_dict, upsert=True)
+
+
+async def measure(work):
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    await work()
+    return time.process_time() - cpu, time.perf_counter() - wall
+
+
+async def run_legacy(args, rng):
+    db = FakeDatabase(args.drivers, args.db_latency_ms / 1000.0, rng)
+    service = DriverHistoryService(db, db)
+
+    async def sweep():
+        for driver_id in db.driver_ids:
+            await legacy_recalculate(service, db, driver_id)
+
+    cpu, wall = await measure(sweep)
+    return {
+        "db_ops_per_minute": sum(db.ops.values()),
+        "cpu_s_per_minute": round(cpu, 3),
+        "sweep_wall_s": round(wall, 2),
+    }
+
+
+async def run_incremental(args, rng):
+    db = FakeDatabase(args.drivers, args.db_latency_ms / 1000.0, rng)
+    service = DriverHistoryService(db, db)
+    await service.recalculate_all_driver_histories()  # Every history exists, as after the first run
+    db.ops.clear()
+
+    trips = [(rng.choice(db.driver_ids), rng.choice(["completed", "completed", "completed", "cancelled"]))
+             for _ in range(args.trips_per_minute)]
+    violations = [(rng.choice(db.driver_ids), rng.choice(list(VIOLATION_COUNTERS)))
+                  for _ in range(args.violations_per_minute)]
+
+    async def minute_of_events():
+        for i, (driver_id, status) in enumerate(trips):
+            await service.update_driver_history_on_trip_completion(driver_id, f"trip-{i}", status)
+        for driver_id, violation_type in violations:
+            await service.record_violation(driver_id, violation_type)
+
+    delta_cpu, delta_wall = await measure(minute_of_events)
+    delta_ops = sum(db.ops.values())
+    db.ops.clear()
+
+    reconcile_cpu, reconcile_wall = await measure(service.recalculate_all_driver_histories)
+    reconcile_ops = sum(db.ops.values())
+    share = 1.0 / args.reconcile_minutes
+    return {
+        "delta_db_ops_per_minute": delta_ops,
+        "delta_cpu_s_per_minute": round(delta_cpu, 3),
+        "reconcile_db_ops": reconcile_ops,
+        "reconcile_cpu_s": round(reconcile_cpu, 3),
+        "reconcile_wall_s": round(reconcile_wall, 2),
+        "db_ops_per_minute": round(delta_ops + reconcile_ops * share, 1),
+        "cpu_s_per_minute": round(delta_cpu + reconcile_cpu * share, 3),
+        "events_wall_s": round(delta_wall, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--drivers", type=int, default=5000)
+    parser.add_argument("--trips-per-minute", type=int, default=100)
+    parser.add_argument("--violations-per-minute", type=int, default=500)
+    parser.add_argument("--reconcile-minutes", type=int, default=60)
+    parser.add_argument("--db-latency-ms", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    before = asyncio.run(run_legacy(args, random.Random(args.seed)))
+    after = asyncio.run(run_incremental(args, random.Random(args.seed)))
+    print(json.dumps({
+        "drivers": args.drivers, "trips_per_minute": args.trips_per_minute,
+        "violations_per_minute": args.violations_per_minute, "reconcile_minutes": args.reconcile_minutes,
+        "db_latency_ms": args.db_latency_ms,
+        "full_sweep_every_minute": before,
+        "incremental": after,
+        "db_ops_reduction": round(before["db_ops_per_minute"] / max(1, after["db_ops_per_minute"]), 1),
+        "cpu_reduction": round(before["cpu_s_per_minute"] / max(1e-9, after["cpu_s_per_minute"]), 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
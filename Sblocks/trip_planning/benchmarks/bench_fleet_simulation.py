@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark one simulation tick for a fleet: per-vehicle loop against the vectorised engine
+
+Runs offline on synthetic routes. The per-vehicle case reproduces the
+arithmetic ``VehicleSimulator.update_position`` does each tick (speed update,
+interpolation, segment walk for heading) without the database round trips,
+so the gap shown is a lower bound. Prints median tick times as JSON.
+
+    python -m benchmarks.bench_fleet_simulation --vehicles 100 500 2000 --points 400
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from types import SimpleNamespace
+
+from benchmarks.bench_geo import legacy_haversine, make_route
+from services.fleet_simulation_engine import FleetSimulationEngine
+from utils import geo
+
+TICK_SECONDS = 2.0
+
+
+def make_simulator(i: int, points: int):
+    route = make_route(points, seed=i)
+    return SimpleNamespace(
+        trip_id=f"trip-{i}",
+        vehicle_id=f"veh-{i}",
+        route=SimpleNamespace(coordinates=route, distance=geo.path_length_km(route) * 1000),
+        speed_profile={},
+        current_position=0.0,
+        current_speed_kmh=60.0,
+        target_speed=60.0,
+        speed_ms=60.0 / 3.6,
+        speed_change_timer=0,
+        speed_change_interval=15,
+        speed_change_rate=0.5,
+        min_speed=40.0,
+        max_speed=140.0,
+        distance_traveled=0.0,
+        last_location=None,
+        is_running=True,
+        is_paused=False,
+    )
+
+
+def legacy_tick(simulators, rng: random.Random):
+    for sim in simulators:
+        sim.speed_change_timer += 1
+        if sim.speed_change_timer >= sim.speed_change_interval:
+            sim.target_speed = rng.uniform(50, 140)
+            sim.speed_change_timer = 0
+        diff = sim.target_speed - sim.current_speed_kmh
+        sim.current_speed_kmh += max(-sim.speed_change_rate, min(sim.speed_change_rate, diff))
+        sim.current_position = min(1.0, sim.current_position + sim.current_speed_kmh / 3.6 * TICK_SECONDS / sim.route.distance)
+
+        coords = sim.route.coordinates
+        index = sim.current_position * (len(coords) - 1)
+        start = min(int(index), len(coords) - 2)
+        ratio = index - start
+        sim.last_location = (
+            coords[start][0] + (coords[start + 1][0] - coords[start][0]) * ratio,
+            coords[start][1] + (coords[start + 1][1] - coords[start][1]) * ratio,
+        )
+
+        # _calculate_heading walks the segments from the start every tick
+        target = sim.current_position * sim.route.distance
+        total = 0.0
+        for j in range(len(coords) - 1):
+            total += legacy_haversine(*coords[j], *coords[j + 1]) * 1000
+            if total >= target:
+                break
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vehicles", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--points", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=15)
+    args = parser.parse_args()
+
+    results = {"points_per_route": args.points, "tick_seconds": TICK_SECONDS, "fleets": {}}
+    for count in args.vehicles:
+        legacy_fleet = [make_simulator(i, args.points) for i in range(count)]
+        engine_fleet = [make_simulator(i, args.points) for i in range(count)]
+        rng = random.Random(3)
+
+        engine = FleetSimulationEngine(seed=3)
+        start = time.perf_counter()
+        engine.sync(engine_fleet)
+        pack_ms = (time.perf_counter() - start) * 1000
+
+        def engine_tick():
+            engine.sync(engine_fleet)
+            engine.step(TICK_SECONDS)
+            engine.flush()
+
+        legacy_ms = timed(lambda: legacy_tick(legacy_fleet, rng), args.repeat)
+        engine_ms = timed(engine_tick, args.repeat)
+        results["fleets"][count] = {
+            "pack_ms": round(pack_ms, 3),
+            "per_vehicle_tick_ms": round(legacy_ms, 3),
+            "engine_tick_ms": round(engine_ms, 3),
+            "speedup": round(legacy_ms / max(engine_ms, 1e-6), 1),
+        }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the vectorised geo kernel against the per-point loops it replaced
+
+Runs offline on a synthetic route and prints a JSON summary of median timings.
+
+    python -m benchmarks.bench_geo --points 10000 --repeat 20
+"""
+import argparse
+import json
+import math
+import random
+import statistics
+import time
+
+from utils import geo
+
+
+def legacy_haversine(lat1, lon1, lat2, lon2):
+    lat1_rad, lon1_rad = math.radians(lat1), math.radians(lon1)
+    lat2_rad, lon2_rad = math.radians(lat2), math.radians(lon2)
+    dlat = lat2_rad - lat1_rad
+    dlon = lon2_rad - lon1_rad
+    a = math.sin(dlat / 2) ** 2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon / 2) ** 2
+    return 6371.0 * 2 * math.asin(math.sqrt(a))
+
+
+def legacy_closest_index(position, route):
+    best, best_index = float("inf"), 0
+    for i, coord in enumerate(route):
+        d = legacy_haversine(position[0], position[1], coord[0], coord[1])
+        if d < best:
+            best, best_index = d, i
+    return best_index
+
+
+def legacy_path_length(route):
+    return sum(
+        legacy_haversine(route[i][0], route[i][1], route[i + 1][0], route[i + 1][1])
+        for i in range(len(route) - 1)
+    )
+
+
+def legacy_point_in_polygon(lat, lon, ring):
+    x, y = lon, lat
+    n = len(ring)
+    inside = False
+    p1x, p1y = ring[0]
+    for i in range(1, n + 1):
+        p2x, p2y = ring[i % n]
+        if min(p1y, p2y) < y <= max(p1y, p2y) and x <= max(p1x, p2x):
+            xinters = (y - p1y) * (p2x - p1x) / (p2y - p1y) + p1x if p1y != p2y else p1x
+            if p1x == p2x or x <= xinters:
+                inside = not inside
+        p1x, p1y = p2x, p2y
+    return inside
+
+
+def make_route(points: int, seed: int = 7):
+    rng = random.Random(seed)
+    lat, lon = -25.7463, 28.1881
+    route = []
+    for _ in range(points):
+        lat += rng.uniform(-0.0004, 0.0006)
+        lon += rng.uniform(-0.0004, 0.0006)
+        route.append([lat, lon])
+    return route
+
+
+def make_ring(vertices: int):
+    return [
+        [28.19 + 0.2 * math.cos(2 * math.pi * i / vertices), -25.75 + 0.2 * math.sin(2 * math.pi * i / vertices)]
+        for i in range(vertices)
+    ]
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--points", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    route = make_route(args.points)
+    position = route[len(route) // 2]
+    ring = make_ring(64)
+    lats = [p[0] for p in route]
+    lons = [p[1] for p in route]
+    route_array = geo.as_latlon_array(route)
+
+    cases = {
+        "closest_vertex": (
+            lambda: legacy_closest_index(position, route),
+            lambda: geo.nearest_vertex_index(route, position[0], position[1]),
+        ),
+        # Same query on a pre-converted array, as cached route geometry would hold
+        "closest_vertex_array": (
+            lambda: legacy_closest_index(position, route),
+            lambda: geo.nearest_vertex_index(route_array, position[0], position[1]),
+        ),
+        "path_length": (
+            lambda: legacy_path_length(route),
+            lambda: geo.path_length_km(route),
+        ),
+        "points_in_polygon": (
+            lambda: [legacy_point_in_polygon(la, lo, ring) for la, lo in zip(lats, lons)],
+            lambda: geo.points_in_polygon(lats, lons, ring),
+        ),
+        "resample_200": (
+            None,
+            lambda: geo.resample_polyline(route, 200),
+        ),
+    }
+
+    assert legacy_closest_index(position, route) == geo.nearest_vertex_index(route, position[0], position[1])
+    assert abs(legacy_path_length(route) - geo.path_length_km(route)) < 1e-6
+
+    results = {"points": args.points, "repeat": args.repeat, "cases": {}}
+    for name, (legacy, vectorised) in cases.items():
+        entry = {"vectorised_ms": round(timed(vectorised, args.repeat), 3)}
+        if legacy is not None:
+            entry["legacy_ms"] = round(timed(legacy, args.repeat), 3)
+            entry["speedup"] = round(entry["legacy_ms"] / max(entry["vectorised_ms"], 1e-6), 1)
+        results["cases"][name] = entry
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
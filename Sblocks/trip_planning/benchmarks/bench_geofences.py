@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-tick geofence checks for simulated vehicles
+
+Scatters ``--fences`` circle and polygon geofences over the synthetic area
+and drives ``--vehicles`` along wandering routes. Each tick is checked the
+previous way, testing every vehicle position against every watched
+geofence, and through the cached ``GeofenceIndex`` with each trip's
+corridor worked out once up front. The database fetch the old path also
+made every tick is not counted. Prints tick times and how many fences each
+position was actually tested against as JSON.
+
+    python -m benchmarks.bench_geofences --fences 500 --vehicles 200 --ticks 50
+"""
+import argparse
+import json
+import logging
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from benchmarks.loadgen import SYNTHETIC_AREA
+from services.fleet_simulation_engine import geofences_containing
+from services.geofence_cache import GeofenceIndex
+
+
+def make_fences(count: int, rng: np.random.Generator):
+    (lat_min, lat_max), (lon_min, lon_max) = SYNTHETIC_AREA
+    fences = []
+    for i in range(count):
+        lat, lon = rng.uniform(lat_min, lat_max), rng.uniform(lon_min, lon_max)
+        if i % 2:
+            geometry = SimpleNamespace(type="Point", coordinates=[lon, lat],
+                                       properties=SimpleNamespace(radius=float(rng.uniform(50, 1000))))
+        else:
+            angles = np.sort(rng.uniform(0, 2 * np.pi, 12))
+            radii = rng.uniform(0.001, 0.01, 12)
+            ring = [[lon + r * np.cos(a), lat + r * np.sin(a)] for a, r in zip(angles, radii)]
+            geometry = SimpleNamespace(type="Polygon", coordinates=[ring], properties=None)
+        fences.append(SimpleNamespace(id=f"fence-{i}", type="restricted", geometry=geometry))
+    return fences
+
+
+def make_routes(count: int, points: int, rng: np.random.Generator):
+    (lat_min, lat_max), (lon_min, lon_max) = SYNTHETIC_AREA
+    routes = []
+    for _ in range(count):
+        start = [rng.uniform(lat_min, lat_max), rng.uniform(lon_min, lon_max)]
+        heading = rng.normal(0, 0.0002, 2)
+        routes.append(np.cumsum(rng.normal(0, 0.0002, size=(points, 2)) + heading, axis=0) + start)
+    return routes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fences", type=int, default=500)
+    parser.add_argument("--vehicles", type=int, default=200)
+    parser.add_argument("--ticks", type=int, default=50)
+    parser.add_argument("--points", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    rng = np.random.default_rng(args.seed)
+    fences = make_fences(args.fences, rng)
+    routes = make_routes(args.vehicles, args.points, rng)
+    ticks = [np.array([route[int(t * (args.points - 1) / max(1, args.ticks - 1))] for route in routes])
+             for t in range(args.ticks)]
+
+    start = time.perf_counter()
+    legacy = [geofences_containing(positions[:, 0], positions[:, 1], fences) for positions in ticks]
+    legacy_ms = (time.perf_counter() - start) * 1000 / args.ticks
+
+    start = time.perf_counter()
+    index = GeofenceIndex(fences)
+    build_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    corridors = [index.corridor(route) for route in routes]
+    corridor_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    indexed = [[index.containing(lat, lon, corridor) for (lat, lon), corridor in zip(positions, corridors)]
+               for positions in ticks]
+    indexed_ms = (time.perf_counter() - start) * 1000 / args.ticks
+    assert indexed == legacy
+
+    tested = [sum(1 for i in index._grid.get(index._cell(lat, lon), []) if i in corridor)
+              for positions in ticks for (lat, lon), corridor in zip(positions, corridors)]
+    print(json.dumps({
+        "fences": args.fences, "vehicles": args.vehicles, "ticks": args.ticks,
+        "legacy_tick_ms": round(legacy_ms, 2),
+        "indexed_tick_ms": round(indexed_ms, 2),
+        "speedup": round(legacy_ms / indexed_ms, 1),
+        "index_build_ms": round(build_ms, 2),
+        "corridors_ms": round(corridor_ms, 2),
+        "mean_corridor_fences": round(float(np.mean([len(c) for c in corridors])), 1),
+        "mean_fences_tested_per_position": round(float(np.mean(tested)), 2),
+        "positions_inside_a_fence": sum(1 for tick in indexed for ids in tick if ids),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
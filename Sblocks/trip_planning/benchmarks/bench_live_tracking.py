@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Benchmark live tracking queries on long routes
+
+Builds trips with ``--points``-vertex routes in an in-memory stand-in for
+the trips collection and polls ``TripService.get_live_tracking_data`` with
+GPS fixes scattered along them, first with every call recompiling the route
+and projecting onto every segment (the previous behaviour), then with the
+per-trip geometry cache and grid index. Prints calls per second, latency
+percentiles and the cost of a single snap as JSON.
+
+    python -m benchmarks.bench_live_tracking --points 5000 --trips 20 --calls 2000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from types import SimpleNamespace
+
+import numpy as np
+from bson import ObjectId
+
+from services.trip_service import TripService
+from utils import route_geometry
+from utils.route_geometry import RouteGeometry, RouteGeometryCache
+
+
+def make_route(points: int, rng: np.random.Generator):
+    """A wandering ~10 m-per-vertex route in Geoapify response shape, and its vertices"""
+    steps = rng.normal(0, 0.00006, size=(points, 2)) + [0.00005, 0.00004]
+    coords = np.cumsum(steps, axis=0) + [-25.80, 28.15]
+    geometry = RouteGeometry(coords)
+    route = {
+        "distance": geometry.length_m,
+        "time": geometry.length_m / 13.9,
+        "geometry": [[{"lat": float(lat), "lon": float(lon)} for lat, lon in coords]],
+        "legs": [{"steps": [
+            {"from_index": i, "to_index": min(i + 50, points - 1), "instruction": {"text": f"Step {i // 50}"}}
+            for i in range(0, points - 1, 50)
+        ]}],
+    }
+    return route, coords
+
+
+class FakeTrips:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def find_one(self, query, projection=None):
+        doc = self.docs.get(str(query["_id"]))
+        if doc and projection and projection.get("raw_route_response.results.geometry") == 0:
+            route = {k: v for k, v in doc["raw_route_response"]["results"][0].items() if k != "geometry"}
+            return {**doc, "raw_route_response": {"results": [route]}}
+        return doc
+
+
+class FakeLocations:
+    def __init__(self):
+        self.fixes = {}
+
+    async def find_one(self, query, sort=None):
+        return self.fixes.get(query["vehicle_id"])
+
+
+async def measure(service: TripService, locations: FakeLocations, calls):
+    latencies = []
+    for trip_id, vehicle_id, (lat, lon) in calls:
+        locations.fixes[vehicle_id] = {"latitude": lat, "longitude": lon, "speed": 50.0}
+        start = time.perf_counter()
+        data = await service.get_live_tracking_data(trip_id)
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert data["progress"]["completed_distance"] is not None
+    p50, p95 = np.percentile(latencies, [50, 95])
+    return {
+        "calls_per_second": round(len(latencies) / (sum(latencies) / 1000), 1),
+        "latency_ms": {"p50": round(float(p50), 3), "p95": round(float(p95), 3)},
+    }
+
+
+def snap_timings(coords, fixes):
+    geometry = RouteGeometry(coords)
+    segments = np.arange(len(coords) - 1)
+    start = time.perf_counter()
+    for lat, lon in fixes:
+        geometry._project(segments, lat, lon)
+    full = (time.perf_counter() - start) / len(fixes) * 1e6
+    start = time.perf_counter()
+    geometry._build_grid()
+    build = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for lat, lon in fixes:
+        geometry._nearest_segment(lat, lon)
+    grid = (time.perf_counter() - start) / len(fixes) * 1e6
+    return {"full_scan_us": round(full, 1), "grid_us": round(grid, 1), "grid_build_ms": round(build, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=5000)
+    parser.add_argument("--trips", type=int, default=20)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    rng = np.random.default_rng(args.seed)
+    docs, vertices = {}, {}
+    for i in range(args.trips):
+        trip_id = str(ObjectId())
+        route, coords = make_route(args.points, rng)
+        docs[trip_id] = {"_id": trip_id, "vehicle_id": f"vehicle-{i}", "status": "in_progress",
+                         "raw_route_response": {"results": [route]}}
+        vertices[trip_id] = coords
+
+    picker = random.Random(args.seed)
+    calls = []
+    for _ in range(args.calls):
+        trip_id = picker.choice(list(docs))
+        lat, lon = vertices[trip_id][picker.randrange(args.points)] + rng.normal(0, 0.00005, 2)
+        calls.append((trip_id, docs[trip_id]["vehicle_id"], (float(lat), float(lon))))
+
+    locations = FakeLocations()
+    results = {"points": args.points, "trips": args.trips, "calls": args.calls}
+
+    def service(cache_entries: int) -> TripService:
+        svc = TripService()
+        svc.db = SimpleNamespace(trips=FakeTrips(docs))
+        svc.db_gps = SimpleNamespace(db=SimpleNamespace(vehicle_locations=locations))
+        svc.route_geometries = RouteGeometryCache(max_entries=cache_entries)
+        return svc
+
+    grid_min_points = route_geometry.GRID_MIN_POINTS
+    route_geometry.GRID_MIN_POINTS = args.points + 1  # Full scan, as before the grid
+    results["recompiled_full_scan"] = asyncio.run(measure(service(0), locations, calls))
+    route_geometry.GRID_MIN_POINTS = grid_min_points
+    results["cached_grid"] = asyncio.run(measure(service(args.trips), locations, calls))
+    results["speedup"] = round(results["cached_grid"]["calls_per_second"] /
+                               results["recompiled_full_scan"]["calls_per_second"], 1)
+    first = calls[0][0]
+    results["snap"] = snap_timings(vertices[first], [c[2] for c in calls if c[0] == first])
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark the local routing provider on random origin/destination pairs
+
+Routes through RoutingService with only the local provider, first with
+bidirectional A* on the plain graph and then with the contraction
+hierarchy, and prints load/contraction times and route latency
+percentiles as JSON. Uses the bundled synthetic graph unless ``--graph``
+points at an ``.osm`` extract or ``.npz`` graph.
+
+    python -m benchmarks.bench_local_routing --routes 300
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import numpy as np
+
+from benchmarks.loadgen import SYNTHETIC_AREA
+from services.routing_providers import LocalGraphProvider
+from services.routing_service import RoutingService
+from utils.road_graph import RoadGraph, synthetic_road_graph
+
+
+def make_pairs(routes: int, seed: int):
+    rng = random.Random(seed)
+    (lat_min, lat_max), (lon_min, lon_max) = SYNTHETIC_AREA
+    return [
+        [(rng.uniform(lat_min, lat_max), rng.uniform(lon_min, lon_max)),
+         (rng.uniform(lat_min, lat_max), rng.uniform(lon_min, lon_max))]
+        for _ in range(routes)
+    ]
+
+
+async def measure(graph: RoadGraph, pairs):
+    service = RoutingService(providers=[LocalGraphProvider(graph=graph)])
+    latencies, distances = [], []
+    for waypoints in pairs:
+        start = time.perf_counter()
+        data = await service.calculate_route(waypoints)
+        latencies.append((time.perf_counter() - start) * 1000)
+        distances.append(data["results"][0]["distance"])
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "latency_ms": {"p50": round(float(p50), 2), "p95": round(float(p95), 2), "p99": round(float(p99), 2),
+                       "max": round(max(latencies), 2)},
+        "mean_route_km": round(float(np.mean(distances)) / 1000, 1),
+    }
+
+
+def load_graph(args) -> RoadGraph:
+    if args.graph:
+        return RoadGraph.load(args.graph)
+    return synthetic_road_graph(spacing_m=args.spacing)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--routes", type=int, default=300)
+    parser.add_argument("--graph", help="OSM XML extract or .npz graph (default: synthetic)")
+    parser.add_argument("--spacing", type=float, default=400.0, help="Synthetic grid spacing in metres")
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    pairs = make_pairs(args.routes, args.seed)
+    start = time.perf_counter()
+    graph = load_graph(args)
+    graph.nearest_node(0.0, 0.0)
+    results = {"nodes": graph.node_count, "edges": graph.edge_count, "routes": args.routes,
+               "load_s": round(time.perf_counter() - start, 2)}
+
+    plain = load_graph(args) if graph.hierarchy is not None else graph
+    plain.hierarchy = None
+    results["astar"] = asyncio.run(measure(plain, pairs))
+
+    if graph.hierarchy is None:
+        start = time.perf_counter()
+        graph.contract()
+        results["contract_s"] = round(time.perf_counter() - start, 2)
+    results["shortcuts"] = len(graph.hierarchy["shortcuts"])
+    results["contraction_hierarchy"] = asyncio.run(measure(graph, pairs))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Benchmark ping-timeout monitoring for many concurrent trips
+
+Sets up ``--sessions`` active ping sessions in an in-memory stand-in for
+the ``driver_ping_sessions`` and ``phone_usage_violations`` collections.
+Most drivers ping every third of the timeout; ``--quiet`` of them stop
+pinging. Monitoring then runs for ``--periods`` timeouts, once the previous
+way, one polling task per session re-reading it every timeout, and once
+through ``PingDeadlineScheduler``, whose deadlines are recovered from the
+collection on start. The timeout is scaled down from 30 s so a run takes
+seconds. Pings write to the collection directly and are not counted, so
+the database operations reported are the monitoring's own. Prints memory
+held for monitoring, database operations and violations opened as JSON.
+
+    python -m benchmarks.bench_ping_deadlines --sessions 10000 --timeout 1.0 --periods 5
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+from bson import ObjectId
+
+from services.driver_ping_service import DriverPingService
+from services.ping_deadline_scheduler import PingDeadlineScheduler
+
+
+def matches(doc, query):
+    for key, value in query.items():
+        if isinstance(value, dict) and "$ne" in value:
+            if doc.get(key) == value["$ne"]:
+                return False
+        elif isinstance(value, dict) and "$in" in value:
+            if doc.get(key) not in value["$in"]:
+                return False
+        elif doc.get(key) != value:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, docs, latency_s=0.0):
+        self.docs = iter(docs)
+        self.latency_s = latency_s
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.latency_s:
+            latency, self.latency_s = self.latency_s, 0.0  # One round trip per batch
+            await asyncio.sleep(latency)
+        try:
+            return next(self.docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    """Just enough of a Motor collection, counting every call and optionally adding a round-trip delay"""
+
+    def __init__(self, name, ops, latency_s=0.0):
+        self.name = name
+        self.ops = ops
+        self.latency_s = latency_s
+        self.docs = {}
+        self.by_trip = {}
+
+    async def _round_trip(self, op):
+        self.ops[f"{self.name}.{op}"] += 1
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+
+    def _find(self, query):
+        for key, index in (("_id", self.docs), ("trip_id", self.by_trip)):
+            if key in query:
+                value = query[key]
+                keys = value["$in"] if isinstance(value, dict) else [value]
+                candidates = [index.get(k) for k in keys]
+                break
+        else:
+            candidates = self.docs.values()
+        return [doc for doc in candidates if doc is not None and matches(doc, query)]
+
+    def add(self, doc):
+        doc.setdefault("_id", ObjectId())
+        self.docs[doc["_id"]] = doc
+        if "trip_id" in doc and self.name == "driver_ping_sessions":
+            self.by_trip[doc["trip_id"]] = doc
+        return doc
+
+    async def find_one(self, query, projection=None):
+        await self._round_trip("find_one")
+        found = self._find(query)
+        return dict(found[0]) if found else None
+
+    def find(self, query, projection=None):
+        self.ops[f"{self.name}.find"] += 1
+        return FakeCursor([dict(doc) for doc in self._find(query)], self.latency_s)
+
+    async def insert_one(self, doc):
+        await self._round_trip("insert_one")
+        doc = self.add(dict(doc))
+        return type("InsertResult", (), {"inserted_id": doc["_id"]})()
+
+    def _apply(self, query, update):
+        for doc in self._find(query)[:1]:
+            doc.update(update.get("$set", {}))
+            for key, step in update.get("$inc", {}).items():
+                doc[key] = doc.get(key, 0) + step
+
+    async def update_one(self, query, update):
+        await self._round_trip("update_one")
+        self._apply(query, update)
+
+    async def bulk_write(self, operations, ordered=True):
+        await self._round_trip("bulk_write")
+        for operation in operations:
+            self._apply(operation._filter, operation._doc)
+
+
+class FakeDatabase:
+    """Trips in progress, each with an active ping session that has just pinged"""
+
+    def __init__(self, sessions: int, latency_s: float = 0.0):
+        self.ops = Counter()
+        self.trips = FakeCollection("trips", self.ops, latency_s)
+        self.driver_ping_sessions = FakeCollection("driver_ping_sessions", self.ops, latency_s)
+        self.phone_usage_violations = FakeCollection("phone_usage_violations", self.ops, latency_s)
+        self.trip_ids = []
+        now = datetime.utcnow()
+        for i in range(sessions):
+            trip = self.trips.add({"status": "in_progress", "driver_assignment": f"driver-{i}"})
+            self.trip_ids.append(str(trip["_id"]))
+            self.driver_ping_sessions.add({
+                "trip_id": str(trip["_id"]), "driver_id": f"driver-{i}", "is_active": True,
+                "started_at": now, "last_ping_time": now, "current_violation_id": None,
+                "last_ping_location": {"type": "Point", "coordinates": [28.2, -25.8]},
+                "ping_count": 1, "total_violations": 0, "created_at": now, "updated_at": now,
+            })
+
+
+async def legacy_monitor(service: DriverPingService, session_id: str):
+    """The removed per-session polling loop"""
+    while True:
+        await asyncio.sleep(service.PING_TIMEOUT_SECONDS)
+        session = await service._get_session_by_id(session_id)
+        if not session or not session.is_active:
+            break
+        if session.last_ping_time:
+            if (datetime.utcnow() - session.last_ping_time).total_seconds() >= service.PING_TIMEOUT_SECONDS:
+                if not session.current_violation_id:
+                    await service._create_violation(session)
+
+
+async def drive_pings(db: FakeDatabase, pinging, timeout: float, duration: float, on_ping=None):
+    """Compliant drivers ping every third of the timeout, straight into the collection"""
+    sessions = db.driver_ping_sessions.by_trip
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        now = datetime.utcnow()
+        for trip_id in pinging:
+            sessions[trip_id]["last_ping_time"] = now
+            if on_ping:
+                on_ping(trip_id)
+        await asyncio.sleep(timeout / 3)
+
+
+async def run_legacy(args):
+    db = FakeDatabase(args.sessions)
+    pinging = db.trip_ids[args.quiet_sessions:]
+    service = DriverPingService()
+    service.db = db
+    service.PING_TIMEOUT_SECONDS = args.timeout
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    tasks = [asyncio.create_task(legacy_monitor(service, doc["_id"]))
+             for doc in db.driver_ping_sessions.docs.values()]
+    await asyncio.sleep(0)  # Every task is now parked in its sleep
+    memory = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    await drive_pings(db, pinging, args.timeout, args.periods * args.timeout)
+    elapsed = time.perf_counter() - start
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return db, memory, elapsed
+
+
+async def run_scheduler(args):
+    db = FakeDatabase(args.sessions)
+    pinging = db.trip_ids[args.quiet_sessions:]
+    service = DriverPingService()
+    service.db = db
+    service.PING_TIMEOUT_SECONDS = args.timeout
+    service.ping_deadlines = scheduler = PingDeadlineScheduler(
+        on_expired=service._handle_ping_timeout,
+        load_sessions=service._load_active_session_ages,
+        timeout_s=args.timeout
+    )
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    await scheduler.start()
+    await asyncio.sleep(0)  # Deadlines recovered from the collection
+    memory = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    await drive_pings(db, pinging, args.timeout, args.periods * args.timeout, on_ping=scheduler.touch)
+    elapsed = time.perf_counter() - start
+    metrics = scheduler.get_metrics()
+    await scheduler.stop()
+    return db, memory, elapsed, metrics
+
+
+def report(db: FakeDatabase, memory: int, elapsed: float, args):
+    return {
+        "monitoring_memory_kib": round(memory / 1024, 1),
+        "db_ops": dict(sorted(db.ops.items())),
+        "db_ops_total": sum(db.ops.values()),
+        "db_ops_per_timeout_period": round(sum(db.ops.values()) / args.periods, 1),
+        "violations_opened": len(db.phone_usage_violations.docs),
+        "wall_s": round(elapsed, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--quiet", type=float, default=0.01, help="Share of drivers that stop pinging")
+    parser.add_argument("--timeout", type=float, default=1.0, help="Scaled ping timeout in seconds")
+    parser.add_argument("--periods", type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    args.quiet_sessions = int(args.sessions * args.quiet)
+
+    legacy_db, legacy_memory, legacy_elapsed = asyncio.run(run_legacy(args))
+    db, memory, elapsed, metrics = asyncio.run(run_scheduler(args))
+    print(json.dumps({
+        "sessions": args.sessions, "quiet_sessions": args.quiet_sessions,
+        "timeout_s": args.timeout, "periods": args.periods,
+        "polling_tasks": report(legacy_db, legacy_memory, legacy_elapsed, args),
+        "deadline_scheduler": {**report(db, memory, elapsed, args), "heap_entries": metrics["heap_entries"],
+                               "compactions": metrics["compactions"]},
+        "db_op_reduction": round(sum(legacy_db.ops.values()) / max(1, sum(db.ops.values())), 1),
+        "memory_reduction": round(legacy_memory / max(1, memory), 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark driver ping ingest on one trip-planning instance
+
+Sets up ``--trips`` trips in progress, each with an active ping session,
+in the in-memory collections from ``bench_ping_deadlines`` with every
+database call delayed by ``--db-latency-ms``. ``--pings`` pings for random
+trips are then sent from ``--clients`` concurrent clients three ways:
+
+- the previous way: a trip lookup in the request handler, then trip
+  status, trip info, session lookup and session update round trips
+- one ping per call through ``DriverPingService.process_ping``
+- ``--batch`` pings per call through ``process_pings``
+
+The pings still buffered in memory are flushed before the clock stops.
+Prints pings per second and database operations per ping as JSON.
+
+    python -m benchmarks.bench_ping_ingest --trips 2000 --pings 20000 --clients 100 --db-latency-ms 1
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from bson import ObjectId
+
+from benchmarks.bench_ping_deadlines import FakeDatabase
+from schemas.entities import DriverPingSession, LocationPoint
+from services.driver_ping_service import DriverPingService
+
+
+async def legacy_process_ping(db: FakeDatabase, trip_id: str, location: LocationPoint, ping_time: datetime):
+    """The round trips the request handler and process_ping made for each ping"""
+    trip = await db.trips.find_one({"_id": ObjectId(trip_id)})  # Request handler's existence check
+    if not trip:
+        return
+    await db.trips.find_one({"_id": ObjectId(trip_id)}, {"status": 1})
+    trip_info = await db.trips.find_one({"_id": ObjectId(trip_id)}, {"driver_assignment": 1, "status": 1})
+    session_doc = await db.driver_ping_sessions.find_one({"trip_id": trip_id})
+    session_doc["_id"] = str(session_doc["_id"])
+    if isinstance(session_doc.get("last_ping_location"), dict):
+        session_doc["last_ping_location"] = LocationPoint(**session_doc["last_ping_location"])
+    session = DriverPingSession(**session_doc)
+    if trip_info["status"] == "in_progress" and session.is_active:
+        await db.driver_ping_sessions.update_one(
+            {"_id": ObjectId(session.id)},
+            {
+                "$set": {"last_ping_time": ping_time, "last_ping_location": location.model_dump(), "updated_at": datetime.utcnow()},
+                "$inc": {"ping_count": 1}
+            }
+        )
+
+
+async def run_clients(pings: List[Tuple[str, LocationPoint]], clients: int, batch: int, send: Callable):
+    """Split the pings between clients, each sending ``batch`` at a time"""
+    async def client(share):
+        for start in range(0, len(share), batch):
+            now = datetime.utcnow()
+            await send([(trip_id, location, now) for trip_id, location in share[start:start + batch]])
+
+    await asyncio.gather(*(client(pings[i::clients]) for i in range(clients)))
+
+
+async def run(args, mode: str, workload: List[Tuple[int, LocationPoint]]):
+    db = FakeDatabase(args.trips, latency_s=args.db_latency_ms / 1000.0)
+    pings = [(db.trip_ids[i], location) for i, location in workload]
+    service = DriverPingService()
+    service.db = db
+
+    if mode == "legacy":
+        async def send(batch):
+            for trip_id, location, ping_time in batch:
+                await legacy_process_ping(db, trip_id, location, ping_time)
+        batch = 1
+    elif mode == "per_ping":
+        async def send(batch):
+            for trip_id, location, ping_time in batch:
+                result = await service.process_ping(trip_id, location, ping_time)
+                assert result["status"] == "success", result
+        batch = 1
+    else:
+        async def send(batch):
+            results = await service.process_pings(batch)
+            assert all(r["status"] == "success" for r in results), results
+        batch = args.batch
+
+    start = time.perf_counter()
+    await run_clients(pings, args.clients, batch, send)
+    await service.session_store.flush()
+    elapsed = time.perf_counter() - start
+
+    stored = sum(doc["ping_count"] - 1 for doc in db.driver_ping_sessions.docs.values())
+    assert stored == len(pings), (stored, len(pings))
+    return {
+        "pings_per_s": round(len(pings) / elapsed),
+        "db_ops_per_ping": round(sum(db.ops.values()) / len(pings), 3),
+        "db_ops": dict(sorted(db.ops.items())),
+        "wall_s": round(elapsed, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trips", type=int, default=2000)
+    parser.add_argument("--pings", type=int, default=20000)
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--batch", type=int, default=50, help="Pings per call in batch mode")
+    parser.add_argument("--db-latency-ms", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    rng = random.Random(args.seed)
+    workload = [(rng.randrange(args.trips), LocationPoint(coordinates=[rng.uniform(28.0, 28.3), rng.uniform(-26.2, -25.7)]))
+                for _ in range(args.pings)]
+
+    results = {mode: asyncio.run(run(args, mode, workload)) for mode in ("legacy", "per_ping", "batched")}
+    print(json.dumps({
+        "trips": args.trips, "pings": args.pings, "clients": args.clients,
+        "batch": args.batch, "db_latency_ms": args.db_latency_ms,
+        **results,
+        "per_ping_speedup": round(results["per_ping"]["pings_per_s"] / results["legacy"]["pings_per_s"], 1),
+        "batched_speedup": round(results["batched"]["pings_per_s"] / results["legacy"]["pings_per_s"], 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
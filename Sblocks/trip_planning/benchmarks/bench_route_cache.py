@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Benchmark RoutingService with and without the route cache against a local stub routing server
+
+The stub serves Geoapify-shaped responses from the route fixture after a
+fixed delay, standing in for the real API. A skewed stream of
+origin/destination pairs (a few popular pairs, a long tail) is replayed
+with the given concurrency, once uncached and once cached, and the
+upstream call count, latency percentiles and cache hit ratio are printed as
+JSON. The persistent tier is included only when ``--mongo-url`` is given.
+
+    python -m benchmarks.bench_route_cache --requests 500 --pairs 50 --latency-ms 150
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+import numpy as np
+from aiohttp import web
+
+from benchmarks.loadgen import DEFAULT_FIXTURE, SYNTHETIC_AREA
+from services.route_cache import RouteCache, pack_polylines
+from services.routing_providers import GeoapifyProvider
+from services.routing_service import RoutingService
+from utils.route_fixture import RouteFixture
+
+
+async def start_stub_server(fixture: RouteFixture, latency_ms: float):
+    """Local stand-in for the Geoapify routing endpoint; returns (runner, url, call counter)"""
+    calls = {"count": 0}
+
+    async def routing(request: web.Request) -> web.Response:
+        calls["count"] += 1
+        await asyncio.sleep(latency_ms / 1000.0)
+        waypoints = [tuple(map(float, p.split(","))) for p in request.query["waypoints"].split("|")]
+        return web.json_response(fixture.geoapify_response(waypoints))
+
+    app = web.Application()
+    app.router.add_get("/v1/routing", routing)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}/v1/routing", calls
+
+
+def make_workload(requests: int, pairs: int, seed: int):
+    rng = random.Random(seed)
+    (lat_min, lat_max), (lon_min, lon_max) = SYNTHETIC_AREA
+    od = [
+        [(rng.uniform(lat_min, lat_max), rng.uniform(lon_min, lon_max)),
+         (rng.uniform(lat_min, lat_max), rng.uniform(lon_min, lon_max))]
+        for _ in range(pairs)
+    ]
+    weights = [1.0 / (k + 1) for k in range(pairs)]  # Zipf-like popularity
+    return rng.choices(od, weights=weights, k=requests)
+
+
+async def replay(service: RoutingService, workload, concurrency: int):
+    slots = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(waypoints):
+        async with slots:
+            start = time.perf_counter()
+            await service.calculate_route(waypoints)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(w) for w in workload))
+    return (time.perf_counter() - start), latencies
+
+
+def summarise(elapsed_s, latencies, upstream_calls):
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "elapsed_s": round(elapsed_s, 3),
+        "upstream_calls": upstream_calls,
+        "throughput_rps": round(len(latencies) / elapsed_s, 1),
+        "latency_ms": {"p50": round(float(p50), 2), "p95": round(float(p95), 2), "p99": round(float(p99), 2),
+                       "mean": round(statistics.mean(latencies), 2)},
+    }
+
+
+async def run(args):
+    fixture = RouteFixture.load(args.fixture)
+    runner, url, calls = await start_stub_server(fixture, args.latency_ms)
+    workload = make_workload(args.requests, args.pairs, args.seed)
+
+    collection = None
+    if args.mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        collection = AsyncIOMotorClient(args.mongo_url)[args.mongo_db].route_cache
+        await collection.delete_many({})
+
+    results = {"requests": args.requests, "distinct_pairs": args.pairs, "concurrency": args.concurrency,
+               "stub_latency_ms": args.latency_ms}
+    try:
+        for name, cache in (
+            ("uncached", RouteCache(persistent=False)),
+            ("cached", RouteCache(collection=(lambda: collection), persistent=collection is not None)),
+        ):
+            cache.enabled = name == "cached"
+            # The stub server is the only provider, whatever ROUTING_* is set to
+            service = RoutingService(cache=cache, providers=[GeoapifyProvider("bench", base_url=url)])
+            calls["count"] = 0
+            elapsed, latencies = await replay(service, workload, args.concurrency)
+            results[name] = summarise(elapsed, latencies, calls["count"])
+            if cache.enabled:
+                results[name]["cache"] = cache.get_metrics()
+            await service.close()
+
+        sample = fixture.geoapify_response(workload[0])
+        results["document_bytes"] = {
+            "raw": len(json.dumps(sample)),
+            "encoded_polyline": len(json.dumps(pack_polylines(sample))),
+        }
+        results["speedup"] = round(results["uncached"]["elapsed_s"] / max(results["cached"]["elapsed_s"], 1e-9), 1)
+    finally:
+        await runner.cleanup()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--pairs", type=int, default=50, help="Distinct origin/destination pairs")
+    parser.add_argument("--concurrency", type=int, default=25)
+    parser.add_argument("--latency-ms", type=float, default=150.0, help="Stub server response delay")
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE)
+    parser.add_argument("--mongo-url", help="Include the persistent tier, using this MongoDB")
+    parser.add_argument("--mongo-db", default="route_cache_bench")
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark trip combination analysis on synthetic backlogs
+
+Generates ``--sizes`` upcoming trips spread over the synthetic area at
+``--trips-per-day`` and runs ``find_combination_opportunities`` against a
+stub router that answers straight away (or after ``--route-latency-ms``).
+For backlogs up to ``--legacy-max`` trips it also runs the previous
+approach, which checked every pair and routed each one that passed the
+distance and time filters, one at a time. Prints wall time, pairs looked
+at and route calls per size as JSON.
+
+    python -m benchmarks.bench_trip_combinations --sizes 100 1000 10000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.loadgen import SYNTHETIC_AREA
+from schemas.entities import LocationPoint, Trip, Waypoint
+from services import upcoming_recommendations_service as urs
+from utils.geo import haversine_km, path_length_km
+
+ROAD_FACTOR = 1.3      # Road distance over straight-line distance
+ROAD_SPEED_KMH = 40.0
+
+
+def make_trips(count: int, trips_per_day: float, drivers: int, seed: int):
+    rng = random.Random(seed)
+    (lat_min, lat_max), (lon_min, lon_max) = SYNTHETIC_AREA
+    horizon_s = count / trips_per_day * 86400
+    base = datetime.utcnow() + timedelta(hours=1)
+    trips = []
+    for i in range(count):
+        origin = (rng.uniform(lat_min, lat_max), rng.uniform(lon_min, lon_max))
+        destination = (rng.uniform(lat_min, lat_max), rng.uniform(lon_min, lon_max))
+        distance = haversine_km(*origin, *destination) * ROAD_FACTOR
+        duration = distance / ROAD_SPEED_KMH * 60
+        start = base + timedelta(seconds=rng.uniform(0, horizon_s))
+        trips.append(Trip(
+            _id=f"{i:024x}", name=f"Trip {i}", created_by="bench",
+            origin=Waypoint(location=LocationPoint(coordinates=[origin[1], origin[0]]), order=0),
+            destination=Waypoint(location=LocationPoint(coordinates=[destination[1], destination[0]]), order=1),
+            scheduled_start_time=start, scheduled_end_time=start + timedelta(minutes=duration),
+            estimated_distance=distance, estimated_duration=duration,
+            driver_assignment=f"driver-{rng.randrange(drivers)}", vehicle_id=f"vehicle-{i}",
+        ))
+    trips.sort(key=lambda t: t.scheduled_start_time)
+    return trips
+
+
+class StubRouter:
+    """Straight lines between the stops, stretched to road length"""
+
+    def __init__(self, latency_s: float):
+        self.latency_s = latency_s
+        self.calls = 0
+
+    async def __call__(self, start_lat, start_lon, end_lat, end_lon, waypoints=[]):
+        self.calls += 1
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+        coords = [[start_lat, start_lon]] + [[lat, lon] for lon, lat in waypoints] + [[end_lat, end_lon]]
+        distance_km = path_length_km(coords) * ROAD_FACTOR
+        return {"distance": distance_km * 1000, "duration": distance_km / ROAD_SPEED_KMH * 3600}, coords
+
+
+async def legacy_combinations(service, trips):
+    """The previous analysis: every pair checked, every feasible pair routed in turn"""
+    filtered_out = dict.fromkeys(["route_calculation_failed", "insufficient_benefits",
+                                  "extreme_distance_penalty", "low_score"], 0)
+    pairs = 0
+    recommendations = []
+    for i, primary in enumerate(trips):
+        for secondary in trips[i + 1:]:
+            pairs += 1
+            if primary.driver_assignment == secondary.driver_assignment:
+                continue
+            travel_distance = service._calculate_travel_distance(primary, secondary)
+            if travel_distance > urs.MAX_TRAVEL_DISTANCE_KM:
+                continue
+            time_gap = service._calculate_time_gap(primary, secondary)
+            feasible, _, _ = await service._check_time_feasibility(primary, secondary, travel_distance, time_gap)
+            if not feasible:
+                continue
+            recommendation = await service._evaluate_combination(primary, secondary, travel_distance, time_gap,
+                                                                 filtered_out)
+            if recommendation is not None:
+                recommendations.append(recommendation)
+    return pairs, recommendations
+
+
+def run(coro):
+    start = time.perf_counter()
+    result = asyncio.run(coro)
+    return result, round(time.perf_counter() - start, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--trips-per-day", type=float, default=200.0)
+    parser.add_argument("--drivers", type=int, default=50)
+    parser.add_argument("--route-latency-ms", type=float, default=0.0)
+    parser.add_argument("--legacy-max", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    results = []
+    for size in args.sizes:
+        trips = make_trips(size, args.trips_per_day, args.drivers, args.seed)
+        service = urs.UpcomingRecommendationsService()
+        router = service._get_route_with_waypoints = StubRouter(args.route_latency_ms / 1000)
+
+        async def load_trips():
+            return trips
+
+        urs.trip_service.get_all_upcoming_trips = load_trips
+        recommendations, seconds = run(service.find_combination_opportunities())
+        result = {"trips": size, "indexed": {"seconds": seconds, "route_calls": router.calls,
+                                             "recommendations": len(recommendations)}}
+
+        if size <= args.legacy_max:
+            router.calls = 0
+            (pairs, legacy), seconds = run(legacy_combinations(service, trips))
+            result["legacy"] = {"seconds": seconds, "pairs": pairs, "route_calls": router.calls,
+                                "recommendations": min(15, len(legacy)), "qualifying_pairs": len(legacy)}
+            result["speedup"] = round(seconds / max(result["indexed"]["seconds"], 1e-6), 1)
+        results.append(result)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
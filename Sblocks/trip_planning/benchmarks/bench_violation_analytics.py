@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Benchmark the driver behaviour analytics endpoints against a real MongoDB
+
+Fills a scratch database with ``--violations`` synthetic violations laid
+out like ``mock_scripts/create_violation_data.py`` (the same fields, value
+ranges and speeding/braking/acceleration/phone usage mix, spread over 90
+days), plus one driver history per driver. The indexes the service creates
+at startup are built as well. Then, for violation comparison, performance
+metrics, violation trends and risk distribution, times:
+
+- the previous way: ``find(...).to_list(None)`` or a count per collection,
+  with severities bucketed and totals summed in Python
+- the aggregation pipelines in ``ViolationAnalyticsService``
+
+Prints the median latency, the peak Python memory while answering, and the
+size of what came back from MongoDB, as JSON. The scratch database is
+dropped afterwards unless ``--keep`` is given, and is reused when it
+already holds the requested number of violations.
+
+    python -m benchmarks.bench_violation_analytics --mongo-url mongodb://localhost:27017 --violations 1000000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import bson
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from services.violation_analytics_service import VIOLATION_COLLECTIONS, ViolationAnalyticsService
+
+# Share of each violation type in mock_scripts/create_violation_data.py (30:15:12:8)
+MIX = {"speeding": 30, "braking": 15, "acceleration": 12, "phone_usage": 8}
+INSERT_BATCH = 10000
+PERIOD_DAYS = 30
+
+
+def location(rng):
+    return {
+        "latitude": -25.7461 + rng.uniform(-0.1, 0.1),
+        "longitude": 28.1881 + rng.uniform(-0.1, 0.1),
+        "address": f"Test Location {rng.randint(1, 100)}"
+    }
+
+
+def make_violation(label, rng, driver_ids, start_date):
+    violation_date = start_date + timedelta(days=rng.randint(0, 90), hours=rng.randint(0, 23), minutes=rng.randint(0, 59))
+    doc = {"driver_id": rng.choice(driver_ids), "created_at": violation_date}
+    if label == "speeding":
+        doc.update(speed=rng.randint(85, 140), speed_limit=rng.randint(60, 100), location=location(rng),
+                   severity=rng.uniform(0.3, 1.0))
+    elif label == "braking":
+        doc.update(deceleration=rng.uniform(6.0, 12.0), threshold=rng.uniform(4.0, 6.0), location=location(rng),
+                   severity=rng.uniform(0.4, 0.9))
+    elif label == "acceleration":
+        doc.update(acceleration=rng.uniform(3.0, 6.0), threshold=rng.uniform(2.0, 3.0), location=location(rng),
+                   severity=rng.uniform(0.3, 0.8))
+    else:
+        duration = rng.randint(30, 300)
+        doc.update(duration_seconds=duration, start_time=violation_date,
+                   end_time=violation_date + timedelta(seconds=duration), start_location=location(rng),
+                   severity=rng.uniform(0.5, 1.0))
+    return doc
+
+
+async def seed(db, args):
+    """Insert the synthetic violations and driver histories unless they are already there"""
+    existing = sum([await db[name].estimated_document_count() for name in VIOLATION_COLLECTIONS.values()])
+    if existing == args.violations:
+        return False
+    await asyncio.gather(*(db.drop_collection(name) for name in [*VIOLATION_COLLECTIONS.values(), "driver_history"]))
+
+    rng = random.Random(args.seed)
+    driver_ids = [f"{i:024x}" for i in range(args.drivers)]
+    start_date = datetime.utcnow() - timedelta(days=90)
+    total = sum(MIX.values())
+    for label, share in MIX.items():
+        collection = db[VIOLATION_COLLECTIONS[label]]
+        remaining = args.violations * share // total
+        if label == "phone_usage":
+            remaining = args.violations - sum(args.violations * s // total for l, s in MIX.items() if l != label)
+        while remaining:
+            batch = [make_violation(label, rng, driver_ids, start_date) for _ in range(min(INSERT_BATCH, remaining))]
+            await collection.insert_many(batch, ordered=False)
+            remaining -= len(batch)
+        await collection.create_index("created_at")
+        await collection.create_index([("driver_id", 1), ("created_at", -1)])
+        if label != "phone_usage":
+            await collection.create_index("time")
+
+    await db.driver_history.insert_many([{
+        "driver_id": driver_id,
+        "driver_name": f"Driver {driver_id[-4:]}",
+        "safety_score": round(rng.uniform(30, 100), 1),
+        "total_violations": rng.randint(0, 40),
+        "total_trips": rng.randint(50, 200),
+        "completed_trips": rng.randint(45, 190),
+        "recent_violations": rng.randint(0, 20),
+        "historical_violations": rng.randint(0, 30),
+        "trend": rng.choice(["improving", "neutral", "declining"]),
+    } for driver_id in driver_ids])
+    return True
+
+
+# -------------------- The previous implementations --------------------
+SEVERITY = {
+    "speeding": (lambda d: d.get("speed", 0) - d.get("speed_limit", 0), 10, 20),
+    "braking": (lambda d: d.get("deceleration", 0) - d.get("threshold", 0), 2, 4),
+    "acceleration": (lambda d: d.get("acceleration", 0) - d.get("threshold", 0), 1.5, 3),
+    "phone_usage": (lambda d: d.get("duration_seconds", 0), 30, 120),
+}
+
+
+def since(start_date):
+    return {"$or": [{"created_at": {"$gte": start_date}}, {"time": {"$gte": start_date}}]}
+
+
+async def legacy_comparison(db, start_date, received):
+    comparison = {}
+    for label, name in VIOLATION_COLLECTIONS.items():
+        docs = await db[name].find(since(start_date)).to_list(length=None)
+        received.extend(docs)
+        measure, minor, moderate = SEVERITY[label]
+        severities = [s for s in (measure(doc) for doc in docs) if s > 0]
+        comparison[label] = {
+            "count": len(docs),
+            "avg_severity": round(sum(severities) / len(severities), 2) if severities else 0,
+            "max_severity": round(max(severities), 2) if severities else 0,
+            "severity_ranges": {
+                "minor": len([s for s in severities if 0 < s <= minor]),
+                "moderate": len([s for s in severities if minor < s <= moderate]),
+                "severe": len([s for s in severities if s > moderate])
+            }
+        }
+    return comparison
+
+
+async def legacy_performance(db, start_date, received):
+    prev_start_date = start_date - timedelta(days=PERIOD_DAYS)
+    counts = {}
+    for label, name in VIOLATION_COLLECTIONS.items():
+        counts[label] = {
+            "current": await db[name].count_documents(since(start_date)),
+            "previous": await db[name].count_documents({"created_at": {"$gte": prev_start_date, "$lt": start_date}}),
+            "critical": await db[name].count_documents({
+                "created_at": {"$gte": start_date},
+                "$or": [{"severity": {"$gt": 0.8}}, {"speed": {"$gt": 120}}, {"duration_seconds": {"$gt": 300}}]
+            }),
+        }
+        received.append(counts[label])
+    drivers = await db.driver_history.find({}).to_list(length=None)
+    received.extend(drivers)
+    return counts, len(drivers), sum(d.get("safety_score", 0) for d in drivers) / max(1, len(drivers))
+
+
+async def legacy_trends(db, start_date, received):
+    """The previous trends endpoint already aggregated, with one pipeline per collection"""
+    trends = {}
+    for label, name in VIOLATION_COLLECTIONS.items():
+        pipeline = [
+            {"$match": {"$and": [{"$or": [{f: {"$gte": start_date}} for f in ("created_at", "time", "timestamp")]}]}},
+            {"$addFields": {"violation_date": {"$convert": {
+                "input": {"$ifNull": ["$created_at", {"$ifNull": ["$time", "$timestamp"]}]},
+                "to": "date", "onError": None, "onNull": None
+            }}}},
+            {"$match": {"violation_date": {"$ne": None, "$gte": start_date}}},
+            {"$group": {"_id": {"y": {"$year": "$violation_date"}, "m": {"$month": "$violation_date"},
+                                "d": {"$dayOfMonth": "$violation_date"}}, "count": {"$sum": 1}}},
+        ]
+        rows = await db[name].aggregate(pipeline).to_list(length=None)
+        received.extend(rows)
+        trends[label] = {f"{r['_id']['y']}-{r['_id']['m']:02d}-{r['_id']['d']:02d}": r["count"] for r in rows}
+    return trends
+
+
+async def legacy_risk(db, received):
+    drivers = await db.driver_history.find({}).to_list(length=None)
+    received.extend(drivers)
+    distribution = {"low_risk": 0, "medium_risk": 0, "high_risk": 0}
+    for driver in drivers:
+        score, violations = driver.get("safety_score", 0), driver.get("total_violations", 0)
+        if score >= 80 and violations <= 5:
+            distribution["low_risk"] += 1
+        elif score >= 60 and violations <= 15:
+            distribution["medium_risk"] += 1
+        else:
+            distribution["high_risk"] += 1
+    ranked = sorted(drivers, key=lambda d: d.get("safety_score", 0), reverse=True)
+    return distribution, ranked[:5], ranked[-5:]
+
+
+# -------------------- Measurement --------------------
+async def measure(run, repeat):
+    """Median latency, peak traced memory and bytes received for ``run(received)``"""
+    latencies, peaks, sizes = [], [], []
+    for _ in range(repeat):
+        received = []
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = await run(received)
+        latencies.append((time.perf_counter() - start) * 1000)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        received = received or [result]
+        sizes.append(sum(len(bson.encode(doc if isinstance(doc, dict) else {"v": doc})) for doc in received))
+    return {
+        "median_ms": round(statistics.median(latencies), 1),
+        "peak_python_mb": round(max(peaks) / 2**20, 2),
+        "received_kb": round(max(sizes) / 1024, 1),
+    }
+
+
+async def run(args):
+    client = AsyncIOMotorClient(args.mongo_url)
+    db = client[args.mongo_db]
+    try:
+        seeded_now = await seed(db, args)
+        service = ViolationAnalyticsService(db)
+        start_date = datetime.utcnow() - timedelta(days=PERIOD_DAYS)
+
+        async def returned(coroutine, received):
+            result = await coroutine
+            received.append(result if isinstance(result, dict) else {"rows": result})
+            return result
+
+        endpoints = {
+            "violation_comparison": (
+                lambda received: legacy_comparison(db, start_date, received),
+                lambda received: returned(service.get_violation_comparison(start_date), received),
+            ),
+            "performance_metrics": (
+                lambda received: legacy_performance(db, start_date, received),
+                lambda received: returned(service.get_period_violation_counts(
+                    start_date, start_date - timedelta(days=PERIOD_DAYS)), received),
+            ),
+            "violation_trends": (
+                lambda received: legacy_trends(db, start_date, received),
+                lambda received: returned(service.get_daily_violation_counts(start_date), received),
+            ),
+            "risk_distribution": (
+                lambda received: legacy_risk(db, received),
+                lambda received: returned(service.get_driver_statistics(), received),
+            ),
+        }
+        results = {}
+        for name, (before, after) in endpoints.items():
+            results[name] = {
+                "find_and_python": await measure(before, args.repeat),
+                "aggregation": await measure(after, args.repeat),
+            }
+            results[name]["speedup"] = round(
+                results[name]["find_and_python"]["median_ms"] / max(0.1, results[name]["aggregation"]["median_ms"]), 1)
+        return {"violations": args.violations, "drivers": args.drivers, "period_days": PERIOD_DAYS,
+                "seeded": seeded_now, "endpoints": results}
+    finally:
+        if not args.keep:
+            await client.drop_database(args.mongo_db)
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", default=os.getenv("MONGODB_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--mongo-db", default="violation_analytics_bench")
+    parser.add_argument("--violations", type=int, default=1000000)
+    parser.add_argument("--drivers", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database for the next run")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Benchmark ingesting telematics violations in bursts
+
+Generates ``--events`` speeding, braking and acceleration events of mixed
+types for ``--drivers`` drivers, each on their own trip, sent by the units
+in bursts of ``--burst`` with ``--concurrency`` units sending at once.
+``--resend`` of the bursts are sent twice, as a unit does when it misses
+an acknowledgement. In-memory stand-ins for the trip, violation, driver
+history and rollup collections delay every call by ``--db-latency-ms``.
+The real ``DriverHistoryService`` and ``TripRollupService`` run against
+them. Three ways are compared:
+
+- per_event: the previous create handler for every event, which is a trip
+  lookup, an ``insert_one`` and ``record_violation`` (a counter update, a
+  score write and a rollup write)
+- batch: ``ViolationIngestService.ingest`` once per burst
+- buffered: ``ViolationIngestService.submit`` once per burst, with the
+  queue written ``--batch-size`` events at a time
+
+Prints throughput, database round trips per event and how many resent
+events were stored twice, as JSON.
+
+    python -m benchmarks.bench_violation_ingest --events 20000 --burst 50 --db-latency-ms 1
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from services.driver_history_service import DriverHistoryService
+from services.trip_rollup_service import trip_rollup_service
+from services.violation_ingest_service import VIOLATION_TYPES, ViolationIngestService
+
+FIELDS = {
+    "speeding": lambda rng: {"speed": rng.uniform(70, 140), "speed_limit": 60.0},
+    "braking": lambda rng: {"deceleration": rng.uniform(8.5, 12), "threshold": 8.0},
+    "acceleration": lambda rng: {"acceleration": rng.uniform(3.5, 6), "threshold": 3.0},
+}
+
+
+class FakeCursor:
+    def __init__(self, docs, round_trip):
+        self.docs = docs
+        self.round_trip = round_trip
+
+    async def to_list(self, length):
+        await self.round_trip()
+        return self.docs
+
+
+class FakeCollection:
+    """Just enough of a Motor collection, counting every call and adding a round-trip delay"""
+
+    def __init__(self, name, ops, latency_s):
+        self.name = name
+        self.ops = ops
+        self.latency_s = latency_s
+        self.docs = {}  # _id, or driver_id for histories -> document
+        self.keys = set()
+
+    async def _round_trip(self, op="find"):
+        self.ops[f"{self.name}.{op}"] += 1
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+
+    # -------------------- Trips --------------------
+    async def find_one(self, query, projection=None):
+        await self._round_trip("find_one")
+        doc = self.docs.get(query.get("_id"))
+        return dict(doc) if doc else None
+
+    def find(self, query, projection=None):
+        docs = [dict(self.docs[i]) for i in query["_id"]["$in"] if i in self.docs]
+        return FakeCursor(docs, self._round_trip)
+
+    # -------------------- Violations --------------------
+    def _store(self, doc):
+        doc.setdefault("_id", ObjectId())
+        key = doc.get("event_key")
+        if doc["_id"] in self.docs or (key is not None and key in self.keys):
+            return False
+        self.docs[doc["_id"]] = doc
+        if key is not None:
+            self.keys.add(key)
+        return True
+
+    async def insert_one(self, doc):
+        await self._round_trip("insert_one")
+        self._store(doc)
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    async def insert_many(self, docs, ordered=True):
+        await self._round_trip("insert_many")
+        errors = [{"index": i, "code": 11000, "errmsg": "E11000 duplicate key error"}
+                  for i, doc in enumerate(docs) if not self._store(doc)]
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(docs) - len(errors)})
+
+    # -------------------- Driver history and rollups --------------------
+    def _update(self, query, update, upsert):
+        doc = self.docs.get(query["driver_id"])
+        if doc is None:
+            if not upsert:
+                return None
+            doc = self.docs[query["driver_id"]] = {"_id": ObjectId(), **query, **update.get("$setOnInsert", {})}
+        elif any(doc.get(k) != v for k, v in query.items()):
+            return None
+        doc.update(update.get("$set", {}))
+        for key, step in update.get("$inc", {}).items():
+            doc[key] = doc.get(key, 0) + step
+        return doc
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        await self._round_trip("find_one_and_update")
+        return dict(self._update(query, update, upsert))
+
+    async def update_one(self, query, update, upsert=False):
+        await self._round_trip("update_one")
+        self._update(query, update, upsert)
+
+    async def bulk_write(self, operations, ordered=True):
+        await self._round_trip("bulk_write")
+
+
+def make_db(args, ops):
+    latency_s = args.db_latency_ms / 1000.0
+    names = ["trips", "trip_history", "driver_history", "trip_rollups",
+             *(collection for collection, _ in VIOLATION_TYPES.values())]
+    db = SimpleNamespace(**{name: FakeCollection(name, ops, latency_s) for name in names})
+    for i in range(args.drivers):
+        trip_id = ObjectId(f"{i:024x}")
+        db.trips.docs[trip_id] = {"_id": trip_id, "driver_assignment": f"EMP{i}"}
+        db.driver_history.docs[f"EMP{i}"] = {"_id": ObjectId(), "driver_id": f"EMP{i}", "driver_name": f"Driver {i}"}
+    return db
+
+
+def make_bursts(args):
+    """Bursts of mixed events, each from one unit, with some bursts sent again"""
+    rng = random.Random(7)
+    start = datetime(2030, 3, 15, 8, 0)
+    bursts = []
+    for b in range(args.events // args.burst):
+        driver = rng.randrange(args.drivers)
+        burst = []
+        for e in range(args.burst):
+            kind = rng.choice(list(FIELDS))
+            burst.append({
+                "type": kind, "trip_id": f"{driver:024x}", "driver_id": f"EMP{driver}",
+                "location": {"type": "Point", "coordinates": [28.0 + rng.random(), -25.0 - rng.random()]},
+                "time": start + timedelta(seconds=b * args.burst + e), **FIELDS[kind](rng),
+            })
+        bursts.append(burst)
+    resent = [burst for burst in bursts if rng.random() < args.resend]
+    return bursts + resent, len(resent) * args.burst
+
+
+async def legacy_create(db, history, event):
+    """The previous create handler: one trip lookup, one insert_one and one record_violation per event"""
+    collection, model = VIOLATION_TYPES[event["type"]]
+    request = model(**{k: v for k, v in event.items() if k != "type"})
+    trip = await db.trips.find_one({"_id": ObjectId(request.trip_id)})
+    if not trip or trip.get("driver_assignment") != request.driver_id:
+        raise ValueError("trip not found or driver not assigned")
+    violation_data = {**request.model_dump(), "created_at": datetime.utcnow()}
+    await getattr(db, collection).insert_one(violation_data)
+    await history.record_violation(request.driver_id, event["type"])
+
+
+async def measure(args, way):
+    ops = Counter()
+    db = make_db(args, ops)
+    trip_rollup_service.db = db
+    history = DriverHistoryService(db, db)
+    publisher = SimpleNamespace(is_connected=lambda: False)
+    ingest = ViolationIngestService(db, history, publisher, batch_size=args.batch_size,
+                                    max_buffered=args.events * 2)
+    bursts, resent_events = make_bursts(args)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def send(burst):
+        async with semaphore:
+            if way == "per_event":
+                for event in burst:
+                    await legacy_create(db, history, event)
+            elif way == "batch":
+                await ingest.ingest(burst)
+            else:
+                await ingest.submit(burst)
+
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    await asyncio.gather(*(send(burst) for burst in bursts))
+    if way == "buffered":
+        await ingest.flush()
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+
+    sent = sum(len(burst) for burst in bursts)
+    stored = sum(len(getattr(db, collection).docs) for collection, _ in VIOLATION_TYPES.values())
+    counted = sum(doc.get(field, 0) for doc in db.driver_history.docs.values()
+                  for field in ("speeding_violations", "braking_violations", "acceleration_violations"))
+    return {
+        "events_sent": sent,
+        "seconds": round(elapsed, 2),
+        "events_per_s": round(sent / elapsed, 1),
+        "cpu_ms_per_event": round(cpu * 1000 / sent, 3),
+        "db_round_trips": sum(ops.values()),
+        "db_round_trips_per_event": round(sum(ops.values()) / sent, 3),
+        "stored": stored,
+        "counted_on_histories": counted,
+        "stored_twice": stored - (sent - resent_events),
+        "ops": dict(sorted(ops.items())),
+    }
+
+
+async def run(args):
+    results = {way: await measure(args, way) for way in ("per_event", "batch", "buffered")}
+    return {
+        "events": args.events, "burst": args.burst, "drivers": args.drivers, "concurrency": args.concurrency,
+        "batch_size": args.batch_size, "resend": args.resend, "db_latency_ms": args.db_latency_ms,
+        **results,
+        "batch_speedup": round(results["batch"]["events_per_s"] / results["per_event"]["events_per_s"], 1),
+        "buffered_speedup": round(results["buffered"]["events_per_s"] / results["per_event"]["events_per_s"], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--burst", type=int, default=50)
+    parser.add_argument("--drivers", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--resend", type=float, default=0.05)
+    parser.add_argument("--db-latency-ms", type=float, default=1.0)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
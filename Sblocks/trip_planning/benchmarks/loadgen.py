@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+"""
+Headless fleet load generator for the trips and GPS request paths
+
+Simulates a fleet with ``FleetSimulationEngine`` on recorded fixture routes
+(or synthetic ones) and drives its traffic through RabbitMQ exactly as Core
+does: requests go to the ``service_requests`` exchange with routing key
+``<service>.requests`` and replies are read off ``service_responses``. Per
+vehicle the scenario is create trip -> start trip -> periodic GPS location
+updates and driver pings -> complete trip on arrival. Prints throughput,
+latency percentiles and error rates per endpoint as JSON.
+
+Latency runs from when a request is due to when its reply arrives, so time
+spent waiting for a free ``--concurrency`` slot is included. Start the trips
+service with ``ROUTING_FIXTURE_PATH=fixtures/routes.json`` so trip creation
+never reaches the live routing API. ``--dry-run`` needs no broker and
+measures the generator alone.
+
+    python -m benchmarks.loadgen --vehicles 50 --duration 120 --ping-interval 5
+    python -m benchmarks.loadgen --dry-run --vehicles 2000 --duration 20 --time-scale 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.rabbitmq_config import RabbitMQConfig
+from services.fleet_simulation_engine import FleetSimulationEngine
+from utils.route_fixture import RouteFixture, synthesise_route
+from utils.route_geometry import RouteGeometry
+
+DEFAULT_FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures", "routes.json")
+SYNTHETIC_AREA = ((-26.20, -25.70), (28.00, 28.30))  # Johannesburg to Pretoria, (lat range, lon range)
+
+CREATE = ("trips", "POST", "trips/create")
+START = ("trips", "POST", "trips/{id}/start")
+COMPLETE = ("trips", "POST", "trips/{id}/complete")
+DRIVER_PING = ("trips", "POST", "trips/driver/ping")
+GPS_UPDATE = ("gps", "POST", "locations/update")
+
+
+class EndpointStats:
+    """Outcomes and latencies for one endpoint"""
+
+    def __init__(self):
+        self.latencies_ms: List[float] = []
+        self.errors = 0
+        self.timeouts = 0
+        self.last_error: Optional[str] = None
+
+    def record(self, latency_ms: float, ok: bool, timed_out: bool = False, error: Optional[str] = None):
+        self.latencies_ms.append(latency_ms)
+        if timed_out:
+            self.timeouts += 1
+        elif not ok:
+            self.errors += 1
+            self.last_error = error
+
+    def summary(self, elapsed_s: float) -> Dict[str, Any]:
+        count = len(self.latencies_ms)
+        failed = self.errors + self.timeouts
+        result = {
+            "requests": count,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "error_rate": round(failed / count, 4) if count else 0.0,
+            "throughput_rps": round(count / elapsed_s, 2) if elapsed_s > 0 else 0.0,
+        }
+        if count:
+            latencies = np.asarray(self.latencies_ms)
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            result["latency_ms"] = {
+                "p50": round(float(p50), 2),
+                "p95": round(float(p95), 2),
+                "p99": round(float(p99), 2),
+                "mean": round(float(latencies.mean()), 2),
+                "max": round(float(latencies.max()), 2),
+            }
+        if self.last_error:
+            result["last_error"] = self.last_error
+        return result
+
+
+class LoadReport:
+    """Per-endpoint statistics for a run"""
+
+    def __init__(self):
+        self.endpoints: Dict[str, EndpointStats] = {}
+
+    def record(self, label: str, latency_ms: float, ok: bool, timed_out: bool = False, error: Optional[str] = None):
+        self.endpoints.setdefault(label, EndpointStats()).record(latency_ms, ok, timed_out, error)
+
+    def as_dict(self, elapsed_s: float) -> Dict[str, Any]:
+        endpoints = {label: stats.summary(elapsed_s) for label, stats in sorted(self.endpoints.items())}
+        requests = sum(e["requests"] for e in endpoints.values())
+        failed = sum(e["errors"] + e["timeouts"] for e in endpoints.values())
+        return {
+            "elapsed_s": round(elapsed_s, 3),
+            "totals": {
+                "requests": requests,
+                "failed": failed,
+                "error_rate": round(failed / requests, 4) if requests else 0.0,
+                "throughput_rps": round(requests / elapsed_s, 2) if elapsed_s > 0 else 0.0,
+            },
+            "endpoints": endpoints,
+        }
+
+
+def unwrap_response(message: Dict[str, Any]) -> Tuple[bool, Any, Optional[str]]:
+    """``(ok, payload, error)`` from a service reply on ``service_responses``
+
+    Replies nest as ``{"status", "data": {"status", "data": <ResponseBuilder dict>}}``;
+    handler failures surface at the middle level, business errors in the
+    ResponseBuilder dict.
+    """
+    envelope = message.get("data") or {}
+    if message.get("status") != "success" or envelope.get("status") != "success":
+        error = envelope.get("error") or message.get("error") or {}
+        return False, None, error.get("message") if isinstance(error, dict) else str(error)
+
+    body = envelope.get("data")
+    if isinstance(body, dict) and body.get("status") == "error":
+        return False, None, body.get("message") or body.get("error")
+    return True, body.get("data") if isinstance(body, dict) else body, None
+
+
+class RabbitMQClient:
+    """Publish requests the way Core does and match replies by correlation id"""
+
+    def __init__(self, url: str, timeout_s: float):
+        self.url = url
+        self.timeout_s = timeout_s
+        self.connection = None
+        self._exchange = None
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    async def connect(self):
+        import aio_pika
+
+        self.connection = await aio_pika.connect_robust(self.url, heartbeat=RabbitMQConfig.HEARTBEAT)
+        channel = await self.connection.channel()
+        self._exchange = await channel.declare_exchange(
+            RabbitMQConfig.EXCHANGE_NAMES["requests"], aio_pika.ExchangeType.DIRECT, durable=True
+        )
+        responses = await channel.declare_exchange(
+            RabbitMQConfig.EXCHANGE_NAMES["responses"], aio_pika.ExchangeType.DIRECT, durable=True
+        )
+        # A private queue gets a copy of every reply without taking them from Core
+        queue = await channel.declare_queue("", exclusive=True, auto_delete=True)
+        await queue.bind(responses, routing_key=RabbitMQConfig.ROUTING_KEYS["core_responses"])
+        await queue.consume(self._on_response, no_ack=True)
+
+    async def _on_response(self, message):
+        try:
+            body = json.loads(message.body.decode())
+        except ValueError:
+            return
+        future = self._pending.get(body.get("correlation_id"))
+        if future and not future.done():
+            future.set_result(body)
+
+    async def request(self, service: str, method: str, endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Send one request and wait for its reply; raises ``asyncio.TimeoutError``"""
+        import aio_pika
+
+        correlation_id = str(uuid.uuid4())
+        future = asyncio.get_running_loop().create_future()
+        self._pending[correlation_id] = future
+        message = {
+            "correlation_id": correlation_id,
+            "method": method,
+            "endpoint": endpoint,
+            "data": data,
+            "user_context": {"user_id": "loadgen", "role": "admin"},
+            "timestamp": datetime.utcnow().isoformat(),
+            "source": "loadgen",
+        }
+        try:
+            await self._exchange.publish(
+                aio_pika.Message(body=json.dumps(message).encode(), content_type="application/json"),
+                routing_key=f"{service}.requests",
+            )
+            return await asyncio.wait_for(future, timeout=self.timeout_s)
+        finally:
+            self._pending.pop(correlation_id, None)
+
+    async def close(self):
+        if self.connection:
+            await self.connection.close()
+
+
+class DryRunClient:
+    """Answers every request immediately, for measuring the generator itself"""
+
+    def __init__(self):
+        self._ids = 0
+
+    async def connect(self):
+        pass
+
+    async def request(self, service: str, method: str, endpoint: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        await asyncio.sleep(0)
+        self._ids += 1
+        payload = {"status": "success", "data": {"id": f"dry-run-{self._ids}"}}
+        return {"status": "success", "data": {"status": "success", "data": payload}}
+
+    async def close(self):
+        pass
+
+
+class SimulatedVehicle:
+    """The attributes ``FleetSimulationEngine`` drives, plus load-test bookkeeping"""
+
+    def __init__(self, index: int, run_id: str, route: Dict[str, Any], rng: random.Random):
+        self.trip_id = f"{run_id}-trip-{index:05d}"
+        self.vehicle_id = f"{run_id}-veh-{index:05d}"
+        self.driver_id = f"{run_id}-drv-{index:05d}"
+        self.route_coordinates = route["coordinates"]
+        self.geometry = RouteGeometry(route["coordinates"])
+        # Steps drive at their speed limit, which is also what the fixture router reports
+        self.speed_profile = {}
+        self.route_duration_s = 0.0
+        for step in route.get("steps") or [{"from_index": 0, "to_index": len(route["coordinates"]) - 1}]:
+            start, end = int(step["from_index"]), int(step["to_index"])
+            limit = float(step.get("speed_limit") or 60)
+            self.speed_profile.update(dict.fromkeys(range(start, end), limit))
+            step_m = self.geometry.distance_at_index(end) - self.geometry.distance_at_index(start)
+            self.route_duration_s += step_m / (limit / 3.6)
+
+        self.current_position = 0.0
+        self.current_speed_kmh = rng.uniform(30, 60)
+        self.target_speed = self.current_speed_kmh
+        self.speed_ms = self.current_speed_kmh / 3.6
+        self.speed_change_timer = 0
+        self.speed_change_interval = rng.randint(10, 20)
+        self.speed_change_rate = rng.uniform(0.3, 1.0)
+        self.min_speed = 20.0
+        self.max_speed = 140.0
+        self.distance_traveled = 0.0
+        self.last_location = tuple(route["coordinates"][0])
+        self.heading = 0.0
+        self.is_running = True
+        self.is_paused = False
+
+        self.remote_trip_id: Optional[str] = None
+        self.started = False
+        self.completed = False
+        self.next_gps_at = 0.0
+        self.next_ping_at = 0.0
+
+
+def build_fleet(count: int, fixture: Optional[RouteFixture], run_id: str, seed: int) -> List[SimulatedVehicle]:
+    """``count`` vehicles spread round-robin over the fixture routes, or on synthetic routes"""
+    rng = random.Random(seed)
+    fleet = []
+    for i in range(count):
+        if fixture is not None and len(fixture):
+            route = fixture.routes[i % len(fixture)]
+        else:
+            (lat_min, lat_max), (lon_min, lon_max) = SYNTHETIC_AREA
+            origin = (rng.uniform(lat_min, lat_max), rng.uniform(lon_min, lon_max))
+            destination = (rng.uniform(lat_min, lat_max), rng.uniform(lon_min, lon_max))
+            route = synthesise_route(origin, destination, seed=seed * 100003 + i)
+        fleet.append(SimulatedVehicle(i, run_id, route, rng))
+    return fleet
+
+
+class LoadGenerator:
+    """Drive a simulated fleet's requests and collect per-endpoint statistics"""
+
+    def __init__(self, client, fleet: List[SimulatedVehicle], args: argparse.Namespace):
+        self.client = client
+        self.fleet = fleet
+        self.args = args
+        self.report = LoadReport()
+        self.engine = FleetSimulationEngine(seed=args.seed)
+        self._slots = asyncio.Semaphore(args.concurrency)
+        self._pending = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.ticks = 0
+        self.max_tick_ms = 0.0
+
+    async def call(self, kind: Tuple[str, str, str], data: Dict[str, Any], trip_id: str = "") -> Tuple[bool, Any]:
+        service, method, template = kind
+        label = f"{service} {method} {template}"
+        due = time.perf_counter()
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            async with self._slots:
+                try:
+                    reply = await self.client.request(service, method, template.replace("{id}", trip_id), data)
+                except asyncio.TimeoutError:
+                    self.report.record(label, (time.perf_counter() - due) * 1000, False, timed_out=True)
+                    return False, None
+                except Exception as e:
+                    self.report.record(label, (time.perf_counter() - due) * 1000, False, error=str(e))
+                    return False, None
+            ok, payload, error = unwrap_response(reply)
+            self.report.record(label, (time.perf_counter() - due) * 1000, ok, error=error)
+            return ok, payload
+        finally:
+            self.in_flight -= 1
+
+    def submit(self, kind: Tuple[str, str, str], data: Dict[str, Any], trip_id: str = ""):
+        task = asyncio.create_task(self.call(kind, data, trip_id))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    # ---- trip lifecycle ----
+
+    def _trip_request(self, vehicle: SimulatedVehicle) -> Dict[str, Any]:
+        start = datetime.utcnow()
+        (lat0, lon0), (lat1, lon1) = vehicle.route_coordinates[0], vehicle.route_coordinates[-1]
+        return {
+            "name": f"Load test {vehicle.trip_id}",
+            "description": "Generated by benchmarks.loadgen",
+            "scheduled_start_time": start.isoformat(),
+            "scheduled_end_time": (start + timedelta(seconds=vehicle.route_duration_s * 2 + 3600)).isoformat(),
+            "origin": {"location": {"type": "Point", "coordinates": [lon0, lat0]}, "name": "Origin", "order": 0},
+            "destination": {"location": {"type": "Point", "coordinates": [lon1, lat1]}, "name": "Destination", "order": 1},
+            "priority": "normal",
+            "vehicle_id": vehicle.vehicle_id,
+            "driver_assignment": vehicle.driver_id,
+            "route_info": {
+                "distance": vehicle.geometry.length_m,
+                "duration": vehicle.route_duration_s,
+                "coordinates": vehicle.route_coordinates,
+            },
+        }
+
+    async def _open_trip(self, vehicle: SimulatedVehicle):
+        ok, trip = await self.call(CREATE, self._trip_request(vehicle))
+        trip_id = (trip.get("id") or trip.get("_id")) if ok and isinstance(trip, dict) else None
+        if not trip_id:
+            vehicle.is_running = False
+            return
+        vehicle.remote_trip_id = str(trip_id)
+        vehicle.started, _ = await self.call(START, {}, vehicle.remote_trip_id)
+        if not vehicle.started:
+            vehicle.is_running = False
+
+    def _complete(self, vehicle: SimulatedVehicle):
+        vehicle.completed = True
+        if vehicle.started:
+            self.submit(COMPLETE, {}, vehicle.remote_trip_id)
+
+    # ---- pings ----
+
+    def _send_pings(self, vehicle: SimulatedVehicle, now: float):
+        lat, lon = vehicle.last_location
+        timestamp = datetime.utcnow().isoformat()
+        if now >= vehicle.next_gps_at:
+            vehicle.next_gps_at = now + self.args.ping_interval
+            self.submit(GPS_UPDATE, {
+                "vehicle_id": vehicle.vehicle_id,
+                "latitude": lat,
+                "longitude": lon,
+                "speed": round(vehicle.current_speed_kmh, 2),
+                "heading": round(vehicle.heading, 1),
+                "accuracy": 5.0,
+                "timestamp": timestamp,
+            })
+        if vehicle.started and now >= vehicle.next_ping_at:
+            vehicle.next_ping_at = now + self.args.driver_ping_interval
+            self.submit(DRIVER_PING, {
+                "trip_id": vehicle.remote_trip_id,
+                "location": {"type": "Point", "coordinates": [lon, lat]},
+                "timestamp": timestamp,
+            })
+
+    # ---- run ----
+
+    async def run(self) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        started_at = time.perf_counter()
+        if self.args.lifecycle:
+            await asyncio.gather(*(self._open_trip(v) for v in self.fleet))
+        setup_s = time.perf_counter() - started_at
+
+        # Stagger the first pings so the fleet does not report in lockstep
+        rng = random.Random(self.args.seed)
+        now = loop.time()
+        for vehicle in self.fleet:
+            vehicle.next_gps_at = now + rng.uniform(0, self.args.ping_interval)
+            vehicle.next_ping_at = now + rng.uniform(0, self.args.driver_ping_interval)
+
+        deadline = now + self.args.duration
+        next_tick = now
+        while loop.time() < deadline and any(v.is_running for v in self.fleet):
+            tick_start = time.perf_counter()
+            self.engine.sync(self.fleet)
+            self.engine.step(self.args.tick * self.args.time_scale)
+            for update in self.engine.flush():
+                update.simulator.heading = update.heading
+            now = loop.time()
+            for vehicle in self.fleet:
+                if vehicle.is_running:
+                    self._send_pings(vehicle, now)
+                elif not vehicle.completed:
+                    self._complete(vehicle)
+            self.ticks += 1
+            self.max_tick_ms = max(self.max_tick_ms, (time.perf_counter() - tick_start) * 1000)
+
+            next_tick += self.args.tick
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+
+        # Trips still on the road when time runs out are completed so the run leaves nothing active
+        for vehicle in self.fleet:
+            if not vehicle.completed:
+                vehicle.is_running = False
+                self._complete(vehicle)
+        if self._pending:
+            await asyncio.wait(list(self._pending), timeout=self.args.timeout + 1)
+
+        result = self.report.as_dict(time.perf_counter() - started_at)
+        result["generator"] = {
+            "setup_s": round(setup_s, 3),
+            "ticks": self.ticks,
+            "max_tick_ms": round(self.max_tick_ms, 3),
+            "max_in_flight": self.max_in_flight,
+            "trips_started": sum(1 for v in self.fleet if v.started),
+            "arrived": sum(1 for v in self.fleet if v.current_position >= 1.0),
+        }
+        return result
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    fixture = None if args.synthetic else RouteFixture.load(args.fixture)
+    fleet = build_fleet(args.vehicles, fixture, args.run_id, args.seed)
+    client = DryRunClient() if args.dry_run else RabbitMQClient(args.amqp_url, args.timeout)
+    await client.connect()
+    try:
+        result = await LoadGenerator(client, fleet, args).run()
+    finally:
+        await client.close()
+
+    result["config"] = {
+        "vehicles": args.vehicles,
+        "duration_s": args.duration,
+        "tick_s": args.tick,
+        "time_scale": args.time_scale,
+        "ping_interval_s": args.ping_interval,
+        "driver_ping_interval_s": args.driver_ping_interval,
+        "concurrency": args.concurrency,
+        "lifecycle": args.lifecycle,
+        "routes": "synthetic" if fixture is None else f"{args.fixture} ({len(fixture)} recorded)",
+        "dry_run": args.dry_run,
+        "run_id": args.run_id,
+    }
+    return result
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--amqp-url", default=RabbitMQConfig.RABBITMQ_URL)
+    parser.add_argument("--vehicles", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds of load after setup")
+    parser.add_argument("--tick", type=float, default=1.0, help="Wall-clock seconds per simulation step")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Simulated seconds per wall-clock second")
+    parser.add_argument("--ping-interval", type=float, default=5.0, help="Seconds between GPS updates per vehicle")
+    parser.add_argument("--driver-ping-interval", type=float, default=10.0, help="Seconds between driver pings per vehicle")
+    parser.add_argument("--concurrency", type=int, default=200, help="Maximum requests in flight")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Seconds to wait for a reply")
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE)
+    parser.add_argument("--synthetic", action="store_true", help="Use synthetic routes instead of the fixture")
+    parser.add_argument("--no-lifecycle", dest="lifecycle", action="store_false",
+                        help="Only send GPS updates; no trips are created, so no driver pings either")
+    parser.add_argument("--dry-run", action="store_true", help="Answer requests locally instead of via RabbitMQ")
+    parser.add_argument("--run-id", default=f"load-{datetime.utcnow():%Y%m%d%H%M%S}")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    result = asyncio.run(main_async(args))
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
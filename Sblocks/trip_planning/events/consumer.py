@@ -12,6 +12,9 @@ import traceback
 
 logger = logging.getLogger(__name__)
 
+GEOFENCE_CHANGE_ACTIONS = ("created", "updated", "deleted")
+TRIP_LIFECYCLE_ACTIONS = ("created", "updated", "deleted", "started", "completed")
+
 
 class EventConsumer:
     """Event consumer for RabbitMQ"""
@@ -162,6 +165,24 @@ class EventConsumer:
 
             for pattern in patterns:
                 await queue.bind(exchange, routing_key=pattern)
+
+            # Geofence changes are published by the GPS service on its own exchange
+            gps_exchange = await self.channel.declare_exchange(
+                "gps_events",
+                aio_pika.ExchangeType.TOPIC,
+                durable=True
+            )
+            for action in GEOFENCE_CHANGE_ACTIONS:
+                await queue.bind(gps_exchange, routing_key=f"gps.geofence.{action}")
+
+            # Trip lifecycle changes, from this service's own publisher
+            trip_exchange = await self.channel.declare_exchange(
+                "trip_planning_events",
+                aio_pika.ExchangeType.TOPIC,
+                durable=True
+            )
+            for action in TRIP_LIFECYCLE_ACTIONS:
+                await queue.bind(trip_exchange, routing_key=f"trip.{action}")
                 
             # Start consuming
             self.is_consuming = True
@@ -221,6 +242,31 @@ async def handle_gps_event(event_data: Dict[str, Any], routing_key: str):
     logger.info(f"Handling gps event: {routing_key}")
     # Process user events that might affect places or permissions
 
+async def handle_geofence_change_event(event_data: Dict[str, Any], routing_key: str):
+    """Reload cached geofences when one is created, updated or deleted"""
+    if routing_key.rsplit(".", 1)[-1] not in GEOFENCE_CHANGE_ACTIONS:
+        return  # Vehicle enter/exit events share the prefix
+    logger.info(f"Geofence changed ({routing_key}), invalidating geofence cache")
+    from services.geofence_cache import geofence_cache
+    geofence_cache.invalidate()
+
+async def handle_trip_lifecycle_event(event_data: Dict[str, Any], routing_key: str):
+    """Drop a trip's cached status and re-read its missed-trip deadline when it is created, changed, started, completed or deleted"""
+    data = event_data.get("data") or {}
+    trip_id = data.get("trip_id")
+    if not trip_id:
+        return
+    logger.debug(f"Trip {trip_id} changed ({routing_key}), invalidating cached trip status")
+    from services.driver_ping_service import driver_ping_service
+    driver_ping_service.trip_statuses.invalidate(trip_id)
+    from services.missed_trip_scheduler import missed_trip_scheduler
+    if missed_trip_scheduler.running:
+        await missed_trip_scheduler.refresh(trip_id)
+    if routing_key == "trip.started" and data.get("driver_id"):
+        # Have the session ready for the first ping; the monitor's sweep catches missed events
+        from services.ping_session_monitor import ping_session_monitor
+        await ping_session_monitor.ensure_session(trip_id, data["driver_id"])
+
 async def handle_removed_user_event(data: Dict[str, Any], routing_key: str):
     """Handle removed user events"""
     logger.info(f"Handling removed user event: {routing_key}")
@@ -249,6 +295,8 @@ async def setup_event_handlers():
     """Setup event handlers"""
     await event_consumer.register_handler("management.*", handle_management_event)
     await event_consumer.register_handler("gps.*", handle_gps_event)
+    await event_consumer.register_handler("gps.geofence.*", handle_geofence_change_event)
+    await event_consumer.register_handler("trip.*", handle_trip_lifecycle_event)
     await event_consumer.register_handler("removed_user", handle_removed_user_event)
     
 # Global event consumer instance
@@ -34,6 +34,9 @@ class EventType(str, Enum):
     
     # Violation events
     SPEED_VIOLATION_CREATED = "violation.speed.created"
+    DRIVER_VIOLATIONS_RECORDED = "violation.driver.recorded"
+    DRIVER_VIOLATION_STARTED = "driver.violation_started"
+    DRIVER_VIOLATION_ENDED = "driver.violation_ended"
     
     # Service events
     SERVICE_STARTED = "service.started"
@@ -285,3 +288,29 @@ class SpeedViolationCreatedEvent(BaseEvent):
             },
             **kwargs
         )
+
+
+class DriverViolationsRecordedEvent(BaseEvent):
+    """Event published with the violations just counted against a driver, by type"""
+    event_type: EventType = EventType.DRIVER_VIOLATIONS_RECORDED
+    
+    @classmethod
+    def create(cls, driver_id: str, counts: Dict[str, int]) -> "DriverViolationsRecordedEvent":
+        return cls(
+            data={
+                "driver_id": driver_id,
+                "counts": counts,
+                "total": sum(counts.values()),
+                "recorded_at": datetime.utcnow().isoformat()
+            }
+        )
+
+
+class DriverViolationStartedEvent(BaseEvent):
+    """Event published when a driver's phone usage violation starts"""
+    event_type: EventType = EventType.DRIVER_VIOLATION_STARTED
+
+
+class DriverViolationEndedEvent(BaseEvent):
+    """Event published when a driver's phone usage violation ends"""
+    event_type: EventType = EventType.DRIVER_VIOLATION_ENDED
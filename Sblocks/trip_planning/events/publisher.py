@@ -184,6 +184,24 @@ class EventPublisher:
         )
         await self.publish_event(event, "violation.speed.created")
     
+    async def publish_driver_violations_recorded(self, driver_id: str, counts: Dict[str, int]) -> bool:
+        """Publish the number of violations of each type just recorded against a driver"""
+        from events.events import DriverViolationsRecordedEvent
+        event = DriverViolationsRecordedEvent.create(driver_id, counts)
+        return await self.publish_event(event, "violation.driver.recorded")
+    
+    async def publish_driver_violation_started(self, violation: Dict[str, Any]) -> bool:
+        """Publish the start of a phone usage violation"""
+        from events.events import DriverViolationStartedEvent
+        event = DriverViolationStartedEvent(data=violation)
+        return await self.publish_event(event, "driver.violation_started")
+    
+    async def publish_driver_violation_ended(self, violation: Dict[str, Any]) -> bool:
+        """Publish the end of a phone usage violation"""
+        from events.events import DriverViolationEndedEvent
+        event = DriverViolationEndedEvent(data=violation)
+        return await self.publish_event(event, "driver.violation_ended")
+    
     # Service-related event publishers
     async def publish_service_started(self, version: str, data: Dict[str, Any] = None) -> bool:
         """Publish service started event"""
@@ -24,6 +24,9 @@ from services.notification_service import notification_service
 from services.trip_service import trip_service
 from services.smart_trip_planning_service import smart_trip_service
 from services.upcoming_recommendations_service import upcoming_recommendation_service
+from services.route_cache import route_cache
+from services.provider_client import provider_client
+from services.geofence_cache import geofence_cache
 from services.request_consumer import service_request_consumer
 from api.routes.analytics import router as analytics_router
 from api.routes.drivers import router as drivers_router
@@ -35,6 +38,7 @@ from api.routes.driver_ping import router as driver_ping_router
 from api.routes.excessive_braking_violations import router as excessive_braking_violations_router
 from api.routes.excessive_acceleration_violations import router as excessive_acceleration_violations_router
 from api.routes.driver_history import router as driver_history_router
+from api.routes.violations import router as violations_router
 
 # Import middleware and exception handlers
 from middleware import (
@@ -50,7 +54,12 @@ from schemas.responses import ResponseBuilder
 # Import the simulation service
 from services.simulation_service import simulation_service
 from services.missed_trip_scheduler import missed_trip_scheduler
+from services.trip_kpi_service import driver_names, trip_kpi_service, vehicle_names
+from services.trip_rollup_service import trip_rollup_service
+from services.driver_behavior_service import driver_behavior_service
 from services.ping_session_monitor import ping_session_monitor
+from services.driver_ping_service import driver_ping_service
+from services.violation_ingest_service import violation_ingest_service
 from services.driver_history_scheduler import start_scheduler as start_driver_history_scheduler, stop_scheduler as stop_driver_history_scheduler
 
 # Setup logging
@@ -256,6 +265,13 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.error(f"Failed to start missed trip scheduler: {e}")
 
+        # Count existing trip history into the analytics rollups on first start
+        logger.info("Checking trip analytics rollups...")
+        try:
+            asyncio.create_task(trip_rollup_service.backfill_if_empty())
+        except Exception as e:
+            logger.error(f"Failed to start trip rollup backfill: {e}")
+
         # Start the ping session monitor
         logger.info("Starting ping session monitor...")
         try:
@@ -263,12 +279,28 @@ async def lifespan(app: FastAPI):
             logger.info("Ping session monitor started successfully")
         except Exception as e:
             logger.error(f"Failed to start ping session monitor: {e}")
+
+        # Start watching active ping sessions for timeouts
+        logger.info("Starting ping timeout monitor...")
+        try:
+            await driver_ping_service.start_monitoring()
+            logger.info("Ping timeout monitor started successfully")
+        except Exception as e:
+            logger.error(f"Failed to start ping timeout monitor: {e}")
+
+        # Start flushing queued violation events
+        logger.info("Starting violation ingest buffer...")
+        try:
+            await violation_ingest_service.start()
+            logger.info("Violation ingest buffer started successfully")
+        except Exception as e:
+            logger.error(f"Failed to start violation ingest buffer: {e}")
         
 
         # Start the driver history scheduler
         logger.info("Starting driver history scheduler...")
         try:
-            await start_driver_history_scheduler(update_interval=60)
+            await start_driver_history_scheduler()
             logger.info("Driver history scheduler started successfully")
         except Exception as e:
             logger.error(f"Failed to start driver history scheduler: {e}")
@@ -293,6 +325,14 @@ async def lifespan(app: FastAPI):
             except Exception as e:
                 logger.warning(f"Error stopping missed trip scheduler: {e}")
 
+            # Stop the traffic monitor
+            logger.info("Stopping traffic monitor...")
+            try:
+                await smart_trip_service.stop_traffic_monitoring()
+                logger.info("Traffic monitor stopped")
+            except Exception as e:
+                logger.warning(f"Error stopping traffic monitor: {e}")
+
             # Stop the ping session monitor
             logger.info("Stopping ping session monitor...")
             try:
@@ -301,6 +341,22 @@ async def lifespan(app: FastAPI):
             except Exception as e:
                 logger.warning(f"Error stopping ping session monitor: {e}")
 
+            # Stop the ping timeout monitor
+            logger.info("Stopping ping timeout monitor...")
+            try:
+                await driver_ping_service.stop_monitoring()
+                logger.info("Ping timeout monitor stopped")
+            except Exception as e:
+                logger.warning(f"Error stopping ping timeout monitor: {e}")
+
+            # Write out queued violation events
+            logger.info("Stopping violation ingest buffer...")
+            try:
+                await violation_ingest_service.stop()
+                logger.info("Violation ingest buffer stopped")
+            except Exception as e:
+                logger.warning(f"Error stopping violation ingest buffer: {e}")
+
             # Stop the driver history scheduler
             logger.info("Stopping driver history scheduler...")
             try:
@@ -317,6 +373,11 @@ async def lifespan(app: FastAPI):
             except Exception as e:
                 logger.warning(f"Error closing trip service: {e}")
 
+            try:
+                await provider_client.close()
+            except Exception as e:
+                logger.warning(f"Error closing provider client: {e}")
+
             # Publish service stopped event
             try:
                 await event_publisher.publish_service_stopped(
@@ -409,6 +470,7 @@ app.include_router(driver_ping_router, tags=["driver_ping"])
 app.include_router(excessive_braking_violations_router, tags=["excessive_braking_violations"])
 app.include_router(excessive_acceleration_violations_router, tags=["excessive_acceleration_violations"])
 app.include_router(driver_history_router, tags=["driver_history"])
+app.include_router(violations_router, tags=["violations"])
 
 @app.get("/")
 async def root():
@@ -500,6 +562,22 @@ async def get_service_metrics():
     """Get service performance metrics"""
     try:
         metrics = metrics_middleware.get_metrics()
+        metrics["simulation"] = simulation_service.get_simulation_metrics()
+        metrics["route_cache"] = route_cache.get_metrics()
+        metrics["providers"] = provider_client.get_metrics()
+        metrics["route_geometries"] = trip_service.route_geometries.get_metrics()
+        metrics["traffic_checks"] = smart_trip_service.traffic_scheduler.get_metrics()
+        metrics["geofences"] = geofence_cache.get_metrics()
+        metrics["ping_deadlines"] = driver_ping_service.ping_deadlines.get_metrics()
+        metrics["ping_sessions"] = driver_ping_service.session_store.get_metrics()
+        metrics["trip_statuses"] = driver_ping_service.trip_statuses.get_metrics()
+        metrics["missed_trips"] = missed_trip_scheduler.get_metrics()
+        metrics["trip_kpis"] = trip_kpi_service.get_metrics()
+        metrics["trip_rollups"] = trip_rollup_service.get_metrics()
+        metrics["driver_behavior"] = driver_behavior_service.get_metrics()
+        metrics["violation_ingest"] = violation_ingest_service.get_metrics()
+        metrics["driver_names"] = driver_names.get_metrics()
+        metrics["vehicle_names"] = vehicle_names.get_metrics()
         return ResponseBuilder.success(
             data=metrics,
             message="Service metrics retrieved successfully"
@@ -192,6 +192,26 @@ class DatabaseManager:
             await self.excessive_acceleration_violations.create_index([("trip_id", 1), ("time", -1)])
             await self.excessive_acceleration_violations.create_index("time")
             
+            # Violation analytics match on the violation date, optionally for one driver
+            for violations in (self.speed_violations, self.excessive_braking_violations,
+                               self.excessive_acceleration_violations, self.phone_usage_violations):
+                await violations.create_index("created_at")
+                await violations.create_index([("driver_id", 1), ("created_at", -1)])
+            
+            # Batch-ingested telematics violations are unique per driver, trip and time
+            for violations in (self.speed_violations, self.excessive_braking_violations,
+                               self.excessive_acceleration_violations):
+                await violations.create_index(
+                    "event_key", unique=True, partialFilterExpression={"event_key": {"$exists": True}}
+                )
+
+            # Trip KPIs match trip history on the creation date
+            await self.trip_history.create_index("created_at")
+
+            # Trip rollups are read by scope over a range of periods
+            await self.trip_rollups.create_index([("scope", 1), ("granularity", 1), ("period_start", 1)])
+            await self.trip_rollups.create_index([("period_start", 1), ("updated_at", 1)])
+
             # Driver ping sessions indexes
             await self.driver_ping_sessions.create_index("trip_id", unique=True)
             await self.driver_ping_sessions.create_index("driver_id")
@@ -212,6 +232,16 @@ class DatabaseManager:
                 ("driver_assignment", 1)
             ])
             
+            # Route cache entries are dropped by MongoDB once expired
+            await self.route_cache.create_index("expires_at", expireAfterSeconds=0)
+            await self.route_cache.create_index("provider")
+
+            # Unanswered route recommendations are dropped once they expire; answered ones are kept
+            await self.route_recommendations.create_index("trip_id")
+            await self.route_recommendations.create_index(
+                "expires_at", expireAfterSeconds=0, partialFilterExpression={"status": "pending"}
+            )
+            
             logger.info("Database indexes created successfully")
             
         except Exception as e:
@@ -238,6 +268,13 @@ class DatabaseManager:
         if self._db is None:
             raise RuntimeError("Database not connected")
         return self._db.trip_history
+
+    @property
+    def trip_rollups(self):
+        """Get daily and monthly trip analytics rollups"""
+        if self._db is None:
+            raise RuntimeError("Database not connected")
+        return self._db.trip_rollups
     
     @property
     def trip_constraints(self):
@@ -337,6 +374,13 @@ class DatabaseManager:
             raise RuntimeError("Database not connected")
         return self._db.upcoming_recommendations
 
+    @property
+    def route_cache(self):
+        """Get route cache collection"""
+        if self._db is None:
+            raise RuntimeError("Database not connected")
+        return self._db.route_cache
+
     
     async def create_trip_with_transaction(self, trip_data: dict, constraints: list = None):
         """Create a trip with constraints in a transaction"""
@@ -322,6 +322,11 @@ class DriverPingRequest(BaseModel):
     timestamp: Optional[datetime] = Field(default_factory=datetime.utcnow, description="Ping timestamp")
 
 
+class DriverPingBatchRequest(BaseModel):
+    """Several driver phone pings sent together"""
+    pings: List[DriverPingRequest] = Field(..., min_length=1, max_length=500, description="Pings in the order they were taken")
+
+
 class CreateSpeedViolationRequest(BaseModel):
     """Request to create a speed violation manually"""
     trip_id: str = Field(..., description="Trip ID where violation occurred")
@@ -331,9 +336,9 @@ class CreateSpeedViolationRequest(BaseModel):
     location: LocationPoint = Field(..., description="Location where violation occurred")
     time: datetime = Field(..., description="When violation occurred")
     
-    @validator('speed')
+    @validator('speed_limit')
     def validate_speed_exceeds_limit(cls, v, values):
-        if 'speed_limit' in values and v <= values['speed_limit']:
+        if 'speed' in values and values['speed'] <= v:
             raise ValueError('Speed must be greater than speed limit for a violation')
         return v
 
@@ -347,9 +352,9 @@ class CreateExcessiveBrakingViolationRequest(BaseModel):
     location: LocationPoint = Field(..., description="Location where violation occurred")
     time: datetime = Field(..., description="When violation occurred")
     
-    @validator('deceleration')
+    @validator('threshold')
     def validate_deceleration_exceeds_threshold(cls, v, values):
-        if 'threshold' in values and v <= values['threshold']:
+        if 'deceleration' in values and values['deceleration'] <= v:
             raise ValueError('Deceleration must be greater than threshold for a violation')
         return v
 
@@ -363,8 +368,17 @@ class CreateExcessiveAccelerationViolationRequest(BaseModel):
     location: LocationPoint = Field(..., description="Location where violation occurred")
     time: datetime = Field(..., description="When violation occurred")
     
-    @validator('acceleration')
+    @validator('threshold')
     def validate_acceleration_exceeds_threshold(cls, v, values):
-        if 'threshold' in values and v <= values['threshold']:
+        if 'acceleration' in values and values['acceleration'] <= v:
             raise ValueError('Acceleration must be greater than threshold for a violation')
         return v
+
+
+class ViolationBatchRequest(BaseModel):
+    """Telematics violation events of mixed types sent together"""
+    violations: List[Dict[str, Any]] = Field(
+        ..., min_length=1, max_length=1000,
+        description="Events with a type of speeding, braking or acceleration and that type's create fields"
+    )
+    wait: bool = Field(default=True, description="Write before responding rather than queue for the next flush")
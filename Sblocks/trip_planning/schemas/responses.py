@@ -254,4 +254,25 @@ class DriverPingResponse(BaseModel):
     ping_received_at: datetime = Field(..., description="When ping was received")
     next_ping_expected_at: datetime = Field(..., description="When next ping is expected")
     session_active: bool = Field(..., description="Whether ping session is active")
-    violations_count: int = Field(default=0, description="Number of violations in current session")
\ No newline at end of file
+    violations_count: int = Field(default=0, description="Number of violations in current session")
+
+
+class DriverPingBatchResponse(BaseModel):
+    """Response from the batch driver ping endpoint"""
+    model_config = ConfigDict(json_encoders={datetime: lambda v: v.isoformat() + 'Z'})
+    
+    accepted: int = Field(..., description="Pings recorded against an active session")
+    inactive: int = Field(default=0, description="Pings ignored because their trip is not in progress")
+    failed: int = Field(default=0, description="Pings that could not be processed")
+    results: List[Dict[str, Any]] = Field(..., description="Result for each ping, in request order")
+
+
+class ViolationBatchResponse(BaseModel):
+    """Response from the batch violation ingest endpoint"""
+    received: int = Field(..., description="Events in the request")
+    inserted: int = Field(default=0, description="Violations written")
+    duplicates: int = Field(default=0, description="Events already recorded, or repeated in the batch")
+    failed: int = Field(default=0, description="Valid events that could not be written and can be sent again")
+    queued: int = Field(default=0, description="Events queued for the next flush")
+    drivers: int = Field(default=0, description="Drivers whose counters moved")
+    rejected: List[Dict[str, Any]] = Field(default_factory=list, description="Index, type and reason of each invalid event")
@@ -6,7 +6,7 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta, timezone
 from bson import ObjectId
 
-from repositories.database import db_manager, db_manager_management
+from repositories.database import db_manager
 from schemas.entities import TripAnalytics, TripStatus
 from schemas.requests import AnalyticsRequest
 
@@ -19,55 +19,12 @@ class AnalyticsService:
     def __init__(self):
         self.db = db_manager
     
-    async def _get_driver_names(driver_ids: List[str]) -> Dict[str, str]:
+    async def _get_driver_names(self, driver_ids: List[str]) -> Dict[str, str]:
         """
         Get driver names from driver IDs.
         """
-        try:
-            if not driver_ids:
-                return {}
-                
-            # Convert to ObjectIds if they are valid ObjectId strings, otherwise keep as strings
-            query_ids = []
-            for driver_id in driver_ids:
-                if len(driver_id) == 24:  # Standard ObjectId length
-                    try:
-                        query_ids.append(ObjectId(driver_id))
-                    except:
-                        query_ids.append(driver_id)
-                else:
-                    query_ids.append(driver_id)
-            
-            # Query drivers collection - adjust field names based on your schema
-            drivers_cursor = db_manager_management.drivers.find(
-                {"_id": {"$in": query_ids}},
-                {"first_name": 1, "last_name": 1}
-            )
-            
-            drivers_data = await drivers_cursor.to_list(None)
-            driver_names = {}
-            
-            for driver in drivers_data:
-                driver_id = str(driver["_id"])
-                
-                # Try different name field combinations based on your schema
-                name = (
-                    f"{driver.get('first_name', '')} {driver.get('last_name', '')}".strip()
-                )
-                
-                driver_names[driver_id] = name
-            
-            # Add default names for drivers not found in the drivers collection
-            for original_id in driver_ids:
-                if original_id not in driver_names:
-                    driver_names[original_id] = f"Driver {original_id}"
-            
-            return driver_names
-            
-        except Exception as e:
-            logger.warning(f"Failed to get driver names: {e}")
-            # Return default names
-            return {driver_id: f"Driver {driver_id}" for driver_id in driver_ids}
+        from services.trip_kpi_service import driver_names
+        return await driver_names.resolve(driver_ids)
     
     async def get_analytics_first(self, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
         """
@@ -133,7 +90,7 @@ class AnalyticsService:
             
             # Get driver names
             logger.info("[DriverAnalytics] Fetching driver names")
-            driver_names = self._get_driver_names([result["_id"] for result in driver_results if result["_id"]])
+            driver_names = await self._get_driver_names([result["_id"] for result in driver_results if result["_id"]])
             
             # Format driver analytics
             drivers = []
@@ -494,56 +451,16 @@ class AnalyticsService:
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None
     ) -> List[Dict[str, Any]]:
-        """Get driver performance metrics"""
+        """Get driver performance metrics for trips created in the period, from the trip rollups"""
         try:
-            # Build query
-            query = {}
-            if start_date or end_date:
-                date_query = {}
-                if start_date:
-                    date_query["$gte"] = start_date
-                if end_date:
-                    date_query["$lte"] = end_date
-                query["scheduled_start_time"] = date_query
-            
-            if driver_ids:
-                query["driver_assignment"] = {"$in": driver_ids}
-            else:
-                # Get all drivers with trips in the period
-                query["driver_assignment"] = {"$exists": True}
-            
-            # Aggregate by driver
-            pipeline = [
-                {"$match": query},
-                {
-                    "$group": {
-                        "_id": "$driver_assignment",
-                        "total_trips": {"$sum": 1},
-                        "completed_trips": {
-                            "$sum": {"$cond": [{"$eq": ["$status", "completed"]}, 1, 0]}
-                        },
-                        "cancelled_trips": {
-                            "$sum": {"$cond": [{"$eq": ["$status", "cancelled"]}, 1, 0]}
-                        },
-                        "total_planned_duration": {"$sum": "$estimated_duration"},
-                        "total_actual_duration": {"$sum": "$actual_duration"},
-                        "total_distance": {"$sum": "$estimated_distance"},
-                        "on_time_trips": {
-                            "$sum": {
-                                "$cond": [
-                                    {"$lte": ["$actual_start_time", "$scheduled_start_time"]},
-                                    1, 0
-                                ]
-                            }
-                        }
-                    }
-                }
-            ]
+            from services.trip_rollup_service import trip_rollup_service
+            summary = await trip_rollup_service.summarize(
+                start_date, end_date, scopes=("driver",), keys=driver_ids, violations=True
+            )
             
             driver_stats = []
-            async for driver_data in self.db.trips.aggregate(pipeline):
-                driver_id = driver_data["_id"]
-                total_trips = driver_data["total_trips"]
+            for driver_id, driver_data in summary["driver"].items():
+                total_trips = driver_data["trips"]
                 completed_trips = driver_data["completed_trips"]
                 
                 performance = {
@@ -551,12 +468,13 @@ class AnalyticsService:
                     "total_trips": total_trips,
                     "completed_trips": completed_trips,
                     "cancelled_trips": driver_data["cancelled_trips"],
-                    "on_time_rate": (driver_data["on_time_trips"] / total_trips * 100) if total_trips > 0 else 0,
+                    "on_time_rate": (driver_data["on_time_trips"] / completed_trips * 100) if completed_trips > 0 else 0,
                     "completion_rate": (completed_trips / total_trips * 100) if total_trips > 0 else 0,
                     "average_trip_duration": (
-                        driver_data["total_actual_duration"] / completed_trips
+                        driver_data["actual_duration"] / completed_trips
                     ) if completed_trips > 0 else None,
-                    "total_distance": driver_data["total_distance"]
+                    "total_distance": driver_data["distance"],
+                    "violations": driver_data["violations"]
                 }
                 
                 # Get additional metrics from analytics data
@@ -576,64 +494,33 @@ class AnalyticsService:
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None
     ) -> Dict[str, Any]:
-        """Analyze route efficiency metrics"""
+        """Analyze route efficiency of completed trips created in the period, from the trip rollups"""
         try:
-            query = {"status": TripStatus.COMPLETED}
-            
-            if start_date or end_date:
-                date_query = {}
-                if start_date:
-                    date_query["$gte"] = start_date
-                if end_date:
-                    date_query["$lte"] = end_date
-                query["actual_end_time"] = date_query
-            
-            # Aggregate efficiency metrics
-            pipeline = [
-                {"$match": query},
-                {
-                    "$lookup": {
-                        "from": "trip_analytics",
-                        "localField": "_id",
-                        "foreignField": "trip_id",
-                        "as": "analytics"
-                    }
-                },
-                {"$unwind": {"path": "$analytics", "preserveNullAndEmptyArrays": True}},
-                {
-                    "$group": {
-                        "_id": None,
-                        "total_trips": {"$sum": 1},
-                        "avg_planned_duration": {"$avg": "$estimated_duration"},
-                        "avg_actual_duration": {"$avg": "$analytics.actual_duration"},
-                        "avg_planned_distance": {"$avg": "$estimated_distance"},
-                        "avg_actual_distance": {"$avg": "$analytics.actual_distance"},
-                        "total_delays": {"$sum": "$analytics.delays"},
-                        "total_fuel": {"$sum": "$analytics.fuel_consumption"},
-                        "total_cost": {"$sum": "$analytics.cost"}
-                    }
-                }
-            ]
-            
-            result = await self.db.trips.aggregate(pipeline).to_list(length=1)
-            
-            if result:
-                data = result[0]
+            from services.trip_rollup_service import FLEET_KEY, trip_rollup_service
+            summary = await trip_rollup_service.summarize(start_date, end_date, scopes=("fleet",))
+            data = summary["fleet"].get(FLEET_KEY)
+            
+            if data and data["completed_trips"]:
+                completed_trips = data["completed_trips"]
+                avg_planned_duration = data["planned_duration"] / completed_trips
+                # Like the durations' old $avg, trips without actual times are left out
+                timed_trips = data["timed_completed_trips"]
+                avg_actual_duration = data["actual_duration"] / timed_trips if timed_trips else None
+                # Trips record no actual distance, fuel or cost yet
                 efficiency = {
-                    "total_completed_trips": data["total_trips"],
-                    "average_planned_duration": data["avg_planned_duration"],
-                    "average_actual_duration": data["avg_actual_duration"],
+                    "total_completed_trips": completed_trips,
+                    "average_planned_duration": avg_planned_duration,
+                    "average_actual_duration": avg_actual_duration,
                     "duration_variance": (
-                        data["avg_actual_duration"] - data["avg_planned_duration"]
-                    ) if data["avg_planned_duration"] else 0,
-                    "average_planned_distance": data["avg_planned_distance"],
-                    "average_actual_distance": data["avg_actual_distance"],
-                    "distance_variance": (
-                        data["avg_actual_distance"] - data["avg_planned_distance"]
-                    ) if data["avg_planned_distance"] else 0,
-                    "average_delay": data["total_delays"] / data["total_trips"] if data["total_trips"] > 0 else 0,
-                    "fuel_efficiency": data["total_fuel"] / data["avg_actual_distance"] if data["avg_actual_distance"] else 0,
-                    "cost_per_km": data["total_cost"] / data["avg_actual_distance"] if data["avg_actual_distance"] else 0
+                        avg_actual_duration - avg_planned_duration
+                    ) if avg_planned_duration and avg_actual_duration is not None else 0,
+                    "average_planned_distance": data["planned_distance"] / completed_trips,
+                    "average_actual_distance": None,
+                    "distance_variance": 0,
+                    "on_time_rate": data["on_time_trips"] / completed_trips * 100,
+                    "average_delay": data["delay_minutes"] / completed_trips,
+                    "fuel_efficiency": 0,
+                    "cost_per_km": 0
                 }
             else:
                 efficiency = {
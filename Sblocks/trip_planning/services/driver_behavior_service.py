@@ -0,0 +1,311 @@
+"""
+Driver behaviour analytics reports
+
+The violation trends, risk distribution, performance metrics and violation
+comparison reports served under ``/driver-behavior``. The HTTP routes and
+the RabbitMQ request consumer both call ``get_report``, so a request from
+the gateway is answered in-process instead of looping back through this
+service's own HTTP API. A report is kept for
+``DRIVER_BEHAVIOR_CACHE_TTL_SECONDS`` per period and driver. Concurrent
+requests for a report that is not cached wait for the same computation.
+The time taken to build and to serve each report is kept for ``/metrics``.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from services.violation_analytics_service import violation_analytics_service
+
+logger = logging.getLogger(__name__)
+
+DRIVER_BEHAVIOR_CACHE_TTL_SECONDS = float(os.getenv("DRIVER_BEHAVIOR_CACHE_TTL_SECONDS", "30"))
+
+PERIODS = {"7d": 7, "30d": 30, "90d": 90}
+
+
+class DriverBehaviorService:
+    """Cached driver behaviour reports built from ``ViolationAnalyticsService``"""
+
+    def __init__(
+        self,
+        violations=violation_analytics_service,
+        ttl_s: float = DRIVER_BEHAVIOR_CACHE_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+        utcnow: Callable[[], datetime] = datetime.utcnow
+    ):
+        self.violations = violations
+        self.ttl_s = ttl_s
+        self.clock = clock
+        self.utcnow = utcnow
+        # Report name -> (builder, default period, whether it can be filtered by driver)
+        self.reports = {
+            "violation-trends": (self._violation_trends, "7d", True),
+            "risk-distribution": (self._risk_distribution, None, False),
+            "performance-metrics": (self._performance_metrics, "30d", False),
+            "violation-comparison": (self._violation_comparison, "30d", False),
+        }
+        self._cache: Dict[Tuple, Tuple[float, Dict[str, Any]]] = {}
+        self._pending: Dict[Tuple, asyncio.Future] = {}
+        # Bumped by invalidate() so reports started before it are not cached
+        self._generation = 0
+        self.stats = {
+            name: {"requests": 0, "hits": 0, "builds": 0, "build_ms": 0.0, "serve_ms": 0.0}
+            for name in self.reports
+        }
+
+    async def get_report(
+        self,
+        report: str,
+        period: Optional[str] = None,
+        driver_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        A report's ``message`` and ``data``, at most ``ttl_s`` seconds old
+
+        Unknown periods fall back to the report's default; ``driver_id`` only
+        filters the violation trends. Raises ``ValueError`` for an unknown
+        report.
+        """
+        if report not in self.reports:
+            raise ValueError(f"Unknown driver behavior report: {report}")
+        builder, default_period, by_driver = self.reports[report]
+        days = PERIODS.get(period, PERIODS[default_period]) if default_period else None
+        key = (report, days, driver_id if by_driver else None)
+
+        started = time.perf_counter()
+        stats = self.stats[report]
+        stats["requests"] += 1
+        try:
+            cached = self._cache.get(key)
+            if cached is not None and self.clock() - cached[0] < self.ttl_s:
+                stats["hits"] += 1
+                return cached[1]
+
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = asyncio.ensure_future(self._build(key, builder))
+                pending.add_done_callback(lambda done: self._pending.pop(key) if self._pending.get(key) is done else None)
+            else:
+                stats["hits"] += 1
+            return await asyncio.shield(pending)
+        finally:
+            stats["serve_ms"] += (time.perf_counter() - started) * 1000
+
+    def invalidate(self):
+        """Drop cached reports"""
+        self._generation += 1
+        self._cache.clear()
+        self._pending.clear()
+
+    async def _build(self, key: Tuple, builder) -> Dict[str, Any]:
+        report, days, driver_id = key
+        generation = self._generation
+        started = time.perf_counter()
+        result = await builder(days, driver_id)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.stats[report]["builds"] += 1
+        self.stats[report]["build_ms"] += elapsed_ms
+        if generation == self._generation:
+            self._cache[key] = (self.clock(), result)
+        logger.info(f"[DriverBehaviorService] Built {report} for days={days} driver_id={driver_id} in {elapsed_ms:.1f}ms")
+        return result
+
+    # -------------------- Reports --------------------
+    async def _violation_trends(self, days: int, driver_id: Optional[str]) -> Dict[str, Any]:
+        """Daily violation counts by type, with zero days filled in"""
+        now = self.utcnow()
+        start_date = now - timedelta(days=days)
+
+        daily_counts = await self.violations.get_daily_violation_counts(start_date, driver_id)
+
+        trends_data: Dict[str, list] = {}
+        total_violations = 0
+        for label, counts in daily_counts.items():
+            total_violations += sum(counts.values())
+            series = []
+            cur = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+            end = now.replace(hour=0, minute=0, second=0, microsecond=0)
+            while cur <= end:
+                key = cur.strftime("%Y-%m-%d")
+                series.append({"date": key, "count": counts.get(key, 0)})
+                cur += timedelta(days=1)
+            trends_data[label] = series
+
+        summary = {
+            "total_violations": total_violations,
+            "period_days": days,
+            "start_date": start_date.isoformat(),
+            "end_date": now.isoformat(),
+            "driver_filter": driver_id
+        }
+        return {
+            "message": "Violation trends retrieved successfully",
+            "data": {"trends": trends_data, "summary": summary}
+        }
+
+    async def _driver_statistics(self) -> Dict[str, Any]:
+        try:
+            return await self.violations.get_driver_statistics()
+        except Exception as e:
+            logger.warning(f"[DriverBehaviorService] Error querying driver_history: {e}")
+            return {"drivers": 0}
+
+    async def _risk_distribution(self, days: Optional[int] = None, driver_id: Optional[str] = None) -> Dict[str, Any]:
+        """Drivers by risk level and safety score, with the top and worst performers"""
+        stats = await self._driver_statistics()
+
+        if not stats["drivers"]:
+            # Return empty distribution if no driver data
+            return {
+                "message": "No driver data available",
+                "data": {
+                    "distribution": {"low_risk": 0, "medium_risk": 0, "high_risk": 0},
+                    "safety_score_ranges": {
+                        "90-100": 0, "80-89": 0, "70-79": 0, "60-69": 0, "below_60": 0
+                    },
+                    "performance_metrics": {
+                        "avg_safety_score": 0, "violation_rate": 0, "improvement_trend": "neutral"
+                    },
+                    "top_performers": [],
+                    "worst_performers": []
+                }
+            }
+
+        total_trips = stats["total_trips_or_one"]
+        violation_rate = round(stats["total_violations"] / total_trips, 3) if total_trips > 0 else 0
+
+        # Determine improvement trend (simplified logic)
+        recent_violations = stats["recent_violations"]
+        historical_violations = stats["historical_violations"]
+
+        if recent_violations < historical_violations * 0.8:
+            improvement_trend = "positive"
+        elif recent_violations > historical_violations * 1.2:
+            improvement_trend = "negative"
+        else:
+            improvement_trend = "neutral"
+
+        return {
+            "message": "Driver risk distribution retrieved successfully",
+            "data": {
+                "distribution": stats["risk_distribution"],
+                "safety_score_ranges": stats["safety_score_ranges"],
+                "performance_metrics": {
+                    "avg_safety_score": round(stats["avg_safety_score"] or 0, 2),
+                    "violation_rate": violation_rate,
+                    "improvement_trend": improvement_trend
+                },
+                "top_performers": stats["top_performers"],
+                "worst_performers": stats["worst_performers"]
+            }
+        }
+
+    async def _performance_metrics(self, days: int, driver_id: Optional[str] = None) -> Dict[str, Any]:
+        """Fleet-wide violation counts, safety trends and key indicators for the period"""
+        start_date = self.utcnow() - timedelta(days=days)
+        prev_start_date = start_date - timedelta(days=days)
+
+        # Violation counts by type for this and the previous period
+        try:
+            period_counts = await self.violations.get_period_violation_counts(start_date, prev_start_date)
+        except Exception as e:
+            logger.warning(f"[DriverBehaviorService] Error counting violations: {e}")
+            period_counts = {}
+        violation_counts = {label: counts["current"] for label, counts in period_counts.items()}
+        total_violations = sum(violation_counts.values())
+        prev_total_violations = sum(counts["previous"] for counts in period_counts.values())
+        critical_violations = sum(counts["critical"] for counts in period_counts.values())
+
+        stats = await self._driver_statistics()
+        drivers = stats["drivers"]
+
+        # Calculate safety metrics
+        if drivers:
+            avg_safety_score = round(stats["avg_safety_score"] or 0, 2)
+
+            # Calculate improvement percentage
+            if prev_total_violations > 0:
+                period_change = round(((prev_total_violations - total_violations) / prev_total_violations) * 100, 2)
+            else:
+                period_change = 0
+
+            # Mock other trend calculations (would need historical data)
+            violation_rate_change = period_change * 0.6  # Approximate correlation
+            avg_safety_score_change = 2.1 if period_change > 0 else -1.5
+        else:
+            avg_safety_score = 0
+            period_change = 0
+            violation_rate_change = 0
+            avg_safety_score_change = 0
+
+        # Driver improvement and completion metrics
+        driver_improvement_rate = round(stats["improving_drivers"] / drivers, 2) if drivers else 0
+        total_trips = stats.get("total_trips", 0)
+        avg_completion_rate = round(stats["completed_trips"] / total_trips, 2) if total_trips > 0 else 0
+
+        return {
+            "message": "Performance metrics retrieved successfully",
+            "data": {
+                "violation_counts": violation_counts,
+                "total_violations": total_violations,
+                "active_drivers": drivers,
+                "safety_trends": {
+                    "period_change": period_change,
+                    "violation_rate_change": violation_rate_change,
+                    "avg_safety_score_change": avg_safety_score_change
+                },
+                "key_metrics": {
+                    "violations_per_driver": round(total_violations / drivers, 2) if drivers else 0,
+                    "violations_per_day": round(total_violations / days, 2),
+                    "critical_violations": critical_violations,
+                    "avg_safety_score": avg_safety_score,
+                    "driver_improvement_rate": driver_improvement_rate,
+                    "avg_driver_completion_rate": avg_completion_rate
+                }
+            }
+        }
+
+    async def _violation_comparison(self, days: int, driver_id: Optional[str] = None) -> Dict[str, Any]:
+        """Count, share and severity spread of each violation type for the period"""
+        start_date = self.utcnow() - timedelta(days=days)
+
+        comparison_data = await self.violations.get_violation_comparison(start_date)
+        total_violations = sum(data["count"] for data in comparison_data.values())
+
+        # Calculate percentages
+        for data in comparison_data.values():
+            data["percentage"] = round((data["count"] / total_violations) * 100, 2) if total_violations > 0 else 0
+
+        # Find most common violation type
+        most_common = max(comparison_data.items(), key=lambda x: x[1]["count"]) if total_violations > 0 else ("none", {"count": 0})
+
+        summary = {
+            "total_violations": total_violations,
+            "most_common_type": most_common[0],
+            "most_common_count": most_common[1]["count"],
+            "period_days": days,
+            "violations_per_day": round(total_violations / days, 2) if days > 0 else 0
+        }
+        return {
+            "message": "Violation comparison retrieved successfully",
+            "data": {"comparison": comparison_data, "summary": summary}
+        }
+
+    def get_metrics(self) -> Dict[str, Any]:
+        metrics = {"reports": len(self._cache)}
+        for name, stats in self.stats.items():
+            metrics[name] = {
+                "requests": stats["requests"],
+                "hits": stats["hits"],
+                "builds": stats["builds"],
+                "avg_build_ms": round(stats["build_ms"] / stats["builds"], 2) if stats["builds"] else 0,
+                "avg_serve_ms": round(stats["serve_ms"] / stats["requests"], 2) if stats["requests"] else 0,
+            }
+        return metrics
+
+
+# Global instance
+driver_behavior_service = DriverBehaviorService()
@@ -2,11 +2,15 @@
 Driver History Scheduler Service
 
 This service runs background tasks to periodically update driver history calculations.
-It ensures driver statistics are kept up-to-date even when trips are not being completed.
+Histories are updated as trips finish and violations are recorded, so this
+is a reconciliation job: it recounts every driver from the trip and
+violation collections every ``DRIVER_HISTORY_RECONCILE_INTERVAL_SECONDS``
+to repair drift from missed updates.
 """
 
 import asyncio
 import logging
+import os
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import signal
@@ -19,16 +23,18 @@ from services.driver_history_service import DriverHistoryService
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+DRIVER_HISTORY_RECONCILE_INTERVAL_SECONDS = int(os.getenv("DRIVER_HISTORY_RECONCILE_INTERVAL_SECONDS", "3600"))
+
 
 class DriverHistoryScheduler:
     """Background scheduler for driver history updates"""
     
-    def __init__(self, update_interval: int = 60):
+    def __init__(self, update_interval: int = DRIVER_HISTORY_RECONCILE_INTERVAL_SECONDS):
         """
         Initialize the scheduler
         
         Args:
-            update_interval: Interval in seconds between updates (default: 60)
+            update_interval: Interval in seconds between reconciliations (default: 1 hour)
         """
         self.update_interval = update_interval
         self.driver_history_service = DriverHistoryService(db_manager, db_manager_management)
@@ -136,74 +142,11 @@ class DriverHistoryScheduler:
             raise
     
     async def _update_all_drivers(self) -> int:
-        """Update driver history for all drivers"""
-        try:
-            # Get list of all unique drivers from completed trips
-            drivers = await self._get_drivers_needing_updates()
-            
-            if not drivers:
-                logger.debug("No drivers found needing history updates")
-                return 0
-            
-            updated_count = 0
-            
-            for driver_id in drivers:
-                try:
-                    # Update driver history for this driver
-                    await self.driver_history_service._recalculate_driver_history(driver_id)
-                    updated_count += 1
-                    logger.debug(f"Updated history for driver {driver_id}")
-                    
-                except Exception as e:
-                    logger.error(f"Failed to update history for driver {driver_id}: {e}")
-                    # Continue with other drivers even if one fails
-                    continue
-            
-            return updated_count
-            
-        except Exception as e:
-            logger.error(f"Error getting drivers for updates: {e}")
-            raise
-    
-    async def _get_drivers_needing_updates(self) -> List[str]:
-        """Get list of drivers that need history updates"""
-        try:
-            # Get all unique driver IDs from trips collection
-            trips_collection = db_manager.db.trips
-            
-            # Find unique driver IDs from trips in the last 24 hours
-            # This ensures we update active drivers more frequently
-            cutoff_time = datetime.now() - timedelta(hours=24)
-            
-            pipeline = [
-                {
-                    "$match": {
-                        "status": "completed",
-                        "end_time": {"$gte": cutoff_time}
-                    }
-                },
-                {
-                    "$group": {
-                        "_id": "$driver_id"
-                    }
-                },
-                {
-                    "$project": {
-                        "driver_id": "$_id",
-                        "_id": 0
-                    }
-                }
-            ]
-            
-            result = trips_collection.aggregate(pipeline)
-            drivers = [doc["driver_id"] for doc in result if doc.get("driver_id")]
-            
-            logger.debug(f"Found {len(drivers)} drivers needing updates")
-            return drivers
-            
-        except Exception as e:
-            logger.error(f"Error querying drivers from trips: {e}")
-            return []
+        """Reconcile driver history for all drivers"""
+        result = await self.driver_history_service.recalculate_all_driver_histories()
+        if result["errors"]:
+            logger.warning(f"Driver history reconciliation had {len(result['errors'])} failed batches")
+        return result["updated_drivers"]
     
     def get_stats(self) -> Dict:
         """Get scheduler statistics"""
@@ -233,7 +176,7 @@ class DriverHistoryScheduler:
 scheduler_instance: Optional[DriverHistoryScheduler] = None
 
 
-async def start_scheduler(update_interval: int = 60):
+async def start_scheduler(update_interval: int = DRIVER_HISTORY_RECONCILE_INTERVAL_SECONDS):
     """Start the global scheduler instance"""
     global scheduler_instance
     
@@ -274,7 +217,7 @@ async def main():
     
     try:
         # Start the scheduler
-        scheduler = await start_scheduler(update_interval=60)
+        scheduler = await start_scheduler()
         
         # Keep the service running
         while True:
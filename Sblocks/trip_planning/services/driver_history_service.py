@@ -1,17 +1,39 @@
 """
 Driver History Service for calculating and managing driver performance metrics
+
+Histories are kept current incrementally: a finished trip or a new
+violation ``$inc``s the driver's counters in one atomic update and the
+safety score is recomputed from the counters that update returned. A full
+recalculation is only a reconciliation job; it counts trips and violations
+for a batch of drivers with one ``$group`` per collection and writes the
+batch back with one ``bulk_write``.
 """
+import asyncio
 import logging
+import os
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, List, Tuple
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
 
 from schemas.entities import DriverHistory, RiskLevel
-from repositories.database import DatabaseManager, DatabaseManagerManagement
+from repositories.database import DatabaseManager, DatabaseManagerManagement, db_manager, db_manager_management
 
 logger = logging.getLogger(__name__)
 
+# Violation type -> (violation collection, counter on the driver's history)
+VIOLATION_COUNTERS = {
+    "speeding": ("speed_violations", "speeding_violations"),
+    "braking": ("excessive_braking_violations", "braking_violations"),
+    "acceleration": ("excessive_acceleration_violations", "acceleration_violations"),
+    "phone_usage": ("phone_usage_violations", "phone_usage_violations"),
+}
+COUNTER_FIELDS = ("total_assigned_trips", "completed_trips", "cancelled_trips",
+                  *(field for _, field in VIOLATION_COUNTERS.values()))
+RECONCILE_BATCH_SIZE = int(os.getenv("DRIVER_HISTORY_RECONCILE_BATCH_SIZE", "500"))
+RECONCILE_CONCURRENCY = int(os.getenv("DRIVER_HISTORY_RECONCILE_CONCURRENCY", "4"))
+
 
 class DriverHistoryService:
     """Service for managing driver performance history and metrics"""
@@ -44,32 +66,13 @@ class DriverHistoryService:
             Updated driver history data
         """
         try:
-            # Get existing driver history or create new one
-            history = await self._get_or_create_driver_history(driver_id)
-            
-            # Update trip statistics based on status
+            increments = {"total_assigned_trips": 1}
             if trip_status.lower() == 'completed':
-                history.completed_trips += 1
+                increments["completed_trips"] = 1
             elif trip_status.lower() == 'cancelled':
-                history.cancelled_trips += 1
-            
-            # Calculate trip completion rate
-            total_finished_trips = history.completed_trips + history.cancelled_trips
-            if total_finished_trips > 0:
-                history.trip_completion_rate = (history.completed_trips / total_finished_trips) * 100
-            
-            # Update violation counts
-            await self._update_violation_counts(history, driver_id)
-            
-            # Calculate safety score and risk level
-            history.driver_safety_score = await self._calculate_safety_score(history)
-            history.driver_risk_level = self._determine_risk_level(history)
+                increments["cancelled_trips"] = 1
             
-            # Update timestamp
-            history.last_updated = datetime.utcnow()
-            
-            # Save to database
-            await self._save_driver_history(history)
+            history = await self.apply_deltas(driver_id, increments)
             
             logger.info(f"Updated driver history for driver {driver_id} after trip {trip_id}")
             
@@ -85,6 +88,101 @@ class DriverHistoryService:
             logger.error(f"Error updating driver history for {driver_id}: {str(e)}")
             raise
     
+    async def record_violation(self, driver_id: str, violation_type: str, count: int = 1):
+        """
+        Count new violations against a driver
+        
+        The violations are counted in the analytics rollups as well.
+        Failures are logged rather than raised; the reconciliation job
+        recounts from the violation collections.
+        
+        Args:
+            driver_id: ID of the driver
+            violation_type: 'speeding', 'braking', 'acceleration' or 'phone_usage'
+            count: Number of new violations
+        """
+        await self.record_violations({driver_id: {violation_type: count}})
+    
+    async def record_violations(self, counts: Dict[str, Dict[str, int]]):
+        """
+        Count new violations against many drivers at once
+        
+        Each driver's counters move in one ``apply_deltas`` whatever the mix
+        of types, and the analytics rollups take every driver in one write.
+        Failures are logged like ``record_violation``.
+        
+        Args:
+            counts: Driver ID -> violation type -> number of new violations
+        """
+        counts = {
+            driver_id: {violation_type: count for violation_type, count in by_type.items() if count > 0}
+            for driver_id, by_type in counts.items() if driver_id
+        }
+        counts = {driver_id: by_type for driver_id, by_type in counts.items() if by_type}
+        if not counts:
+            return
+        
+        async def apply(driver_id: str, by_type: Dict[str, int]):
+            try:
+                await self.apply_deltas(driver_id, {
+                    VIOLATION_COUNTERS[violation_type][1]: count for violation_type, count in by_type.items()
+                })
+            except Exception as e:
+                logger.error(f"Error recording {', '.join(by_type)} violations for driver {driver_id}: {str(e)}")
+        
+        await asyncio.gather(*(apply(driver_id, by_type) for driver_id, by_type in counts.items()))
+        
+        from services.trip_rollup_service import trip_rollup_service
+        await trip_rollup_service.record_violations(counts)
+    
+    async def apply_deltas(self, driver_id: str, increments: Dict[str, int]) -> DriverHistory:
+        """
+        Atomically add to a driver's counters and recompute the safety score
+        
+        Args:
+            driver_id: ID of the driver
+            increments: Counter field -> amount to add
+            
+        Returns:
+            Driver history after the update
+        """
+        collection = self.db_manager.driver_history
+        now = datetime.utcnow()
+        doc = await collection.find_one_and_update(
+            {"driver_id": driver_id},
+            {
+                "$inc": increments,
+                "$setOnInsert": {
+                    "created_at": now,
+                    **{field: 0 for field in COUNTER_FIELDS if field not in increments}
+                }
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        
+        fields = {}
+        if not doc.get("driver_name"):
+            driver_info = await self._get_driver_info(driver_id)
+            fields = {
+                "driver_name": driver_info.get("full_name", "Unknown Driver"),
+                "employee_id": driver_info.get("employee_id", driver_id)
+            }
+        history = await self._rescore(DriverHistory(**{**self._convert_objectid_to_string(doc), **fields}))
+        fields.update({
+            "trip_completion_rate": history.trip_completion_rate,
+            "driver_safety_score": history.driver_safety_score,
+            "driver_risk_level": history.driver_risk_level.value,
+            "last_updated": history.last_updated
+        })
+        
+        # Only write the score if no other delta has landed since; that delta writes a newer one
+        await collection.update_one(
+            {"driver_id": driver_id, **{field: doc.get(field, 0) for field in COUNTER_FIELDS}},
+            {"$set": fields}
+        )
+        return history
+    
     async def get_driver_history(self, driver_id: str) -> Optional[DriverHistory]:
         """
         Get driver history by driver ID
@@ -334,7 +432,7 @@ class DriverHistoryService:
             trip_drivers.update({d for d in driver_ids_from_history_assignment if d})
             
             all_driver_ids.update(trip_drivers)
-            logger.info(f"Found {len(trip_drivers)} unique driver IDs in trips & history collections: {trip_drivers}")
+            logger.info(f"Found {len(trip_drivers)} unique driver IDs in trips & history collections")
 
             # 2. Get all driver employee_ids from the management database
             if self.db_manager_management:
@@ -347,29 +445,30 @@ class DriverHistoryService:
                         management_drivers.add(driver["employee_id"])
                 
                 all_driver_ids.update(management_drivers)
-                logger.info(f"Found {len(management_drivers)} unique driver IDs in the management database: {management_drivers}")
+                logger.info(f"Found {len(management_drivers)} unique driver IDs in the management database")
             else:
                 logger.warning("Management database not available, cannot fetch full driver list.")
 
             driver_ids = list(all_driver_ids)
             logger.info(f"Found a total of {len(driver_ids)} unique driver IDs to process.")
             
-            updated_count = 0
             errors = []
+            semaphore = asyncio.Semaphore(RECONCILE_CONCURRENCY)
             
-            for driver_id in driver_ids:
-                logger.info(f"--- Processing driver_id: {driver_id} ---")
-                try:
-                    await self._recalculate_driver_history(driver_id)
-                    updated_count += 1
-                    logger.info(f"--- Successfully processed driver_id: {driver_id} ---")
-                except Exception as e:
-                    error_message = f"Error updating {driver_id}: {str(e)}"
-                    errors.append(error_message)
-                    logger.error(f"Error recalculating history for driver {driver_id}: {str(e)}")
+            async def reconcile(batch: List[str]) -> int:
+                async with semaphore:
+                    try:
+                        return await self._recalculate_driver_histories(batch)
+                    except Exception as e:
+                        errors.append(f"Error updating {len(batch)} drivers from {batch[0]}: {str(e)}")
+                        logger.error(f"Error recalculating histories for {len(batch)} drivers: {str(e)}")
+                        return 0
+            
+            batches = [driver_ids[i:i + RECONCILE_BATCH_SIZE] for i in range(0, len(driver_ids), RECONCILE_BATCH_SIZE)]
+            updated = await asyncio.gather(*(reconcile(batch) for batch in batches))
             
             result = {
-                "updated_drivers": updated_count,
+                "updated_drivers": sum(updated),
                 "total_drivers": len(driver_ids),
                 "errors": errors
             }
@@ -380,23 +479,6 @@ class DriverHistoryService:
             logger.error(f"Critical error during recalculation of all driver histories: {str(e)}")
             raise
     
-    async def _get_or_create_driver_history(self, driver_id: str) -> DriverHistory:
-        """Get existing driver history or create a new one"""
-        history = await self.get_driver_history(driver_id)
-        
-        if not history:
-            # Get driver info from the drivers collection
-            driver_info = await self._get_driver_info(driver_id)
-            
-            history = DriverHistory(
-                driver_id=driver_id,
-                driver_name=driver_info.get("full_name", "Unknown Driver"),
-                employee_id=driver_info.get("employee_id", None),
-                total_assigned_trips=await self._count_assigned_trips(driver_id),
-            )
-        
-        return history
-    
     async def _get_driver_info(self, driver_id: str) -> Dict[str, Any]:
         """Get driver information from management database drivers collection"""
         try:
@@ -443,41 +525,69 @@ class DriverHistoryService:
         except Exception:
             return 0
     
-    async def _update_violation_counts(self, history: DriverHistory, driver_id: str):
-        """Update violation counts from violation collections"""
-        try:
-            logger.info(f"Updating violation counts for driver_id: {driver_id}")
+    async def _count_trips_by_driver(self, driver_ids: List[str]) -> Dict[str, Dict[str, int]]:
+        """Finished trips per driver and status from trip_history, in one aggregation
 
-            # Count speeding violations
-            speed_violations_collection = self.db_manager.speed_violations
-            speed_query = {"driver_id": driver_id}
-            logger.info(f"Querying '{speed_violations_collection.name}' for speeding violations with query: {speed_query}")
-            history.speeding_violations = await speed_violations_collection.count_documents(speed_query)
-            logger.info(f"Found {history.speeding_violations} speeding violations.")
-
-            # Count braking violations
-            braking_violations_collection = self.db_manager.excessive_braking_violations
-            braking_query = {"driver_id": driver_id}
-            logger.info(f"Querying '{braking_violations_collection.name}' for braking violations with query: {braking_query}")
-            history.braking_violations = await braking_violations_collection.count_documents(braking_query)
-            logger.info(f"Found {history.braking_violations} braking violations.")
-
-            # Count acceleration violations
-            acceleration_violations_collection = self.db_manager.excessive_acceleration_violations
-            acceleration_query = {"driver_id": driver_id}
-            logger.info(f"Querying '{acceleration_violations_collection.name}' for acceleration violations with query: {acceleration_query}")
-            history.acceleration_violations = await acceleration_violations_collection.count_documents(acceleration_query)
-            logger.info(f"Found {history.acceleration_violations} acceleration violations.")
-
-            # Count phone usage violations
-            phone_violations_collection = self.db_manager.phone_usage_violations
-            phone_query = {"driver_id": driver_id}
-            logger.info(f"Querying '{phone_violations_collection.name}' for phone usage violations with query: {phone_query}")
-            history.phone_usage_violations = await phone_violations_collection.count_documents(phone_query)
-            logger.info(f"Found {history.phone_usage_violations} phone usage violations.")
-
-        except Exception as e:
-            logger.error(f"Error updating violation counts for {driver_id}: {str(e)}")
+        Trips whose ``driver_assignment`` is empty are skipped, as they are
+        when a trip finishes.
+        """
+        pipeline = [
+            {"$match": {
+                "driver_assignment": {"$ne": ""},
+                "$or": [{"driver_assignment": {"$in": driver_ids}}, {"driver_id": {"$in": driver_ids}}]
+            }},
+            {"$group": {
+                "_id": {"driver": {"$ifNull": ["$driver_assignment", "$driver_id"]}, "status": "$status"},
+                "count": {"$sum": 1}
+            }}
+        ]
+        counts: Dict[str, Dict[str, int]] = {}
+        async for group in self.db_manager.trip_history.aggregate(pipeline):
+            driver_counts = counts.setdefault(group["_id"]["driver"], {})
+            driver_counts[group["_id"].get("status")] = group["count"]
+        return counts
+    
+    async def _count_violations_by_driver(self, driver_ids: List[str]) -> Dict[str, Dict[str, int]]:
+        """Violations per driver for each counter, with one aggregation per violation collection"""
+        async def count(collection_name: str) -> Dict[str, int]:
+            pipeline = [
+                {"$match": {"driver_id": {"$in": driver_ids}}},
+                {"$group": {"_id": "$driver_id", "count": {"$sum": 1}}}
+            ]
+            collection = getattr(self.db_manager, collection_name)
+            return {group["_id"]: group["count"] async for group in collection.aggregate(pipeline)}
+        
+        counted = await asyncio.gather(*(count(collection_name) for collection_name, _ in VIOLATION_COUNTERS.values()))
+        return {field: counts for (_, field), counts in zip(VIOLATION_COUNTERS.values(), counted)}
+    
+    async def _get_driver_infos(self, driver_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Names of the given drivers from the management database, in one query"""
+        infos = {}
+        if not self.db_manager_management:
+            return infos
+        cursor = self.db_manager_management.drivers.find(
+            {"employee_id": {"$in": driver_ids}},
+            {"employee_id": 1, "first_name": 1, "last_name": 1}
+        )
+        async for driver in cursor:
+            full_name = f"{driver.get('first_name', '')} {driver.get('last_name', '')}".strip()
+            infos[driver["employee_id"]] = {
+                "full_name": full_name or "Unknown Driver",
+                "employee_id": driver["employee_id"]
+            }
+        return infos
+    
+    async def _rescore(self, history: DriverHistory) -> DriverHistory:
+        """Recompute completion rate, safety score and risk level from the counters"""
+        total_finished = history.completed_trips + history.cancelled_trips
+        if total_finished > 0:
+            history.trip_completion_rate = (history.completed_trips / total_finished) * 100
+        else:
+            history.trip_completion_rate = 100.0  # Default for drivers with no history
+        history.driver_safety_score = await self._calculate_safety_score(history)
+        history.driver_risk_level = self._determine_risk_level(history)
+        history.last_updated = datetime.utcnow()
+        return history
     
     async def _calculate_safety_score(self, history: DriverHistory) -> float:
         """
@@ -485,7 +595,7 @@ class DriverHistoryService:
         Score ranges from 0-100, with 100 being the safest
         """
         try:
-            logger.info(f"Calculating safety score for driver_id: {history.driver_id}")
+            logger.debug(f"Calculating safety score for driver_id: {history.driver_id}")
             base_score = 100.0
             completion_penalty = 0.0
             
@@ -493,26 +603,26 @@ class DriverHistoryService:
             total_finished_trips = history.completed_trips + history.cancelled_trips
             if total_finished_trips > 0:
                 completion_penalty = max(0, (100 - history.trip_completion_rate) * 0.3)
-                logger.info(f"Completion penalty: {completion_penalty:.2f} (Rate: {history.trip_completion_rate:.2f}%)")
+                logger.debug(f"Completion penalty: {completion_penalty:.2f} (Rate: {history.trip_completion_rate:.2f}%)")
             else:
-                logger.info("No finished trips, completion penalty is 0.")
+                logger.debug("No finished trips, completion penalty is 0.")
             
             # Deduct points for violations
             total_violations = self._get_total_violations(history)
-            logger.info(f"Total violations for score calculation: {total_violations}")
+            logger.debug(f"Total violations for score calculation: {total_violations}")
             
             # Calculate violations per trip if there are completed trips
             if history.completed_trips > 0:
                 violations_per_trip = total_violations / history.completed_trips
                 violation_penalty = min(50, violations_per_trip * 10)  # Max 50 points deduction
-                logger.info(f"Violation penalty: {violation_penalty:.2f} ({total_violations} violations / {history.completed_trips} trips)")
+                logger.debug(f"Violation penalty: {violation_penalty:.2f} ({total_violations} violations / {history.completed_trips} trips)")
             else:
                 violation_penalty = 0
-                logger.info("No completed trips, violation penalty is 0.")
+                logger.debug("No completed trips, violation penalty is 0.")
             
             # Calculate final score
             final_score = base_score - completion_penalty - violation_penalty
-            logger.info(f"Final score calculated: {final_score:.2f}")
+            logger.debug(f"Final score calculated: {final_score:.2f}")
             
             # Ensure score is between 0 and 100
             return max(0, min(100, final_score))
@@ -524,28 +634,28 @@ class DriverHistoryService:
     def _determine_risk_level(self, history: DriverHistory) -> RiskLevel:
         """Determine driver risk level based on safety score and violations"""
         try:
-            logger.info(f"Determining risk level for driver_id: {history.driver_id}")
+            logger.debug(f"Determining risk level for driver_id: {history.driver_id}")
             total_violations = self._get_total_violations(history)
             total_finished_trips = history.completed_trips + history.cancelled_trips
             
-            logger.info(f"Risk level inputs: score={history.driver_safety_score}, violations={total_violations}, completion_rate={history.trip_completion_rate}, finished_trips={total_finished_trips}")
+            logger.debug(f"Risk level inputs: score={history.driver_safety_score}, violations={total_violations}, completion_rate={history.trip_completion_rate}, finished_trips={total_finished_trips}")
 
             # High risk conditions
             if (history.driver_safety_score < 60 or 
                 total_violations > 10 or 
                 (history.trip_completion_rate < 80 and total_finished_trips > 0)):
-                logger.info("Risk level determined as HIGH.")
+                logger.debug("Risk level determined as HIGH.")
                 return RiskLevel.HIGH
             
             # Medium risk conditions  
             if (history.driver_safety_score < 80 or 
                 total_violations > 5 or 
                 (history.trip_completion_rate < 90 and total_finished_trips > 0)):
-                logger.info("Risk level determined as MEDIUM.")
+                logger.debug("Risk level determined as MEDIUM.")
                 return RiskLevel.MEDIUM
             
             # Low risk (default)
-            logger.info("Risk level determined as LOW.")
+            logger.debug("Risk level determined as LOW.")
             return RiskLevel.LOW
             
         except Exception as e:
@@ -580,64 +690,45 @@ class DriverHistoryService:
     
     async def _recalculate_driver_history(self, driver_id: str):
         """Recalculate a single driver's history from scratch"""
+        await self._recalculate_driver_histories([driver_id])
+    
+    async def _recalculate_driver_histories(self, driver_ids: List[str]) -> int:
+        """Recalculate a batch of drivers' histories from scratch; returns drivers written"""
         try:
-            logger.info(f"Recalculating history for driver_id: {driver_id}")
-            # Get driver info
-            driver_info = await self._get_driver_info(driver_id)
-            logger.info(f"Driver info for {driver_id}: {driver_info}")
-            
-            # Count trips by status from the trip_history collection
-            trip_history_collection = self.db_manager.trip_history
-            driver_query = {
-                "$or": [
-                    {"driver_assignment": driver_id},
-                    {"driver_id": driver_id}
-                ]
-            }
-            logger.info(f"Querying '{trip_history_collection.name}' for trip counts with query: {driver_query}")
-            
-            total_assigned = await trip_history_collection.count_documents(driver_query)
-            completed_query = {**driver_query, "status": "completed"}
-            completed = await trip_history_collection.count_documents(completed_query)
-            logger.info(f"Completed trips query: {completed_query}")
-
-            cancelled_query = {**driver_query, "status": "cancelled"}
-            cancelled = await trip_history_collection.count_documents(cancelled_query)
-            logger.info(f"Cancelled trips query: {cancelled_query}")
-
-            logger.info(f"Trip counts for {driver_id} from history: Assigned={total_assigned}, Completed={completed}, Cancelled={cancelled}")
-            
-            # Create new history record
-            history = DriverHistory(
-                driver_id=driver_id,
-                driver_name=driver_info.get("full_name", "Unknown Driver"),
-                employee_id=driver_info.get("employee_id", None),
-                total_assigned_trips=total_assigned,
-                completed_trips=completed,
-                cancelled_trips=cancelled
+            trip_counts, violation_counts, driver_infos = await asyncio.gather(
+                self._count_trips_by_driver(driver_ids),
+                self._count_violations_by_driver(driver_ids),
+                self._get_driver_infos(driver_ids)
             )
             
-            # Calculate completion rate
-            total_finished = completed + cancelled
-            if total_finished > 0:
-                history.trip_completion_rate = (completed / total_finished) * 100
-            else:
-                history.trip_completion_rate = 100.0 # Default for drivers with no history
-            logger.info(f"Calculated trip completion rate: {history.trip_completion_rate:.2f}%")
-            
-            # Update violations
-            await self._update_violation_counts(history, driver_id)
-            
-            # Calculate safety metrics
-            history.driver_safety_score = await self._calculate_safety_score(history)
-            history.driver_risk_level = self._determine_risk_level(history)
-            
-            # Save to database
-            await self._save_driver_history(history)
-            logger.info(f"Finished recalculating history for driver_id: {driver_id}")
+            operations = []
+            for driver_id in driver_ids:
+                trips = trip_counts.get(driver_id, {})
+                driver_info = driver_infos.get(driver_id, {})
+                history = await self._rescore(DriverHistory(
+                    driver_id=driver_id,
+                    driver_name=driver_info.get("full_name", "Unknown Driver"),
+                    employee_id=driver_info.get("employee_id", driver_id),
+                    total_assigned_trips=sum(trips.values()),
+                    completed_trips=trips.get("completed", 0),
+                    cancelled_trips=trips.get("cancelled", 0),
+                    **{field: violation_counts[field].get(driver_id, 0) for _, field in VIOLATION_COUNTERS.values()}
+                ))
+                history_dict = history.model_dump(by_alias=True, exclude_none=True)
+                created_at = history_dict.pop("created_at")
+                operations.append(UpdateOne(
+                    {"driver_id": driver_id},
+                    {"$set": history_dict, "$setOnInsert": {"created_at": created_at}},
+                    upsert=True
+                ))
+            
+            if operations:
+                await self.db_manager.driver_history.bulk_write(operations, ordered=False)
+            logger.debug(f"Recalculated history for {len(operations)} drivers")
+            return len(operations)
             
         except Exception as e:
-            logger.error(f"Error recalculating driver history for {driver_id}: {str(e)}")
+            logger.error(f"Error recalculating driver histories for {len(driver_ids)} drivers: {str(e)}")
             raise
     
     async def get_trip_violation_counts(self, trip_id: str) -> Dict[str, int]:
@@ -684,4 +775,8 @@ class DriverHistoryService:
                 "braking": 0,
                 "acceleration": 0,
                 "phone_usage": 0
-            }
\ No newline at end of file
+            }
+
+
+# Global instance
+driver_history_service = DriverHistoryService(db_manager, db_manager_management)
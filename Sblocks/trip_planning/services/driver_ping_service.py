@@ -2,10 +2,9 @@
 Driver phone ping tracking service for violation monitoring
 """
 import logging
-import asyncio
 import os
-from typing import Dict, Optional, List
-from datetime import datetime, timedelta
+from typing import Dict, Optional, List, Set, Tuple
+from datetime import datetime, timedelta, timezone
 from bson import ObjectId
 
 from repositories.database import db_manager
@@ -14,6 +13,9 @@ from schemas.entities import (
     LocationPoint, TripStatus
 )
 from events.publisher import event_publisher
+from services.driver_history_service import driver_history_service
+from services.ping_deadline_scheduler import PingDeadlineScheduler
+from services.ping_session_store import PingSessionState, PingSessionStore, TripStatusCache
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +27,32 @@ class DriverPingService:
     
     def __init__(self):
         self.db = db_manager
-        self.active_sessions: Dict[str, asyncio.Task] = {}  # trip_id -> monitoring task
+        self.ping_deadlines = PingDeadlineScheduler(
+            on_expired=self._handle_ping_timeout,
+            load_sessions=self._load_active_session_ages,
+            timeout_s=self.PING_TIMEOUT_SECONDS
+        )
+        # Only in-progress trips are cached: a scheduled trip is re-read on each
+        # ping so its session activates as soon as the trip starts
+        self.trip_statuses = TripStatusCache(
+            load=self._load_trips,
+            cacheable=lambda trip: bool(trip) and trip.get("status") == "in_progress"
+        )
+        self.session_store = PingSessionStore(collection=lambda: self.db.driver_ping_sessions)
+
+    async def start_monitoring(self) -> None:
+        """Start watching active sessions for ping timeouts and flushing pings"""
+        await self.session_store.start()
+        await self.ping_deadlines.start()
+
+    async def stop_monitoring(self) -> None:
+        """Stop watching for ping timeouts and write out pending pings"""
+        await self.ping_deadlines.stop()
+        await self.session_store.stop()
+
+    async def get_trip(self, trip_id: str) -> Optional[Dict]:
+        """Cached status and driver assignment of a trip"""
+        return await self.trip_statuses.get(trip_id)
         
     async def get_or_create_ping_session(self, trip_id: str, driver_id: str) -> DriverPingSession:
         """Get existing ping session for trip or create new one if it doesn't exist"""
@@ -49,20 +76,12 @@ class DriverPingService:
                         }
                     )
                     logger.info(f"[DriverPingService] Updated driver for session {existing_session.id} from {existing_session.driver_id} to {driver_id}")
+                    existing_session.driver_id = driver_id
                 
                 return existing_session
             
             # Create new session - only one per trip ever
-            session_data = {
-                "trip_id": trip_id,
-                "driver_id": driver_id,
-                "is_active": False,  # Will be set based on trip status
-                "started_at": datetime.utcnow(),
-                "ping_count": 0,
-                "total_violations": 0,
-                "created_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow()
-            }
+            session_data = self.new_session_document(trip_id, driver_id)
             
             result = await self.db.driver_ping_sessions.insert_one(session_data)
             session_data["_id"] = str(result.inserted_id)
@@ -76,19 +95,29 @@ class DriverPingService:
             logger.error(f"[DriverPingService] Failed to get/create ping session: {e}")
             raise
     
+    @staticmethod
+    def new_session_document(trip_id: str, driver_id: str) -> Dict:
+        """A trip's ping session as first stored; it activates once the trip is in progress"""
+        now = datetime.utcnow()
+        return {
+            "trip_id": trip_id,
+            "driver_id": driver_id,
+            "is_active": False,  # Will be set based on trip status
+            "started_at": now,
+            "ping_count": 0,
+            "total_violations": 0,
+            "created_at": now,
+            "updated_at": now
+        }
+    
     async def end_ping_session(self, trip_id: str) -> None:
         """End ping session for a trip"""
         logger.info(f"[DriverPingService] Ending ping session for trip {trip_id}")
         
         try:
-            # Cancel monitoring task
-            if trip_id in self.active_sessions:
-                task = self.active_sessions.pop(trip_id)
-                task.cancel()
-                try:
-                    await task
-                except asyncio.CancelledError:
-                    pass
+            # Stop watching for ping timeouts
+            self.ping_deadlines.remove(trip_id)
+            await self.session_store.evict(trip_id)
             
             # Update session in database
             await self.db.driver_ping_sessions.update_one(
@@ -113,111 +142,183 @@ class DriverPingService:
     
     async def process_ping(self, trip_id: str, location: LocationPoint, ping_time: datetime) -> Dict:
         """Process driver ping and update violation tracking"""
-        logger.info(f"[DriverPingService] Processing ping for trip {trip_id}")
+        return (await self.process_pings([(trip_id, location, ping_time)]))[0]
+
+    async def process_pings(self, pings: List[Tuple[str, LocationPoint, datetime]]) -> List[Dict]:
+        """Process a batch of driver pings in order, returning one result per ping"""
+        logger.debug(f"[DriverPingService] Processing {len(pings)} pings")
         
         try:
-            # First, check current trip status to determine if session should be active
-            trip_status = await self._get_trip_status(trip_id)
-            if not trip_status:
-                return {
-                    "status": "error",
-                    "message": "Trip not found"
-                }
-            
-            # Get trip info for driver assignment
-            trip_info = await self._get_trip_info(trip_id)
-            if not trip_info or not trip_info.get("driver_assignment"):
-                return {
-                    "status": "error", 
-                    "message": "Trip has no driver assigned"
-                }
-            
-            driver_id = trip_info["driver_assignment"]
-            
-            # Get or create ping session for this trip
-            session = await self.get_or_create_ping_session(trip_id, driver_id)
-            
-            # Determine if session should be active based on trip status
-            should_be_active = (trip_status == "in_progress")
-            
-            # Update session activity status if needed
-            if session.is_active != should_be_active:
-                await self._update_session_activity(session.id, should_be_active)
-                session.is_active = should_be_active
-                logger.info(f"[DriverPingService] Updated session {session.id} active status to {should_be_active} (trip status: {trip_status})")
-            
-            # If session should not be active, don't process the ping
-            if not should_be_active:
-                return {
-                    "status": "inactive",
-                    "message": f"Ping session is inactive because trip status is '{trip_status}' (not 'in_progress')",
-                    "trip_status": trip_status,
-                    "session_active": False
-                }
-            
-            # Process ping for active session
-            logger.info(f"[DriverPingService] Processing ping for active session {session.id}")
-            
-            # Update session with ping data
-            await self._update_session_ping(session.id, location, ping_time)
-            
-            # Check if there's an active violation to end
-            if session.current_violation_id:
-                await self._end_violation(session.current_violation_id, location, ping_time)
-                # Clear the current violation reference
-                await self.db.driver_ping_sessions.update_one(
-                    {"_id": ObjectId(session.id)},
-                    {"$set": {"current_violation_id": None, "updated_at": datetime.utcnow()}}
-                )
-            
-            next_expected = ping_time + timedelta(seconds=self.PING_TIMEOUT_SECONDS)
-            
-            # Prepare response
-            response_data = {
-                "status": "success",
-                "message": "Ping processed successfully",
-                "ping_received_at": ping_time,
-                "next_ping_expected_at": next_expected,
-                "session_active": True,
-                "violations_count": session.total_violations
-            }
-            
-            return response_data
-            
+            # Trips and sessions not already in memory are loaded in one query each
+            trips = await self.trip_statuses.get_many(trip_id for trip_id, _, _ in pings)
+            loaded = await self._load_session_states({
+                trip_id: trip["driver_assignment"] for trip_id, trip in trips.items()
+                if trip and trip.get("driver_assignment")
+            })
         except Exception as e:
-            logger.error(f"[DriverPingService] Failed to process ping: {e}")
+            logger.error(f"[DriverPingService] Failed to process pings: {e}")
+            return [{"status": "error", "message": f"Failed to process ping: {str(e)}"} for _ in pings]
+        
+        results = []
+        for trip_id, location, ping_time in pings:
+            try:
+                results.append(await self._apply_ping(trips[trip_id], trip_id, location, ping_time, loaded))
+            except Exception as e:
+                logger.error(f"[DriverPingService] Failed to process ping: {e}")
+                results.append({
+                    "status": "error",
+                    "message": f"Failed to process ping: {str(e)}"
+                })
+        return results
+    
+    async def _apply_ping(self, trip: Optional[Dict], trip_id: str, location: LocationPoint,
+                          ping_time: datetime, loaded: Set[str]) -> Dict:
+        """Apply one ping to its session's in-memory state"""
+        if not trip:
             return {
                 "status": "error",
-                "message": f"Failed to process ping: {str(e)}"
+                "error": "TripNotFound",
+                "message": "Trip not found"
+            }
+        if not trip.get("driver_assignment"):
+            return {
+                "status": "error", 
+                "message": "Trip has no driver assigned"
+            }
+        
+        trip_status = trip.get("status")
+        state = await self._session_state(trip_id, trip["driver_assignment"])
+        
+        # Determine if session should be active based on trip status
+        should_be_active = (trip_status == "in_progress")
+        
+        # Update session activity status if needed
+        if state.is_active != should_be_active:
+            await self._update_session_activity(state.session_id, should_be_active)
+            state.is_active = should_be_active
+            logger.info(f"[DriverPingService] Updated session {state.session_id} active status to {should_be_active} (trip status: {trip_status})")
+        
+        # If session should not be active, don't process the ping
+        if not should_be_active:
+            return {
+                "status": "inactive",
+                "message": f"Ping session is inactive because trip status is '{trip_status}' (not 'in_progress')",
+                "trip_status": trip_status,
+                "session_active": False
             }
+        
+        ping_time = self._naive_utc(ping_time)
+        if trip_id not in loaded and (
+                state.last_ping_time is None
+                or self._seconds_since(state.last_ping_time) >= self.PING_TIMEOUT_SECONDS):
+            # Quiet long enough for a violation to have been opened, maybe by another instance
+            session = await self._get_session_for_trip(trip_id)
+            if session:
+                state = self.session_store.put(session)
+            loaded.add(trip_id)
+        
+        # Record the ping in memory; the session document is updated on the next flush
+        self.session_store.record_ping(state, location.model_dump(), ping_time)
+        self.ping_deadlines.touch(trip_id, age_s=self._seconds_since(ping_time))
+        
+        # Check if there's an active violation to end
+        if state.current_violation_id:
+            await self._end_violation(state.current_violation_id, location, ping_time)
+            # Clear the current violation reference
+            await self.db.driver_ping_sessions.update_one(
+                {"_id": ObjectId(state.session_id)},
+                {"$set": {"current_violation_id": None, "updated_at": datetime.utcnow()}}
+            )
+            state.current_violation_id = None
+        
+        next_expected = ping_time + timedelta(seconds=self.PING_TIMEOUT_SECONDS)
+        
+        return {
+            "status": "success",
+            "message": "Ping processed successfully",
+            "ping_received_at": ping_time,
+            "next_ping_expected_at": next_expected,
+            "session_active": True,
+            "violations_count": state.total_violations
+        }
+    
+    async def _session_state(self, trip_id: str, driver_id: str) -> PingSessionState:
+        """In-memory session for a trip, loading or creating it on first use"""
+        state = self.session_store.get(trip_id)
+        if state is None or state.driver_id != driver_id:
+            state = self.session_store.put(await self.get_or_create_ping_session(trip_id, driver_id))
+        return state
+    
+    async def _load_session_states(self, trip_drivers: Dict[str, str]) -> Set[str]:
+        """Load the sessions of trips not yet in memory with one query; returns their trip ids"""
+        missing = [trip_id for trip_id in trip_drivers if self.session_store.get(trip_id) is None]
+        if not missing:
+            return set()
+        cursor = self.db.driver_ping_sessions.find({"trip_id": {"$in": missing}})
+        loaded = set()
+        async for doc in cursor:
+            doc["_id"] = str(doc["_id"])
+            if doc.get("last_ping_location") and isinstance(doc["last_ping_location"], dict):
+                doc["last_ping_location"] = LocationPoint(**doc["last_ping_location"])
+            self.session_store.put(DriverPingSession(**doc))
+            loaded.add(doc["trip_id"])
+        return loaded
     
-    async def _monitor_ping_violations(self, session: DriverPingSession) -> None:
-        """Monitor ping timeouts and create violations"""
-        logger.info(f"[DriverPingService] Starting violation monitoring for session {session.id}")
+    async def _load_trips(self, trip_ids: List[str]) -> Dict[str, Dict]:
+        """Status and driver assignment of each trip, in one query"""
+        object_ids = [ObjectId(trip_id) for trip_id in trip_ids if ObjectId.is_valid(trip_id)]
+        if not object_ids:
+            return {}
+        cursor = self.db.trips.find({"_id": {"$in": object_ids}}, {"driver_assignment": 1, "status": 1})
+        return {str(doc["_id"]): doc async for doc in cursor}
+    
+    async def _handle_ping_timeout(self, trip_id: str) -> Optional[float]:
+        """Open a violation for a session whose ping deadline has passed"""
+        state = self.session_store.get(trip_id)
+        if state is not None:
+            if not state.is_active or state.current_violation_id:
+                return None
+            if state.last_ping_time:
+                seconds_since_ping = self._seconds_since(state.last_ping_time)
+                if seconds_since_ping < self.PING_TIMEOUT_SECONDS:
+                    return seconds_since_ping
+            # Write out any ping not yet flushed before checking the stored session
+            await self.session_store.flush([trip_id])
         
-        try:
-            while True:
-                await asyncio.sleep(self.PING_TIMEOUT_SECONDS)
-                
-                # Get current session state
-                current_session = await self._get_session_by_id(session.id)
-                if not current_session or not current_session.is_active:
-                    logger.info(f"[DriverPingService] Session {session.id} no longer active, stopping monitoring")
-                    break
-                
-                # Check if we haven't received a ping in the timeout period
-                if current_session.last_ping_time:
-                    time_since_last_ping = datetime.utcnow() - current_session.last_ping_time
-                    if time_since_last_ping.total_seconds() >= self.PING_TIMEOUT_SECONDS:
-                        # Only create violation if there isn't already an active one
-                        if not current_session.current_violation_id:
-                            await self._create_violation(current_session)
-                
-        except asyncio.CancelledError:
-            logger.info(f"[DriverPingService] Monitoring cancelled for session {session.id}")
-            raise
-        except Exception as e:
-            logger.error(f"[DriverPingService] Error in violation monitoring: {e}")
+        session = await self._get_active_session(trip_id)
+        if not session or not session.last_ping_time or session.current_violation_id:
+            return None
+
+        # The deadline only moves on pings seen by this instance
+        seconds_since_ping = self._seconds_since(session.last_ping_time)
+        if seconds_since_ping < self.PING_TIMEOUT_SECONDS:
+            return seconds_since_ping
+
+        violation = await self._create_violation(session)
+        if state is not None:
+            state.current_violation_id = violation.id
+            state.total_violations += 1
+        return None
+
+    async def _load_active_session_ages(self) -> List[Tuple[str, float]]:
+        """Seconds since the last ping of each active session not already in violation"""
+        cursor = self.db.driver_ping_sessions.find(
+            {"is_active": True, "current_violation_id": None, "last_ping_time": {"$ne": None}},
+            {"trip_id": 1, "last_ping_time": 1}
+        )
+        return [(doc["trip_id"], self._seconds_since(doc["last_ping_time"])) async for doc in cursor]
+
+    @staticmethod
+    def _naive_utc(moment: datetime) -> datetime:
+        """Aware times as naive UTC, the way they come back from Mongo"""
+        if moment.tzinfo is not None:
+            moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+        return moment
+
+    @classmethod
+    def _seconds_since(cls, moment: datetime) -> float:
+        """Seconds from a naive-UTC or aware time until now"""
+        return (datetime.utcnow() - cls._naive_utc(moment)).total_seconds()
     
     async def _create_violation(self, session: DriverPingSession) -> PhoneUsageViolation:
         """Create a new phone usage violation"""
@@ -243,6 +344,7 @@ class DriverPingService:
             
             result = await self.db.phone_usage_violations.insert_one(violation_data)
             violation_id = str(result.inserted_id)
+            await driver_history_service.record_violation(session.driver_id, "phone_usage")
             
             # Update session with current violation
             await self.db.driver_ping_sessions.update_one(
@@ -257,14 +359,17 @@ class DriverPingService:
             )
             
             # Publish violation event
-            await event_publisher.publish("driver.violation_started", {
-                "violation_id": violation_id,
-                "trip_id": session.trip_id,
-                "driver_id": session.driver_id,
-                "violation_type": "phone_usage",
-                "start_time": violation_data["start_time"].isoformat(),
-                "location": violation_location.dict()
-            })
+            try:
+                await event_publisher.publish_driver_violation_started({
+                    "violation_id": violation_id,
+                    "trip_id": session.trip_id,
+                    "driver_id": session.driver_id,
+                    "violation_type": "phone_usage",
+                    "start_time": violation_data["start_time"].isoformat(),
+                    "location": violation_location.dict()
+                })
+            except Exception as e:
+                logger.warning(f"[DriverPingService] Failed to publish violation started event: {e}")
             
             violation_data["_id"] = violation_id
             violation = PhoneUsageViolation(**violation_data)
@@ -309,14 +414,17 @@ class DriverPingService:
             )
             
             # Publish violation ended event
-            await event_publisher.publish("driver.violation_ended", {
-                "violation_id": violation_id,
-                "trip_id": violation_doc["trip_id"],
-                "driver_id": violation_doc["driver_id"],
-                "duration_seconds": duration_seconds,
-                "end_time": end_time.isoformat(),
-                "end_location": end_location.dict()
-            })
+            try:
+                await event_publisher.publish_driver_violation_ended({
+                    "violation_id": violation_id,
+                    "trip_id": violation_doc["trip_id"],
+                    "driver_id": violation_doc["driver_id"],
+                    "duration_seconds": duration_seconds,
+                    "end_time": end_time.isoformat(),
+                    "end_location": end_location.dict()
+                })
+            except Exception as e:
+                logger.warning(f"[DriverPingService] Failed to publish violation ended event: {e}")
             
             logger.info(f"[DriverPingService] Ended violation {violation_id}, duration: {duration_seconds}s")
             
@@ -367,25 +475,6 @@ class DriverPingService:
             logger.error(f"[DriverPingService] Failed to get session by ID: {e}")
             raise
     
-    async def _update_session_ping(self, session_id: str, location: LocationPoint, ping_time: datetime) -> None:
-        """Update session with new ping data"""
-        try:
-            await self.db.driver_ping_sessions.update_one(
-                {"_id": ObjectId(session_id)},
-                {
-                    "$set": {
-                        "last_ping_time": ping_time,
-                        "last_ping_location": location.dict(),
-                        "updated_at": datetime.utcnow()
-                    },
-                    "$inc": {"ping_count": 1}
-                }
-            )
-            
-        except Exception as e:
-            logger.error(f"[DriverPingService] Failed to update session ping: {e}")
-            raise
-    
     async def _end_existing_session(self, trip_id: str) -> None:
         """End any existing active session for a trip"""
         try:
@@ -438,32 +527,6 @@ class DriverPingService:
             logger.error(f"[DriverPingService] Failed to get trip violations: {e}")
             raise
 
-    async def _get_trip_status(self, trip_id: str) -> Optional[str]:
-        """Get current status of a trip"""
-        try:
-            trip_doc = await self.db.trips.find_one(
-                {"_id": ObjectId(trip_id)},
-                {"status": 1}
-            )
-            return trip_doc.get("status") if trip_doc else None
-            
-        except Exception as e:
-            logger.error(f"[DriverPingService] Failed to get trip status: {e}")
-            return None
-    
-    async def _get_trip_info(self, trip_id: str) -> Optional[Dict]:
-        """Get trip information including driver assignment"""
-        try:
-            trip_doc = await self.db.trips.find_one(
-                {"_id": ObjectId(trip_id)},
-                {"driver_assignment": 1, "status": 1}
-            )
-            return trip_doc if trip_doc else None
-            
-        except Exception as e:
-            logger.error(f"[DriverPingService] Failed to get trip info: {e}")
-            return None
-    
     async def _get_session_for_trip(self, trip_id: str) -> Optional[DriverPingSession]:
         """Get ping session for a trip (regardless of active status)"""
         try:
@@ -494,7 +557,7 @@ class DriverPingService:
             }
             
             if is_active:
-                # Start monitoring task if becoming active
+                # The ping that activated the session sets its first deadline
                 update_data["activated_at"] = datetime.utcnow()
             else:
                 # Stop monitoring and end violations if becoming inactive
@@ -505,24 +568,12 @@ class DriverPingService:
                 {"$set": update_data}
             )
             
-            # Manage monitoring tasks
-            session_doc = await self.db.driver_ping_sessions.find_one({"_id": ObjectId(session_id)})
-            if session_doc:
-                trip_id = session_doc["trip_id"]
-                
-                if is_active:
-                    # Start monitoring if not already running
-                    if trip_id not in self.active_sessions:
-                        session_obj = DriverPingSession(**{**session_doc, "_id": str(session_doc["_id"])})
-                        task = asyncio.create_task(self._monitor_ping_violations(session_obj))
-                        self.active_sessions[trip_id] = task
-                        logger.info(f"[DriverPingService] Started monitoring for session {session_id}")
-                else:
-                    # Stop monitoring and end violations
-                    if trip_id in self.active_sessions:
-                        task = self.active_sessions.pop(trip_id)
-                        task.cancel()
-                        logger.info(f"[DriverPingService] Stopped monitoring for session {session_id}")
+            if not is_active:
+                session_doc = await self.db.driver_ping_sessions.find_one({"_id": ObjectId(session_id)})
+                if session_doc:
+                    trip_id = session_doc["trip_id"]
+                    self.ping_deadlines.remove(trip_id)
+                    logger.info(f"[DriverPingService] Stopped monitoring for session {session_id}")
                     
                     # End active violations
                     await self._end_active_violations(trip_id)
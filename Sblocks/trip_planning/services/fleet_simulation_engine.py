@@ -0,0 +1,308 @@
+"""
+Vectorised fleet simulation engine
+
+Holds every active trip's route geometry, cumulative distances and speed
+profile in packed NumPy arrays so one ``step`` advances the whole fleet.
+"""
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from utils.geo import bearing_deg, haversine_km, points_in_polygon
+from utils.route_geometry import RouteGeometry
+
+logger = logging.getLogger(__name__)
+
+POINT_GEOFENCE_RADIUS_METERS = 10.0  # Radius used for point geofences without one
+
+
+@dataclass
+class FleetUpdate:
+    """Position of one simulated vehicle after a flush"""
+    simulator: Any
+    latitude: float
+    longitude: float
+    heading: float
+
+
+class FleetSimulationEngine:
+    """Advance many ``VehicleSimulator`` instances at once
+
+    The simulators stay the public face of each trip: ``sync`` packs them into
+    arrays, ``step`` moves every running vehicle by ``dt`` seconds and
+    ``flush`` copies the new state back onto the simulators. Speed changes
+    follow ``VehicleSimulator.update_speed`` and movement is by distance along
+    each simulator's ``RouteGeometry``, so ``current_position`` is
+    ``distance_traveled`` over the route length.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        self._rng = np.random.default_rng(seed)
+        self._simulators: List[Any] = []
+        self._slots: Dict[str, int] = {}
+        self._geometry: Dict[str, Tuple[Any, np.ndarray, np.ndarray, np.ndarray]] = {}
+        self._empty()
+
+    def _empty(self):
+        # Packed route vertices for all vehicles, routes laid end to end
+        self._lat = np.empty(0)
+        self._lon = np.empty(0)
+        self._cum = np.empty(0)  # metres, monotone across the packed routes
+        self._profile = np.empty(0)  # km/h per vertex, NaN where the profile has no entry
+
+        # Per-vehicle state
+        self._first = np.empty(0, dtype=np.int64)
+        self._last_segment = np.empty(0, dtype=np.int64)
+        self._base = np.empty(0)
+        self._route_m = np.empty(0)
+        self._traveled = np.empty(0)
+        self._speed = np.empty(0)
+        self._target = np.empty(0)
+        self._timer = np.empty(0, dtype=np.int64)
+        self._min_speed = np.empty(0)
+        self._max_speed = np.empty(0)
+        self._change_rate = np.empty(0)
+        self._change_interval = np.empty(0, dtype=np.int64)
+        self._running = np.empty(0, dtype=bool)
+        self._paused = np.empty(0, dtype=bool)
+        self._finished = np.empty(0, dtype=bool)
+        self._moved = np.empty(0, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self._simulators)
+
+    def __contains__(self, trip_id: str) -> bool:
+        return trip_id in self._slots
+
+    # ---- membership ----
+
+    def sync(self, simulators: Iterable[Any]):
+        """Make the engine hold exactly ``simulators``, repacking only when the set changed"""
+        simulators = list(simulators)
+        if len(simulators) != len(self._simulators) or any(
+            a is not b for a, b in zip(simulators, self._simulators)
+        ):
+            self._pack(simulators)
+        self._refresh_flags()
+
+    def _pack(self, simulators: List[Any]):
+        self._simulators = simulators
+        self._slots = {s.trip_id: i for i, s in enumerate(simulators)}
+        if not simulators:
+            self._geometry = {}
+            self._empty()
+            return
+
+        # Route geometry is cached per simulator so a repack is mostly concatenation
+        geometry = {}
+        for simulator in simulators:
+            cached = self._geometry.get(simulator.trip_id)
+            geometry[simulator.trip_id] = cached if cached and cached[0] is simulator else self._route_arrays(simulator)
+        self._geometry = geometry
+
+        lats, lons, cums, profiles = [], [], [], []
+        first, base, route_m = [], [], []
+        offset, distance_base = 0, 0.0
+        for simulator in simulators:
+            _, coords, cumulative, profile = geometry[simulator.trip_id]
+            lats.append(coords[:, 0])
+            lons.append(coords[:, 1])
+            cums.append(cumulative + distance_base)
+            profiles.append(profile)
+            first.append(offset)
+            base.append(distance_base)
+            route_m.append(cumulative[-1])
+            offset += len(coords)
+            distance_base += cumulative[-1]
+
+        self._lat = np.concatenate(lats)
+        self._lon = np.concatenate(lons)
+        self._cum = np.concatenate(cums)
+        self._profile = np.concatenate(profiles)
+
+        self._first = np.asarray(first, dtype=np.int64)
+        self._last_segment = np.asarray(
+            [f + max(len(c), 2) - 2 for f, c in zip(first, lats)], dtype=np.int64
+        )
+        self._base = np.asarray(base)
+        self._route_m = np.maximum(route_m, 1e-6)
+
+        position = np.clip([float(s.current_position) for s in simulators], 0.0, 1.0)
+        self._traveled = position * self._route_m
+        self._speed = np.asarray([float(s.current_speed_kmh) for s in simulators])
+        self._target = np.asarray([float(s.target_speed) for s in simulators])
+        self._timer = np.asarray([int(s.speed_change_timer) for s in simulators], dtype=np.int64)
+        self._min_speed = np.asarray([float(s.min_speed) for s in simulators])
+        self._max_speed = np.asarray([float(s.max_speed) for s in simulators])
+        self._change_rate = np.asarray([float(s.speed_change_rate) for s in simulators])
+        self._change_interval = np.asarray([int(s.speed_change_interval) for s in simulators], dtype=np.int64)
+        self._finished = np.zeros(len(simulators), dtype=bool)
+        self._moved = np.zeros(len(simulators), dtype=bool)
+        self._running = np.zeros(len(simulators), dtype=bool)
+        self._paused = np.zeros(len(simulators), dtype=bool)
+
+    @staticmethod
+    def _route_arrays(simulator: Any):
+        geometry = getattr(simulator, "geometry", None)
+        if geometry is None:
+            geometry = RouteGeometry(simulator.route.coordinates, simulator.route.distance)
+        coords, cumulative = geometry.coordinates, geometry.cumulative_m
+        if len(coords) < 2:
+            coords = np.repeat(coords, 2, axis=0) if len(coords) else np.zeros((2, 2))
+            cumulative = np.zeros(2)
+
+        profile = np.full(len(coords), np.nan)
+        for index, speed in (simulator.speed_profile or {}).items():
+            if 0 <= int(index) < len(coords):
+                profile[int(index)] = speed
+        return simulator, coords, cumulative, profile
+
+    def _refresh_flags(self):
+        # Pause, resume and stop are applied to the simulators directly
+        self._running = np.fromiter((s.is_running for s in self._simulators), dtype=bool, count=len(self))
+        self._paused = np.fromiter((s.is_paused for s in self._simulators), dtype=bool, count=len(self))
+
+    # ---- stepping ----
+
+    def _segments(self, traveled: np.ndarray) -> np.ndarray:
+        """Global index of the segment each vehicle is on"""
+        along = self._base + traveled
+        index = np.searchsorted(self._cum, along, side="right") - 1
+        return np.clip(index, self._first, self._last_segment)
+
+    def step(self, dt: float):
+        """Advance every running, unpaused vehicle by ``dt`` seconds"""
+        if not len(self):
+            return
+        n = len(self)
+        active = self._running & ~self._paused & ~self._finished
+        # Vehicles already at the destination stop, as update_position does
+        arrived = self._running & ~self._paused & (self._traveled >= self._route_m)
+        self._finished |= arrived
+        active &= ~arrived
+        if not active.any():
+            return
+
+        progress = self._traveled / self._route_m
+        profile_speed = self._profile[self._segments(self._traveled)]
+        on_profile = active & ~np.isnan(profile_speed)
+        if on_profile.any():
+            variation = self._rng.uniform(0.9, 1.1, n)
+            target = np.clip(profile_speed * variation, self._min_speed, self._max_speed)
+            self._target = np.where(on_profile, target, self._target)
+            self._speed = np.where(on_profile, target, self._speed)
+
+        varying = active & ~on_profile
+        self._timer = self._timer + varying
+        due = varying & (self._timer >= self._change_interval)
+        if due.any():
+            cruising = np.where(
+                self._rng.random(n) < 0.7,
+                self._rng.uniform(80, 140, n),
+                self._rng.uniform(50, 80, n),
+            )
+            target = np.where(
+                progress < 0.1,
+                self._rng.uniform(50, 80, n),
+                np.where(progress > 0.9, self._rng.uniform(40, 60, n), cruising),
+            )
+            target = np.clip(target, self._min_speed, self._max_speed)
+            self._target = np.where(due, target, self._target)
+            self._timer = np.where(due, 0, self._timer)
+
+        approached = self._speed + np.clip(self._target - self._speed, -self._change_rate, self._change_rate)
+        approached = np.clip(approached, self._min_speed, self._max_speed)
+        self._speed = np.where(varying, approached, self._speed)
+
+        advanced = np.minimum(self._route_m, self._traveled + self._speed / 3.6 * dt)
+        self._traveled = np.where(active, advanced, self._traveled)
+        self._moved |= active
+
+    def positions(self) -> Dict[str, np.ndarray]:
+        """Latitude, longitude and heading of every vehicle at its current distance"""
+        segment = self._segments(self._traveled)
+        start_m = self._cum[segment]
+        length_m = self._cum[segment + 1] - start_m
+        along = self._base + self._traveled
+        with np.errstate(invalid="ignore", divide="ignore"):
+            t = np.where(length_m > 0, (along - start_m) / length_m, 0.0)
+        t = np.clip(t, 0.0, 1.0)
+
+        lat0, lon0 = self._lat[segment], self._lon[segment]
+        lat1, lon1 = self._lat[segment + 1], self._lon[segment + 1]
+        heading = np.asarray(bearing_deg(lat0, lon0, lat1, lon1), dtype=float).reshape(-1)
+        heading = np.where(self._traveled >= self._route_m, 0.0, heading)
+        return {
+            "latitude": lat0 + (lat1 - lat0) * t,
+            "longitude": lon0 + (lon1 - lon0) * t,
+            "heading": heading,
+        }
+
+    def flush(self) -> List[FleetUpdate]:
+        """Copy state back onto the simulators; returns the vehicles that moved since the last flush"""
+        if not len(self):
+            return []
+        for i in np.flatnonzero(self._finished & self._running):
+            self._simulators[i].is_running = False
+        moved = np.flatnonzero(self._moved)
+        if not len(moved):
+            return []
+
+        position = self.positions()
+        columns = zip(
+            moved.tolist(),
+            self._traveled[moved].tolist(),
+            np.minimum(1.0, self._traveled[moved] / self._route_m[moved]).tolist(),
+            self._speed[moved].tolist(),
+            self._target[moved].tolist(),
+            self._timer[moved].tolist(),
+            position["latitude"][moved].tolist(),
+            position["longitude"][moved].tolist(),
+            position["heading"][moved].tolist(),
+        )
+        updates = []
+        for i, traveled, progress, speed, target, timer, lat, lon, heading in columns:
+            simulator = self._simulators[i]
+            simulator.distance_traveled = traveled
+            simulator.current_position = progress
+            simulator.current_speed_kmh = speed
+            simulator.speed_ms = speed / 3.6
+            simulator.target_speed = target
+            simulator.speed_change_timer = timer
+            simulator.last_location = (lat, lon)
+            updates.append(FleetUpdate(simulator, lat, lon, heading))
+        self._moved[:] = False
+        return updates
+
+
+def geofences_containing(latitudes: Any, longitudes: Any, geofences: Iterable[Any]) -> List[Set[str]]:
+    """For each point, the ids of ``geofences`` containing it
+
+    Mirrors ``VehicleSimulator._is_point_in_geofence`` but tests every point
+    against one geofence at a time.
+    """
+    lats = np.asarray(latitudes, dtype=float)
+    lons = np.asarray(longitudes, dtype=float)
+    inside: List[Set[str]] = [set() for _ in range(len(lats))]
+    if not len(lats):
+        return inside
+
+    for geofence in geofences:
+        try:
+            geometry = geofence.geometry
+            geom_type = geometry.type.lower()
+            if geom_type == "point":
+                center_lon, center_lat = geometry.coordinates
+                radius = geometry.properties.radius or POINT_GEOFENCE_RADIUS_METERS
+                hits = haversine_km(lats, lons, center_lat, center_lon) * 1000.0 <= radius
+            elif geom_type == "polygon":
+                hits = points_in_polygon(lats, lons, geometry.coordinates[0])
+            else:
+                continue
+            for i in np.flatnonzero(hits):
+                inside[i].add(geofence.id)
+        except Exception as e:
+            logger.error(f"Error checking points in geofence: {e}")
+    return inside
@@ -0,0 +1,206 @@
+"""
+In-memory geofence index for simulated vehicles
+
+Active geofences are loaded once, prepared (bounding box, ring arrays or
+circle centre) and bucketed in a uniform lat/lon grid. A position is then
+tested only against the fences whose cells it falls in, and a trip can
+narrow that further to the fences its route passes near. The cache is
+invalidated by geofence change events from the GPS service and reloaded
+after ``GEOFENCE_CACHE_TTL_SECONDS`` in case an event was missed.
+"""
+import asyncio
+import logging
+import math
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from services.fleet_simulation_engine import POINT_GEOFENCE_RADIUS_METERS
+from services.geofence_service import geofence_service
+from utils.geo import haversine_km
+
+logger = logging.getLogger(__name__)
+
+GEOFENCE_CACHE_TTL_SECONDS = float(os.getenv("GEOFENCE_CACHE_TTL_SECONDS", "300"))
+GEOFENCE_GRID_DEGREES = 0.01  # ~1.1 km cells
+GEOFENCE_GRID_MAX_CELLS = 4096  # Larger fences are checked for every point instead of gridded
+CORRIDOR_CHUNK_POINTS = 32  # Route segments per envelope when prefiltering fences for a trip
+WATCHED_GEOFENCE_TYPES = ("restricted", "boundary")
+METERS_PER_DEGREE = 111_195.0
+
+
+class PreparedGeofence:
+    """A geofence with its bounding box and containment test precomputed"""
+
+    def __init__(self, geofence: Any):
+        self.geofence = geofence
+        self.id = geofence.id
+        geometry = geofence.geometry
+        geom_type = geometry.type.lower()
+
+        if geom_type == "point":
+            center_lon, center_lat = geometry.coordinates
+            properties = getattr(geometry, "properties", None)
+            radius = (properties.radius if properties else getattr(geometry, "radius", None)) or POINT_GEOFENCE_RADIUS_METERS
+            self.circle: Optional[Tuple[float, float, float]] = (float(center_lat), float(center_lon), float(radius))
+            dlat = radius / METERS_PER_DEGREE
+            dlon = dlat / max(math.cos(math.radians(center_lat + math.copysign(dlat, center_lat))), 1e-6)
+            self.bounds = (center_lat - dlat, center_lon - dlon, center_lat + dlat, center_lon + dlon)
+        elif geom_type == "polygon":
+            ring = np.asarray(geometry.coordinates[0], dtype=float)
+            if ring.ndim != 2 or len(ring) < 3:
+                raise ValueError("polygon needs at least three points")
+            self.circle = None
+            x1, y1 = ring[:, 0], ring[:, 1]
+            x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+            flat = y1 == y2  # Horizontal edges never straddle a ray
+            self._y1, self._y2 = y1[~flat], y2[~flat]
+            self._x1 = x1[~flat]
+            self._slope = (x2[~flat] - x1[~flat]) / (y2[~flat] - y1[~flat])
+            self.bounds = (float(y1.min()), float(x1.min()), float(y1.max()), float(x1.max()))
+        else:
+            raise ValueError(f"unsupported geometry type {geometry.type}")
+
+    def contains(self, lat: float, lon: float) -> bool:
+        """Same rules as ``VehicleSimulator._is_point_in_geofence``"""
+        min_lat, min_lon, max_lat, max_lon = self.bounds
+        if not (min_lat <= lat <= max_lat and min_lon <= lon <= max_lon):
+            return False
+        if self.circle is not None:
+            center_lat, center_lon, radius = self.circle
+            return haversine_km(lat, lon, center_lat, center_lon) * 1000.0 <= radius
+        straddles = (self._y1 > lat) != (self._y2 > lat)
+        x_cross = self._x1 + (lat - self._y1) * self._slope
+        return bool(np.count_nonzero(straddles & (lon < x_cross)) % 2)
+
+
+class GeofenceIndex:
+    """Prepared geofences bucketed by grid cell; one immutable snapshot per refresh"""
+
+    def __init__(self, geofences: Iterable[Any], version: int = 0, cell_deg: float = GEOFENCE_GRID_DEGREES):
+        self.version = version
+        self.cell_deg = cell_deg
+        self.fences: List[PreparedGeofence] = []
+        for geofence in geofences:
+            try:
+                self.fences.append(PreparedGeofence(geofence))
+            except Exception as e:
+                logger.warning(f"[GeofenceIndex] Skipping geofence {getattr(geofence, 'id', None)}: {e}")
+        self.by_id = {fence.id: fence for fence in self.fences}
+        self._bounds = np.array([f.bounds for f in self.fences], dtype=float).reshape(-1, 4)
+
+        self._grid: Dict[Tuple[int, int], List[int]] = {}
+        self._everywhere: List[int] = []
+        for i, fence in enumerate(self.fences):
+            (row0, col0), (row1, col1) = self._cell(*fence.bounds[:2]), self._cell(*fence.bounds[2:])
+            if (row1 - row0 + 1) * (col1 - col0 + 1) > GEOFENCE_GRID_MAX_CELLS:
+                self._everywhere.append(i)
+                continue
+            for row in range(row0, row1 + 1):
+                for col in range(col0, col1 + 1):
+                    self._grid.setdefault((row, col), []).append(i)
+
+    def __len__(self) -> int:
+        return len(self.fences)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg)
+
+    def corridor(self, coordinates: Any) -> FrozenSet[int]:
+        """Fences whose bounding box meets the envelope of some stretch of a ``[lat, lon]`` route"""
+        coords = np.asarray(coordinates, dtype=float).reshape(-1, 2)
+        if not len(self.fences) or not len(coords):
+            return frozenset()
+        # Envelopes of runs of segments, so no stretch of road between two vertices is missed
+        if len(coords) > 1:
+            low, high = np.minimum(coords[:-1], coords[1:]), np.maximum(coords[:-1], coords[1:])
+        else:
+            low = high = coords
+        starts = np.arange(0, len(low), CORRIDOR_CHUNK_POINTS)
+        low, high = np.minimum.reduceat(low, starts), np.maximum.reduceat(high, starts)
+        bounds = self._bounds
+        near = ((bounds[None, :, 0] <= high[:, None, 0]) & (bounds[None, :, 2] >= low[:, None, 0])
+                & (bounds[None, :, 1] <= high[:, None, 1]) & (bounds[None, :, 3] >= low[:, None, 1])).any(axis=0)
+        return frozenset(np.flatnonzero(near).tolist())
+
+    def containing(self, lat: float, lon: float, corridor: Optional[FrozenSet[int]] = None) -> Set[str]:
+        """Ids of the fences containing the point, optionally only among a trip's corridor"""
+        candidates = self._grid.get(self._cell(lat, lon), [])
+        if self._everywhere:
+            candidates = candidates + self._everywhere
+        return {
+            self.fences[i].id for i in candidates
+            if (corridor is None or i in corridor) and self.fences[i].contains(lat, lon)
+        }
+
+    def geofences(self, ids: Iterable[str]) -> List[Any]:
+        """The original geofence models for ``ids`` that are still in the index"""
+        return [self.by_id[i].geofence for i in ids if i in self.by_id]
+
+
+class GeofenceCache:
+    """Holds the current ``GeofenceIndex``, reloading it when invalidated or too old"""
+
+    def __init__(
+        self,
+        load: Optional[Callable[[], Awaitable[List[Any]]]] = None,
+        ttl_s: float = GEOFENCE_CACHE_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.load = load or self._load_active_geofences
+        self.ttl_s = ttl_s
+        self.clock = clock
+        self.index = GeofenceIndex([], version=0)
+        self._loaded_at: Optional[float] = None
+        self._stale = True
+        self._lock = asyncio.Lock()
+        self.stats = {"refreshes": 0, "invalidations": 0, "errors": 0}
+
+    @staticmethod
+    async def _load_active_geofences() -> List[Any]:
+        # find_geofences raises on database errors so _refresh keeps the last good index
+        geofences = await geofence_service.find_geofences(is_active=True, limit=0)
+        return [g for g in geofences if g.type in WATCHED_GEOFENCE_TYPES]
+
+    def invalidate(self):
+        """Reload on next use; called when a geofence is created, changed or deleted"""
+        self._stale = True
+        self.stats["invalidations"] += 1
+
+    def _expired(self) -> bool:
+        return self._stale or self._loaded_at is None or self.clock() - self._loaded_at >= self.ttl_s
+
+    async def get(self) -> GeofenceIndex:
+        """The current index, refreshed first if it is stale"""
+        if not self._expired():
+            return self.index
+        async with self._lock:
+            if self._expired():
+                await self._refresh()
+        return self.index
+
+    async def _refresh(self):
+        self._stale = False
+        try:
+            geofences = await self.load()
+        except Exception as e:
+            # Keep the last good index; try again after another TTL or event
+            self.stats["errors"] += 1
+            self._loaded_at = self.clock()
+            logger.error(f"[GeofenceCache] Failed to load geofences: {e}")
+            return
+        self.index = GeofenceIndex(geofences, version=self.index.version + 1)
+        self._loaded_at = self.clock()
+        self.stats["refreshes"] += 1
+        logger.info(f"[GeofenceCache] Loaded {len(self.index)} watched geofences (version {self.index.version})")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Refresh counters and the size of the current index"""
+        return {**self.stats, "geofences": len(self.index), "version": self.index.version,
+                "age_s": None if self._loaded_at is None else round(self.clock() - self._loaded_at, 1)}
+
+
+# Global geofence cache instance
+geofence_cache = GeofenceCache()
@@ -24,28 +24,37 @@ class GeofenceService:
     ) -> List[Geofence]:
         """Get geofences with optional filters"""
         try:
-            query = {}
-            if is_active is not None:
-                query["status"] = "active" if is_active else "inactive"
-            if geofence_type:
-                query["type"] = geofence_type
-
-            cursor = self.db.geofences.find(query).skip(offset).limit(limit)
-            geofences = []
-            async for doc in cursor:
-                # Convert _id to string
-                doc["id"] = str(doc.pop("_id"))
-
-                # Keep geometry exactly as in DB
-                if "geometry" not in doc or not isinstance(doc["geometry"], dict):
-                    doc["geometry"] = {"type": "Polygon", "coordinates": []}  # Default fallback
-
-                geofences.append(Geofence(**doc))
-            return geofences
+            return await self.find_geofences(is_active, geofence_type, limit, offset)
         except Exception as e:
             logger.error(f"Error getting geofences: {e}")
             return []
 
+    async def find_geofences(
+        self,
+        is_active: Optional[bool] = None,
+        geofence_type: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0
+    ) -> List[Geofence]:
+        """Like ``get_geofences`` but database errors propagate to the caller"""
+        query = {}
+        if is_active is not None:
+            query["status"] = "active" if is_active else "inactive"
+        if geofence_type:
+            query["type"] = geofence_type
+
+        cursor = self.db.geofences.find(query).skip(offset).limit(limit)
+        geofences = []
+        async for doc in cursor:
+            # Convert _id to string
+            doc["id"] = str(doc.pop("_id"))
+
+            # Keep geometry exactly as in DB
+            if "geometry" not in doc or not isinstance(doc["geometry"], dict):
+                doc["geometry"] = {"type": "Polygon", "coordinates": []}  # Default fallback
+
+            geofences.append(Geofence(**doc))
+        return geofences
 
 
 # Create service instance
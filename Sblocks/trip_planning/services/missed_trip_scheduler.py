@@ -1,42 +1,73 @@
 """
 Scheduler service for marking missed trips
+
+Every scheduled trip that has not started is kept in a min-heap keyed on
+the time it becomes missed (its scheduled start plus the grace period, or
+its scheduled end if that is earlier). A single task sleeps until the
+earliest deadline and marks every trip that is due in one batch, so a trip
+is marked missed within moments of its deadline without the whole trips
+collection being scanned. Trip lifecycle events keep the heap in step
+with creates, edits, starts and cancellations. The periodic full check
+still runs, at the same interval as before, as a safety net for trips
+changed on other instances or while the events were not flowing.
 """
 import asyncio
+import heapq
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 from services.trip_service import trip_service
 
 logger = logging.getLogger(__name__)
 
+HEAP_SLACK_ENTRIES = 1024  # Stale heap entries tolerated before the heap is rebuilt
+
 
 class MissedTripScheduler:
     """Service for scheduling missed trip checks"""
-    
-    def __init__(self, check_interval_minutes: int = 5):
+
+    def __init__(self, check_interval_minutes: int = 5, clock: Callable[[], datetime] = datetime.utcnow):
         self.check_interval_minutes = check_interval_minutes
+        self.clock = clock
         self.running = False
         self._task = None
+        self._deadline_task = None
+
+        self.deadlines: Dict[str, Tuple[datetime, int]] = {}  # trip_id -> (due_at, version)
+        self._heap: List[Tuple[datetime, int, str]] = []
+        self._version = 0
+        self._wake: Optional[asyncio.Event] = None
+        self.metrics = {"recovered": 0, "scheduled": 0, "fired": 0, "marked_missed": 0,
+                        "reconciled": 0, "errors": 0, "compactions": 0}
 
     async def start(self):
         """Start the missed trip scheduler"""
         if self.running:
             logger.warning("[MissedTripScheduler] Scheduler is already running")
             return
-        
+
         self.running = True
         logger.info(f"[MissedTripScheduler] Starting missed trip scheduler (check interval: {self.check_interval_minutes} minutes)")
-        
+
+        self._wake = asyncio.Event()
+        self._deadline_task = asyncio.create_task(self._deadline_loop())
         self._task = asyncio.create_task(self._scheduler_loop())
 
     async def stop(self):
         """Stop the missed trip scheduler"""
         if not self.running:
             return
-        
+
         logger.info("[MissedTripScheduler] Stopping missed trip scheduler")
         self.running = False
-        
+
+        if self._deadline_task:
+            self._deadline_task.cancel()
+            await asyncio.gather(self._deadline_task, return_exceptions=True)
+            self._deadline_task = None
+        self._wake = None
+
         if self._task:
             self._task.cancel()
             try:
@@ -50,13 +81,14 @@ class MissedTripScheduler:
             try:
                 logger.debug("[MissedTripScheduler] Running missed trip check")
                 missed_count = await trip_service.mark_missed_trips()
-                
+
                 if missed_count > 0:
+                    self.metrics["reconciled"] += missed_count
                     logger.info(f"[MissedTripScheduler] Processed {missed_count} missed trips")
-                
+
                 # Wait for the next check interval
                 await asyncio.sleep(self.check_interval_minutes * 60)
-                
+
             except asyncio.CancelledError:
                 logger.info("[MissedTripScheduler] Scheduler cancelled")
                 break
@@ -70,6 +102,130 @@ class MissedTripScheduler:
         logger.info("[MissedTripScheduler] Manual missed trip check triggered")
         return await trip_service.mark_missed_trips()
 
+    # -------------------- Deadlines --------------------
+    def schedule(self, trip_id: str, due_at: Optional[datetime]):
+        """(Re)schedule a trip's missed deadline, or stop watching it when ``due_at`` is None"""
+        if due_at is None:
+            self.remove(trip_id)
+            return
+        self._version += 1
+        self.deadlines[trip_id] = (due_at, self._version)
+        heapq.heappush(self._heap, (due_at, self._version, trip_id))
+        self.metrics["scheduled"] += 1
+        if len(self._heap) > 2 * len(self.deadlines) + HEAP_SLACK_ENTRIES:
+            self._compact()
+        if self._wake is not None and self._heap[0][2] == trip_id:
+            self._wake.set()  # Earlier than what the loop is sleeping towards
+
+    def remove(self, trip_id: str):
+        """Stop watching a trip; its heap entry is skipped when popped"""
+        self.deadlines.pop(trip_id, None)
+
+    def _compact(self):
+        self._heap = [(due_at, version, trip_id) for trip_id, (due_at, version) in self.deadlines.items()]
+        heapq.heapify(self._heap)
+        self.metrics["compactions"] += 1
+
+    def next_due(self) -> Optional[datetime]:
+        """Deadline of the earliest live heap entry"""
+        while self._heap:
+            due_at, version, trip_id = self._heap[0]
+            if self.deadlines.get(trip_id) == (due_at, version):
+                return due_at
+            heapq.heappop(self._heap)
+        return None
+
+    def pop_due(self, now: Optional[datetime] = None) -> List[str]:
+        """Take every trip whose deadline has passed"""
+        now = self.clock() if now is None else now
+        due = []
+        while self.next_due() is not None and self._heap[0][0] <= now:
+            _, _, trip_id = heapq.heappop(self._heap)
+            del self.deadlines[trip_id]
+            due.append(trip_id)
+        return due
+
+    def _load(self, deadlines: Iterable[Tuple[str, datetime]]) -> int:
+        count = 0
+        for trip_id, due_at in deadlines:
+            self.schedule(trip_id, due_at)
+            count += 1
+        return count
+
+    async def recover(self):
+        """Rebuild the heap from the scheduled trips in the database"""
+        deadlines = await trip_service.load_missed_trip_deadlines()
+        self.deadlines.clear()
+        self._heap = []
+        count = self._load(deadlines)
+        self.metrics["recovered"] += count
+        logger.info(f"[MissedTripScheduler] Watching {count} scheduled trips for missed deadlines")
+
+    async def refresh(self, trip_id: str):
+        """Re-read one trip after it was created or changed and move its deadline"""
+        self.remove(trip_id)
+        self._load(await trip_service.load_missed_trip_deadlines([trip_id]))
+
+    async def fire(self, trip_ids: List[str]):
+        """Mark due trips missed in one batch and put back any that are not due after all"""
+        self.metrics["fired"] += len(trip_ids)
+        try:
+            moved = await trip_service.mark_trips_missed(trip_ids)
+        except Exception as e:
+            # The periodic check picks these up
+            self.metrics["errors"] += 1
+            logger.error(f"[MissedTripScheduler] Failed to mark {len(trip_ids)} trips as missed: {e}")
+            return
+        self.metrics["marked_missed"] += len(moved)
+        if moved:
+            logger.info(f"[MissedTripScheduler] Marked {len(moved)} trips as missed")
+
+        # Trips edited on another instance since they were scheduled
+        moved_ids = set(moved)
+        remaining = [trip_id for trip_id in trip_ids if trip_id not in moved_ids and trip_id not in self.deadlines]
+        if remaining:
+            now = self.clock()
+            self._load((trip_id, due_at)
+                       for trip_id, due_at in await trip_service.load_missed_trip_deadlines(remaining)
+                       if due_at > now)
+
+    async def _deadline_loop(self):
+        try:
+            await self.recover()
+        except Exception as e:
+            # Trips still get deadlines from their events, and the periodic check covers the rest
+            self.metrics["errors"] += 1
+            logger.error(f"[MissedTripScheduler] Failed to load missed trip deadlines: {e}")
+
+        while self.running:
+            try:
+                due = self.pop_due()
+                if due:
+                    await self.fire(due)
+                    continue
+                next_due = self.next_due()
+                timeout = None if next_due is None else max(0.0, (next_due - self.clock()).total_seconds())
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                self.metrics["errors"] += 1
+                logger.error(f"[MissedTripScheduler] Error in deadline loop: {e}")
+                await asyncio.sleep(1)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        next_due = self.next_due()
+        return {
+            **self.metrics,
+            "trips": len(self.deadlines),
+            "heap_entries": len(self._heap),
+            "next_deadline_in_s": None if next_due is None else round((next_due - self.clock()).total_seconds(), 1),
+        }
+
 
 # Global instance
 missed_trip_scheduler = MissedTripScheduler()
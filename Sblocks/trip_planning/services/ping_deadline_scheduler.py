@@ -0,0 +1,185 @@
+"""
+Deadline scheduler for driver ping timeouts
+
+Every active ping session has one deadline, the ping timeout after its last
+ping, kept in a single in-memory min-heap. A ping moves the deadline forward
+without touching the database; only a session whose deadline passes is
+handed to ``on_expired`` to open a phone usage violation. The session then
+has no deadline until its next ping ends the violation. Deadlines are
+rebuilt from the active sessions in the database when the scheduler starts.
+"""
+import asyncio
+import heapq
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PING_EXPIRY_CONCURRENCY = int(os.getenv("PING_EXPIRY_CONCURRENCY", "20"))
+HEAP_SLACK_ENTRIES = 1024  # Stale heap entries tolerated beyond one per session before rebuilding
+
+
+class PingDeadlineScheduler:
+    """One timer for the ping timeouts of every active session"""
+
+    def __init__(
+        self,
+        on_expired: Callable[[str], Awaitable[Optional[float]]],
+        load_sessions: Callable[[], Awaitable[Iterable[Tuple[str, float]]]],
+        timeout_s: float,
+        concurrency: int = PING_EXPIRY_CONCURRENCY,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        # on_expired returns None once the session is in violation or gone, or how
+        # long ago it last pinged if the ping reached the database some other way
+        self.on_expired = on_expired
+        self.load_sessions = load_sessions
+        self.timeout_s = timeout_s
+        self.concurrency = max(1, concurrency)
+        self.clock = clock
+
+        self.deadlines: Dict[str, Tuple[float, int]] = {}  # trip_id -> (due_at, version)
+        self._heap: List[Tuple[float, int, str]] = []
+        self._version = 0
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.running = False
+        self.metrics = {"recovered": 0, "pings": 0, "expirations": 0, "rescheduled": 0,
+                        "errors": 0, "compactions": 0}
+
+    # -------------------- Scheduling --------------------
+    def _schedule(self, trip_id: str, due_at: float):
+        """(Re)schedule a session; older heap entries for it are skipped when popped"""
+        self._version += 1
+        self.deadlines[trip_id] = (due_at, self._version)
+        heapq.heappush(self._heap, (due_at, self._version, trip_id))
+        if len(self._heap) > 2 * len(self.deadlines) + HEAP_SLACK_ENTRIES:
+            self._compact()
+        if self._wake is not None and self._heap[0][2] == trip_id:
+            self._wake.set()  # Earlier than what the loop is sleeping towards
+
+    def _compact(self):
+        self._heap = [(due_at, version, trip_id) for trip_id, (due_at, version) in self.deadlines.items()]
+        heapq.heapify(self._heap)
+        self.metrics["compactions"] += 1
+
+    def touch(self, trip_id: str, age_s: float = 0.0):
+        """Move a session's deadline to the timeout after a ping ``age_s`` seconds ago"""
+        self._schedule(trip_id, self.clock() + self.timeout_s - max(0.0, age_s))
+        self.metrics["pings"] += 1
+
+    def remove(self, trip_id: str):
+        """Stop watching a session"""
+        self.deadlines.pop(trip_id, None)
+
+    def next_due(self) -> Optional[float]:
+        """Due time of the earliest live heap entry"""
+        while self._heap:
+            due_at, version, trip_id = self._heap[0]
+            if self.deadlines.get(trip_id) == (due_at, version):
+                return due_at
+            heapq.heappop(self._heap)
+        return None
+
+    def pop_expired(self, now: Optional[float] = None) -> List[str]:
+        """Take every session whose deadline has passed"""
+        now = self.clock() if now is None else now
+        expired = []
+        while self.next_due() is not None and self._heap[0][0] <= now:
+            _, _, trip_id = heapq.heappop(self._heap)
+            del self.deadlines[trip_id]
+            expired.append(trip_id)
+        return expired
+
+    async def recover(self):
+        """Rebuild deadlines from the active sessions in the database"""
+        sessions = list(await self.load_sessions())
+        now = self.clock()
+        self.deadlines.clear()
+        self._heap = []
+        for trip_id, age_s in sessions:
+            self._schedule(trip_id, now + self.timeout_s - max(0.0, age_s))
+        self.metrics["recovered"] += len(sessions)
+        logger.info(f"[PingDeadlineScheduler] Recovered deadlines for {len(sessions)} active ping sessions")
+
+    async def expire(self, trip_ids: List[str]):
+        """Hand expired sessions to ``on_expired`` a few at a time"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(trip_id: str):
+            async with semaphore:
+                try:
+                    age_s = await self.on_expired(trip_id)
+                    self.metrics["expirations"] += 1
+                except Exception as e:
+                    self.metrics["errors"] += 1
+                    logger.error(f"[PingDeadlineScheduler] Failed to handle ping timeout for trip {trip_id}: {e}")
+                    age_s = 0.0  # Try again after another timeout
+            if age_s is not None and trip_id not in self.deadlines:
+                self._schedule(trip_id, self.clock() + self.timeout_s - max(0.0, age_s))
+                self.metrics["rescheduled"] += 1
+
+        await asyncio.gather(*(run(trip_id) for trip_id in trip_ids))
+
+    # -------------------- Loop --------------------
+    async def start(self):
+        """Recover deadlines and start the timer loop"""
+        if self.running:
+            logger.warning("[PingDeadlineScheduler] Scheduler is already running")
+            return
+        self.running = True
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"[PingDeadlineScheduler] Started with a {self.timeout_s}s ping timeout")
+
+    async def stop(self):
+        """Stop the timer loop"""
+        if not self.running:
+            return
+        self.running = False
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._wake = None
+        logger.info("[PingDeadlineScheduler] Stopped")
+
+    async def _run(self):
+        try:
+            await self.recover()
+        except Exception as e:
+            # Sessions still get deadlines from their next ping
+            self.metrics["errors"] += 1
+            logger.error(f"[PingDeadlineScheduler] Failed to recover ping deadlines: {e}")
+
+        while self.running:
+            try:
+                self._wake.clear()
+                expired = self.pop_expired()
+                if expired:
+                    await self.expire(expired)
+                    continue
+
+                next_due = self.next_due()
+                timeout = None if next_due is None else max(0.0, next_due - self.clock())
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"[PingDeadlineScheduler] Error in timer loop: {e}")
+                await asyncio.sleep(1)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Counters and the current schedule's shape"""
+        next_due = self.next_due()
+        return {
+            **self.metrics,
+            "sessions": len(self.deadlines),
+            "heap_entries": len(self._heap),
+            "next_expiry_in_s": None if next_due is None else round(max(0.0, next_due - self.clock()), 1),
+        }
@@ -1,19 +1,32 @@
 """
 Ping Session Monitor Service
 Ensures that ping sessions exist for trips (will be activated/deactivated automatically based on trip status)
+
+A session is created as soon as a trip starts (``trip.started``). The
+periodic sweep is a safety net for missed events: it reads the ids of trips
+that can still be pinged, asks ``driver_ping_sessions`` which of them
+already have a session with one ``distinct``, and creates the rest with one
+unordered ``insert_many``.
 """
 
 import asyncio
 import logging
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterable
 from bson import ObjectId
+from pymongo.errors import BulkWriteError
 from schemas.entities import TripStatus
 from services.driver_ping_service import driver_ping_service
 from repositories.database import db_manager
 
 logger = logging.getLogger(__name__)
 
+# Trips that can still be pinged; finished trips never need a new session
+LIVE_TRIP_STATUSES = [TripStatus.SCHEDULED.value, TripStatus.IN_PROGRESS.value,
+                      TripStatus.PAUSED.value, TripStatus.DELAYED.value]
+RECONCILE_BATCH_SIZE = 1000  # Trip ids per distinct / insert_many call
+DUPLICATE_KEY_ERROR = 11000
+
 
 class PingSessionMonitor:
     """
@@ -98,37 +111,17 @@ class PingSessionMonitor:
                 await asyncio.sleep(30)  # Wait 30 seconds before retrying
 
     async def _ensure_ping_sessions_exist(self) -> int:
-        """Ensure ping sessions exist for all trips with drivers (regardless of trip status)"""
+        """Create the missing ping sessions of live trips with drivers"""
         try:
-            # Get all trips that have drivers assigned
-            trips_with_drivers = await self._get_trips_with_drivers()
-            
-            if not trips_with_drivers:
-                logger.debug("[PingSessionMonitor] No trips with drivers found")
+            trips = await self._get_trips_with_drivers(LIVE_TRIP_STATUSES)
+            if not trips:
+                logger.debug("[PingSessionMonitor] No live trips with drivers found")
                 return 0
             
-            logger.debug(f"[PingSessionMonitor] Found {len(trips_with_drivers)} trips with drivers")
-            
-            created_sessions = 0
-            
-            for trip in trips_with_drivers:
-                trip_id = str(trip["_id"])
-                driver_id = trip.get("driver_assignment")
-                
-                # Check if ping session exists for this trip
-                has_session = await self._has_ping_session(trip_id)
-                
-                if not has_session:
-                    logger.info(f"[PingSessionMonitor] Creating ping session for trip {trip_id}, driver {driver_id}")
-                    try:
-                        session = await driver_ping_service.get_or_create_ping_session(trip_id, driver_id)
-                        created_sessions += 1
-                        logger.info(f"[PingSessionMonitor] ✓ Created ping session {session.id} for trip {trip_id}")
-                    except Exception as e:
-                        logger.error(f"[PingSessionMonitor] ✗ Failed to create ping session for trip {trip_id}: {e}")
-                else:
-                    logger.debug(f"[PingSessionMonitor] ✓ Trip {trip_id} already has ping session")
+            missing = await self._find_missing_sessions(trips)
+            logger.debug(f"[PingSessionMonitor] {len(missing)} of {len(trips)} live trips with drivers have no ping session")
             
+            created_sessions = await self._create_sessions(missing)
             if created_sessions > 0:
                 logger.info(f"[PingSessionMonitor] SUMMARY: Created {created_sessions} new ping sessions")
             
@@ -138,40 +131,64 @@ class PingSessionMonitor:
             logger.error(f"[PingSessionMonitor] Failed to ensure ping sessions exist: {e}")
             return 0
 
-    async def _get_trips_with_drivers(self) -> List[Dict]:
-        """Get all trips that have drivers assigned (regardless of status)"""
+    async def ensure_session(self, trip_id: str, driver_id: str):
+        """Create a started trip's ping session without waiting for the sweep"""
         try:
-            pipeline = [
-                {
-                    "$match": {
-                        "driver_assignment": {"$exists": True, "$ne": None}
-                    }
-                },
-                {
-                    "$project": {
-                        "_id": 1,
-                        "status": 1,
-                        "driver_assignment": 1
-                    }
-                }
-            ]
-            
-            cursor = self.db.trips.aggregate(pipeline)
-            trips = await cursor.to_list(length=None)
-            return trips
-            
+            await driver_ping_service.get_or_create_ping_session(trip_id, driver_id)
         except Exception as e:
-            logger.error(f"[PingSessionMonitor] Failed to get trips with drivers: {e}")
-            return []
+            logger.error(f"[PingSessionMonitor] Failed to create ping session for trip {trip_id}: {e}")
 
-    async def _has_ping_session(self, trip_id: str) -> bool:
-        """Check if a ping session exists for the given trip (regardless of active status)"""
-        try:
-            session = await self.db.driver_ping_sessions.find_one({"trip_id": trip_id})
-            return session is not None
-        except Exception as e:
-            logger.error(f"[PingSessionMonitor] Failed to check if ping session exists for trip {trip_id}: {e}")
-            return False
+    async def force_create_all_ping_sessions(self) -> Dict[str, Any]:
+        """Create the missing ping sessions of every trip with a driver, whatever its status"""
+        trips = await self._get_trips_with_drivers()
+        missing = await self._find_missing_sessions(trips)
+        created = await self._create_sessions(missing)
+        logger.info(f"[PingSessionMonitor] Force create: {created} sessions created for {len(trips)} trips with drivers")
+        return {
+            "trips_with_drivers": len(trips),
+            "missing_sessions": len(missing),
+            "sessions_created": created
+        }
+
+    async def _get_trips_with_drivers(self, statuses: Optional[List[str]] = None) -> Dict[str, str]:
+        """Driver of each trip that has one, optionally only trips in ``statuses``"""
+        query: Dict[str, Any] = {"driver_assignment": {"$nin": [None, ""]}}
+        if statuses is not None:
+            query["status"] = {"$in": statuses}
+        
+        trips = {}
+        async for trip in self.db.trips.find(query, {"driver_assignment": 1}):
+            trips[str(trip["_id"])] = trip["driver_assignment"]
+        return trips
+
+    async def _find_missing_sessions(self, trips: Dict[str, str]) -> Dict[str, str]:
+        """The trips in ``trips`` that have no ping session"""
+        trip_ids = list(trips)
+        existing = set()
+        for chunk in self._chunks(trip_ids):
+            existing.update(await self.db.driver_ping_sessions.distinct("trip_id", {"trip_id": {"$in": chunk}}))
+        return {trip_id: trips[trip_id] for trip_id in trip_ids if trip_id not in existing}
+
+    async def _create_sessions(self, trips: Dict[str, str]) -> int:
+        """Insert a session per trip; trips another instance got to first are skipped"""
+        created = 0
+        documents = [driver_ping_service.new_session_document(trip_id, driver_id) for trip_id, driver_id in trips.items()]
+        for chunk in self._chunks(documents):
+            try:
+                result = await self.db.driver_ping_sessions.insert_many(chunk, ordered=False)
+                created += len(result.inserted_ids)
+            except BulkWriteError as e:
+                # The unique trip_id index rejects sessions created since the check
+                created += e.details.get("nInserted", 0)
+                others = [err for err in e.details.get("writeErrors", []) if err.get("code") != DUPLICATE_KEY_ERROR]
+                if others:
+                    logger.error(f"[PingSessionMonitor] Failed to create {len(others)} ping sessions: {others[0].get('errmsg')}")
+        return created
+
+    @staticmethod
+    def _chunks(items: List, size: int = RECONCILE_BATCH_SIZE) -> Iterable[List]:
+        for start in range(0, len(items), size):
+            yield items[start:start + size]
 
     async def check_now(self) -> int:
         """Manually trigger a ping session existence check"""
@@ -181,38 +198,29 @@ class PingSessionMonitor:
     async def get_status(self) -> Dict[str, Any]:
         """Get status overview of ping sessions"""
         try:
-            # Get all trips with drivers
-            trips_with_drivers = await self._get_trips_with_drivers()
-            total_trips_with_drivers = len(trips_with_drivers)
+            trips_with_drivers = await self._get_trips_with_drivers(LIVE_TRIP_STATUSES)
+            missing_sessions = len(await self._find_missing_sessions(trips_with_drivers))
             
-            # Get all ping sessions
-            ping_sessions = await self.db.driver_ping_sessions.find({}).to_list(length=None)
-            total_sessions = len(ping_sessions)
-            active_sessions = len([s for s in ping_sessions if s.get("status") == "active"])
-            inactive_sessions = len([s for s in ping_sessions if s.get("status") != "active"])
+            sessions_by_activity = {}
+            async for group in self.db.driver_ping_sessions.aggregate([
+                {"$group": {"_id": "$is_active", "count": {"$sum": 1}}}
+            ]):
+                active = group["_id"] is True
+                sessions_by_activity[active] = sessions_by_activity.get(active, 0) + group["count"]
+            active_sessions = sessions_by_activity.get(True, 0)
+            inactive_sessions = sessions_by_activity.get(False, 0)
             
-            # Get trips by status
-            all_trips = await self.db.trips.find({}).to_list(length=None)
             trips_by_status = {}
-            for trip in all_trips:
-                status = trip.get("status", "unknown")
-                if status not in trips_by_status:
-                    trips_by_status[status] = 0
-                trips_by_status[status] += 1
-            
-            # Calculate missing sessions (trips with drivers but no session)
-            missing_sessions = 0
-            for trip in trips_with_drivers:
-                trip_id = str(trip["_id"])
-                has_session = await self._has_ping_session(trip_id)
-                if not has_session:
-                    missing_sessions += 1
+            async for group in self.db.trips.aggregate([
+                {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+            ]):
+                trips_by_status[group["_id"] or "unknown"] = group["count"]
             
             return {
                 "monitor_status": "running" if self.running else "stopped",
-                "total_trips_with_drivers": total_trips_with_drivers,
+                "total_trips_with_drivers": len(trips_with_drivers),
                 "ping_sessions": {
-                    "total": total_sessions,
+                    "total": active_sessions + inactive_sessions,
                     "active": active_sessions,
                     "inactive": inactive_sessions,
                     "missing": missing_sessions
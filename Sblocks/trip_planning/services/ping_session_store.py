@@ -0,0 +1,237 @@
+"""
+In-memory state for driver ping sessions
+
+``TripStatusCache`` keeps each pinging trip's status and driver so a ping
+does not read the trip from the database; entries are dropped by trip
+lifecycle events and expire after ``TRIP_STATUS_CACHE_TTL_SECONDS`` in case
+an event went to another instance. Only trips whose entries pass
+``cacheable`` are kept, so a trip that is about to start is re-read. ``PingSessionStore`` keeps the active
+sessions keyed by trip and records pings against them in memory. The last
+ping and ping count of every session that pinged since the previous flush
+are written in one unordered ``bulk_write`` every
+``PING_FLUSH_INTERVAL_SECONDS``.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+TRIP_STATUS_CACHE_TTL_SECONDS = float(os.getenv("TRIP_STATUS_CACHE_TTL_SECONDS", "30"))
+PING_FLUSH_INTERVAL_SECONDS = float(os.getenv("PING_FLUSH_INTERVAL_SECONDS", "2"))
+PING_SESSION_IDLE_SECONDS = 600.0  # Sessions without pings for this long are dropped from memory
+
+
+class TripStatusCache:
+    """Status and driver of recently pinged trips, loaded many at a time"""
+
+    def __init__(
+        self,
+        load: Callable[[List[str]], Awaitable[Dict[str, Dict[str, Any]]]],
+        ttl_s: float = TRIP_STATUS_CACHE_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+        cacheable: Callable[[Optional[Dict[str, Any]]], bool] = lambda trip: True
+    ):
+        self.load = load
+        self.ttl_s = ttl_s
+        self.clock = clock
+        self.cacheable = cacheable
+        self._entries: Dict[str, Tuple[float, Optional[Dict[str, Any]]]] = {}
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    async def get_many(self, trip_ids: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Trip docs (status and driver) by id, None for trips that do not exist"""
+        now = self.clock()
+        found: Dict[str, Optional[Dict[str, Any]]] = {}
+        missing = []
+        for trip_id in dict.fromkeys(trip_ids):
+            entry = self._entries.get(trip_id)
+            if entry is not None and now - entry[0] < self.ttl_s:
+                found[trip_id] = entry[1]
+                self.stats["hits"] += 1
+            else:
+                missing.append(trip_id)
+        if missing:
+            self.stats["misses"] += len(missing)
+            loaded = await self.load(missing)
+            for trip_id in missing:
+                found[trip_id] = loaded.get(trip_id)
+                if self.cacheable(found[trip_id]):
+                    self._entries[trip_id] = (now, found[trip_id])
+        return found
+
+    async def get(self, trip_id: str) -> Optional[Dict[str, Any]]:
+        return (await self.get_many([trip_id]))[trip_id]
+
+    def invalidate(self, trip_id: str):
+        """Forget a trip whose status or driver changed"""
+        if self._entries.pop(trip_id, None) is not None:
+            self.stats["invalidations"] += 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {**self.stats, "trips": len(self._entries)}
+
+
+class PingSessionState:
+    """A ping session as this instance last saw it"""
+
+    def __init__(self, session: Any):
+        self.session_id = str(session.id)
+        self.trip_id = session.trip_id
+        self.driver_id = session.driver_id
+        self.is_active = session.is_active
+        self.last_ping_time: Optional[datetime] = session.last_ping_time
+        location = session.last_ping_location
+        self.last_ping_location = location.model_dump() if hasattr(location, "model_dump") else location
+        self.current_violation_id: Optional[str] = session.current_violation_id
+        self.total_violations = session.total_violations
+        self.unflushed_pings = 0
+        self.seen_at = 0.0
+
+
+class PingSessionStore:
+    """Active ping sessions by trip, with pings written back in batches"""
+
+    def __init__(
+        self,
+        collection: Callable[[], Any],
+        flush_interval_s: float = PING_FLUSH_INTERVAL_SECONDS,
+        idle_s: float = PING_SESSION_IDLE_SECONDS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.collection = collection
+        self.flush_interval_s = flush_interval_s
+        self.idle_s = idle_s
+        self.clock = clock
+        self.sessions: Dict[str, PingSessionState] = {}
+        self._dirty: Dict[str, PingSessionState] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.running = False
+        self.stats = {"pings": 0, "flushes": 0, "session_writes": 0, "errors": 0, "evictions": 0}
+
+    def get(self, trip_id: str) -> Optional[PingSessionState]:
+        state = self.sessions.get(trip_id)
+        if state is not None:
+            state.seen_at = self.clock()
+        return state
+
+    def put(self, session: Any) -> PingSessionState:
+        """Start tracking a session loaded from the database, keeping pings not yet written"""
+        state = PingSessionState(session)
+        previous = self.sessions.get(state.trip_id)
+        if previous is not None and previous.unflushed_pings:
+            state.unflushed_pings = previous.unflushed_pings
+            if state.last_ping_time is None or (previous.last_ping_time and previous.last_ping_time > state.last_ping_time):
+                state.last_ping_time = previous.last_ping_time
+                state.last_ping_location = previous.last_ping_location
+            self._dirty[state.trip_id] = state
+        state.seen_at = self.clock()
+        self.sessions[state.trip_id] = state
+        return state
+
+    def record_ping(self, state: PingSessionState, location: Dict[str, Any], ping_time: datetime):
+        """Apply a ping in memory; it reaches the database on the next flush"""
+        if state.last_ping_time is None or ping_time >= state.last_ping_time:
+            state.last_ping_time = ping_time
+            state.last_ping_location = location
+        state.unflushed_pings += 1
+        self._dirty[state.trip_id] = state
+        self.stats["pings"] += 1
+
+    async def flush(self, trip_ids: Optional[Iterable[str]] = None) -> int:
+        """Write pending pings for every session, or only ``trip_ids``; returns sessions written"""
+        if trip_ids is None:
+            batch, self._dirty = self._dirty, {}
+        else:
+            batch = {t: self._dirty.pop(t) for t in trip_ids if t in self._dirty}
+        if not batch:
+            return 0
+
+        now = datetime.utcnow()
+        counts = {trip_id: state.unflushed_pings for trip_id, state in batch.items()}
+        operations = [
+            UpdateOne(
+                {"_id": ObjectId(state.session_id)},
+                {
+                    "$set": {
+                        "last_ping_time": state.last_ping_time,
+                        "last_ping_location": state.last_ping_location,
+                        "updated_at": now
+                    },
+                    "$inc": {"ping_count": counts[trip_id]}
+                }
+            )
+            for trip_id, state in batch.items()
+        ]
+        for state in batch.values():
+            state.unflushed_pings = 0
+        try:
+            await self.collection().bulk_write(operations, ordered=False)
+        except Exception as e:
+            # Put the pings back so the next flush retries them
+            self.stats["errors"] += 1
+            for trip_id, state in batch.items():
+                state.unflushed_pings += counts[trip_id]
+                self._dirty.setdefault(trip_id, state)
+            logger.error(f"[PingSessionStore] Failed to flush {len(batch)} ping sessions: {e}")
+            raise
+        self.stats["flushes"] += 1
+        self.stats["session_writes"] += len(operations)
+        return len(operations)
+
+    async def evict(self, trip_id: str):
+        """Write out and forget a session that ended"""
+        await self.flush([trip_id])
+        self.sessions.pop(trip_id, None)
+
+    def _evict_idle(self):
+        cutoff = self.clock() - self.idle_s
+        idle = [t for t, s in self.sessions.items() if s.seen_at < cutoff and t not in self._dirty]
+        for trip_id in idle:
+            del self.sessions[trip_id]
+        self.stats["evictions"] += len(idle)
+
+    # -------------------- Loop --------------------
+    async def start(self):
+        """Start the periodic flush"""
+        if self.running:
+            logger.warning("[PingSessionStore] Store is already running")
+            return
+        self.running = True
+        self._task = asyncio.create_task(self._flush_loop())
+        logger.info(f"[PingSessionStore] Flushing pings every {self.flush_interval_s}s")
+
+    async def stop(self):
+        """Stop the periodic flush and write out what is left"""
+        if not self.running:
+            return
+        self.running = False
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            pass  # Already logged
+        logger.info("[PingSessionStore] Stopped")
+
+    async def _flush_loop(self):
+        while self.running:
+            try:
+                await asyncio.sleep(self.flush_interval_s)
+                await self.flush()
+                self._evict_idle()
+            except asyncio.CancelledError:
+                break
+            except Exception:
+                pass  # Logged by flush; the pings are retried next time
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {**self.stats, "sessions": len(self.sessions), "unflushed_sessions": len(self._dirty)}
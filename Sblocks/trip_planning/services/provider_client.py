@@ -0,0 +1,279 @@
+"""
+Shared async HTTP client for external routing and traffic providers
+
+All ORS, Mapbox and TomTom calls go through one pooled aiohttp session.
+Each provider gets a token bucket for its API rate limit and a semaphore
+bounding its requests in flight, and latency/error counts are kept per
+provider. ``hedge`` races equivalent calls to different providers, starting
+the backup only once the primary has been slower than its usual p95.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# (requests per second, burst, max in flight); override with e.g. ORS_RATE_PER_SECOND
+DEFAULT_PROVIDER_LIMITS = {
+    "ors": (0.66, 5, 4),       # Free plan: 40 directions requests per minute
+    "mapbox": (5.0, 10, 8),    # 300 per minute
+    "tomtom": (5.0, 5, 5),     # 5 queries per second
+}
+FALLBACK_LIMITS = (2.0, 4, 4)
+PROVIDER_POOL_SIZE = int(os.getenv("PROVIDER_POOL_SIZE", "32"))
+PROVIDER_TIMEOUT_SECONDS = float(os.getenv("PROVIDER_TIMEOUT_SECONDS", "30"))
+HEDGE_MIN_DELAY_SECONDS = 0.25
+HEDGE_DEFAULT_DELAY_SECONDS = 2.0  # Until a provider has enough latency samples
+LATENCY_WINDOW = 512
+
+
+class ProviderError(Exception):
+    """An external provider request failed"""
+
+    def __init__(self, provider: str, message: str, status: Optional[int] = None, body: Optional[str] = None):
+        super().__init__(f"{provider}: {message}")
+        self.provider = provider
+        self.status = status
+        self.body = body
+
+
+class TokenBucket:
+    """Refills ``rate`` tokens per second up to ``burst``; ``acquire`` waits for one"""
+
+    def __init__(self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = max(1, int(burst))
+        self.clock = clock
+        self.tokens = float(self.burst)
+        self.updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> float:
+        """Take a token, returning how long the caller had to wait"""
+        waited = 0.0
+        # The lock keeps waiters in arrival order
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1.0:
+                delay = (1.0 - self.tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+                self._refill()
+            self.tokens -= 1.0
+        return waited
+
+
+class ProviderStats:
+    """Request counters and a window of recent latencies for one provider"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self.throttle_wait_s = 0.0
+        self.in_flight = 0
+        self.hedges_started = 0
+        self.hedges_won = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def p95(self) -> Optional[float]:
+        if len(self.latencies) < 20:
+            return None
+        return float(np.percentile(self.latencies, 95))
+
+    def as_dict(self) -> Dict[str, Any]:
+        latencies = list(self.latencies)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if latencies else (0.0, 0.0, 0.0)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": round(self.errors / self.requests, 4) if self.requests else 0.0,
+            "throttled": self.throttled,
+            "throttle_wait_s": round(self.throttle_wait_s, 3),
+            "in_flight": self.in_flight,
+            "hedges_started": self.hedges_started,
+            "hedges_won": self.hedges_won,
+            "latency_ms": {"p50": round(float(p50) * 1000, 1), "p95": round(float(p95) * 1000, 1),
+                           "p99": round(float(p99) * 1000, 1)},
+        }
+
+
+class ProviderClient:
+    """Pooled, rate-limited HTTP client shared by every external provider call"""
+
+    def __init__(self, pool_size: int = PROVIDER_POOL_SIZE, timeout_s: float = PROVIDER_TIMEOUT_SECONDS):
+        self.pool_size = pool_size
+        self.timeout_s = timeout_s
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+        self._limits: Dict[str, Tuple[float, int, int]] = {}
+        self.stats: Dict[str, ProviderStats] = {}
+
+    def configure(self, provider: str, rate: float, burst: int, concurrency: int):
+        """Set a provider's rate limit and concurrency (before its first request)"""
+        self._limits[provider] = (rate, burst, concurrency)
+        self._buckets.pop(provider, None)
+        self._slots.pop(provider, None)
+
+    def _provider_limits(self, provider: str) -> Tuple[float, int, int]:
+        if provider not in self._limits:
+            rate, burst, concurrency = DEFAULT_PROVIDER_LIMITS.get(provider, FALLBACK_LIMITS)
+            prefix = provider.upper()
+            self._limits[provider] = (
+                float(os.getenv(f"{prefix}_RATE_PER_SECOND", rate)),
+                int(os.getenv(f"{prefix}_BURST", burst)),
+                int(os.getenv(f"{prefix}_MAX_CONCURRENCY", concurrency)),
+            )
+        return self._limits[provider]
+
+    def _stats(self, provider: str) -> ProviderStats:
+        if provider not in self.stats:
+            self.stats[provider] = ProviderStats()
+        return self.stats[provider]
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Get or create the shared HTTP session"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300)
+            self.session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout_s)
+            )
+        return self.session
+
+    async def close(self):
+        """Close the shared HTTP session"""
+        if self.session and not self.session.closed:
+            await self.session.close()
+
+    async def request(
+        self,
+        provider: str,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        json: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout_s: Optional[float] = None
+    ) -> Any:
+        """Rate-limited request returning the decoded JSON body; raises ProviderError on failure"""
+        rate, burst, concurrency = self._provider_limits(provider)
+        if provider not in self._buckets:
+            self._buckets[provider] = TokenBucket(rate, burst)
+            self._slots[provider] = asyncio.Semaphore(concurrency)
+        stats = self._stats(provider)
+
+        waited = await self._buckets[provider].acquire()
+        if waited > 0:
+            stats.throttled += 1
+            stats.throttle_wait_s += waited
+
+        async with self._slots[provider]:
+            stats.requests += 1
+            stats.in_flight += 1
+            start = time.monotonic()
+            try:
+                session = await self._get_session()
+                timeout = aiohttp.ClientTimeout(total=timeout_s) if timeout_s else None
+                async with session.request(method, url, params=params, json=json, headers=headers,
+                                           timeout=timeout) as resp:
+                    if resp.status >= 400:
+                        body = await resp.text()
+                        raise ProviderError(provider, f"HTTP {resp.status}", status=resp.status, body=body[:500])
+                    data = await resp.json(content_type=None)
+                stats.latencies.append(time.monotonic() - start)
+                return data
+            except ProviderError:
+                stats.errors += 1
+                raise
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                stats.errors += 1
+                raise ProviderError(provider, f"{type(e).__name__}: {e}") from e
+            finally:
+                stats.in_flight -= 1
+
+    async def get(self, provider: str, url: str, **kwargs: Any) -> Any:
+        return await self.request(provider, "GET", url, **kwargs)
+
+    async def post(self, provider: str, url: str, **kwargs: Any) -> Any:
+        return await self.request(provider, "POST", url, **kwargs)
+
+    def hedge_delay(self, provider: str) -> float:
+        """How long to give ``provider`` before starting a backup: its recent p95 latency"""
+        p95 = self._stats(provider).p95()
+        return HEDGE_DEFAULT_DELAY_SECONDS if p95 is None else max(HEDGE_MIN_DELAY_SECONDS, p95)
+
+    async def hedge(
+        self,
+        calls: Sequence[Tuple[str, Callable[[], Awaitable[Any]]]],
+        accept: Callable[[Any], bool] = bool,
+        delay_s: Optional[float] = None
+    ) -> Any:
+        """First acceptable result from ``(provider, call)`` pairs tried in order
+
+        The next call starts when the running ones have taken longer than the
+        last-started provider's hedge delay, or straight away when one fails
+        or returns an unacceptable result. Losing calls are cancelled. Returns
+        the last result (or None) when none is acceptable.
+        """
+        pending: Dict[asyncio.Task, str] = {}
+        queue: List[Tuple[str, Callable[[], Awaitable[Any]]]] = list(calls)
+        result: Any = None
+
+        def launch():
+            provider, call = queue.pop(0)
+            if pending:
+                self._stats(provider).hedges_started += 1
+            pending[asyncio.ensure_future(call())] = provider
+            return provider
+
+        try:
+            current = launch()
+            while pending:
+                wait = (delay_s if delay_s is not None else self.hedge_delay(current)) if queue else None
+                done, _ = await asyncio.wait(list(pending), timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    current = launch()  # Primary is slow; race a backup
+                    continue
+                for task in done:
+                    provider = pending.pop(task)
+                    if task.cancelled():
+                        continue
+                    if task.exception() is not None:
+                        logger.warning(f"[ProviderClient] Hedged call to {provider} failed: {task.exception()}")
+                        continue
+                    result = task.result()
+                    if accept(result):
+                        if provider != calls[0][0]:
+                            self._stats(provider).hedges_won += 1
+                        return result
+                if queue:
+                    current = launch()  # Something finished without an answer; don't wait out the delay
+            return result
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Per-provider request, error, throttling and latency figures"""
+        return {
+            provider: {**stats.as_dict(), "rate_per_second": self._limits.get(provider, (None,))[0]}
+            for provider, stats in self.stats.items()
+        }
+
+
+# Global provider client instance
+provider_client = ProviderClient()
@@ -255,6 +255,9 @@ class ServiceRequestConsumer:
             elif "driver/ping" in endpoint:
                 logger.info(f"[_route_request] Routing to _handle_driver_ping_request()")
                 return await self._handle_driver_ping_request(method, user_context)
+            elif endpoint == "violations" or endpoint.startswith("violations/"):
+                logger.info(f"[_route_request] Routing to _handle_violations_request()")
+                return await self._handle_violations_request(method, user_context)
             elif "speed-violations" in endpoint or "speed_violations" in endpoint:
                 logger.info(f"[_route_request] Routing to _handle_speed_violations_request()")
                 return await self._handle_speed_violations_request(method, user_context)
@@ -1464,77 +1467,32 @@ class ServiceRequestConsumer:
             ).model_dump()
 
     async def _handle_driver_behavior_analytics_requests(self, method: str, user_context: Dict[str, Any]) -> Dict[str, Any]:
-        """Handle driver behavior analytics requests (avoids TestClient cross-loop issues)."""
+        """Handle driver behavior analytics requests in-process through the driver behavior service"""
         try:
             from schemas.responses import ResponseBuilder
-            from fastapi import Request
-            import os
-            import asyncio
-            import httpx
+            from services.driver_behavior_service import driver_behavior_service
+            from urllib.parse import parse_qs
 
-            data = user_context.get("data", {})
+            data = user_context.get("data") or {}
             endpoint = user_context.get("endpoint", "")
-            user_id = user_context.get("user_id", "")
             logger.info(f"[DriverBehaviorAnalytics] Processing endpoint: {endpoint}")
 
-            path_parts = endpoint.split('/')
+            path, _, query = endpoint.partition("?")
+            path_parts = path.split('/')
             if len(path_parts) < 2:
                 raise ValueError(f"Invalid driver-behavior endpoint format: {endpoint}")
 
-            analytics_endpoint = '/'.join(path_parts[1:]) 
-
-            query_params = ""
-            if data.get('period'):
-                query_params = f"?period={data.get('period')}"
-            elif 'period=' in endpoint:
-                if '?' in endpoint:
-                    query_params = '?' + endpoint.split('?')[1]
-
-            full_endpoint = f"/driver-behavior/{analytics_endpoint}{query_params}"
-            logger.info(f"[DriverBehaviorAnalytics] Calling endpoint: {full_endpoint}")
-
-            
-            base_url = "http://localhost:8000"
-            logger.warning(f"[CONSUMER DEBUG] loop={id(asyncio.get_running_loop())} base_url={base_url} GET {full_endpoint}")
-
-            def _pick_bearer(user_context: dict) -> str | None:
-               
-                raw_auth = str(user_context.get("authorization") or user_context.get("Authorization") or "").strip()
-                if raw_auth.lower().startswith("bearer "):
-                    tok = raw_auth[7:].strip()
-                    if tok and tok.lower() not in {"null", "none"}:
-                        return f"Bearer {tok}"
-
-                tok = str(user_context.get("token") or "").strip()
-                if tok and tok.lower() not in {"null", "none"}:
-                    return f"Bearer {tok}"
-
-                svc = str(os.getenv("INTERNAL_SERVICE_TOKEN", "")).strip()
-                if svc:
-                    return f"Bearer {svc}"
-
-                return None
-
-            auth_value = _pick_bearer(user_context)
-            headers = {}
-            if auth_value:
-                headers["Authorization"] = auth_value
-                masked = auth_value[:10] + "…" if len(auth_value) > 10 else "****"
-                logger.debug(f"[CONSUMER DEBUG] using Authorization={masked}")
-            else:
-                logger.debug("[CONSUMER DEBUG] no valid token; sending request without Authorization")
-
-            async with httpx.AsyncClient(base_url=base_url, timeout=20.0) as client:
-                response = await client.get(full_endpoint, headers=headers)
-
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"[DriverBehaviorAnalytics] API call failed with status {response.status_code}: {response.text}")
-                return ResponseBuilder.error(
-                    error="DriverBehaviorAnalyticsError",
-                    message=f"Failed to retrieve driver behavior analytics: {response.text}"
-                ).model_dump()
+            # Parameters may come in the request data or in the endpoint's query string
+            params = {key: values[-1] for key, values in parse_qs(query).items()}
+            report = await driver_behavior_service.get_report(
+                '/'.join(path_parts[1:]),
+                period=data.get("period") or params.get("period"),
+                driver_id=data.get("driver_id") or params.get("driver_id")
+            )
+            return ResponseBuilder.success(
+                data=report["data"],
+                message=report["message"]
+            ).model_dump()
 
         except Exception as e:
             logger.exception("[DriverBehaviorAnalytics] Unexpected error: %s", e)
@@ -1572,7 +1530,7 @@ class ServiceRequestConsumer:
 
                 if "drivers" in endpoint:
                     logger.info(f"[Analytics] Requesting driver analytics for timeframe: {timeframe}")
-                    driver_analytics = analytics_service.get_analytics_first(start_date, end_date)
+                    driver_analytics = await analytics_service.get_analytics_first(start_date, end_date)
                     logger.info("[Analytics] Driver analytics calculation completed")
                     logger.debug(f"[Analytics] Driver analytics response: {driver_analytics}")
                     return ResponseBuilder.success(
@@ -1582,7 +1540,7 @@ class ServiceRequestConsumer:
 
                 if "vehicles" in endpoint:
                     logger.info(f"[Analytics] Requesting vehicle analytics for timeframe: {timeframe}")
-                    vehicle_analytics = analytics_service.get_analytics_second(start_date, end_date)
+                    vehicle_analytics = await analytics_service.get_analytics_second(start_date, end_date)
                     logger.info("[Analytics] Vehicle analytics calculation completed")
                     logger.debug(f"[Analytics] Vehicle analytics response: {vehicle_analytics}")
                     return ResponseBuilder.success(
@@ -1706,15 +1664,46 @@ class ServiceRequestConsumer:
         try:
             from schemas.responses import ResponseBuilder
             from services.driver_ping_service import driver_ping_service
-            from services.trip_service import trip_service
-            from schemas.requests import DriverPingRequest
+            from schemas.requests import DriverPingRequest, DriverPingBatchRequest
             from schemas.entities import LocationPoint
             
             data = user_context.get("data", {})
             endpoint = user_context.get("endpoint", "")
             logger.info(f"[_handle_driver_ping_request] Endpoint: '{endpoint}', Method: '{method}', Data: {data}")
             
-            if method == "POST" and "driver/ping" in endpoint:
+            if method == "POST" and "driver/ping/batch" in endpoint:
+                # Handle POST /driver/ping/batch - several pings in one request
+                if not data:
+                    return ResponseBuilder.error(
+                        error="ValidationError",
+                        message="Request data is required for ping operation"
+                    ).model_dump()
+                
+                try:
+                    batch = DriverPingBatchRequest(**data)
+                    results = await driver_ping_service.process_pings([
+                        (ping.trip_id, ping.location, ping.timestamp) for ping in batch.pings
+                    ])
+                    statuses = [result["status"] for result in results]
+                    
+                    return ResponseBuilder.success(
+                        data={
+                            "accepted": statuses.count("success"),
+                            "inactive": statuses.count("inactive"),
+                            "failed": statuses.count("error"),
+                            "results": results
+                        },
+                        message=f"Processed {len(results)} pings"
+                    ).model_dump()
+                    
+                except Exception as e:
+                    logger.error(f"[_handle_driver_ping_request] Error processing ping batch: {e}")
+                    return ResponseBuilder.error(
+                        error="PingProcessingError",
+                        message=f"Failed to process driver ping batch: {str(e)}"
+                    ).model_dump()
+            
+            elif method == "POST" and "driver/ping" in endpoint:
                 # Handle POST /driver/ping - receive driver phone ping
                 logger.info(f"[_handle_driver_ping_request] Processing driver ping request")
                 
@@ -1728,15 +1717,7 @@ class ServiceRequestConsumer:
                     # Parse the ping request data
                     ping_request = DriverPingRequest(**data)
                     
-                    # Validate trip exists and is active
-                    trip = await trip_service.get_trip_by_id(ping_request.trip_id)
-                    if not trip:
-                        return ResponseBuilder.error(
-                            error="TripNotFound",
-                            message=f"Trip {ping_request.trip_id} not found"
-                        ).model_dump()
-                    
-                    # Process the ping
+                    # Process the ping; unknown trips come back as TripNotFound
                     result = await driver_ping_service.process_ping(
                         trip_id=ping_request.trip_id,
                         location=ping_request.location,
@@ -1744,6 +1725,11 @@ class ServiceRequestConsumer:
                     )
                     
                     if result["status"] == "error":
+                        if result.get("error") == "TripNotFound":
+                            return ResponseBuilder.error(
+                                error="TripNotFound",
+                                message=f"Trip {ping_request.trip_id} not found"
+                            ).model_dump()
                         return ResponseBuilder.error(
                             error="PingProcessingError",
                             message=result["message"]
@@ -1840,6 +1826,57 @@ class ServiceRequestConsumer:
                 message=f"Failed to process driver ping request: {str(e)}"
             ).model_dump()
 
+    async def _handle_violations_request(self, method: str, user_context: Dict[str, Any]) -> Dict[str, Any]:
+        """Handle batch violation ingest requests"""
+        try:
+            from schemas.responses import ResponseBuilder
+            data = user_context.get("data", {})
+            endpoint = user_context.get("endpoint", "")
+            
+            logger.info(f"[_handle_violations_request] Method: {method}, Endpoint: {endpoint}")
+            
+            if method == "POST" and endpoint == "violations/batch":
+                # Record speeding, braking and acceleration violations of mixed types together
+                from schemas.requests import ViolationBatchRequest
+                from services.violation_ingest_service import violation_ingest_service
+                
+                try:
+                    batch = ViolationBatchRequest(**(data or {}))
+                except Exception as e:
+                    return ResponseBuilder.error(
+                        error="ValidationError",
+                        message=f"Invalid violation batch: {str(e)}"
+                    ).model_dump()
+                
+                if batch.wait:
+                    result = await violation_ingest_service.ingest(batch.violations)
+                else:
+                    result = await violation_ingest_service.submit(batch.violations)
+                
+                if result.get("buffer_full"):
+                    return ResponseBuilder.error(
+                        error="ServiceUnavailable",
+                        message="Violation ingest buffer is full, retry later"
+                    ).model_dump()
+                
+                return ResponseBuilder.success(
+                    data=result,
+                    message=f"Processed {result['received']} violations"
+                ).model_dump()
+            
+            else:
+                return ResponseBuilder.error(
+                    error="MethodNotAllowed",
+                    message=f"Method {method} not allowed for {endpoint}"
+                ).model_dump()
+                
+        except Exception as e:
+            logger.error(f"[_handle_violations_request] Exception: {e}")
+            return ResponseBuilder.error(
+                error="ViolationsRequestError",
+                message=f"Failed to process violations request: {str(e)}"
+            ).model_dump()
+
     async def _handle_speed_violations_request(self, method: str, user_context: Dict[str, Any]) -> Dict[str, Any]:
         """Handle speed violations requests"""
         try:
@@ -1854,6 +1891,7 @@ class ServiceRequestConsumer:
                 from schemas.requests import CreateSpeedViolationRequest
                 from schemas.entities import SpeedViolation, LocationPoint
                 from repositories.database import db_manager
+                from services.driver_history_service import driver_history_service
                 
                 try:
                     # Validate request data
@@ -1872,6 +1910,7 @@ class ServiceRequestConsumer:
                     
                     result = await db_manager.speed_violations.insert_one(violation_data)
                     violation_data["_id"] = str(result.inserted_id)
+                    await driver_history_service.record_violation(violation_data["driver_id"], "speeding")
                     
                     # Create response object
                     violation = SpeedViolation(**violation_data)
@@ -1917,6 +1956,7 @@ class ServiceRequestConsumer:
                 from schemas.requests import CreateExcessiveBrakingViolationRequest
                 from schemas.entities import ExcessiveBrakingViolation, LocationPoint
                 from repositories.database import db_manager
+                from services.driver_history_service import driver_history_service
                 
                 try:
                     # Validate request data
@@ -1935,6 +1975,7 @@ class ServiceRequestConsumer:
                     
                     result = await db_manager.excessive_braking_violations.insert_one(violation_data)
                     violation_data["_id"] = str(result.inserted_id)
+                    await driver_history_service.record_violation(violation_data["driver_id"], "braking")
                     
                     # Create response object
                     violation = ExcessiveBrakingViolation(**violation_data)
@@ -1980,6 +2021,7 @@ class ServiceRequestConsumer:
                 from schemas.requests import CreateExcessiveAccelerationViolationRequest
                 from schemas.entities import ExcessiveAccelerationViolation, LocationPoint
                 from repositories.database import db_manager
+                from services.driver_history_service import driver_history_service
                 
                 try:
                     # Validate request data
@@ -1998,6 +2040,7 @@ class ServiceRequestConsumer:
                     
                     result = await db_manager.excessive_acceleration_violations.insert_one(violation_data)
                     violation_data["_id"] = str(result.inserted_id)
+                    await driver_history_service.record_violation(violation_data["driver_id"], "acceleration")
                     
                     # Create response object
                     violation = ExcessiveAccelerationViolation(**violation_data)
@@ -0,0 +1,286 @@
+"""
+Multi-tier cache for routing provider responses
+
+Lookups go through an in-process LRU, then a MongoDB collection whose
+documents expire through a TTL index, and only then to the provider.
+Concurrent lookups for the same key share one provider call. Keys are
+built from quantised waypoints plus the options that change the route, and
+traffic-dependent results get a much shorter lifetime than free-flow ones.
+"""
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+import polyline
+
+from repositories.database import db_manager
+
+logger = logging.getLogger(__name__)
+
+ROUTE_CACHE_MAX_ENTRIES = int(os.getenv("ROUTE_CACHE_MAX_ENTRIES", "2048"))
+ROUTE_CACHE_TTL_SECONDS = int(os.getenv("ROUTE_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+TRAFFIC_ROUTE_CACHE_TTL_SECONDS = int(os.getenv("TRAFFIC_ROUTE_CACHE_TTL_SECONDS", "300"))
+WAYPOINT_PRECISION = 4  # Decimal places kept in keys, about 11 m
+POLYLINE_PRECISION = 6  # Decimal places kept in stored polylines, about 0.1 m
+
+_POLYLINE = "__polyline__"  # Encoded list of [a, b] pairs
+_POLYLINE_LATLON = "__polyline_latlon__"  # Encoded list of {"lat", "lon"} dicts
+
+# Route geometry fields of the cached provider shapes: "coordinates" in the
+# ORS/Mapbox shapes and GeoJSON, "geometry" in the Geoapify shape. Only lists
+# under these keys are encoded; everything else is stored as-is.
+GEOMETRY_KEYS = frozenset({"coordinates", "geometry"})
+
+
+def route_cache_key(
+    provider: str,
+    waypoints: Iterable[Sequence[float]],
+    mode: str = "drive",
+    avoid: Optional[Iterable[str]] = None,
+    **options: Any
+) -> str:
+    """Stable key for a route request; waypoints within ~11 m share a key"""
+    quantised = [[round(float(a), WAYPOINT_PRECISION), round(float(b), WAYPOINT_PRECISION)] for a, b in waypoints]
+    payload = json.dumps(
+        {
+            "waypoints": quantised,
+            "mode": mode,
+            "avoid": sorted(avoid or []),
+            "options": {k: options[k] for k in sorted(options) if options[k] is not None},
+        },
+        separators=(",", ":"),
+        default=str,
+    )
+    return f"{provider}:{hashlib.sha1(payload.encode()).hexdigest()}"
+
+
+def _is_pair_list(value: Any) -> bool:
+    return len(value) >= 2 and all(
+        isinstance(p, (list, tuple)) and len(p) == 2
+        and all(isinstance(c, (int, float)) and not isinstance(c, bool) and -180.0 <= c <= 180.0 for c in p)
+        for p in value
+    )
+
+
+def _is_latlon_list(value: Any) -> bool:
+    return len(value) >= 2 and all(
+        isinstance(p, dict) and p.keys() == {"lat", "lon"}
+        and all(isinstance(c, (int, float)) and not isinstance(c, bool) for c in p.values())
+        for p in value
+    )
+
+
+def pack_polylines(value: Any, geometry: bool = False) -> Any:
+    """JSON-safe copy of ``value`` with route geometry stored as encoded polylines
+
+    Coordinate lists are encoded only under ``GEOMETRY_KEYS`` (``geometry``
+    is set while packing such a field); other values round-trip unchanged.
+    """
+    if hasattr(value, "model_dump"):
+        value = value.model_dump()
+    if isinstance(value, dict):
+        return {k: pack_polylines(v, k in GEOMETRY_KEYS) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        if geometry and _is_pair_list(value):
+            return {_POLYLINE: polyline.encode([tuple(p) for p in value], POLYLINE_PRECISION)}
+        if geometry and _is_latlon_list(value):
+            return {_POLYLINE_LATLON: polyline.encode([(p["lat"], p["lon"]) for p in value], POLYLINE_PRECISION)}
+        return [pack_polylines(v, geometry) for v in value]
+    return value
+
+
+def unpack_polylines(value: Any) -> Any:
+    """Inverse of ``pack_polylines``"""
+    if isinstance(value, dict):
+        if len(value) == 1 and _POLYLINE in value:
+            return [list(p) for p in polyline.decode(value[_POLYLINE], POLYLINE_PRECISION)]
+        if len(value) == 1 and _POLYLINE_LATLON in value:
+            return [{"lat": a, "lon": b} for a, b in polyline.decode(value[_POLYLINE_LATLON], POLYLINE_PRECISION)]
+        return {k: unpack_polylines(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [unpack_polylines(v) for v in value]
+    return value
+
+
+class RouteCache:
+    """In-process LRU in front of a MongoDB TTL collection, with request coalescing"""
+
+    def __init__(
+        self,
+        max_entries: int = ROUTE_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = ROUTE_CACHE_TTL_SECONDS,
+        traffic_ttl_seconds: int = TRAFFIC_ROUTE_CACHE_TTL_SECONDS,
+        collection: Optional[Callable[[], Any]] = None,
+        persistent: bool = True
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.traffic_ttl_seconds = traffic_ttl_seconds
+        self.enabled = os.getenv("ROUTE_CACHE_ENABLED", "true").lower() != "false"
+        # Callable so the collection is resolved after the database connects
+        self._collection = (collection or (lambda: db_manager.route_cache)) if persistent else None
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats = {
+            "memory_hits": 0,
+            "persistent_hits": 0,
+            "coalesced": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "persistent_errors": 0,
+        }
+
+    async def get_or_fetch(
+        self,
+        provider: str,
+        waypoints: Iterable[Sequence[float]],
+        fetch: Callable[[], Awaitable[Any]],
+        mode: str = "drive",
+        avoid: Optional[Iterable[str]] = None,
+        traffic: bool = False,
+        cacheable: Callable[[Any], bool] = bool,
+        **options: Any
+    ) -> Any:
+        """Cached result for the route request, calling ``fetch`` only on a miss
+
+        ``traffic`` marks results that depend on live conditions and gives
+        them the short TTL. Results failing ``cacheable`` (by default, falsy
+        ones such as the ``None`` providers return on error) are not stored.
+        Callers get their own copy and may mutate it.
+        """
+        if not self.enabled:
+            return await fetch()
+
+        key = route_cache_key(provider, waypoints, mode=mode, avoid=avoid, traffic=traffic, **options)
+        value = self._memory_get(key)
+        if value is not None:
+            self.stats["memory_hits"] += 1
+            return copy.deepcopy(value)
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.stats["coalesced"] += 1
+            return copy.deepcopy(await asyncio.shield(pending))
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value, expires_at = await self._persistent_get(key)
+            if value is not None:
+                self.stats["persistent_hits"] += 1
+                self._memory_put(key, value, expires_at)
+            else:
+                self.stats["misses"] += 1
+                value = await fetch()
+                if cacheable(value):
+                    ttl = self.traffic_ttl_seconds if traffic else self.ttl_seconds
+                    expires_at = time.time() + ttl
+                    self._memory_put(key, value, expires_at)
+                    await self._persistent_put(key, provider, value, expires_at)
+            future.set_result(value)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved so lone failures are not reported as unhandled
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        return copy.deepcopy(value)
+
+    def clear(self):
+        """Drop the in-process tier"""
+        self._memory.clear()
+
+    # ---- in-process tier ----
+
+    def _memory_get(self, key: str) -> Any:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return value
+
+    def _memory_put(self, key: str, value: Any, expires_at: float):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        self.stats["stores"] += 1
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    # ---- persistent tier ----
+
+    def _get_collection(self):
+        try:
+            return self._collection() if self._collection else None
+        except RuntimeError:
+            return None  # Database not connected yet
+
+    async def _persistent_get(self, key: str) -> Tuple[Any, float]:
+        collection = self._get_collection()
+        if collection is None:
+            return None, 0.0
+        try:
+            # The TTL monitor only runs once a minute, so expiry is checked here too
+            doc = await collection.find_one({"_id": key, "expires_at": {"$gt": datetime.utcnow()}})
+        except Exception as e:
+            self.stats["persistent_errors"] += 1
+            logger.warning(f"[RouteCache] Persistent lookup failed: {e}")
+            return None, 0.0
+        if not doc:
+            return None, 0.0
+        expires_at = time.time() + (doc["expires_at"] - datetime.utcnow()).total_seconds()
+        return unpack_polylines(doc["value"]), expires_at
+
+    async def _persistent_put(self, key: str, provider: str, value: Any, expires_at: float):
+        collection = self._get_collection()
+        if collection is None:
+            return
+        now = datetime.utcnow()
+        try:
+            await collection.replace_one(
+                {"_id": key},
+                {
+                    "_id": key,
+                    "provider": provider,
+                    "value": pack_polylines(value),
+                    "created_at": now,
+                    "expires_at": now + timedelta(seconds=expires_at - time.time()),
+                },
+                upsert=True,
+            )
+        except Exception as e:
+            self.stats["persistent_errors"] += 1
+            logger.warning(f"[RouteCache] Persistent store failed: {e}")
+
+    # ---- metrics ----
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Hit counts per tier and the overall hit ratio"""
+        hits = self.stats["memory_hits"] + self.stats["persistent_hits"] + self.stats["coalesced"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "entries": len(self._memory),
+            "lookups": lookups,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Global route cache instance
+route_cache = RouteCache()
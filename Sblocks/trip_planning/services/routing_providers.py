@@ -0,0 +1,213 @@
+"""
+Routing providers behind RoutingService
+
+Every provider answers with a Geoapify ``format=json`` shaped response so
+the rest of the service parses routes the same way whichever one served
+them. RoutingService tries its providers in order and moves on to the next
+when one raises ``RouteNotFound``.
+"""
+import asyncio
+import logging
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+import aiohttp
+
+from utils.road_graph import MAX_SNAP_METERS, RoadGraph, synthetic_road_graph
+from utils.route_fixture import RouteFixture
+from utils.route_response import build_leg, build_response
+
+logger = logging.getLogger(__name__)
+
+GEOAPIFY_ROUTING_URL = "https://api.geoapify.com/v1/routing"
+LOCAL_ROUTING_MODES = {"drive", "truck", "light_truck", "medium_truck", "truck_dangerous_goods",
+                       "heavy_truck", "long_truck", "bus", "scooter", "motorcycle"}
+
+
+class RouteNotFound(Exception):
+    """The provider cannot route these waypoints; the next provider should try"""
+
+
+class RoutingProvider(ABC):
+    """Base class for route sources"""
+
+    name = "provider"
+    external = False  # External responses are worth keeping in the route cache
+
+    @abstractmethod
+    async def route(
+        self,
+        waypoints: List[Tuple[float, float]],
+        mode: str = "drive",
+        details: Optional[List[str]] = None,
+        avoid: Optional[List[str]] = None,
+        traffic_model: str = "free_flow"
+    ) -> Dict[str, Any]:
+        """Route through ``waypoints`` in the Geoapify response shape, or raise ``RouteNotFound``"""
+
+    async def close(self):
+        """Release any resources held by the provider"""
+
+
+class GeoapifyProvider(RoutingProvider):
+    """Geoapify Routing API"""
+
+    name = "geoapify"
+    external = True
+
+    def __init__(self, api_key: str, base_url: str = GEOAPIFY_ROUTING_URL):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Get or create HTTP session"""
+        if self.session is None or self.session.closed:
+            timeout = aiohttp.ClientTimeout(total=30)
+            self.session = aiohttp.ClientSession(timeout=timeout)
+        return self.session
+
+    async def close(self):
+        """Close HTTP session"""
+        if self.session and not self.session.closed:
+            await self.session.close()
+
+    async def route(self, waypoints, mode="drive", details=None, avoid=None, traffic_model="free_flow"):
+        # Format waypoints as lat,lon|lat,lon
+        params = {
+            "waypoints": "|".join([f"{lat},{lon}" for lat, lon in waypoints]),
+            "mode": mode,
+            "format": "json",
+            "apiKey": self.api_key,
+            "traffic": traffic_model
+        }
+        if details:
+            params["details"] = ",".join(details)
+        if avoid:
+            params["avoid"] = "|".join(avoid)
+
+        try:
+            session = await self._get_session()
+            url = f"{self.base_url}?{urlencode(params)}"
+
+            logger.debug(f"[GeoapifyProvider] Making request to: {url}")
+
+            async with session.get(url) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    logger.error(f"[GeoapifyProvider] API request failed with status {response.status}: {error_text}")
+                    raise Exception(f"Routing API request failed: {response.status} - {error_text}")
+
+                data = await response.json()
+                logger.debug(f"[GeoapifyProvider] API response received successfully")
+
+                return data
+
+        except Exception as e:
+            logger.error(f"[GeoapifyProvider] Failed to calculate route: {e}")
+            raise
+
+
+class FixtureProvider(RoutingProvider):
+    """Recorded routes from a route fixture, synthesising any that are missing"""
+
+    name = "fixture"
+
+    def __init__(self, fixture: RouteFixture):
+        self.fixture = fixture
+
+    async def route(self, waypoints, mode="drive", details=None, avoid=None, traffic_model="free_flow"):
+        return self.fixture.geoapify_response(waypoints)
+
+
+class LocalGraphProvider(RoutingProvider):
+    """Shortest-time routes over a local road graph
+
+    The graph is loaded on first use, off the event loop. Modes it does not
+    model (walking, cycling) and avoid rules raise ``RouteNotFound`` so an
+    external provider can answer instead, as do waypoints off the graph.
+    """
+
+    name = "local"
+
+    def __init__(self, graph_path: Optional[str] = None, graph: Optional[RoadGraph] = None,
+                 max_snap_m: float = MAX_SNAP_METERS):
+        self.graph_path = graph_path
+        self.graph = graph
+        self.max_snap_m = max_snap_m
+        self._loading: Optional[asyncio.Lock] = None
+
+    def _load(self) -> RoadGraph:
+        if self.graph_path == "synthetic":
+            graph = synthetic_road_graph()
+        else:
+            graph = RoadGraph.load(self.graph_path)
+        graph.nearest_node(0.0, 0.0)  # Builds the snapping mask up front
+        if graph.hierarchy is None:
+            logger.info("[LocalGraphProvider] Graph is not contracted; routing with A* "
+                        "(contract it with `python -m utils.road_graph` for faster routes)")
+        logger.info(f"[LocalGraphProvider] Loaded {self.graph_path}: {graph.node_count} nodes, {graph.edge_count} edges")
+        return graph
+
+    async def _get_graph(self) -> RoadGraph:
+        if self.graph is None:
+            if self._loading is None:
+                self._loading = asyncio.Lock()
+            async with self._loading:
+                if self.graph is None:
+                    try:
+                        self.graph = await asyncio.to_thread(self._load)
+                    except Exception as e:
+                        logger.error(f"[LocalGraphProvider] Failed to load {self.graph_path}: {e}")
+                        raise RouteNotFound(f"Local road graph unavailable: {e}")
+        return self.graph
+
+    async def route(self, waypoints, mode="drive", details=None, avoid=None, traffic_model="free_flow"):
+        if mode not in LOCAL_ROUTING_MODES or avoid:
+            raise RouteNotFound(f"Local graph does not support mode={mode} avoid={avoid}")
+        graph = await self._get_graph()
+        # The graph search is CPU-bound, so keep it off the event loop
+        legs = await asyncio.to_thread(self._route_legs, graph, waypoints)
+        return build_response(waypoints, legs, source=self.name, mode=mode)
+
+    def _route_legs(self, graph: RoadGraph, waypoints) -> List[Tuple[Any, Dict[str, Any]]]:
+        legs = []
+        for origin, destination in zip(waypoints, waypoints[1:]):
+            leg = graph.route_leg(tuple(origin), tuple(destination), max_snap_m=self.max_snap_m)
+            if leg is None:
+                raise RouteNotFound(f"No local route from {origin} to {destination}")
+            coordinates, steps = leg
+            legs.append((coordinates, build_leg(coordinates, steps)))
+        return legs
+
+
+def build_providers(
+    api_key: str,
+    fixture_path: Optional[str] = None,
+    graph_path: Optional[str] = None,
+    external_fallback: Optional[bool] = None
+) -> List[RoutingProvider]:
+    """Provider chain from arguments or the environment
+
+    ``ROUTING_FIXTURE_PATH`` serves everything from a fixture.
+    ``ROUTING_GRAPH_PATH`` (a graph file, or ``synthetic``) routes locally,
+    falling back to Geoapify unless ``ROUTING_EXTERNAL_FALLBACK=false``.
+    With neither set, routes come from Geoapify alone.
+    """
+    fixture_path = fixture_path or os.getenv("ROUTING_FIXTURE_PATH")
+    if fixture_path:
+        fixture = RouteFixture.load(fixture_path)
+        logger.info(f"[RoutingService] Offline mode: serving routes from {fixture_path} ({len(fixture)} recorded)")
+        return [FixtureProvider(fixture)]
+
+    providers: List[RoutingProvider] = []
+    graph_path = graph_path or os.getenv("ROUTING_GRAPH_PATH")
+    if graph_path:
+        providers.append(LocalGraphProvider(graph_path))
+    if external_fallback is None:
+        external_fallback = os.getenv("ROUTING_EXTERNAL_FALLBACK", "true").lower() != "false"
+    if external_fallback or not providers:
+        providers.append(GeoapifyProvider(api_key))
+    return providers
@@ -3,11 +3,11 @@ Routing Service using Geoapify Routing API
 Provides route calculation, turn-by-turn instructions, and route details
 """
 
-import asyncio
 import logging
-import aiohttp
 from typing import List, Dict, Any, Optional, Tuple
-from urllib.parse import urlencode
+
+from services.route_cache import RouteCache, route_cache
+from services.routing_providers import RouteNotFound, RoutingProvider, build_providers
 
 logger = logging.getLogger(__name__)
 
@@ -17,28 +17,33 @@ class RoutingService:
     Service for calculating routes using Geoapify Routing API
     """
     
-    def __init__(self, api_key: str = "8c5cae4820744254b3cb03ebd9b9ce13"):
+    def __init__(
+        self,
+        api_key: str = "8c5cae4820744254b3cb03ebd9b9ce13",
+        fixture_path: Optional[str] = None,
+        cache: Optional[RouteCache] = None,
+        providers: Optional[List[RoutingProvider]] = None
+    ):
         """
         Initialize the routing service
         
         Args:
             api_key: Geoapify API key
+            fixture_path: Route fixture to answer from instead of the API
+                (defaults to ROUTING_FIXTURE_PATH; unset means live routing)
+            cache: Route cache for API responses (defaults to the shared one)
+            providers: Route sources tried in order (defaults to the chain
+                configured by ROUTING_FIXTURE_PATH / ROUTING_GRAPH_PATH)
         """
         self.api_key = api_key
-        self.base_url = "https://api.geoapify.com/v1/routing"
-        self.session: Optional[aiohttp.ClientSession] = None
-
-    async def _get_session(self) -> aiohttp.ClientSession:
-        """Get or create HTTP session"""
-        if self.session is None or self.session.closed:
-            timeout = aiohttp.ClientTimeout(total=30)
-            self.session = aiohttp.ClientSession(timeout=timeout)
-        return self.session
+        self.cache = cache or route_cache
+        self.providers = providers or build_providers(api_key, fixture_path=fixture_path)
+        logger.info(f"[RoutingService] Providers: {[p.name for p in self.providers]}")
 
     async def close(self):
-        """Close HTTP session"""
-        if self.session and not self.session.closed:
-            await self.session.close()
+        """Close provider sessions"""
+        for provider in self.providers:
+            await provider.close()
 
     async def calculate_route(
         self,
@@ -51,7 +56,7 @@ class RoutingService:
         traffic_model: str = "free_flow"
     ) -> Dict[str, Any]:
         """
-        Calculate route using Geoapify Routing API
+        Calculate route using the first provider that can route the waypoints
         
         Args:
             waypoints: List of (latitude, longitude) tuples
@@ -63,60 +68,41 @@ class RoutingService:
             traffic_model: Traffic model to use (free_flow, approximated)
             
         Returns:
-            Dict containing route information from Geoapify API
+            Dict containing route information in the Geoapify response shape
         """
         if len(waypoints) < 2:
             raise ValueError("At least 2 waypoints are required")
 
-        try:
-            # Format waypoints as lat,lon|lat,lon
-            waypoints_str = "|".join([f"{lat},{lon}" for lat, lon in waypoints])
-            
-            # Build parameters
-            params = {
-                "waypoints": waypoints_str,
-                "mode": mode,
-                "format": "json",
-                "apiKey": self.api_key,
-                "traffic": traffic_model
-            }
-            
-            # Add details if requested
-            details = []
-            if include_instructions:
-                details.append("instruction_details")
-            if include_route_details:
-                details.append("route_details")
-            if include_elevation:
-                details.append("elevation")
-            
-            if details:
-                params["details"] = ",".join(details)
-            
-            # Add avoids if specified
-            if avoid:
-                params["avoid"] = "|".join(avoid)
-            
-            # Make API request
-            session = await self._get_session()
-            url = f"{self.base_url}?{urlencode(params)}"
-            
-            logger.debug(f"[RoutingService] Making request to: {url}")
-            
-            async with session.get(url) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    logger.error(f"[RoutingService] API request failed with status {response.status}: {error_text}")
-                    raise Exception(f"Routing API request failed: {response.status} - {error_text}")
-                
-                data = await response.json()
-                logger.debug(f"[RoutingService] API response received successfully")
-                
-                return data
-                
-        except Exception as e:
-            logger.error(f"[RoutingService] Failed to calculate route: {e}")
-            raise
+        # Add details if requested
+        details = []
+        if include_instructions:
+            details.append("instruction_details")
+        if include_route_details:
+            details.append("route_details")
+        if include_elevation:
+            details.append("elevation")
+
+        for i, provider in enumerate(self.providers):
+            fetch = lambda p=provider: p.route(waypoints, mode, details, avoid, traffic_model)
+            try:
+                if not provider.external:
+                    return await fetch()
+                return await self.cache.get_or_fetch(
+                    provider.name,
+                    waypoints,
+                    fetch,
+                    mode=mode,
+                    avoid=avoid,
+                    traffic=traffic_model != "free_flow",
+                    details=",".join(details) or None,
+                    traffic_model=traffic_model
+                )
+            except RouteNotFound as e:
+                if i == len(self.providers) - 1:
+                    raise
+                logger.debug(f"[RoutingService] {provider.name} could not route, falling back: {e}")
+
+        raise RouteNotFound("No routing provider configured")
 
     async def get_route_geometry(
         self,
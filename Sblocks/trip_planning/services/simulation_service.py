@@ -3,22 +3,31 @@ import logging
 import asyncio
 import aiohttp
 import time
-from typing import List, Optional, Dict, Any, Tuple
+from typing import FrozenSet, List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta,timezone
 from bson import ObjectId
 from dataclasses import dataclass
 import math
+from pymongo import UpdateOne
 
 from repositories.database import db_manager, db_manager_gps
 from services.trip_service import trip_service
-from services.geofence_service import geofence_service
+from services.driver_history_service import driver_history_service
+from services.geofence_cache import GeofenceIndex, geofence_cache
 from services.notification_service import notification_service
 from schemas.requests import NotificationRequest
 from schemas.entities import NotificationType, Geofence, GeofenceGeometry, Trip, RouteInfo, Waypoint, LocationPoint
 from events.publisher import event_publisher
+from utils.geo import point_in_polygon
+from utils.route_geometry import RouteGeometry
+from services.fleet_simulation_engine import FleetSimulationEngine, FleetUpdate
 
 logger = logging.getLogger(__name__)
 
+TICK_SECONDS = 2.0  # Simulated time per update
+MAX_CATCHUP_STEPS = 5  # Extra steps run after an overrun before time is dropped
+TRAFFIC_ANALYSIS_INTERVAL_SECONDS = 30.0  # Per-trip spacing of traffic analysis tasks
+
 current_time = datetime.now(timezone.utc)
 
 @dataclass
@@ -61,10 +70,14 @@ class VehicleSimulator:
         self.start_time = datetime.utcnow()
         self.distance_traveled = 0.0
         self.last_location = None
+        self._geometry: Optional[RouteGeometry] = None
+        self._geometry_key = None
 
         # Geofence tracking
         self.current_geofences = set()  # Track which geofences vehicle is currently inside
         self.geofence_violations = []  # Track violations for this trip
+        self._geofence_corridor: FrozenSet[int] = frozenset()
+        self._geofence_corridor_key = None
         
         # Speed variation parameters
         self.min_speed = 40.0  # km/h
@@ -93,6 +106,23 @@ class VehicleSimulator:
         self.is_paused = False
         logger.info(f"Stopped simulation for trip {self.trip_id}")
     
+    @property
+    def geometry(self) -> RouteGeometry:
+        """Distance index over the route, rebuilt only if the route changes"""
+        key = (id(self.route.coordinates), len(self.route.coordinates), self.route.distance)
+        if self._geometry is None or self._geometry_key != key:
+            self._geometry = RouteGeometry(self.route.coordinates, self.route.distance)
+            self._geometry_key = key
+        return self._geometry
+    
+    def geofence_corridor(self, index: GeofenceIndex) -> FrozenSet[int]:
+        """Geofences near the route, worked out once per route and geofence index"""
+        key = (index, id(self.route.coordinates), len(self.route.coordinates))
+        if self._geofence_corridor_key != key:
+            self._geofence_corridor = index.corridor(self.route.coordinates)
+            self._geofence_corridor_key = key
+        return self._geofence_corridor
+    
     def get_distance_traveled(self) -> float:
         """Get distance traveled in meters"""
         return self.distance_traveled
@@ -103,13 +133,13 @@ class VehicleSimulator:
     
     def get_remaining_distance(self) -> float:
         """Get remaining distance in meters"""
-        return self.route.distance - self.distance_traveled
+        return self.geometry.length_m - self.distance_traveled
     
     def get_progress_percentage(self) -> float:
         """Get trip progress as percentage (0-100)"""
-        if self.route.distance == 0:
+        if self.geometry.length_m == 0:
             return 100.0
-        return (self.distance_traveled / self.route.distance) * 100.0
+        return (self.distance_traveled / self.geometry.length_m) * 100.0
         
     def calculate_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         """Calculate distance between two points using Haversine formula"""
@@ -127,42 +157,8 @@ class VehicleSimulator:
         return R * c
     
     def get_current_location(self) -> Tuple[float, float]:
-        """Get current lat/lon based on position along route using exact geometry coordinates"""
-        if not self.route.coordinates:
-            return (0, 0)
-        
-        if self.current_position >= 1.0:
-            return self.route.coordinates[-1]
-        
-        # Use direct coordinate index for more accurate position tracking
-        total_coords = len(self.route.coordinates)
-        
-        # Calculate which coordinate we should be at based on progress
-        coord_index = self.current_position * (total_coords - 1)
-        
-        # If we're exactly on a coordinate point, return it
-        if coord_index == int(coord_index):
-            index = int(coord_index)
-            return self.route.coordinates[min(index, total_coords - 1)]
-        
-        # Otherwise, interpolate between two consecutive coordinates
-        start_index = int(coord_index)
-        end_index = min(start_index + 1, total_coords - 1)
-        
-        if start_index >= total_coords - 1:
-            return self.route.coordinates[-1]
-        
-        start_point = self.route.coordinates[start_index]
-        end_point = self.route.coordinates[end_index]
-        
-        # Calculate interpolation ratio
-        ratio = coord_index - start_index
-        
-        # Interpolate between the two points
-        lat = start_point[0] + (end_point[0] - start_point[0]) * ratio
-        lon = start_point[1] + (end_point[1] - start_point[1]) * ratio
-        
-        return (lat, lon)
+        """Get current lat/lon at the distance travelled along the route geometry"""
+        return self.geometry.position_at_fraction(min(self.current_position, 1.0))
     
     def get_current_step_info(self) -> Dict[str, Any]:
         """Get current step information from raw response for detailed vehicle state"""
@@ -195,7 +191,7 @@ class VehicleSimulator:
         if self.current_position >= 1.0:
             return datetime.utcnow()
         speed_ms = self.speed_ms if self.speed_ms and self.speed_ms > 0 else (50 / 3.6)
-        remaining_distance = self.route.distance * (1 - self.current_position)
+        remaining_distance = self.geometry.remaining_distance(self.current_position * self.geometry.length_m)
         remaining_time_sec = remaining_distance / speed_ms
         return datetime.utcnow() + timedelta(seconds=remaining_time_sec)
     
@@ -264,71 +260,67 @@ class VehicleSimulator:
 
     async def check_geofence_violations(self, lat: float, lon: float) -> List[GeofenceViolation]:
         """Check if current location violates any geofences"""
-        violations = []
-        
         try:
-            # Get all active geofences from the geofence service
-            geofences = await geofence_service.get_geofences(is_active=True)
-            
-            # Check which geofences the vehicle is currently inside
-            current_inside = set()
-            
-            for geofence in geofences:
-                # Only check restricted and boundary geofences
-                if geofence.type not in ["restricted", "boundary"]:
-                    continue
-                
-                is_inside = self._is_point_in_geofence(lat, lon, geofence.geometry)
-                
-                if is_inside:
-                    current_inside.add(geofence.id)
-                    
-                    # Check if this is a new entry
-                    if geofence.id not in self.current_geofences:
-                        violation = GeofenceViolation(
-                            geofence_id=geofence.id,
-                            geofence_name=geofence.name,
-                            geofence_type=geofence.type,
-                            vehicle_id=self.vehicle_id,
-                            trip_id=self.trip_id,
-                            location=(lat, lon),
-                            timestamp=datetime.utcnow(),
-                            violation_type="entry"
-                        )
-                        violations.append(violation)
-                        logger.warning(f"Vehicle {self.vehicle_id} entered {geofence.type} geofence '{geofence.name}'")
-            
-            # Check for exits
-            for geofence_id in self.current_geofences:
-                if geofence_id not in current_inside:
-                    # Find the geofence details
-                    geofence = next((g for g in geofences if g.id == geofence_id), None)
-                    if geofence:
-                        violation = GeofenceViolation(
-                            geofence_id=geofence_id,
-                            geofence_name=geofence.name,
-                            geofence_type=geofence.type,
-                            vehicle_id=self.vehicle_id,
-                            trip_id=self.trip_id,
-                            location=(lat, lon),
-                            timestamp=datetime.utcnow(),
-                            violation_type="exit"
-                        )
-                        violations.append(violation)
-                        logger.info(f"Vehicle {self.vehicle_id} exited {geofence.type} geofence '{geofence.name}'")
-            
-            # Update current geofences
-            self.current_geofences = current_inside
-            
-            # Store violations for this trip
-            self.geofence_violations.extend(violations)
+            # Watched geofences come from the shared cache; only those near the route are tested
+            index = await geofence_cache.get()
+            current_inside = index.containing(lat, lon, self.geofence_corridor(index))
+            geofences = index.geofences(current_inside | self.current_geofences)
             
-            return violations
+            return self.apply_geofence_state(lat, lon, geofences, current_inside)
             
         except Exception as e:
             logger.error(f"Error checking geofence violations: {e}")
             return []
     
+    def apply_geofence_state(self, lat: float, lon: float, geofences: List[Geofence], current_inside: set) -> List[GeofenceViolation]:
+        """Record entry/exit violations given the ids of the geofences the vehicle is now inside"""
+        violations = []
+        by_id = {geofence.id: geofence for geofence in geofences}
+        
+        for geofence_id in current_inside:
+            # Check if this is a new entry
+            geofence = by_id.get(geofence_id)
+            if geofence and geofence_id not in self.current_geofences:
+                violation = GeofenceViolation(
+                    geofence_id=geofence.id,
+                    geofence_name=geofence.name,
+                    geofence_type=geofence.type,
+                    vehicle_id=self.vehicle_id,
+                    trip_id=self.trip_id,
+                    location=(lat, lon),
+                    timestamp=datetime.utcnow(),
+                    violation_type="entry"
+                )
+                violations.append(violation)
+                logger.warning(f"Vehicle {self.vehicle_id} entered {geofence.type} geofence '{geofence.name}'")
+        
+        # Check for exits
+        for geofence_id in self.current_geofences:
+            if geofence_id not in current_inside:
+                # Find the geofence details
+                geofence = by_id.get(geofence_id)
+                if geofence:
+                    violation = GeofenceViolation(
+                        geofence_id=geofence_id,
+                        geofence_name=geofence.name,
+                        geofence_type=geofence.type,
+                        vehicle_id=self.vehicle_id,
+                        trip_id=self.trip_id,
+                        location=(lat, lon),
+                        timestamp=datetime.utcnow(),
+                        violation_type="exit"
+                    )
+                    violations.append(violation)
+                    logger.info(f"Vehicle {self.vehicle_id} exited {geofence.type} geofence '{geofence.name}'")
+        
+        # Update current geofences
+        self.current_geofences = set(current_inside)
+        
+        # Store violations for this trip
+        self.geofence_violations.extend(violations)
+        
+        return violations
+    
     def _is_point_in_geofence(self, lat: float, lon: float, geometry: GeofenceGeometry) -> bool:
         """Check if a point is inside a geofence geometry"""
         try:
@@ -362,23 +354,7 @@ class VehicleSimulator:
     
     def _point_in_polygon(self, lat: float, lon: float, polygon_coords: List[List[float]]) -> bool:
         """Ray casting algorithm to check if point is inside polygon"""
-        x, y = lon, lat
-        n = len(polygon_coords)
-        inside = False
-        
-        p1x, p1y = polygon_coords[0]
-        for i in range(1, n + 1):
-            p2x, p2y = polygon_coords[i % n]
-            if y > min(p1y, p2y):
-                if y <= max(p1y, p2y):
-                    if x <= max(p1x, p2x):
-                        if p1y != p2y:
-                            xinters = (y - p1y) * (p2x - p1x) / (p2y - p1y) + p1x
-                        if p1x == p2x or x <= xinters:
-                            inside = not inside
-            p1x, p1y = p2x, p2y
-        
-        return inside
+        return point_in_polygon(lat, lon, polygon_coords)
 
     async def update_position(self):
         """Update vehicle position and save to database with detailed logging"""
@@ -398,10 +374,12 @@ class VehicleSimulator:
         
         # Calculate how far we should have moved in 2 seconds
         distance_moved = self.speed_ms * 2  # 2 seconds
-        position_increment = distance_moved / self.route.distance
+        route_length = self.geometry.length_m
+        position_increment = distance_moved / route_length if route_length > 0 else 1.0
         old_position = self.current_position
         
         self.current_position = min(1.0, self.current_position + position_increment)
+        self.distance_traveled = self.current_position * self.geometry.length_m
         
         # Get current lat/lon
         old_location = self.get_current_location() if hasattr(self, '_last_logged_location') else (0, 0)
@@ -564,6 +542,20 @@ class VehicleSimulator:
             # Remove from active trips collection
             await db_manager.trips.delete_one({"_id": ObjectId(self.trip_id)})
             
+            if trip_doc.get("driver_assignment"):
+                try:
+                    await driver_history_service.update_driver_history_on_trip_completion(
+                        driver_id=trip_doc["driver_assignment"],
+                        trip_id=self.trip_id,
+                        trip_status="completed"
+                    )
+                except Exception as e:
+                    logger.error(f"Failed to update driver history for completed trip {self.trip_id}: {e}")
+            
+            # Count the trip in the analytics rollups
+            from services.trip_rollup_service import trip_rollup_service
+            await trip_rollup_service.record_trip(trip_doc)
+            
             # send notification that the trip has ended
             await notification_service.notify_trip_completed(trip_doc)
             
@@ -575,41 +567,9 @@ class VehicleSimulator:
     
     def _calculate_heading(self) -> float:
         """Calculate current heading based on direction of travel"""
-        if len(self.route.coordinates) < 2 or self.current_position >= 1.0:
+        if self.current_position >= 1.0:
             return 0.0
-        
-        # Find current segment
-        total_distance = 0
-        target_distance = self.current_position * self.route.distance
-        
-        for i in range(len(self.route.coordinates) - 1):
-            start_point = self.route.coordinates[i]
-            end_point = self.route.coordinates[i + 1]
-            
-            segment_distance = self.calculate_distance(
-                start_point[0], start_point[1],
-                end_point[0], end_point[1]
-            )
-            
-            if total_distance + segment_distance >= target_distance:
-                # Calculate bearing from start to end point
-                lat1, lon1 = math.radians(start_point[0]), math.radians(start_point[1])
-                lat2, lon2 = math.radians(end_point[0]), math.radians(end_point[1])
-                
-                dlon = lon2 - lon1
-                y = math.sin(dlon) * math.cos(lat2)
-                x = (math.cos(lat1) * math.sin(lat2) - 
-                     math.sin(lat1) * math.cos(lat2) * math.cos(dlon))
-                
-                bearing = math.atan2(y, x)
-                bearing = math.degrees(bearing)
-                bearing = (bearing + 360) % 360
-                
-                return bearing
-            
-            total_distance += segment_distance
-        
-        return 0.0
+        return self.geometry.bearing_at_distance(self.current_position * self.geometry.length_m)
 
     def get_bearing(self) -> float:
         """Get current bearing/heading in degrees (0-360)"""
@@ -620,6 +580,20 @@ class SimulationService:
         self.active_simulators: Dict[str, VehicleSimulator] = {}
         self.is_running = False
         self.osrm_url = "http://router.project-osrm.org"  # Public OSRM instance
+        self.engine = FleetSimulationEngine()
+        self._traffic_analysis_at: Dict[str, float] = {}
+        self.metrics: Dict[str, Any] = {
+            "ticks": 0,
+            "active_vehicles": 0,
+            "last_tick_ms": 0.0,
+            "max_tick_ms": 0.0,
+            "avg_tick_ms": 0.0,
+            "last_lag_ms": 0.0,
+            "max_lag_ms": 0.0,
+            "catchup_steps": 0,
+            "dropped_steps": 0,
+            "last_tick_at": None
+        }
         
     async def get_route(self, start_lat: float, start_lon: float, 
                        end_lat: float, end_lon: float) -> Optional[Route]:
@@ -802,6 +776,12 @@ class SimulationService:
         simulator = VehicleSimulator(trip_id, vehicle_id, route, speed, speed_profile)
         simulator.is_running = True
         
+        # Narrow the geofences this trip is checked against once, up front
+        try:
+            simulator.geofence_corridor(await geofence_cache.get())
+        except Exception as e:
+            logger.warning(f"[start_trip_simulation] Could not prefilter geofences for trip {trip_id}: {e}")
+        
         self.active_simulators[trip_id] = simulator
         
         simulation_type = "realistic (using road speed data)" if speed_profile else "variable speed (40-140 km/h)"
@@ -868,44 +848,118 @@ class SimulationService:
             duration=0
         )
     
-    async def update_all_simulations(self):
-        """Update all active simulations with detailed logging"""
+    async def update_all_simulations(self, steps: int = 1):
+        """Advance every active simulation by ``steps`` ticks and write the final positions in bulk"""
         if not self.active_simulators:
             logger.debug("[update_all_simulations] No active simulators to update")
             return
-            
-               
-        for trip_id, simulator in list(self.active_simulators.items()):
+        
+        self.engine.sync(self.active_simulators.values())
+        for _ in range(max(1, steps)):
+            self.engine.step(TICK_SECONDS)
+        updates = self.engine.flush()
+        if not updates:
+            return
+        
+        await self._apply_geofences(updates)
+        await self._write_positions(updates)
+        self._schedule_traffic_analysis(updates)
+    
+    async def _apply_geofences(self, updates: List[FleetUpdate]):
+        """Check every updated vehicle against the cached geofences near its route"""
+        try:
+            index = await geofence_cache.get()
+        except Exception as e:
+            logger.error(f"Error checking geofence violations: {e}")
+            return
+        
+        for update in updates:
+            simulator = update.simulator
+            current_inside = index.containing(update.latitude, update.longitude, simulator.geofence_corridor(index))
+            if not current_inside and not simulator.current_geofences:
+                continue
+            geofences = index.geofences(current_inside | simulator.current_geofences)
+            violations = simulator.apply_geofence_state(update.latitude, update.longitude, geofences, current_inside)
+            if violations:
+                await simulator._handle_geofence_violations(violations)
+    
+    async def _write_positions(self, updates: List[FleetUpdate]):
+        """Write vehicle locations and trip ETAs for one tick as two bulk operations"""
+        current_time = datetime.utcnow()
+        location_ops = []
+        trip_ops = []
+        for update in updates:
+            simulator = update.simulator
+            location_doc = {
+                "vehicle_id": simulator.vehicle_id,
+                "location": {
+                    "type": "Point",
+                    "coordinates": [update.longitude, update.latitude]  # GeoJSON format: [longitude, latitude]
+                },
+                "latitude": update.latitude,
+                "longitude": update.longitude,
+                "altitude": None,
+                "speed": simulator.current_speed_kmh,
+                "heading": update.heading,
+                "accuracy": None,
+                "timestamp": current_time,
+                "updated_at": current_time
+            }
+            location_ops.append(UpdateOne({"vehicle_id": simulator.vehicle_id}, {"$set": location_doc}, upsert=True))
+            if ObjectId.is_valid(simulator.trip_id):
+                trip_ops.append(UpdateOne(
+                    {"_id": ObjectId(simulator.trip_id)},
+                    {"$set": {"estimated_end_time": simulator.get_estimated_finish_time()}}
+                ))
+        
+        try:
+            await db_manager_gps.locations.bulk_write(location_ops, ordered=False)
+            if trip_ops:
+                await db_manager.trips.bulk_write(trip_ops, ordered=False)
+        except Exception as e:
+            # Continue simulation even if database update fails
+            logger.error(f"[update_all_simulations] Failed to write {len(location_ops)} simulated positions: {e}")
+    
+    def _schedule_traffic_analysis(self, updates: List[FleetUpdate]):
+        """Spawn traffic analysis for trips mid-journey, at most once per interval per trip"""
+        now = time.monotonic()
+        for trip_id in list(self._traffic_analysis_at):
+            if trip_id not in self.active_simulators:
+                del self._traffic_analysis_at[trip_id]
+        
+        for update in updates:
+            simulator = update.simulator
+            if not (0.1 < simulator.current_position < 0.9):  # Middle of journey
+                continue
+            last = self._traffic_analysis_at.get(simulator.trip_id)
+            if last is not None and now - last < TRAFFIC_ANALYSIS_INTERVAL_SECONDS:
+                continue
+            self._traffic_analysis_at[simulator.trip_id] = now
             try:
-                if simulator.is_running:
-                    # Get position before update for comparison
-                    old_position = simulator.current_position
-                    old_location = simulator.get_current_location()
-                    old_speed = simulator.current_speed_kmh
-                    
-                                        
-                    # Update position
-                    success = await simulator.update_position()
-                    
-                    if success:
-                        # Get new position after update
-                        new_position = simulator.current_position
-                        new_location = simulator.get_current_location()
-                        new_speed = simulator.current_speed_kmh
-                        
-                        # Calculate changes
-                        position_change = new_position - old_position
-                        speed_change = new_speed - old_speed
-                        progress_percent = (new_position * 100)
-                        
-                        
-                else:
-                    logger.warning(f"  - ⏸️ SIMULATOR NOT RUNNING")
-                    
+                # Import here to avoid circular imports
+                from services.smart_trip_planning_service import smart_trip_service
+                
+                # Trigger traffic analysis for this trip (non-blocking)
+                asyncio.create_task(smart_trip_service._analyze_route_traffic(simulator.trip_id, simulator.vehicle_id))
             except Exception as e:
-                logger.error(f"[update_all_simulations] ❌ ERROR updating trip {trip_id}: {e}", exc_info=True)
+                logger.warning(f"[update_all_simulations] Failed to trigger traffic analysis: {e}")
     
-
+    def _record_tick(self, duration_ms: float, lag_ms: float, catchup: int, dropped: int):
+        metrics = self.metrics
+        metrics["ticks"] += 1
+        metrics["active_vehicles"] = len(self.active_simulators)
+        metrics["last_tick_ms"] = round(duration_ms, 3)
+        metrics["max_tick_ms"] = round(max(metrics["max_tick_ms"], duration_ms), 3)
+        metrics["avg_tick_ms"] = round(metrics["avg_tick_ms"] + (duration_ms - metrics["avg_tick_ms"]) / metrics["ticks"], 3)
+        metrics["last_lag_ms"] = round(lag_ms, 3)
+        metrics["max_lag_ms"] = round(max(metrics["max_lag_ms"], lag_ms), 3)
+        metrics["catchup_steps"] += catchup
+        metrics["dropped_steps"] += dropped
+        metrics["last_tick_at"] = datetime.utcnow().isoformat()
+    
+    def get_simulation_metrics(self) -> Dict[str, Any]:
+        """Tick duration, lag and catch-up counters for the simulation loop"""
+        return dict(self.metrics, tick_seconds=TICK_SECONDS, max_catchup_steps=MAX_CATCHUP_STEPS)
     
     async def pause_trip_simulation(self, trip_id: str):
         """Pause simulation for a specific trip"""
@@ -1017,36 +1071,51 @@ class SimulationService:
     
     
     async def start_simulation_service(self):
-        """Main simulation loop"""
+        """Main simulation loop
+        
+        Runs on a fixed timestep: when a tick overruns, the next one advances
+        the fleet by the missed steps (up to ``MAX_CATCHUP_STEPS``) before
+        writing, so simulated time keeps pace with wall time.
+        """
         logger.info("Starting vehicle simulation service")
         self.is_running = True
+        next_tick = time.monotonic()
         
         while self.is_running:
             try:
                 # Check for new trips to simulate
                 active_trips = await trip_service.get_active_trips()
                 
-                if len(active_trips) > 0:
-                    for trip_id, sim in self.active_simulators.items():
-                        logger.info(f"  - {trip_id}: running={sim.is_running}, position={sim.current_position:.3f}, paused={sim.is_paused}")
-                
                 for trip in active_trips:
                     await self.start_trip_simulation(trip)
                 
+                started = time.monotonic()
+                lag = max(0.0, started - next_tick)
+                behind = int(lag // TICK_SECONDS)
+                catchup = min(behind, MAX_CATCHUP_STEPS)
+                next_tick += (behind + 1) * TICK_SECONDS
+                
                 # Update all simulations
-                await self.update_all_simulations()
+                await self.update_all_simulations(steps=1 + catchup)
+                
+                self._record_tick((time.monotonic() - started) * 1000, lag * 1000, catchup, behind - catchup)
+                if behind:
+                    logger.warning(f"[simulation_loop] Tick {lag:.2f}s late, ran {catchup} catch-up steps")
                 
-                # Wait 2 seconds before next update
-                await asyncio.sleep(2)
+                # Wait for the next tick
+                await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
                 
             except Exception as e:
                 logger.error(f"[simulation_loop] Error in simulation loop: {e}")
                 await asyncio.sleep(5)
+                next_tick = time.monotonic()
     
     def stop_simulation_service(self):
         """Stop the simulation service"""
         self.is_running = False
         self.active_simulators.clear()
+        self.engine.sync([])
+        self._traffic_analysis_at.clear()
     
     def _create_route_from_raw_response(self, raw_response: Dict) -> Optional[Route]:
         """
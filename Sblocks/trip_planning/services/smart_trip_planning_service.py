@@ -2,15 +2,13 @@ import os
 import logging
 from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
-import requests
 import asyncio
 import traceback
-import aiohttp
 import math
 import random
-from math import radians, sin, cos, sqrt, atan2
 from bson import ObjectId
 from flexpolyline import decode
+import numpy as np
 
 from schemas.entities import ScheduledTrip, RouteInfo, RouteBounds, TripStatus, VehicleLocation, SmartTrip, TrafficCondition, RouteRecommendation, TrafficType, Trip, TripPriority
 from schemas.requests import CreateTripRequest, UpdateTripRequest, DriverAvailabilityRequest
@@ -20,6 +18,10 @@ from services.vehicle_service import vehicle_service
 from services.notification_service import notification_service
 from services.driver_service import driver_service
 from services.driver_analytics_service import driver_analytics_service
+from services.route_cache import route_cache
+from services.provider_client import provider_client
+from services.traffic_check_scheduler import TrafficCheck, TrafficCheckScheduler
+from utils.geo import as_latlon_array, haversine_km
 
 
 logger = logging.getLogger(__name__)
@@ -32,10 +34,13 @@ MAPBOX_API_KEY = os.getenv("MAPBOX_API_KEY")
 VEHICLE_MASS = 12000  # kg constant mass
 
 # Traffic monitoring configuration
-TRAFFIC_CHECK_INTERVAL = 300  # Check traffic every 5 minutes
 HIGH_TRAFFIC_THRESHOLD = 0.3  # 30% increase in travel time indicates high traffic
 MINIMUM_TIME_SAVINGS = 600  # Only recommend if saves at least 10 minutes
 ROUTE_DEVIATION_THRESHOLD = 0.5  # Only recommend if new route is significantly different
+TRAFFIC_MONITOR_CONCURRENCY = int(os.getenv("TRAFFIC_MONITOR_CONCURRENCY", "10"))  # Trips checked at once
+
+ORS_DIRECTIONS_URL = "https://api.openrouteservice.org/v2/directions/driving-car"
+NO_TRAFFIC = {"live_traffic_delay": 0, "historical_traffic_delay": 0, "traffic_ratio": 1.0}
 
 
 class SmartTripService:
@@ -46,15 +51,16 @@ class SmartTripService:
         self.db_gps = db_manager_gps
         self.db_management = db_manager_management
         self.active_traffic_monitoring = False
-        self.route_recommendations: Dict[str, RouteRecommendation] = {}
-        self.last_traffic_check: Dict[str, datetime] = {}
+        self.traffic_scheduler = TrafficCheckScheduler(
+            check_trip=self._monitor_trip_traffic,
+            load_trips=trip_service.get_active_trips,
+            load_pending=trip_service.get_pending_recommendation_trip_ids,
+            workers=TRAFFIC_MONITOR_CONCURRENCY
+        )
 
     # -------------------- Utilities --------------------
     def _haversine(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-        R = 6371.0  # km
-        dlat, dlon = radians(lat2 - lat1), radians(lon2 - lon1)
-        a = sin(dlat / 2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2)**2
-        return R * 2 * atan2(sqrt(a), sqrt(1 - a))
+        return haversine_km(lat1, lon1, lat2, lon2)
 
     def _calculate_bounds(self, coords: List[List[float]]) -> RouteBounds:
         if not coords:
@@ -78,19 +84,15 @@ class SmartTripService:
         route1_step = max(1, len(route1_coords) // sample_size)
         route2_step = max(1, len(route2_coords) // sample_size)
         
-        route1_samples = [route1_coords[i * route1_step] for i in range(sample_size)]
-        route2_samples = [route2_coords[i * route2_step] for i in range(sample_size)]
+        route1_samples = as_latlon_array(route1_coords)[np.arange(sample_size) * route1_step]
+        route2_samples = as_latlon_array(route2_coords)[np.arange(sample_size) * route2_step]
         
         # Calculate average distance between corresponding points
-        total_distance = 0
-        for i in range(min(len(route1_samples), len(route2_samples))):
-            distance = self._haversine(
-                route1_samples[i][0], route1_samples[i][1],
-                route2_samples[i][0], route2_samples[i][1]
-            )
-            total_distance += distance
+        avg_distance = float(np.mean(haversine_km(
+            route1_samples[:, 0], route1_samples[:, 1],
+            route2_samples[:, 0], route2_samples[:, 1]
+        )))
         
-        avg_distance = total_distance / sample_size
         # Make similarity calculation more lenient (increased from 5.0 to 10.0)
         similarity = max(0, 1 - (avg_distance / 10.0))
         
@@ -111,8 +113,40 @@ class SmartTripService:
             raise
 
     # -------------------- External API Calls --------------------
+    # Each provider call goes through the route cache; the _fetch_* methods make the request.
     async def _get_ors_route(self, origin_lat, origin_lng, dest_lat, dest_lng, departure_time=None):
-        url = "https://api.openrouteservice.org/v2/directions/driving-car"
+        # ORS does not take a departure time, so every departure shares one entry
+        return await route_cache.get_or_fetch(
+            "hedged_route",
+            [(origin_lat, origin_lng), (dest_lat, dest_lng)],
+            lambda: self._fetch_hedged_route(origin_lat, origin_lng, dest_lat, dest_lng)
+        )
+
+    async def _fetch_hedged_route(self, origin_lat, origin_lng, dest_lat, dest_lng):
+        """ORS route, racing Mapbox if ORS is slower than usual or fails"""
+        calls = [("ors", lambda: self._fetch_ors_route(origin_lat, origin_lng, dest_lat, dest_lng))]
+        if MAPBOX_API_KEY:
+            calls.append(("mapbox", lambda: self._fetch_mapbox_route(origin_lat, origin_lng, dest_lat, dest_lng)))
+        return await provider_client.hedge(calls)
+
+    async def _fetch_mapbox_route(self, origin_lat, origin_lng, dest_lat, dest_lng):
+        """Mapbox's primary free-flow route in the ORS route shape
+
+        Uses the ``driving`` profile so, like ORS, the duration excludes traffic:
+        the result is cached with the free-flow TTL and TomTom's delay is added
+        on top by the caller.
+        """
+        routes = await self._fetch_alternative_routes_mapbox(
+            origin_lat, origin_lng, dest_lat, dest_lng, profile="driving"
+        )
+        if not routes:
+            return None
+        route = routes[0]
+        route.pop("route_index", None)
+        route["elevation_gain"] = 0  # Not reported by Mapbox
+        return route
+
+    async def _fetch_ors_route(self, origin_lat, origin_lng, dest_lat, dest_lng):
         headers = {"Authorization": ORS_API_KEY}
         params = {
             "start": f"{origin_lng},{origin_lat}",
@@ -120,9 +154,7 @@ class SmartTripService:
         }
 
         try:
-            resp = requests.get(url, headers=headers, params=params)
-            resp.raise_for_status()
-            data = resp.json()
+            data = await provider_client.get("ors", ORS_DIRECTIONS_URL, headers=headers, params=params)
             route = data["features"][0]["properties"]["segments"][0]
             polyline = data["features"][0]["geometry"]["coordinates"]
             coords = [[lat, lng] for lng, lat in polyline]  # Convert lng,lat -> lat,lng
@@ -155,16 +187,31 @@ class SmartTripService:
         Get multiple alternative routes using Mapbox Directions API with traffic awareness.
         Returns a list of routes with distance, duration, and coordinates.
         """
-        try:
-            # Starting point: current location or origin
-            if current_location_lat and current_location_lng:
-                start_lat, start_lng = current_location_lat, current_location_lng
-            else:
-                start_lat, start_lng = origin_lat, origin_lng
+        if current_location_lat and current_location_lng:
+            start_lat, start_lng = current_location_lat, current_location_lng
+        else:
+            start_lat, start_lng = origin_lat, origin_lng
 
+        # driving-traffic results follow live conditions, so they take the short TTL
+        return await route_cache.get_or_fetch(
+            "mapbox_alternatives",
+            [(start_lat, start_lng), (dest_lat, dest_lng)],
+            lambda: self._fetch_alternative_routes_mapbox(start_lat, start_lng, dest_lat, dest_lng),
+            traffic=True
+        )
+
+    async def _fetch_alternative_routes_mapbox(
+        self,
+        start_lat: float,
+        start_lng: float,
+        dest_lat: float,
+        dest_lng: float,
+        profile: str = "driving-traffic"
+    ) -> List[dict]:
+        try:
             # Build the request URL
             coordinates = f"{start_lng},{start_lat};{dest_lng},{dest_lat}"
-            url = f"https://api.mapbox.com/directions/v5/mapbox/driving-traffic/{coordinates}"
+            url = f"https://api.mapbox.com/directions/v5/mapbox/{profile}/{coordinates}"
 
             params = {
                 "alternatives": "true",          # Request alternative routes
@@ -174,10 +221,7 @@ class SmartTripService:
                 "access_token": MAPBOX_API_KEY
             }
 
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params, timeout=30) as resp:
-                    resp.raise_for_status()
-                    data = await resp.json()
+            data = await provider_client.get("mapbox", url, params=params)
 
             routes = []
             for i, route in enumerate(data.get("routes", [])):
@@ -215,7 +259,13 @@ class SmartTripService:
         else:
             start_lat, start_lng = origin_lat, origin_lng
 
-        url = "https://api.openrouteservice.org/v2/directions/driving-car"
+        return await route_cache.get_or_fetch(
+            "ors_alternatives",
+            [(start_lat, start_lng), (dest_lat, dest_lng)],
+            lambda: self._fetch_alternative_routes(start_lat, start_lng, dest_lat, dest_lng)
+        )
+
+    async def _fetch_alternative_routes(self, start_lat, start_lng, dest_lat, dest_lng):
         headers = {"Authorization": ORS_API_KEY}
         
         # Updated parameters for better alternative route generation
@@ -229,9 +279,7 @@ class SmartTripService:
         }
 
         try:
-            resp = requests.get(url, headers=headers, params=params, timeout=30)
-            resp.raise_for_status()
-            data = resp.json()
+            data = await provider_client.get("ors", ORS_DIRECTIONS_URL, headers=headers, params=params)
             
             logger.info(f"ORS returned {len(data.get('features', []))} route features")
             
@@ -277,8 +325,19 @@ class SmartTripService:
 
     async def _get_tomtom_traffic(self, origin_lat, origin_lng, dest_lat, dest_lng, departure_time=None):
         if not TOMTOM_API_KEY:
-            return 0  # No traffic delay if no key
+            return dict(NO_TRAFFIC)  # No traffic delay if no key
+
+        # Error fallbacks carry no travel times and are not cached
+        return await route_cache.get_or_fetch(
+            "tomtom_traffic",
+            [(origin_lat, origin_lng), (dest_lat, dest_lng)],
+            lambda: self._fetch_tomtom_traffic(origin_lat, origin_lng, dest_lat, dest_lng, departure_time),
+            traffic=True,
+            cacheable=lambda result: isinstance(result, dict) and "no_traffic_duration" in result,
+            depart_at=departure_time.replace(second=0, microsecond=0).isoformat() if departure_time else None
+        )
 
+    async def _fetch_tomtom_traffic(self, origin_lat, origin_lng, dest_lat, dest_lng, departure_time=None):
         url = f"https://api.tomtom.com/routing/1/calculateRoute/{origin_lat},{origin_lng}:{dest_lat},{dest_lng}/json"
         params = {
             "key": TOMTOM_API_KEY,
@@ -290,9 +349,7 @@ class SmartTripService:
             params["departAt"] = departure_time.isoformat()
 
         try:
-            resp = requests.get(url, params=params)
-            resp.raise_for_status()
-            data = resp.json()
+            data = await provider_client.get("tomtom", url, params=params)
             
             summary = data["routes"][0]["summary"]
             logger.info(f"Traffic summary {summary}")
@@ -309,7 +366,7 @@ class SmartTripService:
             }
         except Exception as e:
             logger.warning(f"TomTom Traffic API error: {e}")
-            return {"live_traffic_delay": 0, "historical_traffic_delay": 0, "traffic_ratio": 1.0}
+            return dict(NO_TRAFFIC)
         
     
     def _is_reasonable_distance(self, lat1: float, lng1: float, lat2: float, lng2: float) -> bool:
@@ -440,13 +497,15 @@ class SmartTripService:
                 logger.warning(f"Waypoint {waypoint_name} too far from route")
                 return None
             
-            # Try to get both legs of the route
-            leg1 = await self._get_ors_route(start_lat, start_lng, waypoint_lat, waypoint_lng)
+            # Fetch both legs of the route at once
+            leg1, leg2 = await asyncio.gather(
+                self._get_ors_route(start_lat, start_lng, waypoint_lat, waypoint_lng),
+                self._get_ors_route(waypoint_lat, waypoint_lng, dest_lat, dest_lng)
+            )
             if not leg1:
                 logger.warning(f"Failed to get route to waypoint {waypoint_name}")
                 return None
             
-            leg2 = await self._get_ors_route(waypoint_lat, waypoint_lng, dest_lat, dest_lng)
             if not leg2:
                 logger.warning(f"Failed to get route from waypoint {waypoint_name} to destination")
                 return None
@@ -490,11 +549,17 @@ class SmartTripService:
         
         alternative_routes = []
         
+        # Both providers are asked at once; Mapbox routes still take precedence
+        mapbox_routes, ors_routes = await asyncio.gather(
+            self._get_alternative_routes_mapbox(None, None, dest_lat, dest_lng, current_lat, current_lng),
+            self._get_alternative_routes(None, None, dest_lat, dest_lng, current_lat, current_lng),
+            return_exceptions=True
+        )
+
         # 1. Get standard API routes first
         try:
-            mapbox_routes = await self._get_alternative_routes_mapbox(
-                None, None, dest_lat, dest_lng, current_lat, current_lng
-            )
+            if isinstance(mapbox_routes, Exception):
+                raise mapbox_routes
             
             # Only add routes that are actually different and reasonable
             for i, route in enumerate(mapbox_routes[:2]):
@@ -508,9 +573,8 @@ class SmartTripService:
         
         # 2. Try ORS alternative routes as backup
         try:
-            ors_routes = await self._get_alternative_routes(
-                None, None, dest_lat, dest_lng, current_lat, current_lng
-            )
+            if isinstance(ors_routes, Exception):
+                raise ors_routes
             
             for i, route in enumerate(ors_routes[:2]):
                 if route.get("distance", 0) > 1000 and len(alternative_routes) < 3:
@@ -540,22 +604,26 @@ class SmartTripService:
             
             logger.info(f"Generated {len(intermediate_waypoints)} strategic waypoints")
             
-            # Try each waypoint, but limit API calls
-            for waypoint_lat, waypoint_lng, waypoint_name in intermediate_waypoints[:5]:
-                if len(alternative_routes) >= num_routes:
-                    break
-                
-                waypoint_route = await self._get_route_via_waypoint_safe(
-                    current_lat, current_lng,
-                    waypoint_lat, waypoint_lng,
-                    dest_lat, dest_lng,
-                    waypoint_name
-                )
+            # Try waypoints in waves of as many as are still needed, to limit API calls
+            candidates = intermediate_waypoints[:5]
+            while candidates and len(alternative_routes) < num_routes:
+                wave = candidates[:num_routes - len(alternative_routes)]
+                candidates = candidates[len(wave):]
+                waypoint_routes = await asyncio.gather(*(
+                    self._get_route_via_waypoint_safe(
+                        current_lat, current_lng,
+                        waypoint_lat, waypoint_lng,
+                        dest_lat, dest_lng,
+                        waypoint_name
+                    )
+                    for waypoint_lat, waypoint_lng, waypoint_name in wave
+                ))
                 
-                if waypoint_route:
-                    waypoint_route["route_type"] = f"waypoint_{waypoint_name}"
-                    waypoint_route["route_index"] = len(alternative_routes)
-                    alternative_routes.append(waypoint_route)
+                for (_, _, waypoint_name), waypoint_route in zip(wave, waypoint_routes):
+                    if waypoint_route:
+                        waypoint_route["route_type"] = f"waypoint_{waypoint_name}"
+                        waypoint_route["route_index"] = len(alternative_routes)
+                        alternative_routes.append(waypoint_route)
         
         logger.info(f"Generated {len(alternative_routes)} total alternative routes")
         
@@ -577,7 +645,7 @@ class SmartTripService:
             logger.error(f"Error getting current location for vehicle {vehicle_id}: {e}")
             return None
 
-    async def _analyze_route_traffic(self, trip_id, vehicle_id) -> TrafficCondition:
+    async def _analyze_route_traffic(self, trip_id, vehicle_id, current_location=None) -> TrafficCondition:
         """Analyze traffic conditions for a specific trip's route"""
         try:
             # vehicle_id, trip 
@@ -585,7 +653,8 @@ class SmartTripService:
                 return None
 
             # Get current vehicle location
-            current_location = await self._get_current_trip_location(vehicle_id)
+            if current_location is None:
+                current_location = await self._get_current_trip_location(vehicle_id)
             if not current_location:
                 return None
 
@@ -687,8 +756,12 @@ class SmartTripService:
 #               None, None, dest_lat, dest_lng, current_lat, current_lng, num_routes=5
 #            )
 
-            alternative_routes = await self._generate_improved_alternative_routes(
-                current_lat,current_lng,dest_lat,dest_lng, num_routes=5
+            # Traffic from here to the destination is the same for every alternative; fetch it alongside them
+            alternative_routes, alt_traffic = await asyncio.gather(
+                self._generate_improved_alternative_routes(
+                    current_lat,current_lng,dest_lat,dest_lng, num_routes=5
+                ),
+                self._get_tomtom_traffic(current_lat, current_lng, dest_lat, dest_lng)
             )
             
             logger.info(f"Generated {len(alternative_routes)} improved alternative routes")
@@ -705,8 +778,6 @@ class SmartTripService:
             min_savings = MINIMUM_TIME_SAVINGS * 0.3 if traffic_condition.severity == TrafficType.SEVERE else MINIMUM_TIME_SAVINGS * 0.5
 
             for alt_route in alternative_routes:
-                # Get traffic info for this route
-                alt_traffic = await self._get_tomtom_traffic(current_lat, current_lng, dest_lat, dest_lng)
                 alt_duration = alt_route["duration"] + alt_traffic.get("live_traffic_delay", 0)
                 time_savings = current_duration - alt_duration
 
@@ -741,7 +812,7 @@ class SmartTripService:
                     
                     best_savings = time_savings
                     best_route = alt_route
-                    best_route["traffic_info"] = alt_traffic
+                    best_route["traffic_info"] = dict(alt_traffic)
                     logger.info(f"New best route: {route_type}, saves {int(time_savings/60)} minutes")
 
             if not best_route:
@@ -795,69 +866,81 @@ class SmartTripService:
             return None
         
     async def monitor_traffic_and_recommend_routes(self):
-        """Main traffic monitoring function that generates route recommendations"""
+        """Check every active trip once (the scheduler normally checks trips as they fall due)"""
         try:
             logger.info("Starting traffic monitoring cycle")
             
             active_trips = await trip_service.get_active_trips()
             logger.info(f"Monitoring {len(active_trips)} active trips for traffic conditions")
             
-            recommendations_generated = 0
-            
-            for trip in active_trips:
-                try:
-                    trip_id = trip.id
-                    
-                    # Update last check time
-                    self.last_traffic_check[trip_id] = datetime.utcnow()
-                    
-                    # Analyze traffic conditions
-                    traffic_condition = await self._analyze_route_traffic(trip_id,trip.vehicle_id)
-                    
-                    if traffic_condition and traffic_condition.severity in [TrafficType.HEAVY, TrafficType.SEVERE]:
-                        logger.info(f"High traffic detected for trip {trip_id}: {traffic_condition.severity}")
-                        # Make notification to fleet manager about high traffic
-                        asyncio.create_task(notification_service.notify_high_traffic(trip,traffic_condition.severity))
-                        # Generate route recommendation
-                        recommendation = await self.generate_improved_route_recommendation(trip, traffic_condition)
-                        
-                        if recommendation:
-                            # Store recommendation
-                            self.route_recommendations[trip_id] = recommendation
-                            recommendations_generated += 1
-                            
-                            logger.info(f"Route recommendation generated for trip {trip_id}: "
-                                      f"saves {int(recommendation.time_savings / 60)} minutes")
-                            
-                            # Optionally, publish event or store in database
-                            await trip_service._store_route_recommendation(recommendation)
-                    
-                except Exception as e:
-                    logger.error(f"Error processing trip {trip.id} in traffic monitoring: {e}")
-                    continue
+            # Trips are checked concurrently; provider rate limits pace the actual API calls
+            slots = asyncio.Semaphore(TRAFFIC_MONITOR_CONCURRENCY)
+
+            async def check(trip) -> bool:
+                async with slots:
+                    return await self._monitor_trip_traffic(trip)
+
+            results = await asyncio.gather(*(check(trip) for trip in active_trips))
+            recommendations_generated = sum(result.recommended for result in results)
             
             logger.info(f"Traffic monitoring cycle complete. Generated {recommendations_generated} recommendations")
             
         except Exception as e:
             logger.error(f"Error in traffic monitoring cycle: {e}")
 
+    def _remaining_km(self, trip, current_location: Optional[Tuple[float, float]]) -> Optional[float]:
+        """Straight-line distance from the vehicle to the trip's destination"""
+        try:
+            dest_lng, dest_lat = trip.destination.location.coordinates[:2]
+        except (AttributeError, TypeError, ValueError):
+            return None
+        if not current_location:
+            return None
+        return float(haversine_km(current_location[0], current_location[1], dest_lat, dest_lng))
+
+    async def _monitor_trip_traffic(self, trip) -> TrafficCheck:
+        """Check one trip's traffic and store a route recommendation if warranted"""
+        result = TrafficCheck()
+        try:
+            trip_id = trip.id
+            current_location = await self._get_current_trip_location(trip.vehicle_id) if trip.vehicle_id else None
+            result.remaining_km = self._remaining_km(trip, current_location)
+            
+            # Analyze traffic conditions
+            traffic_condition = await self._analyze_route_traffic(trip_id, trip.vehicle_id, current_location)
+            if traffic_condition:
+                result.traffic_ratio = traffic_condition.traffic_ratio
+            
+            if traffic_condition and traffic_condition.severity in [TrafficType.HEAVY, TrafficType.SEVERE]:
+                logger.info(f"High traffic detected for trip {trip_id}: {traffic_condition.severity}")
+                # Make notification to fleet manager about high traffic
+                asyncio.create_task(notification_service.notify_high_traffic(trip,traffic_condition.severity))
+                # Generate route recommendation
+                recommendation = await self.generate_improved_route_recommendation(trip, traffic_condition)
+                
+                if recommendation:
+                    logger.info(f"Route recommendation generated for trip {trip_id}: "
+                              f"saves {int(recommendation.time_savings / 60)} minutes")
+                    
+                    # Persisted so it survives restarts; MongoDB drops it once it expires
+                    await trip_service._store_route_recommendation(recommendation)
+                    result.recommended = True
+            
+        except Exception as e:
+            logger.error(f"Error processing trip {trip.id} in traffic monitoring: {e}")
+        return result
+
     async def start_traffic_monitoring(self):
         """Start the traffic monitoring service"""
         logger.info("Starting traffic monitoring service")
         self.active_traffic_monitoring = True
-        
-        while self.active_traffic_monitoring:
-            try:
-                await self.monitor_traffic_and_recommend_routes()
-                await asyncio.sleep(TRAFFIC_CHECK_INTERVAL)
-            except Exception as e:
-                logger.error(f"Error in traffic monitoring loop: {e}")
-                await asyncio.sleep(60)  # Wait 1 minute before retry on error
+        await self.traffic_scheduler.start()
 
-    def stop_traffic_monitoring(self):
+    async def stop_traffic_monitoring(self):
         """Stop the traffic monitoring service"""
         logger.info("Stopping traffic monitoring service")
         self.active_traffic_monitoring = False
+        await self.traffic_scheduler.stop()
 
     # -------------------- Original Smart Trip Creation Functions --------------------
     async def create_smart_trip(self, scheduled_trip: ScheduledTrip, created_by: str) -> SmartTrip:
@@ -894,11 +977,16 @@ class SmartTripService:
 
             # Route optimization
             logger.info(f"[SmartTripService.create_smart_trip] Optimizing route with {num_samples} samples")
-            for i in range(num_samples + 1):
-                test_start = start_window + i * step
-                route = await self._get_ors_route(origin_lat, origin_lng, dest_lat, dest_lng, test_start)
+            starts = [start_window + i * step for i in range(num_samples + 1)]
+            samples = await asyncio.gather(*(
+                asyncio.gather(
+                    self._get_ors_route(origin_lat, origin_lng, dest_lat, dest_lng, test_start),
+                    self._get_tomtom_traffic(origin_lat, origin_lng, dest_lat, dest_lng, test_start)
+                )
+                for test_start in starts
+            ))
+            for test_start, (route, traffic_delay) in zip(starts, samples):
                 if route:
-                    traffic_delay = await self._get_tomtom_traffic(origin_lat, origin_lng, dest_lat, dest_lng, test_start)
                     total_duration = route["duration"] + traffic_delay.get("live_traffic_delay", 0)
                     if total_duration < min_duration:
                         min_duration = total_duration
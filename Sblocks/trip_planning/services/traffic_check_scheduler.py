@@ -0,0 +1,277 @@
+"""
+Priority scheduler for traffic checks on active trips
+
+Each active trip sits in a min-heap keyed by when its next traffic check is
+due. A fixed pool of workers takes trips as they fall due, and after each
+check the trip is rescheduled with ``next_check_delay``: sooner when a lot
+of the trip is left or its traffic has been changing, later when it is
+nearly done or a route recommendation is already waiting on the fleet
+manager. The set of active trips and pending recommendations is
+reconciled from the database every ``sync_interval_s`` so new trips join
+and finished ones drop out without a full sweep.
+"""
+import asyncio
+import heapq
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TRAFFIC_CHECK_BASE_SECONDS = float(os.getenv("TRAFFIC_CHECK_BASE_SECONDS", "300"))
+TRAFFIC_CHECK_MIN_SECONDS = float(os.getenv("TRAFFIC_CHECK_MIN_SECONDS", "60"))
+TRAFFIC_CHECK_MAX_SECONDS = float(os.getenv("TRAFFIC_CHECK_MAX_SECONDS", "1800"))
+TRAFFIC_CHECK_SYNC_SECONDS = float(os.getenv("TRAFFIC_CHECK_SYNC_SECONDS", "60"))
+REFERENCE_REMAINING_KM = 20.0   # A trip with this much left is checked every base interval
+NEAR_DESTINATION_KM = 2.0       # Too close to the destination for a reroute to help
+HEAVY_TRAFFIC_RATIO = 1.5       # Matches the "heavy" severity in SmartTripService
+VOLATILITY_WEIGHT = 3.0
+RATIO_WINDOW = 5
+
+
+@dataclass
+class TrafficCheck:
+    """Outcome of one traffic check, used to pick the next one"""
+    remaining_km: Optional[float] = None
+    traffic_ratio: Optional[float] = None
+    recommended: bool = False
+
+
+class TripCheckState:
+    """Scheduling state for one active trip"""
+
+    def __init__(self, trip: Any, due_at: float):
+        self.trip = trip
+        self.due_at = due_at
+        self.version = 0
+        self.in_flight = False
+        self.checks = 0
+        self.remaining_km: Optional[float] = None
+        self.ratios: Deque[float] = deque(maxlen=RATIO_WINDOW)
+
+
+def next_check_delay(
+    remaining_km: Optional[float],
+    ratios: Iterable[float],
+    pending_recommendation: bool,
+    base_s: float = TRAFFIC_CHECK_BASE_SECONDS,
+    min_s: float = TRAFFIC_CHECK_MIN_SECONDS,
+    max_s: float = TRAFFIC_CHECK_MAX_SECONDS
+) -> float:
+    """Seconds until a trip's next traffic check"""
+    ratios = list(ratios)
+    if remaining_km is not None and remaining_km <= NEAR_DESTINATION_KM:
+        return max_s
+
+    delay = base_s
+    if remaining_km is not None:
+        # More road ahead means more traffic that can change and more time a reroute can save
+        delay *= min(3.0, max(0.5, REFERENCE_REMAINING_KM / remaining_km))
+    if len(ratios) >= 2:
+        delay /= 1.0 + VOLATILITY_WEIGHT * float(np.std(ratios))
+    if ratios and ratios[-1] >= HEAVY_TRAFFIC_RATIO:
+        delay /= 2.0
+    if pending_recommendation:
+        # The fleet manager has not answered the last recommendation yet
+        delay = max(delay, 3 * base_s)
+    return min(max_s, max(min_s, delay))
+
+
+class TrafficCheckScheduler:
+    """Runs traffic checks for active trips in next-due order with a bounded worker pool"""
+
+    def __init__(
+        self,
+        check_trip: Callable[[Any], Awaitable[TrafficCheck]],
+        load_trips: Callable[[], Awaitable[List[Any]]],
+        load_pending: Callable[[], Awaitable[Iterable[str]]],
+        workers: int = 10,
+        sync_interval_s: float = TRAFFIC_CHECK_SYNC_SECONDS,
+        base_s: float = TRAFFIC_CHECK_BASE_SECONDS,
+        min_s: float = TRAFFIC_CHECK_MIN_SECONDS,
+        max_s: float = TRAFFIC_CHECK_MAX_SECONDS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.check_trip = check_trip
+        self.load_trips = load_trips
+        self.load_pending = load_pending
+        self.workers = max(1, workers)
+        self.sync_interval_s = sync_interval_s
+        self.base_s = base_s
+        self.min_s = min_s
+        self.max_s = max_s
+        self.clock = clock
+
+        self.states: Dict[str, TripCheckState] = {}
+        self.pending: Set[str] = set()  # Trips with a recommendation awaiting an answer
+        self._heap: List[Tuple[float, int, str]] = []
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._last_sync: Optional[float] = None
+        self.running = False
+        self.metrics = {"syncs": 0, "checks": 0, "recommendations": 0, "errors": 0}
+
+    # -------------------- Scheduling --------------------
+    def _schedule(self, trip_id: str, due_at: float):
+        """(Re)schedule a trip; older heap entries for it are skipped when popped"""
+        state = self.states[trip_id]
+        state.version += 1
+        state.due_at = due_at
+        heapq.heappush(self._heap, (due_at, state.version, trip_id))
+
+    def _delay_for(self, trip_id: str, state: TripCheckState) -> float:
+        return next_check_delay(state.remaining_km, state.ratios, trip_id in self.pending,
+                                self.base_s, self.min_s, self.max_s)
+
+    def next_due(self) -> Optional[float]:
+        """Due time of the earliest live heap entry"""
+        while self._heap:
+            due_at, version, trip_id = self._heap[0]
+            state = self.states.get(trip_id)
+            if state is not None and state.version == version and not state.in_flight:
+                return due_at
+            heapq.heappop(self._heap)
+        return None
+
+    def pop_due(self, now: Optional[float] = None) -> List[str]:
+        """Take every trip whose check is due, marking it in flight"""
+        now = self.clock() if now is None else now
+        due = []
+        while self.next_due() is not None and self._heap[0][0] <= now:
+            _, _, trip_id = heapq.heappop(self._heap)
+            self.states[trip_id].in_flight = True
+            due.append(trip_id)
+        return due
+
+    async def sync(self):
+        """Reconcile scheduled trips and pending recommendations with the database"""
+        now = self.clock()
+        trips = await self.load_trips()
+        pending = {str(trip_id) for trip_id in await self.load_pending()}
+
+        active = {str(trip.id): trip for trip in trips}
+        for trip_id in list(self.states):
+            if trip_id not in active:
+                del self.states[trip_id]
+        added = 0
+        for trip_id, trip in active.items():
+            state = self.states.get(trip_id)
+            if state is None:
+                self.states[trip_id] = TripCheckState(trip, now)
+                self._schedule(trip_id, now)
+                added += 1
+            else:
+                state.trip = trip
+
+        # A recommendation was answered or expired: the trip no longer needs to wait it out
+        resolved = self.pending - pending
+        self.pending = pending
+        for trip_id in resolved:
+            state = self.states.get(trip_id)
+            if state is not None and not state.in_flight and state.checks:
+                self._schedule(trip_id, min(state.due_at, now + self._delay_for(trip_id, state)))
+
+        self._last_sync = now
+        self.metrics["syncs"] += 1
+        if added or resolved:
+            logger.info(f"[TrafficCheckScheduler] Tracking {len(self.states)} active trips "
+                        f"({added} new, {len(resolved)} recommendations resolved)")
+
+    async def run_check(self, trip_id: str):
+        """Check one trip and schedule its next check"""
+        state = self.states.get(trip_id)
+        if state is None:
+            return
+        result = None
+        try:
+            result = await self.check_trip(state.trip)
+            self.metrics["checks"] += 1
+        except Exception as e:
+            self.metrics["errors"] += 1
+            logger.error(f"[TrafficCheckScheduler] Traffic check failed for trip {trip_id}: {e}")
+        finally:
+            state.in_flight = False
+
+        if self.states.get(trip_id) is not state:
+            return  # Finished while it was being checked
+        state.checks += 1
+        if result is not None:
+            if result.remaining_km is not None:
+                state.remaining_km = result.remaining_km
+            if result.traffic_ratio is not None:
+                state.ratios.append(result.traffic_ratio)
+            if result.recommended:
+                self.metrics["recommendations"] += 1
+                self.pending.add(trip_id)
+        self._schedule(trip_id, self.clock() + self._delay_for(trip_id, state))
+
+    # -------------------- Loop --------------------
+    async def start(self):
+        """Start the dispatcher and worker pool"""
+        if self.running:
+            logger.warning("[TrafficCheckScheduler] Scheduler is already running")
+            return
+        self.running = True
+        self._queue = asyncio.Queue(maxsize=self.workers)
+        self._tasks = [asyncio.create_task(self._dispatch_loop())]
+        self._tasks += [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"[TrafficCheckScheduler] Started with {self.workers} workers")
+
+    async def stop(self):
+        """Stop the dispatcher and workers"""
+        if not self.running:
+            return
+        self.running = False
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("[TrafficCheckScheduler] Stopped")
+
+    async def _dispatch_loop(self):
+        """Hand due trips to the workers, resyncing with the database periodically"""
+        while self.running:
+            try:
+                now = self.clock()
+                if self._last_sync is None or now - self._last_sync >= self.sync_interval_s:
+                    await self.sync()
+
+                for trip_id in self.pop_due():
+                    await self._queue.put(trip_id)  # Blocks while every worker is busy
+
+                next_sync = self._last_sync + self.sync_interval_s
+                next_due = self.next_due()
+                wake_at = next_sync if next_due is None else min(next_sync, next_due)
+                await asyncio.sleep(max(0.0, wake_at - self.clock()))
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"[TrafficCheckScheduler] Error in dispatch loop: {e}")
+                self._last_sync = self.clock()  # Back off a full sync interval before retrying
+                await asyncio.sleep(min(60.0, self.sync_interval_s))
+
+    async def _worker(self):
+        while True:
+            trip_id = await self._queue.get()
+            try:
+                await self.run_check(trip_id)
+            finally:
+                self._queue.task_done()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Scheduler counters and the current schedule's shape"""
+        now = self.clock()
+        next_due = self.next_due()
+        return {
+            **self.metrics,
+            "active_trips": len(self.states),
+            "pending_recommendations": len(self.pending),
+            "in_flight": sum(1 for s in self.states.values() if s.in_flight),
+            "next_check_in_s": None if next_due is None else round(max(0.0, next_due - now), 1),
+            "workers": self.workers,
+        }
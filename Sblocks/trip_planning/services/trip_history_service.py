@@ -26,6 +26,9 @@ class TripHistoryService:
         inserted_id = str(result.inserted_id)
         logger.info(f"Trip inserted with ID: {inserted_id}")
 
+        from services.trip_rollup_service import trip_rollup_service
+        await trip_rollup_service.record_trip(trip_data)
+
         trip_data["_id"] = inserted_id
         return Trip(**trip_data)
     
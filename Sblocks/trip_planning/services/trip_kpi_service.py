@@ -0,0 +1,175 @@
+"""
+Trip KPIs for the analytics dashboards
+
+Every dashboard figure for a timeframe (total trips, completion rate,
+average trips per day, total distance, and the per-driver and per-vehicle
+leaderboards) comes from one ``summarize`` over the trip rollups, so the
+cost does not depend on how much history the timeframe spans. Results
+are kept for ``TRIP_KPI_CACHE_TTL_SECONDS`` so the separate dashboard
+requests for one timeframe share one query. Concurrent requests for a
+timeframe that is not cached wait for the same query. Leaderboard names
+are resolved in one batch through the shared ``driver_names`` and
+``vehicle_names`` resolvers.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+
+from repositories.database import db_manager_management
+from services.trip_rollup_service import FLEET_KEY, trip_rollup_service
+from utils.name_resolver import NameResolver
+
+logger = logging.getLogger(__name__)
+
+TRIP_KPI_CACHE_TTL_SECONDS = float(os.getenv("TRIP_KPI_CACHE_TTL_SECONDS", "30"))
+
+TIMEFRAMES = {
+    "day": timedelta(days=1),
+    "week": timedelta(days=7),
+    "month": timedelta(days=30),
+    "year": timedelta(days=365)
+}
+
+
+async def load_driver_names(driver_ids: List[str]) -> Dict[str, str]:
+    """Driver names by employee id or document id, in one query"""
+    object_ids = [ObjectId(driver_id) for driver_id in driver_ids if ObjectId.is_valid(driver_id)]
+    cursor = db_manager_management.drivers.find(
+        {"$or": [{"employee_id": {"$in": driver_ids}}, {"_id": {"$in": object_ids}}]},
+        {"employee_id": 1, "first_name": 1, "last_name": 1}
+    )
+    names = {}
+    for driver in await cursor.to_list(None):
+        name = f"{driver.get('first_name', '')} {driver.get('last_name', '')}".strip()
+        for key in (driver.get("employee_id"), str(driver["_id"])):
+            if key is not None:
+                names[key] = name
+    return names
+
+
+async def load_vehicle_names(vehicle_ids: List[str]) -> Dict[str, str]:
+    """Vehicle names, or make, model and registration, in one query"""
+    object_ids = [ObjectId(vehicle_id) for vehicle_id in vehicle_ids if ObjectId.is_valid(vehicle_id)]
+    if not object_ids:
+        return {}
+    cursor = db_manager_management.vehicles.find(
+        {"_id": {"$in": object_ids}},
+        {"name": 1, "make": 1, "model": 1, "registration_number": 1}
+    )
+    names = {}
+    for vehicle in await cursor.to_list(None):
+        names[str(vehicle["_id"])] = vehicle.get("name") or " ".join(
+            str(vehicle[field]) for field in ("make", "model", "registration_number") if vehicle.get(field)
+        )
+    return names
+
+
+class TripKpiService:
+    """Dashboard KPIs for a timeframe from the trip rollups"""
+
+    def __init__(
+        self,
+        rollups=trip_rollup_service,
+        ttl_s: float = TRIP_KPI_CACHE_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.rollups = rollups
+        self.ttl_s = ttl_s
+        self.clock = clock
+        self._cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+        # Bumped by invalidate() so queries started before it are not cached
+        self._generation = 0
+        self.stats = {"hits": 0, "queries": 0}
+        # Trips completed, cancelled or missed show up in the KPIs straight away
+        rollups.add_trip_listener(self.invalidate)
+
+    @staticmethod
+    def get_window(timeframe: str, end_date: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+        """Start and end of a timeframe ending now; unknown timeframes mean a week"""
+        end_date = end_date or datetime.now(timezone.utc)
+        return end_date - TIMEFRAMES.get(timeframe.lower(), TIMEFRAMES["week"]), end_date
+
+    async def get_kpis(self, timeframe: str) -> Dict[str, Any]:
+        """Every dashboard KPI for the timeframe, at most ``ttl_s`` seconds old"""
+        key = timeframe.lower() if timeframe.lower() in TIMEFRAMES else "week"
+        cached = self._cache.get(key)
+        if cached is not None and self.clock() - cached[0] < self.ttl_s:
+            self.stats["hits"] += 1
+            return cached[1]
+
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = asyncio.ensure_future(self._query(key))
+            pending.add_done_callback(lambda done: self._pending.pop(key) if self._pending.get(key) is done else None)
+        else:
+            self.stats["hits"] += 1
+        return await asyncio.shield(pending)
+
+    def invalidate(self):
+        """Drop cached KPIs; called by the rollups once a trip moves to history"""
+        self._generation += 1
+        self._cache.clear()
+        # Later requests start a new query rather than wait for one that may miss the trip
+        self._pending.clear()
+
+    async def _query(self, timeframe: str) -> Dict[str, Any]:
+        start_date, end_date = self.get_window(timeframe)
+        generation = self._generation
+        self.stats["queries"] += 1
+        summary = await self.rollups.summarize(start_date, end_date)
+
+        totals = summary["fleet"].get(FLEET_KEY, {})
+        drivers, vehicles = await asyncio.gather(
+            driver_names.resolve(list(summary["driver"])), vehicle_names.resolve(list(summary["vehicle"]))
+        )
+
+        completed_trips = totals.get("completed_trips", 0)
+        finished = completed_trips + totals.get("cancelled_trips", 0)
+        days = (end_date - start_date).days or 1  # Minimum 1 day
+        kpis = {
+            "start_date": start_date,
+            "end_date": end_date,
+            "total_trips": totals.get("trips", 0),
+            "completed_trips": completed_trips,
+            "cancelled_trips": totals.get("cancelled_trips", 0),
+            "completion_rate": round(completed_trips / finished * 100, 2) if finished > 0 else 0,
+            "average_trips_per_day": round(totals.get("timed_trips", 0) / days, 2),
+            "total_distance": round(totals.get("distance", 0.0), 2),
+            "drivers": [
+                {
+                    "driver_id": driver_id,
+                    "driver_name": drivers.get(driver_id, f"Driver {driver_id}"),
+                    "completed_trips": row["completed_trips"],
+                    "cancelled_trips": row["cancelled_trips"]
+                }
+                for driver_id, row in summary["driver"].items()
+            ],
+            "vehicles": [
+                {
+                    "vehicleName": vehicles.get(vehicle_id, f"Vehicle {vehicle_id}"),
+                    "totalTrips": row["trips"],
+                    "totalDistance": round(row["distance"], 2)
+                }
+                for vehicle_id, row in summary["vehicle"].items()
+            ]
+        }
+        if generation == self._generation:
+            self._cache[timeframe] = (self.clock(), kpis)
+        logger.info(f"[TripKpiService] KPIs for {timeframe}: {kpis['total_trips']} trips, "
+                    f"{len(kpis['drivers'])} drivers, {len(kpis['vehicles'])} vehicles")
+        return kpis
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {**self.stats, "timeframes": len(self._cache)}
+
+
+# Global instances
+driver_names = NameResolver(load_driver_names, lambda driver_id: f"Driver {driver_id}")
+vehicle_names = NameResolver(load_vehicle_names, lambda vehicle_id: f"Vehicle {vehicle_id}")
+trip_kpi_service = TripKpiService()
@@ -0,0 +1,483 @@
+"""
+Daily and monthly trip analytics rollups
+
+Every trip that reaches ``trip_history`` is counted into pre-aggregated
+buckets: one per day and one per month, for the fleet, for its driver and
+for its vehicle. A bucket holds trip counts by status, distance, planned
+and actual durations, on-time starts, delays and violation counts, and is
+bucketed on the trip's ``created_at`` like the dashboards. Buckets are
+kept current with one unordered ``bulk_write`` of ``$inc`` upserts when
+trips move to history or violations are recorded. ``rebuild`` recounts
+them from ``trip_history`` and the violation collections.
+
+``summarize`` answers a date range from the smallest covering set of
+buckets: whole months, then the remaining whole days. Only a partial first
+day, or a partial last day in the past, is aggregated from the raw
+collections, so the cost does not grow with the length of the range or
+of the history.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pymongo import ReplaceOne, UpdateOne
+
+from repositories.database import db_manager
+
+logger = logging.getLogger(__name__)
+
+DAY = timedelta(days=1)
+SCOPES = ("fleet", "driver", "vehicle")
+FLEET_KEY = "all"
+REBUILD_BATCH_SIZE = 1000
+
+# The trip field each scope is keyed on; violations only carry a driver
+SCOPE_FIELDS = {"fleet": None, "driver": "driver_assignment", "vehicle": "vehicle_id"}
+VIOLATION_SCOPE_FIELDS = {"fleet": None, "driver": "driver_id"}
+
+COUNTERS = (
+    "trips", "completed_trips", "cancelled_trips", "missed_trips", "timed_trips", "distance",
+    # Completed trips only
+    "planned_distance", "planned_duration", "timed_completed_trips", "actual_duration", "on_time_trips",
+    "delay_minutes",
+)
+TRIP_COUNTS = (
+    "trips", "completed_trips", "cancelled_trips", "missed_trips", "timed_trips", "timed_completed_trips",
+    "on_time_trips",
+)
+
+_completed = {"$eq": ["$status", "completed"]}
+_started = {"$gt": ["$actual_start_time", None]}
+_ended = {"$gt": ["$actual_end_time", None]}
+
+
+def _minutes(later: str, earlier: str) -> Dict[str, Any]:
+    return {"$divide": [{"$subtract": [later, earlier]}, 60000]}
+
+
+# How each counter is summed in an aggregation over trip_history
+COUNTER_EXPRESSIONS = {
+    "trips": 1,
+    "completed_trips": {"$cond": [_completed, 1, 0]},
+    "cancelled_trips": {"$cond": [{"$eq": ["$status", "cancelled"]}, 1, 0]},
+    "missed_trips": {"$cond": [{"$eq": ["$status", "missed"]}, 1, 0]},
+    "timed_trips": {"$cond": [{"$and": [_started, _ended]}, 1, 0]},
+    "distance": {"$ifNull": ["$estimated_distance", 0]},
+    "planned_distance": {"$cond": [_completed, {"$ifNull": ["$estimated_distance", 0]}, 0]},
+    "planned_duration": {"$cond": [_completed, {"$ifNull": ["$estimated_duration", 0]}, 0]},
+    # The trips actual_duration is summed over
+    "timed_completed_trips": {"$cond": [{"$and": [_completed, _started, _ended]}, 1, 0]},
+    "actual_duration": {"$cond": [
+        {"$and": [_completed, _started, _ended]}, _minutes("$actual_end_time", "$actual_start_time"), 0
+    ]},
+    "on_time_trips": {"$cond": [
+        {"$and": [_completed, _started, {"$lte": ["$actual_start_time", "$scheduled_start_time"]}]}, 1, 0
+    ]},
+    "delay_minutes": {"$cond": [
+        {"$and": [_completed, _started, {"$gt": ["$actual_start_time", "$scheduled_start_time"]}]},
+        _minutes("$actual_start_time", "$scheduled_start_time"), 0
+    ]},
+}
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Naive UTC, the way trip dates are stored"""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _day_floor(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _month_floor(value: datetime) -> datetime:
+    return _day_floor(value).replace(day=1)
+
+
+def _next_month(value: datetime) -> datetime:
+    return (value.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def trip_counters(trip: Dict[str, Any]) -> Dict[str, float]:
+    """What one trip adds to its buckets; the same as ``COUNTER_EXPRESSIONS``"""
+    status = getattr(trip.get("status"), "value", trip.get("status"))
+    start, end = _utc(trip.get("actual_start_time")), _utc(trip.get("actual_end_time"))
+    scheduled = _utc(trip.get("scheduled_start_time"))
+    completed = status == "completed"
+    counters = {
+        "trips": 1,
+        "completed_trips": int(completed),
+        "cancelled_trips": int(status == "cancelled"),
+        "missed_trips": int(status == "missed"),
+        "timed_trips": int(start is not None and end is not None),
+        "distance": trip.get("estimated_distance") or 0,
+    }
+    if completed:
+        counters["planned_distance"] = trip.get("estimated_distance") or 0
+        counters["planned_duration"] = trip.get("estimated_duration") or 0
+        if start is not None and end is not None:
+            counters["timed_completed_trips"] = 1
+            counters["actual_duration"] = (end - start).total_seconds() / 60
+        if start is not None and scheduled is not None:
+            counters["on_time_trips"] = int(start <= scheduled)
+            counters["delay_minutes"] = max(0.0, (start - scheduled).total_seconds() / 60)
+    return {name: value for name, value in counters.items() if value}
+
+
+def covering_ranges(
+    start: Optional[datetime],
+    end: Optional[datetime],
+    now: datetime
+) -> Tuple[List[Tuple[str, Optional[datetime], datetime]], List[Dict[str, datetime]]]:
+    """
+    Split ``[start, end]`` into bucket ranges and raw ranges
+
+    Returns ``(granularity, first period_start, end)`` ranges of buckets,
+    with ``None`` for no lower bound, and ``created_at`` conditions for the
+    partial days that have to be read from the raw collections. Today's
+    buckets are complete up to now, so a range that ends now or later
+    needs no raw tail.
+    """
+    start, end, now = _utc(start), _utc(end), _utc(now)
+    live = end is None or end >= now
+    hi = _day_floor(now) + DAY if live else _day_floor(end)
+    lo = None if start is None else _day_floor(start)
+    if lo is not None and lo < start:
+        lo += DAY
+
+    if lo is not None and lo >= hi:
+        # Within a day or two that no whole bucket covers
+        return [], [{"$gte": start, "$lte": now if live else end}]
+
+    raw = []
+    if lo is not None and lo > start:
+        raw.append({"$gte": start, "$lt": lo})
+    if not live and end > hi:
+        raw.append({"$gte": hi, "$lte": end})
+
+    month_lo = None if lo is None else (lo if lo.day == 1 else _next_month(lo))
+    month_hi = _month_floor(hi)
+    if month_lo is not None and month_lo >= month_hi:
+        return [("day", lo, hi)], raw
+    buckets = [("month", month_lo, month_hi)]
+    if lo is not None and lo < month_lo:
+        buckets.append(("day", lo, month_lo))
+    if month_hi < hi:
+        buckets.append(("day", month_hi, hi))
+    return buckets, raw
+
+
+class TripRollupService:
+    """Pre-aggregated trip and violation figures by day and month"""
+
+    def __init__(self, db=db_manager, utcnow: Callable[[], datetime] = datetime.utcnow):
+        self.db = db
+        self.utcnow = utcnow
+        self.stats = {"trips": 0, "violations": 0, "writes": 0, "errors": 0, "queries": 0, "raw_queries": 0,
+                      "rebuilds": 0}
+        self._trip_listeners: List[Callable[[], None]] = []
+
+    def add_trip_listener(self, callback: Callable[[], None]):
+        """Call ``callback`` whenever trip counts change, e.g. to drop results cached from them"""
+        self._trip_listeners.append(callback)
+
+    def _notify_trip_listeners(self):
+        for callback in self._trip_listeners:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"[TripRollupService] Trip listener failed: {e}")
+
+    # -------------------- Incremental updates --------------------
+    @staticmethod
+    def _bucket_keys(created_at: datetime, keys: Dict[str, Any]) -> Iterable[Tuple[str, str, datetime, str, str]]:
+        created_at = _utc(created_at)
+        periods = (("day", created_at.strftime("%Y-%m-%d"), _day_floor(created_at)),
+                   ("month", created_at.strftime("%Y-%m"), _month_floor(created_at)))
+        for scope, key in keys.items():
+            if key is None:
+                continue
+            for granularity, period, period_start in periods:
+                yield f"{granularity}:{period}:{scope}:{key}", granularity, period_start, scope, str(key)
+
+    async def _apply(self, increments: Dict[Tuple[str, str, datetime, str, str], Dict[str, float]]):
+        now = self.utcnow()
+        operations = [
+            UpdateOne(
+                {"_id": bucket_id},
+                {
+                    "$inc": counters,
+                    "$set": {"updated_at": now},
+                    "$setOnInsert": {"granularity": granularity, "period_start": period_start,
+                                     "scope": scope, "key": key}
+                },
+                upsert=True
+            )
+            for (bucket_id, granularity, period_start, scope, key), counters in increments.items()
+        ]
+        if operations:
+            await self.db.trip_rollups.bulk_write(operations, ordered=False)
+            self.stats["writes"] += 1
+
+    async def record_trips(self, trips: Sequence[Dict[str, Any]]):
+        """
+        Count trips that have just moved to history
+
+        Failures are logged rather than raised; ``rebuild`` recounts from
+        ``trip_history``.
+        """
+        increments = defaultdict(lambda: defaultdict(int))
+        for trip in trips:
+            if trip.get("created_at") is None:
+                continue
+            keys = {scope: FLEET_KEY if field is None else trip.get(field) for scope, field in SCOPE_FIELDS.items()}
+            counters = trip_counters(trip)
+            for bucket in self._bucket_keys(trip["created_at"], keys):
+                for name, value in counters.items():
+                    increments[bucket][name] += value
+        try:
+            await self._apply(increments)
+            self.stats["trips"] += len(trips)
+            self._notify_trip_listeners()
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"[TripRollupService] Failed to count {len(trips)} trips: {e}")
+
+    async def record_trip(self, trip: Dict[str, Any]):
+        await self.record_trips([trip])
+
+    async def record_violation(
+        self,
+        driver_id: str,
+        violation_type: str,
+        count: int = 1,
+        created_at: Optional[datetime] = None
+    ):
+        """Count new violations against a driver and the fleet; failures are logged like ``record_trips``"""
+        await self.record_violations({driver_id: {violation_type: count}}, created_at)
+
+    async def record_violations(self, counts: Dict[str, Dict[str, int]], created_at: Optional[datetime] = None):
+        """Count new violations for many drivers, given by driver and type, in one write"""
+        increments = defaultdict(lambda: defaultdict(int))
+        total = 0
+        for driver_id, by_type in counts.items():
+            if not driver_id:
+                continue
+            keys = {"fleet": FLEET_KEY, "driver": driver_id}
+            for violation_type, count in by_type.items():
+                if count <= 0:
+                    continue
+                total += count
+                for bucket in self._bucket_keys(created_at or self.utcnow(), keys):
+                    increments[bucket][f"violations.{violation_type}"] += count
+        if not increments:
+            return
+        try:
+            await self._apply(increments)
+            self.stats["violations"] += total
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"[TripRollupService] Failed to count {total} violations for {len(counts)} drivers: {e}")
+
+    # -------------------- Queries --------------------
+    async def summarize(
+        self,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        scopes: Sequence[str] = SCOPES,
+        keys: Optional[List[str]] = None,
+        violations: bool = False
+    ) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Counters for trips created between ``start`` and ``end``, by scope and key
+
+        ``None`` leaves that end of the range open. ``keys`` limits a single
+        scope to those drivers or vehicles. With ``violations`` each entry
+        also has a ``violations`` count per type.
+        """
+        from services.violation_analytics_service import VIOLATION_COLLECTIONS
+
+        if keys is not None and len(scopes) != 1:
+            raise ValueError("keys can only be given for a single scope")
+        buckets, raw = covering_ranges(start, end, self.utcnow())
+        totals = {scope: defaultdict(lambda: defaultdict(int)) for scope in scopes}
+
+        if buckets:
+            match = {"scope": {"$in": list(scopes)}, "$or": []}
+            for granularity, lo, hi in buckets:
+                period = {"$lt": hi} if lo is None else {"$gte": lo, "$lt": hi}
+                match["$or"].append({"granularity": granularity, "period_start": period})
+            if keys is not None:
+                match["key"] = {"$in": keys}
+            fields = {name: {"$sum": f"${name}"} for name in COUNTERS}
+            if violations:
+                fields.update({f"violations_{label}": {"$sum": f"$violations.{label}"} for label in VIOLATION_COLLECTIONS})
+            pipeline = [{"$match": match}, {"$group": {"_id": {"scope": "$scope", "key": "$key"}, **fields}}]
+            self.stats["queries"] += 1
+            async for row in self.db.trip_rollups.aggregate(pipeline):
+                self._add(totals[row["_id"]["scope"]][row["_id"]["key"]], row)
+
+        if raw:
+            self.stats["raw_queries"] += 1
+            for scope, rows in (await self._aggregate_raw_trips(raw, scopes, keys)).items():
+                for row in rows:
+                    if row["_id"] is not None:
+                        self._add(totals[scope][str(row["_id"])], row)
+            if violations:
+                for row in await self._aggregate_raw_violations(raw, scopes, keys):
+                    driver_id = row["_id"]["driver_id"]
+                    for scope in scopes:
+                        key = FLEET_KEY if scope == "fleet" else driver_id
+                        if scope in VIOLATION_SCOPE_FIELDS and key is not None:
+                            totals[scope][str(key)][f"violations_{row['_id']['type']}"] += row["count"]
+
+        return {scope: {key: self._counters(row, violations) for key, row in entries.items()}
+                for scope, entries in totals.items()}
+
+    @staticmethod
+    def _add(total: Dict[str, float], row: Dict[str, Any]):
+        for name, value in row.items():
+            if name != "_id" and value:
+                total[name] += value
+
+    @staticmethod
+    def _counters(total: Dict[str, float], violations: bool) -> Dict[str, Any]:
+        from services.violation_analytics_service import VIOLATION_COLLECTIONS
+
+        counters = {name: int(total[name]) if name in TRIP_COUNTS else total.get(name, 0) for name in COUNTERS}
+        if violations:
+            counters["violations"] = {label: int(total.get(f"violations_{label}", 0)) for label in VIOLATION_COLLECTIONS}
+        return counters
+
+    async def _aggregate_raw_trips(self, raw, scopes, keys) -> Dict[str, List[Dict[str, Any]]]:
+        match = {"$or": [{"created_at": condition} for condition in raw]}
+        if keys is not None and SCOPE_FIELDS[scopes[0]]:
+            match[SCOPE_FIELDS[scopes[0]]] = {"$in": keys}
+        facet = {
+            scope: [{"$group": {
+                "_id": FLEET_KEY if SCOPE_FIELDS[scope] is None else f"${SCOPE_FIELDS[scope]}",
+                **{name: {"$sum": expression} for name, expression in COUNTER_EXPRESSIONS.items()}
+            }}]
+            for scope in scopes
+        }
+        result = await self.db.trip_history.aggregate([{"$match": match}, {"$facet": facet}]).to_list(1)
+        return result[0] if result else {}
+
+    async def _aggregate_raw_violations(self, raw, scopes, keys) -> List[Dict[str, Any]]:
+        from services.violation_analytics_service import VIOLATION_COLLECTIONS, _violation_date, union_pipeline
+
+        if not any(scope in VIOLATION_SCOPE_FIELDS for scope in scopes):
+            return []
+        owners = [] if keys is None else [{"$match": {"driver_id": {"$in": keys}}}]
+        pipeline = union_pipeline(
+            lambda label: owners + [
+                {"$project": {"_id": 0, "type": {"$literal": label}, "driver_id": 1,
+                              "date": _violation_date(label)}},
+                {"$match": {"$or": [{"date": condition} for condition in raw]}},
+            ],
+            [{"$group": {"_id": {"type": "$type", "driver_id": "$driver_id"}, "count": {"$sum": 1}}}]
+        )
+        collection = getattr(self.db, VIOLATION_COLLECTIONS[next(iter(VIOLATION_COLLECTIONS))])
+        return await collection.aggregate(pipeline).to_list(None)
+
+    # -------------------- Rebuild --------------------
+    async def rebuild(self, since: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Recount every bucket from the month of ``since`` onwards, or all of them
+
+        Trips and violations are grouped by day, driver and vehicle in one
+        aggregation each and the buckets are replaced in batches of
+        ``REBUILD_BATCH_SIZE``. Buckets left over from trips that are no
+        longer in history are removed. Counts recorded while a rebuild is
+        running can be lost; the next rebuild corrects them.
+        """
+        from services.violation_analytics_service import VIOLATION_COLLECTIONS, _violation_date, union_pipeline
+
+        started = self.utcnow()
+        since = None if since is None else _month_floor(_utc(since))
+        created = {"created_at": {"$gte": since} if since is not None else {"$type": "date"}}
+        day = {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}}
+        buckets = defaultdict(lambda: defaultdict(int))
+
+        pipeline = [
+            {"$match": created},
+            {"$group": {
+                "_id": {"day": day, "driver": "$driver_assignment", "vehicle": "$vehicle_id"},
+                **{name: {"$sum": expression} for name, expression in COUNTER_EXPRESSIONS.items()}
+            }},
+        ]
+        trip_groups = 0
+        async for row in self.db.trip_history.aggregate(pipeline, allowDiskUse=True):
+            trip_groups += 1
+            keys = {"fleet": FLEET_KEY, "driver": row["_id"]["driver"], "vehicle": row["_id"]["vehicle"]}
+            created_at = datetime.strptime(row["_id"]["day"], "%Y-%m-%d")
+            for bucket in self._bucket_keys(created_at, keys):
+                self._add(buckets[bucket], row)
+
+        # Violations are dated by ``created_at`` or, for older documents, ``time``
+        dated = {"date": created["created_at"]}
+        violations = union_pipeline(
+            lambda label: [
+                {"$project": {"_id": 0, "type": {"$literal": label}, "driver_id": 1, "date": _violation_date(label)}},
+                {"$match": dated},
+            ],
+            [{"$group": {
+                "_id": {"type": "$type", "driver_id": "$driver_id",
+                        "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$date"}}},
+                "count": {"$sum": 1}
+            }}]
+        )
+        collection = getattr(self.db, VIOLATION_COLLECTIONS[next(iter(VIOLATION_COLLECTIONS))])
+        async for row in collection.aggregate(violations, allowDiskUse=True):
+            keys = {"fleet": FLEET_KEY, "driver": row["_id"]["driver_id"]}
+            created_at = datetime.strptime(row["_id"]["day"], "%Y-%m-%d")
+            for bucket in self._bucket_keys(created_at, keys):
+                buckets[bucket][f"violations.{row['_id']['type']}"] += row["count"]
+
+        operations = []
+        for (bucket_id, granularity, period_start, scope, key), counters in buckets.items():
+            doc = {"_id": bucket_id, "granularity": granularity, "period_start": period_start,
+                   "scope": scope, "key": key, "updated_at": started, "violations": {}}
+            for name, value in counters.items():
+                if name.startswith("violations."):
+                    doc["violations"][name.split(".", 1)[1]] = value
+                elif value:
+                    doc[name] = value
+            operations.append(ReplaceOne({"_id": bucket_id}, doc, upsert=True))
+        for i in range(0, len(operations), REBUILD_BATCH_SIZE):
+            await self.db.trip_rollups.bulk_write(operations[i:i + REBUILD_BATCH_SIZE], ordered=False)
+
+        # Buckets this rebuild did not write and nothing has counted into since it started
+        stale = {"updated_at": {"$lt": started}}
+        if since is not None:
+            stale["period_start"] = {"$gte": since}
+        removed = await self.db.trip_rollups.delete_many(stale)
+
+        self.stats["rebuilds"] += 1
+        self._notify_trip_listeners()
+        result = {"since": since, "trip_groups": trip_groups, "buckets": len(operations),
+                  "removed": removed.deleted_count}
+        logger.info(f"[TripRollupService] Rebuilt rollups: {result}")
+        return result
+
+    async def backfill_if_empty(self) -> Optional[Dict[str, Any]]:
+        """Rebuild every bucket if there are none yet but there is trip history; failures are logged"""
+        try:
+            if await self.db.trip_rollups.estimated_document_count():
+                return None
+            if not await self.db.trip_history.estimated_document_count():
+                return None
+            return await self.rebuild()
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"[TripRollupService] Failed to backfill rollups: {e}")
+            return None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return dict(self.stats)
+
+
+# Global instance
+trip_rollup_service = TripRollupService()
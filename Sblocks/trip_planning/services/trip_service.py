@@ -2,7 +2,8 @@
 Trip service for managing trip CRUD operations
 """
 import logging
-from typing import List, Optional, Dict, Any
+import os
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
 from bson import ObjectId
 
@@ -11,10 +12,18 @@ from schemas.entities import Trip, TripStatus, TripConstraint, VehicleLocation,
 from schemas.requests import CreateTripRequest, UpdateTripRequest, TripFilterRequest, ScheduledTripRequest, CreateSmartTripRequest
 from events.publisher import event_publisher
 from services.routing_service import routing_service
-from services.driver_history_service import DriverHistoryService
+from utils.geo import haversine_km
+from utils.route_geometry import RouteGeometry, RouteGeometryCache
+from services.driver_history_service import driver_history_service
 
 logger = logging.getLogger(__name__)
 
+ROUTE_RECOMMENDATION_TTL_MINUTES = int(os.getenv("ROUTE_RECOMMENDATION_TTL_MINUTES", "120"))
+ROUTE_GEOMETRY_FIELD = "raw_route_response.results.geometry"
+MISSED_TRIP_GRACE_MINUTES = int(os.getenv("MISSED_TRIP_GRACE_MINUTES", "30"))
+MISSED_TRIP_CLAIM_TIMEOUT_MINUTES = 5  # A trip marked missed but still in trips after this is moved again
+DUPLICATE_KEY_ERROR = 11000
+
 
 class TripService:
     """Service for managing trips"""
@@ -22,6 +31,7 @@ class TripService:
     def __init__(self):
         self.db = db_manager
         self.db_gps = db_manager_gps
+        self.route_geometries = RouteGeometryCache()
 
     async def add_waypoint_to_trip(self, trip_id: str, waypoint: Waypoint) -> bool:
         """Function that adds a waypoint to an existing trip"""
@@ -343,8 +353,8 @@ class TripService:
                 "status": "pending",  # pending, accepted, rejected, expired
             }
             
-            recommendation_doc["created_at"] = datetime.now()
-            recommendation_doc["expires_at"] = recommendation_doc["created_at"] + timedelta(minutes=120) 
+            recommendation_doc["created_at"] = datetime.utcnow()
+            recommendation_doc["expires_at"] = recommendation_doc["created_at"] + timedelta(minutes=ROUTE_RECOMMENDATION_TTL_MINUTES)
             
             # Store in route_recommendations collection
             await self.db.route_recommendations.update_one(
@@ -383,6 +393,14 @@ class TripService:
             logger.error(f"Error getting route recommendations: {e}")
             return []
 
+    async def get_pending_recommendation_trip_ids(self) -> List[str]:
+        """IDs of trips with a pending, unexpired route recommendation"""
+        cursor = self.db.route_recommendations.find(
+            {"status": "pending", "expires_at": {"$gt": datetime.utcnow()}},
+            {"trip_id": 1}
+        )
+        return [doc["trip_id"] async for doc in cursor]
+
     async def accept_route_recommendation(self, trip_id: str, recommendation_id: str) -> bool:
         """Accept a route recommendation and update the trip's route"""
         try:
@@ -561,6 +579,12 @@ class TripService:
                 logger.error(f"[TripService.create_trip] Database insert failed: {e}")
                 raise
 
+            # Compile the route now so live tracking starts from the cache
+            try:
+                self._cache_route_geometry(str(result.inserted_id), trip_data.get("raw_route_response"))
+            except Exception as e:
+                logger.warning(f"[TripService.create_trip] Could not compile route geometry: {e}")
+
             # Retrieve created trip
             logger.info(f"[TripService.create_trip] Fetching created trip with ID={result.inserted_id}")
             trip = await self.get_trip_by_id(str(result.inserted_id))
@@ -839,6 +863,7 @@ class TripService:
             
             if result.deleted_count == 0:
                 return False
+            self.route_geometries.invalidate(trip_id)
             
             # Publish event
             await event_publisher.publish_trip_deleted(trip)
@@ -1137,7 +1162,6 @@ class TripService:
             # Update driver history
             if trip.driver_assignment:
                 try:
-                    driver_history_service = DriverHistoryService(db_manager, db_manager_management)
                     await driver_history_service.update_driver_history_on_trip_completion(
                         driver_id=trip.driver_assignment,
                         trip_id=trip_id,
@@ -1147,6 +1171,10 @@ class TripService:
                 except Exception as e:
                     logger.error(f"Failed to update driver history for cancelled trip {trip_id}: {e}")
             
+            # Count the trip in the analytics rollups
+            from services.trip_rollup_service import trip_rollup_service
+            await trip_rollup_service.record_trip(trip_doc)
+            
             # Create trip object for event publishing
             trip_doc["_id"] = str(trip_doc["_id"])
             cancelled_trip = Trip(**trip_doc)
@@ -1228,7 +1256,6 @@ class TripService:
             # Update driver history
             if trip.driver_assignment:
                 try:
-                    driver_history_service = DriverHistoryService(db_manager, db_manager_management)
                     await driver_history_service.update_driver_history_on_trip_completion(
                         driver_id=trip.driver_assignment,
                         trip_id=trip_id,
@@ -1238,6 +1265,10 @@ class TripService:
                 except Exception as e:
                     logger.error(f"Failed to update driver history for completed trip {trip_id}: {e}")
             
+            # Count the trip in the analytics rollups
+            from services.trip_rollup_service import trip_rollup_service
+            await trip_rollup_service.record_trip(trip_doc)
+            
             # Create trip object for event publishing
             trip_doc["_id"] = str(trip_doc["_id"])
             completed_trip = Trip(**trip_doc)
@@ -1683,80 +1714,159 @@ class TripService:
             logger.error(f"[TripService._fetch_detailed_route_info] Failed to fetch detailed route information: {e}")
             return None
 
+    @staticmethod
+    def _missed_trip_query(now: datetime) -> Dict[str, Any]:
+        """Scheduled trips that were never started and are past their missed-trip deadline"""
+        return {
+            "status": TripStatus.SCHEDULED.value,
+            "actual_start_time": {"$in": [None, ""]},  # Not started yet
+            "$or": [
+                {
+                    # Grace period past scheduled start time
+                    "scheduled_start_time": {"$lte": now - timedelta(minutes=MISSED_TRIP_GRACE_MINUTES)}
+                },
+                {
+                    # Past scheduled end time (if it exists)
+                    "scheduled_end_time": {
+                        "$ne": None,
+                        "$lte": now
+                    }
+                }
+            ]
+        }
+    
+    @staticmethod
+    def missed_trip_deadline(trip_doc: Dict[str, Any]) -> Optional[datetime]:
+        """When an unstarted scheduled trip counts as missed, or None if it never will"""
+        if trip_doc.get("status") != TripStatus.SCHEDULED.value or trip_doc.get("actual_start_time"):
+            return None
+        deadlines = [trip_doc["scheduled_start_time"] + timedelta(minutes=MISSED_TRIP_GRACE_MINUTES)]
+        if trip_doc.get("scheduled_end_time"):
+            deadlines.append(trip_doc["scheduled_end_time"])
+        return min(deadlines)
+    
+    async def load_missed_trip_deadlines(self, trip_ids: Optional[List[str]] = None) -> List[Tuple[str, datetime]]:
+        """Missed-trip deadline of every scheduled trip, or of the given ones that are still scheduled"""
+        query = {"status": TripStatus.SCHEDULED.value, "actual_start_time": {"$in": [None, ""]}}
+        if trip_ids is not None:
+            query["_id"] = {"$in": [ObjectId(trip_id) for trip_id in trip_ids if ObjectId.is_valid(trip_id)]}
+        projection = {"status": 1, "actual_start_time": 1, "scheduled_start_time": 1, "scheduled_end_time": 1}
+        
+        deadlines = []
+        async for trip_doc in self.db.trips.find(query, projection):
+            deadline = self.missed_trip_deadline(trip_doc)
+            if deadline is not None:
+                deadlines.append((str(trip_doc["_id"]), deadline))
+        return deadlines
+    
+    async def mark_trips_missed(self, trip_ids: List[str]) -> List[str]:
+        """Mark the given trips as missed if they are past their deadline; returns the ids moved to history"""
+        now = datetime.utcnow()
+        query = {"_id": {"$in": [ObjectId(trip_id) for trip_id in trip_ids]}, **self._missed_trip_query(now)}
+        return await self._claim_and_move_missed_trips(query, now)
+    
     async def mark_missed_trips(self) -> int:
         """Mark trips as missed and move them to history"""
         logger.info("[TripService.mark_missed_trips] Checking for missed trips")
         try:
             now = datetime.utcnow()
-            missed_count = 0
             
             # Find trips that should be marked as missed
-            # 1. Scheduled trips that are 30+ minutes past their scheduled start time
+            # 1. Scheduled trips past the grace period after their scheduled start time
             # 2. Scheduled trips that are past their scheduled end time
-            query = {
-                "status": TripStatus.SCHEDULED.value,
-                "actual_start_time": {"$in": [None, ""]},  # Not started yet
-                "$or": [
-                    {
-                        # 30 minutes past scheduled start time
-                        "scheduled_start_time": {"$lte": now - timedelta(minutes=30)}
-                    },
-                    {
-                        # Past scheduled end time (if it exists)
-                        "scheduled_end_time": {
-                            "$ne": None,
-                            "$lte": now
-                        }
-                    }
-                ]
-            }
+            moved = await self._claim_and_move_missed_trips(self._missed_trip_query(now), now)
             
-            logger.debug(f"[TripService.mark_missed_trips] Query: {query}")
-            
-            # Find all trips that meet the criteria
-            missed_trips_cursor = self.db.trips.find(query)
-            
-            async for trip_doc in missed_trips_cursor:
-                try:
-                    trip_id = str(trip_doc["_id"])
-                    logger.info(f"[TripService.mark_missed_trips] Marking trip {trip_id} as missed")
-                    
-                    # Add missed trip information
-                    missed_time = now
-                    trip_doc.update({
-                        "status": TripStatus.MISSED.value,
-                        "actual_end_time": missed_time,
-                        "completion_reason": "missed",
-                        "moved_to_history_at": missed_time,
-                        "updated_at": missed_time
-                    })
-                    
-                    # Insert into trip_history collection
-                    await self.db.trip_history.insert_one(trip_doc)
-                    logger.info(f"Trip {trip_id} moved to trip_history with status 'missed'")
-                    
-                    # Remove from active trips collection
-                    await self.db.trips.delete_one({"_id": trip_doc["_id"]})
-                    
-                    # Create trip object for event publishing
-                    trip_doc["_id"] = str(trip_doc["_id"])
-                    missed_trip = Trip(**trip_doc)
-                    
-                    # Publish event
-                    await event_publisher.publish_trip_updated(missed_trip, None)
-                    
-                    missed_count += 1
-                    
-                except Exception as e:
-                    logger.error(f"[TripService.mark_missed_trips] Failed to mark trip {trip_doc.get('_id')} as missed: {e}")
-                    continue
+            # Trips claimed by a move that did not finish
+            stale_claims = {
+                "status": TripStatus.MISSED.value,
+                "moved_to_history_at": {"$lte": now - timedelta(minutes=MISSED_TRIP_CLAIM_TIMEOUT_MINUTES)}
+            }
+            moved += await self._claim_and_move_missed_trips(stale_claims, now, mark=False)
             
-            logger.info(f"[TripService.mark_missed_trips] Marked {missed_count} trips as missed")
-            return missed_count
+            logger.info(f"[TripService.mark_missed_trips] Marked {len(moved)} trips as missed")
+            return len(moved)
             
         except Exception as e:
             logger.error(f"[TripService.mark_missed_trips] Error: {e}")
             raise
+    
+    async def _claim_and_move_missed_trips(self, query: Dict[str, Any], now: datetime, mark: bool = True) -> List[str]:
+        """
+        Mark every trip matching ``query`` as missed in one update_many and move them to history
+        
+        The update tags the trips with a claim id, so a trip that another
+        instance marks at the same moment is moved only once; the history
+        insert is keyed on the trip id for the same reason.
+        """
+        claim = str(ObjectId())
+        update = {"missed_claim": claim}
+        if mark:
+            update.update({
+                "status": TripStatus.MISSED.value,
+                "actual_end_time": now,
+                "completion_reason": "missed",
+                "moved_to_history_at": now,
+                "updated_at": now
+            })
+        result = await self.db.trips.update_many(query, {"$set": update})
+        if not result.modified_count:
+            return []
+        
+        trip_docs = []
+        async for trip_doc in self.db.trips.find({"missed_claim": claim}):
+            trip_doc.pop("missed_claim", None)
+            trip_docs.append(trip_doc)
+        
+        # Insert into trip_history collection
+        failed, already_moved = set(), set()
+        try:
+            await self.db.trip_history.insert_many(trip_docs, ordered=False)
+        except Exception as e:
+            details = getattr(e, "details", None)  # BulkWriteError: the other documents were inserted
+            if details is None:
+                raise
+            for error in details.get("writeErrors", []):
+                trip_id = trip_docs[error["index"]]["_id"]
+                if error.get("code") == DUPLICATE_KEY_ERROR:
+                    already_moved.add(trip_id)
+                else:
+                    failed.add(trip_id)
+                    logger.error(f"[TripService.mark_missed_trips] Failed to mark trip {trip_id} as missed: {error.get('errmsg')}")
+        
+        # Remove from active trips collection; failed trips stay claimed and are retried
+        moved_docs = [trip_doc for trip_doc in trip_docs if trip_doc["_id"] not in failed]
+        if moved_docs:
+            await self.db.trips.delete_many({"_id": {"$in": [trip_doc["_id"] for trip_doc in moved_docs]}})
+        
+        # Count the newly moved trips in the analytics rollups
+        from services.trip_rollup_service import trip_rollup_service
+        await trip_rollup_service.record_trips([trip_doc for trip_doc in moved_docs if trip_doc["_id"] not in already_moved])
+        
+        moved = []
+        for trip_doc in moved_docs:
+            if trip_doc["_id"] in already_moved:
+                continue
+            trip_id = str(trip_doc["_id"])
+            logger.info(f"Trip {trip_id} moved to trip_history with status 'missed'")
+            
+            if trip_doc.get("driver_assignment"):
+                try:
+                    await driver_history_service.update_driver_history_on_trip_completion(
+                        driver_id=trip_doc["driver_assignment"],
+                        trip_id=trip_id,
+                        trip_status=TripStatus.MISSED.value
+                    )
+                except Exception as e:
+                    logger.error(f"Failed to update driver history for missed trip {trip_id}: {e}")
+            
+            try:
+                # Create trip object for event publishing
+                trip_doc["_id"] = trip_id
+                await event_publisher.publish_trip_updated(Trip(**trip_doc), None)
+            except Exception as e:
+                logger.error(f"[TripService.mark_missed_trips] Failed to publish missed trip {trip_id}: {e}")
+            moved.append(trip_id)
+        return moved
 
     async def get_live_tracking_data(self, trip_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -1771,8 +1881,9 @@ class TripService:
         try:
             logger.info(f"[TripService.get_live_tracking_data] Getting live data for trip {trip_id}")
             
-            # Get trip data
-            trip_doc = await self.db.trips.find_one({"_id": ObjectId(trip_id)})
+            # Get trip data, leaving out the route geometry when it is already compiled
+            projection = {ROUTE_GEOMETRY_FIELD: 0} if trip_id in self.route_geometries else None
+            trip_doc = await self.db.trips.find_one({"_id": ObjectId(trip_id)}, projection)
             if not trip_doc:
                 logger.warning(f"[TripService.get_live_tracking_data] Trip {trip_id} not found")
                 return None
@@ -1851,24 +1962,8 @@ class TripService:
             if raw_response and raw_response.get("results"):
                 route = raw_response["results"][0]
                 
-                # Get route polyline from geometry
-                route_geometry = route.get("geometry")
-                if route_geometry and isinstance(route_geometry, list) and len(route_geometry) > 0:
-                    # Geometry structure: geometry[0] is an array of coordinate objects
-                    # Each coordinate object has {"lon": x, "lat": y} format
-                    geometry_coords = route_geometry[0]
-                    if isinstance(geometry_coords, list):
-                        # Extract all coordinate points and convert to [lat, lon] format
-                        route_polyline = []
-                        for coord in geometry_coords:
-                            if isinstance(coord, dict) and "lat" in coord and "lon" in coord:
-                                route_polyline.append([coord["lat"], coord["lon"]])  # [lat, lon]
-                        
-                        logger.info(f"[TripService.get_live_tracking_data] Extracted {len(route_polyline)} coordinates from geometry")
-                    else:
-                        logger.warning(f"[TripService.get_live_tracking_data] Geometry[0] is not an array: {type(geometry_coords)}")
-                else:
-                    logger.warning(f"[TripService.get_live_tracking_data] No valid geometry found")
+                # Route polyline and its distance/spatial index, compiled once per trip
+                geometry, route_polyline = await self._get_route_geometry(trip_id, route)
                 
                 # Get route bounds from route_info if available
                 route_info = trip_doc.get("route_info", {})
@@ -1877,7 +1972,8 @@ class TripService:
                 
                 # Calculate progress based on current position
                 total_distance = route.get("distance", 0)
-                if total_distance > 0 and route_polyline and current_position:
+                completed_distance = None
+                if total_distance > 0 and geometry and current_position:
                     # Extract coordinates safely
                     try:
                         if isinstance(current_position, dict):
@@ -1889,31 +1985,31 @@ class TripService:
                         
                         # Validate coordinates are numbers
                         if lat is not None and lon is not None and isinstance(lat, (int, float)) and isinstance(lon, (int, float)):
-                            # Find closest point on route to current position
-                            closest_index = self._find_closest_point_on_route([lat, lon], route_polyline)
+                            # Project the current position onto the route; a simulated
+                            # vehicle's own distance narrows the search
+                            hint = simulated_data.get("distance_traveled") if is_simulated else None
+                            completed_distance = geometry.distance_at_point(lat, lon, hint_m=hint)
                         else:
                             logger.warning(f"[TripService.get_live_tracking_data] Invalid coordinates: lat={lat}, lon={lon}")
-                            closest_index = None
                     except Exception as e:
                         logger.warning(f"[TripService.get_live_tracking_data] Error extracting position: {e}")
-                        closest_index = None
                     
-                    if closest_index is not None:
+                    if completed_distance is not None:
                         # Calculate completed and remaining distances
-                        completed_distance = self._calculate_distance_along_route(route_polyline, 0, closest_index)
-                        remaining_distance = total_distance - completed_distance
+                        remaining_distance = geometry.remaining_distance(completed_distance)
                         progress_percentage = (completed_distance / total_distance) * 100
                         
                         progress_info.update({
                             "total_distance": total_distance,
-                            "remaining_distance": max(0, remaining_distance),
+                            "remaining_distance": remaining_distance,
                             "completed_distance": completed_distance,
-                            "progress_percentage": min(100, max(0, progress_percentage))
+                            "progress_percentage": min(100, max(0, progress_percentage)),
+                            "estimated_time_remaining": self._estimate_time_remaining(remaining_distance, current_position.get("speed"))
                         })
                         
                         # Get remaining polyline
-                        if closest_index < len(route_polyline) - 1:
-                            remaining_polyline = route_polyline[closest_index:]
+                        if remaining_distance > 0:
+                            remaining_polyline = geometry.remaining_coordinates(completed_distance)
                 
                 # Get current navigation instruction from steps
                 if route.get("legs") and len(route["legs"]) > 0:
@@ -1922,7 +2018,9 @@ class TripService:
                         progress_info["total_steps"] = len(steps)
                         
                         # Find current step based on position
-                        current_step = self._find_current_step(current_position, steps, route_polyline)
+                        current_step = self._find_current_step(
+                            current_position, steps, route_polyline, geometry=geometry, distance_m=completed_distance
+                        )
                         if current_step:
                             step_index = current_step.get("index", 0)
                             step_data = current_step.get("step", {})
@@ -1988,28 +2086,60 @@ class TripService:
             logger.error(f"[TripService.get_live_tracking_data] Error getting live data for trip {trip_id}: {e}")
             raise
 
-    def _find_closest_point_on_route(self, position: List[float], route_coordinates: List[List[float]]) -> Optional[int]:
-        """Find the closest point on the route to a given position"""
-        if not route_coordinates or not position:
-            return None
-        
-        min_distance = float('inf')
-        closest_index = 0
-        
-        for i, coord in enumerate(route_coordinates):
-            distance = self._calculate_distance(position[0], position[1], coord[0], coord[1])
-            if distance < min_distance:
-                min_distance = distance
-                closest_index = i
-        
-        logger.debug(f"[_find_closest_point_on_route] Position {position} closest to route index {closest_index} with distance {min_distance:.3f}km")
-        
-        return closest_index
+    @staticmethod
+    def _route_stamp(route: Dict[str, Any]) -> Tuple[Any, ...]:
+        """Identifies a stored route without reading its geometry"""
+        return (route.get("distance"), route.get("time"), len(route.get("legs") or []))
+
+    def _compile_route_geometry(self, route: Dict[str, Any]) -> Tuple[Optional[RouteGeometry], List[List[float]]]:
+        """``[lat, lon]`` polyline of a stored route and its RouteGeometry"""
+        route_polyline = []
+        route_geometry = route.get("geometry")
+        if route_geometry and isinstance(route_geometry, list) and len(route_geometry) > 0:
+            # Geometry structure: geometry[0] is an array of coordinate objects
+            # Each coordinate object has {"lon": x, "lat": y} format
+            geometry_coords = route_geometry[0]
+            if isinstance(geometry_coords, list):
+                route_polyline = [
+                    [coord["lat"], coord["lon"]] for coord in geometry_coords
+                    if isinstance(coord, dict) and "lat" in coord and "lon" in coord
+                ]
+                logger.info(f"[TripService._compile_route_geometry] Extracted {len(route_polyline)} coordinates from geometry")
+            else:
+                logger.warning(f"[TripService._compile_route_geometry] Geometry[0] is not an array: {type(geometry_coords)}")
+        else:
+            logger.warning(f"[TripService._compile_route_geometry] No valid geometry found")
+
+        if not route_polyline:
+            return None, route_polyline
+        geometry = RouteGeometry(route_polyline, route.get("distance", 0))
+        return geometry, geometry.polyline
+
+    def _cache_route_geometry(self, trip_id: str, raw_route_response: Optional[Dict[str, Any]]):
+        """Compile a freshly stored route so live tracking starts with it cached"""
+        if raw_route_response and raw_route_response.get("results"):
+            route = raw_route_response["results"][0]
+            self.route_geometries.put(trip_id, self._route_stamp(route), self._compile_route_geometry(route))
+
+    async def _get_route_geometry(self, trip_id: str, route: Dict[str, Any]) -> Tuple[Optional[RouteGeometry], List[List[float]]]:
+        """Compiled geometry for a trip's stored route, from the cache when it is current"""
+        stamp = self._route_stamp(route)
+        cached = self.route_geometries.get(trip_id, stamp)
+        if cached is not None:
+            return cached
+
+        if "geometry" not in route:
+            # The trip was read without its geometry but the cached copy is stale
+            doc = await self.db.trips.find_one({"_id": ObjectId(trip_id)}, {ROUTE_GEOMETRY_FIELD: 1})
+            results = ((doc or {}).get("raw_route_response") or {}).get("results") or [{}]
+            route = {**route, "geometry": results[0].get("geometry")}
+
+        compiled = self._compile_route_geometry(route)
+        self.route_geometries.put(trip_id, stamp, compiled)
+        return compiled
 
     def _calculate_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         """Calculate the haversine distance between two points in kilometers"""
-        import math
-        
         # Validate inputs are numbers
         try:
             lat1 = float(lat1)
@@ -2020,38 +2150,22 @@ class TripService:
             logger.warning(f"Invalid coordinates for distance calculation: lat1={lat1}, lon1={lon1}, lat2={lat2}, lon2={lon2}")
             return 0.0
         
-        # Convert latitude and longitude from degrees to radians
-        lat1_rad = math.radians(lat1)
-        lon1_rad = math.radians(lon1)
-        lat2_rad = math.radians(lat2)
-        lon2_rad = math.radians(lon2)
-        
-        # Haversine formula
-        dlat = lat2_rad - lat1_rad
-        dlon = lon2_rad - lon1_rad
-        a = math.sin(dlat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon/2)**2
-        c = 2 * math.asin(math.sqrt(a))
-        
-        # Radius of earth in kilometers
-        earth_radius = 6371.0
-        
-        return earth_radius * c
+        return haversine_km(lat1, lon1, lat2, lon2)
 
-    def _calculate_distance_along_route(self, route_coordinates: List[List[float]], start_index: int, end_index: int) -> float:
-        """Calculate distance along a route between two indices"""
-        if start_index >= end_index or start_index >= len(route_coordinates) or end_index >= len(route_coordinates):
-            return 0.0
-        
-        total_distance = 0.0
-        for i in range(start_index, end_index):
-            if i + 1 < len(route_coordinates):
-                coord1 = route_coordinates[i]
-                coord2 = route_coordinates[i + 1]
-                total_distance += self._calculate_distance(coord1[0], coord1[1], coord2[0], coord2[1])
-        
-        return total_distance
+    def _estimate_time_remaining(self, remaining_distance_m: float, speed_kmh: Optional[float]) -> Optional[float]:
+        """Seconds to cover the remaining distance at the current speed"""
+        if not isinstance(speed_kmh, (int, float)) or speed_kmh <= 0:
+            return None
+        return remaining_distance_m / (speed_kmh / 3.6)
 
-    def _find_current_step(self, position: Dict[str, Any], steps: List[Dict], route_coordinates: List[List[float]]) -> Optional[Dict]:
+    def _find_current_step(
+        self,
+        position: Dict[str, Any],
+        steps: List[Dict],
+        route_coordinates: List[List[float]],
+        geometry: Optional[RouteGeometry] = None,
+        distance_m: Optional[float] = None
+    ) -> Optional[Dict]:
         """Find the current step based on position and route geometry"""
         if not steps or not position or not route_coordinates:
             return None
@@ -2075,28 +2189,24 @@ class TripService:
             logger.warning(f"Error extracting position coordinates: {e}, position: {position}")
             return None
         
-        closest_coord_index = self._find_closest_point_on_route(current_pos, route_coordinates)
-        
-        if closest_coord_index is None:
-            return None
+        if geometry is None:
+            geometry = RouteGeometry(route_coordinates)
+        if distance_m is None:
+            distance_m = geometry.distance_at_point(current_pos[0], current_pos[1])
+        segment_index = geometry.segment_index_at_distance(distance_m)
         
-        logger.debug(f"[_find_current_step] Current position: {current_pos}, closest coordinate index: {closest_coord_index}")
+        logger.debug(f"[_find_current_step] Current position: {current_pos}, segment index: {segment_index}")
         
-        # Find which step contains this coordinate index
-        coord_index = 0
+        # Find which step contains this segment
         for i, step in enumerate(steps):
             from_index = step.get("from_index", 0)
             to_index = step.get("to_index", from_index + 1)
             
-            logger.debug(f"[_find_current_step] Step {i}: from_index={from_index}, to_index={to_index}, checking if {closest_coord_index} is in range")
-            
-            if from_index <= closest_coord_index <= to_index:
+            if from_index <= segment_index < to_index:
                 logger.debug(f"[_find_current_step] Found current step: {i}")
-                # Calculate distance to end of this step
+                # Distance to the end of this step, in kilometres like the driver app expects
                 if to_index < len(route_coordinates):
-                    distance_to_instruction = self._calculate_distance_along_route(
-                        route_coordinates, closest_coord_index, to_index
-                    )
+                    distance_to_instruction = max(0.0, geometry.distance_at_index(to_index) - distance_m) / 1000.0
                 else:
                     distance_to_instruction = 0
                 
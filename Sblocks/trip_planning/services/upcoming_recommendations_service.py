@@ -1,8 +1,7 @@
 import logging
 import os
-import requests
 from typing import Dict, Any, List, Optional, Tuple
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from math import radians, sin, cos, sqrt, atan2
 from bson import ObjectId
 import asyncio
@@ -12,6 +11,9 @@ from schemas.entities import Trip, TripCombinationRecommendation, RouteInfo, Way
 from schemas.requests import CreateTripRequest
 from repositories.database import db_manager
 from services.trip_service import trip_service
+from services.route_cache import route_cache
+from services.provider_client import ProviderError, provider_client
+from utils.trip_candidate_index import TripCandidateIndex
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +24,8 @@ MAX_TIME_BUFFER_HOURS = 8
 MIN_TIME_SAVINGS_MINUTES = 10  
 MAX_ADDITIONAL_DISTANCE_KM = 15.0
 MINIMUM_SCORE_THRESHOLD = 0.15  
+MAX_ROAD_SPEED_KMH = 120.0  # Upper bound on a combined route's average speed
+COMBINATION_SCORING_CONCURRENCY = int(os.getenv("COMBINATION_SCORING_CONCURRENCY", "8"))
 
 ORS_API_KEY = os.getenv("ORS_API_KEY")
 
@@ -209,14 +213,24 @@ class UpcomingRecommendationsService:
             logger.error(f"Error checking time feasibility: {e}")
             return False, 0, 0
     async def _get_route_with_waypoints(self, start_location_lat, start_location_long, end_location_lat, end_location_long, waypoints=[]):
-        try:
-            # Build coordinates array in [lng, lat] format
-            coordinates = (
-                [[start_location_long, start_location_lat]]
-                + waypoints  # waypoints should already be [lng, lat] pairs
-                + [[end_location_long, end_location_lat]]
-            )
+        # Build coordinates array in [lng, lat] format
+        coordinates = (
+            [[start_location_long, start_location_lat]]
+            + waypoints  # waypoints should already be [lng, lat] pairs
+            + [[end_location_long, end_location_lat]]
+        )
+
+        # Pairs of trips are re-checked on every analysis run, so their routes come from the cache
+        return await route_cache.get_or_fetch(
+            "ors_waypoints",
+            [(lat, lng) for lng, lat in coordinates],
+            lambda: self._fetch_route_with_waypoints(coordinates)
+        )
 
+    async def _fetch_route_with_waypoints(self, coordinates):
+        start_location_long, start_location_lat = coordinates[0]
+        end_location_long, end_location_lat = coordinates[-1]
+        try:
             logger.debug(f"Route coordinates: {coordinates}")
 
             url = "https://api.openrouteservice.org/v2/directions/driving-car"
@@ -227,9 +241,7 @@ class UpcomingRecommendationsService:
 
             try:
                 logger.debug(f"Making ORS API request to {url}")
-                resp = requests.post(url, headers=headers, json=params)
-                resp.raise_for_status()
-                data = resp.json()
+                data = await provider_client.post("ors", url, headers=headers, json=params)
                 
                 # Check if response has expected structure (ORS returns 'routes' not 'features')
                 if "routes" not in data or not data["routes"]:
@@ -263,10 +275,10 @@ class UpcomingRecommendationsService:
                 logger.debug(f"ORS response: distance={total_distance}m, duration={total_duration}s, coord_count={len(coords)}")
                 return route_summary, coords
                 
-            except requests.exceptions.HTTPError as e:
+            except ProviderError as e:
                 logger.error(f"ORS API HTTP error: {e}")
-                if hasattr(e, 'response') and e.response:
-                    logger.error(f"Response status: {e.response.status_code}, content: {e.response.text}")
+                if e.status:
+                    logger.error(f"Response status: {e.status}, content: {e.body}")
                 return None
             except Exception as e:
                 logger.error(f"ORS API error: {e}")
@@ -425,182 +437,220 @@ class UpcomingRecommendationsService:
         
         return min(1.0, max(0.0, score))
     
+    def _trip_timestamp(self, value: Any) -> Optional[float]:
+        """Epoch seconds for a scheduled time, treating naive datetimes as UTC"""
+        if value is None:
+            return None
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+
+    def _combination_upper_bounds(self, primary_trip: Trip, secondary_trip: Trip) -> Optional[Dict[str, float]]:
+        """Best distance and time savings any road route through the four stops could give
+
+        The combined route is at least as long as the straight lines between
+        its stops, and cannot average more than MAX_ROAD_SPEED_KMH along them.
+        None when the trips have no estimates to compare against.
+        """
+        if None in (primary_trip.estimated_distance, secondary_trip.estimated_distance,
+                    primary_trip.estimated_duration, secondary_trip.estimated_duration):
+            return None
+        stops = [w.location.coordinates for w in
+                 (primary_trip.origin, primary_trip.destination, secondary_trip.origin, secondary_trip.destination)]
+        min_distance = sum(self._haversine(a[1], a[0], b[1], b[0]) for a, b in zip(stops, stops[1:]))
+        return {
+            "distance_savings_km": primary_trip.estimated_distance + secondary_trip.estimated_distance - min_distance,
+            "time_savings_minutes": (primary_trip.estimated_duration + secondary_trip.estimated_duration
+                                     - min_distance / MAX_ROAD_SPEED_KMH * 60),
+        }
+
+    async def _candidate_pairs(self, trips: List[Trip],
+                               filtered_out: Dict[str, int]) -> List[Tuple[Trip, Trip, float, float]]:
+        """Pairs worth routing, as (primary, secondary, travel_distance_km, time_gap_hours)
+
+        Secondary trips are looked up by where and when they start, so only
+        those leaving within MAX_TRAVEL_DISTANCE_KM of the primary's
+        destination and MAX_TIME_BUFFER_HOURS of its end are considered. Those
+        then go through the same driver and time checks as before, and pairs
+        whose best possible route would still be rejected are dropped
+        without calling the router.
+        """
+        index = TripCandidateIndex(MAX_TRAVEL_DISTANCE_KM)
+        ends = []
+        for trip in trips:
+            try:
+                start = self._trip_timestamp(trip.scheduled_start_time)
+                end = self._trip_timestamp(trip.scheduled_end_time)
+                origin = trip.origin.location.coordinates
+                destination = trip.destination.location.coordinates
+            except Exception as e:
+                logger.warning(f"Skipping trip {trip.id} in combination analysis: {e}")
+                continue
+            if start is not None:
+                index.add(trip, origin[1], origin[0], start)
+            if end is not None:
+                ends.append((trip, end, destination))
+
+        candidates = []
+        max_gap_s = MAX_TIME_BUFFER_HOURS * 3600
+        for primary_trip, end, destination in ends:
+            for secondary_trip, travel_distance in index.near(destination[1], destination[0], end, end + max_gap_s):
+                if secondary_trip is primary_trip:
+                    continue
+                filtered_out['indexed_pairs'] += 1
+
+                if primary_trip.driver_assignment == secondary_trip.driver_assignment:
+                    filtered_out['same_driver'] += 1
+                    continue
+
+                time_gap = (self._trip_timestamp(secondary_trip.scheduled_start_time) - end) / 3600.0
+                is_time_feasible, required_travel_time, time_buffer = await self._check_time_feasibility(
+                    primary_trip, secondary_trip, travel_distance, time_gap
+                )
+                if not is_time_feasible:
+                    filtered_out['time_feasibility'] += 1
+                    logger.debug(f"Time infeasible: {primary_trip.name} -> {secondary_trip.name}: "
+                                 f"available={time_gap*60:.0f}min, required={required_travel_time:.0f}min")
+                    continue
+
+                bounds = self._combination_upper_bounds(primary_trip, secondary_trip)
+                if bounds is not None:
+                    distance_bound = bounds["distance_savings_km"]
+                    time_bound = bounds["time_savings_minutes"]
+                    score_bound = self._calculate_combination_score(
+                        primary_trip, secondary_trip, bounds, travel_distance, time_gap
+                    )
+                    if (distance_bound < -10.0
+                            or (time_bound < MIN_TIME_SAVINGS_MINUTES and distance_bound < -5.0)
+                            or score_bound < MINIMUM_SCORE_THRESHOLD):
+                        filtered_out['detour_bound'] += 1
+                        continue
+
+                candidates.append((primary_trip, secondary_trip, travel_distance, time_gap))
+        return candidates
+
+    async def _evaluate_combination(self, primary_trip: Trip, secondary_trip: Trip, travel_distance: float,
+                                    available_time_gap: float,
+                                    filtered_out: Dict[str, int]) -> Optional[TripCombinationRecommendation]:
+        """Route a candidate pair and build its recommendation if it is worth making"""
+        combined_route = await self._calculate_combined_route_info(primary_trip, secondary_trip)
+        if not combined_route:
+            filtered_out['route_calculation_failed'] += 1
+            logger.debug("Combined route calculation failed completely, skipping")
+            return None
+
+        logger.debug(f"Combined route: {combined_route.distance/1000:.2f}km, {combined_route.duration/60:.1f}min")
+
+        benefits = self._calculate_combination_benefits(primary_trip, secondary_trip, combined_route)
+        time_savings = benefits.get("time_savings_minutes", 0)
+        distance_savings = benefits.get("distance_savings_km", 0)
+
+        logger.debug(f"Flexible benefits: time_savings={time_savings:.1f}min, distance_savings={distance_savings:.2f}km")
+
+        # Allow combinations with minimal time savings if the distance penalty is acceptable
+        if time_savings < MIN_TIME_SAVINGS_MINUTES and distance_savings < -5.0:
+            filtered_out['insufficient_benefits'] += 1
+            logger.debug(f"Time savings {time_savings:.1f}min < {MIN_TIME_SAVINGS_MINUTES}min AND "
+                         f"distance penalty {abs(distance_savings):.2f}km > 5km")
+            return None
+
+        # Only reject extreme distance penalties (>10km additional)
+        if distance_savings < -10.0:
+            filtered_out['extreme_distance_penalty'] += 1
+            logger.debug(f"Extreme distance penalty {abs(distance_savings):.2f}km > 10km, skipping")
+            return None
+
+        score = self._calculate_combination_score(
+            primary_trip, secondary_trip, benefits, travel_distance, available_time_gap
+        )
+        if score < MINIMUM_SCORE_THRESHOLD:
+            filtered_out['low_score'] += 1
+            logger.debug(f"Score {score:.3f} < {MINIMUM_SCORE_THRESHOLD} (flexible threshold)")
+            return None
+
+        logger.debug(f"Viable combination: {primary_trip.name} + {secondary_trip.name} "
+                     f"(score: {score:.3f}, time_savings: {time_savings:.1f}min, distance_impact: {distance_savings:.2f}km)")
+
+        return TripCombinationRecommendation(
+            id=f"combo_{primary_trip.id[:8]}_{secondary_trip.id[:8]}",
+            primary_trip_id=primary_trip.id,
+            secondary_trip_id=secondary_trip.id,
+            primary_trip_name=primary_trip.name,
+            secondary_trip_name=secondary_trip.name,
+            recommended_driver=primary_trip.driver_assignment,
+            recommended_vehicle=primary_trip.vehicle_id,
+            combined_route=combined_route,
+            travel_distance_km=travel_distance,
+            time_gap_hours=available_time_gap,
+            benefits=benefits,
+            confidence_score=score,
+            reasoning=[
+                f"Operational efficiency: {benefits.get('operational_efficiency', 'Single driver consolidation')}",
+                f"Distance impact: {benefits.get('distance_description', f'{distance_savings:.1f}km change')}",
+                f"Time impact: {benefits.get('time_description', f'{time_savings:.0f}min change')}",
+                f"Cost benefit: {benefits.get('total_cost_savings', 'Driver consolidation savings')}",
+                f"Travel distance: {travel_distance:.1f}km (within {MAX_TRAVEL_DISTANCE_KM}km flexible limit)",
+                f"Time gap: {available_time_gap:.1f}h allows comfortable transition",
+                f"Driver consolidation reduces fleet complexity",
+                f"Confidence score: {score:.2f} (flexible threshold: {MINIMUM_SCORE_THRESHOLD})"
+            ],
+            created_at=datetime.utcnow(),
+            expires_at=datetime.utcnow() + timedelta(hours=24)
+        )
+
     async def find_combination_opportunities(self) -> List[TripCombinationRecommendation]:
         """Find opportunities to combine upcoming trips with flexible criteria"""
         try:
             trips = await trip_service.get_all_upcoming_trips()
-            recommendations = []
-            processed_pairs = set()
-            
+
             logger.info(f"Analyzing {len(trips)} trips with FLEXIBLE criteria")
             logger.info(f"Flexible constraints: max_distance={MAX_TRAVEL_DISTANCE_KM}km, "
-                    f"min_time_savings={MIN_TIME_SAVINGS_MINUTES}min, "
+                    f"max_gap={MAX_TIME_BUFFER_HOURS}h, min_time_savings={MIN_TIME_SAVINGS_MINUTES}min, "
                     f"min_score={MINIMUM_SCORE_THRESHOLD}")
-            
-            # Log trip details for debugging
-            for idx, trip in enumerate(trips):
-                logger.info(f"Trip {idx}: '{trip.name}' - Driver: {trip.driver_assignment}, "
-                        f"Start: {trip.scheduled_start_time}, End: {trip.scheduled_end_time}")
-            
-            total_pairs = 0
+
+            total_pairs = len(trips) * (len(trips) - 1) // 2
             filtered_out = {
+                'indexed_pairs': 0,
                 'same_driver': 0,
-                'travel_distance': 0,
                 'time_feasibility': 0,
-                'time_gap': 0,
+                'detour_bound': 0,
                 'route_calculation_failed': 0,
                 'insufficient_benefits': 0,
                 'extreme_distance_penalty': 0,
                 'low_score': 0
             }
-            
-            for i, primary_trip in enumerate(trips):
-                for j, secondary_trip in enumerate(trips):
-                    if i >= j:  # Skip same trip and avoid duplicate pairs
-                        continue
-                    
-                    total_pairs += 1
-                    pair_key = tuple(sorted([primary_trip.id, secondary_trip.id]))
-                    
-                    logger.debug(f"Evaluating flexible pair {total_pairs}: {primary_trip.name} -> {secondary_trip.name}")
-                    
-                    if pair_key in processed_pairs:
-                        logger.debug(f"Pair already processed, skipping")
-                        continue
-                    processed_pairs.add(pair_key)
-                    
-                    # Check same driver filter (still required)
-                    if primary_trip.driver_assignment == secondary_trip.driver_assignment:
-                        filtered_out['same_driver'] += 1
-                        logger.debug(f"Same driver assigned ({primary_trip.driver_assignment}), skipping")
-                        continue
-                    
-                    # Calculate metrics
-                    travel_distance = self._calculate_travel_distance(primary_trip, secondary_trip)
-                    available_time_gap = self._calculate_time_gap(primary_trip, secondary_trip)
-                    
-                    logger.debug(f"Travel distance: {travel_distance:.2f}km, Available time: {available_time_gap:.2f}h")
-                    
-                    # More lenient distance filter
-                    if travel_distance > MAX_TRAVEL_DISTANCE_KM:
-                        filtered_out['travel_distance'] += 1
-                        logger.debug(f"Travel distance {travel_distance:.2f}km > {MAX_TRAVEL_DISTANCE_KM}km (flexible limit)")
-                        continue
-                    
-                    # Flexible time feasibility check
-                    is_time_feasible, required_travel_time, time_buffer = await self._check_time_feasibility(
-                        primary_trip, secondary_trip, travel_distance, available_time_gap
-                    )
-                    
-                    if not is_time_feasible:
-                        filtered_out['time_feasibility'] += 1
-                        logger.info(f"❌ TIME FEASIBILITY (flexible): {primary_trip.name} -> {secondary_trip.name}: "
-                                f"available={available_time_gap*60:.0f}min, required={required_travel_time:.0f}min, "
-                                f"buffer={time_buffer:.0f}min")
-                        continue
-                    
-                    logger.info(f"✓ TIME FEASIBLE (flexible): {primary_trip.name} -> {secondary_trip.name}: "
-                            f"available={available_time_gap*60:.0f}min, required={required_travel_time:.0f}min, "
-                            f"buffer={time_buffer:.0f}min")
-                    
-                    logger.debug(f"Calculating combined route for viable flexible pair...")
-                    
-                    # Calculate combined route with fallback
-                    combined_route = await self._calculate_combined_route_info(primary_trip, secondary_trip)
-                    if not combined_route:
-                        filtered_out['route_calculation_failed'] += 1
-                        logger.debug("Combined route calculation failed completely, skipping")
-                        continue
-                    
-                    logger.debug(f"Combined route: {combined_route.distance/1000:.2f}km, {combined_route.duration/60:.1f}min")
-                    
-                    # Calculate benefits with flexible expectations
-                    benefits = self._calculate_combination_benefits(primary_trip, secondary_trip, combined_route)
-                    
-                    logger.debug(f"Flexible benefits: time_savings={benefits.get('time_savings_minutes', 0):.1f}min, "
-                            f"distance_savings={benefits.get('distance_savings_km', 0):.2f}km")
-                    
-                    # More lenient benefit requirements
-                    time_savings = benefits.get("time_savings_minutes", 0)
-                    distance_savings = benefits.get("distance_savings_km", 0)
-                    
-                    # Allow combinations with minimal time savings if other benefits exist
-                    if time_savings < MIN_TIME_SAVINGS_MINUTES:
-                        # Check if distance penalty is acceptable (operational efficiency can offset)
-                        if distance_savings < -5.0:
-                            filtered_out['insufficient_benefits'] += 1
-                            logger.debug(f"Time savings {time_savings:.1f}min < {MIN_TIME_SAVINGS_MINUTES}min AND "
-                                    f"distance penalty {abs(distance_savings):.2f}km > 5km")
-                            continue
-                        else:
-                            logger.debug(f"Time savings below minimum but distance impact acceptable: "
-                                    f"{time_savings:.1f}min, {distance_savings:.2f}km")
-                    
-                    # Only reject extreme distance penalties (>10km additional)
-                    if distance_savings < -10.0:
-                        filtered_out['extreme_distance_penalty'] += 1
-                        logger.debug(f"Extreme distance penalty {abs(distance_savings):.2f}km > 10km, skipping")
-                        continue
-                    
-                    # Calculate flexible score
-                    score = self._calculate_combination_score(
-                        primary_trip, secondary_trip, benefits, travel_distance, available_time_gap
-                    )
-                    
-                    logger.debug(f"Flexible combination score: {score:.3f}")
-                    
-                    # More lenient score threshold
-                    if score < MINIMUM_SCORE_THRESHOLD:
-                        filtered_out['low_score'] += 1
-                        logger.debug(f"Score {score:.3f} < {MINIMUM_SCORE_THRESHOLD} (flexible threshold)")
-                        continue
-                    
-                    logger.info(f"✓ VIABLE FLEXIBLE COMBINATION: {primary_trip.name} + {secondary_trip.name} "
-                            f"(score: {score:.3f}, time_savings: {time_savings:.1f}min, distance_impact: {distance_savings:.2f}km)")
-                    
-                    # Create enhanced recommendation
-                    recommendation = TripCombinationRecommendation(
-                        id=f"combo_{primary_trip.id[:8]}_{secondary_trip.id[:8]}",
-                        primary_trip_id=primary_trip.id,
-                        secondary_trip_id=secondary_trip.id,
-                        primary_trip_name=primary_trip.name,
-                        secondary_trip_name=secondary_trip.name,
-                        recommended_driver=primary_trip.driver_assignment,
-                        recommended_vehicle=primary_trip.vehicle_id,
-                        combined_route=combined_route,
-                        travel_distance_km=travel_distance,
-                        time_gap_hours=available_time_gap,
-                        benefits=benefits,
-                        confidence_score=score,
-                        reasoning=[
-                            f"Operational efficiency: {benefits.get('operational_efficiency', 'Single driver consolidation')}",
-                            f"Distance impact: {benefits.get('distance_description', f'{distance_savings:.1f}km change')}",
-                            f"Time impact: {benefits.get('time_description', f'{time_savings:.0f}min change')}",
-                            f"Cost benefit: {benefits.get('total_cost_savings', 'Driver consolidation savings')}",
-                            f"Travel distance: {travel_distance:.1f}km (within {MAX_TRAVEL_DISTANCE_KM}km flexible limit)",
-                            f"Time gap: {available_time_gap:.1f}h allows comfortable transition",
-                            f"Driver consolidation reduces fleet complexity",
-                            f"Confidence score: {score:.2f} (flexible threshold: {MINIMUM_SCORE_THRESHOLD})"
-                        ],
-                        created_at=datetime.utcnow(),
-                        expires_at=datetime.utcnow() + timedelta(hours=24)
-                    )
-                    
-                    recommendations.append(recommendation)
-            
-            # Log enhanced filtering summary
+
+            candidates = await self._candidate_pairs(trips, filtered_out)
+
+            # Routes come from the cache or the rate-limited provider client; score several at once
+            semaphore = asyncio.Semaphore(COMBINATION_SCORING_CONCURRENCY)
+
+            async def evaluate(candidate):
+                async with semaphore:
+                    try:
+                        return await self._evaluate_combination(*candidate, filtered_out)
+                    except Exception as e:
+                        logger.error(f"Error evaluating combination {candidate[0].id} + {candidate[1].id}: {e}")
+                        return None
+
+            results = await asyncio.gather(*(evaluate(candidate) for candidate in candidates))
+            recommendations = [r for r in results if r is not None]
+
             logger.info(f"FLEXIBLE FILTERING SUMMARY:")
-            logger.info(f"  Total pairs evaluated: {total_pairs}")
+            logger.info(f"  Total trip pairs: {total_pairs}")
+            logger.info(f"  Pairs in reach (<= {MAX_TRAVEL_DISTANCE_KM}km, <= {MAX_TIME_BUFFER_HOURS}h): "
+                        f"{filtered_out['indexed_pairs']}")
             logger.info(f"  Filtered out by same driver: {filtered_out['same_driver']}")
-            logger.info(f"  Filtered out by travel distance (>{MAX_TRAVEL_DISTANCE_KM}km): {filtered_out['travel_distance']}")
             logger.info(f"  Filtered out by time feasibility: {filtered_out['time_feasibility']}")
+            logger.info(f"  Filtered out by detour bound (before routing): {filtered_out['detour_bound']}")
+            logger.info(f"  Routed: {len(candidates)}")
             logger.info(f"  Filtered out by route calculation failure: {filtered_out['route_calculation_failed']}")
             logger.info(f"  Filtered out by insufficient benefits: {filtered_out['insufficient_benefits']}")
             logger.info(f"  Filtered out by extreme distance penalty (>10km): {filtered_out['extreme_distance_penalty']}")
             logger.info(f"  Filtered out by low score (<{MINIMUM_SCORE_THRESHOLD}): {filtered_out['low_score']}")
-            
-            # Enhanced acceptance rate logging
-            total_filtered = sum(filtered_out.values())
+
             acceptance_rate = (len(recommendations) / total_pairs * 100) if total_pairs > 0 else 0
             logger.info(f"  Acceptance rate: {acceptance_rate:.1f}% ({len(recommendations)}/{total_pairs} pairs)")
             
@@ -0,0 +1,290 @@
+"""
+Driver behaviour analytics over the violation collections
+
+Every figure is computed by MongoDB: the four violation collections are
+combined with ``$unionWith`` into a single pipeline, and the driver history
+statistics come from a single ``$facet``. Each endpoint therefore costs
+one or two round trips and receives only the aggregates, however many
+violations fall in the period.
+"""
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from repositories.database import db_manager
+
+logger = logging.getLogger(__name__)
+
+VIOLATION_COLLECTIONS = {
+    "speeding": "speed_violations",
+    "braking": "excessive_braking_violations",
+    "acceleration": "excessive_acceleration_violations",
+    "phone_usage": "phone_usage_violations",
+}
+
+# Fields a violation's date may be stored in; phone usage violations have no ``time``
+VIOLATION_DATE_FIELDS = {
+    "speeding": ("created_at", "time"),
+    "braking": ("created_at", "time"),
+    "acceleration": ("created_at", "time"),
+    "phone_usage": ("created_at",),
+}
+
+# How far past its limit a violation went, and the upper bounds of minor and moderate
+SEVERITY_MEASURES = {
+    "speeding": ({"$subtract": [{"$ifNull": ["$speed", 0]}, {"$ifNull": ["$speed_limit", 0]}]}, 10, 20),
+    "braking": ({"$subtract": [{"$ifNull": ["$deceleration", 0]}, {"$ifNull": ["$threshold", 0]}]}, 2, 4),
+    "acceleration": ({"$subtract": [{"$ifNull": ["$acceleration", 0]}, {"$ifNull": ["$threshold", 0]}]}, 1.5, 3),
+    "phone_usage": ({"$ifNull": ["$duration_seconds", 0]}, 30, 120),
+}
+
+SAFETY_SCORE = {"$ifNull": ["$safety_score", {"$ifNull": ["$driver_safety_score", 0]}]}
+DRIVER_NAME = {"$ifNull": ["$name", {"$ifNull": ["$driver_name", "Unknown Driver"]}]}
+PERFORMERS_LIMIT = 5
+
+
+def _since(label: str, start_date: datetime) -> Dict[str, Any]:
+    """
+    Violations of one type that may be dated on or after ``start_date``
+
+    Dates stored as strings cannot be compared here, so they are let through
+    and checked against ``_violation_date`` once converted.
+    """
+    return {"$or": [
+        condition
+        for field in VIOLATION_DATE_FIELDS[label]
+        for condition in ({field: {"$gte": start_date}}, {field: {"$type": "string"}})
+    ]}
+
+
+def _violation_date(label: str) -> Any:
+    """A violation's date as a BSON date, or null if it cannot be converted"""
+    date = "$" + VIOLATION_DATE_FIELDS[label][-1]
+    for field in reversed(VIOLATION_DATE_FIELDS[label][:-1]):
+        date = {"$ifNull": ["$" + field, date]}
+    return {"$convert": {"input": date, "to": "date", "onError": None, "onNull": None}}
+
+
+def union_pipeline(stages: Callable[[str], List[Dict[str, Any]]], tail: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Run ``stages(label)`` over every violation collection and ``tail`` over the combined result
+
+    The pipeline is run on the first collection in ``VIOLATION_COLLECTIONS``;
+    each stage list should project a ``type`` field so the tail can tell the
+    violations apart.
+    """
+    labels = list(VIOLATION_COLLECTIONS)
+    pipeline = stages(labels[0])
+    for label in labels[1:]:
+        pipeline.append({"$unionWith": {"coll": VIOLATION_COLLECTIONS[label], "pipeline": stages(label)}})
+    return pipeline + tail
+
+
+class ViolationAnalyticsService:
+    """Violation trends, comparisons and driver risk computed by MongoDB"""
+
+    def __init__(self, db=db_manager):
+        self.db = db
+
+    async def _aggregate_violations(self, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        collection = getattr(self.db, VIOLATION_COLLECTIONS[next(iter(VIOLATION_COLLECTIONS))])
+        return await collection.aggregate(pipeline).to_list(None)
+
+    async def get_daily_violation_counts(
+        self,
+        start_date: datetime,
+        driver_id: Optional[str] = None
+    ) -> Dict[str, Dict[str, int]]:
+        """Violations per day ("YYYY-MM-DD") for each violation type since ``start_date``"""
+        def stages(label):
+            match = _since(label, start_date)
+            if driver_id:
+                match = {"$and": [match, {"driver_id": driver_id}]}
+            return [
+                {"$match": match},
+                {"$project": {"_id": 0, "type": {"$literal": label}, "violation_date": _violation_date(label)}},
+            ]
+
+        pipeline = union_pipeline(stages, [
+            {"$match": {"violation_date": {"$gte": start_date}}},
+            {"$group": {
+                "_id": {
+                    "type": "$type",
+                    "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$violation_date"}}
+                },
+                "count": {"$sum": 1}
+            }},
+        ])
+        counts = {label: {} for label in VIOLATION_COLLECTIONS}
+        for row in await self._aggregate_violations(pipeline):
+            counts[row["_id"]["type"]][row["_id"]["day"]] = int(row["count"])
+        return counts
+
+    async def get_violation_comparison(self, start_date: datetime) -> Dict[str, Dict[str, Any]]:
+        """Count and severity spread of each violation type since ``start_date``"""
+        def stages(label):
+            measure, minor, moderate = SEVERITY_MEASURES[label]
+            return [
+                {"$match": _since(label, start_date)},
+                {"$project": {
+                    "_id": 0,
+                    "type": {"$literal": label},
+                    "severity": measure,
+                    "violation_date": _violation_date(label)
+                }},
+                {"$match": {"violation_date": {"$gte": start_date}}},
+                {"$addFields": {"range": {"$switch": {
+                    "branches": [
+                        {"case": {"$lte": ["$severity", 0]}, "then": None},
+                        {"case": {"$lte": ["$severity", minor]}, "then": "minor"},
+                        {"case": {"$lte": ["$severity", moderate]}, "then": "moderate"},
+                    ],
+                    "default": "severe"
+                }}}},
+            ]
+
+        pipeline = union_pipeline(stages, [
+            {"$group": {
+                "_id": "$type",
+                "count": {"$sum": 1},
+                # Only violations past their limit count towards severity
+                "severity_sum": {"$sum": {"$cond": [{"$gt": ["$severity", 0]}, "$severity", 0]}},
+                "severity_count": {"$sum": {"$cond": [{"$gt": ["$severity", 0]}, 1, 0]}},
+                "max_severity": {"$max": {"$cond": [{"$gt": ["$severity", 0]}, "$severity", None]}},
+                "minor": {"$sum": {"$cond": [{"$eq": ["$range", "minor"]}, 1, 0]}},
+                "moderate": {"$sum": {"$cond": [{"$eq": ["$range", "moderate"]}, 1, 0]}},
+                "severe": {"$sum": {"$cond": [{"$eq": ["$range", "severe"]}, 1, 0]}},
+            }},
+        ])
+        rows = {row["_id"]: row for row in await self._aggregate_violations(pipeline)}
+
+        comparison = {}
+        for label in VIOLATION_COLLECTIONS:
+            row = rows.get(label, {})
+            severity_count = row.get("severity_count", 0)
+            comparison[label] = {
+                "count": row.get("count", 0),
+                "avg_severity": round(row["severity_sum"] / severity_count, 2) if severity_count else 0,
+                "max_severity": round(row.get("max_severity") or 0, 2),
+                "severity_ranges": {
+                    "minor": row.get("minor", 0),
+                    "moderate": row.get("moderate", 0),
+                    "severe": row.get("severe", 0)
+                }
+            }
+        return comparison
+
+    async def get_period_violation_counts(self, start_date: datetime, previous_start_date: datetime) -> Dict[str, Dict[str, int]]:
+        """
+        Per violation type: violations since ``start_date``, violations created
+        in the period before it, and critical violations created since it
+        """
+        critical = {"$or": [
+            {"$gt": ["$severity", 0.8]},
+            {"$gt": ["$speed", 120]},
+            {"$gt": ["$duration_seconds", 300]}
+        ]}
+
+        def stages(label):
+            return [
+                {"$match": _since(label, previous_start_date)},
+                {"$addFields": {"violation_date": _violation_date(label)}},
+                {"$project": {
+                    "_id": 0,
+                    "type": {"$literal": label},
+                    "current": {"$cond": [{"$gte": ["$violation_date", start_date]}, 1, 0]},
+                    "previous": {"$cond": [{"$and": [
+                        {"$gte": ["$violation_date", previous_start_date]},
+                        {"$lt": ["$violation_date", start_date]}
+                    ]}, 1, 0]},
+                    "critical": {"$cond": [{"$and": [{"$gte": ["$violation_date", start_date]}, critical]}, 1, 0]},
+                }},
+            ]
+
+        pipeline = union_pipeline(stages, [
+            {"$group": {
+                "_id": "$type",
+                "current": {"$sum": "$current"},
+                "previous": {"$sum": "$previous"},
+                "critical": {"$sum": "$critical"},
+            }},
+        ])
+        counts = {label: {"current": 0, "previous": 0, "critical": 0} for label in VIOLATION_COLLECTIONS}
+        for row in await self._aggregate_violations(pipeline):
+            counts[row["_id"]] = {key: int(row[key]) for key in ("current", "previous", "critical")}
+        return counts
+
+    async def get_driver_statistics(self) -> Dict[str, Any]:
+        """Risk, safety score and trip figures across every driver history, in one ``$facet``"""
+        violations = {"$ifNull": ["$total_violations", 0]}
+        performer = {"_id": 0, "driver_id": {"$ifNull": ["$driver_id", "Unknown"]}, "name": DRIVER_NAME,
+                     "safety_score": SAFETY_SCORE}
+        pipeline = [
+            {"$facet": {
+                "totals": [{"$group": {
+                    "_id": None,
+                    "drivers": {"$sum": 1},
+                    "avg_safety_score": {"$avg": SAFETY_SCORE},
+                    "total_violations": {"$sum": violations},
+                    "total_trips_or_one": {"$sum": {"$ifNull": ["$total_trips", 1]}},
+                    "total_trips": {"$sum": {"$ifNull": ["$total_trips", 0]}},
+                    "completed_trips": {"$sum": {"$ifNull": ["$completed_trips", 0]}},
+                    "recent_violations": {"$sum": {"$ifNull": ["$recent_violations", 0]}},
+                    "historical_violations": {"$sum": {"$ifNull": [
+                        "$historical_violations", {"$ifNull": ["$recent_violations", 0]}
+                    ]}},
+                    "improving_drivers": {"$sum": {"$cond": [{"$eq": ["$trend", "improving"]}, 1, 0]}},
+                }}],
+                "risk": [{"$group": {
+                    "_id": {"$switch": {
+                        "branches": [
+                            {"case": {"$and": [{"$gte": [SAFETY_SCORE, 80]}, {"$lte": [violations, 5]}]},
+                             "then": "low_risk"},
+                            {"case": {"$and": [{"$gte": [SAFETY_SCORE, 60]}, {"$lte": [violations, 15]}]},
+                             "then": "medium_risk"},
+                        ],
+                        "default": "high_risk"
+                    }},
+                    "count": {"$sum": 1}
+                }}],
+                "score_ranges": [{"$bucket": {
+                    "groupBy": SAFETY_SCORE,
+                    "boundaries": [60, 70, 80, 90, float("inf")],
+                    "default": "below_60",
+                    "output": {"count": {"$sum": 1}}
+                }}],
+                "top": [
+                    {"$addFields": {"sort_score": SAFETY_SCORE}},
+                    {"$sort": {"sort_score": -1}},
+                    {"$limit": PERFORMERS_LIMIT},
+                    {"$project": performer}
+                ],
+                "worst": [
+                    {"$addFields": {"sort_score": SAFETY_SCORE}},
+                    {"$sort": {"sort_score": 1}},
+                    {"$limit": PERFORMERS_LIMIT},
+                    {"$project": performer}
+                ],
+            }}
+        ]
+        result = (await self.db.driver_history.aggregate(pipeline).to_list(1))[0]
+
+        totals = result["totals"][0] if result["totals"] else {"drivers": 0}
+        ranges = {60: "60-69", 70: "70-79", 80: "80-89", 90: "90-100", "below_60": "below_60"}
+        return {
+            **totals,
+            "risk_distribution": {
+                "low_risk": 0, "medium_risk": 0, "high_risk": 0,
+                **{row["_id"]: row["count"] for row in result["risk"]}
+            },
+            "safety_score_ranges": {
+                "90-100": 0, "80-89": 0, "70-79": 0, "60-69": 0, "below_60": 0,
+                **{ranges[row["_id"]]: row["count"] for row in result["score_ranges"]}
+            },
+            "top_performers": result["top"],
+            "worst_performers": sorted(result["worst"], key=lambda d: d["safety_score"], reverse=True),
+        }
+
+
+# Global instance
+violation_analytics_service = ViolationAnalyticsService()
@@ -0,0 +1,347 @@
+"""
+Batch ingest of telematics violations
+
+Speed, excessive braking and excessive acceleration events arrive from
+vehicle units in bursts, of mixed types. ``ingest`` validates a whole
+array against the same request models as the single create endpoints and
+checks every trip and driver assignment in one query. It writes one
+unordered ``insert_many`` per violation collection. Each event carries an
+``event_key`` built from its driver, trip and time, and a unique index on
+it turns a resent event into a duplicate rather than a second violation.
+The violations written are then counted once per driver through
+``DriverHistoryService.record_violations``, and one
+``violation.driver.recorded`` event per driver carries the new counts by
+type for downstream counters.
+
+``submit`` validates the same way but only queues the events. The queue
+is written every ``VIOLATION_INGEST_FLUSH_INTERVAL_SECONDS``, or as soon
+as it holds ``VIOLATION_INGEST_BATCH_SIZE`` events, so bursts from many
+units share their writes. Events that could not be written are queued
+again, up to ``VIOLATION_INGEST_MAX_BUFFERED``; the event keys make the
+retry safe. A failed write may still have stored some of its events, so
+a requeued event that turns out to be a duplicate is counted as written.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from bson import ObjectId
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+from events.publisher import event_publisher
+from repositories.database import db_manager
+from schemas.requests import (
+    CreateExcessiveAccelerationViolationRequest, CreateExcessiveBrakingViolationRequest, CreateSpeedViolationRequest
+)
+from services.driver_history_service import driver_history_service
+
+logger = logging.getLogger(__name__)
+
+VIOLATION_INGEST_BATCH_SIZE = int(os.getenv("VIOLATION_INGEST_BATCH_SIZE", "500"))
+VIOLATION_INGEST_FLUSH_INTERVAL_SECONDS = float(os.getenv("VIOLATION_INGEST_FLUSH_INTERVAL_SECONDS", "1"))
+VIOLATION_INGEST_MAX_BUFFERED = int(os.getenv("VIOLATION_INGEST_MAX_BUFFERED", "20000"))
+
+DUPLICATE_KEY = 11000
+
+# Violation type -> (collection, request model)
+VIOLATION_TYPES = {
+    "speeding": ("speed_violations", CreateSpeedViolationRequest),
+    "braking": ("excessive_braking_violations", CreateExcessiveBrakingViolationRequest),
+    "acceleration": ("excessive_acceleration_violations", CreateExcessiveAccelerationViolationRequest),
+}
+
+
+def _naive_utc(moment: datetime) -> datetime:
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def event_key(driver_id: str, trip_id: str, moment: datetime) -> str:
+    """Natural key of a violation: one per driver, trip and time within its collection"""
+    return f"{driver_id}:{trip_id}:{_naive_utc(moment).isoformat()}"
+
+
+def _describe(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc']) or 'event'}: {e['msg']}" for e in error.errors()
+    )
+
+
+class ViolationIngestService:
+    """Validates, buffers and writes violation events in batches"""
+
+    def __init__(
+        self,
+        db=db_manager,
+        history=driver_history_service,
+        publisher=event_publisher,
+        batch_size: int = VIOLATION_INGEST_BATCH_SIZE,
+        flush_interval_s: float = VIOLATION_INGEST_FLUSH_INTERVAL_SECONDS,
+        max_buffered: int = VIOLATION_INGEST_MAX_BUFFERED,
+        utcnow: Callable[[], datetime] = datetime.utcnow
+    ):
+        self.db = db
+        self.history = history
+        self.publisher = publisher
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.max_buffered = max_buffered
+        self.utcnow = utcnow
+        self._buffer: List[Tuple[str, Dict[str, Any]]] = []
+        # (type, event key) of queued events whose last write failed and may have been stored
+        self._requeued: Set[Tuple[str, str]] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.running = False
+        self.stats = {"received": 0, "rejected": 0, "inserted": 0, "duplicates": 0, "failed": 0, "requeued": 0,
+                      "batches": 0, "writes": 0, "flushes": 0, "drivers_updated": 0, "events_published": 0,
+                      "batch_ms": 0.0}
+
+    # -------------------- Validation --------------------
+    async def validate(self, events: Sequence[Any]) -> Tuple[List[Tuple[str, Dict[str, Any]]], List[Dict[str, Any]]]:
+        """
+        Violation documents for the valid events, and why each other event was rejected
+
+        Every event needs a ``type`` of ``speeding``, ``braking`` or
+        ``acceleration`` and the fields of that type's create request. The
+        trip must exist, in ``trips`` or ``trip_history``, with the event's
+        driver assigned to it.
+        """
+        self.stats["received"] += len(events)
+        valid: List[Tuple[int, str, Any]] = []
+        rejected: List[Dict[str, Any]] = []
+        for index, event in enumerate(events):
+            violation_type = event.get("type") if isinstance(event, dict) else None
+            if violation_type not in VIOLATION_TYPES:
+                rejected.append({"index": index, "type": violation_type,
+                                 "error": f"type must be one of {', '.join(VIOLATION_TYPES)}"})
+                continue
+            try:
+                request = VIOLATION_TYPES[violation_type][1](**{k: v for k, v in event.items() if k != "type"})
+            except ValidationError as e:
+                rejected.append({"index": index, "type": violation_type, "error": _describe(e)})
+                continue
+            if not ObjectId.is_valid(request.trip_id):
+                rejected.append({"index": index, "type": violation_type, "error": f"Invalid trip ID {request.trip_id}"})
+                continue
+            valid.append((index, violation_type, request))
+
+        assignments = await self._load_assignments({request.trip_id for _, _, request in valid})
+        documents = []
+        for index, violation_type, request in valid:
+            if request.trip_id not in assignments:
+                rejected.append({"index": index, "type": violation_type, "error": f"Trip {request.trip_id} not found"})
+            elif assignments[request.trip_id] != request.driver_id:
+                rejected.append({"index": index, "type": violation_type,
+                                 "error": f"Driver {request.driver_id} is not assigned to trip {request.trip_id}"})
+            else:
+                document = request.model_dump()
+                document["event_key"] = event_key(request.driver_id, request.trip_id, request.time)
+                documents.append((violation_type, document))
+
+        rejected.sort(key=lambda r: r["index"])
+        self.stats["rejected"] += len(rejected)
+        return documents, rejected
+
+    async def _load_assignments(self, trip_ids) -> Dict[str, Optional[str]]:
+        """Assigned driver of each trip that exists, from ``trips`` then ``trip_history``"""
+        assignments: Dict[str, Optional[str]] = {}
+        missing = [ObjectId(trip_id) for trip_id in trip_ids]
+        for collection in (self.db.trips, self.db.trip_history):
+            if not missing:
+                break
+            cursor = collection.find({"_id": {"$in": missing}}, {"driver_assignment": 1})
+            for trip in await cursor.to_list(None):
+                assignments[str(trip["_id"])] = trip.get("driver_assignment")
+            missing = [oid for oid in missing if str(oid) not in assignments]
+        return assignments
+
+    # -------------------- Writes --------------------
+    async def ingest(self, events: Sequence[Any]) -> Dict[str, Any]:
+        """Validate and write a batch of events now; returns what happened to them"""
+        documents, rejected = await self.validate(events)
+        result = await self._write(documents)
+        return {"received": len(events), **result, "rejected": rejected}
+
+    async def submit(self, events: Sequence[Any]) -> Dict[str, Any]:
+        """
+        Validate a batch of events and queue the valid ones for the next flush
+
+        The events are written at once if that fills a batch. When the queue
+        is full the events are refused, to be sent again later.
+        """
+        documents, rejected = await self.validate(events)
+        if len(self._buffer) + len(documents) > self.max_buffered:
+            logger.warning(f"[ViolationIngestService] Buffer full, refusing {len(documents)} violations")
+            self.stats["rejected"] += len(documents)
+            return {"received": len(events), "queued": 0, "rejected": rejected, "buffer_full": True}
+
+        self._buffer.extend(documents)
+        if len(self._buffer) >= self.batch_size:
+            await self.flush()
+        return {"received": len(events), "queued": len(documents), "rejected": rejected, "buffer_full": False}
+
+    async def flush(self) -> Dict[str, int]:
+        """Write every queued event, a batch at a time; events that fail to write are queued again"""
+        totals = {"inserted": 0, "duplicates": 0, "failed": 0, "drivers": 0}
+        while self._buffer:
+            batch, self._buffer = self._buffer[:self.batch_size], self._buffer[self.batch_size:]
+            result = await self._write(batch, requeue=True)
+            for name in totals:
+                totals[name] += result[name]
+            if result["requeued"]:
+                break  # Leave the rest for the next flush
+        if any(totals.values()):
+            self.stats["flushes"] += 1
+        return totals
+
+    async def _write(self, documents: List[Tuple[str, Dict[str, Any]]], requeue: bool = False) -> Dict[str, int]:
+        started = time.perf_counter()
+        now = self.utcnow()
+        by_type: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        duplicates = 0
+        seen = set()
+        for violation_type, document in documents:
+            if (violation_type, document["event_key"]) in seen:
+                duplicates += 1
+                continue
+            seen.add((violation_type, document["event_key"]))
+            document.setdefault("created_at", now)
+            by_type[violation_type].append(document)
+
+        results = await asyncio.gather(*(
+            self._insert(violation_type, docs) for violation_type, docs in by_type.items()
+        ))
+
+        self._requeued.difference_update(seen)
+
+        counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        failed, retry = 0, []
+        for violation_type, inserted, type_duplicates, type_failed, unwritten in results:
+            duplicates += type_duplicates
+            failed += type_failed
+            retry.extend((violation_type, document) for document in unwritten)
+            for document in inserted:
+                counts[document["driver_id"]][violation_type] += 1
+        inserted_total = sum(sum(by_type.values()) for by_type in counts.values())
+
+        requeued = 0
+        if retry:
+            if requeue and len(self._buffer) + len(retry) <= self.max_buffered:
+                for violation_type, document in retry:
+                    # insert_many gave every document an _id; let the retry insert it afresh
+                    document.pop("_id", None)
+                    self._requeued.add((violation_type, document["event_key"]))
+                self._buffer[:0] = retry
+                requeued = len(retry)
+                self.stats["requeued"] += requeued
+            else:
+                failed += len(retry)
+
+        if counts:
+            counts = {driver_id: dict(by_type) for driver_id, by_type in counts.items()}
+            await self.history.record_violations(counts)
+            await self._publish(counts)
+
+        self.stats["inserted"] += inserted_total
+        self.stats["duplicates"] += duplicates
+        self.stats["failed"] += failed
+        self.stats["drivers_updated"] += len(counts)
+        if documents:
+            self.stats["batches"] += 1
+            self.stats["batch_ms"] += (time.perf_counter() - started) * 1000
+            logger.info(f"[ViolationIngestService] Wrote {inserted_total} of {len(documents)} violations "
+                        f"for {len(counts)} drivers ({duplicates} duplicates, {failed} failed, {requeued} requeued)")
+        return {"inserted": inserted_total, "duplicates": duplicates, "failed": failed, "requeued": requeued,
+                "drivers": len(counts)}
+
+    async def _insert(self, violation_type: str, documents: List[Dict[str, Any]]):
+        """
+        One unordered ``insert_many``: the documents written, duplicates,
+        documents refused for another reason, and documents to try again
+
+        A requeued document refused as a duplicate was stored by the write
+        that failed, and is counted as written now.
+        """
+        collection = getattr(self.db, VIOLATION_TYPES[violation_type][0])
+        self.stats["writes"] += 1
+        try:
+            await collection.insert_many(documents, ordered=False)
+            return violation_type, documents, 0, 0, []
+        except BulkWriteError as e:
+            errors = {error["index"]: error.get("code") for error in e.details.get("writeErrors", [])}
+            for index, code in list(errors.items()):
+                if code == DUPLICATE_KEY and (violation_type, documents[index]["event_key"]) in self._requeued:
+                    del errors[index]
+            inserted = [document for index, document in enumerate(documents) if index not in errors]
+            duplicates = sum(1 for code in errors.values() if code == DUPLICATE_KEY)
+            failed = len(errors) - duplicates
+            if failed:
+                logger.warning(f"[ViolationIngestService] {failed} {violation_type} violations were refused: "
+                               f"{e.details.get('writeErrors', [])[0].get('errmsg')}")
+            return violation_type, inserted, duplicates, failed, []
+        except Exception as e:
+            logger.error(f"[ViolationIngestService] Failed to write {len(documents)} {violation_type} violations: {e}")
+            return violation_type, [], 0, 0, documents
+
+    async def _publish(self, counts: Dict[str, Dict[str, int]]):
+        """One ``violation.driver.recorded`` event per driver with the new counts by type"""
+        if not self.publisher.is_connected():
+            return
+        published = await asyncio.gather(*(
+            self.publisher.publish_driver_violations_recorded(driver_id, by_type)
+            for driver_id, by_type in counts.items()
+        ), return_exceptions=True)
+        self.stats["events_published"] += sum(1 for ok in published if ok is True)
+
+    # -------------------- Loop --------------------
+    async def start(self):
+        """Start the periodic flush"""
+        if self.running:
+            logger.warning("[ViolationIngestService] Already running")
+            return
+        self.running = True
+        self._task = asyncio.create_task(self._flush_loop())
+        logger.info(f"[ViolationIngestService] Flushing violations every {self.flush_interval_s}s")
+
+    async def stop(self):
+        """Stop the periodic flush and write out what is queued"""
+        if not self.running:
+            return
+        self.running = False
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"[ViolationIngestService] Final flush failed: {e}")
+        if self._buffer:
+            logger.warning(f"[ViolationIngestService] {len(self._buffer)} violations were not written")
+        logger.info("[ViolationIngestService] Stopped")
+
+    async def _flush_loop(self):
+        while self.running:
+            try:
+                await asyncio.sleep(self.flush_interval_s)
+                await self.flush()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"[ViolationIngestService] Flush failed: {e}")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        metrics = {name: value for name, value in self.stats.items() if name != "batch_ms"}
+        metrics["buffered"] = len(self._buffer)
+        metrics["avg_batch_ms"] = round(self.stats["batch_ms"] / self.stats["batches"], 2) if self.stats["batches"] else 0
+        return metrics
+
+
+# Global instance
+violation_ingest_service = ViolationIngestService()
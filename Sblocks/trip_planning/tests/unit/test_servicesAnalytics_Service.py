@@ -153,36 +153,37 @@ def make_async_iter(items):
 # _get_driver_names
 # ====================================================================================
 
+def use_driver_names(monkeypatch, load):
+    """Route name lookups through a fresh resolver over ``load``"""
+    from utils.name_resolver import NameResolver
+    resolver = NameResolver(load, lambda i: f"Driver {i}")
+    monkeypatch.setitem(sys.modules, "services.trip_kpi_service", SimpleNamespace(driver_names=resolver))
+    return resolver
+
 @pytest.mark.asyncio
-async def test__get_driver_names_empty_returns_empty():
-    res = await AnalyticsService._get_driver_names([])
+async def test__get_driver_names_empty_returns_empty(monkeypatch):
+    async def load(ids): raise AssertionError("nothing to load")
+    use_driver_names(monkeypatch, load)
+    res = await AnalyticsService()._get_driver_names([])
     assert res == {}
 
 @pytest.mark.asyncio
 async def test__get_driver_names_found_and_default(monkeypatch):
     d1 = "507f191e810c19729de860ea"
     d2 = "abc"
+    async def load(ids): return {d1: "Ann Lee"}
+    use_driver_names(monkeypatch, load)
 
-    class _Drivers:
-        def find(self, *_args, **_kwargs):
-            return make_to_list_cursor([{"_id": analytics_service_module.ObjectId(d1),
-                                         "first_name": "Ann", "last_name": "Lee"}])
-
-    monkeypatch.setattr(analytics_service_module, "db_manager_management",
-                        SimpleNamespace(drivers=_Drivers()))
-
-    names = await AnalyticsService._get_driver_names([d1, d2])
-    assert names[str(analytics_service_module.ObjectId(d1))] == "Ann Lee"
+    names = await AnalyticsService()._get_driver_names([d1, d2])
+    assert names[d1] == "Ann Lee"
     assert names[d2] == f"Driver {d2}"
 
 @pytest.mark.asyncio
 async def test__get_driver_names_on_exception_returns_defaults(monkeypatch):
-    class _Drivers:
-        def find(self, *_a, **_k): raise RuntimeError("boom")
-    monkeypatch.setattr(analytics_service_module, "db_manager_management",
-                        SimpleNamespace(drivers=_Drivers()))
+    async def load(ids): raise RuntimeError("boom")
+    use_driver_names(monkeypatch, load)
     ids = ["x", "y"]
-    names = await AnalyticsService._get_driver_names(ids)
+    names = await AnalyticsService()._get_driver_names(ids)
     assert names == {i: f"Driver {i}" for i in ids}
 
 # ====================================================================================
@@ -190,7 +191,7 @@ async def test__get_driver_names_on_exception_returns_defaults(monkeypatch):
 # ====================================================================================
 
 @pytest.mark.asyncio
-async def test_get_analytics_first_success_with_sync_name_lookup(monkeypatch):
+async def test_get_analytics_first_success_with_name_lookup(monkeypatch):
     svc = AnalyticsService()
     results = [
         {"_id": "D1", "completedTrips": 3, "cancelledTrips": 1, "totalHours": 5.234, "totalTrips": 4},
@@ -201,7 +202,7 @@ async def test_get_analytics_first_success_with_sync_name_lookup(monkeypatch):
     monkeypatch.setattr(analytics_service_module, "db_manager",
                         SimpleNamespace(trip_history=_TripHistory()))
 
-    def fake_get_names(self, ids): return {i: f"Name-{i}" for i in ids}
+    async def fake_get_names(self, ids): return {i: f"Name-{i}" for i in ids}
     monkeypatch.setattr(AnalyticsService, "_get_driver_names", fake_get_names)
 
     from datetime import datetime
@@ -218,21 +219,28 @@ async def test_get_analytics_first_success_with_sync_name_lookup(monkeypatch):
     assert out["timeframeSummary"]["averageTripsPerDay"] == 0.13
 
 @pytest.mark.asyncio
-async def test_get_analytics_first_buggy_name_lookup_falls_back_to_error_handler(monkeypatch):
+async def test_get_analytics_first_resolves_names_in_one_batch(monkeypatch):
     svc = AnalyticsService()
     class _TripHistory:
         def aggregate(self, pipeline):
-            return make_to_list_cursor([{"_id":"D1","completedTrips":1,"cancelledTrips":0,"totalHours":1.0,"totalTrips":1}])
+            return make_to_list_cursor([
+                {"_id":"D1","completedTrips":1,"cancelledTrips":0,"totalHours":1.0,"totalTrips":1},
+                {"_id":"D2","completedTrips":0,"cancelledTrips":1,"totalHours":0.0,"totalTrips":1},
+            ])
     monkeypatch.setattr(analytics_service_module, "db_manager",
                         SimpleNamespace(trip_history=_TripHistory()))
+    loads = []
+    async def load(ids):
+        loads.append(ids)
+        return {"D1": "Ann Lee"}
+    use_driver_names(monkeypatch, load)
 
     from datetime import datetime, timezone
     now = datetime.now(tz=timezone.utc)
     out = await svc.get_analytics_first(now, now)
-    assert out == {
-        "drivers": [],
-        "timeframeSummary": {"totalTrips": 0, "completionRate": 0.0, "averageTripsPerDay": 0.0},
-    }
+    assert [d["driverName"] for d in out["drivers"]] == ["Ann Lee", "Driver D2"]
+    assert out["timeframeSummary"]["totalTrips"] == 2
+    assert loads == [["D1", "D2"]]
 
 # ====================================================================================
 # get_analytics_second
@@ -408,47 +416,50 @@ async def test_get_trip_analytics_raises_on_error(monkeypatch):
 # get_driver_performance
 # ====================================================================================
 
-def make_async_iter(items):
-    class _Iter:
-        def __init__(self, items): self._items = list(items)
-        def __aiter__(self): return self
-        async def __anext__(self):
-            if not self._items:
-                raise StopAsyncIteration
-            return self._items.pop(0)
-    return _Iter(items)
+def use_rollups(monkeypatch, summaries):
+    """Answer ``summarize`` with ``summaries`` (or raise it) and record the calls"""
+    calls = []
+    async def summarize(start, end, scopes=("fleet", "driver", "vehicle"), keys=None, violations=False):
+        calls.append({"scopes": scopes, "keys": keys, "violations": violations})
+        if isinstance(summaries, Exception):
+            raise summaries
+        return summaries
+    rollups = SimpleNamespace(FLEET_KEY="all", trip_rollup_service=SimpleNamespace(summarize=summarize))
+    monkeypatch.setitem(sys.modules, "services.trip_rollup_service", rollups)
+    return calls
+
+def counters(**values):
+    names = ("trips", "completed_trips", "cancelled_trips", "missed_trips", "timed_trips", "distance",
+             "planned_distance", "planned_duration", "timed_completed_trips", "actual_duration", "on_time_trips",
+             "delay_minutes")
+    return {name: values.get(name, 0) for name in names}
 
 @pytest.mark.asyncio
 async def test_get_driver_performance_happy_path(monkeypatch):
     svc = AnalyticsService()
-    items = [{
-        "_id": "D1",
-        "total_trips": 4,
-        "completed_trips": 3,
-        "cancelled_trips": 1,
-        "total_planned_duration": 0,
-        "total_actual_duration": 90,
-        "total_distance": 100,
-        "on_time_trips": 2,
-    }]
-    class _Trips:
-        def aggregate(self, pipeline): return make_async_iter(items)
-    svc.db = SimpleNamespace(trips=_Trips())
+    violations = {"speeding": 2, "braking": 0, "acceleration": 1, "phone_usage": 0}
+    calls = use_rollups(monkeypatch, {"driver": {"D1": {
+        **counters(trips=4, completed_trips=3, cancelled_trips=1, actual_duration=90, distance=100,
+                   on_time_trips=2),
+        "violations": violations,
+    }}})
 
     async def fake_more(driver_id, s, e):
         return {"fuel_efficiency": 7.0, "safety_score": 98, "average_rating": 4.9}
     monkeypatch.setattr(svc, "_get_driver_analytics_data", fake_more)
 
     out = await svc.get_driver_performance(driver_ids=["D1"])
+    assert calls == [{"scopes": ("driver",), "keys": ["D1"], "violations": True}]
     assert out == [{
         "driver_id": "D1",
         "total_trips": 4,
         "completed_trips": 3,
         "cancelled_trips": 1,
-        "on_time_rate": pytest.approx(50.0),
+        "on_time_rate": pytest.approx(200 / 3),
         "completion_rate": pytest.approx(75.0),
         "average_trip_duration": pytest.approx(30.0),
         "total_distance": 100,
+        "violations": violations,
         "fuel_efficiency": 7.0,
         "safety_score": 98,
         "average_rating": 4.9,
@@ -457,19 +468,7 @@ async def test_get_driver_performance_happy_path(monkeypatch):
 @pytest.mark.asyncio
 async def test_get_driver_performance_zero_trips_branch(monkeypatch):
     svc = AnalyticsService()
-    items = [{
-        "_id": "D2",
-        "total_trips": 0,
-        "completed_trips": 0,
-        "cancelled_trips": 0,
-        "total_planned_duration": 0,
-        "total_actual_duration": 0,
-        "total_distance": 0,
-        "on_time_trips": 0,
-    }]
-    class _Trips:
-        def aggregate(self, pipeline): return make_async_iter(items)
-    svc.db = SimpleNamespace(trips=_Trips())
+    use_rollups(monkeypatch, {"driver": {"D2": {**counters(), "violations": {}}}})
 
     async def fake_more(driver_id, s, e):
         return {"fuel_efficiency": None, "safety_score": None, "average_rating": None}
@@ -482,11 +481,9 @@ async def test_get_driver_performance_zero_trips_branch(monkeypatch):
     assert out[0]["average_trip_duration"] is None
 
 @pytest.mark.asyncio
-async def test_get_driver_performance_raises_on_error():
+async def test_get_driver_performance_raises_on_error(monkeypatch):
     svc = AnalyticsService()
-    class _Trips:
-        def aggregate(self, pipeline): raise RuntimeError("agg boom")
-    svc.db = SimpleNamespace(trips=_Trips())
+    use_rollups(monkeypatch, RuntimeError("agg boom"))
     with pytest.raises(RuntimeError):
         await svc.get_driver_performance()
 
@@ -495,40 +492,45 @@ async def test_get_driver_performance_raises_on_error():
 # ====================================================================================
 
 @pytest.mark.asyncio
-async def test_get_route_efficiency_analysis_success():
+async def test_get_route_efficiency_analysis_success(monkeypatch):
     svc = AnalyticsService()
-    data = [{
-        "total_trips": 5,
-        "avg_planned_duration": 10.0,
-        "avg_actual_duration": 12.0,
-        "avg_planned_distance": 100.0,
-        "avg_actual_distance": 120.0,
-        "total_delays": 7.5,
-        "total_fuel": 60.0,
-        "total_cost": 240.0,
-    }]
-    class _Trips:
-        def aggregate(self, pipeline): return make_to_list_cursor(data)
-    svc.db = SimpleNamespace(trips=_Trips())
+    calls = use_rollups(monkeypatch, {"fleet": {"all": counters(
+        trips=8, completed_trips=5, distance=800.0, planned_distance=600.0, planned_duration=50.0,
+        timed_completed_trips=4, actual_duration=60.0, on_time_trips=4, delay_minutes=7.5
+    )}})
 
     out = await svc.get_route_efficiency_analysis()
+    assert calls == [{"scopes": ("fleet",), "keys": None, "violations": False}]
     assert out["total_completed_trips"] == 5
-    assert out["duration_variance"] == 2.0
-    assert out["distance_variance"] == 20.0
+    assert out["average_planned_duration"] == 10.0
+    assert out["average_actual_duration"] == 15.0  # Over the completed trips with actual times
+    assert out["duration_variance"] == 5.0
+    assert out["average_planned_distance"] == 120.0  # Over completed trips, like the durations
+    assert out["average_actual_distance"] is None
+    assert out["on_time_rate"] == 80.0
     assert out["average_delay"] == pytest.approx(1.5)
-    assert out["fuel_efficiency"] == pytest.approx(60.0/120.0)
-    assert out["cost_per_km"] == pytest.approx(240.0/120.0)
+    assert (out["distance_variance"], out["fuel_efficiency"], out["cost_per_km"]) == (0, 0, 0)
 
 @pytest.mark.asyncio
-async def test_get_route_efficiency_analysis_no_results():
+async def test_get_route_efficiency_analysis_without_actual_times(monkeypatch):
     svc = AnalyticsService()
-    class _Trips:
-        def aggregate(self, pipeline): return make_to_list_cursor([])
-    svc.db = SimpleNamespace(trips=_Trips())
+    use_rollups(monkeypatch, {"fleet": {"all": counters(trips=2, completed_trips=2, planned_duration=40.0)}})
+    out = await svc.get_route_efficiency_analysis()
+    assert out["average_planned_duration"] == 20.0
+    assert out["average_actual_duration"] is None
+    assert out["duration_variance"] == 0
+
+@pytest.mark.asyncio
+async def test_get_route_efficiency_analysis_no_results(monkeypatch):
+    svc = AnalyticsService()
+    use_rollups(monkeypatch, {"fleet": {"all": counters(trips=3, cancelled_trips=3)}})
     out = await svc.get_route_efficiency_analysis()
     assert out["total_completed_trips"] == 0
     assert "message" in out
 
+    use_rollups(monkeypatch, {"fleet": {}})
+    assert (await svc.get_route_efficiency_analysis())["total_completed_trips"] == 0
+
 # ====================================================================================
 # _build_analytics_query
 # ====================================================================================
@@ -0,0 +1,181 @@
+import os
+import sys
+import asyncio
+import importlib
+from datetime import datetime
+from types import SimpleNamespace
+import pytest
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+ROOT = os.path.abspath(os.path.join(HERE, "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+PACKAGES = ("schemas", "repositories", "services", "utils", "config", "events")
+
+
+def load_module():
+    """Import the service against the real packages, then put back whatever other tests had stubbed"""
+    owned = lambda name: name.split(".")[0] in PACKAGES
+    saved = {name: mod for name, mod in sys.modules.items() if owned(name)}
+    for name in saved:
+        del sys.modules[name]
+    try:
+        return importlib.import_module("services.driver_behavior_service")
+    finally:
+        for name in [n for n in sys.modules if owned(n)]:
+            del sys.modules[name]
+        sys.modules.update(saved)
+
+
+dbs = load_module()
+
+NOW = datetime(2030, 3, 15, 12, 0)
+
+
+class Violations:
+    """Canned ``ViolationAnalyticsService`` answers, counting the calls"""
+
+    def __init__(self):
+        self.calls = []
+        self.driver_stats = {
+            "drivers": 4, "total_trips_or_one": 100, "total_trips": 100, "completed_trips": 90,
+            "total_violations": 25, "recent_violations": 5, "historical_violations": 10,
+            "avg_safety_score": 81.456, "improving_drivers": 1,
+            "risk_distribution": {"low_risk": 2, "medium_risk": 1, "high_risk": 1},
+            "safety_score_ranges": {"90-100": 1, "80-89": 1, "70-79": 1, "60-69": 0, "below_60": 1},
+            "top_performers": [{"driver_id": "D1"}], "worst_performers": [{"driver_id": "D4"}],
+        }
+
+    async def get_daily_violation_counts(self, start_date, driver_id=None):
+        self.calls.append(("daily", start_date, driver_id))
+        await asyncio.sleep(0)
+        return {"speeding": {"2030-03-14": 3}, "braking": {}}
+
+    async def get_driver_statistics(self):
+        self.calls.append(("drivers",))
+        if isinstance(self.driver_stats, Exception):
+            raise self.driver_stats
+        return self.driver_stats
+
+    async def get_period_violation_counts(self, start_date, prev_start_date):
+        self.calls.append(("period", start_date, prev_start_date))
+        return {"speeding": {"current": 6, "previous": 12, "critical": 1},
+                "braking": {"current": 3, "previous": 3, "critical": 0}}
+
+    async def get_violation_comparison(self, start_date):
+        self.calls.append(("comparison", start_date))
+        return {"speeding": {"count": 3}, "braking": {"count": 1}}
+
+
+@pytest.fixture
+def env():
+    clock = SimpleNamespace(now=0.0)
+    violations = Violations()
+    service = dbs.DriverBehaviorService(violations, ttl_s=30, clock=lambda: clock.now, utcnow=lambda: NOW)
+    return SimpleNamespace(service=service, violations=violations, clock=clock)
+
+
+#------------violation trends fill in every day of the period--------
+def test_violation_trends(env):
+    report = asyncio.run(env.service.get_report("violation-trends", "unknown", "D1"))
+    assert env.violations.calls == [("daily", datetime(2030, 3, 8, 12), "D1")]
+    trends, summary = report["data"]["trends"], report["data"]["summary"]
+    assert len(trends["speeding"]) == 8 and trends["speeding"][6] == {"date": "2030-03-14", "count": 3}
+    assert sum(day["count"] for day in trends["braking"]) == 0
+    assert summary == {"total_violations": 3, "period_days": 7, "start_date": "2030-03-08T12:00:00",
+                       "end_date": "2030-03-15T12:00:00", "driver_filter": "D1"}
+
+
+#------------risk distribution, with and without driver histories--------
+def test_risk_distribution(env):
+    report = asyncio.run(env.service.get_report("risk-distribution", "90d", "D1"))
+    assert report["message"] == "Driver risk distribution retrieved successfully"
+    assert report["data"]["performance_metrics"] == {"avg_safety_score": 81.46, "violation_rate": 0.25,
+                                                     "improvement_trend": "positive"}
+    assert report["data"]["top_performers"] == [{"driver_id": "D1"}]
+
+    env.service.invalidate()
+    env.violations.driver_stats = RuntimeError("no history")
+    report = asyncio.run(env.service.get_report("risk-distribution"))
+    assert report["message"] == "No driver data available"
+    assert report["data"]["distribution"] == {"low_risk": 0, "medium_risk": 0, "high_risk": 0}
+
+
+#------------performance metrics compare the period with the one before--------
+def test_performance_metrics(env):
+    data = asyncio.run(env.service.get_report("performance-metrics", "7d"))["data"]
+    assert ("period", datetime(2030, 3, 8, 12), datetime(2030, 3, 1, 12)) in env.violations.calls
+    assert data["violation_counts"] == {"speeding": 6, "braking": 3}
+    assert data["safety_trends"]["period_change"] == 40.0
+    assert data["key_metrics"] == {
+        "violations_per_driver": 2.25, "violations_per_day": 1.29, "critical_violations": 1,
+        "avg_safety_score": 81.46, "driver_improvement_rate": 0.25, "avg_driver_completion_rate": 0.9,
+    }
+
+
+#------------the comparison adds each type's share and the most common type--------
+def test_violation_comparison(env):
+    data = asyncio.run(env.service.get_report("violation-comparison"))["data"]
+    assert data["comparison"]["speeding"] == {"count": 3, "percentage": 75.0}
+    assert data["summary"] == {"total_violations": 4, "most_common_type": "speeding", "most_common_count": 3,
+                               "period_days": 30, "violations_per_day": 0.13}
+
+
+#------------reports are shared until they expire, per period and driver--------
+def test_reports_are_shared_until_expiry(env):
+    service = env.service
+
+    async def requests():
+        return await asyncio.gather(*(service.get_report("violation-trends", "7d", "D1") for _ in range(3)))
+
+    first = asyncio.run(requests())
+    assert all(report is first[0] for report in first)
+    assert len(env.violations.calls) == 1
+
+    env.clock.now = 29
+    asyncio.run(service.get_report("violation-trends", "bogus", "D1"))  # unknown periods mean the default
+    asyncio.run(service.get_report("violation-trends", "7d", "D2"))
+    assert len(env.violations.calls) == 2
+
+    env.clock.now = 31
+    asyncio.run(service.get_report("violation-trends", "7d", "D1"))
+    assert len(env.violations.calls) == 3
+
+    metrics = service.get_metrics()
+    assert metrics["reports"] == 2
+    assert {k: metrics["violation-trends"][k] for k in ("requests", "hits", "builds")} == {
+        "requests": 6, "hits": 3, "builds": 3
+    }
+    assert metrics["risk-distribution"]["requests"] == 0
+
+
+#------------unknown reports raise and failed builds are not cached--------
+def test_unknown_report_and_failures(env):
+    with pytest.raises(ValueError):
+        asyncio.run(env.service.get_report("driver-scores"))
+
+    async def broken(start_date):
+        raise RuntimeError("aggregation failed")
+    env.violations.get_violation_comparison = broken
+    with pytest.raises(RuntimeError):
+        asyncio.run(env.service.get_report("violation-comparison"))
+    assert env.service.get_metrics()["reports"] == 0
+
+
+#------------a report that was building when the cache was invalidated is not cached--------
+def test_report_invalidated_mid_build_is_not_cached(env):
+    comparison = env.violations.get_violation_comparison
+
+    async def compare_then_invalidate(start_date):
+        result = await comparison(start_date)
+        env.violations.get_violation_comparison = comparison
+        env.service.invalidate()
+        return result
+    env.violations.get_violation_comparison = compare_then_invalidate
+
+    asyncio.run(env.service.get_report("violation-comparison"))
+    assert env.service.get_metrics()["reports"] == 0
+    asyncio.run(env.service.get_report("violation-comparison"))
+    assert len(env.violations.calls) == 2
+    assert env.service.get_metrics()["reports"] == 1
@@ -0,0 +1,251 @@
+import os
+import sys
+import asyncio
+import importlib
+from collections import Counter
+from datetime import datetime
+from types import SimpleNamespace
+import pytest
+from bson import ObjectId
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+ROOT = os.path.abspath(os.path.join(HERE, "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+PACKAGES = ("schemas", "repositories", "services", "utils", "config", "events")
+
+
+def load_module():
+    """Import the service against the real packages, then put back whatever other tests had stubbed"""
+    owned = lambda name: name.split(".")[0] in PACKAGES
+    saved = {name: mod for name, mod in sys.modules.items() if owned(name)}
+    for name in saved:
+        del sys.modules[name]
+    try:
+        return importlib.import_module("services.driver_history_service")
+    finally:
+        for name in [n for n in sys.modules if owned(n)]:
+            del sys.modules[name]
+        sys.modules.update(saved)
+
+
+dhs = load_module()
+
+
+def evaluate(expr, doc):
+    if isinstance(expr, str) and expr.startswith("$"):
+        return doc.get(expr[1:])
+    if isinstance(expr, dict) and "$ifNull" in expr:
+        return next((v for v in (evaluate(e, doc) for e in expr["$ifNull"]) if v is not None), None)
+    if isinstance(expr, dict):
+        return {key: evaluate(value, doc) for key, value in expr.items()}
+    return expr
+
+
+def matches(doc, query):
+    for key, value in query.items():
+        if key == "$or":
+            if not any(matches(doc, q) for q in value):
+                return False
+        elif isinstance(value, dict) and "$in" in value:
+            if doc.get(key) not in value["$in"]:
+                return False
+        elif isinstance(value, dict) and "$ne" in value:
+            if doc.get(key) == value["$ne"]:
+                return False
+        elif doc.get(key) != value:
+            return False
+    return True
+
+
+class Cursor:
+    def __init__(self, docs):
+        self.docs = iter(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class Collection:
+    def __init__(self, name, ops):
+        self.name = name
+        self.ops = ops
+        self.docs = []
+        self.before_update = None  # Runs between a driver's $inc and its score write
+
+    def _upsert(self, query, update, upsert):
+        found = [doc for doc in self.docs if matches(doc, query)]
+        if found:
+            doc = found[0]
+        elif upsert:
+            doc = {"_id": ObjectId(), **query, **update.get("$setOnInsert", {})}
+            self.docs.append(doc)
+        else:
+            return None
+        doc.update(update.get("$set", {}))
+        for key, step in update.get("$inc", {}).items():
+            doc[key] = doc.get(key, 0) + step
+        return doc
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        self.ops[f"{self.name}.find_one_and_update"] += 1
+        return dict(self._upsert(query, update, upsert))
+
+    async def update_one(self, query, update, upsert=False):
+        self.ops[f"{self.name}.update_one"] += 1
+        if self.before_update:
+            self.before_update()
+        self._upsert(query, update, upsert)
+
+    async def bulk_write(self, operations, ordered=True):
+        self.ops[f"{self.name}.bulk_write"] += 1
+        for op in operations:
+            self._upsert(op._filter, op._doc, op._upsert)
+
+    async def find_one(self, query, projection=None):
+        self.ops[f"{self.name}.find_one"] += 1
+        return next((dict(doc) for doc in self.docs if matches(doc, query)), None)
+
+    def find(self, query, projection=None):
+        self.ops[f"{self.name}.find"] += 1
+        return Cursor([dict(doc) for doc in self.docs if matches(doc, query)])
+
+    async def distinct(self, key, query=None):
+        self.ops[f"{self.name}.distinct"] += 1
+        return list({doc.get(key) for doc in self.docs})
+
+    def aggregate(self, pipeline):
+        self.ops[f"{self.name}.aggregate"] += 1
+        match, group = pipeline[0]["$match"], pipeline[1]["$group"]
+        counts = Counter()
+        keys = {}
+        for doc in self.docs:
+            if matches(doc, match):
+                key = evaluate(group["_id"], doc)
+                frozen = repr(key)
+                keys[frozen] = key
+                counts[frozen] += 1
+        return Cursor([{"_id": keys[k], "count": n} for k, n in counts.items()])
+
+
+class Database:
+    def __init__(self, ops):
+        for name in ("driver_history", "trips", "trip_history", "speed_violations", "excessive_braking_violations",
+                     "excessive_acceleration_violations", "phone_usage_violations", "drivers"):
+            setattr(self, name, Collection(name, ops))
+
+
+def make_service():
+    ops = Counter()
+    db = Database(ops)
+    db.drivers.docs += [{"_id": ObjectId(), "employee_id": f"EMP{i}", "first_name": "Driver", "last_name": str(i)}
+                        for i in range(5)]
+    return dhs.DriverHistoryService(db, db), db, ops
+
+
+#------------trip and violation deltas are one $inc plus one score write each--------
+def test_deltas_increment_and_rescore():
+    service, db, ops = make_service()
+
+    async def scenario():
+        first = await service.update_driver_history_on_trip_completion("EMP1", "t1", "completed")
+        assert first["trip_completion_rate"] == 100.0 and first["safety_score"] == 100.0
+        await service.update_driver_history_on_trip_completion("EMP1", "t2", "cancelled")
+        for _ in range(3):
+            await service.record_violation("EMP1", "speeding")
+        await service.record_violation("EMP1", "phone_usage", count=2)
+
+    asyncio.run(scenario())
+    (history,) = db.driver_history.docs
+    assert history["driver_name"] == "Driver 1"
+    assert (history["total_assigned_trips"], history["completed_trips"], history["cancelled_trips"]) == (2, 1, 1)
+    assert history["speeding_violations"] == 3 and history["phone_usage_violations"] == 2
+    assert history["braking_violations"] == 0
+    # 50% completion costs 15 points; 5 violations over one completed trip cost the maximum 50
+    assert history["driver_safety_score"] == 35.0 and history["driver_risk_level"] == "high"
+    assert ops["driver_history.find_one_and_update"] == 6 and ops["driver_history.update_one"] == 6
+    assert ops["drivers.find_one"] == 1  # Name looked up only when the history is created
+    assert "speed_violations.count_documents" not in ops
+
+
+#------------a batch of violations moves each driver's counters once and the rollups once--------
+def test_record_violations_batch(monkeypatch):
+    service, db, ops = make_service()
+    rollups = []
+
+    class Rollups:
+        async def record_violations(self, counts):
+            rollups.append(counts)
+
+    monkeypatch.setitem(sys.modules, "services.trip_rollup_service", SimpleNamespace(trip_rollup_service=Rollups()))
+    asyncio.run(service.record_violations({
+        "EMP1": {"speeding": 3, "braking": 1}, "EMP2": {"acceleration": 2, "speeding": 0}, "EMP3": {"braking": 0}, "": {"speeding": 1}
+    }))
+    histories = {doc["driver_id"]: doc for doc in db.driver_history.docs}
+    assert set(histories) == {"EMP1", "EMP2"}
+    assert (histories["EMP1"]["speeding_violations"], histories["EMP1"]["braking_violations"]) == (3, 1)
+    assert histories["EMP2"]["acceleration_violations"] == 2 and histories["EMP2"]["speeding_violations"] == 0
+    assert ops["driver_history.find_one_and_update"] == 2
+    assert rollups == [{"EMP1": {"speeding": 3, "braking": 1}, "EMP2": {"acceleration": 2}}]
+
+
+#------------a score computed from counters that have since moved is not written--------
+def test_stale_score_not_written():
+    service, db, ops = make_service()
+    asyncio.run(service.update_driver_history_on_trip_completion("EMP2", "t1", "completed"))
+    assert db.driver_history.docs[0]["driver_safety_score"] == 100.0
+
+    def concurrent_delta():
+        db.driver_history.before_update = None
+        db.driver_history.docs[0]["braking_violations"] += 1
+
+    db.driver_history.before_update = concurrent_delta
+    asyncio.run(service.record_violation("EMP2", "speeding"))
+    history = db.driver_history.docs[0]
+    assert history["speeding_violations"] == 1 and history["braking_violations"] == 1
+    assert history["driver_safety_score"] == 100.0  # Left for the other delta to write
+
+
+#------------reconciliation recounts drivers in batches with one $group per collection--------
+def test_reconciliation_batches(monkeypatch):
+    monkeypatch.setattr(dhs, "RECONCILE_BATCH_SIZE", 3)
+    service, db, ops = make_service()
+    created = datetime(2025, 1, 1)
+    db.driver_history.docs.append({"_id": ObjectId(), "driver_id": "EMP0", "driver_name": "Driver 0",
+                                   "completed_trips": 40, "created_at": created})
+    db.trip_history.docs += [{"driver_assignment": "EMP0", "status": "completed"},
+                             {"driver_assignment": "EMP0", "status": "completed"},
+                             {"driver_id": "EMP0", "status": "cancelled"},
+                             {"driver_assignment": "", "driver_id": "EMP0", "status": "completed"},
+                             {"driver_assignment": "EMP3", "status": "missed"},
+                             {"driver_assignment": "EMP9", "status": "completed"}]
+    db.speed_violations.docs += [{"driver_id": "EMP0"}, {"driver_id": "EMP3"}]
+    db.phone_usage_violations.docs.append({"driver_id": "EMP0"})
+
+    result = asyncio.run(service.recalculate_all_driver_histories())
+    assert result == {"updated_drivers": 6, "total_drivers": 6, "errors": []}
+
+    histories = {doc["driver_id"]: doc for doc in db.driver_history.docs}
+    emp0 = histories["EMP0"]
+    assert (emp0["total_assigned_trips"], emp0["completed_trips"], emp0["cancelled_trips"]) == (3, 2, 1)
+    assert emp0["speeding_violations"] == 1 and emp0["phone_usage_violations"] == 1
+    assert emp0["created_at"] == created
+    assert histories["EMP3"]["total_assigned_trips"] == 1 and histories["EMP3"]["trip_completion_rate"] == 100.0
+    assert histories["EMP9"]["driver_name"] == "Unknown Driver" and histories["EMP4"]["driver_name"] == "Driver 4"
+
+    # Two batches, each one trip $group, four violation $groups, one name query and one bulk write
+    assert ops["trip_history.aggregate"] == 2
+    assert sum(ops[f"{name}.aggregate"] for name in ("speed_violations", "excessive_braking_violations",
+                                                     "excessive_acceleration_violations",
+                                                     "phone_usage_violations")) == 8
+    assert ops["driver_history.bulk_write"] == 2 and ops["drivers.find"] == 3  # Plus the driver list
+    assert "driver_history.replace_one" not in ops
+    # An empty assignment is not counted, under "" or any other driver
+    assert asyncio.run(service._count_trips_by_driver(["EMP0"])) == {"EMP0": {"completed": 2, "cancelled": 1}}
@@ -0,0 +1,202 @@
+import os
+import sys
+import asyncio
+import importlib
+from collections import Counter
+from datetime import datetime, timedelta
+import pytest
+from bson import ObjectId
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+ROOT = os.path.abspath(os.path.join(HERE, "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+PACKAGES = ("schemas", "repositories", "services", "utils", "config", "events")
+
+
+def load_modules():
+    """Import the service against the real packages, then put back whatever other tests had stubbed"""
+    owned = lambda name: name.split(".")[0] in PACKAGES
+    saved = {name: mod for name, mod in sys.modules.items() if owned(name)}
+    for name in saved:
+        del sys.modules[name]
+    try:
+        return (importlib.import_module("services.driver_ping_service"),
+                importlib.import_module("schemas.entities"))
+    finally:
+        for name in [n for n in sys.modules if owned(n)]:
+            del sys.modules[name]
+        sys.modules.update(saved)
+
+
+dps, entities = load_modules()
+
+
+def matches(doc, query):
+    for key, value in query.items():
+        if isinstance(value, dict) and "$in" in value:
+            if doc.get(key) not in value["$in"]:
+                return False
+        elif isinstance(value, dict) and "$ne" in value:
+            if doc.get(key) == value["$ne"]:
+                return False
+        elif doc.get(key) != value:
+            return False
+    return True
+
+
+class Cursor:
+    def __init__(self, docs):
+        self.docs = iter(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class Collection:
+    def __init__(self, name, ops):
+        self.name = name
+        self.ops = ops
+        self.docs = []
+
+    def _match(self, query):
+        return [doc for doc in self.docs if matches(doc, query)]
+
+    def _apply(self, doc, update):
+        doc.update(update.get("$set", {}))
+        for key, step in update.get("$inc", {}).items():
+            doc[key] = doc.get(key, 0) + step
+
+    def find(self, query, projection=None):
+        self.ops[f"{self.name}.find"] += 1
+        return Cursor([dict(doc) for doc in self._match(query)])
+
+    async def find_one(self, query, projection=None):
+        self.ops[f"{self.name}.find_one"] += 1
+        found = self._match(query)
+        return dict(found[0]) if found else None
+
+    async def insert_one(self, doc):
+        self.ops[f"{self.name}.insert_one"] += 1
+        doc = {**doc, "_id": ObjectId()}
+        self.docs.append(doc)
+        return type("Result", (), {"inserted_id": doc["_id"]})()
+
+    async def update_one(self, query, update):
+        self.ops[f"{self.name}.update_one"] += 1
+        for doc in self._match(query)[:1]:
+            self._apply(doc, update)
+
+    async def update_many(self, query, update):
+        self.ops[f"{self.name}.update_many"] += 1
+        for doc in self._match(query):
+            self._apply(doc, update)
+
+    async def bulk_write(self, operations, ordered=True):
+        self.ops[f"{self.name}.bulk_write"] += 1
+        for op in operations:
+            for doc in self._match(op._filter)[:1]:
+                self._apply(doc, op._doc)
+
+
+class Database:
+    def __init__(self):
+        self.ops = Counter()
+        self.trips = Collection("trips", self.ops)
+        self.driver_ping_sessions = Collection("driver_ping_sessions", self.ops)
+        self.phone_usage_violations = Collection("phone_usage_violations", self.ops)
+
+
+def location(lon=28.2, lat=-25.8):
+    return entities.LocationPoint(coordinates=[lon, lat])
+
+
+def make_service():
+    db = Database()
+    service = dps.DriverPingService()
+    service.db = db
+    return service, db
+
+
+#------------a batch reads each trip and session once and buffers the pings--------
+def test_process_pings_batch():
+    service, db = make_service()
+    started = ObjectId()
+    scheduled = ObjectId()
+    now = datetime.utcnow()
+    db.trips.docs += [{"_id": started, "status": "in_progress", "driver_assignment": "d1"},
+                      {"_id": scheduled, "status": "scheduled", "driver_assignment": "d2"}]
+    db.driver_ping_sessions.docs.append({
+        "_id": ObjectId(), "trip_id": str(started), "driver_id": "d1", "is_active": True,
+        "started_at": now, "last_ping_time": now - timedelta(seconds=5), "ping_count": 4,
+        "total_violations": 0, "current_violation_id": None,
+    })
+
+    pings = [(str(started), location(), now), (str(scheduled), location(), now),
+             (str(started), location(28.3), now + timedelta(seconds=3)), (str(ObjectId()), location(), now)]
+    results = asyncio.run(service.process_pings(pings))
+
+    assert [r["status"] for r in results] == ["success", "inactive", "success", "error"]
+    assert results[3]["error"] == "TripNotFound"
+    assert db.ops["trips.find"] == 1 and db.ops["driver_ping_sessions.find"] == 1
+    assert "driver_ping_sessions.update_one" not in db.ops  # Pings are not written one by one
+    assert str(started) in service.ping_deadlines.deadlines
+
+    asyncio.run(service.session_store.flush())
+    session = db.driver_ping_sessions._match({"trip_id": str(started)})[0]
+    assert session["ping_count"] == 6
+    assert session["last_ping_location"]["coordinates"] == [28.3, -25.8]
+    assert db.ops["driver_ping_sessions.bulk_write"] == 1
+
+    # Next ping for the same trip needs no database at all
+    before = sum(db.ops.values())
+    result = asyncio.run(service.process_ping(str(started), location(), now + timedelta(seconds=6)))
+    assert result["status"] == "success" and sum(db.ops.values()) == before
+
+
+#------------a timed-out session opens a violation that the next ping ends--------
+def test_timeout_then_ping_ends_violation(monkeypatch):
+    published = []
+
+    class Publisher:
+        async def publish_driver_violation_started(self, violation):
+            published.append(("started", violation))
+
+        async def publish_driver_violation_ended(self, violation):
+            published.append(("ended", violation))
+
+    monkeypatch.setattr(dps, "event_publisher", Publisher())
+    service, db = make_service()
+    trip_id = ObjectId()
+    db.trips.docs.append({"_id": trip_id, "status": "in_progress", "driver_assignment": "d1"})
+    db.driver_ping_sessions.docs.append({
+        "_id": ObjectId(), "trip_id": str(trip_id), "driver_id": "d1", "is_active": True,
+        "started_at": datetime.utcnow(), "ping_count": 0, "total_violations": 0, "current_violation_id": None,
+    })
+
+    async def scenario():
+        quiet_since = datetime.utcnow() - timedelta(seconds=45)
+        assert (await service.process_ping(str(trip_id), location(), quiet_since))["status"] == "success"
+        assert await service._handle_ping_timeout(str(trip_id)) is None
+        state = service.session_store.get(str(trip_id))
+        assert state.current_violation_id and state.total_violations == 1
+        # The buffered ping was written before the stored session was checked
+        assert db.ops["driver_ping_sessions.bulk_write"] == 1
+
+        result = await service.process_ping(str(trip_id), location(), datetime.utcnow())
+        assert result["status"] == "success" and result["violations_count"] == 1
+        assert service.session_store.get(str(trip_id)).current_violation_id is None
+
+    asyncio.run(scenario())
+    violation = db.phone_usage_violations.docs[0]
+    assert not violation["is_active"] and violation["duration_seconds"] >= 0
+    assert db.driver_ping_sessions.docs[0]["current_violation_id"] is None
+    assert [kind for kind, _ in published] == ["started", "ended"]
+    assert published[0][1]["violation_id"] == published[1][1]["violation_id"] == str(violation["_id"])
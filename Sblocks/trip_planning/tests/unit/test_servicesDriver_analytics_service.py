@@ -1,328 +1,179 @@
-import sys, os, types, importlib, pytest
+import os
+import sys
+import importlib
 from datetime import datetime, timezone
+from types import SimpleNamespace
+import pytest
+from bson import ObjectId
 
 HERE = os.path.abspath(os.path.dirname(__file__))
+ROOT = os.path.abspath(os.path.join(HERE, "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
 
-def _candidate_paths():
-    return [
-        os.path.abspath(os.path.join(HERE, "..", "..", "services", "driver_analytics_service.py")),
-        os.path.abspath(os.path.join(os.getcwd(), "Sblocks", "maintenance", "services", "driver_analytics_service.py")),
-        os.path.abspath(os.path.join(os.getcwd(), "services", "driver_analytics_service.py")),
-        os.path.abspath(os.path.join(os.getcwd(), "driver_analytics_service.py")),
-    ]
+PACKAGES = ("schemas", "repositories", "services", "utils", "config", "events")
 
-def _ensure_pkg(name: str):
-    if name not in sys.modules:
-        pkg = types.ModuleType(name)
-        pkg.__path__ = []  
-        sys.modules[name] = pkg
-    elif not hasattr(sys.modules[name], "__path__"):
-        sys.modules[name].__path__ = []
-
-def _snap(names):
-    return {n: sys.modules.get(n) for n in names}
-
-def _restore(snap):
-    for name, mod in snap.items():
-        if mod is None:
-            sys.modules.pop(name, None)
-        else:
-            sys.modules[name] = mod
-    if "repositories" in snap and snap["repositories"] is not None:
-        if "repositories.database" in snap:
-            setattr(sys.modules["repositories"], "database", snap["repositories.database"])
-    if "schemas" in snap and snap["schemas"] is not None:
-        if "schemas.entities" in snap:
-            setattr(sys.modules["schemas"], "entities", snap["schemas.entities"])
-        if "schemas.requests" in snap:
-            setattr(sys.modules["schemas"], "requests", snap["schemas.requests"])
-
-
-@pytest.fixture(scope="module")
-def svc_env():
-    names = [
-        "repositories",
-        "repositories.database",
-        "schemas",
-        "schemas.entities",
-        "schemas.requests",
-        "bson",
-        "services.driver_analytics_service",
-    ]
-    snap = _snap(names)
-
-    if snap["bson"] is None:
-        bson_mod = types.ModuleType("bson")
-        class ObjectId:
-            @classmethod
-            def is_valid(cls, s):
-                return isinstance(s, str) and len(s) == 24 and all(c in "0123456789abcdefABCDEF" for c in s)
-            def __init__(self, s):
-                if not ObjectId.is_valid(s):
-                    raise ValueError("invalid ObjectId")
-                self._s = s.lower()
-            def __str__(self): return self._s
-            def __repr__(self): return f"ObjectId('{self._s}')"
-            def __eq__(self, other): return str(self) == str(other)
-            def __hash__(self): return hash(self._s)
-        bson_mod.ObjectId = ObjectId
-        sys.modules["bson"] = bson_mod
-
-    _ensure_pkg("repositories")
-    repodb = types.ModuleType("repositories.database")
-
-    class _FakeCursor:
-        def __init__(self, data=None, raise_exc=None):
-            self._data = list(data or [])
-            self._raise = raise_exc
-        async def to_list(self, *_):
-            if self._raise:
-                raise self._raise
-            return list(self._data)
-
-    class _TripHistoryCollection:
-        def __init__(self):
-            self.total_count = 0
-            self.completed_count = 0
-            self.cancelled_count = 0
-            self.raise_on_status = None
-            self.find_trips = []
-            self.find_raise = None
-            self.aggregate_result = []
-            self.aggregate_raise = None
-            self.last_count_filter = None
-            self.last_find_filter = None
-            self.last_aggregate_pipeline = None
-        async def count_documents(self, flt):
-            self.last_count_filter = flt
-            status = flt.get("status")
-            if self.raise_on_status and (self.raise_on_status == status or self.raise_on_status == "any"):
-                raise RuntimeError("count fail")
-            if status == "completed":
-                return self.completed_count
-            if status == "cancelled":
-                return self.cancelled_count
-            return self.total_count
-        def find(self, flt, projection=None):
-            self.last_find_filter = flt
-            return _FakeCursor(self.find_trips, self.find_raise)
-        def aggregate(self, pipeline):
-            self.last_aggregate_pipeline = pipeline
-            return _FakeCursor(self.aggregate_result, self.aggregate_raise)
-
-    class _DriversCollection:
-        def __init__(self):
-            self.drivers_data = []
-            self.raise_exc = None
-            self.last_find_filter = None
-        def find(self, flt, projection=None):
-            self.last_find_filter = flt
-            data = list(self.drivers_data)
-            try:
-                in_list = flt.get("_id", {}).get("$in")
-                if in_list is not None:
-                    data = [d for d in data if d.get("_id") in set(in_list)]
-            except Exception:
-                pass
-            if isinstance(projection, dict) and projection:
-                keep = {k for k, v in projection.items() if v} | {"_id"}
-                projected = []
-                for d in data:
-                    projected.append({k: v for k, v in d.items() if k in keep})
-                data = projected
-            return _FakeCursor(data, self.raise_exc)
-
-    class _DBTrips:
-        def __init__(self):
-            self.trip_history = _TripHistoryCollection()
-
-    class _DBMgmt:
-        def __init__(self):
-            self.drivers = _DriversCollection()
-
-    repodb.db_manager = _DBTrips()
-    repodb.db_manager_management = _DBMgmt()
-    sys.modules["repositories.database"] = repodb
-    sys.modules["repositories"].database = repodb
-
-    _ensure_pkg("schemas")
-    se = types.ModuleType("schemas.entities")
-    class TripAnalytics: pass
-    class TripStatus: pass
-    se.TripAnalytics = TripAnalytics
-    se.TripStatus = TripStatus
-    sys.modules["schemas.entities"] = se
-    sys.modules["schemas"].entities = se
-
-    sr = types.ModuleType("schemas.requests")
-    class AnalyticsRequest: pass
-    sr.AnalyticsRequest = AnalyticsRequest
-    sys.modules["schemas.requests"] = sr
-    sys.modules["schemas"].requests = sr
-
-    import importlib.util
-    for path in _candidate_paths():
-        if os.path.exists(path):
-            if "services.driver_analytics_service" in sys.modules:
-                del sys.modules["services.driver_analytics_service"]
-            spec = importlib.util.spec_from_file_location("services.driver_analytics_service", path)
-            mod = importlib.util.module_from_spec(spec)
-            sys.modules["services.driver_analytics_service"] = mod
-            spec.loader.exec_module(mod)
-            break
-    else:
-        _restore(snap)
-        raise ImportError("driver_analytics_service.py not found")
-
-    env = {
-        "DriverAnalyticsService": sys.modules["services.driver_analytics_service"].DriverAnalyticsService,
-        "repodb": repodb,
-        "ObjectId": sys.modules["bson"].ObjectId,
-        "_DriversCollection": _DriversCollection,
-    }
 
+def load_modules():
+    """Import the services against the real packages, then put back whatever other tests had stubbed"""
+    owned = lambda name: name.split(".")[0] in PACKAGES
+    saved = {name: mod for name, mod in sys.modules.items() if owned(name)}
+    for name in saved:
+        del sys.modules[name]
     try:
-        yield env
+        return (importlib.import_module("services.driver_analytics_service"),
+                importlib.import_module("services.trip_kpi_service"))
     finally:
-        _restore(snap)
+        for name in [n for n in sys.modules if owned(n)]:
+            del sys.modules[name]
+        sys.modules.update(saved)
+
+
+das, tks = load_modules()
+
+
+class _FakeCursor:
+    def __init__(self, data=None, raise_exc=None):
+        self._data = list(data or [])
+        self._raise = raise_exc
+
+    async def to_list(self, *_):
+        if self._raise:
+            raise self._raise
+        return list(self._data)
+
+
+def _counters(**values):
+    return {**{name: 0 for name in ("trips", "completed_trips", "cancelled_trips", "timed_trips")},
+            "distance": 0.0, **values}
+
+
+class _Rollups:
+    """Answers the KPI summary with canned counters"""
+
+    def __init__(self):
+        self.summary = {"fleet": {}, "driver": {}, "vehicle": {}}
+        self.summarize_raise = None
+        self.summaries = 0
+
+    def add_trip_listener(self, callback):
+        pass
+
+    async def summarize(self, start, end):
+        self.summaries += 1
+        if self.summarize_raise:
+            raise self.summarize_raise
+        return self.summary
+
+
+class _DriversCollection:
+    def __init__(self):
+        self.drivers_data = []
+        self.raise_exc = None
+        self.finds = 0
+
+    def find(self, flt, projection=None):
+        self.finds += 1
+        if self.raise_exc:
+            raise self.raise_exc
+        by_employee, by_id = flt["$or"][0]["employee_id"]["$in"], flt["$or"][1]["_id"]["$in"]
+        return _FakeCursor([d for d in self.drivers_data if d.get("employee_id") in by_employee or d["_id"] in by_id])
+
+
+@pytest.fixture
+def s(monkeypatch):
+    rollups, drivers = _Rollups(), _DriversCollection()
+    monkeypatch.setattr(tks, "db_manager_management", SimpleNamespace(drivers=drivers))
+    resolver = tks.NameResolver(tks.load_driver_names, lambda i: f"Driver {i}")
+    monkeypatch.setattr(tks, "driver_names", resolver)
+    monkeypatch.setattr(das, "driver_names", resolver)
+    service = das.DriverAnalyticsService()
+    service.kpis = tks.TripKpiService(rollups)
+    return service
+
+
+def _rollups(s):
+    return s.kpis.rollups
 
 
-def _make_service(env):
-    s = env["DriverAnalyticsService"]()
-    assert s.db is env["repodb"].db_manager and s.db_management is env["repodb"].db_manager_management
-    return s
+def _drivers(s):
+    return tks.db_manager_management.drivers
 
 # ================================== TESTS ==================================
 
 @pytest.mark.asyncio
-async def test_get_driver_names_empty_returns_empty(svc_env):
-    s = _make_service(svc_env)
+async def test_get_driver_names_empty_returns_empty(s):
     assert await s._get_driver_names([]) == {}
+    assert _drivers(s).finds == 0
 
 @pytest.mark.asyncio
-async def test_get_driver_names_mixed_ids_found_and_defaults(svc_env):
-    s = _make_service(svc_env)
-    OID = svc_env["ObjectId"]
+async def test_get_driver_names_by_employee_or_document_id(s):
     valid_hex = "507f1f77bcf86cd799439011"
-    invalid_hexlen = "Z"*24
-    short_id = "drv-1"
-    drv = s.db_management.drivers
-    drv.drivers_data = [
-        {"_id": OID(valid_hex), "first_name":"Driver", "last_name":"507f1f77bcf86cd799439011"},
+    _drivers(s).drivers_data = [
+        {"_id": ObjectId(valid_hex), "employee_id": "EMP-9", "first_name": "Ann", "last_name": "Lee"},
+        {"_id": ObjectId(), "employee_id": "EMP-1", "first_name": "Bo", "last_name": "Mo"},
     ]
-    out = await s._get_driver_names([valid_hex, invalid_hexlen, short_id])
-    assert out[valid_hex] == "Driver 507f1f77bcf86cd799439011"
-    assert out[invalid_hexlen] == f"Driver {invalid_hexlen}"
-    assert out[short_id] == f"Driver {short_id}"
+    out = await s._get_driver_names([valid_hex, "EMP-1", "drv-1"])
+    assert out == {valid_hex: "Ann Lee", "EMP-1": "Bo Mo", "drv-1": "Driver drv-1"}
+    assert await s._get_driver_names(["EMP-1"]) == {"EMP-1": "Bo Mo"}
+    assert _drivers(s).finds == 1
 
 @pytest.mark.asyncio
-async def test_get_driver_names_error_fallback_defaults(svc_env):
-    s = _make_service(svc_env)
-    class BoomDrivers:
-        def find(self, *a, **k): raise RuntimeError("fail")
-    s.db_management.drivers = BoomDrivers()
-    ids = ["a","b"]
+async def test_get_driver_names_error_fallback_defaults(s):
+    _drivers(s).raise_exc = RuntimeError("fail")
+    ids = ["a", "b"]
     out = await s._get_driver_names(ids)
     assert out == {i: f"Driver {i}" for i in ids}
 
 @pytest.mark.asyncio
-async def test_get_total_trips_success_and_filter_shape(svc_env):
-    s = _make_service(svc_env)
-    s.db.trip_history.total_count = 7
-    got = await s.get_total_trips("week")
-    assert got == 7
-    flt = s.db.trip_history.last_count_filter
-    assert "created_at" in flt and "$gte" in flt["created_at"] and "$lte" in flt["created_at"]
-
-@pytest.mark.asyncio
-async def test_get_total_trips_failure_raises(svc_env, monkeypatch):
-    s = _make_service(svc_env)
-    async def boom(_): raise RuntimeError("x")
-    monkeypatch.setattr(s.db.trip_history, "count_documents", boom, raising=True)
-    with pytest.raises(RuntimeError):
-        await s.get_total_trips("day")
+async def test_dashboard_figures_share_one_summary(s):
+    _rollups(s).summary["fleet"]["all"] = _counters(trips=12, completed_trips=8, cancelled_trips=2,
+                                                    timed_trips=5, distance=40.0)
+    assert await s.get_total_trips("week") == 12
+    assert await s.get_completion_rate("week") == 80.0
+    assert await s.get_average_trips_per_day("week") == 0.71
+    assert await s.get_average_trips_per_day("day") == 5.0
+    assert _rollups(s).summaries == 2
 
 @pytest.mark.asyncio
-async def test_get_completion_rate_zero_total_returns_zero(svc_env):
-    s = _make_service(svc_env)
-    th = s.db.trip_history
-    th.raise_on_status = None
-    th.completed_count = 0
-    th.cancelled_count = 0
+async def test_empty_timeframe_returns_zeros(s):
+    assert await s.get_total_trips("day") == 0
     assert await s.get_completion_rate("day") == 0.0
+    assert await s.get_average_trips_per_day("day") == 0.0
+    assert await s.get_driver_trip_stats("day") == []
 
 @pytest.mark.asyncio
-async def test_get_completion_rate_nonzero_rounds(svc_env):
-    s = _make_service(svc_env)
-    th = s.db.trip_history
-    th.raise_on_status = None
-    th.completed_count = 8
-    th.cancelled_count = 2
-    assert await s.get_completion_rate("week") == 80.0
-
-@pytest.mark.asyncio
-async def test_get_completion_rate_failure_raises(svc_env):
-    s = _make_service(svc_env)
-    th = s.db.trip_history
-    th.raise_on_status = "completed"
+async def test_summary_failure_raises(s):
+    _rollups(s).summarize_raise = RuntimeError("agg fail")
     with pytest.raises(RuntimeError):
-        await s.get_completion_rate("month")
-
-@pytest.mark.asyncio
-async def test_get_average_trips_per_day_dayframe_nonempty(svc_env):
-    s = _make_service(svc_env)
-    s.db.trip_history.find_trips = [{"_id":i} for i in range(5)]
-    avg = await s.get_average_trips_per_day("day")
-    assert avg == 5.0
-
-@pytest.mark.asyncio
-async def test_get_average_trips_per_day_week_empty_zero(svc_env):
-    s = _make_service(svc_env)
-    s.db.trip_history.find_trips = []
-    avg = await s.get_average_trips_per_day("week")
-    assert avg == 0.0
-
-@pytest.mark.asyncio
-async def test_get_average_trips_per_day_find_raises(svc_env):
-    s = _make_service(svc_env)
-    s.db.trip_history.find_raise = RuntimeError("find fail")
+        await s.get_total_trips("day")
     with pytest.raises(RuntimeError):
-        await s.get_average_trips_per_day("week")
+        await s.get_driver_trip_stats("week")
 
 @pytest.mark.asyncio
-async def test_get_driver_trip_stats_formats_names_and_counts(svc_env):
-    s = _make_service(svc_env)
-    th = s.db.trip_history
+async def test_get_driver_trip_stats_formats_names_and_counts(s):
     hex_id = "507f1f77bcf86cd799439011"
-    th.aggregate_result = [
-        {"_id":"D1","completed_trips":3,"cancelled_trips":1},
-        {"_id":hex_id,"completed_trips":0,"cancelled_trips":2},
-    ]
-    s.db_management.drivers.drivers_data = []
-    out = await s.get_driver_trip_stats("week")
-    out = sorted(out, key=lambda x: x["driver_name"])
-    assert out[0] == {
-        "driver_id": hex_id,
-        "driver_name": f"Driver {hex_id}",
-        "completed_trips": 0,
-        "cancelled_trips": 2,
-    }
-    assert out[1] == {
-        "driver_id": "D1",
-        "driver_name": "Driver D1",
-        "completed_trips": 3,
-        "cancelled_trips": 1,
+    _rollups(s).summary["driver"] = {
+        "D1": _counters(trips=4, completed_trips=3, cancelled_trips=1),
+        hex_id: _counters(trips=2, cancelled_trips=2),
     }
+    _drivers(s).drivers_data = [{"_id": ObjectId(), "employee_id": "D1", "first_name": "Ann", "last_name": "Lee"}]
+    out = sorted(await s.get_driver_trip_stats("week"), key=lambda x: x["driver_name"])
+    assert out == [
+        {"driver_id": "D1", "driver_name": "Ann Lee", "completed_trips": 3, "cancelled_trips": 1},
+        {"driver_id": hex_id, "driver_name": f"Driver {hex_id}", "completed_trips": 0, "cancelled_trips": 2},
+    ]
 
 @pytest.mark.asyncio
-async def test_get_driver_trip_stats_aggregate_raises(svc_env):
-    s = _make_service(svc_env)
-    s.db.trip_history.aggregate_raise = RuntimeError("agg fail")
-    with pytest.raises(RuntimeError):
-        await s.get_driver_trip_stats("week")
-
-def test_get_start_date_variants(svc_env):
-    s = _make_service(svc_env)
+async def test_get_driver_trip_stats_by_id_found_and_missing(s):
+    _rollups(s).summary["driver"] = {"D1": _counters(trips=4, completed_trips=3, cancelled_trips=1)}
+    found = await s.get_driver_trip_stats_by_id("D1", "year")
+    assert found == {"driver_id": "D1", "driver_name": "Driver D1", "completed_trips": 3, "cancelled_trips": 1}
+    missing = await s.get_driver_trip_stats_by_id("D2", "year")
+    assert missing == {"driver_id": "D2", "driver_name": "Driver D2", "completed_trips": 0, "cancelled_trips": 0}
+    assert _rollups(s).summaries == 1
+
+def test_get_start_date_variants(s):
     end = datetime(2030,1,31,tzinfo=timezone.utc)
     assert (end - s._get_start_date("day", end)).days == 1
     assert (end - s._get_start_date("WEEK", end)).days == 7
@@ -0,0 +1,154 @@
+import os
+import importlib.util
+from types import SimpleNamespace
+import numpy as np
+import pytest
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+MODULE_PATH = os.path.abspath(os.path.join(HERE, "..", "..", "services", "fleet_simulation_engine.py"))
+GEO_PATH = os.path.abspath(os.path.join(HERE, "..", "..", "utils", "geo.py"))
+
+
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+fse = load_module("trip_planning_fleet_simulation_engine", MODULE_PATH)
+geo = load_module("trip_planning_utils_geo_for_engine", GEO_PATH)
+
+
+def make_simulator(trip_id, coords, speed_kmh=36.0, profile=None, distance=None):
+    """Minimal stand-in exposing the VehicleSimulator attributes the engine reads and writes"""
+    return SimpleNamespace(
+        trip_id=trip_id,
+        vehicle_id=f"veh-{trip_id}",
+        route=SimpleNamespace(
+            coordinates=coords,
+            distance=distance if distance is not None else geo.path_length_km(coords) * 1000,
+        ),
+        speed_profile=profile or {},
+        current_position=0.0,
+        current_speed_kmh=speed_kmh,
+        target_speed=speed_kmh,
+        speed_ms=speed_kmh / 3.6,
+        speed_change_timer=0,
+        speed_change_interval=15,
+        speed_change_rate=0.5,
+        min_speed=0.0,
+        max_speed=140.0,
+        distance_traveled=0.0,
+        last_location=None,
+        is_running=True,
+        is_paused=False,
+    )
+
+
+EAST = [(-25.75, 28.19), (-25.75, 28.20), (-25.75, 28.21)]
+SOUTH = [(-25.70, 28.10), (-25.71, 28.10), (-25.72, 28.10), (-25.73, 28.10)]
+BENT = [(-26.00, 28.00), (-26.00, 28.01), (-26.01, 28.01)]
+
+
+#------------one step moves speed x dt along the route--------
+def test_step_advances_by_speed_and_updates_simulator():
+    sim = make_simulator("a", EAST)
+    engine = fse.FleetSimulationEngine(seed=1)
+    engine.sync([sim])
+    engine.step(2.0)
+    [update] = engine.flush()
+
+    assert update.simulator is sim
+    assert sim.distance_traveled == pytest.approx(20.0)
+    assert sim.current_position == pytest.approx(20.0 / sim.route.distance)
+    assert update.latitude == pytest.approx(-25.75)
+    assert geo.haversine_km(-25.75, 28.19, update.latitude, update.longitude) * 1000 == pytest.approx(20.0, rel=1e-3)
+    assert update.heading == pytest.approx(90.0, abs=0.1)
+    assert sim.last_location == (update.latitude, update.longitude)
+
+
+#------------packed routes keep each vehicle on its own geometry--------
+def test_fleet_positions_match_per_route_interpolation():
+    sims = [make_simulator(name, coords, speed_kmh=72.0) for name, coords in (("a", EAST), ("b", SOUTH), ("c", BENT))]
+    engine = fse.FleetSimulationEngine(seed=2)
+    engine.sync(sims)
+    for _ in range(40):
+        engine.step(2.0)
+    updates = {u.simulator.trip_id: u for u in engine.flush()}
+
+    for sim in sims:
+        expected = geo.interpolate_along(sim.route.coordinates, [sim.distance_traveled / 1000.0])[0]
+        assert (updates[sim.trip_id].latitude, updates[sim.trip_id].longitude) == pytest.approx(tuple(expected), abs=1e-9)
+    assert updates["c"].heading == pytest.approx(180.0, abs=0.1)  # Turned south onto the second leg
+
+
+#------------paused and stopped vehicles hold still, arrivals stop running--------
+def test_paused_stopped_and_arrived_vehicles():
+    moving = make_simulator("a", EAST, speed_kmh=140.0, distance=50.0)
+    paused = make_simulator("b", SOUTH)
+    stopped = make_simulator("c", BENT)
+    paused.is_paused = True
+    stopped.is_running = False
+
+    engine = fse.FleetSimulationEngine(seed=3)
+    engine.sync([moving, paused, stopped])
+    engine.step(2.0)
+    assert [u.simulator.trip_id for u in engine.flush()] == ["a"]
+    assert moving.current_position == 1.0 and moving.is_running
+
+    engine.sync([moving, paused, stopped])
+    engine.step(2.0)
+    assert engine.flush() == []
+    assert moving.is_running is False
+    assert paused.distance_traveled == 0.0 and stopped.distance_traveled == 0.0
+
+
+#------------speed profile sets speed, otherwise speed ramps toward the target--------
+def test_speed_profile_and_gradual_ramp():
+    profiled = make_simulator("a", EAST, speed_kmh=50.0, profile={0: 100.0})
+    ramping = make_simulator("b", SOUTH, speed_kmh=50.0)
+    ramping.target_speed = 60.0
+
+    engine = fse.FleetSimulationEngine(seed=4)
+    engine.sync([profiled, ramping])
+    engine.step(2.0)
+    engine.flush()
+
+    assert 90.0 <= profiled.current_speed_kmh <= 110.0
+    assert profiled.speed_change_timer == 0
+    assert ramping.current_speed_kmh == pytest.approx(50.5)
+    assert ramping.speed_change_timer == 1
+
+
+#------------membership changes repack and keep progress--------
+def test_sync_repacks_preserving_progress():
+    a, b = make_simulator("a", EAST), make_simulator("b", SOUTH)
+    engine = fse.FleetSimulationEngine(seed=5)
+    engine.sync([a])
+    engine.step(2.0)
+    engine.flush()
+
+    engine.sync([a, b])
+    assert len(engine) == 2 and "b" in engine
+    engine.step(2.0)
+    engine.flush()
+    assert a.distance_traveled == pytest.approx(40.0)
+    assert b.distance_traveled == pytest.approx(20.0)
+
+    engine.sync([])
+    assert len(engine) == 0 and engine.flush() == []
+
+
+#------------batch geofence containment for circles and polygons--------
+def test_geofences_containing():
+    circle = SimpleNamespace(id="c", geometry=SimpleNamespace(
+        type="Point", coordinates=[28.19, -25.75], properties=SimpleNamespace(radius=500)))
+    square = SimpleNamespace(id="p", geometry=SimpleNamespace(
+        type="Polygon", coordinates=[[[28.0, -26.0], [28.0, -25.0], [29.0, -25.0], [29.0, -26.0]]],
+        properties=SimpleNamespace(radius=None)))
+    lats = np.array([-25.75, -25.5, -24.0])
+    lons = np.array([28.191, 28.5, 28.5])
+
+    assert fse.geofences_containing(lats, lons, [circle, square]) == [{"c", "p"}, {"p"}, set()]
+    assert fse.geofences_containing([], [], [circle]) == []
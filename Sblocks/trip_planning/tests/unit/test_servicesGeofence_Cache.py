@@ -0,0 +1,154 @@
+import os
+import sys
+import asyncio
+import importlib
+from types import SimpleNamespace
+import numpy as np
+import pytest
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+ROOT = os.path.abspath(os.path.join(HERE, "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+PACKAGES = ("schemas", "repositories", "services", "utils", "config", "events")
+
+
+def load_modules():
+    """Import the cache against the real packages, then put back whatever other tests had stubbed"""
+    owned = lambda name: name.split(".")[0] in PACKAGES
+    saved = {name: mod for name, mod in sys.modules.items() if owned(name)}
+    for name in saved:
+        del sys.modules[name]
+    try:
+        return (importlib.import_module("services.geofence_cache"),
+                importlib.import_module("services.fleet_simulation_engine"))
+    finally:
+        for name in [n for n in sys.modules if owned(n)]:
+            del sys.modules[name]
+        sys.modules.update(saved)
+
+
+gc, fse = load_modules()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def circle(fence_id, lat, lon, radius):
+    return SimpleNamespace(id=fence_id, type="restricted", geometry=SimpleNamespace(
+        type="Point", coordinates=[lon, lat], properties=SimpleNamespace(radius=radius)))
+
+
+def polygon(fence_id, ring):
+    return SimpleNamespace(id=fence_id, type="boundary", geometry=SimpleNamespace(
+        type="Polygon", coordinates=[ring], properties=None))
+
+
+def sample_fences(rng):
+    fences = [circle(f"c{i}", rng.uniform(-26.2, -25.7), rng.uniform(28.0, 28.3), rng.uniform(50, 3000))
+              for i in range(40)]
+    for i in range(40):
+        lat, lon = rng.uniform(-26.2, -25.7), rng.uniform(28.0, 28.3)
+        angles = np.sort(rng.uniform(0, 2 * np.pi, 7))
+        radii = rng.uniform(0.002, 0.03, 7)  # Star-shaped, so often concave
+        fences.append(polygon(f"p{i}", [[lon + r * np.cos(a), lat + r * np.sin(a)] for a, r in zip(angles, radii)]))
+    # Covers the whole area: too many cells to grid, so checked everywhere
+    fences.append(polygon("province", [[27.0, -27.0], [29.5, -27.0], [29.5, -25.0], [27.0, -25.0]]))
+    return fences
+
+
+#------------indexed lookups agree with testing every geofence--------
+def test_containing_matches_brute_force():
+    rng = np.random.default_rng(4)
+    fences = sample_fences(rng)
+    index = gc.GeofenceIndex(fences)
+    assert len(index) == len(fences) and index._everywhere == [len(fences) - 1]
+
+    lats = rng.uniform(-26.25, -25.65, 3000)
+    lons = rng.uniform(27.95, 28.35, 3000)
+    expected = fse.geofences_containing(lats, lons, fences)
+    assert [index.containing(lat, lon) for lat, lon in zip(lats, lons)] == expected
+    assert any(len(ids) > 1 for ids in expected)
+
+
+#------------a trip's corridor keeps every fence its route can enter and drops the rest--------
+def test_corridor_prefilter():
+    rng = np.random.default_rng(9)
+    fences = sample_fences(rng)
+    index = gc.GeofenceIndex(fences)
+    route = np.cumsum(rng.normal(0, 0.0004, size=(2000, 2)) + [0.0001, 0.00008], axis=0) + [-26.1, 28.05]
+
+    corridor = index.corridor(route)
+    assert len(corridor) < len(fences) / 2
+    assert len(fences) - 1 in corridor  # The province fence contains the whole route
+
+    # Positions along the route, vertices and between them
+    t = rng.uniform(0, len(route) - 1, 3000)
+    i = t.astype(int)
+    points = route[i] + (route[np.minimum(i + 1, len(route) - 1)] - route[i]) * (t - i)[:, None]
+    for lat, lon in points:
+        assert index.containing(lat, lon, corridor) == index.containing(lat, lon)
+    assert gc.GeofenceIndex([]).corridor(route) == frozenset()
+
+
+#------------cache reloads on invalidation or expiry and keeps the last good index on failure--------
+def test_cache_refresh_and_invalidation():
+    clock = FakeClock()
+    state = {"loads": 0, "fail": False, "fences": [circle("a", -25.75, 28.19, 500)]}
+
+    async def load():
+        state["loads"] += 1
+        await asyncio.sleep(0.01)
+        if state["fail"]:
+            raise RuntimeError("gps db down")
+        return list(state["fences"])
+
+    cache = gc.GeofenceCache(load=load, ttl_s=300, clock=clock)
+
+    async def scenario():
+        first = await asyncio.gather(*(cache.get() for _ in range(5)))
+        assert state["loads"] == 1 and all(index is first[0] for index in first)
+        assert first[0].containing(-25.75, 28.19) == {"a"}
+
+        clock.now += 100
+        assert await cache.get() is first[0]
+
+        state["fences"].append(polygon("b", [[28.0, -26.0], [28.0, -25.0], [29.0, -25.0], [29.0, -26.0]]))
+        cache.invalidate()
+        second = await cache.get()
+        assert second.version == first[0].version + 1
+        assert second.containing(-25.75, 28.19) == {"a", "b"}
+
+        state["fail"] = True
+        clock.now += 300
+        assert await cache.get() is second
+        return second
+
+    asyncio.run(scenario())
+    assert state["loads"] == 3
+    metrics = cache.get_metrics()
+    assert metrics["refreshes"] == 2 and metrics["errors"] == 1 and metrics["invalidations"] == 1
+    assert metrics["geofences"] == 2
+
+
+#------------the default loader surfaces database errors instead of loading nothing--------
+def test_default_loader_keeps_index_when_database_fails(monkeypatch):
+    class FailingCollection:
+        def find(self, query):
+            raise RuntimeError("gps db down")
+
+    monkeypatch.setattr(gc.geofence_service, "db", SimpleNamespace(geofences=FailingCollection()))
+    clock = FakeClock()
+    cache = gc.GeofenceCache(ttl_s=300, clock=clock)
+    good = gc.GeofenceIndex([circle("a", -25.75, 28.19, 500)], version=1)
+    cache.index, cache._loaded_at, cache._stale = good, 0.0, False
+
+    clock.now += 300
+    assert asyncio.run(cache.get()) is good
+    assert cache.get_metrics()["errors"] == 1
@@ -222,3 +222,72 @@ async def test_check_now_calls_trip_service_once_and_returns_value(monkeypatch,
     monkeypatch.setattr(sched_env["module"].trip_service, "mark_missed_trips", mark_once, raising=True)
     out = await s.check_now()
     assert out == 3 and called == [1]
+
+def test_deadline_heap_orders_reschedules_and_removes(sched_env):
+    from datetime import datetime, timedelta
+    t0 = datetime(2025, 1, 1, 8, 0)
+    s = _make(sched_env, clock=lambda: t0)
+    s.schedule("a", t0 + timedelta(minutes=10))
+    s.schedule("b", t0 + timedelta(minutes=5))
+    s.schedule("c", t0 + timedelta(minutes=1))
+    s.schedule("b", t0 + timedelta(minutes=20))  # Edited trip: old entry goes stale
+    s.remove("c")
+    s.schedule("d", None)
+    assert s.next_due() == t0 + timedelta(minutes=10)
+    assert s.pop_due(t0 + timedelta(minutes=15)) == ["a"]
+    assert s.pop_due(t0 + timedelta(minutes=30)) == ["b"]
+    assert s.deadlines == {} and s.next_due() is None
+
+@pytest.mark.asyncio
+async def test_fire_marks_batch_and_reschedules_trips_not_due(monkeypatch, sched_env):
+    from datetime import datetime, timedelta
+    t0 = datetime(2025, 1, 1, 8, 0)
+    s = _make(sched_env, clock=lambda: t0)
+    batches, loads = [], []
+
+    async def mark_trips_missed(trip_ids):
+        batches.append(list(trip_ids))
+        return ["t1", "t2"]
+
+    async def load_missed_trip_deadlines(trip_ids=None):
+        loads.append(trip_ids)
+        return [("t3", t0 + timedelta(minutes=30))]
+
+    svc = sched_env["module"].trip_service
+    monkeypatch.setattr(svc, "mark_trips_missed", mark_trips_missed, raising=False)
+    monkeypatch.setattr(svc, "load_missed_trip_deadlines", load_missed_trip_deadlines, raising=False)
+
+    await s.fire(["t1", "t2", "t3"])
+    assert batches == [["t1", "t2", "t3"]] and loads == [["t3"]]
+    assert s.deadlines["t3"][0] == t0 + timedelta(minutes=30)
+    assert s.metrics["marked_missed"] == 2
+
+@pytest.mark.asyncio
+async def test_deadline_loop_fires_when_trip_becomes_due(monkeypatch, sched_env):
+    from datetime import datetime, timedelta
+    s = _make(sched_env)
+    fired = asyncio.Event()
+    batches = []
+
+    async def load_missed_trip_deadlines(trip_ids=None):
+        return [("late", datetime.utcnow() - timedelta(minutes=1))] if trip_ids is None else []
+
+    async def mark_trips_missed(trip_ids):
+        batches.append(list(trip_ids))
+        fired.set()
+        return list(trip_ids)
+
+    svc = sched_env["module"].trip_service
+    monkeypatch.setattr(svc, "load_missed_trip_deadlines", load_missed_trip_deadlines, raising=False)
+    monkeypatch.setattr(svc, "mark_trips_missed", mark_trips_missed, raising=False)
+
+    await s.start()
+    await asyncio.wait_for(fired.wait(), 1)
+    assert batches == [["late"]]
+    # A trip created while running is picked up without waiting for the periodic check
+    fired.clear()
+    s.schedule("new", datetime.utcnow() + timedelta(milliseconds=20))
+    await asyncio.wait_for(fired.wait(), 1)
+    assert batches[-1] == ["new"]
+    await s.stop()
+    assert s.get_metrics()["trips"] == 0
@@ -0,0 +1,125 @@
+import os
+import asyncio
+import importlib.util
+import pytest
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+MODULE_PATH = os.path.abspath(os.path.join(HERE, "..", "..", "services", "ping_deadline_scheduler.py"))
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location("trip_planning_ping_deadline_scheduler", MODULE_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+pds = load_module()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+async def no_sessions():
+    return []
+
+
+#------------pings push deadlines back; only sessions that go quiet expire--------
+def test_touch_and_pop_expired():
+    clock = FakeClock()
+
+    async def on_expired(trip_id):
+        return None
+
+    scheduler = pds.PingDeadlineScheduler(on_expired, no_sessions, timeout_s=30, clock=clock)
+    scheduler.touch("a")
+    scheduler.touch("b", age_s=20)
+    scheduler.touch("c")
+    assert scheduler.next_due() == 1010.0
+
+    clock.now += 25
+    scheduler.touch("a")  # a keeps pinging, b and c go quiet
+    assert scheduler.pop_expired() == ["b"]
+    clock.now += 10
+    assert scheduler.pop_expired() == ["c"]
+    assert scheduler.pop_expired() == []
+    assert set(scheduler.deadlines) == {"a"} and scheduler.next_due() == 1055.0
+
+    scheduler.remove("a")
+    clock.now += 100
+    assert scheduler.pop_expired() == [] and scheduler.next_due() is None
+
+
+#------------stale heap entries are dropped so memory tracks the number of sessions--------
+def test_heap_stays_bounded():
+    clock = FakeClock()
+    scheduler = pds.PingDeadlineScheduler(None, no_sessions, timeout_s=30, clock=clock)
+    for step in range(200):
+        clock.now += 1
+        for i in range(100):
+            scheduler.touch(f"trip-{i}")
+    assert len(scheduler.deadlines) == 100
+    assert len(scheduler._heap) <= 2 * 100 + pds.HEAP_SLACK_ENTRIES
+    assert scheduler.metrics["compactions"] > 0 and scheduler.metrics["pings"] == 20000
+    assert scheduler.pop_expired(clock.now + 30) == [f"trip-{i}" for i in range(100)]
+
+
+#------------expiry handling: violation opened, ping seen elsewhere, or failure retried--------
+def test_expire_outcomes():
+    clock = FakeClock()
+    outcomes = {"quiet": None, "pinged_elsewhere": 12.0}
+    calls = []
+
+    async def on_expired(trip_id):
+        calls.append(trip_id)
+        if trip_id == "broken":
+            raise RuntimeError("db down")
+        return outcomes[trip_id]
+
+    scheduler = pds.PingDeadlineScheduler(on_expired, no_sessions, timeout_s=30, clock=clock)
+    asyncio.run(scheduler.expire(["quiet", "pinged_elsewhere", "broken"]))
+
+    assert sorted(calls) == ["broken", "pinged_elsewhere", "quiet"]
+    assert "quiet" not in scheduler.deadlines  # In violation until its next ping
+    assert scheduler.deadlines["pinged_elsewhere"][0] == 1018.0
+    assert scheduler.deadlines["broken"][0] == 1030.0
+    assert scheduler.metrics["expirations"] == 2 and scheduler.metrics["errors"] == 1
+    assert scheduler.metrics["rescheduled"] == 2
+
+
+#------------deadlines are recovered on start and the loop expires only quiet sessions--------
+def test_recover_and_run():
+    opened = []
+
+    async def load_sessions():
+        return [("overdue", 5.0), ("recent", 0.0), ("quiet", 0.0)]
+
+    async def on_expired(trip_id):
+        opened.append(trip_id)
+        return None
+
+    scheduler = pds.PingDeadlineScheduler(on_expired, load_sessions, timeout_s=0.2)
+
+    async def scenario():
+        await scheduler.start()
+        await asyncio.sleep(0.05)
+        assert opened == ["overdue"]  # Its deadline had passed while the service was down
+        for _ in range(6):
+            scheduler.touch("recent")
+            await asyncio.sleep(0.05)
+        assert opened == ["overdue", "quiet"]
+
+        scheduler.touch("late", age_s=0.19)  # Earlier than anything the loop is waiting on
+        await asyncio.sleep(0.05)
+        assert opened[-1] == "late"
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+    metrics = scheduler.get_metrics()
+    assert metrics["recovered"] == 3 and metrics["expirations"] == 3
+    assert metrics["sessions"] == 1 and not scheduler.running
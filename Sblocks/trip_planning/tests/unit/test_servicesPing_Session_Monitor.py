@@ -0,0 +1,158 @@
+import os
+import sys
+import asyncio
+import importlib
+from collections import Counter
+import pytest
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+ROOT = os.path.abspath(os.path.join(HERE, "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+PACKAGES = ("schemas", "repositories", "services", "utils", "config", "events")
+
+
+def load_module():
+    """Import the monitor against the real packages, then put back whatever other tests had stubbed"""
+    owned = lambda name: name.split(".")[0] in PACKAGES
+    saved = {name: mod for name, mod in sys.modules.items() if owned(name)}
+    for name in saved:
+        del sys.modules[name]
+    try:
+        return importlib.import_module("services.ping_session_monitor")
+    finally:
+        for name in [n for n in sys.modules if owned(n)]:
+            del sys.modules[name]
+        sys.modules.update(saved)
+
+
+psm = load_module()
+
+
+def matches(doc, query):
+    for key, value in query.items():
+        if isinstance(value, dict) and "$in" in value:
+            if doc.get(key) not in value["$in"]:
+                return False
+        elif isinstance(value, dict) and "$nin" in value:
+            if doc.get(key) in value["$nin"]:
+                return False
+        elif doc.get(key) != value:
+            return False
+    return True
+
+
+class Cursor:
+    def __init__(self, docs):
+        self.docs = iter(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class Collection:
+    def __init__(self, name, ops):
+        self.name = name
+        self.ops = ops
+        self.docs = []
+        self.raced = set()  # Trip ids another instance inserts just before us
+
+    def find(self, query, projection=None):
+        self.ops[f"{self.name}.find"] += 1
+        return Cursor([dict(doc) for doc in self.docs if matches(doc, query)])
+
+    async def find_one(self, query, projection=None):
+        self.ops[f"{self.name}.find_one"] += 1
+        return next((dict(doc) for doc in self.docs if matches(doc, query)), None)
+
+    async def distinct(self, key, query):
+        self.ops[f"{self.name}.distinct"] += 1
+        return list({doc[key] for doc in self.docs if matches(doc, query)})
+
+    async def insert_many(self, docs, ordered=True):
+        self.ops[f"{self.name}.insert_many"] += 1
+        assert not ordered
+        inserted, errors = [], []
+        for index, doc in enumerate(docs):
+            if doc["trip_id"] in self.raced:
+                errors.append({"index": index, "code": 11000, "errmsg": "duplicate key"})
+                continue
+            self.docs.append({**doc, "_id": ObjectId()})
+            inserted.append(self.docs[-1]["_id"])
+        if errors:
+            raise BulkWriteError({"nInserted": len(inserted), "writeErrors": errors})
+        return type("Result", (), {"inserted_ids": inserted})()
+
+    def aggregate(self, pipeline):
+        self.ops[f"{self.name}.aggregate"] += 1
+        field = pipeline[0]["$group"]["_id"].lstrip("$")
+        counts = Counter(doc.get(field) for doc in self.docs)
+        return Cursor([{"_id": value, "count": count} for value, count in counts.items()])
+
+
+class Database:
+    def __init__(self):
+        self.ops = Counter()
+        self.trips = Collection("trips", self.ops)
+        self.driver_ping_sessions = Collection("driver_ping_sessions", self.ops)
+
+
+def make_monitor():
+    db = Database()
+    monitor = psm.PingSessionMonitor()
+    monitor.db = db
+    statuses = ["scheduled", "in_progress", "paused", "completed", "cancelled", "in_progress"]
+    for i, status in enumerate(statuses):
+        db.trips.docs.append({"_id": ObjectId(), "status": status, "driver_assignment": f"d{i}"})
+    db.trips.docs.append({"_id": ObjectId(), "status": "scheduled", "driver_assignment": None})
+    trip_ids = [str(trip["_id"]) for trip in db.trips.docs]
+    db.driver_ping_sessions.docs.append({"_id": ObjectId(), "trip_id": trip_ids[1], "driver_id": "d1", "is_active": True})
+    return monitor, db, trip_ids
+
+
+#------------the sweep creates missing sessions of live trips in a fixed number of queries--------
+def test_sweep_creates_missing_live_sessions():
+    monitor, db, trip_ids = make_monitor()
+
+    assert asyncio.run(monitor.check_now()) == 3
+    created = {doc["trip_id"]: doc for doc in db.driver_ping_sessions.docs[1:]}
+    assert set(created) == {trip_ids[0], trip_ids[2], trip_ids[5]}
+    assert created[trip_ids[5]]["driver_id"] == "d5" and not created[trip_ids[5]]["is_active"]
+    assert db.ops == Counter({"trips.find": 1, "driver_ping_sessions.distinct": 1,
+                              "driver_ping_sessions.insert_many": 1})
+
+    assert asyncio.run(monitor.check_now()) == 0
+    assert db.ops["driver_ping_sessions.insert_many"] == 1  # Nothing left to insert
+
+
+#------------sessions another instance created first are skipped, not counted--------
+def test_sweep_race_with_other_instance():
+    monitor, db, trip_ids = make_monitor()
+    db.driver_ping_sessions.raced = {trip_ids[2]}
+
+    assert asyncio.run(monitor.check_now()) == 2
+
+
+#------------force create covers finished trips; status comes from two aggregations--------
+def test_force_create_and_status():
+    monitor, db, trip_ids = make_monitor()
+
+    status = asyncio.run(monitor.get_status())
+    assert status["total_trips_with_drivers"] == 4
+    assert status["ping_sessions"] == {"total": 1, "active": 1, "inactive": 0, "missing": 3}
+    assert status["trips_by_status"] == {"scheduled": 2, "in_progress": 2, "paused": 1, "completed": 1, "cancelled": 1}
+    assert "driver_ping_sessions.find_one" not in db.ops
+
+    result = asyncio.run(monitor.force_create_all_ping_sessions())
+    assert result == {"trips_with_drivers": 6, "missing_sessions": 5, "sessions_created": 5}
+    status = asyncio.run(monitor.get_status())
+    assert status["ping_sessions"] == {"total": 6, "active": 1, "inactive": 5, "missing": 0}
@@ -0,0 +1,142 @@
+import os
+import asyncio
+import importlib.util
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import pytest
+from bson import ObjectId
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+MODULE_PATH = os.path.abspath(os.path.join(HERE, "..", "..", "services", "ping_session_store.py"))
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location("trip_planning_ping_session_store", MODULE_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+pss = load_module()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeSessions:
+    def __init__(self):
+        self.writes = []
+        self.fail = False
+
+    async def bulk_write(self, operations, ordered=True):
+        if self.fail:
+            raise RuntimeError("db down")
+        self.writes.append((list(operations), ordered))
+
+
+def session(trip_id, last_ping_time=None):
+    return SimpleNamespace(id=str(ObjectId()), trip_id=trip_id, driver_id="driver", is_active=True,
+                           last_ping_time=last_ping_time, last_ping_location=None,
+                           current_violation_id=None, total_violations=0)
+
+
+#------------trip statuses are loaded together, served from memory and dropped on events or expiry--------
+def test_trip_status_cache():
+    clock = FakeClock()
+    loads = []
+
+    async def load(trip_ids):
+        loads.append(list(trip_ids))
+        return {t: {"status": "in_progress", "driver_assignment": "d"} for t in trip_ids if t != "gone"}
+
+    cache = pss.TripStatusCache(load=load, ttl_s=30, clock=clock)
+
+    async def scenario():
+        first = await cache.get_many(["a", "b", "a", "gone"])
+        assert first["a"]["status"] == "in_progress" and first["gone"] is None
+        await cache.get_many(["a", "b", "gone"])
+        cache.invalidate("a")
+        await cache.get("a")
+        clock.now += 30
+        await cache.get_many(["a", "b"])
+
+    asyncio.run(scenario())
+    assert loads == [["a", "b", "gone"], ["a"], ["a", "b"]]
+    assert cache.get_metrics() == {"hits": 3, "misses": 6, "invalidations": 1, "trips": 3}
+
+
+#------------entries failing cacheable are re-read on every lookup--------
+def test_trip_status_cache_skips_uncacheable():
+    statuses = {"a": "scheduled"}
+    loads = []
+
+    async def load(trip_ids):
+        loads.append(list(trip_ids))
+        return {t: {"status": statuses[t], "driver_assignment": "d"} for t in trip_ids}
+
+    cache = pss.TripStatusCache(load=load, ttl_s=30, clock=FakeClock(),
+                                cacheable=lambda trip: bool(trip) and trip["status"] == "in_progress")
+
+    async def scenario():
+        assert (await cache.get("a"))["status"] == "scheduled"
+        statuses["a"] = "in_progress"  # Started without an event reaching this instance
+        assert (await cache.get("a"))["status"] == "in_progress"
+        assert (await cache.get("a"))["status"] == "in_progress"
+
+    asyncio.run(scenario())
+    assert loads == [["a"], ["a"]]
+
+
+#------------pings are coalesced into one unordered bulk write per flush--------
+def test_pings_coalesced_into_bulk_write():
+    sessions = FakeSessions()
+    store = pss.PingSessionStore(collection=lambda: sessions, clock=FakeClock())
+    t0 = datetime(2026, 1, 1, 8, 0, 0)
+    a, b = store.put(session("a")), store.put(session("b"))
+
+    for seconds in (5, 15, 10):  # The late arrival does not move the last ping back
+        store.record_ping(a, {"coordinates": [28.0, -25.0 - seconds]}, t0 + timedelta(seconds=seconds))
+    store.record_ping(b, {"coordinates": [28.1, -25.1]}, t0)
+
+    assert asyncio.run(store.flush()) == 2
+    operations, ordered = sessions.writes[0]
+    assert not ordered
+    by_id = {op._filter["_id"]: op._doc for op in operations}
+    assert by_id[ObjectId(a.session_id)]["$inc"] == {"ping_count": 3}
+    assert by_id[ObjectId(a.session_id)]["$set"]["last_ping_time"] == t0 + timedelta(seconds=15)
+    assert by_id[ObjectId(a.session_id)]["$set"]["last_ping_location"] == {"coordinates": [28.0, -40.0]}
+    assert by_id[ObjectId(b.session_id)]["$inc"] == {"ping_count": 1}
+
+    assert asyncio.run(store.flush()) == 0  # Nothing new to write
+    assert len(sessions.writes) == 1
+
+
+#------------a failed flush keeps its pings for the next one; reloading a session keeps unwritten pings--------
+def test_failed_flush_and_reload():
+    sessions = FakeSessions()
+    store = pss.PingSessionStore(collection=lambda: sessions, clock=FakeClock())
+    t0 = datetime(2026, 1, 1, 8, 0, 0)
+    state = store.put(session("a"))
+    store.record_ping(state, {"coordinates": [28.0, -25.0]}, t0)
+    store.record_ping(state, {"coordinates": [28.0, -25.0]}, t0 + timedelta(seconds=5))
+
+    sessions.fail = True
+    with pytest.raises(RuntimeError):
+        asyncio.run(store.flush())
+    assert store.get_metrics()["unflushed_sessions"] == 1
+
+    reloaded = store.put(session("a", last_ping_time=t0 - timedelta(minutes=1)))
+    assert reloaded.unflushed_pings == 2 and reloaded.last_ping_time == t0 + timedelta(seconds=5)
+    store.record_ping(reloaded, {"coordinates": [28.0, -25.0]}, t0 + timedelta(seconds=10))
+
+    sessions.fail = False
+    asyncio.run(store.evict("a"))
+    (operation,), _ = sessions.writes[0]
+    assert operation._doc["$inc"] == {"ping_count": 3}
+    assert store.get("a") is None
+    assert store.get_metrics()["errors"] == 1
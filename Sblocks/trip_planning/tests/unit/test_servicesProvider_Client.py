@@ -0,0 +1,116 @@
+import os
+import asyncio
+import time
+import importlib.util
+import pytest
+from aiohttp import web
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+MODULE_PATH = os.path.abspath(os.path.join(HERE, "..", "..", "services", "provider_client.py"))
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location("trip_planning_provider_client", MODULE_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+pc = load_module()
+
+
+async def start_server(delay_s=0.05):
+    """Stub provider: /ok echoes the query after a delay, /fail returns 503; tracks peak concurrency"""
+    state = {"active": 0, "peak": 0}
+
+    async def ok(request):
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(delay_s)
+        state["active"] -= 1
+        return web.json_response({"query": dict(request.query)})
+
+    async def fail(request):
+        return web.Response(status=503, text="over capacity")
+
+    app = web.Application()
+    app.router.add_get("/ok", ok)
+    app.router.add_get("/fail", fail)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{runner.addresses[0][1]}", state
+
+
+#------------token bucket allows a burst then paces to the rate--------
+def test_token_bucket_paces_requests():
+    async def scenario():
+        bucket = pc.TokenBucket(rate=50.0, burst=2)
+        start = time.monotonic()
+        waits = [await bucket.acquire() for _ in range(6)]
+        return time.monotonic() - start, waits
+
+    elapsed, waits = asyncio.run(scenario())
+    assert waits[:2] == [0.0, 0.0]
+    assert all(w > 0 for w in waits[2:])
+    assert elapsed >= 4 / 50.0 * 0.9
+
+
+#------------requests share a pool, respect concurrency and record metrics--------
+def test_request_concurrency_errors_and_metrics():
+    async def scenario():
+        runner, base, state = await start_server()
+        client = pc.ProviderClient()
+        client.configure("ors", rate=1000.0, burst=100, concurrency=2)
+        try:
+            results = await asyncio.gather(*(client.get("ors", f"{base}/ok", params={"n": str(i)}) for i in range(6)))
+            with pytest.raises(pc.ProviderError) as failure:
+                await client.get("ors", f"{base}/fail")
+            return results, state["peak"], failure.value, client.get_metrics()
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+    results, peak, failure, metrics = asyncio.run(scenario())
+    assert [r["query"]["n"] for r in results] == [str(i) for i in range(6)]
+    assert peak == 2
+    assert failure.status == 503 and failure.body == "over capacity"
+    ors = metrics["ors"]
+    assert ors["requests"] == 7 and ors["errors"] == 1 and ors["in_flight"] == 0
+    assert ors["latency_ms"]["p50"] >= 50
+
+
+#------------hedging races a backup only when the primary is slow or fails--------
+def test_hedge():
+    client = pc.ProviderClient()
+    cancelled = []
+
+    def call(value, delay_s, fail=False):
+        async def run():
+            try:
+                await asyncio.sleep(delay_s)
+            except asyncio.CancelledError:
+                cancelled.append(value)
+                raise
+            if fail:
+                raise RuntimeError("down")
+            return value
+        return run
+
+    async def scenario():
+        fast_primary = await client.hedge([("ors", call("ors", 0.01)), ("mapbox", call("mapbox", 0.0))], delay_s=0.2)
+        slow_primary = await client.hedge([("ors", call("ors", 1.0)), ("mapbox", call("mapbox", 0.01))], delay_s=0.05)
+        start = time.monotonic()
+        failed_primary = await client.hedge([("ors", call("ors", 0.0, fail=True)), ("mapbox", call("mapbox", 0.0))],
+                                            delay_s=5.0)
+        failover_s = time.monotonic() - start
+        nothing = await client.hedge([("ors", call(None, 0.0)), ("mapbox", call([], 0.0))], delay_s=5.0)
+        return fast_primary, slow_primary, failed_primary, failover_s, nothing
+
+    fast_primary, slow_primary, failed_primary, failover_s, nothing = asyncio.run(scenario())
+    assert fast_primary == "ors"
+    assert slow_primary == "mapbox" and cancelled == ["ors"]
+    assert failed_primary == "mapbox" and failover_s < 1.0
+    assert nothing == []
+    assert client.stats["mapbox"].hedges_started == 1 and client.stats["mapbox"].hedges_won == 2
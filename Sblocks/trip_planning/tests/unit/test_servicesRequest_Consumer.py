@@ -201,8 +201,8 @@ def _install_stubs():
 
     serv_an = _ensure("services.analytics_service")
     class _ASvc:
-        def get_analytics_first(self, start, end): return {"drivers": True, "range": (start.isoformat(), end.isoformat())}
-        def get_analytics_second(self, start, end): return {"vehicles": True, "range": (start.isoformat(), end.isoformat())}
+        async def get_analytics_first(self, start, end): return {"drivers": True, "range": (start.isoformat(), end.isoformat())}
+        async def get_analytics_second(self, start, end): return {"vehicles": True, "range": (start.isoformat(), end.isoformat())}
         async def get_trip_history_stats(self, days=None): return {"days": days if days is not None else "default"}
     serv_an.analytics_service = _ASvc()
 
@@ -421,6 +421,66 @@ async def test_analytics_requests_drivers_vehicles_and_history_stats_and_unknown
     assert out4["status"] == "error"
 
 
+@pytest.mark.asyncio
+async def test_driver_behavior_reports_are_served_in_process(monkeypatch):
+    mod, Service = _load_consumer_isolated()
+    svc = Service()
+    calls = []
+    class _DBSvc:
+        async def get_report(self, report, period=None, driver_id=None):
+            calls.append((report, period, driver_id))
+            if report == "unknown":
+                raise ValueError("Unknown driver behavior report: unknown")
+            return {"message": "ok", "data": {"report": report}}
+    stub = types.ModuleType("services.driver_behavior_service")
+    stub.driver_behavior_service = _DBSvc()
+    monkeypatch.setitem(sys.modules, "services.driver_behavior_service", stub)
+
+    out1 = await svc._handle_driver_behavior_analytics_requests(
+        "GET", {"endpoint": "driver-behavior/violation-trends?period=30d&driver_id=D1", "data": {}})
+    out2 = await svc._handle_driver_behavior_analytics_requests(
+        "GET", {"endpoint": "driver-behavior/performance-metrics?period=30d", "data": {"period": "90d"}})
+    out3 = await svc._handle_driver_behavior_analytics_requests("GET", {"endpoint": "driver-behavior/unknown"})
+    out4 = await svc._handle_driver_behavior_analytics_requests("GET", {"endpoint": "driver-behavior"})
+    assert out1["status"] == "success" and out1["data"] == {"report": "violation-trends"}
+    assert out2["status"] == "success" and out2["message"] == "ok"
+    assert out3["status"] == "error" and out4["status"] == "error"
+    assert calls == [("violation-trends", "30d", "D1"), ("performance-metrics", "90d", None), ("unknown", None, None)]
+
+@pytest.mark.asyncio
+async def test_violation_batches_are_ingested(monkeypatch):
+    mod, Service = _load_consumer_isolated()
+    svc = Service()
+    calls = []
+    class _Ingest:
+        async def ingest(self, events):
+            calls.append(("ingest", events))
+            return {"received": len(events), "inserted": len(events), "rejected": []}
+        async def submit(self, events):
+            calls.append(("submit", events))
+            return {"received": len(events), "queued": 0, "rejected": [], "buffer_full": True}
+    class _Batch:
+        def __init__(self, violations, wait=True):
+            self.violations, self.wait = violations, wait
+    stub = types.ModuleType("services.violation_ingest_service")
+    stub.violation_ingest_service = _Ingest()
+    monkeypatch.setitem(sys.modules, "services.violation_ingest_service", stub)
+    monkeypatch.setattr(sys.modules["schemas.requests"], "ViolationBatchRequest", _Batch, raising=False)
+    routed = []
+    async def h_violations(m, u): routed.append(u["endpoint"]); return {"v": "ok"}
+
+    out1 = await svc._handle_violations_request("POST", {"endpoint": "violations/batch", "data": {"violations": [{"type": "speeding"}]}})
+    out2 = await svc._handle_violations_request("POST", {"endpoint": "violations/batch", "data": {"violations": [{}], "wait": False}})
+    out3 = await svc._handle_violations_request("GET", {"endpoint": "violations/batch", "data": {}})
+    out4 = await svc._handle_violations_request("POST", {"endpoint": "violations/batch", "data": {}})
+    assert out1["status"] == "success" and out1["data"]["inserted"] == 1
+    assert out2["status"] == "error" and out3["status"] == "error" and out4["status"] == "error"
+    assert calls == [("ingest", [{"type": "speeding"}]), ("submit", [{}])]
+
+    monkeypatch.setattr(svc, "_handle_violations_request", h_violations)
+    assert await svc._route_request("POST", {"data": {}}, "/violations/batch") == {"v": "ok"}
+    assert routed == ["violations/batch"]
+
 @pytest.mark.asyncio
 async def test_health_docs_metrics_get_and_bad_methods():
     mod, Service = _load_consumer_isolated()
@@ -0,0 +1,214 @@
+import os
+import asyncio
+import importlib.util
+from datetime import datetime
+import pytest
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+ROOT = os.path.abspath(os.path.join(HERE, "..", ".."))
+MODULE_PATH = os.path.join(ROOT, "services", "route_cache.py")
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location("trip_planning_route_cache", MODULE_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+rc = load_module()
+
+ROUTE = [[-25.7487 + i * 0.001, 28.2380 + i * 0.0005] for i in range(50)]
+GEOAPIFY = {
+    "results": [{
+        "distance": 6000.0,
+        "time": 400.0,
+        "geometry": [[{"lat": lat, "lon": lon} for lat, lon in ROUTE]],
+        "legs": [{"steps": [{"from_index": 0, "to_index": 49, "speed_limit": 60}]}],
+    }]
+}
+
+
+class FakeCollection:
+    """find_one/replace_one over a dict, honouring the expires_at filter"""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, query):
+        doc = self.docs.get(query["_id"])
+        if doc and doc["expires_at"] > query["expires_at"]["$gt"]:
+            return doc
+        return None
+
+    async def replace_one(self, query, doc, upsert=False):
+        self.docs[query["_id"]] = doc
+
+
+def make_fetch(value, delay=0.0):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return value
+    return fetch, calls
+
+
+#------------keys quantise waypoints and separate options--------
+def test_route_cache_key():
+    key = rc.route_cache_key("geoapify", [(-25.74871, 28.23802), (-25.86, 28.19)])
+    assert key == rc.route_cache_key("geoapify", [(-25.748712, 28.238018), (-25.86, 28.19)])
+    assert key != rc.route_cache_key("geoapify", [(-25.7497, 28.2380), (-25.86, 28.19)])
+    assert key != rc.route_cache_key("ors_route", [(-25.74871, 28.23802), (-25.86, 28.19)])
+    assert key != rc.route_cache_key("geoapify", [(-25.74871, 28.23802), (-25.86, 28.19)], avoid=["tolls"])
+    assert rc.route_cache_key("g", [(0, 0), (1, 1)], avoid=["a", "b"], x=None) == rc.route_cache_key("g", [(0, 0), (1, 1)], avoid=["b", "a"])
+
+
+#------------stored documents use encoded polylines--------
+def test_pack_and_unpack_polylines():
+    packed = rc.pack_polylines(GEOAPIFY)
+    assert "__polyline_latlon__" in packed["results"][0]["geometry"][0]
+    assert len(repr(packed)) < len(repr(GEOAPIFY)) / 3
+
+    restored = rc.unpack_polylines(packed)
+    assert restored["results"][0]["legs"] == GEOAPIFY["results"][0]["legs"]
+    for got, want in zip(restored["results"][0]["geometry"][0], GEOAPIFY["results"][0]["geometry"][0]):
+        assert (got["lat"], got["lon"]) == pytest.approx((want["lat"], want["lon"]), abs=1e-6)
+
+    pairs = rc.unpack_polylines(rc.pack_polylines({"coordinates": ROUTE, "summary": (1.0, 2.0)}))
+    assert [c for p in pairs["coordinates"] for c in p] == pytest.approx([c for p in ROUTE for c in p], abs=1e-6)
+    assert pairs["summary"] == [1.0, 2.0]  # A single pair is not a polyline
+
+
+#------------pairs outside the geometry fields are stored exactly--------
+def test_pack_leaves_non_geometry_pairs_alone():
+    value = {
+        "coordinates": ROUTE,
+        "way_points": [[0, 49], [49, 120]],
+        "samples": [[12.3456789, 1700.0], [98.7654321, 1800.0]],
+        "routes": [{"geometry": {"type": "LineString", "coordinates": ROUTE}, "legs": [[1, 2], [3, 4]]}],
+    }
+    packed = rc.pack_polylines(value)
+    assert "__polyline__" in packed["coordinates"]
+    assert "__polyline__" in packed["routes"][0]["geometry"]["coordinates"]
+    assert packed["way_points"] == value["way_points"] and packed["samples"] == value["samples"]
+    restored = rc.unpack_polylines(packed)
+    assert restored["way_points"] == [[0, 49], [49, 120]]
+    assert all(isinstance(i, int) for p in restored["way_points"] for i in p)
+    assert restored["samples"] == value["samples"] and restored["routes"][0]["legs"] == [[1, 2], [3, 4]]
+
+
+#------------memory tier: hits, LRU eviction and TTL--------
+def test_memory_tier_lru_and_ttl(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(rc.time, "time", lambda: clock[0])
+    a, b, c = [(0, 0), (1, 1)], [(0, 0), (2, 2)], [(0, 0), (3, 3)]
+
+    async def lru():
+        cache = rc.RouteCache(max_entries=2, persistent=False)
+        fetch, calls = make_fetch({"distance": 1})
+        first = await cache.get_or_fetch("p", a, fetch)
+        first["distance"] = 99  # Callers get copies
+        assert await cache.get_or_fetch("p", a, fetch) == {"distance": 1}
+        await cache.get_or_fetch("p", b, fetch)
+        await cache.get_or_fetch("p", a, fetch)  # a is now most recent
+        await cache.get_or_fetch("p", c, fetch)  # Evicts b
+        await cache.get_or_fetch("p", a, fetch)
+        assert len(calls) == 3
+        await cache.get_or_fetch("p", b, fetch)
+        assert len(calls) == 4
+        return cache.get_metrics()
+
+    metrics = asyncio.run(lru())
+    assert metrics["misses"] == 4 and metrics["memory_hits"] == 3 and metrics["evictions"] == 2
+    assert metrics["hit_ratio"] == pytest.approx(3 / 7, abs=1e-4)
+
+    async def ttl():
+        cache = rc.RouteCache(ttl_seconds=100, traffic_ttl_seconds=10, persistent=False)
+        fetch, calls = make_fetch({"distance": 1})
+        await cache.get_or_fetch("p", a, fetch, traffic=True)
+        await cache.get_or_fetch("p", a, fetch)  # Traffic and free-flow results are kept apart
+        clock[0] += 11
+        await cache.get_or_fetch("p", a, fetch, traffic=True)  # Short TTL lapsed
+        await cache.get_or_fetch("p", a, fetch)  # Long TTL still valid
+        return len(calls)
+
+    assert asyncio.run(ttl()) == 3
+
+
+#------------concurrent identical lookups share one provider call--------
+def test_request_coalescing():
+    cache = rc.RouteCache(persistent=False)
+
+    async def scenario():
+        fetch, calls = make_fetch(GEOAPIFY, delay=0.05)
+        results = await asyncio.gather(*(cache.get_or_fetch("geoapify", [(0, 0), (1, 1)], fetch) for _ in range(10)))
+        return calls, results
+
+    calls, results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert all(r == GEOAPIFY for r in results)
+    assert results[0] is not results[1]
+    assert cache.stats["coalesced"] == 9
+
+
+#------------failures reach every waiter and are not cached--------
+def test_failures_are_not_cached():
+    cache = rc.RouteCache(persistent=False)
+
+    async def scenario():
+        calls = []
+
+        async def failing():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            raise RuntimeError("provider down")
+
+        outcomes = await asyncio.gather(
+            *(cache.get_or_fetch("p", [(0, 0), (1, 1)], failing) for _ in range(3)), return_exceptions=True
+        )
+        assert all(isinstance(o, RuntimeError) for o in outcomes) and len(calls) == 1
+
+        fetch, none_calls = make_fetch(None)
+        await cache.get_or_fetch("p", [(0, 0), (1, 1)], fetch)
+        await cache.get_or_fetch("p", [(0, 0), (1, 1)], fetch)
+        return len(none_calls)
+
+    assert asyncio.run(scenario()) == 2
+    assert cache.get_metrics()["entries"] == 0
+
+
+#------------persistent tier survives a cold process--------
+def test_persistent_tier_round_trip():
+    collection = FakeCollection()
+
+    async def scenario():
+        warm = rc.RouteCache(collection=lambda: collection)
+        fetch, calls = make_fetch(GEOAPIFY)
+        await warm.get_or_fetch("geoapify", [(0, 0), (1, 1)], fetch)
+
+        [doc] = collection.docs.values()
+        assert doc["provider"] == "geoapify" and doc["expires_at"] > datetime.utcnow()
+        assert "__polyline_latlon__" in doc["value"]["results"][0]["geometry"][0]
+
+        cold = rc.RouteCache(collection=lambda: collection)
+        value = await cold.get_or_fetch("geoapify", [(0, 0), (1, 1)], fetch)
+        await cold.get_or_fetch("geoapify", [(0, 0), (1, 1)], fetch)
+        return calls, value, cold.get_metrics()
+
+    calls, value, metrics = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert value["results"][0]["distance"] == 6000.0
+    assert metrics["persistent_hits"] == 1 and metrics["memory_hits"] == 1
+
+
+#------------an unconnected database just skips the tier--------
+def test_unconnected_database_is_skipped():
+    def not_connected():
+        raise RuntimeError("Database not connected")
+
+    cache = rc.RouteCache(collection=not_connected)
+    fetch, calls = make_fetch({"distance": 1})
+    assert asyncio.run(cache.get_or_fetch("p", [(0, 0), (1, 1)], fetch)) == {"distance": 1}
+    assert cache.stats["persistent_errors"] == 0
@@ -374,4 +374,30 @@ def test_stop_simulation_service_clears_and_flags():
     svc.is_running = True
     svc.stop_simulation_service()
     assert svc.is_running is False
-    assert svc.active_simulators == {}
\ No newline at end of file
+    assert svc.active_simulators == {}
+@pytest.mark.asyncio
+async def test_update_all_simulations_writes_one_bulk_per_tick(monkeypatch):
+    svc = SimulationService()
+    for i in range(3):
+        route = Route(coordinates=[(0,0),(0,1)], distance=0.0, duration=0.0)
+        route.distance = VehicleSimulator("x","x",route).calculate_distance(0,0,0,1)
+        sim = VehicleSimulator(f"T{i}", f"V{i}", route, speed_kmh=36)
+        sim.is_running = True
+        svc.active_simulators[sim.trip_id] = sim
+
+    writes = []
+    class _GPS:
+        async def bulk_write(self, ops, ordered=True): writes.append((len(ops), ordered)); return SimpleNamespace()
+    monkeypatch.setattr(simulation_service_module, "db_manager_gps", SimpleNamespace(locations=_GPS()))
+    cache = type(simulation_service_module.geofence_cache)(load=_no_geofences)
+    monkeypatch.setattr(simulation_service_module, "geofence_cache", cache)
+
+    await svc.update_all_simulations(steps=3)
+    assert writes == [(3, False)]
+    for sim in svc.active_simulators.values():
+        assert sim.distance_traveled > 0
+        assert sim.current_position == pytest.approx(sim.distance_traveled / sim.route.distance)
+    assert cache.stats["refreshes"] == 1
+
+async def _no_geofences(**kwargs):
+    return []
@@ -0,0 +1,134 @@
+import os
+import asyncio
+import importlib.util
+from types import SimpleNamespace
+import pytest
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+MODULE_PATH = os.path.abspath(os.path.join(HERE, "..", "..", "services", "traffic_check_scheduler.py"))
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location("trip_planning_traffic_check_scheduler", MODULE_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+tcs = load_module()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def trip(trip_id):
+    return SimpleNamespace(id=trip_id)
+
+
+#------------check interval adapts to distance left, volatility and pending recommendations--------
+def test_next_check_delay():
+    delay = lambda *args: tcs.next_check_delay(*args, base_s=300, min_s=60, max_s=1800)
+
+    assert delay(None, [], False) == 300
+    assert delay(40.0, [], False) == 150          # Long way to go: check more often
+    assert delay(5.0, [], False) == 900           # Nearly there: check less often
+    assert delay(1.0, [1.0], False) == 1800       # A reroute can no longer help
+    assert delay(20.0, [1.0, 1.0, 1.0], False) == 300
+    assert delay(20.0, [1.0, 1.4, 1.0], False) < 200   # Traffic has been changing
+    assert delay(20.0, [1.0, 1.6], False) < delay(20.0, [1.0, 1.1], False)
+    assert delay(40.0, [1.0, 2.5], True) == 900   # Waiting on the fleet manager
+    assert delay(100.0, [1.0, 3.0, 1.0], False) == 60
+
+
+#------------sync adds and drops trips; due trips come out in order and are rescheduled--------
+def test_sync_and_schedule():
+    clock = FakeClock()
+    trips = {"a": trip("a"), "b": trip("b")}
+    pending = set()
+    results = {"a": tcs.TrafficCheck(remaining_km=40.0, traffic_ratio=1.0),
+               "b": tcs.TrafficCheck(remaining_km=5.0, traffic_ratio=2.5, recommended=True)}
+    checked = []
+
+    async def check_trip(t):
+        checked.append(t.id)
+        return results[t.id]
+
+    async def load_trips():
+        return list(trips.values())
+
+    async def load_pending():
+        return set(pending)
+
+    scheduler = tcs.TrafficCheckScheduler(check_trip, load_trips, load_pending, workers=2,
+                                          base_s=300, min_s=60, max_s=1800, clock=clock)
+
+    async def scenario():
+        await scheduler.sync()
+        due = scheduler.pop_due()
+        assert sorted(due) == ["a", "b"] and scheduler.pop_due() == []
+        for trip_id in due:
+            await scheduler.run_check(trip_id)
+        assert scheduler.states["a"].due_at == clock.now + 150
+        assert scheduler.states["b"].due_at == clock.now + 900   # Pending recommendation backs it off
+        assert scheduler.pending == {"b"}
+
+        pending.add("b")
+        trips["c"] = trip("c")
+        del trips["a"]
+        await scheduler.sync()
+        assert set(scheduler.states) == {"b", "c"} and scheduler.pop_due() == ["c"]
+        results["c"] = tcs.TrafficCheck(remaining_km=20.0, traffic_ratio=1.0)
+        await scheduler.run_check("c")
+
+        # Recommendation answered: b is brought forward to its heavy-traffic interval
+        pending.clear()
+        clock.now += 10
+        await scheduler.sync()
+        assert scheduler.states["b"].due_at == pytest.approx(clock.now + 450)
+        clock.now += 300
+        return scheduler.pop_due()
+
+    assert asyncio.run(scenario()) == ["c"]
+    assert checked == ["a", "b", "c"]
+    metrics = scheduler.get_metrics()
+    assert metrics["checks"] == 3 and metrics["recommendations"] == 1 and metrics["active_trips"] == 2
+
+
+#------------the worker pool bounds concurrent checks and survives failures--------
+def test_worker_pool_runs_due_checks():
+    trips = [trip(f"t{i}") for i in range(12)]
+    state = {"active": 0, "peak": 0, "calls": 0}
+
+    async def check_trip(t):
+        state["calls"] += 1
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.01)
+        state["active"] -= 1
+        if t.id == "t0":
+            raise RuntimeError("provider down")
+        return tcs.TrafficCheck(remaining_km=20.0, traffic_ratio=1.0)
+
+    async def load_trips():
+        return trips
+
+    async def load_pending():
+        return []
+
+    scheduler = tcs.TrafficCheckScheduler(check_trip, load_trips, load_pending, workers=3,
+                                          sync_interval_s=60, base_s=0.2, min_s=0.2, max_s=1.0)
+
+    async def scenario():
+        await scheduler.start()
+        await asyncio.sleep(0.5)
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+    assert state["peak"] == 3
+    assert state["calls"] >= 24  # Every trip checked at least twice
+    assert scheduler.metrics["errors"] >= 2 and "t0" in scheduler.states
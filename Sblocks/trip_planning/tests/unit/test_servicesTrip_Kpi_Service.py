@@ -0,0 +1,188 @@
+import os
+import sys
+import asyncio
+import importlib
+from datetime import timedelta
+from types import SimpleNamespace
+import pytest
+from bson import ObjectId
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+ROOT = os.path.abspath(os.path.join(HERE, "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+PACKAGES = ("schemas", "repositories", "services", "utils", "config", "events")
+
+
+def load_module():
+    """Import the service against the real packages, then put back whatever other tests had stubbed"""
+    owned = lambda name: name.split(".")[0] in PACKAGES
+    saved = {name: mod for name, mod in sys.modules.items() if owned(name)}
+    for name in saved:
+        del sys.modules[name]
+    try:
+        return importlib.import_module("services.trip_kpi_service")
+    finally:
+        for name in [n for n in sys.modules if owned(n)]:
+            del sys.modules[name]
+        sys.modules.update(saved)
+
+
+tks = load_module()
+
+
+def counters(**values):
+    return {**{name: 0 for name in ("trips", "completed_trips", "cancelled_trips", "timed_trips")},
+            "distance": 0.0, **values}
+
+
+class Rollups:
+    """Answers ``summarize`` with a canned summary and records the ranges asked for"""
+
+    def __init__(self, summary):
+        self.summary = summary
+        self.ranges = []
+        self.listeners = []
+
+    def add_trip_listener(self, callback):
+        self.listeners.append(callback)
+
+    async def summarize(self, start, end):
+        self.ranges.append((start, end))
+        return self.summary
+
+
+class Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length):
+        return self.docs
+
+
+class Management:
+    """Drivers by employee id and vehicles by document id"""
+
+    def __init__(self, drivers, vehicles):
+        self.finds = []
+        outer = self
+
+        class Collection:
+            def __init__(self, docs):
+                self.docs = docs
+
+            def find(self, flt, projection=None):
+                outer.finds.append(flt)
+                clauses = flt.get("$or", [flt])
+                hits = [d for d in self.docs if any(
+                    d.get(field) in cond["$in"] for clause in clauses for field, cond in clause.items())]
+                return Cursor(hits)
+
+        self.drivers = Collection(drivers)
+        self.vehicles = Collection(vehicles)
+
+
+@pytest.fixture
+def env(monkeypatch):
+    vehicle_id = str(ObjectId())
+    rollups = Rollups({
+        "fleet": {"all": counters(trips=3, completed_trips=2, cancelled_trips=1, timed_trips=2, distance=15.004)},
+        "driver": {
+            "EMP-1": counters(trips=2, completed_trips=2, timed_trips=2, distance=15.004),
+            "EMP-2": counters(trips=1, cancelled_trips=1),
+        },
+        "vehicle": {
+            vehicle_id: counters(trips=2, completed_trips=2, timed_trips=2, distance=15.004),
+            "unknown": counters(trips=1, cancelled_trips=1),
+        },
+    })
+    management = Management(
+        drivers=[{"_id": ObjectId(), "employee_id": "EMP-1", "first_name": "Ann", "last_name": "Lee"}],
+        vehicles=[{"_id": ObjectId(vehicle_id), "make": "Toyota", "model": "Hilux", "registration_number": "CA 123"}],
+    )
+    monkeypatch.setattr(tks, "db_manager_management", management)
+    monkeypatch.setattr(tks, "driver_names", tks.NameResolver(tks.load_driver_names, lambda i: f"Driver {i}"))
+    monkeypatch.setattr(tks, "vehicle_names", tks.NameResolver(tks.load_vehicle_names, lambda i: f"Vehicle {i}"))
+    return SimpleNamespace(rollups=rollups, management=management, vehicle_id=vehicle_id)
+
+
+#------------every dashboard figure comes from one rollup summary and one name lookup per kind--------
+def test_kpis_from_one_summary(env):
+    service = tks.TripKpiService(env.rollups)
+    kpis = asyncio.run(service.get_kpis("WEEK"))
+
+    (start, end), = env.rollups.ranges
+    assert end - start == timedelta(days=7)
+    assert len(env.management.finds) == 2
+    assert kpis["total_trips"] == 3
+    assert kpis["completion_rate"] == pytest.approx(66.67)
+    assert kpis["average_trips_per_day"] == pytest.approx(0.29)
+    assert kpis["total_distance"] == 15.0
+    assert sorted(kpis["drivers"], key=lambda d: d["driver_id"]) == [
+        {"driver_id": "EMP-1", "driver_name": "Ann Lee", "completed_trips": 2, "cancelled_trips": 0},
+        {"driver_id": "EMP-2", "driver_name": "Driver EMP-2", "completed_trips": 0, "cancelled_trips": 1},
+    ]
+    assert sorted(kpis["vehicles"], key=lambda v: v["totalTrips"]) == [
+        {"vehicleName": "Vehicle unknown", "totalTrips": 1, "totalDistance": 0},
+        {"vehicleName": "Toyota Hilux CA 123", "totalTrips": 2, "totalDistance": 15.0},
+    ]
+
+
+#------------an empty timeframe reports zeros--------
+def test_kpis_for_empty_timeframe(env):
+    env.rollups.summary = {"fleet": {}, "driver": {}, "vehicle": {}}
+    service = tks.TripKpiService(env.rollups)
+    kpis = asyncio.run(service.get_kpis("day"))
+    assert (kpis["total_trips"], kpis["completion_rate"], kpis["average_trips_per_day"]) == (0, 0, 0)
+    assert kpis["drivers"] == [] and kpis["vehicles"] == []
+    assert env.management.finds == []
+
+
+#------------concurrent and repeated requests share a query until the cache expires--------
+def test_kpis_are_shared_until_expiry(env):
+    clock = SimpleNamespace(now=0.0)
+    service = tks.TripKpiService(env.rollups, ttl_s=30, clock=lambda: clock.now)
+
+    async def dashboard():
+        return await asyncio.gather(*(service.get_kpis("week") for _ in range(4)))
+
+    first = asyncio.run(dashboard())
+    assert len(env.rollups.ranges) == 1
+    assert all(kpis is first[0] for kpis in first)
+
+    clock.now = 29
+    asyncio.run(service.get_kpis("unknown"))  # unknown timeframes mean a week
+    assert len(env.rollups.ranges) == 1
+
+    clock.now = 31
+    asyncio.run(service.get_kpis("week"))
+    asyncio.run(service.get_kpis("month"))
+    assert len(env.rollups.ranges) == 3
+    assert len(env.management.finds) == 2  # names are still cached
+    assert service.get_metrics() == {"hits": 4, "queries": 3, "timeframes": 2}
+
+    # A trip moving to history drops the cached KPIs before they expire
+    for notify in env.rollups.listeners:
+        notify()
+    asyncio.run(service.get_kpis("week"))
+    assert len(env.rollups.ranges) == 4
+
+
+#------------a query that was running when the KPIs were invalidated is not cached--------
+def test_kpis_invalidated_mid_query_are_not_cached(env):
+    service = tks.TripKpiService(env.rollups)
+    summarize = env.rollups.summarize
+
+    async def summarize_then_invalidate(start, end):
+        summary = await summarize(start, end)
+        env.rollups.summarize = summarize
+        service.invalidate()  # a trip moves to history while the query runs
+        return summary
+    env.rollups.summarize = summarize_then_invalidate
+
+    asyncio.run(service.get_kpis("week"))
+    assert service.get_metrics()["timeframes"] == 0
+    asyncio.run(service.get_kpis("week"))
+    assert len(env.rollups.ranges) == 2
+    assert service.get_metrics()["timeframes"] == 1
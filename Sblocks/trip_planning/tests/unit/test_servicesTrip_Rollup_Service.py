@@ -0,0 +1,285 @@
+import os
+import sys
+import asyncio
+import importlib
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import pytest
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+ROOT = os.path.abspath(os.path.join(HERE, "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+PACKAGES = ("schemas", "repositories", "services", "utils", "config", "events")
+
+
+def load_module():
+    """Import the service against the real packages, then put back whatever other tests had stubbed"""
+    owned = lambda name: name.split(".")[0] in PACKAGES
+    saved = {name: mod for name, mod in sys.modules.items() if owned(name)}
+    for name in saved:
+        del sys.modules[name]
+    try:
+        return importlib.import_module("services.trip_rollup_service")
+    finally:
+        for name in [n for n in sys.modules if owned(n)]:
+            del sys.modules[name]
+        sys.modules.update(saved)
+
+
+trs = load_module()
+
+NOW = datetime(2030, 3, 15, 12, 0)
+
+
+def order(value):
+    """Enough of BSON ordering for these tests: missing and null before everything else"""
+    return (0, 0) if value is None else (1, value)
+
+
+def evaluate(expr, doc):
+    """The aggregation expressions the counters use"""
+    if isinstance(expr, str) and expr.startswith("$"):
+        return doc.get(expr[1:])
+    if not isinstance(expr, dict):
+        return expr
+    (op, args), = expr.items()
+    values = [evaluate(arg, doc) for arg in args]
+    if op == "$ifNull":
+        return next((v for v in values if v is not None), None)
+    if op == "$cond":
+        return values[1] if values[0] else values[2]
+    if op == "$and":
+        return all(values)
+    if None in values and op in ("$subtract", "$divide"):
+        return None
+    if op == "$subtract":
+        return (values[0] - values[1]).total_seconds() * 1000
+    if op == "$divide":
+        return values[0] / values[1]
+    compare = {"$gt": lambda a, b: a > b, "$lte": lambda a, b: a <= b, "$eq": lambda a, b: a == b}[op]
+    return compare(order(values[0]), order(values[1]))
+
+
+class Cursor:
+    def __init__(self, docs):
+        self.docs = list(docs)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+    async def to_list(self, length):
+        return self.docs
+
+
+class Collection:
+    """Records writes and aggregations and answers each aggregation with the next canned result"""
+
+    def __init__(self, results=(), raise_exc=None):
+        self.results = list(results)
+        self.raise_exc = raise_exc
+        self.pipelines = []
+        self.writes = []
+        self.deletes = []
+
+    def aggregate(self, pipeline, **kwargs):
+        self.pipelines.append(pipeline)
+        return Cursor(self.results.pop(0) if self.results else [])
+
+    async def bulk_write(self, operations, ordered=True):
+        if self.raise_exc:
+            raise self.raise_exc
+        assert ordered is False
+        self.writes.append(operations)
+
+    async def delete_many(self, flt):
+        self.deletes.append(flt)
+        return SimpleNamespace(deleted_count=2)
+
+
+@pytest.fixture
+def db():
+    return SimpleNamespace(trip_rollups=Collection(), trip_history=Collection(), speed_violations=Collection())
+
+
+def service(db):
+    return trs.TripRollupService(db, utcnow=lambda: NOW)
+
+
+#------------a range is covered by whole months, then whole days, then raw partial days--------
+def test_covering_ranges():
+    buckets, raw = trs.covering_ranges(datetime(2030, 1, 10, 8), None, NOW)
+    assert buckets == [("month", datetime(2030, 2, 1), datetime(2030, 3, 1)),
+                       ("day", datetime(2030, 1, 11), datetime(2030, 2, 1)),
+                       ("day", datetime(2030, 3, 1), datetime(2030, 3, 16))]
+    assert raw == [{"$gte": datetime(2030, 1, 10, 8), "$lt": datetime(2030, 1, 11)}]
+
+    # Everything up to now, from timezone-aware dates
+    assert trs.covering_ranges(None, NOW.replace(tzinfo=timezone.utc) + timedelta(hours=1), NOW) == (
+        [("month", None, datetime(2030, 3, 1)), ("day", datetime(2030, 3, 1), datetime(2030, 3, 16))], []
+    )
+
+    # A range in the past reads its partial last day raw
+    end = datetime(2030, 2, 10, 6)
+    assert trs.covering_ranges(datetime(2030, 2, 1), end, NOW) == (
+        [("day", datetime(2030, 2, 1), datetime(2030, 2, 10))], [{"$gte": datetime(2030, 2, 10), "$lte": end}]
+    )
+
+    # Today counts as a whole day; a range within it does not
+    start = datetime(2030, 3, 14, 18)
+    assert trs.covering_ranges(start, None, NOW) == (
+        [("day", datetime(2030, 3, 15), datetime(2030, 3, 16))], [{"$gte": start, "$lt": datetime(2030, 3, 15)}]
+    )
+    start = datetime(2030, 3, 15, 9)
+    assert trs.covering_ranges(start, None, NOW) == ([], [{"$gte": start, "$lte": NOW}])
+
+
+#------------the counters recorded for a trip match the ones a rebuild aggregates--------
+def test_trip_counters_match_expressions():
+    scheduled = datetime(2030, 3, 1, 8)
+    trips = [
+        {"status": "completed", "estimated_distance": 12.5, "estimated_duration": 30, "scheduled_start_time": scheduled,
+         "actual_start_time": scheduled - timedelta(minutes=5), "actual_end_time": scheduled + timedelta(minutes=40)},
+        {"status": SimpleNamespace(value="completed"), "estimated_duration": 20, "scheduled_start_time": scheduled,
+         "actual_start_time": scheduled + timedelta(minutes=15), "actual_end_time": scheduled + timedelta(minutes=45)},
+        {"status": "completed", "estimated_distance": None, "scheduled_start_time": scheduled},
+        {"status": "cancelled", "estimated_distance": 8.0, "actual_start_time": scheduled},
+        {"status": "missed", "scheduled_start_time": scheduled},
+    ]
+    for trip in trips:
+        doc = {**trip, "status": getattr(trip["status"], "value", trip["status"])}
+        expected = {name: evaluate(expr, doc) or 0 for name, expr in trs.COUNTER_EXPRESSIONS.items()}
+        counters = trs.trip_counters(trip)
+        assert {name: counters.get(name, 0) for name in trs.COUNTERS} == pytest.approx(expected)
+
+    assert trs.trip_counters(trips[0]) == {"trips": 1, "completed_trips": 1, "timed_trips": 1, "distance": 12.5,
+                                           "planned_distance": 12.5, "planned_duration": 30, "timed_completed_trips": 1,
+                                           "actual_duration": 45.0, "on_time_trips": 1}
+    assert trs.trip_counters(trips[1])["delay_minutes"] == 15.0
+
+
+#------------trips are counted into day and month buckets for the fleet, driver and vehicle in one write--------
+def test_record_trips_increments_buckets(db):
+    rollups = service(db)
+    notified = []
+    rollups.add_trip_listener(lambda: notified.append(1))
+    created_at = datetime(2030, 3, 14, 9, tzinfo=timezone.utc)
+    trips = [
+        {"created_at": created_at, "status": "completed", "driver_assignment": "EMP-1", "vehicle_id": "V1",
+         "estimated_distance": 10.0},
+        {"created_at": created_at, "status": "cancelled", "driver_assignment": "EMP-1", "vehicle_id": None},
+        {"status": "completed", "driver_assignment": "EMP-2"},
+    ]
+    asyncio.run(rollups.record_trips(trips))
+
+    assert notified == [1]
+    operations, = db.trip_rollups.writes
+    updates = {op._filter["_id"]: op._doc for op in operations}
+    assert sorted(updates) == sorted([
+        "day:2030-03-14:fleet:all", "month:2030-03:fleet:all",
+        "day:2030-03-14:driver:EMP-1", "month:2030-03:driver:EMP-1",
+        "day:2030-03-14:vehicle:V1", "month:2030-03:vehicle:V1",
+    ])
+    assert all(op._upsert for op in operations)
+    assert updates["day:2030-03-14:driver:EMP-1"]["$inc"] == {"trips": 2, "completed_trips": 1,
+                                                               "cancelled_trips": 1, "distance": 10.0,
+                                                               "planned_distance": 10.0}
+    assert updates["month:2030-03:vehicle:V1"]["$inc"] == {"trips": 1, "completed_trips": 1, "distance": 10.0,
+                                                           "planned_distance": 10.0}
+    assert updates["month:2030-03:fleet:all"]["$setOnInsert"] == {
+        "granularity": "month", "period_start": datetime(2030, 3, 1), "scope": "fleet", "key": "all"
+    }
+
+
+#------------violations are counted for the driver and the fleet; write failures are logged--------
+def test_record_violation_and_failures(db):
+    rollups = service(db)
+    asyncio.run(rollups.record_violation("EMP-1", "speeding", 3))
+    asyncio.run(rollups.record_violation("EMP-1", "speeding", 0))
+    operations, = db.trip_rollups.writes
+    assert {op._filter["_id"]: op._doc["$inc"] for op in operations} == {
+        f"{period}:{scope}": {"violations.speeding": 3}
+        for period in ("day:2030-03-15", "month:2030-03") for scope in ("fleet:all", "driver:EMP-1")
+    }
+
+    asyncio.run(rollups.record_violations({"EMP-1": {"braking": 1, "speeding": 2}, "EMP-2": {"braking": 4}}))
+    _, operations = db.trip_rollups.writes
+    incs = {op._filter["_id"]: op._doc["$inc"] for op in operations}
+    assert len(incs) == 6
+    assert incs["day:2030-03-15:fleet:all"] == {"violations.braking": 5, "violations.speeding": 2}
+    assert incs["month:2030-03:driver:EMP-2"] == {"violations.braking": 4}
+
+    db.trip_rollups.raise_exc = RuntimeError("write failed")
+    asyncio.run(rollups.record_trip({"created_at": NOW, "status": "completed"}))
+    assert rollups.get_metrics()["errors"] == 1
+    assert rollups.get_metrics()["violations"] == 10
+
+
+#------------a summary adds the buckets to the raw partial days--------
+def test_summarize_merges_buckets_and_raw_days(db):
+    db.trip_rollups.results = [[
+        {"_id": {"scope": "driver", "key": "EMP-1"}, "trips": 5, "completed_trips": 4, "distance": 40.0,
+         "violations_speeding": 2},
+    ]]
+    db.trip_history.results = [[{"driver": [
+        {"_id": "EMP-1", "trips": 1, "completed_trips": 1, "distance": 2.5},
+        {"_id": None, "trips": 1},
+    ]}]]
+    db.speed_violations.results = [[{"_id": {"type": "braking", "driver_id": "EMP-1"}, "count": 1}]]
+    rollups = service(db)
+
+    summary = asyncio.run(rollups.summarize(
+        datetime(2030, 2, 27, 18), None, scopes=("driver",), keys=["EMP-1"], violations=True
+    ))
+    entry = summary["driver"]["EMP-1"]
+    assert list(summary["driver"]) == ["EMP-1"]
+    assert (entry["trips"], entry["completed_trips"], entry["distance"]) == (6, 5, 42.5)
+    assert entry["violations"] == {"speeding": 2, "braking": 1, "acceleration": 0, "phone_usage": 0}
+
+    match = db.trip_rollups.pipelines[0][0]["$match"]
+    assert match["key"] == {"$in": ["EMP-1"]} and match["scope"] == {"$in": ["driver"]}
+    assert db.trip_history.pipelines[0][0]["$match"]["driver_assignment"] == {"$in": ["EMP-1"]}
+    assert rollups.get_metrics()["queries"] == 1 and rollups.get_metrics()["raw_queries"] == 1
+
+    with pytest.raises(ValueError):
+        asyncio.run(rollups.summarize(None, None, keys=["EMP-1"]))
+
+
+#------------a range covered by whole days reads no raw trips--------
+def test_summarize_without_raw_days(db):
+    rollups = service(db)
+    summary = asyncio.run(rollups.summarize(datetime(2030, 3, 1), None))
+    assert summary == {"fleet": {}, "driver": {}, "vehicle": {}}
+    assert db.trip_history.pipelines == [] and rollups.get_metrics()["raw_queries"] == 0
+
+
+#------------a rebuild replaces the buckets from history and removes stale ones--------
+def test_rebuild(db):
+    db.trip_history.results = [[
+        {"_id": {"day": "2030-02-03", "driver": "EMP-1", "vehicle": "V1"}, "trips": 2, "completed_trips": 2,
+         "distance": 20.0, "missed_trips": 0},
+        {"_id": {"day": "2030-02-04", "driver": "EMP-1", "vehicle": None}, "trips": 1, "cancelled_trips": 1},
+    ]]
+    db.speed_violations.results = [[
+        {"_id": {"type": "speeding", "driver_id": "EMP-1", "day": "2030-02-04"}, "count": 2},
+    ]]
+    rollups = service(db)
+
+    result = asyncio.run(rollups.rebuild(datetime(2030, 2, 20, tzinfo=timezone.utc)))
+    assert result == {"since": datetime(2030, 2, 1), "trip_groups": 2, "buckets": 8, "removed": 2}
+
+    docs = {op._filter["_id"]: op._doc for batch in db.trip_rollups.writes for op in batch}
+    assert docs["month:2030-02:driver:EMP-1"] == {
+        "_id": "month:2030-02:driver:EMP-1", "granularity": "month", "period_start": datetime(2030, 2, 1),
+        "scope": "driver", "key": "EMP-1", "updated_at": NOW, "violations": {"speeding": 2},
+        "trips": 3, "completed_trips": 2, "cancelled_trips": 1, "distance": 20.0,
+    }
+    assert docs["day:2030-02-04:fleet:all"]["violations"] == {"speeding": 2}
+    assert "day:2030-02-04:vehicle:V1" not in docs
+    assert db.trip_rollups.deletes == [{"updated_at": {"$lt": NOW}, "period_start": {"$gte": datetime(2030, 2, 1)}}]
+    assert db.trip_history.pipelines[0][0] == {"$match": {"created_at": {"$gte": datetime(2030, 2, 1)}}}
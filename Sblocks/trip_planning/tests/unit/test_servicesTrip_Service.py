@@ -1067,22 +1067,28 @@ async def test_mark_missed_trips_counts_success_and_skips_errors():
     }
     docs = [{**base, "_id": "M1"}, {**base, "_id": "M2"}]
 
+    deleted = []
     class _Trips:
-        def find(self, q): 
-            return Cursor(docs)
-        async def delete_one(self, f): return SimpleNamespace()
-        async def find_one(self, f):
-
-            if f.get("_id") == "M1": return {**base, "_id": "M1"}
-            if f.get("_id") == "M2": return {**base, "_id": "M2"}
-            return None
+        async def update_many(self, q, u):
+            if q["status"] != "scheduled":  # Stale claims: M2 was only just marked
+                return SimpleNamespace(modified_count=0)
+            for d in docs: d.update(u["$set"])
+            return SimpleNamespace(modified_count=len(docs))
+        def find(self, q):
+            return Cursor([dict(d) for d in docs if d.get("missed_claim") == q["missed_claim"]])
+        async def delete_many(self, f):
+            deleted.extend(f["_id"]["$in"]); return SimpleNamespace()
 
     inserted = []
+    class _BulkWriteError(Exception):
+        def __init__(self, details): self.details = details
     class _Hist:
-        async def insert_one(self, doc):
-            if doc["_id"] == "M2": 
-                raise RuntimeError("insert fail")
-            inserted.append(doc["_id"]); return SimpleNamespace()
+        async def insert_many(self, batch, ordered=True):
+            assert ordered is False and all("missed_claim" not in d for d in batch)
+            errors = [{"index": i, "code": 121, "errmsg": "insert fail"} for i, d in enumerate(batch) if d["_id"] == "M2"]
+            inserted.extend(d["_id"] for d in batch if d["_id"] != "M2")
+            if errors:
+                raise _BulkWriteError({"nInserted": len(batch) - len(errors), "writeErrors": errors})
 
     pub = []
     async def pub_upd(new, old): pub.append(new.id)
@@ -1092,4 +1098,51 @@ async def test_mark_missed_trips_counts_success_and_skips_errors():
 
     count = await svc.mark_missed_trips()
     assert count == 1
-    assert inserted == ["M1"]
+    assert inserted == ["M1"] and deleted == ["M1"] and pub == ["M1"]
+    assert docs[0]["status"] == "missed"
+
+# --------------------------------- _find_current_step ----------------------------------
+def test__find_current_step_measures_along_route_in_kilometres():
+    svc = TripService()
+    # Dense first step, one long sparse second step
+    route = [[0.0, 0.0], [0.0, 0.001], [0.0, 0.002], [0.0, 0.003], [0.0, 0.1]]
+    steps = [{"from_index": 0, "to_index": 3}, {"from_index": 3, "to_index": 4}]
+
+    current = svc._find_current_step({"latitude": 0.0, "longitude": 0.05}, steps, route)
+    assert current["index"] == 1
+    # Kilometres: the driver app multiplies by 1000 for display
+    assert current["distance_to_instruction"] == pytest.approx(5.5597, rel=1e-3)
+
+    current = svc._find_current_step({"latitude": 0.0001, "longitude": 0.0015}, steps, route)
+    assert current["index"] == 0
+    assert current["distance_to_instruction"] == pytest.approx(0.1668, rel=1e-3)
+
+# --------------------------------- get_live_tracking_data ----------------------------------
+@pytest.mark.asyncio
+async def test_get_live_tracking_data_compiles_route_once():
+    svc = TripService()
+    TRIP_ID = "64b7f0c2a1b2c3d4e5f60718"
+    points = [{"lat": 0.0, "lon": 0.001 * i} for i in range(200)]
+    route = {"distance": 22129.0, "time": 1800, "geometry": [points],
+             "legs": [{"steps": [{"from_index": 0, "to_index": 199, "instruction": {"text": "Drive east"}}]}]}
+    doc = {"_id": TRIP_ID, "status": "in_progress", "raw_route_response": {"results": [route]},
+           "origin": {"location": {"coordinates": [0.05, 0.0001]}}}
+    projections = []
+
+    class _Trips:
+        async def find_one(self, q, projection=None):
+            projections.append(projection)
+            if projection and projection.get(trip_service_module.ROUTE_GEOMETRY_FIELD) == 0:
+                return {**doc, "raw_route_response": {"results": [{k: v for k, v in route.items() if k != "geometry"}]}}
+            return doc
+
+    set_svc_db(svc, trips=_Trips())
+    first = await svc.get_live_tracking_data(TRIP_ID)
+    second = await svc.get_live_tracking_data(TRIP_ID)
+
+    assert projections == [None, {trip_service_module.ROUTE_GEOMETRY_FIELD: 0}]
+    assert len(second["route_polyline"]) == 200
+    assert second["progress"]["completed_distance"] == pytest.approx(first["progress"]["completed_distance"])
+    assert second["progress"]["completed_distance"] == pytest.approx(5559.7, rel=1e-3)
+    assert second["current_instruction"]["text"] == "Drive east"
+    assert svc.route_geometries.stats == {"hits": 1, "misses": 1, "evictions": 0}
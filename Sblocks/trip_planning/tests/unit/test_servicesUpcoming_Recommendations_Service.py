@@ -0,0 +1,112 @@
+import os
+import sys
+import asyncio
+import importlib
+import random
+from datetime import datetime, timedelta
+import pytest
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+ROOT = os.path.abspath(os.path.join(HERE, "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+PACKAGES = ("schemas", "repositories", "services", "utils", "config")
+
+
+def load_modules():
+    """Import the service against the real packages, then put back whatever other tests had stubbed"""
+    owned = lambda name: name.split(".")[0] in PACKAGES
+    saved = {name: mod for name, mod in sys.modules.items() if owned(name)}
+    for name in saved:
+        del sys.modules[name]
+    try:
+        return (importlib.import_module("services.upcoming_recommendations_service"),
+                importlib.import_module("schemas.entities"))
+    finally:
+        for name in [n for n in sys.modules if owned(n)]:
+            del sys.modules[name]
+        sys.modules.update(saved)
+
+
+urs, entities = load_modules()
+
+
+def make_trip(i, origin, destination, start, driver, road_factor=1.3):
+    distance = urs.UpcomingRecommendationsService()._haversine(*origin, *destination) * road_factor
+    duration = distance / 40.0 * 60
+    return entities.Trip(
+        _id=f"{i:024x}", name=f"Trip {i}", created_by="test",
+        origin=entities.Waypoint(location=entities.LocationPoint(coordinates=[origin[1], origin[0]]), order=0),
+        destination=entities.Waypoint(location=entities.LocationPoint(coordinates=[destination[1], destination[0]]), order=1),
+        scheduled_start_time=start, scheduled_end_time=start + timedelta(minutes=duration),
+        estimated_distance=distance, estimated_duration=duration,
+        driver_assignment=driver, vehicle_id=f"vehicle-{i}",
+    )
+
+
+class Router:
+    """Straight lines between the stops at road length and 40 km/h"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self, start_lat, start_lon, end_lat, end_lon, waypoints=[]):
+        self.calls += 1
+        coords = [[start_lat, start_lon]] + [[lat, lon] for lon, lat in waypoints] + [[end_lat, end_lon]]
+        km = sum(urs.UpcomingRecommendationsService()._haversine(*a, *b) for a, b in zip(coords, coords[1:])) * 1.3
+        return {"distance": km * 1000, "duration": km / 40.0 * 3600}, coords
+
+
+#------------indexed candidates and bounds give the same recommendations as routing every pair--------
+def test_find_combinations_matches_exhaustive_search(monkeypatch):
+    rng = random.Random(7)
+    base = datetime.utcnow() + timedelta(hours=1)
+    trips = []
+    for i in range(80):
+        origin = (rng.uniform(-26.2, -25.7), rng.uniform(28.0, 28.3))
+        # Some short hops whose trips are cheap to join, some long hauls that never pay off
+        spread = 0.02 if i % 2 else 0.4
+        destination = (origin[0] + rng.uniform(-spread, spread), origin[1] + rng.uniform(-spread, spread))
+        start = base + timedelta(minutes=rng.uniform(0, 36 * 60))
+        trips.append(make_trip(i, origin, destination, start, f"driver-{rng.randrange(10)}",
+                               road_factor=rng.choice([1.05, 1.3, 2.0])))
+    trips.sort(key=lambda t: t.scheduled_start_time)
+
+    async def load_trips():
+        return trips
+
+    monkeypatch.setattr(urs.trip_service, "get_all_upcoming_trips", load_trips)
+    service = urs.UpcomingRecommendationsService()
+    service._get_route_with_waypoints = router = Router()
+
+    async def exhaustive():
+        filtered_out = {"route_calculation_failed": 0, "insufficient_benefits": 0,
+                        "extreme_distance_penalty": 0, "low_score": 0}
+        found = []
+        for i, primary in enumerate(trips):
+            for secondary in trips[i + 1:]:
+                travel = service._calculate_travel_distance(primary, secondary)
+                gap = service._calculate_time_gap(primary, secondary)
+                if (primary.driver_assignment == secondary.driver_assignment
+                        or travel > urs.MAX_TRAVEL_DISTANCE_KM or gap > urs.MAX_TIME_BUFFER_HOURS):
+                    continue
+                feasible, _, _ = await service._check_time_feasibility(primary, secondary, travel, gap)
+                if feasible:
+                    rec = await service._evaluate_combination(primary, secondary, travel, gap, filtered_out)
+                    if rec is not None:
+                        found.append(rec)
+        found.sort(key=lambda r: r.confidence_score, reverse=True)
+        return found
+
+    recommendations = asyncio.run(service.find_combination_opportunities())
+    indexed_calls = router.calls
+    router.calls = 0
+    expected = asyncio.run(exhaustive())
+
+    assert len(expected) > 15
+    assert [r.confidence_score for r in recommendations] == pytest.approx([r.confidence_score for r in expected[:15]])
+    cutoff = expected[14].confidence_score
+    top = {r.id for r in expected if r.confidence_score > cutoff}
+    assert top <= {r.id for r in recommendations}
+    assert indexed_calls < router.calls  # Pairs that could never qualify were not routed
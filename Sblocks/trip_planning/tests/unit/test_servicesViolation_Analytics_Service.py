@@ -0,0 +1,236 @@
+import os
+import sys
+import asyncio
+import importlib
+from collections import Counter
+from datetime import datetime, timedelta
+import pytest
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+ROOT = os.path.abspath(os.path.join(HERE, "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+PACKAGES = ("schemas", "repositories", "services", "utils", "config", "events")
+
+
+def load_module():
+    """Import the service against the real packages, then put back whatever other tests had stubbed"""
+    owned = lambda name: name.split(".")[0] in PACKAGES
+    saved = {name: mod for name, mod in sys.modules.items() if owned(name)}
+    for name in saved:
+        del sys.modules[name]
+    try:
+        return importlib.import_module("services.violation_analytics_service")
+    finally:
+        for name in [n for n in sys.modules if owned(n)]:
+            del sys.modules[name]
+        sys.modules.update(saved)
+
+
+vas = load_module()
+
+
+def order(value):
+    """Enough of BSON ordering for these tests: missing and null before everything else"""
+    return (0, 0) if value is None else (1, value)
+
+
+def evaluate(expr, doc):
+    """The aggregation expressions the service uses"""
+    if isinstance(expr, str) and expr.startswith("$"):
+        return doc.get(expr[1:])
+    if not isinstance(expr, dict):
+        return expr
+    (op, args), = expr.items()
+    if op == "$literal":
+        return args
+    if op == "$convert":
+        value = evaluate(args["input"], doc)
+        if value is None:
+            return args["onNull"]
+        try:
+            return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            return args["onError"]
+    if op == "$switch":
+        for branch in args["branches"]:
+            if evaluate(branch["case"], doc):
+                return branch["then"]
+        return args["default"]
+    values = [evaluate(arg, doc) for arg in args]
+    if op == "$ifNull":
+        return next((v for v in values if v is not None), None)
+    if op == "$subtract":
+        return values[0] - values[1]
+    if op == "$cond":
+        return values[1] if values[0] else values[2]
+    if op in ("$and", "$or"):
+        return (all if op == "$and" else any)(values)
+    compare = {"$gt": lambda a, b: a > b, "$gte": lambda a, b: a >= b, "$lt": lambda a, b: a < b,
+               "$lte": lambda a, b: a <= b, "$eq": lambda a, b: a == b}[op]
+    return compare(order(values[0]), order(values[1]))
+
+
+def matches(doc, query):
+    for key, value in query.items():
+        if key in ("$or", "$and"):
+            if not (any if key == "$or" else all)(matches(doc, q) for q in value):
+                return False
+        elif isinstance(value, dict) and "$type" in value:
+            if not isinstance(doc.get(key), str):
+                return False
+        elif isinstance(value, dict) and "$gte" in value:
+            # Like MongoDB, only values of the same type compare
+            if type(doc.get(key)) is not type(value["$gte"]) or doc[key] < value["$gte"]:
+                return False
+        elif doc.get(key) != value:
+            return False
+    return True
+
+
+def accumulate(rows, accumulators):
+    out = {}
+    for field, spec in accumulators.items():
+        (op, expr), = spec.items()
+        values = [evaluate(expr, row) for row in rows]
+        if op == "$sum":
+            out[field] = sum(v for v in values if v is not None)
+        elif op == "$max":
+            present = [v for v in values if v is not None]
+            out[field] = max(present) if present else None
+    return out
+
+
+class Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length):
+        return self.docs
+
+
+class Database:
+    """Violation collections that run the service's pipelines in memory, counting each round trip"""
+
+    def __init__(self):
+        self.ops = Counter()
+        self.collections = {name: [] for name in vas.VIOLATION_COLLECTIONS.values()}
+
+    def __getattr__(self, name):
+        if name not in self.__dict__.get("collections", {}):
+            raise AttributeError(name)
+        database = self
+
+        class Collection:
+            def aggregate(self, pipeline):
+                database.ops[f"{name}.aggregate"] += 1
+                return Cursor(database.run(name, pipeline))
+        return Collection()
+
+    def run(self, name, pipeline):
+        rows = [dict(doc) for doc in self.collections[name]]
+        for stage in pipeline:
+            (op, spec), = stage.items()
+            if op == "$match":
+                rows = [row for row in rows if matches(row, spec)]
+            elif op == "$project":
+                rows = [{k: evaluate(v, row) for k, v in spec.items() if k != "_id"} for row in rows]
+            elif op == "$addFields":
+                rows = [{**row, **{k: evaluate(v, row) for k, v in spec.items()}} for row in rows]
+            elif op == "$unionWith":
+                rows += self.run(spec["coll"], spec["pipeline"])
+            elif op == "$group":
+                groups = {}
+                for row in rows:
+                    key = evaluate(spec["_id"], row)
+                    groups.setdefault(repr(key), (key, []))[1].append(row)
+                accumulators = {k: v for k, v in spec.items() if k != "_id"}
+                rows = [{"_id": key, **accumulate(members, accumulators)} for key, members in groups.values()]
+            else:
+                raise AssertionError(f"unsupported stage {op}")
+        return rows
+
+
+#------------one round trip covers all four collections, with the old severity ranges--------
+def test_violation_comparison_in_one_pipeline():
+    db = Database()
+    now = datetime.utcnow()
+    recent, old = now - timedelta(days=1), now - timedelta(days=60)
+    db.collections["speed_violations"] += [
+        {"speed": 105, "speed_limit": 100, "created_at": recent},   # minor
+        {"speed": 120, "speed_limit": 100, "time": recent},         # moderate, dated by time only
+        {"speed": 140, "speed_limit": 100, "created_at": recent},   # severe
+        {"speed": 90, "speed_limit": 100, "created_at": recent},    # under the limit: counted, no severity
+        {"speed": 150, "speed_limit": 100, "created_at": old},      # outside the period
+        {"speed": 106, "speed_limit": 100, "created_at": recent.isoformat()},  # minor, dated by a string
+        {"speed": 150, "speed_limit": 100, "created_at": old.isoformat()},     # string outside the period
+        {"speed": 150, "speed_limit": 100, "created_at": "not a date"},        # undated: skipped
+    ]
+    db.collections["excessive_braking_violations"] += [
+        {"deceleration": 9.333, "threshold": 5.0, "created_at": recent},
+        {"deceleration": 6.5, "threshold": 5.0, "created_at": recent},
+    ]
+    db.collections["phone_usage_violations"] += [{"duration_seconds": 30, "created_at": recent}]
+
+    service = vas.ViolationAnalyticsService(db)
+    comparison = asyncio.run(service.get_violation_comparison(now - timedelta(days=30)))
+
+    assert sum(db.ops.values()) == 1
+    assert comparison["speeding"] == {
+        "count": 5, "avg_severity": 17.75, "max_severity": 40,
+        "severity_ranges": {"minor": 2, "moderate": 1, "severe": 1}
+    }
+    assert comparison["braking"]["avg_severity"] == pytest.approx(2.92)
+    assert comparison["braking"]["max_severity"] == 4.33
+    assert comparison["braking"]["severity_ranges"] == {"minor": 1, "moderate": 0, "severe": 1}
+    assert comparison["acceleration"]["count"] == 0
+    assert comparison["phone_usage"]["severity_ranges"]["minor"] == 1
+
+
+#------------period counts split current, previous and critical violations--------
+def test_period_violation_counts():
+    db = Database()
+    now = datetime.utcnow()
+    start, previous_start = now - timedelta(days=7), now - timedelta(days=14)
+    db.collections["speed_violations"] += [
+        {"speed": 130, "created_at": now - timedelta(days=1)},
+        {"speed": 100, "created_at": now - timedelta(days=2)},
+        {"speed": 100, "created_at": now - timedelta(days=10)},
+        {"speed": 100, "created_at": now - timedelta(days=30)},
+        {"speed": 100, "created_at": (now - timedelta(days=3)).isoformat()},
+        {"speed": 100, "time": (now - timedelta(days=9)).isoformat()},
+    ]
+    db.collections["phone_usage_violations"] += [{"duration_seconds": 400, "created_at": now - timedelta(hours=3)}]
+
+    service = vas.ViolationAnalyticsService(db)
+    counts = asyncio.run(service.get_period_violation_counts(start, previous_start))
+
+    assert counts["speeding"] == {"current": 3, "previous": 2, "critical": 1}
+    assert counts["phone_usage"] == {"current": 1, "previous": 0, "critical": 1}
+    assert counts["braking"] == {"current": 0, "previous": 0, "critical": 0}
+    assert sum(db.ops.values()) == 1
+
+
+#------------driver statistics are read from a single facet--------
+def test_driver_statistics_from_facet():
+    facet = {
+        "totals": [{"_id": None, "drivers": 3, "avg_safety_score": 70.0, "total_violations": 12}],
+        "risk": [{"_id": "low_risk", "count": 1}, {"_id": "high_risk", "count": 2}],
+        "score_ranges": [{"_id": 90, "count": 1}, {"_id": "below_60", "count": 2}],
+        "top": [{"driver_id": "a", "name": "A", "safety_score": 95}],
+        "worst": [{"driver_id": "c", "name": "C", "safety_score": 40}, {"driver_id": "b", "name": "B", "safety_score": 55}],
+    }
+
+    class History:
+        def aggregate(self, pipeline):
+            assert list(pipeline[0]) == ["$facet"]
+            return Cursor([facet])
+
+    db = type("Db", (), {"driver_history": History()})()
+    stats = asyncio.run(vas.ViolationAnalyticsService(db).get_driver_statistics())
+
+    assert stats["drivers"] == 3
+    assert stats["risk_distribution"] == {"low_risk": 1, "medium_risk": 0, "high_risk": 2}
+    assert stats["safety_score_ranges"] == {"90-100": 1, "80-89": 0, "70-79": 0, "60-69": 0, "below_60": 2}
+    assert [d["driver_id"] for d in stats["worst_performers"]] == ["b", "c"]
@@ -0,0 +1,245 @@
+import os
+import sys
+import asyncio
+import importlib
+from collections import Counter
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import pytest
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+ROOT = os.path.abspath(os.path.join(HERE, "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+PACKAGES = ("schemas", "repositories", "services", "utils", "config", "events")
+
+
+def load_module():
+    """Import the service against the real packages, then put back whatever other tests had stubbed"""
+    owned = lambda name: name.split(".")[0] in PACKAGES
+    saved = {name: mod for name, mod in sys.modules.items() if owned(name)}
+    for name in saved:
+        del sys.modules[name]
+    try:
+        return importlib.import_module("services.violation_ingest_service")
+    finally:
+        for name in [n for n in sys.modules if owned(n)]:
+            del sys.modules[name]
+        sys.modules.update(saved)
+
+
+vis = load_module()
+
+NOW = datetime(2030, 3, 15, 12, 0)
+TRIP, OLD_TRIP, OTHER_TRIP = (str(ObjectId()) for _ in range(3))
+
+
+class Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length):
+        return self.docs
+
+
+class Collection:
+    """Finds trips by id; inserts refuse a second document with the same ``_id`` or ``event_key``"""
+
+    def __init__(self, name, ops, docs=()):
+        self.name = name
+        self.ops = ops
+        self.docs = list(docs)
+        self.raise_exc = None
+        self.stored_before_raise = 0
+
+    def find(self, query, projection=None):
+        self.ops[f"{self.name}.find"] += 1
+        ids = set(query["_id"]["$in"])
+        return Cursor([doc for doc in self.docs if doc["_id"] in ids])
+
+    async def insert_many(self, docs, ordered=True):
+        self.ops[f"{self.name}.insert_many"] += 1
+        assert ordered is False
+        errors = []
+        if self.raise_exc:
+            for doc in docs[:self.stored_before_raise]:
+                doc.setdefault("_id", ObjectId())
+                self.docs.append(dict(doc))
+            for doc in docs[self.stored_before_raise:]:
+                doc.setdefault("_id", ObjectId())
+            raise self.raise_exc
+        for index, doc in enumerate(docs):
+            doc.setdefault("_id", ObjectId())
+            if any(d["_id"] == doc["_id"] or d.get("event_key") == doc["event_key"] for d in self.docs):
+                errors.append({"index": index, "code": 11000, "errmsg": "E11000 duplicate key error"})
+            else:
+                self.docs.append(dict(doc))
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(docs) - len(errors)})
+
+
+class History:
+    def __init__(self):
+        self.calls = []
+
+    async def record_violations(self, counts):
+        self.calls.append(counts)
+
+
+class Publisher:
+    def __init__(self, connected=True):
+        self.connected = connected
+        self.events = []
+
+    def is_connected(self):
+        return self.connected
+
+    async def publish_driver_violations_recorded(self, driver_id, counts):
+        self.events.append((driver_id, counts))
+        return True
+
+
+@pytest.fixture
+def env():
+    ops = Counter()
+    db = SimpleNamespace(
+        trips=Collection("trips", ops, [{"_id": ObjectId(TRIP), "driver_assignment": "D1"},
+                                        {"_id": ObjectId(OTHER_TRIP), "driver_assignment": "D2"}]),
+        trip_history=Collection("trip_history", ops, [{"_id": ObjectId(OLD_TRIP), "driver_assignment": "D2"}]),
+        **{name: Collection(name, ops) for name, _ in vis.VIOLATION_TYPES.values()}
+    )
+    history, publisher = History(), Publisher()
+    service = vis.ViolationIngestService(db, history, publisher, batch_size=4, max_buffered=10, utcnow=lambda: NOW)
+    return SimpleNamespace(service=service, db=db, ops=ops, history=history, publisher=publisher)
+
+
+def event(kind, trip=TRIP, driver="D1", seconds=0, **fields):
+    base = {
+        "speeding": {"speed": 90, "speed_limit": 60},
+        "braking": {"deceleration": 9.5, "threshold": 8},
+        "acceleration": {"acceleration": 4.5, "threshold": 3},
+    }.get(kind, {})
+    return {"type": kind, "trip_id": trip, "driver_id": driver,
+            "location": {"type": "Point", "coordinates": [28.2, -25.7]},
+            "time": (NOW + timedelta(seconds=seconds)).isoformat(), **base, **fields}
+
+
+#------------a mixed batch is validated together and written once per collection--------
+def test_mixed_batch(env):
+    events = [
+        event("speeding"), event("braking", seconds=1), event("speeding", seconds=2),
+        event("acceleration", trip=OLD_TRIP, driver="D2"),
+        event("speeding", seconds=3, speed=50),                     # not over the limit
+        event("skidding"),                                          # unknown type
+        event("braking", trip="not-an-id"),
+        event("braking", trip=str(ObjectId())),                     # no such trip
+        event("acceleration", trip=OTHER_TRIP, driver="D1"),        # someone else's trip
+    ]
+    result = asyncio.run(env.service.ingest(events))
+
+    assert {k: result[k] for k in ("received", "inserted", "duplicates", "failed", "drivers")} == {
+        "received": 9, "inserted": 4, "duplicates": 0, "failed": 0, "drivers": 2
+    }
+    assert [r["index"] for r in result["rejected"]] == [4, 5, 6, 7, 8]
+    assert "speed" in result["rejected"][0]["error"]
+    assert result["rejected"][4]["error"] == f"Driver D1 is not assigned to trip {OTHER_TRIP}"
+    assert env.ops == Counter({"trips.find": 1, "trip_history.find": 1, "speed_violations.insert_many": 1,
+                               "excessive_braking_violations.insert_many": 1,
+                               "excessive_acceleration_violations.insert_many": 1})
+
+    speeding = env.db.speed_violations.docs
+    assert [doc["speed"] for doc in speeding] == [90, 90] and speeding[0]["created_at"] == NOW
+    assert speeding[0]["event_key"] == f"D1:{TRIP}:2030-03-15T12:00:00"
+    assert speeding[0]["location"] == {"type": "Point", "coordinates": [28.2, -25.7]}
+    assert env.history.calls == [{"D1": {"speeding": 2, "braking": 1}, "D2": {"acceleration": 1}}]
+    assert sorted(env.publisher.events) == [("D1", {"speeding": 2, "braking": 1}), ("D2", {"acceleration": 1})]
+
+
+#------------resent and repeated events are duplicates and move no counters--------
+def test_duplicates(env):
+    asyncio.run(env.service.ingest([event("speeding"), event("braking")]))
+    env.history.calls.clear()
+
+    resent = [event("speeding"), event("speeding", seconds=5), event("speeding", seconds=5),
+              event("braking", time=NOW.replace(tzinfo=None).isoformat() + "+00:00")]
+    result = asyncio.run(env.service.ingest(resent))
+    assert (result["inserted"], result["duplicates"]) == (1, 3)
+    assert env.history.calls == [{"D1": {"speeding": 1}}]
+    assert len(env.db.speed_violations.docs) == 2 and len(env.db.excessive_braking_violations.docs) == 1
+
+    env.history.calls.clear()
+    asyncio.run(env.service.ingest([event("speeding")]))
+    assert env.history.calls == []  # Nothing new, nothing to count
+    assert env.service.get_metrics()["duplicates"] == 4
+
+
+#------------queued events are written when a batch fills or on flush--------
+def test_buffered_submit(env):
+    service = env.service
+    result = asyncio.run(service.submit([event("speeding", seconds=i) for i in range(3)] + [event("skidding")]))
+    assert (result["queued"], len(result["rejected"])) == (3, 1)
+    assert env.db.speed_violations.docs == [] and service.get_metrics()["buffered"] == 3
+
+    asyncio.run(service.submit([event("braking", trip=OLD_TRIP, driver="D2")]))
+    assert len(env.db.speed_violations.docs) == 3 and service.get_metrics()["buffered"] == 0
+    assert env.history.calls == [{"D1": {"speeding": 3}, "D2": {"braking": 1}}]
+
+    asyncio.run(service.submit([event("acceleration")]))
+    totals = asyncio.run(service.flush())
+    assert totals == {"inserted": 1, "duplicates": 0, "failed": 0, "drivers": 1}
+    assert service.get_metrics()["flushes"] == 2
+
+
+#------------events that fail to write are queued again; a full queue refuses more--------
+def test_failed_writes_are_retried(env):
+    service = env.service
+    env.db.speed_violations.raise_exc = RuntimeError("primary stepped down")
+    asyncio.run(service.submit([event("speeding", seconds=i) for i in range(2)] + [event("braking")]))
+    asyncio.run(service.flush())
+    assert service.get_metrics()["buffered"] == 2 and service.get_metrics()["requeued"] == 2
+    assert env.history.calls == [{"D1": {"braking": 1}}]
+
+    refused = asyncio.run(service.submit([event("braking", seconds=i) for i in range(1, 10)]))
+    assert refused["buffer_full"] and refused["queued"] == 0
+
+    env.db.speed_violations.raise_exc = None
+    asyncio.run(service.flush())
+    assert len(env.db.speed_violations.docs) == 2 and service.get_metrics()["buffered"] == 0
+
+    # Writing directly reports the failure instead
+    env.db.speed_violations.raise_exc = RuntimeError("primary stepped down")
+    result = asyncio.run(service.ingest([event("speeding", seconds=30)]))
+    assert (result["inserted"], result["failed"]) == (0, 1) and service.get_metrics()["buffered"] == 0
+
+
+#------------events stored by a write that then failed are counted when the retry finds them--------
+def test_partially_applied_write_is_counted_on_retry(env):
+    service = env.service
+    speeding = env.db.speed_violations
+    speeding.raise_exc, speeding.stored_before_raise = RuntimeError("connection reset"), 1
+    asyncio.run(service.submit([event("speeding", seconds=i) for i in range(3)]))
+    asyncio.run(service.flush())
+    assert len(speeding.docs) == 1 and env.history.calls == []
+    assert all("_id" not in document for _, document in service._buffer)
+
+    speeding.raise_exc = None
+    totals = asyncio.run(service.flush())
+    assert totals == {"inserted": 3, "duplicates": 0, "failed": 0, "drivers": 1}
+    assert len(speeding.docs) == 3
+    assert env.history.calls == [{"D1": {"speeding": 3}}]
+    assert env.publisher.events == [("D1", {"speeding": 3})]
+
+    # Once written, the same event sent again is a duplicate as usual
+    result = asyncio.run(service.ingest([event("speeding")]))
+    assert (result["inserted"], result["duplicates"]) == (0, 1)
+
+
+#------------no driver events are published while the broker is away--------
+def test_publishing_skipped_when_disconnected(env):
+    env.publisher.connected = False
+    asyncio.run(env.service.ingest([event("speeding")]))
+    assert env.publisher.events == [] and env.history.calls == [{"D1": {"speeding": 1}}]
+    assert env.service.get_metrics()["events_published"] == 0
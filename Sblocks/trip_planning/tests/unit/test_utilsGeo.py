@@ -0,0 +1,87 @@
+import os
+import math
+import importlib.util
+import numpy as np
+import pytest
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+MODULE_PATH = os.path.abspath(os.path.join(HERE, "..", "..", "utils", "geo.py"))
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location("trip_planning_utils_geo", MODULE_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+geo = load_module()
+
+ROUTE = [[-25.7500, 28.1900], [-25.7500, 28.2000], [-25.7600, 28.2000], [-25.7600, 28.2100]]
+SQUARE = [[28.0, -26.0], [28.0, -25.0], [29.0, -25.0], [29.0, -26.0]]  # [lon, lat]
+
+
+def reference_haversine(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(a))
+
+
+#------------haversine matches the scalar formula and broadcasts--------
+def test_haversine_scalar_and_batch():
+    assert geo.haversine_km(0, 0, 0, 1) == pytest.approx(111.195, abs=1e-3)
+    assert isinstance(geo.haversine_km(0, 0, 0, 1), float)
+    lats = np.array([row[0] for row in ROUTE])
+    lons = np.array([row[1] for row in ROUTE])
+    batch = geo.haversine_km(lats, lons, -25.75, 28.19)
+    expected = [reference_haversine(la, lo, -25.75, 28.19) for la, lo in zip(lats, lons)]
+    assert batch == pytest.approx(expected)
+
+
+#------------cumulative distance and path length--------
+def test_cumulative_distance_and_path_length():
+    cumulative = geo.cumulative_distance_km(ROUTE)
+    legs = [reference_haversine(*ROUTE[i], *ROUTE[i + 1]) for i in range(len(ROUTE) - 1)]
+    assert cumulative[0] == 0.0
+    assert cumulative[-1] == pytest.approx(sum(legs))
+    assert geo.path_length_km(ROUTE) == pytest.approx(sum(legs))
+    assert geo.path_length_km([]) == 0.0
+    assert geo.path_length_km([ROUTE[0]]) == 0.0
+
+
+#------------nearest vertex and closest point projection--------
+def test_nearest_vertex_and_closest_point():
+    assert geo.nearest_vertex_index(ROUTE, -25.7601, 28.2001) == 2
+    assert geo.nearest_vertex_index([], 0, 0) is None
+
+    segment, fraction, offset, along = geo.closest_point_on_polyline(ROUTE, -25.7490, 28.1950)
+    assert segment == 0
+    assert fraction == pytest.approx(0.5, abs=1e-3)
+    assert offset == pytest.approx(0.111, abs=0.002)
+    assert along == pytest.approx(geo.cumulative_distance_km(ROUTE)[1] / 2, rel=1e-3)
+
+
+#------------resampling spaces points evenly and keeps the ends--------
+def test_resample_polyline():
+    points = geo.resample_polyline(ROUTE, 7)
+    assert points.shape == (7, 2)
+    assert points[0].tolist() == pytest.approx(ROUTE[0])
+    assert points[-1].tolist() == pytest.approx(ROUTE[-1])
+    straight = geo.resample_polyline([[-25.75, 28.19], [-25.75, 28.20], [-25.75, 28.25]], 7)
+    gaps = geo.segment_lengths_km(straight)
+    assert gaps == pytest.approx([gaps[0]] * 6, rel=1e-3)
+
+
+#------------polygon containment, batch and scalar--------
+def test_points_in_polygon():
+    inside = geo.points_in_polygon([-25.5, -24.5, -25.5], [28.5, 28.5, 30.0], SQUARE)
+    assert inside.tolist() == [True, False, False]
+    assert geo.point_in_polygon(-25.5, 28.5, SQUARE) is True
+    assert geo.point_in_polygon(-25.5, 28.5, SQUARE[:2]) is False
+
+
+#------------bearing--------
+def test_bearing():
+    assert geo.bearing_deg(0, 0, 1, 0) == pytest.approx(0.0)
+    assert geo.bearing_deg(0, 0, 0, 1) == pytest.approx(90.0)
+    assert geo.bearing_deg(0, 0, -1, 0) == pytest.approx(180.0)
@@ -0,0 +1,87 @@
+import os
+import asyncio
+import importlib.util
+import pytest
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+MODULE_PATH = os.path.abspath(os.path.join(HERE, "..", "..", "utils", "name_resolver.py"))
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location("trip_planning_utils_name_resolver", MODULE_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+nr = load_module()
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_resolver(names, clock, fail=None):
+    loads = []
+
+    async def load(ids):
+        loads.append(list(ids))
+        if fail:
+            raise fail
+        return {i: names[i] for i in ids if i in names}
+    return nr.NameResolver(load, lambda i: f"Driver {i}", ttl_s=60, clock=clock), loads
+
+
+#------------misses are loaded in one call and served from the cache until they expire--------
+def test_resolve_batches_misses_and_caches():
+    clock = Clock()
+    resolver, loads = make_resolver({"a": "Ann Lee", "b": "Bo Mo", "c": ""}, clock)
+
+    names = asyncio.run(resolver.resolve(["a", "b", None, "a", "c", "x"]))
+    assert names == {"a": "Ann Lee", "b": "Bo Mo", "c": "Driver c", "x": "Driver x"}
+    assert loads == [["a", "b", "c", "x"]]
+
+    clock.now = 59
+    assert asyncio.run(resolver.resolve(["b", "d"])) == {"b": "Bo Mo", "d": "Driver d"}
+    assert loads[-1] == ["d"]
+
+    clock.now = 61
+    asyncio.run(resolver.resolve(["a", "b"]))
+    assert loads[-1] == ["a", "b"]
+    assert resolver.get_metrics()["loads"] == 3
+    assert asyncio.run(resolver.resolve([])) == {}
+
+
+#------------ids are matched on their string form and returned as given--------
+def test_resolve_keys_results_as_given():
+    class Id:
+        def __init__(self, value):
+            self.value = value
+
+        def __str__(self):
+            return self.value
+
+    resolver, loads = make_resolver({"a": "Ann Lee"}, Clock())
+    key = Id("a")
+    assert asyncio.run(resolver.resolve([key])) == {key: "Ann Lee"}
+    assert loads == [["a"]]
+
+
+#------------a failed load falls back to default names and is retried next time--------
+def test_failed_load_is_not_cached():
+    clock = Clock()
+    resolver, loads = make_resolver({}, clock, fail=RuntimeError("down"))
+
+    assert asyncio.run(resolver.resolve(["a"])) == {"a": "Driver a"}
+    assert asyncio.run(resolver.resolve(["a"])) == {"a": "Driver a"}
+    assert len(loads) == 2
+    assert resolver.get_metrics()["errors"] == 2
+
+    resolver.load = make_resolver({"a": "Ann Lee"}, clock)[0].load
+    assert asyncio.run(resolver.resolve(["a"])) == {"a": "Ann Lee"}
+    resolver.invalidate("a")
+    assert resolver.get_metrics()["names"] == 0
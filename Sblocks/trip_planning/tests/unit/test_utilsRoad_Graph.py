@@ -0,0 +1,183 @@
+import os
+import asyncio
+import heapq
+import random
+import importlib
+import importlib.util
+import pytest
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+ROOT = os.path.abspath(os.path.join(HERE, "..", ".."))
+MODULE_PATH = os.path.join(ROOT, "utils", "road_graph.py")
+ROUTING_PATH = os.path.join(ROOT, "services", "routing_service.py")
+
+
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+rg = load_module("trip_planning_utils_road_graph", MODULE_PATH)
+
+HATFIELD_AREA = ((-25.80, -25.70), (28.15, 28.27))
+OSM_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6">
+  <node id="1" lat="-25.7500" lon="28.2000"/>
+  <node id="2" lat="-25.7500" lon="28.2100"/>
+  <node id="3" lat="-25.7600" lon="28.2100"/>
+  <node id="4" lat="-25.7600" lon="28.2000"/>
+  <node id="9" lat="-25.7000" lon="28.3000"/>
+  <way id="10"><nd ref="1"/><nd ref="2"/><nd ref="3"/>
+    <tag k="highway" v="primary"/><tag k="name" v="Lynnwood Road"/><tag k="maxspeed" v="70"/></way>
+  <way id="11"><nd ref="3"/><nd ref="4"/><nd ref="1"/>
+    <tag k="highway" v="residential"/><tag k="oneway" v="yes"/></way>
+  <way id="12"><nd ref="4"/><nd ref="9"/><tag k="waterway" v="river"/></way>
+</osm>
+"""
+
+
+@pytest.fixture(scope="module")
+def graph():
+    return rg.synthetic_road_graph(bounds=HATFIELD_AREA, spacing_m=300.0)
+
+
+def dijkstra(graph, source, target):
+    dist, heap = {source: 0.0}, [(0.0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if u == target:
+            return d
+        if d > dist[u]:
+            continue
+        for slot in range(graph.indptr[u], graph.indptr[u + 1]):
+            v, nd = int(graph.indices[slot]), d + float(graph.travel_s[slot])
+            if nd < dist.get(v, float("inf")):
+                dist[v] = nd
+                heapq.heappush(heap, (nd, v))
+    return None
+
+
+def path_cost(graph, source, edges):
+    node = source
+    for edge in edges:
+        assert graph.indptr[node] <= edge < graph.indptr[node + 1]  # Edges chain from source
+        node = graph.edge_target(edge)
+    return node, sum(float(graph.travel_s[e]) for e in edges)
+
+
+#------------A* and the contraction hierarchy both find the fastest path--------
+def test_shortest_paths_match_dijkstra(graph, tmp_path):
+    rng = random.Random(5)
+    pairs = [(rng.randrange(graph.node_count), rng.randrange(graph.node_count)) for _ in range(25)]
+    expected = [dijkstra(graph, s, t) for s, t in pairs]
+
+    def check(g):
+        for (s, t), cost in zip(pairs, expected):
+            edges = g.shortest_path(s, t)
+            if cost is None:
+                assert edges is None
+                continue
+            end, got = path_cost(g, s, edges)
+            assert end == t and got == pytest.approx(cost, rel=1e-5)
+
+    check(graph)
+    contracted = rg.synthetic_road_graph(bounds=HATFIELD_AREA, spacing_m=300.0).contract()
+    check(contracted)
+
+    path = str(tmp_path / "graph.npz")
+    contracted.save(path)
+    reloaded = rg.RoadGraph.load(path)
+    assert reloaded.hierarchy is not None
+    check(reloaded)
+
+
+#------------legs start and end at the waypoints with contiguous steps--------
+def test_route_leg_shape(graph):
+    origin, destination = (-25.7487, 28.2380), (-25.7890, 28.1700)
+    coordinates, steps = graph.route_leg(origin, destination)
+
+    assert coordinates[0] == pytest.approx(list(origin)) and coordinates[-1] == pytest.approx(list(destination))
+    assert steps[0]["from_index"] == 0 and steps[-1]["to_index"] == len(coordinates) - 1
+    assert all(a["to_index"] == b["from_index"] for a, b in zip(steps, steps[1:]))
+    assert {s["speed_limit"] for s in steps} <= {40.0, 60.0, 80.0}
+    assert steps[0]["instruction"]["type"] == "StartAt"
+    assert graph.route_leg(origin, (-24.0, 29.0)) is None  # Too far from any road
+
+
+#------------OSM extracts keep drivable ways, speeds and one-way streets--------
+def test_load_osm_xml(tmp_path):
+    path = tmp_path / "area.osm"
+    path.write_text(OSM_XML)
+    graph = rg.RoadGraph.load(str(path))
+
+    assert graph.node_count == 4  # The river's nodes are not part of the road graph
+    assert graph.edge_count == 4 + 2
+    assert set(graph.names) == {"Lynnwood Road", "Residential"}
+    assert sorted({float(s) for s in graph.speed_kmh}) == [40.0, 70.0]
+    assert rg._parse_maxspeed("40 mph") == pytest.approx(64.37, abs=0.01)
+    assert rg._parse_maxspeed("ZA:urban") is None
+
+    node = {ref: graph.nearest_node(lat, lon)[0] for ref, (lat, lon) in
+            {1: (-25.75, 28.20), 3: (-25.76, 28.21), 4: (-25.76, 28.20)}.items()}
+
+    def names(source, target):
+        return [graph.names[graph.name_id[e]] for e in graph.shortest_path(node[source], node[target])]
+
+    assert names(3, 4) == ["Residential"]
+    assert names(4, 3) == ["Residential", "Lynnwood Road", "Lynnwood Road"]  # Not against the one-way
+
+
+#------------the local provider answers in the Geoapify shape and falls back--------
+def test_local_provider_and_fallback(graph):
+    routing = load_module("trip_planning_routing_service_local", ROUTING_PATH)
+    providers = importlib.import_module(routing.RoutingProvider.__module__)
+
+    class Recorder(providers.RoutingProvider):
+        name = "recorder"
+
+        def __init__(self):
+            self.calls = []
+
+        async def route(self, waypoints, mode="drive", details=None, avoid=None, traffic_model="free_flow"):
+            self.calls.append((mode, avoid))
+            return {"results": [], "source": self.name}
+
+    recorder = Recorder()
+    service = routing.RoutingService(providers=[providers.LocalGraphProvider(graph=graph), recorder])
+    waypoints = [(-25.7487, 28.2380), (-25.7890, 28.1700), (-25.7200, 28.2000)]
+
+    async def scenario():
+        local = await service.calculate_route(waypoints)
+        walk = await service.calculate_route(waypoints, mode="walk")
+        off_graph = await service.calculate_route([(-25.7487, 28.2380), (-24.0, 29.0)])
+        return local, walk, off_graph
+
+    local, walk, off_graph = asyncio.run(scenario())
+    result = local["results"][0]
+    assert local["source"] == "local"
+    assert len(result["legs"]) == len(result["geometry"]) == 2
+    assert result["geometry"][0][0] == {"lat": -25.7487, "lon": 28.2380}
+    step = result["legs"][0]["steps"][0]
+    assert step["speed"] == step["speed_limit"] and step["to_index"] < len(result["geometry"][0])
+    assert result["time"] == pytest.approx(sum(leg["time"] for leg in result["legs"]), abs=0.2)
+
+    assert walk["source"] == off_graph["source"] == "recorder"
+    assert recorder.calls == [("walk", None), ("drive", None)]
+
+    with pytest.raises(providers.RouteNotFound):
+        only_local = routing.RoutingService(providers=[providers.LocalGraphProvider(graph=graph)])
+        asyncio.run(only_local.calculate_route(waypoints, avoid=["tolls"]))
+
+
+#------------providers must implement route--------
+def test_routing_provider_is_abstract():
+    routing = load_module("trip_planning_routing_service_abstract", ROUTING_PATH)
+    providers = importlib.import_module(routing.RoutingProvider.__module__)
+
+    class Incomplete(providers.RoutingProvider):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
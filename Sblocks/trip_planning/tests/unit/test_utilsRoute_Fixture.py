@@ -0,0 +1,73 @@
+import os
+import asyncio
+import importlib.util
+import pytest
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+ROOT = os.path.abspath(os.path.join(HERE, "..", ".."))
+MODULE_PATH = os.path.join(ROOT, "utils", "route_fixture.py")
+ROUTING_PATH = os.path.join(ROOT, "services", "routing_service.py")
+FIXTURE_PATH = os.path.join(ROOT, "fixtures", "routes.json")
+
+
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+rf = load_module("trip_planning_utils_route_fixture", MODULE_PATH)
+
+HATFIELD = (-25.7487, 28.2380)
+CENTURION = (-25.8603, 28.1894)
+
+
+#------------synthetic routes are deterministic and end where asked--------
+def test_synthesise_route_is_reproducible():
+    a = rf.synthesise_route((-25.0, 28.0), (-25.1, 28.2), points=50)
+    b = rf.synthesise_route((-25.0, 28.0), (-25.1, 28.2), points=50)
+    assert a == b
+    assert a["coordinates"][0] == pytest.approx([-25.0, 28.0])
+    assert a["coordinates"][-1] == pytest.approx([-25.1, 28.2])
+    assert a["steps"][0]["from_index"] == 0 and a["steps"][-1]["to_index"] == 49
+    assert all(s["to_index"] > s["from_index"] for s in a["steps"])
+
+
+#------------recorded routes are matched by their endpoints--------
+def test_find_matches_recorded_route_within_tolerance():
+    fixture = rf.RouteFixture.load(FIXTURE_PATH)
+    assert len(fixture) >= 1
+
+    route = fixture.find((HATFIELD[0] + 0.001, HATFIELD[1]), CENTURION)
+    assert route is not None and route["name"] == "Hatfield to Centurion"
+    assert fixture.find(CENTURION, HATFIELD) is None
+    assert fixture.route_between(CENTURION, HATFIELD)["name"] == "synthetic"
+
+
+#------------responses have the Geoapify json shape the services parse--------
+def test_geoapify_response_shape():
+    fixture = rf.RouteFixture.load(FIXTURE_PATH)
+    result = fixture.geoapify_response([HATFIELD, CENTURION, (-25.99, 28.12)])["results"][0]
+
+    assert len(result["geometry"]) == len(result["legs"]) == 2
+    assert set(result["geometry"][0][0]) == {"lat", "lon"}
+    assert result["distance"] == pytest.approx(sum(leg["distance"] for leg in result["legs"]), abs=0.2)
+    step = result["legs"][0]["steps"][0]
+    assert step["speed_limit"] > 0 and step["instruction"]["text"]
+    assert step["time"] == pytest.approx(step["distance"] / (step["speed_limit"] / 3.6), abs=0.1)
+
+
+#------------routing service answers from the fixture in offline mode--------
+def test_routing_service_offline_mode(monkeypatch):
+    monkeypatch.setenv("ROUTING_FIXTURE_PATH", FIXTURE_PATH)
+    routing = load_module("trip_planning_routing_service_offline", ROUTING_PATH)
+    service = routing.RoutingService()
+    assert [p.name for p in service.providers] == ["fixture"]  # No HTTP provider to fall back to
+
+    data = asyncio.run(service.calculate_route([HATFIELD, CENTURION]))
+    assert data["source"] == "fixture"
+    assert data["results"][0]["geometry"][0][0] == {"lat": HATFIELD[0], "lon": HATFIELD[1]}
+
+    with pytest.raises(ValueError):
+        asyncio.run(service.calculate_route([HATFIELD]))
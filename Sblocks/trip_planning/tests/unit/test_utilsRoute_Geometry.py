@@ -0,0 +1,115 @@
+import os
+import importlib.util
+import pytest
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+MODULE_PATH = os.path.abspath(os.path.join(HERE, "..", "..", "utils", "route_geometry.py"))
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location("trip_planning_utils_route_geometry", MODULE_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+rg = load_module()
+
+# A two-point leg followed by a densely sampled one of equal length
+SPARSE_THEN_DENSE = [[0.0, 0.0], [0.0, 0.01]] + [[0.0, 0.01 + 0.001 * i] for i in range(1, 11)]
+LEG_M = 1111.95
+
+
+#------------position is by distance, not by vertex index--------
+def test_position_at_distance_ignores_vertex_density():
+    geometry = rg.RouteGeometry(SPARSE_THEN_DENSE)
+    assert geometry.length_m == pytest.approx(2 * LEG_M, rel=1e-4)
+
+    # Halfway by distance is the joint between the legs, although the index midpoint is deep in the dense leg
+    lat, lon = geometry.position_at_fraction(0.5)
+    assert (lat, lon) == pytest.approx((0.0, 0.01), abs=1e-9)
+    assert geometry.position_at_distance(LEG_M / 2)[1] == pytest.approx(0.005, abs=1e-6)
+    assert geometry.position_at_distance(-5) == (0.0, 0.0)
+    assert geometry.position_at_distance(1e9) == (0.0, 0.02)
+    assert geometry.segment_index_at_distance(LEG_M * 1.25) == 3
+
+
+#------------reported route length rescales the index--------
+def test_total_distance_rescales_cumulative():
+    geometry = rg.RouteGeometry(SPARSE_THEN_DENSE, total_distance_m=3000)
+    assert geometry.length_m == 3000
+    assert geometry.distance_at_index(1) == pytest.approx(1500, rel=1e-4)
+    assert geometry.remaining_distance(1000) == 2000
+    assert geometry.remaining_distance(5000) == 0.0
+    assert geometry.position_at_distance(1500) == pytest.approx((0.0, 0.01), abs=1e-6)
+
+
+#------------projecting a point, with and without a hint--------
+def test_distance_at_point():
+    geometry = rg.RouteGeometry(SPARSE_THEN_DENSE)
+    assert geometry.distance_at_point(0.0005, 0.015) == pytest.approx(1.5 * LEG_M, rel=1e-4)
+    assert geometry.distance_at_point(0.0005, 0.015, hint_m=1.4 * LEG_M, window_m=300) == pytest.approx(1.5 * LEG_M, rel=1e-4)
+
+    # A loop back over the start resolves to the pass nearest the hint
+    loop = rg.RouteGeometry([[0.0, 0.0], [0.0, 0.01], [0.001, 0.01], [0.001, 0.0], [0.0, 0.0], [0.0, 0.01]])
+    assert loop.distance_at_point(0.0, 0.005, hint_m=loop.length_m - 600, window_m=300) > loop.length_m / 2
+    assert loop.distance_at_point(0.0, 0.005, hint_m=500, window_m=300) == pytest.approx(LEG_M / 2, rel=1e-3)
+
+
+#------------bearing and remaining polyline--------
+def test_bearing_and_remaining_coordinates():
+    geometry = rg.RouteGeometry([[0.0, 0.0], [0.0, 0.01], [-0.01, 0.01]])
+    assert geometry.bearing_at_distance(100) == pytest.approx(90.0, abs=0.1)
+    assert geometry.bearing_at_distance(LEG_M + 100) == pytest.approx(180.0, abs=0.1)
+    assert geometry.bearing_at_distance(geometry.length_m) == 0.0
+
+    remaining = geometry.remaining_coordinates(LEG_M / 2)
+    assert remaining[0] == pytest.approx([0.0, 0.005], abs=1e-6)
+    assert remaining[1:] == [[0.0, 0.01], [-0.01, 0.01]]
+    assert geometry.remaining_coordinates(geometry.length_m) == [[-0.01, 0.01]]
+
+
+#------------degenerate routes--------
+def test_empty_and_single_point_routes():
+    empty = rg.RouteGeometry([])
+    assert empty.position_at_fraction(0.5) == (0.0, 0.0)
+    assert empty.length_m == 0.0 and empty.segment_index_at_distance(0) is None
+
+    single = rg.RouteGeometry([(1.0, 2.0)])
+    assert single.position_at_fraction(0.3) == (1.0, 2.0)
+    assert single.distance_at_point(1.0, 2.0) == 0.0
+    assert single.bearing_at_distance(0) == 0.0
+
+
+#------------grid snapping agrees with projecting onto every segment--------
+def test_grid_snapping_matches_full_scan():
+    import numpy as np
+    rng = np.random.default_rng(4)
+    # A wandering 3000-point route that doubles back over itself
+    steps = rng.normal(0, 0.0004, size=(3000, 2)) + [0.0002, 0.0001]
+    coords = np.cumsum(steps, axis=0) + [-25.75, 28.2]
+    geometry = rg.RouteGeometry(coords.tolist())
+    assert len(geometry) >= rg.GRID_MIN_POINTS
+
+    for lat, lon in rng.uniform(coords.min(axis=0) - 0.02, coords.max(axis=0) + 0.02, size=(200, 2)):
+        segment, fraction, _ = geometry._project(np.arange(len(coords) - 1), lat, lon)
+        expected = geometry.cumulative_m[segment] + fraction * (geometry.cumulative_m[segment + 1] - geometry.cumulative_m[segment])
+        got = geometry.distance_at_point(lat, lon)
+        snapped = geometry.position_at_distance(got)
+        offset = lambda d: rg.haversine_km(lat, lon, *geometry.position_at_distance(d))
+        # Equal distance along, or an equally close point on another pass of the route
+        assert got == pytest.approx(expected, abs=0.5) or offset(got) == pytest.approx(offset(expected), abs=1e-4)
+        assert snapped is not None
+
+
+#------------the per-trip cache is an LRU keyed by route stamp--------
+def test_route_geometry_cache():
+    cache = rg.RouteGeometryCache(max_entries=2)
+    cache.put("a", (1000, 60), "A")
+    cache.put("b", (2000, 90), "B")
+    assert cache.get("a", (1000, 60)) == "A"
+    assert cache.get("a", (1500, 60)) is None  # Rerouted since it was compiled
+    cache.put("c", (3000, 120), "C")
+    assert "b" not in cache and "a" in cache and len(cache) == 2
+    cache.invalidate("a")
+    assert cache.get_metrics() == {"hits": 1, "misses": 1, "evictions": 1, "entries": 1, "max_entries": 2}
@@ -0,0 +1,56 @@
+import os
+import random
+import importlib.util
+import pytest
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+MODULE_PATH = os.path.abspath(os.path.join(HERE, "..", "..", "utils", "trip_candidate_index.py"))
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location("trip_planning_utils_trip_candidate_index", MODULE_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+tci = load_module()
+
+
+#------------lookups match a scan of every point, including far from the equator--------
+@pytest.mark.parametrize("centre", [(-25.9, 28.1), (64.1, -21.9)])
+def test_near_matches_brute_force(centre):
+    rng = random.Random(3)
+    index = tci.TripCandidateIndex(radius_km=25.0)
+    points = []
+    for i in range(600):
+        lat = centre[0] + rng.uniform(-1.0, 1.0)
+        lon = centre[1] + rng.uniform(-1.5, 1.5)
+        ts = rng.uniform(0, 3 * 86400)
+        index.add(i, lat, lon, ts)
+        points.append((i, lat, lon, ts))
+    assert len(index) == 600
+
+    for _ in range(50):
+        lat = centre[0] + rng.uniform(-1.0, 1.0)
+        lon = centre[1] + rng.uniform(-1.5, 1.5)
+        after = rng.uniform(0, 3 * 86400)
+        until = after + 8 * 3600
+        expected = {i for i, p_lat, p_lon, ts in points
+                    if after < ts <= until and tci._haversine_km(lat, lon, p_lat, p_lon) <= 25.0}
+        found = dict(index.near(lat, lon, after, until))
+        assert set(found) == expected
+        for i, distance in found.items():
+            assert distance == pytest.approx(tci._haversine_km(lat, lon, points[i][1], points[i][2]))
+
+
+#------------the departure window excludes its start and includes its end--------
+def test_near_window_bounds():
+    index = tci.TripCandidateIndex(radius_km=25.0)
+    index.add("at_start", 0.0, 0.0, 3600.0)
+    index.add("inside", 0.0, 0.1, 5000.0)
+    index.add("at_end", 0.0, 0.0, 7200.0)
+    index.add("too_far", 0.0, 0.5, 5000.0)
+
+    assert sorted(item for item, _ in index.near(0.0, 0.0, 3600.0, 7200.0)) == ["at_end", "inside"]
+    assert list(index.near(0.0, 0.0, 7200.0, 3600.0)) == []
@@ -0,0 +1,3 @@
+"""
+Utilities package for Trip Planning service
+"""
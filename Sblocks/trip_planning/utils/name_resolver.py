@@ -0,0 +1,76 @@
+"""
+Batched, time-limited cache of display names by id
+
+Leaderboards and analytics show a name for every driver or vehicle they
+list. ``NameResolver`` answers a whole list of ids with one call to its
+loader for the ids it has not seen within ``NAME_CACHE_TTL_SECONDS``, so a
+page of results costs at most one query, and usually none.
+"""
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+NAME_CACHE_TTL_SECONDS = float(os.getenv("NAME_CACHE_TTL_SECONDS", "300"))
+
+
+class NameResolver:
+    """Names by id, loaded many at a time and kept for ``ttl_s`` seconds"""
+
+    def __init__(
+        self,
+        load: Callable[[List[str]], Awaitable[Dict[str, str]]],
+        default: Callable[[str], str],
+        ttl_s: float = NAME_CACHE_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        # load gets string ids and returns names for the ones it found
+        self.load = load
+        self.default = default
+        self.ttl_s = ttl_s
+        self.clock = clock
+        self._entries: Dict[str, Tuple[float, str]] = {}
+        self.stats = {"hits": 0, "misses": 0, "loads": 0, "errors": 0}
+
+    async def resolve(self, ids: Iterable[Hashable]) -> Dict[Any, str]:
+        """Name of every id, keyed as given; ids that are not found get the default name"""
+        ids = list(dict.fromkeys(i for i in ids if i is not None))
+        now = self.clock()
+        names: Dict[str, str] = {}
+        missing = []
+        for key in dict.fromkeys(str(i) for i in ids):
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.ttl_s:
+                names[key] = entry[1]
+                self.stats["hits"] += 1
+            else:
+                missing.append(key)
+
+        if missing:
+            self.stats["misses"] += len(missing)
+            try:
+                loaded = await self.load(missing)
+                self.stats["loads"] += 1
+            except Exception as e:
+                # Show the default names this time and try again on the next call
+                self.stats["errors"] += 1
+                logger.warning(f"[NameResolver] Failed to load {len(missing)} names: {e}")
+                names.update((key, self.default(key)) for key in missing)
+            else:
+                for key in missing:
+                    names[key] = loaded.get(key) or self.default(key)
+                    self._entries[key] = (now, names[key])
+
+        return {i: names[str(i)] for i in ids}
+
+    def invalidate(self, id_: Hashable = None):
+        """Forget one name, or every name"""
+        if id_ is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(str(id_), None)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {**self.stats, "names": len(self._entries)}
@@ -0,0 +1,646 @@
+"""
+Compact road graph and shortest-path search for offline routing
+
+Edges are stored in CSR form (``indptr``/``indices`` arrays plus per-edge
+length, speed limit and road name) with a reverse copy for the backward
+search. Shortest-time paths are exact either way: a graph contracted with
+``RoadGraph.contract`` answers from its contraction hierarchy in a couple of
+milliseconds, otherwise bidirectional A* is used with the straight-line
+distance at the fastest speed in the graph as the heuristic.
+
+Graphs come from an OpenStreetMap XML extract (``.osm``), a compact ``.npz``
+saved by ``RoadGraph.save`` (hierarchy included), or ``synthetic_road_graph``
+for a bundled grid-like network covering Johannesburg to Pretoria.
+Contraction is slow in Python (about a minute per 40k nodes), so do it once
+offline:
+
+    python -m utils.road_graph area.osm graph.npz
+    python -m utils.road_graph synthetic fixtures/synthetic_graph.npz
+"""
+import argparse
+import heapq
+import math
+import random
+import re
+import time
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.geo import EARTH_RADIUS_KM, bearing_deg, haversine_km
+
+SYNTHETIC_BOUNDS = ((-26.25, -25.65), (27.95, 28.35))  # (lat range, lon range)
+MAX_SNAP_METERS = 2000.0  # Waypoints further than this from any road are not routable
+WITNESS_SETTLED_LIMIT = 60  # Nodes a witness search may settle before a shortcut is added anyway
+
+# Default speeds (km/h) for OSM highway classes without a usable maxspeed tag
+HIGHWAY_SPEEDS_KMH = {
+    "motorway": 120, "motorway_link": 80,
+    "trunk": 100, "trunk_link": 70,
+    "primary": 80, "primary_link": 60,
+    "secondary": 70, "secondary_link": 50,
+    "tertiary": 60, "tertiary_link": 40,
+    "unclassified": 50, "residential": 40,
+    "living_street": 20, "service": 20,
+}
+
+_EARTH_RADIUS_M = EARTH_RADIUS_KM * 1000.0
+
+
+def _haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Scalar haversine in metres; the search calls this per node so it avoids NumPy overhead"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((phi2 - phi1) / 2.0) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2.0) ** 2
+    return 2.0 * _EARTH_RADIUS_M * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def _csr(sources: np.ndarray, targets: np.ndarray, node_count: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(indptr, neighbour per slot, edge id per slot) for edges grouped by source"""
+    order = np.argsort(sources, kind="stable").astype(np.int32)
+    indptr = np.zeros(node_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=node_count), out=indptr[1:])
+    return indptr, targets[order].astype(np.int32), order
+
+
+class RoadGraph:
+    """Directed road network in compressed sparse row form"""
+
+    def __init__(
+        self,
+        lats: Sequence[float],
+        lons: Sequence[float],
+        sources: Sequence[int],
+        targets: Sequence[int],
+        speeds_kmh: Sequence[float],
+        name_ids: Sequence[int],
+        names: Sequence[str]
+    ):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        sources = np.asarray(sources, dtype=np.int32)
+        targets = np.asarray(targets, dtype=np.int32)
+        self.names = list(names)
+
+        length_m = np.asarray(
+            haversine_km(self.lats[sources], self.lons[sources], self.lats[targets], self.lons[targets]), dtype=np.float64
+        ).reshape(-1) * 1000.0
+        speeds = np.maximum(np.asarray(speeds_kmh, dtype=np.float32), 1.0)
+
+        # Forward CSR, with edges renumbered into slot order
+        self.indptr, self.indices, order = _csr(sources, targets, len(self.lats))
+        self.length_m = length_m[order].astype(np.float32)
+        self.speed_kmh = speeds[order]
+        self.name_id = np.asarray(name_ids, dtype=np.int32)[order]
+        self.travel_s = (self.length_m / (self.speed_kmh / 3.6)).astype(np.float32)
+
+        # Reverse CSR for the backward search; rev_edge maps back to forward slots
+        edge_sources = np.repeat(np.arange(len(self.lats), dtype=np.int32), np.diff(self.indptr))
+        self.rev_indptr, self.rev_indices, self.rev_edge = _csr(self.indices, edge_sources, len(self.lats))
+
+        self.max_speed_ms = float(self.speed_kmh.max()) / 3.6 if len(self.speed_kmh) else 1.0
+        self.hierarchy: Optional[Dict[str, np.ndarray]] = None  # Set by contract() or load()
+        self._search_arrays = None
+        self._hierarchy_lists = None
+        self._routable = None
+
+    @property
+    def node_count(self) -> int:
+        return len(self.lats)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.indices)
+
+    # ---- construction ----
+
+    @classmethod
+    def load(cls, path: str) -> "RoadGraph":
+        """Load an ``.npz`` saved by ``save`` or an OpenStreetMap ``.osm`` XML extract"""
+        if path.endswith(".npz"):
+            data = np.load(path, allow_pickle=False)
+            graph = cls(data["lats"], data["lons"], data["sources"], data["targets"],
+                        data["speeds_kmh"], data["name_ids"], [str(n) for n in data["names"]])
+            if "ch_rank" in data:
+                graph.hierarchy = {k[3:]: data[k] for k in data.files if k.startswith("ch_")}
+            return graph
+        return load_osm_xml(path)
+
+    def save(self, path: str):
+        """Write the graph, and its hierarchy if contracted, as a compressed ``.npz``
+
+        Edges are written in slot order, so a reloaded graph keeps the edge
+        numbering the hierarchy refers to.
+        """
+        sources = np.repeat(np.arange(self.node_count, dtype=np.int32), np.diff(self.indptr))
+        hierarchy = {f"ch_{k}": v for k, v in (self.hierarchy or {}).items()}
+        np.savez_compressed(
+            path, lats=self.lats, lons=self.lons, sources=sources, targets=self.indices,
+            speeds_kmh=self.speed_kmh, name_ids=self.name_id, names=np.asarray(self.names, dtype=str),
+            **hierarchy,
+        )
+
+    def contract(self, witness_limit: int = WITNESS_SETTLED_LIMIT) -> "RoadGraph":
+        """Build the contraction hierarchy used by ``shortest_path``; returns self"""
+        self.hierarchy = _contract(self, witness_limit)
+        self._hierarchy_lists = None
+        return self
+
+    # ---- snapping ----
+
+    def _routable_mask(self) -> np.ndarray:
+        """Nodes in the largest weakly connected component; islands are never snapped to"""
+        if self._routable is None:
+            n = self.node_count
+            indptr, indices = self.indptr.tolist(), self.indices.tolist()
+            rev_indptr, rev_indices = self.rev_indptr.tolist(), self.rev_indices.tolist()
+            component = [-1] * n
+            sizes = []
+            for start in range(n):
+                if component[start] != -1:
+                    continue
+                label, stack, size = len(sizes), [start], 0
+                component[start] = label
+                while stack:
+                    u = stack.pop()
+                    size += 1
+                    for v in indices[indptr[u]:indptr[u + 1]] + rev_indices[rev_indptr[u]:rev_indptr[u + 1]]:
+                        if component[v] == -1:
+                            component[v] = label
+                            stack.append(v)
+                sizes.append(size)
+            largest = int(np.argmax(sizes)) if sizes else 0
+            self._routable = np.asarray(component) == largest
+        return self._routable
+
+    def nearest_node(self, lat: float, lon: float) -> Tuple[int, float]:
+        """Closest routable node to a point and its distance in metres"""
+        mask = self._routable_mask()
+        k = math.cos(math.radians(lat))
+        d2 = (self.lats - lat) ** 2 + ((self.lons - lon) * k) ** 2
+        d2[~mask] = np.inf
+        node = int(np.argmin(d2))
+        return node, _haversine_m(lat, lon, self.lats[node], self.lons[node])
+
+    # ---- search ----
+
+    def _arrays(self):
+        """Plain lists for the search loop, which indexes them element by element"""
+        if self._search_arrays is None:
+            self._search_arrays = (
+                self.indptr.tolist(), self.indices.tolist(), self.travel_s.tolist(),
+                self.rev_indptr.tolist(), self.rev_indices.tolist(), self.rev_edge.tolist(),
+                self.lats.tolist(), self.lons.tolist(),
+            )
+        return self._search_arrays
+
+    def shortest_path(self, source: int, target: int) -> Optional[List[int]]:
+        """Edge slots of the fastest path from ``source`` to ``target``, or None if unreachable"""
+        if source == target:
+            return []
+        if self.hierarchy is not None:
+            return self._hierarchy_path(source, target)
+        return self._astar_path(source, target)
+
+    def _astar_path(self, source: int, target: int) -> Optional[List[int]]:
+        """Bidirectional A* with the averaged potential
+        ``p(v) = (h_t(v) - h_s(v)) / 2`` so both searches see the same
+        non-negative reduced costs; the search stops once the two frontier
+        minimums together reach the best meeting cost.
+        """
+        indptr, indices, weights, rev_indptr, rev_indices, rev_edge, lats, lons = self._arrays()
+        s_lat, s_lon, t_lat, t_lon = lats[source], lons[source], lats[target], lons[target]
+        inv_speed = 1.0 / self.max_speed_ms
+        potentials: Dict[int, float] = {}
+
+        def potential(v: int) -> float:
+            p = potentials.get(v)
+            if p is None:
+                lat, lon = lats[v], lons[v]
+                p = (_haversine_m(lat, lon, t_lat, t_lon) - _haversine_m(lat, lon, s_lat, s_lon)) * 0.5 * inv_speed
+                potentials[v] = p
+            return p
+
+        inf = float("inf")
+        dist = ({source: 0.0}, {target: 0.0})
+        parent: Tuple[Dict[int, Tuple[int, int]], Dict[int, Tuple[int, int]]] = ({}, {})
+        settled = (set(), set())
+        heaps = ([(potential(source), source)], [(-potential(target), target)])
+        graphs = ((indptr, indices, None), (rev_indptr, rev_indices, rev_edge))
+        best, meet = inf, -1
+
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+            side = 0 if len(heaps[0]) <= len(heaps[1]) else 1
+            _, u = heapq.heappop(heaps[side])
+            if u in settled[side]:
+                continue
+            settled[side].add(u)
+
+            d_here, d_other = dist[side], dist[1 - side]
+            ptr, nbr, edge_map = graphs[side]
+            sign = 1.0 if side == 0 else -1.0
+            du = d_here[u]
+            for slot in range(ptr[u], ptr[u + 1]):
+                edge = slot if edge_map is None else edge_map[slot]
+                v = nbr[slot]
+                nd = du + weights[edge]
+                if nd < d_here.get(v, inf):
+                    d_here[v] = nd
+                    parent[side][v] = (u, edge)
+                    heapq.heappush(heaps[side], (nd + sign * potential(v), v))
+                    other = d_other.get(v)
+                    if other is not None and nd + other < best:
+                        best, meet = nd + other, v
+
+        if meet < 0:
+            return None
+        forward, node = [], meet
+        while node != source:
+            node, edge = parent[0][node]
+            forward.append(edge)
+        forward.reverse()
+        node = meet
+        while node != target:
+            node, edge = parent[1][node]
+            forward.append(edge)
+        return forward
+
+    def _hierarchy_path(self, source: int, target: int) -> Optional[List[int]]:
+        """Bidirectional upward Dijkstra over the hierarchy, then shortcut unpacking
+
+        Each side stops once its frontier minimum reaches the best meeting
+        cost, since every later meeting through it can only be longer.
+        """
+        if self._hierarchy_lists is None:
+            h = self.hierarchy
+            self._hierarchy_lists = (
+                h["rank"].tolist(),
+                (h["up_indptr"].tolist(), h["up_nodes"].tolist(), h["up_weights"].tolist(), h["up_mids"].tolist()),
+                (h["down_indptr"].tolist(), h["down_nodes"].tolist(), h["down_weights"].tolist(), h["down_mids"].tolist()),
+            )
+        rank, up, down = self._hierarchy_lists
+
+        inf = float("inf")
+        dist = ({source: 0.0}, {target: 0.0})
+        parent: Tuple[Dict[int, Tuple[int, int]], Dict[int, Tuple[int, int]]] = ({}, {})
+        heaps = ([(0.0, source)], [(0.0, target)])
+        adjacency = (up, down)
+        best, meet = inf, -1
+        active = [True, True]
+        while active[0] or active[1]:
+            for side in (0, 1):
+                heap = heaps[side]
+                if not active[side]:
+                    continue
+                if not heap or heap[0][0] >= best:
+                    active[side] = False
+                    continue
+                du, u = heapq.heappop(heap)
+                d_here = dist[side]
+                if du > d_here[u]:
+                    continue
+                other = dist[1 - side].get(u)
+                if other is not None and du + other < best:
+                    best, meet = du + other, u
+                ptr, nodes, weights, _ = adjacency[side]
+                for slot in range(ptr[u], ptr[u + 1]):
+                    v = nodes[slot]
+                    nd = du + weights[slot]
+                    if nd < d_here.get(v, inf):
+                        d_here[v] = nd
+                        parent[side][v] = (u, slot)
+                        heapq.heappush(heap, (nd, v))
+
+        if meet < 0:
+            return None
+        edges: List[int] = []
+        chain, node = [], meet
+        while node != source:
+            node, slot = parent[0][node]
+            chain.append(up[3][slot])
+        for mid in reversed(chain):
+            self._unpack(mid, edges)
+        node = meet
+        while node != target:
+            node, slot = parent[1][node]
+            self._unpack(down[3][slot], edges)
+        return edges
+
+    def _unpack(self, mid: int, edges: List[int]):
+        """Append the original edge slots behind one hierarchy edge
+
+        ``mid`` is ``-(slot + 1)`` for an original edge, otherwise a pair
+        ``(mid, via)`` index into the shortcut table.
+        """
+        shortcuts = self.hierarchy["shortcuts"]
+        stack = [mid]
+        while stack:
+            mid = stack.pop()
+            if mid < 0:
+                edges.append(-mid - 1)
+            else:
+                first, second = shortcuts[mid]
+                stack.append(int(second))
+                stack.append(int(first))
+
+    def edge_target(self, edge: int) -> int:
+        return int(self.indices[edge])
+
+    # ---- routes ----
+
+    def route_leg(
+        self,
+        origin: Tuple[float, float],
+        destination: Tuple[float, float],
+        max_snap_m: float = MAX_SNAP_METERS
+    ) -> Optional[Tuple[List[List[float]], List[Dict[str, Any]]]]:
+        """``([lat, lon] polyline, steps)`` from ``origin`` to ``destination``, or None if not routable
+
+        The polyline starts and ends at the waypoints themselves; steps group
+        consecutive edges on the same road at the same speed limit and carry
+        ``from_index``, ``to_index``, ``speed_limit``, ``name`` and ``instruction``.
+        """
+        source, source_m = self.nearest_node(*origin)
+        target, target_m = self.nearest_node(*destination)
+        if source_m > max_snap_m or target_m > max_snap_m:
+            return None
+        edges = self.shortest_path(source, target)
+        if edges is None:
+            return None
+
+        lead = 1 if source_m > 1.0 else 0
+        coordinates = [[float(origin[0]), float(origin[1])]] if lead else []
+        node = source
+        coordinates.append([float(self.lats[node]), float(self.lons[node])])
+        for edge in edges:
+            node = self.edge_target(edge)
+            coordinates.append([float(self.lats[node]), float(self.lons[node])])
+        if target_m > 1.0 or len(coordinates) < 2:
+            coordinates.append([float(destination[0]), float(destination[1])])
+
+        steps: List[Dict[str, Any]] = []
+        for i, edge in enumerate(edges):
+            name, limit = self.names[self.name_id[edge]], float(self.speed_kmh[edge])
+            if steps and steps[-1]["name"] == name and steps[-1]["speed_limit"] == limit:
+                steps[-1]["to_index"] = lead + i + 1
+                continue
+            steps.append({
+                "from_index": lead + i,
+                "to_index": lead + i + 1,
+                "speed_limit": limit,
+                "name": name,
+                "instruction": self._instruction(coordinates, lead + i, name, first=not steps),
+            })
+        if not steps:
+            steps.append({"from_index": 0, "to_index": len(coordinates) - 1, "speed_limit": 20.0, "name": "Unnamed Road"})
+        steps[0]["from_index"] = 0
+        steps[-1]["to_index"] = len(coordinates) - 1
+        return coordinates, steps
+
+    @staticmethod
+    def _instruction(coordinates: List[List[float]], index: int, name: str, first: bool) -> Dict[str, str]:
+        if first or index == 0:
+            return {"text": f"Drive along {name}", "type": "StartAt"}
+        (a_lat, a_lon), (b_lat, b_lon), (c_lat, c_lon) = coordinates[index - 1], coordinates[index], coordinates[index + 1]
+        turn = (bearing_deg(b_lat, b_lon, c_lat, c_lon) - bearing_deg(a_lat, a_lon, b_lat, b_lon) + 540.0) % 360.0 - 180.0
+        if turn > 30.0:
+            return {"text": f"Turn right onto {name}", "type": "Right"}
+        if turn < -30.0:
+            return {"text": f"Turn left onto {name}", "type": "Left"}
+        return {"text": f"Continue onto {name}", "type": "Straight"}
+
+
+# ---- contraction hierarchy ----
+
+def _contract(graph: RoadGraph, witness_limit: int) -> Dict[str, np.ndarray]:
+    """Contract nodes in edge-difference order, adding shortcuts where no witness path exists
+
+    Edges are tagged with a ``mid``: ``-(slot + 1)`` for an original edge, or
+    the index of a ``(first mid, second mid)`` row in the shortcut table.
+    """
+    n = graph.node_count
+    indptr, indices, weights = graph.indptr.tolist(), graph.indices.tolist(), graph.travel_s.tolist()
+    out: List[Dict[int, Tuple[float, int]]] = [{} for _ in range(n)]
+    into: List[Dict[int, Tuple[float, int]]] = [{} for _ in range(n)]
+    for u in range(n):
+        for slot in range(indptr[u], indptr[u + 1]):
+            v, cost = indices[slot], weights[slot]
+            if v != u and (v not in out[u] or cost < out[u][v][0]):
+                out[u][v] = into[v][u] = (cost, -slot - 1)
+
+    contracted = [False] * n
+    shortcuts: List[Tuple[int, int]] = []
+
+    def witness_distances(source: int, skip: int, limit: float, targets: set) -> Dict[int, float]:
+        dist = {source: 0.0}
+        heap = [(0.0, source)]
+        settled = 0
+        while heap and targets and settled < witness_limit:
+            du, u = heapq.heappop(heap)
+            if du > dist[u]:
+                continue
+            if du > limit:
+                break
+            targets.discard(u)
+            settled += 1
+            for v, (cost, _) in out[u].items():
+                if v != skip and not contracted[v] and du + cost < dist.get(v, math.inf):
+                    dist[v] = du + cost
+                    heapq.heappush(heap, (du + cost, v))
+        return dist
+
+    def contract_node(v: int, apply: bool) -> int:
+        """Shortcuts needed to remove ``v``, minus the edges removed with it"""
+        ins = [(u, cost, mid) for u, (cost, mid) in into[v].items() if not contracted[u]]
+        outs = [(w, cost, mid) for w, (cost, mid) in out[v].items() if not contracted[w]]
+        added = 0
+        for u, in_cost, in_mid in ins:
+            others = [(w, c, m) for w, c, m in outs if w != u]
+            if not others:
+                continue
+            dist = witness_distances(u, v, in_cost + max(c for _, c, _ in others), {w for w, _, _ in others})
+            for w, out_cost, out_mid in others:
+                cost = in_cost + out_cost
+                if dist.get(w, math.inf) <= cost:
+                    continue
+                added += 1
+                if apply and (w not in out[u] or cost < out[u][w][0]):
+                    out[u][w] = into[w][u] = (cost, len(shortcuts))
+                    shortcuts.append((in_mid, out_mid))
+        return added - len(ins) - len(outs)
+
+    removed_neighbours = [0] * n
+    queue = [(contract_node(v, False), v) for v in range(n)]
+    heapq.heapify(queue)
+    rank = [0] * n
+    order = 0
+    while queue:
+        _, v = heapq.heappop(queue)
+        if contracted[v]:
+            continue
+        # Lazy update: re-check the priority and defer if another node is now cheaper
+        priority = contract_node(v, False) + removed_neighbours[v]
+        if queue and priority > queue[0][0]:
+            heapq.heappush(queue, (priority, v))
+            continue
+        contract_node(v, True)
+        contracted[v] = True
+        rank[v] = order
+        order += 1
+        for w in list(out[v]) + list(into[v]):
+            removed_neighbours[w] += 1
+
+    def upward(adjacency: List[Dict[int, Tuple[float, int]]]) -> List[np.ndarray]:
+        ptr, nodes, costs, mids = [0], [], [], []
+        for u in range(n):
+            for w, (cost, mid) in adjacency[u].items():
+                if rank[w] > rank[u]:
+                    nodes.append(w)
+                    costs.append(cost)
+                    mids.append(mid)
+            ptr.append(len(nodes))
+        return [np.asarray(ptr, dtype=np.int64), np.asarray(nodes, dtype=np.int32),
+                np.asarray(costs, dtype=np.float64), np.asarray(mids, dtype=np.int32)]
+
+    up_indptr, up_nodes, up_weights, up_mids = upward(out)
+    down_indptr, down_nodes, down_weights, down_mids = upward(into)
+    return {
+        "rank": np.asarray(rank, dtype=np.int32),
+        "up_indptr": up_indptr, "up_nodes": up_nodes, "up_weights": up_weights, "up_mids": up_mids,
+        "down_indptr": down_indptr, "down_nodes": down_nodes, "down_weights": down_weights, "down_mids": down_mids,
+        "shortcuts": np.asarray(shortcuts, dtype=np.int32).reshape(-1, 2),
+    }
+
+
+# ---- OpenStreetMap extracts ----
+
+def _parse_maxspeed(value: Optional[str]) -> Optional[float]:
+    match = re.match(r"\s*(\d+(?:\.\d+)?)\s*(mph)?", value or "")
+    if not match:
+        return None  # Zone values such as "ZA:urban" fall back to the class default
+    speed = float(match.group(1))
+    return speed * 1.609344 if match.group(2) else speed
+
+
+def load_osm_xml(path: str) -> RoadGraph:
+    """Build a graph from the drivable ``highway`` ways of an OSM XML extract
+
+    ``.pbf`` extracts need converting first, e.g. ``osmium cat area.osm.pbf -o area.osm``.
+    """
+    coords: Dict[int, Tuple[float, float]] = {}
+    ways: List[Tuple[List[int], float, str, int]] = []
+    names: Dict[str, int] = {}
+
+    for _, elem in ET.iterparse(path, events=("end",)):
+        if elem.tag == "node":
+            coords[int(elem.get("id"))] = (float(elem.get("lat")), float(elem.get("lon")))
+        elif elem.tag == "way":
+            tags = {t.get("k"): t.get("v") for t in elem.findall("tag")}
+            highway = tags.get("highway")
+            if highway in HIGHWAY_SPEEDS_KMH:
+                refs = [int(nd.get("ref")) for nd in elem.findall("nd")]
+                speed = _parse_maxspeed(tags.get("maxspeed")) or HIGHWAY_SPEEDS_KMH[highway]
+                name = tags.get("name") or tags.get("ref") or highway.replace("_", " ").title()
+                oneway = tags.get("oneway", "yes" if highway in ("motorway", "motorway_link") else "no")
+                direction = -1 if oneway == "-1" else 1 if oneway in ("yes", "true", "1") else 0
+                ways.append((refs, speed, names.setdefault(name, len(names)), direction))
+        if elem.tag in ("node", "way", "relation"):
+            elem.clear()
+
+    index: Dict[int, int] = {}
+    lats, lons, sources, targets, speeds, name_ids = [], [], [], [], [], []
+    for refs, speed, name_id, direction in ways:
+        refs = [r for r in refs if r in coords]
+        for ref in refs:
+            if ref not in index:
+                index[ref] = len(lats)
+                lats.append(coords[ref][0])
+                lons.append(coords[ref][1])
+        for a, b in zip(refs, refs[1:]):
+            u, v = index[a], index[b]
+            pairs = [(u, v), (v, u)] if direction == 0 else [(u, v)] if direction == 1 else [(v, u)]
+            for s, t in pairs:
+                sources.append(s)
+                targets.append(t)
+                speeds.append(speed)
+                name_ids.append(name_id)
+    return RoadGraph(lats, lons, sources, targets, speeds, name_ids, list(names))
+
+
+# ---- bundled synthetic network ----
+
+def synthetic_road_graph(
+    bounds: Tuple[Tuple[float, float], Tuple[float, float]] = SYNTHETIC_BOUNDS,
+    spacing_m: float = 400.0,
+    seed: int = 7
+) -> RoadGraph:
+    """Deterministic grid road network for offline runs and tests
+
+    Every twelfth line is an 80 km/h arterial and every fourth a 60 km/h
+    collector; the remaining 40 km/h local streets are jittered and about a
+    tenth of them are missing, so routes have to pick between detours and
+    faster roads the way they would on a real network.
+    """
+    rng = random.Random(seed)
+    (lat_min, lat_max), (lon_min, lon_max) = bounds
+    d_lat = spacing_m / 111_320.0
+    d_lon = d_lat / math.cos(math.radians((lat_min + lat_max) / 2.0))
+    rows = int((lat_max - lat_min) / d_lat) + 1
+    cols = int((lon_max - lon_min) / d_lon) + 1
+
+    def road(k: int, axis: str) -> Tuple[float, str]:
+        if k % 12 == 0:
+            return 80.0, f"M{k // 12 + 1} {'East' if axis == 'row' else 'North'}"
+        if k % 4 == 0:
+            return 60.0, f"{k // 4 + 1} {'Street' if axis == 'row' else 'Avenue'}"
+        return 40.0, f"{'Row' if axis == 'row' else 'Column'} {k + 1} Road"
+
+    lats, lons = [], []
+    for r in range(rows):
+        for c in range(cols):
+            major = r % 4 == 0 or c % 4 == 0
+            jitter = 0.0 if major else 0.15
+            lats.append(lat_min + (r + rng.uniform(-jitter, jitter)) * d_lat)
+            lons.append(lon_min + (c + rng.uniform(-jitter, jitter)) * d_lon)
+
+    names: Dict[str, int] = {}
+    sources, targets, speeds, name_ids = [], [], [], []
+    for r in range(rows):
+        for c in range(cols):
+            u = r * cols + c
+            links = []
+            if c + 1 < cols:
+                links.append((u + 1, road(r, "row")))
+            if r + 1 < rows:
+                links.append((u + cols, road(c, "col")))
+            for v, (speed, name) in links:
+                if speed == 40.0 and rng.random() < 0.1:
+                    continue
+                name_id = names.setdefault(name, len(names))
+                sources += [u, v]
+                targets += [v, u]
+                speeds += [speed, speed]
+                name_ids += [name_id, name_id]
+    return RoadGraph(lats, lons, sources, targets, speeds, name_ids, list(names))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a contracted road graph for the local routing provider")
+    parser.add_argument("source", help="OSM XML extract, .npz graph, or 'synthetic'")
+    parser.add_argument("output", help="Where to write the contracted .npz")
+    parser.add_argument("--spacing", type=float, default=400.0, help="Synthetic grid spacing in metres")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    graph = synthetic_road_graph(spacing_m=args.spacing) if args.source == "synthetic" else RoadGraph.load(args.source)
+    print(f"Loaded {graph.node_count} nodes, {graph.edge_count} edges in {time.perf_counter() - start:.1f}s")
+    start = time.perf_counter()
+    graph.contract()
+    print(f"Contracted with {len(graph.hierarchy['shortcuts'])} shortcuts in {time.perf_counter() - start:.1f}s")
+    graph.save(args.output)
+
+
+if __name__ == "__main__":
+    main()
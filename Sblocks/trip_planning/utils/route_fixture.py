@@ -0,0 +1,106 @@
+"""
+Offline route fixture standing in for the Geoapify routing API
+
+Holds recorded routes (``[lat, lon]`` polylines with per-step speed limits)
+and answers route requests with a Geoapify-shaped response, synthesising a
+deterministic route when no recorded one matches the waypoints.
+"""
+import json
+import math
+import random
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from utils.geo import haversine_km
+from utils.route_response import build_leg, build_response
+
+MATCH_TOLERANCE_METERS = 300.0  # Endpoints this close reuse a recorded route
+SYNTHETIC_SPEED_LIMITS = (60, 80, 100, 120)  # km/h
+STEPS_PER_SYNTHETIC_ROUTE = 4
+
+
+def synthesise_route(
+    origin: Tuple[float, float],
+    destination: Tuple[float, float],
+    points: int = 80,
+    seed: Optional[int] = None
+) -> Dict[str, Any]:
+    """A gently winding road from ``origin`` to ``destination``
+
+    The same endpoints and seed always give the same route, so synthetic
+    runs are reproducible.
+    """
+    if seed is None:
+        seed = zlib.crc32(json.dumps([list(origin), list(destination)]).encode())
+    rng = random.Random(seed)
+    points = max(int(points), 2)
+
+    (lat0, lon0), (lat1, lon1) = origin, destination
+    # Lateral offset is a couple of sine waves that vanish at both ends
+    amplitude = 0.08 * math.hypot(lat1 - lat0, lon1 - lon0)
+    waves = [(rng.uniform(-1, 1) * amplitude, rng.randint(1, 3)) for _ in range(2)]
+    coordinates = []
+    for i in range(points):
+        t = i / (points - 1)
+        offset = sum(a * math.sin(math.pi * k * t) for a, k in waves)
+        coordinates.append([
+            lat0 + (lat1 - lat0) * t - (lon1 - lon0) * offset,
+            lon0 + (lon1 - lon0) * t + (lat1 - lat0) * offset,
+        ])
+
+    bounds = sorted(rng.sample(range(1, points - 1), min(STEPS_PER_SYNTHETIC_ROUTE - 1, points - 2)))
+    edges = [0] + bounds + [points - 1]
+    steps = [
+        {
+            "from_index": start,
+            "to_index": end,
+            "speed_limit": rng.choice(SYNTHETIC_SPEED_LIMITS),
+            "name": f"Synthetic Road {n + 1}",
+        }
+        for n, (start, end) in enumerate(zip(edges, edges[1:]))
+        if end > start
+    ]
+    return {"name": "synthetic", "coordinates": coordinates, "steps": steps}
+
+
+class RouteFixture:
+    """Recorded routes served in place of live routing calls"""
+
+    def __init__(self, routes: Optional[List[Dict[str, Any]]] = None, tolerance_m: float = MATCH_TOLERANCE_METERS):
+        self.routes = [r for r in (routes or []) if len(r.get("coordinates") or []) >= 2]
+        self.tolerance_m = tolerance_m
+
+    @classmethod
+    def load(cls, path: str) -> "RouteFixture":
+        """Read a fixture file of the form ``{"routes": [{"coordinates": [...], "steps": [...]}]}``"""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("routes", []) if isinstance(data, dict) else data)
+
+    def __len__(self) -> int:
+        return len(self.routes)
+
+    def find(self, origin: Tuple[float, float], destination: Tuple[float, float]) -> Optional[Dict[str, Any]]:
+        """The recorded route whose ends are closest to ``origin`` and ``destination``, if within tolerance"""
+        best, best_m = None, self.tolerance_m
+        for route in self.routes:
+            start, end = route["coordinates"][0], route["coordinates"][-1]
+            error_m = 1000.0 * max(
+                haversine_km(origin[0], origin[1], start[0], start[1]),
+                haversine_km(destination[0], destination[1], end[0], end[1]),
+            )
+            if error_m <= best_m:
+                best, best_m = route, error_m
+        return best
+
+    def route_between(self, origin: Tuple[float, float], destination: Tuple[float, float]) -> Dict[str, Any]:
+        """A recorded route when one matches, otherwise a synthetic one"""
+        return self.find(origin, destination) or synthesise_route(origin, destination)
+
+    def geoapify_response(self, waypoints: Sequence[Tuple[float, float]]) -> Dict[str, Any]:
+        """Route through ``waypoints`` shaped like a Geoapify ``format=json`` response, one leg per pair"""
+        legs = []
+        for origin, destination in zip(waypoints, waypoints[1:]):
+            route = self.route_between(tuple(origin), tuple(destination))
+            legs.append((route["coordinates"], build_leg(route["coordinates"], route.get("steps"))))
+        return build_response(waypoints, legs, source="fixture")
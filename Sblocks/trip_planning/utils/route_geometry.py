@@ -0,0 +1,259 @@
+"""
+Route polyline with a precomputed cumulative-distance index
+
+Built once per route; position, bearing and remaining distance for a given
+distance along the route are then a binary search plus one interpolation.
+Snapping a point to the route without a hint goes through a uniform grid of
+segments, so only the segments near the point are projected onto.
+"""
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from utils.geo import as_latlon_array, bearing_deg, haversine_km, segment_lengths_km
+
+DEFAULT_SEARCH_WINDOW_METERS = 2000.0  # Either side of a hint when locating a point
+GRID_CELL_METERS = 250.0
+GRID_MIN_POINTS = 64  # Shorter routes are cheaper to scan than to index
+GRID_MAX_RINGS = 8
+METERS_PER_DEGREE = 111_195.0
+ROUTE_GEOMETRY_CACHE_SIZE = int(os.getenv("ROUTE_GEOMETRY_CACHE_SIZE", "512"))
+
+
+class RouteGeometry:
+    """A ``[lat, lon]`` polyline indexed by distance along it, in metres
+
+    ``total_distance_m`` is the route length reported by the router; when
+    given, distances are scaled so the polyline's end sits exactly at that
+    length and progress agrees with the trip's stored distance. Otherwise
+    the polyline's own haversine length is used.
+    """
+
+    def __init__(self, coordinates: Any, total_distance_m: Optional[float] = None):
+        self.coordinates = as_latlon_array(coordinates)
+        if len(self.coordinates) > 1:
+            cumulative = np.concatenate(([0.0], np.cumsum(segment_lengths_km(self.coordinates) * 1000.0)))
+        else:
+            cumulative = np.zeros(len(self.coordinates))
+        self.geometry_length_m = float(cumulative[-1]) if len(cumulative) else 0.0
+        self.length_m = float(total_distance_m) if total_distance_m and total_distance_m > 0 else self.geometry_length_m
+
+        scale = self.length_m / self.geometry_length_m if self.geometry_length_m > 0 else 0.0
+        self.cumulative_m = cumulative * scale
+
+        # Local equirectangular plane in metres, shared by the projection and the grid
+        ref_lat = float(self.coordinates[:, 0].mean()) if len(self.coordinates) else 0.0
+        self._kx = np.cos(np.radians(ref_lat)) * METERS_PER_DEGREE
+        self._xs, self._ys = self._plane(self.coordinates[:, 0], self.coordinates[:, 1])
+        self._polyline: Optional[List[List[float]]] = None
+        self._grid: Optional[Dict[Tuple[int, int], np.ndarray]] = None
+        self._grid_extent: Tuple[int, int, int, int] = (0, 0, 0, 0)
+
+    def __len__(self) -> int:
+        return len(self.coordinates)
+
+    @property
+    def polyline(self) -> List[List[float]]:
+        """The coordinates as ``[lat, lon]`` lists, converted once"""
+        if self._polyline is None:
+            self._polyline = self.coordinates.tolist()
+        return self._polyline
+
+    def _locate(self, distance_m: float) -> Tuple[int, float]:
+        """Segment index and fraction along it for ``distance_m``"""
+        d = min(max(float(distance_m), 0.0), self.length_m)
+        last = len(self.coordinates) - 2
+        index = int(np.searchsorted(self.cumulative_m, d, side="right")) - 1
+        index = min(max(index, 0), last)
+        span = self.cumulative_m[index + 1] - self.cumulative_m[index]
+        fraction = (d - self.cumulative_m[index]) / span if span > 0 else 0.0
+        return index, min(max(fraction, 0.0), 1.0)
+
+    def position_at_distance(self, distance_m: float) -> Tuple[float, float]:
+        """``(lat, lon)`` at ``distance_m`` along the route"""
+        if len(self.coordinates) == 0:
+            return (0.0, 0.0)
+        if len(self.coordinates) == 1 or distance_m >= self.length_m:
+            lat, lon = self.coordinates[-1 if distance_m >= self.length_m else 0]
+            return (float(lat), float(lon))
+
+        index, fraction = self._locate(distance_m)
+        start, end = self.coordinates[index], self.coordinates[index + 1]
+        point = start + (end - start) * fraction
+        return (float(point[0]), float(point[1]))
+
+    def position_at_fraction(self, fraction: float) -> Tuple[float, float]:
+        """``(lat, lon)`` at a 0-1 fraction of the route length"""
+        return self.position_at_distance(fraction * self.length_m)
+
+    def segment_index_at_distance(self, distance_m: float) -> Optional[int]:
+        """Index of the vertex starting the segment that contains ``distance_m``"""
+        if len(self.coordinates) < 2:
+            return 0 if len(self.coordinates) else None
+        return self._locate(distance_m)[0]
+
+    def bearing_at_distance(self, distance_m: float) -> float:
+        """Heading of the segment at ``distance_m``; 0 at the destination"""
+        if len(self.coordinates) < 2 or distance_m >= self.length_m:
+            return 0.0
+        index, _ = self._locate(distance_m)
+        start, end = self.coordinates[index], self.coordinates[index + 1]
+        return float(bearing_deg(start[0], start[1], end[0], end[1]))
+
+    def distance_at_index(self, index: int) -> float:
+        """Distance from the start to vertex ``index``"""
+        if len(self.coordinates) == 0:
+            return 0.0
+        return float(self.cumulative_m[min(max(int(index), 0), len(self.coordinates) - 1)])
+
+    def _plane(self, latitude: Any, longitude: Any) -> Tuple[np.ndarray, np.ndarray]:
+        return np.asarray(longitude) * self._kx, np.asarray(latitude) * METERS_PER_DEGREE
+
+    def _project(self, segments: np.ndarray, latitude: float, longitude: float) -> Tuple[int, float, float]:
+        """Closest of ``segments`` to a point: ``(segment, fraction, offset_m)``"""
+        px, py = self._plane(latitude, longitude)
+        ax, ay = self._xs[segments], self._ys[segments]
+        dx, dy = self._xs[segments + 1] - ax, self._ys[segments + 1] - ay
+        seg_len_sq = dx * dx + dy * dy
+        with np.errstate(invalid="ignore", divide="ignore"):
+            t = np.where(seg_len_sq > 0, ((px - ax) * dx + (py - ay) * dy) / seg_len_sq, 0.0)
+        t = np.clip(t, 0.0, 1.0)
+        ox, oy = ax + t * dx - px, ay + t * dy - py
+        offsets = ox * ox + oy * oy
+        best = int(np.argmin(offsets))
+        return int(segments[best]), float(t[best]), float(np.sqrt(offsets[best]))
+
+    def _cell(self, x: Any, y: Any) -> Tuple[np.ndarray, np.ndarray]:
+        return np.floor(np.asarray(x) / GRID_CELL_METERS).astype(np.int64), np.floor(np.asarray(y) / GRID_CELL_METERS).astype(np.int64)
+
+    def _build_grid(self):
+        """Bucket every segment into the grid cells its bounding box covers"""
+        cx, cy = self._cell(self._xs, self._ys)
+        x0, x1 = np.minimum(cx[:-1], cx[1:]), np.maximum(cx[:-1], cx[1:])
+        y0, y1 = np.minimum(cy[:-1], cy[1:]), np.maximum(cy[:-1], cy[1:])
+
+        buckets: Dict[Tuple[int, int], List[int]] = {}
+        for segment in range(len(x0)):
+            for gx in range(int(x0[segment]), int(x1[segment]) + 1):
+                for gy in range(int(y0[segment]), int(y1[segment]) + 1):
+                    buckets.setdefault((gx, gy), []).append(segment)
+        self._grid = {cell: np.asarray(segments, dtype=np.int64) for cell, segments in buckets.items()}
+        self._grid_extent = (int(cx.min()), int(cx.max()), int(cy.min()), int(cy.max()))
+
+    def _nearest_segment(self, latitude: float, longitude: float) -> Tuple[int, float]:
+        """Closest segment to a point via the grid: ``(segment, fraction)``
+
+        Rings of cells are searched outwards from the point's cell until the
+        best offset found is shorter than the distance to the edge of the
+        searched block; a point too far from the route for that to happen
+        within ``GRID_MAX_RINGS`` is projected onto every segment instead.
+        """
+        if self._grid is None:
+            self._build_grid()
+        px, py = self._plane(latitude, longitude)
+        qx, qy = (int(c) for c in self._cell(px, py))
+        min_x, max_x, min_y, max_y = self._grid_extent
+        max_ring = max(abs(qx - min_x), abs(qx - max_x), abs(qy - min_y), abs(qy - max_y))
+
+        best: Optional[Tuple[int, float, float]] = None
+        for ring in range(min(max_ring, GRID_MAX_RINGS) + 1):
+            found = []
+            for gx in range(qx - ring, qx + ring + 1):
+                for gy in ((qy - ring, qy + ring) if abs(gx - qx) != ring else range(qy - ring, qy + ring + 1)):
+                    segments = self._grid.get((gx, gy))
+                    if segments is not None:
+                        found.append(segments)
+            if found:
+                candidate = self._project(np.concatenate(found), latitude, longitude)
+                if best is None or candidate[2] < best[2]:
+                    best = candidate
+            # Anything outside the searched block is at least this far from the point
+            margin = min(px - (qx - ring) * GRID_CELL_METERS, (qx + ring + 1) * GRID_CELL_METERS - px,
+                         py - (qy - ring) * GRID_CELL_METERS, (qy + ring + 1) * GRID_CELL_METERS - py)
+            if best is not None and (best[2] <= margin or ring == max_ring):
+                return best[0], best[1]
+        segment, fraction, _ = self._project(np.arange(len(self.coordinates) - 1), latitude, longitude)
+        return segment, fraction
+
+    def distance_at_point(
+        self,
+        latitude: float,
+        longitude: float,
+        hint_m: Optional[float] = None,
+        window_m: float = DEFAULT_SEARCH_WINDOW_METERS
+    ) -> float:
+        """Distance along the route of the closest point to ``(latitude, longitude)``
+
+        With ``hint_m`` (e.g. the last known distance) only the segments
+        within ``window_m`` of it are projected onto, found by binary search;
+        otherwise the nearest segment comes from the grid.
+        """
+        if len(self.coordinates) < 2:
+            return 0.0
+
+        if hint_m is not None:
+            first = self._locate(hint_m - window_m)[0]
+            last = self._locate(hint_m + window_m)[0]
+            index, fraction, _ = self._project(np.arange(first, last + 1), latitude, longitude)
+        elif len(self.coordinates) >= GRID_MIN_POINTS:
+            index, fraction = self._nearest_segment(latitude, longitude)
+        else:
+            index, fraction, _ = self._project(np.arange(len(self.coordinates) - 1), latitude, longitude)
+        return float(self.cumulative_m[index] + fraction * (self.cumulative_m[index + 1] - self.cumulative_m[index]))
+
+    def remaining_distance(self, distance_m: float) -> float:
+        """Distance left from ``distance_m`` to the destination"""
+        return max(0.0, self.length_m - float(distance_m))
+
+    def remaining_coordinates(self, distance_m: float) -> List[List[float]]:
+        """The polyline from ``distance_m`` to the destination, starting at the interpolated point"""
+        if len(self.coordinates) < 2:
+            return self.coordinates.tolist()
+        if distance_m >= self.length_m:
+            return [self.coordinates[-1].tolist()]
+        index, _ = self._locate(distance_m)
+        return [list(self.position_at_distance(distance_m))] + self.polyline[index + 1:]
+
+
+class RouteGeometryCache:
+    """LRU of compiled per-trip route artefacts
+
+    Entries are stored with a ``stamp`` describing the route they were built
+    from (e.g. its length and duration); a lookup with a different stamp is
+    a miss, so a rerouted trip is rebuilt rather than served stale.
+    """
+
+    def __init__(self, max_entries: int = ROUTE_GEOMETRY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Hashable, Any]]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get(self, key: str, stamp: Hashable) -> Any:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != stamp:
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry[1]
+
+    def put(self, key: str, stamp: Hashable, value: Any):
+        self._entries[key] = (stamp, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def invalidate(self, key: str):
+        self._entries.pop(key, None)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {**self.stats, "entries": len(self._entries), "max_entries": self.max_entries}
@@ -0,0 +1,72 @@
+"""
+Build routing responses in the Geoapify ``format=json`` shape
+
+Used by the local routing providers so their routes go through the same
+parsing as Geoapify's (``_extract_route_info_from_raw``,
+``_create_route_from_raw_response``, ``_extract_speed_profile_from_raw_response``).
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from utils.geo import path_length_km
+
+DEFAULT_SPEED_KMH = 60.0
+
+
+def build_leg(coordinates: Sequence[Sequence[float]], steps: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """Geoapify leg for a ``[lat, lon]`` polyline; each step is timed at its speed limit
+
+    ``steps`` hold ``from_index``, ``to_index``, ``speed_limit`` and ``name``
+    (and optionally ``instruction``); without them the leg is one step.
+    """
+    if not steps:
+        steps = [{"from_index": 0, "to_index": len(coordinates) - 1, "speed_limit": DEFAULT_SPEED_KMH}]
+
+    leg_steps = []
+    for i, step in enumerate(steps):
+        start, end = int(step["from_index"]), int(step["to_index"])
+        distance_m = path_length_km(coordinates[start:end + 1]) * 1000.0
+        limit = float(step.get("speed_limit") or DEFAULT_SPEED_KMH)
+        name = step.get("name") or "Unnamed Road"
+        instruction = step.get("instruction") or {
+            "text": f"{'Drive' if i == 0 else 'Continue'} along {name}",
+            "type": "StartAt" if i == 0 else "Straight",
+        }
+        leg_steps.append({
+            "from_index": start,
+            "to_index": end,
+            "distance": round(distance_m, 1),
+            "time": round(distance_m / (limit / 3.6), 1),
+            "speed": limit,
+            "speed_limit": limit,
+            "name": name,
+            "instruction": instruction,
+        })
+    return {
+        "distance": round(sum(s["distance"] for s in leg_steps), 1),
+        "time": round(sum(s["time"] for s in leg_steps), 1),
+        "steps": leg_steps,
+    }
+
+
+def build_response(
+    waypoints: Sequence[Tuple[float, float]],
+    legs: List[Tuple[Sequence[Sequence[float]], Dict[str, Any]]],
+    source: str,
+    mode: str = "drive"
+) -> Dict[str, Any]:
+    """Full response from ``(coordinates, leg)`` pairs, one per pair of consecutive waypoints"""
+    points = [{"lat": lat, "lon": lon} for lat, lon in waypoints]
+    return {
+        "results": [{
+            "mode": mode,
+            "waypoints": points,
+            "units": "metric",
+            "distance": round(sum(leg["distance"] for _, leg in legs), 1),
+            "distance_units": "meters",
+            "time": round(sum(leg["time"] for _, leg in legs), 1),
+            "legs": [leg for _, leg in legs],
+            "geometry": [[{"lat": lat, "lon": lon} for lat, lon in coordinates] for coordinates, _ in legs],
+        }],
+        "properties": {"mode": mode, "waypoints": points},
+        "source": source,
+    }
@@ -0,0 +1,72 @@
+"""
+Spatio-temporal index of trip start points for pairing trips
+
+Trips are bucketed by the grid cell of their origin and the hour of their
+departure. Looking up the trips that leave near a point within a time
+window then only touches the handful of cells and hours that can hold a
+match, instead of every other trip.
+"""
+import math
+from collections import defaultdict
+from typing import Any, DefaultDict, Iterator, List, Tuple
+
+from utils.geo import EARTH_RADIUS_KM
+
+KM_PER_DEGREE = 111.195
+TIME_BUCKET_SECONDS = 3600.0
+MAX_INDEX_LATITUDE = 89.0
+
+
+def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Scalar haversine; called once per indexed neighbour so it avoids NumPy overhead"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((phi2 - phi1) / 2.0) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2.0) ** 2
+    return 2.0 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+class TripCandidateIndex:
+    """Points bucketed by ``radius_km`` grid cell and departure hour; ``near`` finds those in reach"""
+
+    def __init__(self, radius_km: float, bucket_s: float = TIME_BUCKET_SECONDS):
+        self.radius_km = radius_km
+        self.bucket_s = bucket_s
+        self.cell_deg = radius_km / KM_PER_DEGREE
+        self._buckets: DefaultDict[Tuple[int, int, int], List[Tuple[Any, float, float, float]]] = defaultdict(list)
+        self._max_abs_lat = 0.0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg)
+
+    def add(self, item: Any, lat: float, lon: float, depart_ts: float):
+        """Index ``item`` as leaving from (lat, lon) at ``depart_ts`` (epoch seconds)"""
+        row, col = self._cell(lat, lon)
+        self._buckets[(row, col, math.floor(depart_ts / self.bucket_s))].append((item, lat, lon, depart_ts))
+        self._max_abs_lat = max(self._max_abs_lat, abs(lat))
+        self._count += 1
+
+    def near(self, lat: float, lon: float, after_ts: float, until_ts: float) -> Iterator[Tuple[Any, float]]:
+        """``(item, distance_km)`` for points within the radius leaving in (after_ts, until_ts]"""
+        if until_ts <= after_ts:
+            return
+        # Cells are square in degrees, so at this latitude a radius spans more columns than rows
+        reach_lat = min(MAX_INDEX_LATITUDE, max(abs(lat), self._max_abs_lat) + self.cell_deg)
+        lon_reach = self.cell_deg / math.cos(math.radians(reach_lat))
+        rows = range(math.floor((lat - self.cell_deg) / self.cell_deg),
+                     math.floor((lat + self.cell_deg) / self.cell_deg) + 1)
+        cols = range(math.floor((lon - lon_reach) / self.cell_deg),
+                     math.floor((lon + lon_reach) / self.cell_deg) + 1)
+        hours = range(math.floor(after_ts / self.bucket_s), math.floor(until_ts / self.bucket_s) + 1)
+
+        for row in rows:
+            for col in cols:
+                for hour in hours:
+                    for item, p_lat, p_lon, depart_ts in self._buckets.get((row, col, hour), ()):
+                        if not after_ts < depart_ts <= until_ts:
+                            continue
+                        distance = _haversine_km(lat, lon, p_lat, p_lon)
+                        if distance <= self.radius_km:
+                            yield item, distance